@@ -0,0 +1,44 @@
+"""Job requirement extraction cache table
+
+Revision ID: 003_job_requirement_extractions
+Revises: 002_enhanced_auth
+Create Date: 2024-02-01 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '003_job_requirement_extractions'
+down_revision = '002_enhanced_auth'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create the content-addressed job requirement extraction table."""
+    
+    op.create_table(
+        'job_requirement_extractions',
+        sa.Column('digest', sa.String(64), primary_key=True),
+        sa.Column('prompt_version', sa.String(50), nullable=False),
+        sa.Column('model', sa.String(100), nullable=False),
+        sa.Column('requirements', postgresql.JSONB(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    
+    # Allows purging extractions from retired prompt versions or models
+    op.create_index(
+        'idx_job_requirement_extractions_version_model',
+        'job_requirement_extractions',
+        ['prompt_version', 'model']
+    )
+
+
+def downgrade() -> None:
+    """Drop the job requirement extraction table."""
+    
+    op.drop_index('idx_job_requirement_extractions_version_model')
+    op.drop_table('job_requirement_extractions')
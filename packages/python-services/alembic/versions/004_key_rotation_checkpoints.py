@@ -0,0 +1,51 @@
+"""Key rotation checkpoint table
+
+Revision ID: 004_key_rotation_checkpoints
+Revises: 003_job_requirement_extractions
+Create Date: 2024-02-05 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_key_rotation_checkpoints'
+down_revision = '003_job_requirement_extractions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create the per-worker checkpoint table for online key rotation."""
+    
+    op.create_table(
+        'key_rotation_checkpoints',
+        sa.Column('job_id', sa.String(255), primary_key=True),
+        sa.Column('worker_index', sa.Integer(), primary_key=True),
+        sa.Column('table_name', sa.String(255), nullable=False),
+        sa.Column('old_key_id', sa.String(255), nullable=False),
+        sa.Column('new_key_id', sa.String(255), nullable=False),
+        # Primary key boundaries are stored as text so any key type can be checkpointed
+        sa.Column('range_start', sa.Text(), nullable=True),
+        sa.Column('range_end', sa.Text(), nullable=True),
+        sa.Column('last_pk', sa.Text(), nullable=True),
+        sa.Column('total_rows', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('rows_processed', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('rows_updated', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    
+    op.create_index(
+        'idx_key_rotation_checkpoints_status',
+        'key_rotation_checkpoints',
+        ['status']
+    )
+
+
+def downgrade() -> None:
+    """Drop the key rotation checkpoint table."""
+    
+    op.drop_index('idx_key_rotation_checkpoints_status')
+    op.drop_table('key_rotation_checkpoints')
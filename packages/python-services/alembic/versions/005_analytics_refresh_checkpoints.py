@@ -0,0 +1,40 @@
+"""Analytics refresh checkpoint table
+
+Revision ID: 005_analytics_refresh_checkpoints
+Revises: 004_key_rotation_checkpoints
+Create Date: 2024-02-12 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_analytics_refresh_checkpoints'
+down_revision = '004_key_rotation_checkpoints'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create the checkpoint table for incremental analytics refreshes."""
+    
+    op.create_table(
+        'analytics_refresh_checkpoints',
+        sa.Column('job_name', sa.String(255), primary_key=True),
+        sa.Column('run_id', sa.String(255), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='completed'),
+        # Activity in (since_watermark, until_watermark] is refreshed by the current run
+        sa.Column('since_watermark', sa.DateTime(), nullable=True),
+        sa.Column('until_watermark', sa.DateTime(), nullable=True),
+        # Keyset cursor of the last committed chunk, stored as text like key rotation checkpoints
+        sa.Column('last_user_id', sa.Text(), nullable=True),
+        sa.Column('users_refreshed', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Drop the analytics refresh checkpoint table."""
+    
+    op.drop_table('analytics_refresh_checkpoints')
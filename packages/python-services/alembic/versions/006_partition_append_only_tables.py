@@ -0,0 +1,137 @@
+"""Monthly range partitioning for audit logs and security events
+
+Revision ID: 006_partition_append_only_tables
+Revises: 005_analytics_refresh_checkpoints
+Create Date: 2024-02-19 10:00:00.000000
+
+The existing tables are converted without copying rows: each is renamed to
+``<table>_legacy`` and attached as the partition covering everything before
+the start of next month, under a new partitioned parent with the original
+name. A validated CHECK constraint lets the attach skip its scan, and the
+indexes the parent needs are built on the legacy table concurrently
+beforehand, so writes are only blocked for the catalog-only renames and
+attach. New rows go to monthly partitions from next month on.
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006_partition_append_only_tables'
+down_revision = '005_analytics_refresh_checkpoints'
+branch_labels = None
+depends_on = None
+
+PREMAKE_MONTHS = 3
+
+# Secondary indexes from 002, recreated on the partitioned parents
+TABLE_INDEXES = {
+    'audit_logs': ['user_id', 'event_type', 'created_at'],
+    'security_events': ['user_id', 'event_type', 'severity', 'status', 'created_at'],
+}
+
+# Foreign keys from 002. Audit rows and security events outlive the users they
+# mention, so the partitioned tables carry none; the legacy partitions keep
+# theirs until they expire.
+TABLE_FOREIGN_KEYS = {
+    'audit_logs': [('fk_audit_logs_user_id', 'user_id')],
+    'security_events': [
+        ('fk_security_events_user_id', 'user_id'),
+        ('fk_security_events_resolved_by', 'resolved_by'),
+    ],
+}
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    index = moment.year * 12 + moment.month - 1 + months
+    return moment.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _next_month() -> datetime:
+    now = datetime.now(timezone.utc)
+    return _add_months(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0), 1)
+
+
+def upgrade() -> None:
+    """Convert audit_logs and security_events to monthly range partitions."""
+
+    boundary = _next_month()
+
+    for table in TABLE_INDEXES:
+        # Rows keyed on a NULL created_at could not be routed to any partition
+        with op.get_context().autocommit_block():
+            op.execute(f"UPDATE {table} SET created_at = now() WHERE created_at IS NULL")
+            # Backs the (id, created_at) primary key once the table is attached
+            op.execute(f"""
+                CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {table}_legacy_id_created_at
+                ON {table} (id, created_at)
+            """)
+            # VALIDATE only takes a SHARE UPDATE EXCLUSIVE lock, so writes continue
+            op.execute(f"""
+                ALTER TABLE {table} ADD CONSTRAINT {table}_legacy_bound
+                CHECK (created_at IS NOT NULL AND created_at < '{boundary.isoformat()}') NOT VALID
+            """)
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_legacy_bound")
+
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        op.execute(f"ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_pkey TO {table}_legacy_pkey")
+        for column in TABLE_INDEXES[table]:
+            op.execute(f"ALTER INDEX idx_{table}_{column} RENAME TO idx_{table}_legacy_{column}")
+        # The validated CHECK constraint proves there are no NULLs, so this skips the scan
+        op.execute(f"ALTER TABLE {table}_legacy ALTER COLUMN created_at SET NOT NULL")
+
+        op.execute(f"""
+            CREATE TABLE {table} (
+                LIKE {table}_legacy INCLUDING DEFAULTS,
+                CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+        """)
+        op.execute(f"""
+            ALTER TABLE {table} ATTACH PARTITION {table}_legacy
+            FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')
+        """)
+
+        for offset in range(PREMAKE_MONTHS + 1):
+            lower = _add_months(boundary, offset)
+            upper = _add_months(boundary, offset + 1)
+            op.execute(f"""
+                CREATE TABLE {table}_p{lower:%Y_%m} PARTITION OF {table}
+                FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')
+            """)
+
+        # Matching legacy indexes are attached rather than rebuilt; new partitions are empty
+        for column in TABLE_INDEXES[table]:
+            op.execute(f"CREATE INDEX idx_{table}_{column} ON {table} ({column})")
+
+
+def downgrade() -> None:
+    """Copy the partitioned rows back into plain tables.
+
+    Unlike the upgrade this rewrites every row and blocks writes while it runs.
+    """
+
+    for table in TABLE_INDEXES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_partitioned")
+        op.execute(f"ALTER TABLE {table}_partitioned RENAME CONSTRAINT {table}_pkey TO {table}_partitioned_pkey")
+        for column in TABLE_INDEXES[table]:
+            op.execute(f"ALTER INDEX idx_{table}_{column} RENAME TO idx_{table}_partitioned_{column}")
+
+        op.execute(f"""
+            CREATE TABLE {table} (
+                LIKE {table}_partitioned INCLUDING DEFAULTS,
+                CONSTRAINT {table}_pkey PRIMARY KEY (id)
+            )
+        """)
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN created_at DROP NOT NULL")
+        op.execute(f"INSERT INTO {table} SELECT * FROM {table}_partitioned")
+        op.execute(f"DROP TABLE {table}_partitioned CASCADE")
+
+        for column in TABLE_INDEXES[table]:
+            op.create_index(f"idx_{table}_{column}", table, [column])
+        # Rows may reference users deleted since the upgrade
+        for name, column in TABLE_FOREIGN_KEYS[table]:
+            op.execute(f"""
+                ALTER TABLE {table} ADD CONSTRAINT {name}
+                FOREIGN KEY ({column}) REFERENCES users (id) NOT VALID
+            """)
@@ -19,6 +19,7 @@ from ..services.encryption_service import (
     decrypt_user_data,
     get_encryption_health_check
 )
+from ..core.database_encryption import get_key_rotation_service
 from ..core.tls_config import get_tls_service
 from ..models.encrypted_fields import EncryptionAuditLog, EncryptionMetrics
 
@@ -249,6 +250,26 @@ async def rotate_encryption_keys(
         raise HTTPException(status_code=500, detail=f"Key rotation failed: {str(e)}")
 
 
+@router.get("/rotations/{job_id}")
+async def get_key_rotation_progress(job_id: str):
+    """
+    Get progress of an online table key rotation.
+    
+    Returns rows processed and updated, per-worker status, throughput and
+    the estimated time remaining.
+    """
+    try:
+        progress = await get_key_rotation_service().get_rotation_progress(job_id)
+    except Exception as e:
+        logger.error("Failed to get key rotation progress", job_id=job_id, error=str(e))
+        raise HTTPException(status_code=500, detail=f"Key rotation progress retrieval failed: {str(e)}")
+    
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Key rotation job not found")
+    
+    return progress
+
+
 @router.get("/tls-info")
 async def get_tls_information():
     """
@@ -93,7 +93,8 @@ async def get_cdn_optimizer() -> CDNOptimizer:
         css_minify=settings.cdn.css_minify,
         js_minify=settings.cdn.js_minify,
         enable_brotli=settings.cdn.enable_brotli,
-        enable_gzip=settings.cdn.enable_gzip
+        enable_gzip=settings.cdn.enable_gzip,
+        max_workers=settings.cdn.optimization_workers
     )
 
 
@@ -189,9 +190,17 @@ async def batch_optimize_assets(
             results = await cdn_optimizer.batch_optimize_directory(
                 directory_path,
                 request.pattern,
-                request.max_concurrent
+                request.max_concurrent,
+                manifest_path=Path(settings.cdn.build_manifest_path)
             )
             
+            # Publish versioned paths for AssetVersionManager
+            manager = AssetVersionManager(Path(settings.cdn.asset_manifest_path))
+            await manager.load_manifest()
+            for result in results:
+                manager.add_asset(result.path, result.cache_key)
+            await manager.save_manifest()
+            
             # Count assets in directory
             total_assets = len(list(directory_path.glob(request.pattern)))
             successful = len(results)
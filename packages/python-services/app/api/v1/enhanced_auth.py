@@ -449,20 +449,7 @@ async def get_user_sessions(
     """Get user's active sessions."""
     
     try:
-        # This would typically query the database for user sessions
-        # For now, return a simulated response
-        sessions = [
-            SessionInfo(
-                session_id="session_1",
-                user_id=user.id,
-                ip_address="192.168.1.1",
-                user_agent="Mozilla/5.0...",
-                created_at=datetime.now(timezone.utc),
-                last_activity=datetime.now(timezone.utc),
-                expires_at=datetime.now(timezone.utc) + timedelta(days=7),
-                is_active=True
-            )
-        ]
+        sessions = await user_manager.get_user_sessions(user.id)
         
         return SessionListResponse(sessions=sessions, total=len(sessions))
         
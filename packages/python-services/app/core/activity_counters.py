@@ -0,0 +1,102 @@
+"""
+Incremental activity counters for business metrics.
+
+Business events are counted as they happen instead of being recounted from
+the database on every scrape:
+
+- ``metrics:events:{event}:{minute}`` counter per event and minute, expiring
+  after ``EVENT_RETENTION_SECONDS``
+- ``metrics:active_sessions:{window}`` HyperLogLog of the sessions created or
+  touched in a window; the session store already writes once per touch
+  interval, so the count rides along in its pipelines
+
+Reading every rate and the active session count is one pipelined round trip.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import redis.asyncio as redis
+
+
+EVENT_KEY_PREFIX = "metrics:events"
+ACTIVE_SESSIONS_KEY_PREFIX = "metrics:active_sessions"
+EVENT_WINDOW_SECONDS = 60
+EVENT_RETENTION_SECONDS = 2 * 3600
+
+APPLICATION_SUBMITTED = "applications"
+DOCUMENT_GENERATED = "documents"
+
+
+def event_key(event: str, minute: int) -> str:
+    return f"{EVENT_KEY_PREFIX}:{event}:{minute}"
+
+
+def active_sessions_key(window: int) -> str:
+    return f"{ACTIVE_SESSIONS_KEY_PREFIX}:{window}"
+
+
+def _minute(now: float) -> int:
+    return int(now // EVENT_WINDOW_SECONDS) * EVENT_WINDOW_SECONDS
+
+
+def mark_session_active(pipe, session_id: str, window_seconds: int, now: Optional[float] = None) -> None:
+    """Queue the commands counting ``session_id`` as active on an existing pipeline."""
+    now = time.time() if now is None else now
+    window_seconds = max(window_seconds, 1)
+    key = active_sessions_key(int(now // window_seconds) * window_seconds)
+    pipe.pfadd(key, session_id)
+    # Readers look back one full window past the current one
+    pipe.expire(key, 2 * window_seconds + 60)
+
+
+@dataclass
+class ActivitySnapshot:
+    """Per-minute event rates and the active session count."""
+    rates: Dict[str, float]
+    active_sessions: int
+
+
+class ActivityCounters:
+    """Records business events and reads back their rates."""
+
+    def __init__(self, redis_client: redis.Redis, active_window_seconds: int = 300):
+        self.redis_client = redis_client
+        self.active_window_seconds = max(active_window_seconds, 1)
+
+    async def record(self, event: str, count: int = 1, now: Optional[float] = None) -> None:
+        key = event_key(event, _minute(time.time() if now is None else now))
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.incrby(key, count)
+            pipe.expire(key, EVENT_RETENTION_SECONDS)
+            await pipe.execute()
+
+    async def snapshot(
+        self,
+        events: Sequence[str],
+        minutes: int = 5,
+        now: Optional[float] = None
+    ) -> ActivitySnapshot:
+        """
+        Average per-minute rates over the last ``minutes`` complete minutes.
+
+        Active sessions are those created or touched in the current or the
+        previous window, so at least the last ``active_window_seconds``.
+        """
+        now = time.time() if now is None else now
+        current = _minute(now)
+        minute_starts = [current - EVENT_WINDOW_SECONDS * i for i in range(1, minutes + 1)]
+        window = int(now // self.active_window_seconds) * self.active_window_seconds
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.mget([event_key(event, minute) for minute in minute_starts])
+            pipe.pfcount(active_sessions_key(window), active_sessions_key(window - self.active_window_seconds))
+            *counts, active = await pipe.execute()
+
+        rates = {
+            event: sum(int(value) for value in values if value is not None) / minutes
+            for event, values in zip(events, counts)
+        }
+        return ActivitySnapshot(rates=rates, active_sessions=int(active))
@@ -0,0 +1,244 @@
+"""
+Time-bucketed Redis storage for security alerts.
+
+Alerts are written into one set of keys per time bucket (an hour by default):
+
+- ``alerts:{bucket}`` hash of alert id -> serialised alert
+- ``alerts:{bucket}:time`` sorted set of alert ids by timestamp
+- ``alerts:{bucket}:counts`` hash of counters (``total`` and ``severity:{level}``)
+
+Every bucket key expires once it falls out of the retention window, so old
+alerts are trimmed by Redis itself. ``alerts:buckets`` indexes the live
+buckets and is trimmed on every write; ``alert_locator:{id}`` maps an alert
+back to its bucket for updates.
+
+Reads are pipelined: recent alerts cost one round trip to list ids and one
+HMGET per bucket touched, and statistics are summed from the bucket counters
+instead of being counted on demand.
+
+Correlation and notification throttling each run as a single Lua script, so
+concurrent workers cannot interleave between the check and the update.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import redis.asyncio as redis
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+BUCKET_INDEX_KEY = "alerts:buckets"
+LOCATOR_KEY_PREFIX = "alert_locator:"
+
+# Buckets whose time indexes are fetched per pipeline when listing alerts
+BUCKETS_PER_READ = 24
+
+# KEYS[1] correlation list; ARGV: alert id, max entries, window seconds.
+# Returns the ids already in the window, newest first.
+CORRELATE_SCRIPT = """
+local previous = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[2]) - 1)
+redis.call('LPUSH', KEYS[1], ARGV[1])
+redis.call('LTRIM', KEYS[1], 0, tonumber(ARGV[2]) - 1)
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return previous
+"""
+
+# KEYS[1] throttle flag, KEYS[2] hourly counter; ARGV: throttle seconds,
+# max per hour. Returns 1 and records the send if one is allowed, else 0.
+ACQUIRE_SEND_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if tonumber(redis.call('GET', KEYS[2]) or '0') >= tonumber(ARGV[2]) then
+    return 0
+end
+if tonumber(ARGV[1]) > 0 then
+    redis.call('SET', KEYS[1], '1', 'EX', tonumber(ARGV[1]))
+end
+if redis.call('INCR', KEYS[2]) == 1 then
+    redis.call('EXPIRE', KEYS[2], 3600)
+end
+return 1
+"""
+
+# KEYS[1] throttle flag, KEYS[2] hourly counter. Undoes a send that was
+# acquired but never delivered.
+RELEASE_SEND_SCRIPT = """
+redis.call('DEL', KEYS[1])
+if tonumber(redis.call('GET', KEYS[2]) or '0') > 0 then
+    redis.call('DECR', KEYS[2])
+end
+return 1
+"""
+
+
+def _decode(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def bucket_key(bucket: int) -> str:
+    return f"alerts:{bucket}"
+
+
+def locator_key(alert_id: str) -> str:
+    return f"{LOCATOR_KEY_PREFIX}{alert_id}"
+
+
+@dataclass
+class AlertStatistics:
+    """Counters summed over the retained buckets."""
+    total: int
+    by_severity: Dict[str, int]
+    recent: int
+
+
+class AlertStore:
+    """Bucketed alert storage with Redis-side retention."""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        bucket_seconds: int = 3600,
+        retention_seconds: int = 30 * 86400
+    ):
+        if bucket_seconds <= 0 or retention_seconds < bucket_seconds:
+            raise ValueError("retention must cover at least one positive-length bucket")
+        self.redis_client = redis_client
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention_seconds
+        # A bucket lives until its newest possible alert leaves the window
+        self.key_ttl = retention_seconds + bucket_seconds
+        self._correlate = redis_client.register_script(CORRELATE_SCRIPT)
+        self._acquire_send = redis_client.register_script(ACQUIRE_SEND_SCRIPT)
+        self._release_send = redis_client.register_script(RELEASE_SEND_SCRIPT)
+
+    def bucket_for(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds) * self.bucket_seconds
+
+    async def add(self, alert_id: str, timestamp: float, severity: str, payload: str) -> None:
+        """Store an alert and bump its bucket's counters in one transaction."""
+        bucket = self.bucket_for(timestamp)
+        key = bucket_key(bucket)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, alert_id, payload)
+            pipe.zadd(f"{key}:time", {alert_id: timestamp})
+            pipe.hincrby(f"{key}:counts", "total", 1)
+            pipe.hincrby(f"{key}:counts", f"severity:{severity}", 1)
+            for name in (key, f"{key}:time", f"{key}:counts"):
+                pipe.expire(name, self.key_ttl)
+            pipe.set(locator_key(alert_id), bucket, ex=self.key_ttl)
+            pipe.zadd(BUCKET_INDEX_KEY, {str(bucket): bucket})
+            pipe.zremrangebyscore(BUCKET_INDEX_KEY, "-inf", f"({self._oldest_bucket()}")
+            await pipe.execute()
+
+    async def get(self, alert_id: str) -> Optional[str]:
+        bucket = await self.redis_client.get(locator_key(alert_id))
+        if bucket is None:
+            return None
+        return _decode(await self.redis_client.hget(bucket_key(int(bucket)), alert_id))
+
+    async def replace(self, alert_id: str, payload: str) -> bool:
+        """Overwrite a stored alert in place; False if it is unknown or expired."""
+        bucket = await self.redis_client.get(locator_key(alert_id))
+        if bucket is None:
+            return False
+        key = bucket_key(int(bucket))
+        # The locator can outlive its bucket hash by a few seconds
+        if not await self.redis_client.hexists(key, alert_id):
+            return False
+        await self.redis_client.hset(key, alert_id, payload)
+        return True
+
+    async def recent(self, limit: int = 20) -> List[str]:
+        """Serialised alerts, newest first."""
+        if limit <= 0:
+            return []
+        buckets = await self._buckets()
+        selected: Dict[int, List[str]] = {}
+        remaining = limit
+        for start in range(0, len(buckets), BUCKETS_PER_READ):
+            chunk = buckets[start:start + BUCKETS_PER_READ]
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for bucket in chunk:
+                    pipe.zrevrange(f"{bucket_key(bucket)}:time", 0, remaining - 1)
+                results = await pipe.execute()
+            for bucket, ids in zip(chunk, results):
+                if ids and remaining:
+                    selected[bucket] = [_decode(alert_id) for alert_id in ids[:remaining]]
+                    remaining -= len(selected[bucket])
+            if not remaining:
+                break
+
+        if not selected:
+            return []
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for bucket, ids in selected.items():
+                pipe.hmget(bucket_key(bucket), ids)
+            payloads = await pipe.execute()
+        return [_decode(payload) for values in payloads for payload in values if payload is not None]
+
+    async def statistics(self, recent_seconds: int = 86400) -> AlertStatistics:
+        """
+        Sum the bucket counters.
+
+        ``recent`` counts whole buckets, so it may include up to one bucket
+        of alerts older than ``recent_seconds``.
+        """
+        buckets = await self._buckets()
+        if not buckets:
+            return AlertStatistics(total=0, by_severity={}, recent=0)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for bucket in buckets:
+                pipe.hgetall(f"{bucket_key(bucket)}:counts")
+            counters = await pipe.execute()
+
+        recent_from = self.bucket_for(time.time() - recent_seconds)
+        total = recent = 0
+        by_severity: Dict[str, int] = {}
+        for bucket, counts in zip(buckets, counters):
+            counts = {_decode(name): int(value) for name, value in counts.items()}
+            bucket_total = counts.pop("total", 0)
+            total += bucket_total
+            if bucket >= recent_from:
+                recent += bucket_total
+            for name, value in counts.items():
+                severity = name.split(":", 1)[1]
+                by_severity[severity] = by_severity.get(severity, 0) + value
+        return AlertStatistics(total=total, by_severity=by_severity, recent=recent)
+
+    async def correlate(self, correlation_key: str, alert_id: str, window_seconds: int, limit: int = 10) -> List[str]:
+        """Record an alert under a correlation key; returns the ids already in the window."""
+        previous = await self._correlate(
+            keys=[f"correlation:{correlation_key}"], args=[alert_id, limit, window_seconds]
+        )
+        return [_decode(value) for value in previous]
+
+    async def acquire_send(self, rule_id: str, throttle_seconds: int, max_per_hour: int, now: Optional[float] = None) -> bool:
+        """
+        Check and reserve a send against a rule's throttle and hourly budget
+        atomically. Release the reservation if the notification is not delivered.
+        """
+        allowed = await self._acquire_send(keys=self._send_keys(rule_id, now), args=[throttle_seconds, max_per_hour])
+        return bool(allowed)
+
+    async def release_send(self, rule_id: str, now: Optional[float] = None) -> None:
+        """Return a send acquired at ``now`` to the throttle and hourly budget."""
+        await self._release_send(keys=self._send_keys(rule_id, now), args=[])
+
+    @staticmethod
+    def _send_keys(rule_id: str, now: Optional[float]) -> List[str]:
+        hour = time.gmtime(now if now is not None else time.time()).tm_hour
+        return [f"alert_throttle:{rule_id}", f"alert_count:{rule_id}:{hour}"]
+
+    async def _buckets(self) -> List[int]:
+        """Retained buckets, newest first."""
+        raw = await self.redis_client.zrevrangebyscore(BUCKET_INDEX_KEY, "+inf", self._oldest_bucket())
+        return [int(_decode(bucket)) for bucket in raw]
+
+    def _oldest_bucket(self) -> int:
+        return self.bucket_for(time.time() - self.retention_seconds)
+
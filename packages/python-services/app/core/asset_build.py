@@ -0,0 +1,521 @@
+"""
+Incremental, content-addressed static asset builds.
+
+A build scans a source directory and only re-processes files whose content
+hash or optimisation settings changed since the previous build, as recorded in
+a persisted build manifest. Image optimisation and text compression are CPU
+bound and run in a bounded process pool; workers write their outputs
+atomically under content-addressed names (``name.<hash>.ext``), so a file that
+already exists never needs rewriting. Each build also writes the flat
+``original -> versioned`` mapping served by ``AssetVersionManager``.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Bump whenever worker output changes for identical inputs and settings
+BUILD_VERSION = "1"
+
+BUILD_MANIFEST_NAME = ".asset-build-manifest.json"
+VERSION_MANIFEST_NAME = "asset-manifest.json"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+CONTENT_HASH_LENGTH = 16
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'}
+TEXT_EXTENSIONS = {'.css', '.js', '.mjs', '.html', '.htm', '.json', '.xml', '.svg', '.txt'}
+
+KIND_IMAGE = "image"
+KIND_TEXT = "text"
+KIND_COPY = "copy"
+
+
+def asset_kind(path: Path) -> str:
+    """Classify a source file for the build."""
+    extension = path.suffix.lower()
+    if extension in IMAGE_EXTENSIONS:
+        return KIND_IMAGE
+    if extension in TEXT_EXTENSIONS:
+        return KIND_TEXT
+    return KIND_COPY
+
+
+def settings_digest(options: Dict[str, Any]) -> str:
+    """Digest of the options that affect a build output."""
+    payload = json.dumps({"build_version": BUILD_VERSION, **options}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:CONTENT_HASH_LENGTH]
+
+
+def hash_file(path: Path) -> str:
+    """SHA-256 of a file, read in chunks."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write a file via a temporary sibling and ``os.replace``."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def content_addressed_path(relative_path: str, digest: str, suffix: Optional[str] = None) -> str:
+    """Insert a content hash before the extension: ``css/app.css`` -> ``css/app.<hash>.css``."""
+    path = Path(relative_path)
+    suffix = path.suffix if suffix is None else suffix
+    name = f"{path.stem}.{digest[:CONTENT_HASH_LENGTH]}{suffix}"
+    return (path.parent / name).as_posix()
+
+
+def _write_content_addressed(output_dir: Path, relative_path: str, data: bytes) -> Dict[str, Any]:
+    """Write ``data`` at ``relative_path`` unless identical content is already there."""
+    target = output_dir / relative_path
+    if not target.exists():
+        atomic_write_bytes(target, data)
+    return {
+        "path": relative_path,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+    }
+
+
+# Worker-process functions (must be importable top-level callables)
+
+def select_image_format(image: Any, formats: List[str]) -> str:
+    """Pick the output format for an image based on its content."""
+    preferred = 'webp' if 'webp' in formats else None
+    has_transparency = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    if has_transparency:
+        return preferred or 'png'
+
+    if image.mode in ('RGB', 'RGBA'):
+        # Photos have many distinct colours; graphics compress better losslessly
+        sample = image.resize((100, 100))
+        colors = sample.getcolors(maxcolors=256 * 256 * 256) or []
+        if len(colors) > 1000:
+            return preferred or 'jpeg'
+
+    return preferred or 'png'
+
+
+def encode_image(
+    data: bytes,
+    target_format: Optional[str],
+    quality: int,
+    max_width: int,
+    max_height: int,
+    formats: Optional[List[str]] = None
+) -> Tuple[bytes, str, int, int]:
+    """
+    Resize and re-encode an image.
+
+    ``target_format`` of None picks a format from ``formats`` by content.
+
+    Returns:
+        Encoded bytes, format, width and height
+    """
+    from PIL import Image
+
+    image = Image.open(BytesIO(data))
+    original_format = (image.format or 'jpeg').lower()
+
+    if target_format is None:
+        target_format = select_image_format(image, formats or ['webp', 'jpeg', 'png'])
+    elif target_format == 'original':
+        target_format = original_format
+
+    if image.width > max_width or image.height > max_height:
+        image.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+    if target_format == 'jpeg' and image.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        background.paste(image, mask=image.split()[-1] if image.mode in ('RGBA', 'LA') else None)
+        image = background
+    elif target_format == 'webp' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    output = BytesIO()
+    if target_format == 'webp':
+        image.save(output, 'WEBP', quality=quality, optimize=True)
+    elif target_format == 'jpeg':
+        image.save(output, 'JPEG', quality=quality, optimize=True)
+    elif target_format == 'png':
+        image.save(output, 'PNG', optimize=True)
+    else:
+        image.save(output, target_format.upper(), optimize=True)
+
+    return output.getvalue(), target_format, image.width, image.height
+
+
+def compress_bytes(data: bytes, enable_gzip: bool, enable_brotli: bool, level: int) -> Dict[str, bytes]:
+    """Produce precompressed variants of a text asset."""
+    variants = {}
+    if enable_gzip:
+        # mtime=0 keeps gzip output deterministic across builds
+        variants['gzip'] = gzip.compress(data, compresslevel=level, mtime=0)
+    if enable_brotli:
+        import brotli
+        variants['brotli'] = brotli.compress(data, quality=level)
+    return variants
+
+
+def minify_bytes(data: bytes, asset_type: str) -> bytes:
+    """Minify CSS or JavaScript if a minifier is installed."""
+    try:
+        if asset_type == 'css':
+            import cssmin
+            return cssmin.cssmin(data.decode('utf-8')).encode('utf-8')
+        if asset_type == 'javascript':
+            import jsmin
+            return jsmin.jsmin(data.decode('utf-8')).encode('utf-8')
+    except Exception:
+        pass
+    return data
+
+
+def optimize_asset_bytes(
+    content: bytes,
+    asset_type: str,
+    mime_type: str,
+    options: Dict[str, Any]
+) -> bytes:
+    """
+    Optimize a single in-memory asset for upload.
+
+    Runs inside a build worker process. ``options`` mirrors
+    ``AssetOptimizationConfig``; failures fall back to the original content.
+    """
+    if asset_type == 'image':
+        try:
+            if options.get("enable_webp") and mime_type != 'image/gif':
+                target_format = 'webp'
+            elif mime_type == 'image/jpeg':
+                target_format = 'jpeg'
+            elif mime_type == 'image/png':
+                target_format = 'png'
+            else:
+                target_format = 'original'
+            encoded, _, _, _ = encode_image(
+                content,
+                target_format,
+                options["image_quality"],
+                options["image_max_width"],
+                options["image_max_height"],
+            )
+            return encoded
+        except Exception:
+            return content
+
+    if asset_type == 'css':
+        return minify_bytes(content, 'css') if options.get("css_minify") else content
+    if asset_type == 'javascript':
+        return minify_bytes(content, 'javascript') if options.get("js_minify") else content
+
+    if options.get("enable_brotli"):
+        try:
+            import brotli
+            return brotli.compress(content)
+        except ImportError:
+            pass
+    if options.get("enable_gzip"):
+        return gzip.compress(content, mtime=0)
+    return content
+
+
+def build_asset_file(
+    source_path: str,
+    relative_path: str,
+    source_sha256: str,
+    kind: str,
+    output_dir: str,
+    options: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Build one source file into content-addressed outputs.
+
+    Runs inside a build worker process.
+
+    Returns:
+        Manifest fields describing the outputs
+    """
+    output_root = Path(output_dir)
+    with open(source_path, "rb") as f:
+        data = f.read()
+
+    if kind == KIND_IMAGE:
+        image_options = options["image"]
+        encoded, image_format, width, height = encode_image(
+            data,
+            target_format=image_options.get("target_format"),
+            quality=image_options["quality"],
+            max_width=image_options["max_width"],
+            max_height=image_options["max_height"],
+            formats=image_options.get("formats"),
+        )
+        digest = hashlib.sha256(encoded).hexdigest()
+        versioned = content_addressed_path(relative_path, digest, suffix=f".{image_format}")
+        return {
+            "outputs": {"image": _write_content_addressed(output_root, versioned, encoded)},
+            "versioned_path": versioned,
+            "format": image_format,
+            "width": width,
+            "height": height,
+        }
+
+    versioned = content_addressed_path(relative_path, source_sha256)
+    outputs = {"identity": _write_content_addressed(output_root, versioned, data)}
+
+    if kind == KIND_TEXT:
+        text_options = options["text"]
+        variants = compress_bytes(
+            data,
+            enable_gzip=text_options["gzip"],
+            enable_brotli=text_options["brotli"],
+            level=text_options["level"],
+        )
+        extensions = {"gzip": ".gz", "brotli": ".br"}
+        for variant, payload in variants.items():
+            outputs[variant] = _write_content_addressed(
+                output_root, versioned + extensions[variant], payload
+            )
+
+    return {"outputs": outputs, "versioned_path": versioned, "format": kind}
+
+
+@dataclass
+class SourceFile:
+    """A scanned source file."""
+    relative_path: str
+    path: Path
+    size: int
+    mtime_ns: int
+    sha256: str
+    kind: str
+
+
+@dataclass
+class AssetBuildResult:
+    """Outcome of an incremental build."""
+    entries: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    built: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    version_manifest: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "built": len(self.built),
+            "skipped": len(self.skipped),
+            "removed": len(self.removed),
+            "failed": self.failed,
+            "total_assets": len(self.entries),
+        }
+
+
+class IncrementalAssetBuilder:
+    """Incremental static asset build with a process pool and a persisted manifest."""
+
+    def __init__(
+        self,
+        output_dir: Path,
+        image_options: Dict[str, Any],
+        text_options: Dict[str, Any],
+        max_workers: Optional[int] = None,
+        version_manifest_path: Optional[Path] = None
+    ):
+        self.output_dir = Path(output_dir)
+        self.options = {"image": image_options, "text": text_options}
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.build_manifest_path = self.output_dir / BUILD_MANIFEST_NAME
+        self.version_manifest_path = (
+            Path(version_manifest_path) if version_manifest_path
+            else self.output_dir / VERSION_MANIFEST_NAME
+        )
+
+    def _options_for(self, kind: str) -> Dict[str, Any]:
+        if kind == KIND_IMAGE:
+            return {"kind": kind, "image": self.options["image"]}
+        if kind == KIND_TEXT:
+            return {"kind": kind, "text": self.options["text"]}
+        return {"kind": kind}
+
+    def load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Load the previous build manifest (empty if missing or unreadable)."""
+        try:
+            with open(self.build_manifest_path, "r") as f:
+                return json.load(f).get("assets", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable build manifest",
+                           path=str(self.build_manifest_path), error=str(e))
+            return {}
+
+    def scan(self, input_dir: Path, previous: Dict[str, Dict[str, Any]]) -> List[SourceFile]:
+        """
+        Fingerprint source files.
+
+        Files whose size and mtime match the previous build reuse the recorded
+        hash instead of being read again.
+        """
+        output_dir = self.output_dir.resolve()
+        sources = []
+        for path in sorted(input_dir.rglob("*")):
+            if not path.is_file() or path.name.startswith('.'):
+                continue
+            if output_dir in path.resolve().parents:
+                continue
+
+            relative_path = path.relative_to(input_dir).as_posix()
+            stat = path.stat()
+            entry = previous.get(relative_path)
+            if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+                sha256 = entry["sha256"]
+            else:
+                sha256 = hash_file(path)
+
+            sources.append(SourceFile(
+                relative_path=relative_path,
+                path=path,
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                sha256=sha256,
+                kind=asset_kind(path),
+            ))
+        return sources
+
+    def _is_up_to_date(self, source: SourceFile, entry: Optional[Dict[str, Any]]) -> bool:
+        if not entry:
+            return False
+        if entry.get("sha256") != source.sha256:
+            return False
+        if entry.get("settings") != settings_digest(self._options_for(source.kind)):
+            return False
+        return all(
+            (self.output_dir / output["path"]).exists()
+            for output in entry.get("outputs", {}).values()
+        )
+
+    async def build(self, input_dir: Path) -> AssetBuildResult:
+        """Build ``input_dir`` into ``output_dir``, re-processing only changed files."""
+        input_dir = Path(input_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        previous = await asyncio.to_thread(self.load_manifest)
+        sources = await asyncio.to_thread(self.scan, input_dir, previous)
+
+        result = AssetBuildResult()
+        pending = []
+        for source in sources:
+            entry = previous.get(source.relative_path)
+            if self._is_up_to_date(source, entry):
+                # Unchanged content; refresh stat fields so the next scan skips hashing
+                result.entries[source.relative_path] = {
+                    **entry, "size": source.size, "mtime_ns": source.mtime_ns
+                }
+                result.skipped.append(source.relative_path)
+            else:
+                pending.append(source)
+
+        if pending:
+            await self._build_pending(pending, previous, result)
+
+        current = {source.relative_path for source in sources}
+        result.removed = sorted(set(previous) - current)
+
+        result.version_manifest = {
+            relative_path: entry["versioned_path"]
+            for relative_path, entry in sorted(result.entries.items())
+        }
+        await asyncio.to_thread(self._save_manifests, result)
+
+        logger.info("Incremental asset build completed",
+                    input_dir=str(input_dir),
+                    output_dir=str(self.output_dir),
+                    **result.to_dict())
+        return result
+
+    async def _build_pending(
+        self,
+        pending: List[SourceFile],
+        previous: Dict[str, Dict[str, Any]],
+        result: AssetBuildResult
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        executor = ProcessPoolExecutor(max_workers=min(self.max_workers, len(pending)))
+        try:
+            futures = [
+                loop.run_in_executor(
+                    executor,
+                    build_asset_file,
+                    str(source.path),
+                    source.relative_path,
+                    source.sha256,
+                    source.kind,
+                    str(self.output_dir),
+                    self.options,
+                )
+                for source in pending
+            ]
+            outcomes = await asyncio.gather(*futures, return_exceptions=True)
+        finally:
+            executor.shutdown(wait=True)
+
+        for source, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.warning("Failed to build asset",
+                               path=source.relative_path, error=str(outcome))
+                result.failed[source.relative_path] = str(outcome)
+                # Keep serving the previous build of this file, if any
+                if source.relative_path in previous:
+                    result.entries[source.relative_path] = previous[source.relative_path]
+                continue
+
+            result.entries[source.relative_path] = {
+                **outcome,
+                "sha256": source.sha256,
+                "size": source.size,
+                "mtime_ns": source.mtime_ns,
+                "kind": source.kind,
+                "settings": settings_digest(self._options_for(source.kind)),
+            }
+            result.built.append(source.relative_path)
+
+    def _save_manifests(self, result: AssetBuildResult) -> None:
+        atomic_write_bytes(
+            self.build_manifest_path,
+            json.dumps({"build_version": BUILD_VERSION, "assets": result.entries},
+                       indent=2, sort_keys=True).encode("utf-8")
+        )
+        atomic_write_bytes(
+            self.version_manifest_path,
+            json.dumps(result.version_manifest, indent=2, sort_keys=True).encode("utf-8")
+        )
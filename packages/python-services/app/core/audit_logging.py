@@ -11,9 +11,9 @@ This module provides:
 
 import asyncio
 import json
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from uuid import UUID, uuid4
 
 import redis.asyncio as redis
@@ -27,6 +27,9 @@ from ..models.database.auth import AuditLog, User
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+# Default lookback for searches without a start date
+AUDIT_SEARCH_WINDOW = timedelta(days=90)
+
 
 class AuditEventType(str, Enum):
     """Audit event types for categorization."""
@@ -129,6 +132,16 @@ class AuditEvent(BaseModel):
         }
 
 
+def _search_range(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+) -> Tuple[datetime, datetime]:
+    """Close an open-ended date range so queries prune to the partitions it spans."""
+    end_date = end_date or datetime.now(timezone.utc)
+    start_date = start_date or end_date - AUDIT_SEARCH_WINDOW
+    return start_date, end_date
+
+
 class AuditLogger:
     """Comprehensive audit logging system."""
     
@@ -426,7 +439,13 @@ class AuditLogger:
         limit: int = 100,
         offset: int = 0
     ) -> List[AuditLog]:
-        """Search audit logs with filters."""
+        """
+        Search audit logs with filters.
+        
+        The search is always bounded on ``created_at`` so only the monthly
+        partitions overlapping the range are scanned; without a start date it
+        covers the ``AUDIT_SEARCH_WINDOW`` before ``end_date``.
+        """
         
         try:
             from sqlalchemy import and_, or_
@@ -434,7 +453,11 @@ class AuditLogger:
             query = self.session.query(AuditLog)
             
             # Apply filters
-            conditions = []
+            start_date, end_date = _search_range(start_date, end_date)
+            conditions = [
+                AuditLog.created_at >= start_date,
+                AuditLog.created_at <= end_date,
+            ]
             
             if user_id:
                 conditions.append(AuditLog.user_id == user_id)
@@ -442,12 +465,6 @@ class AuditLogger:
             if event_types:
                 conditions.append(AuditLog.event_type.in_([et.value for et in event_types]))
             
-            if start_date:
-                conditions.append(AuditLog.created_at >= start_date)
-            
-            if end_date:
-                conditions.append(AuditLog.created_at <= end_date)
-            
             if resource_type:
                 conditions.append(AuditLog.resource == resource_type)
             
@@ -457,8 +474,7 @@ class AuditLogger:
             if success is not None:
                 conditions.append(AuditLog.success == success)
             
-            if conditions:
-                query = query.filter(and_(*conditions))
+            query = query.filter(and_(*conditions))
             
             # Order by timestamp descending
             query = query.order_by(AuditLog.created_at.desc())
@@ -483,13 +499,11 @@ class AuditLogger:
         try:
             from sqlalchemy import func, and_
             
-            query = self.session.query(AuditLog)
+            # Every aggregate shares the date range so each prunes to the same partitions
+            start_date, end_date = _search_range(start_date, end_date)
+            in_range = and_(AuditLog.created_at >= start_date, AuditLog.created_at <= end_date)
             
-            # Apply date filters
-            if start_date:
-                query = query.filter(AuditLog.created_at >= start_date)
-            if end_date:
-                query = query.filter(AuditLog.created_at <= end_date)
+            query = self.session.query(AuditLog).filter(in_range)
             
             # Get total count
             total_events = await query.count()
@@ -498,19 +512,20 @@ class AuditLogger:
             events_by_type = await self.session.query(
                 AuditLog.event_type,
                 func.count(AuditLog.id).label('count')
-            ).group_by(AuditLog.event_type).all()
+            ).filter(in_range).group_by(AuditLog.event_type).all()
             
             # Get events by success/failure
             success_stats = await self.session.query(
                 AuditLog.success,
                 func.count(AuditLog.id).label('count')
-            ).group_by(AuditLog.success).all()
+            ).filter(in_range).group_by(AuditLog.success).all()
             
             # Get top users by activity
             top_users = await self.session.query(
                 AuditLog.user_id,
                 func.count(AuditLog.id).label('count')
             ).filter(
+                in_range,
                 AuditLog.user_id.isnot(None)
             ).group_by(AuditLog.user_id).order_by(
                 func.count(AuditLog.id).desc()
@@ -1,257 +1,451 @@
-"""Cache warming strategies and performance monitoring."""
+"""
+Predictive cache warming and cache performance monitoring.
+
+Services record reads of their expensive cache entries in a sampled access
+log: the key, the time bucket it was read in and, on a miss, how long the
+entry took to compute, together with the registered loader and arguments
+that recompute it. A warming cycle estimates the probability that each
+logged key is read within the next interval from its recent and
+same-time-of-day access rates, ranks keys by that probability times their
+recompute cost, and recomputes the best ones through their loaders with
+bounded concurrency under a wall-clock budget. Celery workers run a cycle
+for the subsystems they serve before they start consuming tasks, and the
+semantic search API runs one for search results before it starts serving.
+"""
 
 import asyncio
-from typing import Dict, List, Any, Optional, Callable
-from datetime import datetime, timedelta
+import importlib
+import json
+import math
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional
 
 from .cache import CacheService
+from .config import get_settings
 from .logging import get_logger
 
 logger = get_logger(__name__)
 
 
-class CacheWarmingStrategy:
-    """Base class for cache warming strategies."""
-    
-    def __init__(self, cache_service: CacheService):
-        self.cache = cache_service
-        self.logger = get_logger(f"{__name__}.{self.__class__.__name__}")
-    
-    async def warm_cache(self) -> Dict[str, Any]:
-        """Warm cache with strategy-specific data."""
-        raise NotImplementedError
+# Redis keys of the access log
+ACCESS_BUCKET_PREFIX = "cache:access:bucket:"
+ACCESS_LOADERS_KEY = "cache:access:loaders"
+ACCESS_COSTS_KEY = "cache:access:costs"
+WARMING_LOCK_KEY = "cache:warming:lock"
 
+# Recent accesses count half as much every six hours
+RECENT_HALF_LIFE_SECONDS = 6 * 3600
+# Weight of the recency-decayed rate against the same-time-of-day rate
+RECENT_WEIGHT = 0.5
+SECONDS_PER_DAY = 86400
 
-class PopularJobsCacheWarmer(CacheWarmingStrategy):
-    """Cache warmer for popular job listings."""
-    
-    async def warm_cache(self) -> Dict[str, Any]:
-        """Warm cache with popular job listings."""
-        try:
-            # This would typically query the database for popular jobs
-            # For now, we'll simulate the warming process
-            
-            warmed_keys = []
-            
-            # Simulate warming popular job categories
-            popular_categories = ["software", "data", "marketing", "sales", "design"]
-            
-            for category in popular_categories:
-                cache_key = f"popular_jobs:{category}"
-                
-                # Simulate job data (in real implementation, this would come from database)
-                job_data = {
-                    "category": category,
-                    "jobs": [f"job_{i}" for i in range(10)],
-                    "cached_at": datetime.utcnow().isoformat()
-                }
-                
-                await self.cache.set(cache_key, job_data, ttl=3600)  # 1 hour
-                warmed_keys.append(cache_key)
-            
-            self.logger.info(f"Warmed {len(warmed_keys)} popular job cache keys")
-            
-            return {
-                "strategy": "popular_jobs",
-                "warmed_keys": len(warmed_keys),
-                "keys": warmed_keys
-            }
-            
-        except Exception as e:
-            self.logger.error(f"Failed to warm popular jobs cache: {e}")
-            return {"strategy": "popular_jobs", "error": str(e)}
 
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
 
-class UserProfileCacheWarmer(CacheWarmingStrategy):
-    """Cache warmer for frequently accessed user profiles."""
-    
-    async def warm_cache(self) -> Dict[str, Any]:
-        """Warm cache with active user profiles."""
-        try:
-            warmed_keys = []
-            
-            # This would typically query for active users
-            # For simulation, we'll warm some sample user profiles
-            active_user_ids = [f"user_{i}" for i in range(1, 101)]  # Top 100 active users
-            
-            for user_id in active_user_ids:
-                cache_key = f"user_profile:{user_id}"
-                
-                # Check if already cached
-                if await self.cache.exists(cache_key):
-                    continue
-                
-                # Simulate user profile data
-                profile_data = {
-                    "user_id": user_id,
-                    "skills": [f"skill_{i}" for i in range(5)],
-                    "experience": [f"exp_{i}" for i in range(3)],
-                    "cached_at": datetime.utcnow().isoformat()
-                }
-                
-                await self.cache.set(cache_key, profile_data, ttl=1800)  # 30 minutes
-                warmed_keys.append(cache_key)
-                
-                # Add small delay to avoid overwhelming the system
-                if len(warmed_keys) % 10 == 0:
-                    await asyncio.sleep(0.1)
-            
-            self.logger.info(f"Warmed {len(warmed_keys)} user profile cache keys")
-            
-            return {
-                "strategy": "user_profiles",
-                "warmed_keys": len(warmed_keys),
-                "keys": warmed_keys[:10]  # Only show first 10 for brevity
-            }
-            
-        except Exception as e:
-            self.logger.error(f"Failed to warm user profiles cache: {e}")
-            return {"strategy": "user_profiles", "error": str(e)}
 
+class AccessLog:
+    """Sampled record of cache reads, bucketed by time, kept in Redis."""
 
-class SearchResultsCacheWarmer(CacheWarmingStrategy):
-    """Cache warmer for common search queries."""
-    
-    async def warm_cache(self) -> Dict[str, Any]:
-        """Warm cache with common search results."""
-        try:
-            warmed_keys = []
-            
-            # Common search terms to pre-cache
-            common_searches = [
-                "python developer",
-                "data scientist", 
-                "frontend developer",
-                "product manager",
-                "marketing manager",
-                "sales representative",
-                "ui designer",
-                "backend engineer",
-                "devops engineer",
-                "business analyst"
-            ]
-            
-            for search_term in common_searches:
-                cache_key = f"search_results:{search_term.replace(' ', '_')}"
-                
-                # Simulate search results
-                search_results = {
-                    "query": search_term,
-                    "results": [f"job_{i}" for i in range(20)],
-                    "total": 150,
-                    "cached_at": datetime.utcnow().isoformat()
-                }
-                
-                await self.cache.set(cache_key, search_results, ttl=600)  # 10 minutes
-                warmed_keys.append(cache_key)
-            
-            self.logger.info(f"Warmed {len(warmed_keys)} search results cache keys")
-            
-            return {
-                "strategy": "search_results",
-                "warmed_keys": len(warmed_keys),
-                "keys": warmed_keys
-            }
-            
-        except Exception as e:
-            self.logger.error(f"Failed to warm search results cache: {e}")
-            return {"strategy": "search_results", "error": str(e)}
+    def __init__(
+        self,
+        redis,
+        sample_rate: float = 0.05,
+        bucket_seconds: int = 3600,
+        retention_seconds: int = 7 * SECONDS_PER_DAY,
+        sampler: Callable[[], float] = random.random,
+    ):
+        self.redis = redis
+        self.sample_rate = sample_rate
+        self.bucket_seconds = bucket_seconds
+        self.retention_buckets = max(1, retention_seconds // bucket_seconds)
+        self._sampler = sampler
 
+    @classmethod
+    def from_settings(cls, redis, settings=None) -> "AccessLog":
+        settings = (settings or get_settings()).redis
+        return cls(
+            redis,
+            sample_rate=settings.cache_access_sample_rate,
+            bucket_seconds=settings.cache_access_bucket_seconds,
+            retention_seconds=settings.cache_access_retention_hours * 3600,
+        )
 
-class CacheWarmingManager:
-    """Manage cache warming operations."""
-    
-    def __init__(self, cache_service: CacheService):
-        self.cache = cache_service
-        self.strategies = [
-            PopularJobsCacheWarmer(cache_service),
-            UserProfileCacheWarmer(cache_service),
-            SearchResultsCacheWarmer(cache_service)
-        ]
-        self.logger = get_logger(f"{__name__}.CacheWarmingManager")
-        self.warming_in_progress = False
-    
-    async def warm_all_caches(self) -> Dict[str, Any]:
-        """Execute all cache warming strategies."""
-        if self.warming_in_progress:
-            return {"status": "warming_in_progress"}
-        
-        self.warming_in_progress = True
-        start_time = datetime.utcnow()
-        
+    def bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    async def record(
+        self,
+        key: str,
+        loader: str,
+        args: Dict[str, Any],
+        cost: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> bool:
+        """
+        Record a read of ``key`` if it is sampled.
+
+        ``cost`` is the seconds spent computing the entry and is only known on
+        a miss. Each sampled read counts ``1 / sample_rate`` reads so bucket
+        totals estimate the real read rate.
+        """
+        if self.redis is None or self.sample_rate <= 0 or self._sampler() >= self.sample_rate:
+            return False
+
+        bucket_key = f"{ACCESS_BUCKET_PREFIX}{self.bucket(time.time() if now is None else now)}"
         try:
-            results = []
-            
-            # Execute all warming strategies concurrently
-            tasks = [strategy.warm_cache() for strategy in self.strategies]
-            strategy_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for result in strategy_results:
-                if isinstance(result, Exception):
-                    results.append({"error": str(result)})
-                else:
-                    results.append(result)
-            
-            end_time = datetime.utcnow()
-            duration = (end_time - start_time).total_seconds()
-            
-            total_warmed = sum(
-                r.get("warmed_keys", 0) for r in results 
-                if isinstance(r, dict) and "warmed_keys" in r
-            )
-            
-            self.logger.info(f"Cache warming completed: {total_warmed} keys in {duration:.2f}s")
-            
-            return {
-                "status": "completed",
-                "duration_seconds": duration,
-                "total_warmed_keys": total_warmed,
-                "strategies": results,
-                "completed_at": end_time.isoformat()
-            }
-            
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zincrby(bucket_key, 1.0 / self.sample_rate, key)
+            pipe.expire(bucket_key, (self.retention_buckets + 1) * self.bucket_seconds)
+            pipe.hset(ACCESS_LOADERS_KEY, key, json.dumps({"loader": loader, "args": args}, default=str))
+            if cost is not None:
+                pipe.hset(ACCESS_COSTS_KEY, key, repr(float(cost)))
+            await pipe.execute()
+            return True
         except Exception as e:
-            self.logger.error(f"Cache warming failed: {e}")
-            return {
-                "status": "failed",
-                "error": str(e),
-                "completed_at": datetime.utcnow().isoformat()
-            }
-        finally:
-            self.warming_in_progress = False
-    
-    async def warm_specific_strategy(self, strategy_name: str) -> Dict[str, Any]:
-        """Warm cache using a specific strategy."""
-        strategy_map = {
-            "popular_jobs": PopularJobsCacheWarmer,
-            "user_profiles": UserProfileCacheWarmer,
-            "search_results": SearchResultsCacheWarmer
+            logger.warning("Failed to record cache access", key=key, error=str(e))
+            return False
+
+    async def history(self, now: Optional[float] = None) -> Dict[int, Dict[str, float]]:
+        """Estimated reads per key in each complete bucket, by bucket age (1 = last bucket)."""
+        current = self.bucket(time.time() if now is None else now)
+        ages = range(1, self.retention_buckets + 1)
+        pipe = self.redis.pipeline(transaction=False)
+        for age in ages:
+            pipe.zrange(f"{ACCESS_BUCKET_PREFIX}{current - age}", 0, -1, withscores=True)
+        buckets = await pipe.execute()
+        return {
+            age: {_text(key): float(count) for key, count in entries}
+            for age, entries in zip(ages, buckets)
+            if entries
         }
-        
-        if strategy_name not in strategy_map:
-            return {
-                "status": "error",
-                "message": f"Unknown strategy: {strategy_name}",
-                "available_strategies": list(strategy_map.keys())
-            }
-        
+
+    async def descriptors(self) -> Dict[str, Dict[str, Any]]:
+        """Loader name and arguments of every logged key."""
+        descriptors = {}
+        for key, raw in (await self.redis.hgetall(ACCESS_LOADERS_KEY)).items():
+            try:
+                descriptors[_text(key)] = json.loads(raw)
+            except (TypeError, ValueError):
+                continue
+        return descriptors
+
+    async def costs(self) -> Dict[str, float]:
+        """Last measured recompute cost in seconds of every logged key."""
+        return {
+            _text(key): float(value)
+            for key, value in (await self.redis.hgetall(ACCESS_COSTS_KEY)).items()
+        }
+
+    async def forget(self, keys: Iterable[str]) -> None:
+        """Drop the descriptors and costs of keys that left the retained history."""
+        keys = list(keys)
+        if keys:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hdel(ACCESS_LOADERS_KEY, *keys)
+            pipe.hdel(ACCESS_COSTS_KEY, *keys)
+            await pipe.execute()
+
+
+def predict_hit_probabilities(
+    history: Mapping[int, Mapping[str, float]],
+    bucket_seconds: int,
+    retention_buckets: int,
+    horizon_seconds: float,
+) -> Dict[str, float]:
+    """
+    Probability that each key is read at least once in the next ``horizon_seconds``.
+
+    The expected read rate blends an exponentially decayed average over the
+    retained buckets with the average of the current time-of-day slot on
+    previous days, and reads are treated as a Poisson process at that rate.
+    """
+    ages = range(1, retention_buckets + 1)
+    decay = 0.5 ** (bucket_seconds / RECENT_HALF_LIFE_SECONDS)
+    weights = {age: decay ** (age - 1) for age in ages}
+    total_weight = sum(weights.values())
+
+    # The current bucket's time-of-day slot on each retained previous day
+    seasonal_ages = []
+    if SECONDS_PER_DAY % bucket_seconds == 0:
+        per_day = SECONDS_PER_DAY // bucket_seconds
+        seasonal_ages = list(range(per_day, retention_buckets + 1, per_day))
+
+    recent: Dict[str, float] = {}
+    seasonal: Dict[str, float] = {}
+    for age, counts in history.items():
+        weight = weights.get(age, 0.0) / total_weight
+        in_season = age in seasonal_ages
+        for key, count in counts.items():
+            recent[key] = recent.get(key, 0.0) + weight * count
+            if in_season:
+                seasonal[key] = seasonal.get(key, 0.0) + count / len(seasonal_ages)
+
+    probabilities = {}
+    for key, rate in recent.items():
+        if seasonal_ages:
+            rate = RECENT_WEIGHT * rate + (1 - RECENT_WEIGHT) * seasonal.get(key, 0.0)
+        expected = rate * horizon_seconds / bucket_seconds
+        probabilities[key] = 1.0 - math.exp(-expected)
+    return probabilities
+
+
+@dataclass(frozen=True)
+class WarmingLoader:
+    """
+    Recomputes a logged cache entry through the service that owns it.
+
+    ``attribute`` names an async function of the logged arguments in
+    ``module``; ``release``, if set, names an async function that closes the
+    clients the loader opened, for warming run in a throwaway event loop.
+    Loaders are looked up by name from this registry only, never from the
+    module path stored with an access.
+    """
+    name: str
+    module: str
+    attribute: str
+    subsystem: Optional[str] = None
+    release: Optional[str] = None
+
+    def resolve(self) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        return getattr(importlib.import_module(self.module), self.attribute)
+
+    async def release_clients(self) -> None:
+        if self.release:
+            await getattr(importlib.import_module(self.module), self.release)()
+
+
+warming_loaders: Dict[str, WarmingLoader] = {}
+
+
+def register_warming_loader(loader: WarmingLoader) -> None:
+    """Register a loader that warming may call for logged keys."""
+    warming_loaders[loader.name] = loader
+
+
+register_warming_loader(WarmingLoader(
+    name="semantic_search.search_jobs",
+    module="app.services.semantic_search.service",
+    attribute="warm_search_results",
+    subsystem="semantic_search",
+    release="release_semantic_search_service",
+))
+
+
+def loaders_for_subsystems(subsystems: Optional[Iterable[str]]) -> Dict[str, WarmingLoader]:
+    """Registered loaders usable in a process serving ``subsystems`` (``None`` for all)."""
+    if subsystems is None:
+        return dict(warming_loaders)
+    subsystems = set(subsystems)
+    return {
+        name: loader for name, loader in warming_loaders.items()
+        if loader.subsystem is None or loader.subsystem in subsystems
+    }
+
+
+@dataclass
+class WarmingCandidate:
+    """A logged key worth recomputing."""
+    key: str
+    loader: str
+    args: Dict[str, Any]
+    probability: float
+    cost: float
+
+    @property
+    def score(self) -> float:
+        return self.probability * self.cost
+
+
+@dataclass
+class WarmingCycleStats:
+    """Outcome of one warming cycle."""
+    planned: int = 0
+    warmed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    expected_seconds_saved: float = 0.0
+    elapsed_seconds: float = 0.0
+    locked: bool = False
+    failures: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "planned": self.planned,
+            "warmed": self.warmed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "expected_seconds_saved": round(self.expected_seconds_saved, 3),
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "locked": self.locked,
+        }
+
+
+class PredictiveCacheWarmer:
+    """Recomputes the logged cache entries with the highest expected payoff."""
+
+    def __init__(
+        self,
+        redis,
+        access_log: Optional[AccessLog] = None,
+        loaders: Optional[Dict[str, WarmingLoader]] = None,
+        horizon_seconds: float = 300.0,
+        concurrency: int = 4,
+        budget_seconds: float = 30.0,
+        max_keys: int = 500,
+    ):
+        self.redis = redis
+        self.access_log = access_log or AccessLog(redis)
+        self.loaders = warming_loaders if loaders is None else loaders
+        self.horizon_seconds = horizon_seconds
+        self.concurrency = concurrency
+        self.budget_seconds = budget_seconds
+        self.max_keys = max_keys
+
+    @classmethod
+    def from_settings(
+        cls, redis, subsystems: Optional[Iterable[str]] = None, settings=None
+    ) -> "PredictiveCacheWarmer":
+        settings = settings or get_settings()
+        return cls(
+            redis,
+            access_log=AccessLog.from_settings(redis, settings),
+            loaders=loaders_for_subsystems(subsystems),
+            horizon_seconds=settings.redis.cache_warming_interval_seconds,
+            concurrency=settings.redis.cache_warming_concurrency,
+            budget_seconds=settings.redis.cache_warming_budget_seconds,
+            max_keys=settings.redis.cache_warming_max_keys,
+        )
+
+    async def plan(self, now: Optional[float] = None) -> List[WarmingCandidate]:
+        """Logged keys this process can warm, best expected payoff first."""
+        log = self.access_log
+        history = await log.history(now)
+        probabilities = predict_hit_probabilities(
+            history, log.bucket_seconds, log.retention_buckets, self.horizon_seconds
+        )
+        descriptors = await log.descriptors()
+        await log.forget(key for key in descriptors if key not in probabilities)
+
+        costs = await log.costs()
+        # Keys only ever seen as hits are costed like a typical entry of their loader
+        loader_costs: Dict[str, List[float]] = {}
+        for key, descriptor in descriptors.items():
+            if key in costs:
+                loader_costs.setdefault(descriptor.get("loader"), []).append(costs[key])
+        default_cost = statistics.median(costs.values()) if costs else 1.0
+
+        candidates = []
+        for key, probability in probabilities.items():
+            descriptor = descriptors.get(key)
+            if not descriptor or descriptor.get("loader") not in self.loaders or probability <= 0:
+                continue
+            loader = descriptor["loader"]
+            cost = costs.get(key)
+            if cost is None:
+                cost = statistics.median(loader_costs[loader]) if loader in loader_costs else default_cost
+            candidates.append(WarmingCandidate(key, loader, descriptor.get("args") or {}, probability, cost))
+        candidates.sort(key=lambda candidate: candidate.score, reverse=True)
+
+        # Entries that stay cached through the whole horizon need no warming
+        planned = []
+        for start in range(0, len(candidates), self.max_keys):
+            chunk = candidates[start:start + self.max_keys]
+            pipe = self.redis.pipeline(transaction=False)
+            for candidate in chunk:
+                pipe.ttl(candidate.key)
+            for candidate, ttl in zip(chunk, await pipe.execute()):
+                if ttl < self.horizon_seconds:
+                    planned.append(candidate)
+            if len(planned) >= self.max_keys:
+                break
+        return planned[:self.max_keys]
+
+    async def run_cycle(
+        self, budget_seconds: Optional[float] = None, now: Optional[float] = None
+    ) -> WarmingCycleStats:
+        """
+        Warm the planned keys, best first, until the plan or the budget runs out.
+
+        Loads in flight when the budget expires are allowed to finish; no new
+        load starts after it. Only one process warms at a time.
+        """
+        budget = self.budget_seconds if budget_seconds is None else budget_seconds
+        stats = WarmingCycleStats()
+        started = time.monotonic()
+        deadline = started + budget
+
+        token = f"{time.time()}:{random.random()}"
+        if not await self.redis.set(WARMING_LOCK_KEY, token, nx=True, ex=max(1, math.ceil(budget * 2))):
+            stats.locked = True
+            return stats
+
         try:
-            strategy = strategy_map[strategy_name](self.cache)
-            result = await strategy.warm_cache()
-            
-            return {
-                "status": "completed",
-                "strategy": strategy_name,
-                "result": result
-            }
-            
-        except Exception as e:
-            self.logger.error(f"Failed to warm {strategy_name} cache: {e}")
-            return {
-                "status": "failed",
-                "strategy": strategy_name,
-                "error": str(e)
-            }
+            candidates = await self.plan(now)
+            stats.planned = len(candidates)
+            queue = iter(candidates)
+            resolved: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+
+            async def worker():
+                for candidate in queue:
+                    if time.monotonic() >= deadline:
+                        stats.skipped += 1
+                        continue
+                    try:
+                        if candidate.loader not in resolved:
+                            resolved[candidate.loader] = self.loaders[candidate.loader].resolve()
+                        await resolved[candidate.loader](candidate.args)
+                        stats.warmed += 1
+                        stats.expected_seconds_saved += candidate.score
+                    except Exception as e:
+                        stats.failed += 1
+                        stats.failures.append(candidate.key)
+                        logger.warning("Cache warming load failed", key=candidate.key, error=str(e))
+
+            await asyncio.gather(*(worker() for _ in range(max(1, self.concurrency))))
+        finally:
+            if _text(await self.redis.get(WARMING_LOCK_KEY)) == token:
+                await self.redis.delete(WARMING_LOCK_KEY)
+
+        stats.elapsed_seconds = time.monotonic() - started
+        logger.info("Cache warming cycle completed", **stats.to_dict())
+        return stats
+
+
+async def warm_predicted_caches(
+    subsystems: Optional[Iterable[str]] = None,
+    budget_seconds: Optional[float] = None,
+    release: bool = False,
+) -> Dict[str, Any]:
+    """
+    Run one warming cycle for the loaders of ``subsystems``.
+
+    With ``release`` the clients opened for warming are closed afterwards, so
+    a cycle run in a throwaway event loop (e.g. before a worker forks) leaves
+    no connections bound to it.
+    """
+    settings = get_settings()
+    if not settings.redis.cache_warming_enabled:
+        return {"enabled": False}
+
+    from .dependencies import close_redis_client, get_redis_client
+
+    warmer = PredictiveCacheWarmer.from_settings(await get_redis_client(), subsystems, settings)
+    try:
+        stats = await warmer.run_cycle(budget_seconds)
+    finally:
+        if release:
+            for loader in warmer.loaders.values():
+                try:
+                    await loader.release_clients()
+                except Exception as e:
+                    logger.warning("Failed to release warming clients", loader=loader.name, error=str(e))
+            await close_redis_client()
+    return stats.to_dict()
 
 
 class CachePerformanceMonitor:
@@ -359,25 +553,18 @@ class CachePerformanceMonitor:
 
 
 # Global instances
-cache_warming_manager = None
 cache_performance_monitor = None
 
 
 async def initialize_cache_warming(cache_service: CacheService):
-    """Initialize cache warming and monitoring."""
-    global cache_warming_manager, cache_performance_monitor
+    """Initialize cache monitoring; warming runs from worker startup and the beat schedule."""
+    global cache_performance_monitor
     
-    cache_warming_manager = CacheWarmingManager(cache_service)
     cache_performance_monitor = CachePerformanceMonitor(cache_service)
     
-    logger.info("Cache warming and monitoring initialized")
-
-
-async def get_cache_warming_manager() -> Optional[CacheWarmingManager]:
-    """Get cache warming manager instance."""
-    return cache_warming_manager
+    logger.info("Cache monitoring initialized")
 
 
 async def get_cache_performance_monitor() -> Optional[CachePerformanceMonitor]:
     """Get cache performance monitor instance."""
-    return cache_performance_monitor
\ No newline at end of file
+    return cache_performance_monitor
@@ -14,6 +14,7 @@ import json
 import mimetypes
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, asdict
 from enum import Enum
 from pathlib import Path
@@ -22,10 +23,10 @@ from urllib.parse import urljoin, urlparse
 
 import aiofiles
 import httpx
-from PIL import Image, ImageOptim
 import structlog
 from prometheus_client import Counter, Histogram, Gauge
 
+from .asset_build import atomic_write_bytes, hash_file, optimize_asset_bytes, settings_digest
 from .config import get_settings
 
 logger = structlog.get_logger(__name__)
@@ -128,17 +129,33 @@ asset_size_gauge = Gauge(
 class CDNOptimizer:
     """CDN and static asset optimizer."""
     
-    def __init__(self, cdn_config: CDNConfig, optimization_config: AssetOptimizationConfig):
+    def __init__(
+        self, 
+        cdn_config: CDNConfig, 
+        optimization_config: AssetOptimizationConfig,
+        max_workers: Optional[int] = None
+    ):
         self.cdn_config = cdn_config
         self.optimization_config = optimization_config
         self.asset_cache: Dict[str, AssetMetadata] = {}
         self.http_client = httpx.AsyncClient(timeout=30.0)
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._executor: Optional[ProcessPoolExecutor] = None
         
     async def __aenter__(self):
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.http_client.aclose()
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, True)
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Process pool for CPU-bound optimization, created on first use."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
     
     async def optimize_and_upload_asset(
         self, 
@@ -257,120 +274,16 @@ class CDNOptimizer:
             return AssetType.OTHER
     
     async def _optimize_asset(self, content: bytes, metadata: AssetMetadata) -> bytes:
-        """Optimize asset based on type."""
-        if metadata.asset_type == AssetType.IMAGE:
-            return await self._optimize_image(content, metadata)
-        elif metadata.asset_type == AssetType.CSS:
-            return await self._optimize_css(content)
-        elif metadata.asset_type == AssetType.JAVASCRIPT:
-            return await self._optimize_javascript(content)
-        else:
-            return await self._compress_generic(content)
-    
-    async def _optimize_image(self, content: bytes, metadata: AssetMetadata) -> bytes:
-        """Optimize image with PIL and compression."""
-        try:
-            # Load image
-            from io import BytesIO
-            image = Image.open(BytesIO(content))
-            
-            # Convert to RGB if necessary
-            if image.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'P':
-                    image = image.convert('RGBA')
-                background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                image = background
-            
-            # Resize if too large
-            if (image.width > self.optimization_config.image_max_width or 
-                image.height > self.optimization_config.image_max_height):
-                image.thumbnail(
-                    (self.optimization_config.image_max_width, 
-                     self.optimization_config.image_max_height),
-                    Image.Resampling.LANCZOS
-                )
-            
-            # Save optimized image
-            output = BytesIO()
-            
-            # Choose format based on configuration and original format
-            if self.optimization_config.enable_webp and metadata.mime_type != 'image/gif':
-                image.save(
-                    output, 
-                    format='WEBP', 
-                    quality=self.optimization_config.image_quality,
-                    optimize=True
-                )
-            elif metadata.mime_type == 'image/jpeg':
-                image.save(
-                    output, 
-                    format='JPEG', 
-                    quality=self.optimization_config.image_quality,
-                    optimize=True
-                )
-            elif metadata.mime_type == 'image/png':
-                image.save(
-                    output, 
-                    format='PNG', 
-                    optimize=True
-                )
-            else:
-                # Keep original format
-                original_format = image.format or 'JPEG'
-                image.save(output, format=original_format, optimize=True)
-            
-            return output.getvalue()
-            
-        except Exception as e:
-            logger.warning(
-                "Image optimization failed, using original",
-                error=str(e)
-            )
-            return content
-    
-    async def _optimize_css(self, content: bytes) -> bytes:
-        """Optimize CSS by minifying."""
-        if not self.optimization_config.css_minify:
-            return content
-        
-        try:
-            import cssmin
-            css_text = content.decode('utf-8')
-            minified = cssmin.cssmin(css_text)
-            return minified.encode('utf-8')
-        except Exception as e:
-            logger.warning("CSS minification failed, using original", error=str(e))
-            return content
-    
-    async def _optimize_javascript(self, content: bytes) -> bytes:
-        """Optimize JavaScript by minifying."""
-        if not self.optimization_config.js_minify:
-            return content
-        
-        try:
-            import jsmin
-            js_text = content.decode('utf-8')
-            minified = jsmin.jsmin(js_text)
-            return minified.encode('utf-8')
-        except Exception as e:
-            logger.warning("JavaScript minification failed, using original", error=str(e))
-            return content
-    
-    async def _compress_generic(self, content: bytes) -> bytes:
-        """Apply generic compression."""
-        if self.optimization_config.enable_brotli:
-            try:
-                import brotli
-                return brotli.compress(content)
-            except ImportError:
-                pass
-        
-        if self.optimization_config.enable_gzip:
-            import gzip
-            return gzip.compress(content)
-        
-        return content
+        """Optimize asset based on type in the worker process pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(),
+            optimize_asset_bytes,
+            content,
+            metadata.asset_type.value,
+            metadata.mime_type,
+            asdict(self.optimization_config)
+        )
     
     def _generate_versioned_path(self, original_path: str, file_hash: str) -> str:
         """Generate versioned path with hash."""
@@ -514,16 +427,55 @@ class CDNOptimizer:
         self, 
         directory: Path, 
         pattern: str = "*",
-        max_concurrent: int = 5
+        max_concurrent: int = 5,
+        manifest_path: Optional[Path] = None
     ) -> List[AssetMetadata]:
-        """Batch optimize all assets in a directory."""
-        assets = list(directory.glob(pattern))
+        """
+        Batch optimize all assets in a directory.
+        
+        With ``manifest_path``, results are recorded in a persisted build
+        manifest keyed on content hash and optimization settings, and assets
+        unchanged since the previous run are neither re-optimized nor
+        re-uploaded.
+        """
+        assets = [path for path in directory.glob(pattern) if path.is_file()]
+        
+        previous = await asyncio.to_thread(self._load_build_manifest, manifest_path) if manifest_path else {}
+        options_digest = settings_digest(asdict(self.optimization_config))
+        entries: Dict[str, Dict[str, Any]] = {}
+        skipped = 0
         
         semaphore = asyncio.Semaphore(max_concurrent)
         
         async def optimize_single(asset_path: Path) -> AssetMetadata:
+            nonlocal skipped
             async with semaphore:
-                return await self.optimize_and_upload_asset(asset_path)
+                if manifest_path is None:
+                    return await self.optimize_and_upload_asset(asset_path)
+                
+                key = str(asset_path)
+                stat = asset_path.stat()
+                entry = previous.get(key)
+                if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+                    content_hash = entry["sha256"]
+                else:
+                    content_hash = await asyncio.to_thread(hash_file, asset_path)
+                
+                if entry and entry.get("sha256") == content_hash and entry.get("settings") == options_digest:
+                    metadata = self._metadata_from_entry(entry["metadata"])
+                    self.asset_cache[key] = metadata
+                    skipped += 1
+                else:
+                    metadata = await self.optimize_and_upload_asset(asset_path)
+                
+                entries[key] = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha256": content_hash,
+                    "settings": options_digest,
+                    "metadata": {**asdict(metadata), "asset_type": metadata.asset_type.value},
+                }
+                return metadata
         
         tasks = [optimize_single(asset) for asset in assets]
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -539,14 +491,41 @@ class CDNOptimizer:
             else:
                 successful_results.append(result)
         
+        if manifest_path is not None:
+            # Keep entries for assets outside this run; drop deleted files
+            for key, entry in previous.items():
+                if key not in entries and Path(key).exists():
+                    entries[key] = entry
+            await asyncio.to_thread(
+                atomic_write_bytes,
+                manifest_path,
+                json.dumps(entries, indent=2, sort_keys=True).encode('utf-8')
+            )
+        
         logger.info(
             "Batch optimization completed",
             total_assets=len(assets),
             successful=len(successful_results),
-            failed=len(assets) - len(successful_results)
+            failed=len(assets) - len(successful_results),
+            unchanged=skipped
         )
         
         return successful_results
+    
+    def _load_build_manifest(self, manifest_path: Path) -> Dict[str, Dict[str, Any]]:
+        """Load the persisted build manifest, if any."""
+        try:
+            with open(manifest_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable build manifest", path=str(manifest_path), error=str(e))
+            return {}
+    
+    def _metadata_from_entry(self, data: Dict[str, Any]) -> AssetMetadata:
+        """Rebuild asset metadata recorded in the build manifest."""
+        return AssetMetadata(**{**data, "asset_type": AssetType(data["asset_type"])})
 
 
 class AssetVersionManager:
@@ -572,9 +551,11 @@ class AssetVersionManager:
     async def save_manifest(self) -> None:
         """Save asset manifest to file."""
         try:
-            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
-            async with aiofiles.open(self.manifest_path, 'w') as f:
-                await f.write(json.dumps(self.manifest, indent=2))
+            await asyncio.to_thread(
+                atomic_write_bytes,
+                self.manifest_path,
+                json.dumps(self.manifest, indent=2).encode('utf-8')
+            )
         except Exception as e:
             logger.error("Failed to save asset manifest", error=str(e))
     
@@ -623,4 +604,4 @@ def create_cdn_optimizer(
         enable_gzip=kwargs.get('enable_gzip', True)
     )
     
-    return CDNOptimizer(cdn_config, optimization_config)
\ No newline at end of file
+    return CDNOptimizer(cdn_config, optimization_config, max_workers=kwargs.get('max_workers'))
\ No newline at end of file
@@ -1,8 +1,10 @@
 """Enhanced Celery configuration for background task processing with priority queues and auto-scaling."""
 
 import os
+import socket
+import time
 from celery import Celery
-from celery.signals import worker_ready, worker_shutting_down
+from celery.signals import heartbeat_sent, worker_init, worker_ready, worker_shutting_down
 from kombu import Queue, Exchange
 
 from .config import get_settings
@@ -197,6 +199,26 @@ celery_app.conf.beat_schedule = {
         "schedule": 3600.0,  # Every hour
         "options": {"queue": "semantic_search", "priority": 3}
     },
+    "sync-keyword-index": {
+        "task": "semantic_search.sync_keyword_index",
+        "schedule": 3600.0,  # Every hour, indexes existing jobs and drops closed ones
+        "options": {"queue": "semantic_search", "priority": 2}
+    },
+    "reverse-match-new-jobs": {
+        "task": "semantic_search.batch_job_matching",
+        "schedule": 3600.0,  # Every hour, merges new jobs into recommendation lists
+        "options": {"queue": "semantic_search", "priority": 2}
+    },
+    "warm-search-cache": {
+        "task": "semantic_search.warm_search_cache",
+        "schedule": float(settings.redis.cache_warming_interval_seconds),
+        "options": {"queue": "semantic_search", "priority": 2}
+    },
+    "feed-platform-statistics": {
+        "task": "app.tasks.background_analytics.feed_platform_statistics",
+        "schedule": 60.0,  # Every minute
+        "options": {"queue": "analytics", "priority": 3}
+    },
     "calculate-user-analytics": {
         "task": "app.tasks.background_analytics.calculate_user_analytics_batch",
         "schedule": 1800.0,  # Every 30 minutes
@@ -224,18 +246,103 @@ celery_app.conf.beat_schedule = {
         "schedule": 604800.0,  # Weekly
         "options": {"queue": "background", "priority": 1}
     },
+    "maintain-partitions": {
+        "task": "app.tasks.background_analytics.maintain_partitions",
+        "schedule": 86400.0,  # Daily
+        "options": {"queue": "background", "priority": 1}
+    },
 }
 
 # Worker event handlers for monitoring
+@worker_init.connect
+def preload_subsystems_handler(sender=None, **kwargs):
+    """Import the subsystems serving this worker's queues before child processes fork."""
+    if not settings.celery.preload_subsystems:
+        return
+    
+    from .subsystems import subsystem_registry
+    
+    try:
+        queues = list(sender.app.amqp.queues.consume_from)
+    except AttributeError:
+        return
+    
+    loaded = subsystem_registry.load_for_queues(queues)
+    logger.info(
+        "Preloaded subsystems for worker queues",
+        extra={"queues": queues, "subsystems": loaded}
+    )
+
+@worker_init.connect
+def warm_caches_handler(sender=None, **kwargs):
+    """Warm the cache entries this worker's queues are predicted to read before it consumes."""
+    if not settings.redis.cache_warming_enabled:
+        return
+    
+    import asyncio
+    from .cache_warming import warm_predicted_caches
+    from .subsystems import subsystem_registry
+    
+    try:
+        queues = list(sender.app.amqp.queues.consume_from)
+    except AttributeError:
+        return
+    
+    subsystems = subsystem_registry.subsystems_for_queues(queues)
+    try:
+        # Runs in the parent before forking, so release every client it opened
+        stats = asyncio.run(warm_predicted_caches(
+            subsystems,
+            budget_seconds=settings.redis.cache_warming_startup_budget_seconds,
+            release=True,
+        ))
+    except Exception as e:
+        logger.warning("Startup cache warming failed", extra={"error": str(e)})
+        return
+    logger.info("Warmed caches before consuming", extra={"queues": queues, **stats})
+
 @worker_ready.connect
 def worker_ready_handler(sender=None, **kwargs):
     """Handle worker ready event."""
     logger.info(f"Celery worker {sender} is ready", extra={"worker_id": sender})
 
+# Worker heartbeats recorded in the broker for the active worker gauge
+_heartbeat_client = None
+_last_heartbeat_recorded = 0.0
+
 @worker_shutting_down.connect
 def worker_shutting_down_handler(sender=None, **kwargs):
     """Handle worker shutdown event."""
     logger.info(f"Celery worker {sender} is shutting down", extra={"worker_id": sender})
+    
+    if _heartbeat_client is not None and sender:
+        from .metrics import WORKER_HEARTBEATS_KEY
+        try:
+            _heartbeat_client.zrem(WORKER_HEARTBEATS_KEY, str(sender))
+        except Exception:
+            pass
+
+@heartbeat_sent.connect
+def heartbeat_sent_handler(sender=None, **kwargs):
+    """Record this worker as alive, at most once per recording interval."""
+    global _heartbeat_client, _last_heartbeat_recorded
+    from .metrics import WORKER_HEARTBEAT_RECORD_INTERVAL, is_redis_broker, record_worker_heartbeat
+    
+    now = time.time()
+    if now - _last_heartbeat_recorded < WORKER_HEARTBEAT_RECORD_INTERVAL:
+        return
+    if not is_redis_broker(settings.celery.broker_url):
+        return
+    _last_heartbeat_recorded = now
+    
+    hostname = getattr(getattr(sender, "eventer", None), "hostname", None)
+    try:
+        if _heartbeat_client is None:
+            import redis
+            _heartbeat_client = redis.from_url(settings.celery.broker_url, socket_timeout=1.0)
+        record_worker_heartbeat(_heartbeat_client, hostname or f"{socket.gethostname()}:{os.getpid()}", now)
+    except Exception as e:
+        logger.warning("Failed to record worker heartbeat", extra={"error": str(e)})
 
 # Auto-scaling configuration
 def get_worker_autoscale_config():
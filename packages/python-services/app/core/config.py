@@ -1,11 +1,20 @@
 """Configuration settings for Python-centric FastAPI services."""
 
 import os
+from pathlib import Path
 from typing import Dict, List, Optional
 
 from pydantic import Field, ConfigDict, validator
 from pydantic_settings import BaseSettings
 
+# Root of the service; relative data file paths are resolved against it
+APP_ROOT = Path(__file__).resolve().parents[2]
+
+
+def _resolve_app_path(path: str) -> str:
+    """Resolve a relative path against the service root rather than the working directory."""
+    return str(APP_ROOT / path) if path and not os.path.isabs(path) else path
+
 
 class DatabaseSettings(BaseSettings):
     """Database configuration settings."""
@@ -233,6 +242,12 @@ class DatabaseSettings(BaseSettings):
     # Connection retry settings
     max_retries: int = Field(default=3, description="Max connection retry attempts")
     retry_delay: float = Field(default=1.0, description="Retry delay seconds")
+    
+    # Monthly partitioning of append-only tables
+    partition_premake_months: int = Field(default=3, ge=1, description="Monthly partitions created ahead of the current month")
+    partition_archive_schema: str = Field(default="archive", description="Schema expired partitions are moved to when archived")
+    audit_log_retention_months: int = Field(default=24, ge=1, description="Months of audit logs kept before partitions are archived")
+    security_event_retention_months: int = Field(default=12, ge=1, description="Months of security events kept before partitions are dropped")
 
 
 class RedisSettings(BaseSettings):
@@ -247,6 +262,17 @@ class RedisSettings(BaseSettings):
     retry_on_timeout: bool = Field(default=True, description="Retry on timeout")
     health_check_interval: int = Field(default=30, description="Health check interval")
 
+    # Predictive cache warming
+    cache_access_sample_rate: float = Field(default=0.05, ge=0.0, le=1.0, description="Fraction of cache reads recorded in the access log")
+    cache_access_bucket_seconds: int = Field(default=3600, ge=60, description="Width of an access log time bucket")
+    cache_access_retention_hours: int = Field(default=168, ge=1, description="Hours of access log kept for prediction")
+    cache_warming_enabled: bool = Field(default=True, description="Warm predicted cache entries at startup and periodically")
+    cache_warming_interval_seconds: int = Field(default=300, ge=10, description="Seconds between warming cycles")
+    cache_warming_concurrency: int = Field(default=4, ge=1, description="Entries recomputed concurrently while warming")
+    cache_warming_budget_seconds: float = Field(default=30.0, gt=0, description="Wall-clock budget of a periodic warming cycle")
+    cache_warming_startup_budget_seconds: float = Field(default=60.0, gt=0, description="Wall-clock budget of the warming cycle run before serving")
+    cache_warming_max_keys: int = Field(default=500, ge=1, description="Most entries considered in one warming cycle")
+
 
 class SecuritySettings(BaseSettings):
     """Security configuration settings."""
@@ -295,6 +321,49 @@ class SecuritySettings(BaseSettings):
     pii_encryption_key_id: str = Field(default="pii_default_v1", description="Default PII encryption key ID")
     session_encryption_key_id: str = Field(default="session_default_v1", description="Default session encryption key ID")
     key_rotation_days: int = Field(default=90, description="Days between key rotations")
+    key_rotation_workers: int = Field(default=4, description="Concurrent workers per table key rotation")
+    key_rotation_batch_size: int = Field(default=500, description="Rows re-encrypted per rotation batch")
+    key_rotation_crypto_threads: int = Field(default=4, description="Threads for rotation decrypt/re-encrypt")
+    key_rotation_max_replication_lag: float = Field(default=5.0, description="Replica lag (seconds) above which rotation pauses; 0 disables")
+
+    # Session Store
+    session_ttl_seconds: int = Field(default=7 * 24 * 3600, description="Sliding session lifetime in seconds")
+    session_touch_interval_seconds: int = Field(default=300, description="Minimum seconds between session expiry extensions")
+    session_local_cache_ttl_seconds: float = Field(default=5.0, description="In-process validated-session cache TTL; 0 disables")
+    session_local_cache_size: int = Field(default=10000, description="Maximum sessions held in the in-process cache")
+
+    # RBAC
+    rbac_cache_ttl_seconds: int = Field(default=3600, description="Redis TTL for compiled user permission sets")
+    rbac_local_cache_size: int = Field(default=10000, description="Maximum users held in the in-process permission cache")
+
+    # Service-to-service tokens
+    service_token_secret: Optional[str] = Field(default=None, description="Shared service JWT secret (defaults to secret_key + '_service')")
+    service_token_algorithm: str = Field(default="HS256", description="Algorithm for the shared service JWT secret")
+    service_token_issuer: Optional[str] = Field(default=None, description="Required service JWT issuer")
+    service_token_audience: Optional[str] = Field(default=None, description="Required service JWT audience")
+    service_token_leeway_seconds: float = Field(default=0.0, description="Clock skew allowed for exp/nbf")
+    service_token_cache_size: int = Field(default=10000, description="Maximum verified service tokens cached in-process")
+    service_jwks_url: Optional[str] = Field(default=None, description="JWKS URL with additional service verification keys")
+    service_jwks_refresh_seconds: float = Field(default=300.0, description="Background JWKS refresh interval")
+    service_token_revocation_sync_seconds: float = Field(default=5.0, description="Revoked service token filter sync interval")
+    service_token_revocation_capacity: int = Field(default=100000, description="Revoked service tokens sized for in the bloom filter")
+
+    # Threat detection
+    threat_profile_cache_size: int = Field(default=50000, description="Behavioural profiles held in-process")
+    threat_profile_cache_ttl_seconds: float = Field(default=900.0, description="Age after which in-process profiles are re-read from Redis")
+    threat_profile_redis_ttl_seconds: int = Field(default=30 * 24 * 3600, description="Redis TTL of persisted behavioural profiles")
+    threat_profile_flush_interval_seconds: float = Field(default=5.0, description="Interval for writing changed profiles to Redis")
+    threat_anomaly_batch_size: int = Field(default=64, description="Events scored per anomaly model call")
+    threat_anomaly_batch_delay_seconds: float = Field(default=0.05, description="Longest wait for an anomaly batch to fill")
+    threat_anomaly_queue_size: int = Field(default=10000, description="Events queued for anomaly scoring before dropping")
+
+    # IP reputation
+    ip_reputation_index_path: str = Field(default="data/ip_reputation.idx", description="Compiled IP reputation index shared by workers")
+    ip_reputation_blocklists: List[str] = Field(default_factory=list, description="Blocklist files (addresses or CIDR ranges) compiled into the index")
+    ip_reputation_blocklist_score: float = Field(default=0.1, description="Reputation assigned to blocklisted prefixes")
+    ip_reputation_reload_seconds: float = Field(default=60.0, description="Interval for picking up rebuilt indexes and changed blocklists")
+    alert_bucket_seconds: int = Field(default=3600, description="Width of the time buckets security alerts are stored in")
+    alert_retention_days: int = Field(default=30, description="Days security alerts are kept before their buckets expire")
     
     # TLS Configuration
     tls_cert_file: Optional[str] = Field(default=None, description="TLS certificate file path")
@@ -303,6 +372,15 @@ class SecuritySettings(BaseSettings):
     tls_min_version: str = Field(default="TLSv1.3", description="Minimum TLS version")
     enable_hsts: bool = Field(default=True, description="Enable HTTP Strict Transport Security")
     hsts_max_age: int = Field(default=31536000, description="HSTS max age in seconds")
+    
+    @validator('ip_reputation_index_path')
+    def resolve_ip_reputation_index_path(cls, v: str) -> str:
+        """Workers started from different directories must share one index."""
+        return _resolve_app_path(v)
+    
+    @validator('ip_reputation_blocklists', each_item=True)
+    def resolve_ip_reputation_blocklists(cls, v: str) -> str:
+        return _resolve_app_path(v)
 
 
 class AISettings(BaseSettings):
@@ -341,6 +419,39 @@ class AISettings(BaseSettings):
     # Generation Limits
     max_concurrent_generations: int = Field(default=10, description="Max concurrent AI generations")
     generation_timeout: int = Field(default=120, description="Generation timeout seconds")
+    
+    # Document Parsing
+    parser_max_workers: int = Field(default=2, description="Document parser process pool size")
+    parser_timeout: int = Field(default=30, description="Per-document parse timeout seconds")
+    parser_memory_limit_mb: int = Field(default=512, description="Address-space limit per parser worker")
+    parser_max_pages: int = Field(default=50, description="Max PDF pages parsed per document")
+    parser_max_chars: int = Field(default=200_000, description="Max characters extracted per document")
+    parsed_document_cache_ttl: int = Field(default=86400, description="Parsed document cache TTL seconds")
+    
+    # Extraction Caching
+    requirements_cache_ttl: int = Field(
+        default=7 * 24 * 3600,
+        description="Redis TTL for cached job requirement extractions in seconds"
+    )
+    
+    # Keyword Search
+    keyword_index_path: str = Field(
+        default="./models/job_keyword_index.json.gz",
+        description="Snapshot file for the in-process BM25 job index"
+    )
+    keyword_index_k1: float = Field(default=1.2, ge=0.0, description="BM25 term frequency saturation")
+    keyword_index_b: float = Field(default=0.75, ge=0.0, le=1.0, description="BM25 length normalisation")
+    hybrid_rrf_k: int = Field(default=60, ge=1, description="Reciprocal rank fusion rank offset")
+    elasticsearch_url: Optional[str] = Field(
+        default=None,
+        description="Elasticsearch URL; keyword search uses the local BM25 index when unset"
+    )
+    
+    # Recommendations
+    recommendation_list_size: int = Field(default=20, ge=1, description="Jobs kept in each user's recommendation list")
+    recommendation_threshold: float = Field(default=0.6, ge=0.0, le=1.0, description="Minimum match score for a recommendation")
+    reverse_match_chunk_size: int = Field(default=1024, ge=1, description="User profiles scored per reverse matching chunk")
+    job_feed_retention_days: int = Field(default=7, ge=1, description="Days changed jobs stay in the reverse matching feed")
 
 
 class MonitoringSettings(BaseSettings):
@@ -386,11 +497,33 @@ class MonitoringSettings(BaseSettings):
         default_factory=lambda: {"service.version": "1.0.0"},
         description="OpenTelemetry resource attributes"
     )
+    tracing_route_sample_rates: Dict[str, float] = Field(
+        default_factory=lambda: {"/health": 0.0, "/metrics": 0.0},
+        description="Trace sampling rates by path prefix, overriding otel_sampling_rate"
+    )
+    tracing_buffer_size: int = Field(default=8192, ge=1, description="Finished spans held for export")
+    tracing_exporter: str = Field(default="none", description="Span exporter: none, file or otlp")
+    tracing_export_path: str = Field(default="logs/spans.jsonl", description="File span exporter path")
+    tracing_otlp_endpoint: str = Field(
+        default="http://localhost:4318/v1/traces",
+        description="OTLP/HTTP traces endpoint"
+    )
+    tracing_export_batch_size: int = Field(default=512, ge=1, description="Spans per export batch")
+    tracing_export_interval: float = Field(default=2.0, gt=0, description="Span export interval seconds")
     
     # Prometheus Configuration
     prometheus_metrics_port: int = Field(default=8001, description="Prometheus metrics port")
     enable_metrics: bool = Field(default=True, description="Enable metrics collection")
     metrics_path: str = Field(default="/metrics", description="Metrics endpoint path")
+    metrics_collector_intervals: Dict[str, float] = Field(
+        default_factory=lambda: {"system": 15.0, "redis": 30.0, "celery": 15.0, "business": 60.0},
+        description="Collection interval in seconds per metrics collector"
+    )
+    metrics_collector_timeout: float = Field(
+        default=5.0,
+        gt=0,
+        description="Seconds a single metrics collection may take before it is abandoned"
+    )
     
     # Health Checks
     health_check_interval: int = Field(default=30, description="Health check interval seconds")
@@ -425,6 +558,10 @@ class CelerySettings(BaseSettings):
     worker_prefetch_multiplier: int = Field(default=1, description="Worker prefetch multiplier")
     task_acks_late: bool = Field(default=True, description="Acknowledge tasks late")
     worker_disable_rate_limits: bool = Field(default=False, description="Disable rate limits")
+    preload_subsystems: bool = Field(
+        default=True,
+        description="Import the subsystems serving a worker's queues before forking child processes"
+    )
 
 
 class CDNSettings(BaseSettings):
@@ -463,6 +600,8 @@ class CDNSettings(BaseSettings):
     asset_manifest_path: str = Field(default="./asset_manifest.json", description="Asset manifest file path")
     asset_upload_path: str = Field(default="./uploads", description="Asset upload directory")
     max_concurrent_uploads: int = Field(default=5, description="Maximum concurrent uploads")
+    build_manifest_path: str = Field(default="./asset_build_manifest.json", description="Incremental build manifest file path")
+    optimization_workers: int = Field(default=4, ge=1, description="Worker processes for asset optimization")
     
     # AWS S3 Configuration (for CloudFront)
     aws_access_key_id: Optional[str] = Field(default=None, description="AWS access key ID")
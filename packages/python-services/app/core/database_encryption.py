@@ -3,23 +3,130 @@ Database encryption service for transparent field-level encryption with SQLAlche
 
 This module provides SQLAlchemy custom types and utilities for automatic
 encryption/decryption of sensitive data at the database layer.
+
+``EncryptedBinaryType`` stores values as compact AEAD envelopes in ``bytea``
+columns and decrypts them lazily; the text-based types keep the legacy
+``EncryptedField`` JSON format and can read both.
 """
 
+import hashlib
 import json
+from collections import OrderedDict
 from typing import Any, Optional, Type, TypeVar, Union
 
 import structlog
-from sqlalchemy import String, TypeDecorator, Text
+from sqlalchemy import LargeBinary, String, TypeDecorator, Text
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.engine import Dialect
 from sqlalchemy.sql.type_api import UserDefinedType
 
-from .encryption import EncryptedField, get_encryption_service
+from .encryption import EncryptedField, get_encryption_service, is_compact_envelope
 
 logger = structlog.get_logger()
 
 T = TypeVar('T')
 
+SESSION_DECRYPTION_CACHE_KEY = "decryption_cache"
+DEFAULT_DECRYPTION_CACHE_SIZE = 1024
+
+
+class DecryptionCache:
+    """Bounded LRU of decrypted values keyed by a digest of the stored envelope."""
+    
+    def __init__(self, max_size: int = DEFAULT_DECRYPTION_CACHE_SIZE):
+        self.max_size = max_size
+        self._values: "OrderedDict[bytes, str]" = OrderedDict()
+    
+    @staticmethod
+    def _key(envelope: bytes) -> bytes:
+        return hashlib.blake2b(envelope, digest_size=16).digest()
+    
+    def get(self, envelope: bytes) -> Optional[str]:
+        key = self._key(envelope)
+        value = self._values.get(key)
+        if value is not None:
+            self._values.move_to_end(key)
+        return value
+    
+    def set(self, envelope: bytes, plaintext: str) -> None:
+        key = self._key(envelope)
+        self._values[key] = plaintext
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_size:
+            self._values.popitem(last=False)
+    
+    def clear(self) -> None:
+        self._values.clear()
+    
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+def get_session_decryption_cache(session) -> DecryptionCache:
+    """
+    Get the decryption cache bound to a (sync or async) SQLAlchemy session.
+    
+    The cache lives in ``session.info`` so it is discarded with the session.
+    """
+    cache = session.info.get(SESSION_DECRYPTION_CACHE_KEY)
+    if cache is None:
+        cache = DecryptionCache()
+        session.info[SESSION_DECRYPTION_CACHE_KEY] = cache
+    return cache
+
+
+class LazyDecryptedValue:
+    """
+    Encrypted column value that is only decrypted when it is read.
+    
+    Loading rows with encrypted columns costs no crypto until the plaintext is
+    actually needed; the plaintext is then memoised on the instance and, if a
+    cache is supplied, shared with other values in the same session.
+    """
+    
+    __slots__ = ("envelope", "_plaintext", "_encryption_service")
+    
+    def __init__(self, envelope: bytes, encryption_service=None):
+        self.envelope = envelope
+        self._plaintext: Optional[str] = None
+        self._encryption_service = encryption_service
+    
+    @property
+    def is_decrypted(self) -> bool:
+        return self._plaintext is not None
+    
+    def get(self, cache: Optional[DecryptionCache] = None) -> str:
+        """Decrypt (once) and return the plaintext."""
+        if self._plaintext is None:
+            if cache is not None:
+                self._plaintext = cache.get(self.envelope)
+            if self._plaintext is None:
+                service = self._encryption_service or get_encryption_service()
+                self._plaintext = service.decrypt_stored_value(self.envelope)
+                if cache is not None:
+                    cache.set(self.envelope, self._plaintext)
+        return self._plaintext
+    
+    def get_for_session(self, session) -> str:
+        """Decrypt using the session-scoped decryption cache."""
+        return self.get(get_session_decryption_cache(session))
+    
+    def __str__(self) -> str:
+        return self.get()
+    
+    def __repr__(self) -> str:
+        return f"LazyDecryptedValue(decrypted={self.is_decrypted})"
+    
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, LazyDecryptedValue):
+            return self.envelope == other.envelope or self.get() == other.get()
+        if isinstance(other, str):
+            return self.get() == other
+        return NotImplemented
+    
+    def __hash__(self) -> int:
+        return hash(self.get())
+
 
 class EncryptedType(TypeDecorator):
     """
@@ -60,16 +167,16 @@ class EncryptedType(TypeDecorator):
         try:
             # If already encrypted, serialize it
             if isinstance(value, EncryptedField):
-                return json.dumps(value.model_dump())
+                return value.model_dump_json()
             
             # If it's a plain value, encrypt it
             if isinstance(value, (str, int, float)):
                 encrypted_field = self.encryption_service.encrypt_field(value, self.key_id)
-                return json.dumps(encrypted_field.model_dump())
+                return encrypted_field.model_dump_json()
             
             # For other types, convert to string first
             encrypted_field = self.encryption_service.encrypt_field(str(value), self.key_id)
-            return json.dumps(encrypted_field.model_dump())
+            return encrypted_field.model_dump_json()
             
         except Exception as e:
             logger.error("Failed to encrypt value for database", 
@@ -91,12 +198,8 @@ class EncryptedType(TypeDecorator):
             return None
         
         try:
-            # Parse JSON to get encrypted field
-            encrypted_data = json.loads(value)
-            encrypted_field = EncryptedField(**encrypted_data)
-            
-            # Decrypt and return plain text
-            return self.encryption_service.decrypt_field(encrypted_field)
+            # Accepts the legacy EncryptedField JSON as well as compact envelopes
+            return self.encryption_service.decrypt_stored_value(value)
             
         except Exception as e:
             logger.error("Failed to decrypt value from database", 
@@ -155,7 +258,7 @@ class EncryptedJSON(TypeDecorator):
             
             # Encrypt the JSON string
             encrypted_field = self.encryption_service.encrypt_field(json_str, self.key_id)
-            return json.dumps(encrypted_field.model_dump())
+            return encrypted_field.model_dump_json()
             
         except Exception as e:
             logger.error("Failed to encrypt JSON for database", 
@@ -211,6 +314,92 @@ class EncryptedPIIType(EncryptedType):
         return super().process_result_value(value, dialect)
 
 
+class EncryptedBinaryType(TypeDecorator):
+    """
+    SQLAlchemy type storing values as compact AEAD envelopes in ``bytea``.
+    
+    Values are encrypted with ``EncryptionService.encrypt_field_compact``. By
+    default loaded values are returned as ``LazyDecryptedValue`` so that rows
+    are only decrypted when a column is actually read. Legacy JSON payloads
+    (e.g. columns converted from ``EncryptedType``) are still readable.
+    """
+    
+    impl = LargeBinary
+    cache_ok = True
+    
+    def __init__(
+        self,
+        key_id: Optional[str] = None,
+        lazy: bool = True,
+        algorithm: str = "aes-gcm",
+        *args,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.key_id = key_id
+        self.lazy = lazy
+        self.algorithm = algorithm
+        self.encryption_service = get_encryption_service()
+    
+    def load_dialect_impl(self, dialect: Dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.BYTEA())
+        return dialect.type_descriptor(LargeBinary())
+    
+    def process_bind_param(self, value: Any, dialect: Dialect) -> Optional[bytes]:
+        """Encrypt a value into a compact envelope before storing."""
+        if value is None:
+            return None
+        
+        # Values loaded from the database are written back without re-encrypting
+        if isinstance(value, LazyDecryptedValue):
+            return value.envelope
+        if isinstance(value, (bytes, bytearray, memoryview)) and is_compact_envelope(value):
+            return bytes(value)
+        
+        try:
+            if isinstance(value, EncryptedField):
+                value = self.encryption_service.decrypt_field(value)
+            elif not isinstance(value, (str, bytes)):
+                value = str(value)
+            
+            return self.encryption_service.encrypt_field_compact(
+                value, self.key_id, algorithm=self.algorithm
+            )
+            
+        except Exception as e:
+            logger.error("Failed to encrypt value for database", 
+                        key_id=self.key_id, error=str(e))
+            raise
+    
+    def process_result_value(self, value: Optional[bytes], dialect: Dialect) -> Any:
+        """Wrap (or decrypt) a stored envelope after loading."""
+        if value is None:
+            return None
+        
+        lazy_value = LazyDecryptedValue(bytes(value), self.encryption_service)
+        if self.lazy:
+            return lazy_value
+        
+        try:
+            return lazy_value.get()
+        except Exception as e:
+            logger.error("Failed to decrypt value from database", 
+                        error=str(e))
+            return None
+
+
+class EncryptedPIIBinaryType(EncryptedBinaryType):
+    """Compact encrypted type bound to the dedicated PII key."""
+    
+    def __init__(self, *args, **kwargs):
+        kwargs.pop("key_id", None)
+        super().__init__(key_id="pii_default_v1", *args, **kwargs)
+
+
+ENCRYPTED_COLUMN_TYPES = (EncryptedType, EncryptedJSON, EncryptedPIIType, EncryptedBinaryType)
+
+
 class DatabaseEncryptionMixin:
     """
     Mixin for SQLAlchemy models that need encryption support.
@@ -225,7 +414,7 @@ class DatabaseEncryptionMixin:
         
         if hasattr(cls, '__table__'):
             for column in cls.__table__.columns:
-                if isinstance(column.type, (EncryptedType, EncryptedJSON, EncryptedPIIType)):
+                if isinstance(column.type, ENCRYPTED_COLUMN_TYPES):
                     encrypted_columns.append(column.name)
         
         return encrypted_columns
@@ -246,7 +435,7 @@ class DatabaseEncryptionMixin:
                 if value is not None:
                     encryption_service = get_encryption_service()
                     encrypted_field = encryption_service.encrypt_field(value)
-                    encrypted_data[column_name] = encrypted_field.model_dump()
+                    encrypted_data[column_name] = encrypted_field.model_dump(mode="json")
         
         return encrypted_data
     
@@ -282,97 +471,84 @@ class EncryptionKeyRotationService:
         model_class: Type[T], 
         old_key_id: str, 
         new_key_id: str,
-        batch_size: int = 100
+        batch_size: int = 100,
+        workers: Optional[int] = None,
+        job_id: Optional[str] = None
     ) -> int:
         """
         Rotate encryption key for all records in a table.
         
+        Runs online through ``OnlineKeyRotationEngine``: the primary key range
+        is split across workers with their own connections, rows are walked
+        by keyset pagination and progress is checkpointed, so calling this
+        again with the same arguments resumes an interrupted rotation.
+        
         Args:
-            session: SQLAlchemy async session
+            session: SQLAlchemy async session (kept for compatibility; workers
+                open their own connections)
             model_class: SQLAlchemy model class
             old_key_id: Old encryption key ID
             new_key_id: New encryption key ID
             batch_size: Number of records to process per batch
+            workers: Number of concurrent workers (defaults to settings)
+            job_id: Rotation job ID (defaults to table/key based ID)
             
         Returns:
             Number of records updated
         """
+        from .key_rotation import get_online_rotation_engine
+        
         try:
-            updated_count = 0
-            encrypted_columns = []
-            
-            # Find encrypted columns
-            if hasattr(model_class, '__table__'):
-                for column in model_class.__table__.columns:
-                    if isinstance(column.type, (EncryptedType, EncryptedJSON, EncryptedPIIType)):
-                        encrypted_columns.append(column.name)
-            
-            if not encrypted_columns:
-                self.logger.info("No encrypted columns found", 
-                               model=model_class.__name__)
-                return 0
-            
-            # Process records in batches
-            offset = 0
-            while True:
-                # Fetch batch of records
-                query = session.query(model_class).offset(offset).limit(batch_size)
-                records = await query.all()
-                
-                if not records:
-                    break
-                
-                # Process each record
-                for record in records:
-                    try:
-                        record_updated = False
-                        
-                        for column_name in encrypted_columns:
-                            if hasattr(record, column_name):
-                                encrypted_value = getattr(record, column_name)
-                                
-                                if encrypted_value and self._needs_key_rotation(encrypted_value, old_key_id):
-                                    # Decrypt with old key and re-encrypt with new key
-                                    decrypted_value = self._decrypt_with_key(encrypted_value, old_key_id)
-                                    new_encrypted_value = self._encrypt_with_key(decrypted_value, new_key_id)
-                                    
-                                    setattr(record, column_name, new_encrypted_value)
-                                    record_updated = True
-                        
-                        if record_updated:
-                            updated_count += 1
-                    
-                    except Exception as e:
-                        self.logger.error("Failed to rotate key for record", 
-                                        model=model_class.__name__,
-                                        record_id=getattr(record, 'id', None),
-                                        error=str(e))
-                
-                # Commit batch
-                await session.commit()
-                offset += batch_size
-                
-                self.logger.info("Processed batch for key rotation", 
-                               model=model_class.__name__,
-                               batch_size=len(records),
-                               updated_in_batch=len([r for r in records if self._record_was_updated(r)]))
-            
-            self.logger.info("Completed key rotation for table", 
-                           model=model_class.__name__,
-                           total_updated=updated_count)
-            
-            return updated_count
+            progress = await get_online_rotation_engine().rotate_table(
+                model_class,
+                old_key_id,
+                new_key_id,
+                job_id=job_id,
+                batch_size=batch_size,
+                workers=workers
+            )
+            return progress.rows_updated
             
         except Exception as e:
             self.logger.error("Failed to rotate keys for table", 
                             model=model_class.__name__,
                             error=str(e))
-            await session.rollback()
             raise
     
-    def _needs_key_rotation(self, encrypted_value: str, old_key_id: str) -> bool:
+    async def get_rotation_progress(self, job_id: str) -> Optional[dict]:
+        """Get progress and ETA of a table rotation job."""
+        from .key_rotation import get_online_rotation_engine
+        
+        progress = await get_online_rotation_engine().load_progress(job_id)
+        return progress.to_dict() if progress else None
+    
+    def reencrypt_value(
+        self,
+        encrypted_value: Any,
+        old_key_id: str,
+        new_key_id: str,
+        compact: bool = False
+    ) -> Optional[Union[str, bytes]]:
+        """
+        Re-encrypt a stored value if it was encrypted with ``old_key_id``.
+        
+        Returns:
+            The value encrypted with ``new_key_id``, or None if it needs no rotation
+        """
+        if encrypted_value is None or not self._needs_key_rotation(encrypted_value, old_key_id):
+            return None
+        plaintext = self._decrypt_with_key(encrypted_value, old_key_id)
+        return self._encrypt_with_key(plaintext, new_key_id, compact=compact)
+    
+    def _needs_key_rotation(self, encrypted_value: Any, old_key_id: str) -> bool:
         """Check if encrypted value needs key rotation."""
         try:
+            if isinstance(encrypted_value, LazyDecryptedValue):
+                encrypted_value = encrypted_value.envelope
+            if isinstance(encrypted_value, (bytes, bytearray, memoryview)):
+                if is_compact_envelope(encrypted_value):
+                    return self.encryption_service.get_envelope_key_id(encrypted_value) == old_key_id
+                encrypted_value = bytes(encrypted_value).decode('utf-8')
             if isinstance(encrypted_value, str):
                 encrypted_data = json.loads(encrypted_value)
                 return encrypted_data.get('key_id') == old_key_id
@@ -380,21 +556,18 @@ class EncryptionKeyRotationService:
         except:
             return False
     
-    def _decrypt_with_key(self, encrypted_value: str, key_id: str) -> str:
+    def _decrypt_with_key(self, encrypted_value: Any, key_id: str) -> str:
         """Decrypt value with specific key."""
-        encrypted_data = json.loads(encrypted_value)
-        encrypted_field = EncryptedField(**encrypted_data)
-        return self.encryption_service.decrypt_field(encrypted_field)
+        if isinstance(encrypted_value, LazyDecryptedValue):
+            return encrypted_value.get()
+        return self.encryption_service.decrypt_stored_value(encrypted_value)
     
-    def _encrypt_with_key(self, plain_value: str, key_id: str) -> str:
-        """Encrypt value with specific key."""
+    def _encrypt_with_key(self, plain_value: str, key_id: str, compact: bool = False) -> Union[str, bytes]:
+        """Encrypt value with specific key, in the compact or legacy format."""
+        if compact:
+            return self.encryption_service.encrypt_field_compact(plain_value, key_id)
         encrypted_field = self.encryption_service.encrypt_field(plain_value, key_id)
-        return json.dumps(encrypted_field.model_dump())
-    
-    def _record_was_updated(self, record) -> bool:
-        """Check if record was updated (simplified check)."""
-        # This would need to be implemented based on your ORM change tracking
-        return True
+        return encrypted_field.model_dump_json()
 
 
 # Utility functions for database encryption
@@ -404,12 +577,12 @@ def create_encrypted_column(
     key_id: Optional[str] = None,
     length: Optional[int] = None,
     **kwargs
-) -> Union[EncryptedString, EncryptedText, EncryptedJSON, EncryptedPIIType]:
+) -> Union[EncryptedString, EncryptedText, EncryptedJSON, EncryptedPIIType, EncryptedBinaryType]:
     """
     Create an encrypted column type.
     
     Args:
-        column_type: Type of column ("string", "text", "json", "pii")
+        column_type: Type of column ("string", "text", "json", "pii", "binary", "pii_binary")
         key_id: Encryption key ID to use
         length: Maximum length for string columns
         **kwargs: Additional arguments for the column type
@@ -425,6 +598,10 @@ def create_encrypted_column(
         return EncryptedJSON(key_id=key_id, **kwargs)
     elif column_type == "pii":
         return EncryptedPIIType(**kwargs)
+    elif column_type == "binary":
+        return EncryptedBinaryType(key_id=key_id, **kwargs)
+    elif column_type == "pii_binary":
+        return EncryptedPIIBinaryType(**kwargs)
     else:
         raise ValueError(f"Unknown encrypted column type: {column_type}")
 
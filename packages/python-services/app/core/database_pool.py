@@ -1,10 +1,18 @@
 """
 Advanced Database Connection Pooling with Read Replicas
 Implements optimized connection pooling, read/write splitting, and performance monitoring
+
+Reads are routed to replicas whose polled replication lag fits the query's
+staleness budget, weighted by pool utilisation and recent latency. After a
+write, the commit LSN is remembered as a ``WriteToken`` so later reads in the
+same context either stay on the primary or wait for a replica to replay past
+it (read-your-writes).
 """
 
 import asyncio
+import random
 import time
+from contextvars import ContextVar
 from typing import Dict, List, Optional, Any, Callable, Union
 from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
@@ -18,7 +26,6 @@ from sqlalchemy.ext.asyncio import (
 )
 from sqlalchemy.pool import QueuePool, NullPool
 from sqlalchemy import event, text
-from sqlalchemy.engine.events import PoolEvents
 import asyncpg
 from asyncpg.pool import Pool as AsyncPGPool
 import psutil
@@ -38,6 +45,55 @@ class QueryType(Enum):
     WRITE = "write"
     ANALYTICS = "analytics"
 
+class ReadYourWritesMode(Enum):
+    """How reads after a write are kept consistent with that write"""
+    PIN_PRIMARY = "pin_primary"
+    WAIT_FOR_REPLICA = "wait_for_replica"
+
+
+def parse_lsn(value: str) -> int:
+    """Parse a PostgreSQL LSN (``XXX/YYY``) into an integer"""
+    high, low = value.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+def format_lsn(value: int) -> str:
+    """Format an integer LSN in PostgreSQL notation"""
+    return f"{value >> 32:X}/{value & 0xFFFFFFFF:X}"
+
+
+@dataclass(frozen=True)
+class WriteToken:
+    """Position of the last committed write, used for read-your-writes"""
+    lsn: int
+    committed_at: float
+    
+    def encode(self) -> str:
+        """Serialize for carrying across requests (e.g. in a cookie or header)"""
+        return f"{format_lsn(self.lsn)}@{self.committed_at:.3f}"
+    
+    @classmethod
+    def decode(cls, value: Optional[str]) -> Optional["WriteToken"]:
+        """Parse an encoded token, returning None if it is missing or malformed"""
+        if not value:
+            return None
+        try:
+            lsn, committed_at = value.split("@", 1)
+            return cls(lsn=parse_lsn(lsn), committed_at=float(committed_at))
+        except (ValueError, TypeError):
+            return None
+
+
+# Last write in the current request/task context
+_last_write_token: ContextVar[Optional[WriteToken]] = ContextVar("last_write_token", default=None)
+
+def get_last_write_token() -> Optional[WriteToken]:
+    """Get the write token recorded in the current context"""
+    return _last_write_token.get()
+
+def set_last_write_token(token: Optional[WriteToken]) -> None:
+    """Set the write token for the current context (e.g. from a client cookie)"""
+    _last_write_token.set(token)
+
 @dataclass
 class DatabaseConfig:
     """Database configuration"""
@@ -75,10 +131,23 @@ class ConnectionMetrics:
     last_health_check: Optional[float] = None
     health_status: bool = True
     
+    # Replication state (replicas only), refreshed by the lag monitor
+    replication_lag: Optional[float] = None
+    replay_lsn: Optional[int] = None
+    lag_checked_at: Optional[float] = None
+    
+    # Exponentially weighted recent query latency
+    latency_ewma: Optional[float] = None
+    latency_alpha: float = 0.2
+    
     def add_query_time(self, duration: float):
         """Add query execution time"""
         self.queries_executed += 1
         self.query_times.append(duration)
+        if self.latency_ewma is None:
+            self.latency_ewma = duration
+        else:
+            self.latency_ewma += self.latency_alpha * (duration - self.latency_ewma)
         
         # Keep only last 1000 query times
         if len(self.query_times) > 1000:
@@ -91,7 +160,14 @@ class ConnectionMetrics:
 class DatabaseConnectionPool:
     """Advanced database connection pool with read replica support"""
     
-    def __init__(self, configs: List[DatabaseConfig]):
+    def __init__(
+        self,
+        configs: List[DatabaseConfig],
+        default_max_staleness: float = 5.0,
+        lag_poll_interval: float = 1.0,
+        read_your_writes_mode: ReadYourWritesMode = ReadYourWritesMode.PIN_PRIMARY,
+        replica_wait_timeout: float = 0.5
+    ):
         self.configs = {config.role: config for config in configs}
         self.engines: Dict[DatabaseRole, AsyncEngine] = {}
         self.session_makers: Dict[DatabaseRole, async_sessionmaker] = {}
@@ -101,6 +177,11 @@ class DatabaseConnectionPool:
         # Query routing
         self.read_replicas: List[DatabaseRole] = []
         self.primary_role = DatabaseRole.PRIMARY
+        self.default_max_staleness = default_max_staleness
+        self.lag_poll_interval = lag_poll_interval
+        self.read_your_writes_mode = read_your_writes_mode
+        self.replica_wait_timeout = replica_wait_timeout
+        self._rng = random.Random()
         
         # Performance monitoring
         self.slow_query_threshold = 1.0  # seconds
@@ -235,6 +316,10 @@ class DatabaseConnectionPool:
         for role in self.configs.keys():
             task = asyncio.create_task(self._health_monitor_loop(role))
             self.health_check_tasks.append(task)
+        
+        for role in self.read_replicas:
+            task = asyncio.create_task(self._lag_monitor_loop(role))
+            self.health_check_tasks.append(task)
     
     async def _health_monitor_loop(self, role: DatabaseRole):
         """Background health monitoring for a database role"""
@@ -277,27 +362,100 @@ class DatabaseConnectionPool:
                         role=role.value, error=str(e))
             return False
     
-    def _select_read_replica(self) -> DatabaseRole:
-        """Select the best available read replica"""
-        if not self.read_replicas:
-            return self.primary_role
+    async def _lag_monitor_loop(self, role: DatabaseRole):
+        """Background replication lag polling for a read replica"""
+        while not self._shutdown_event.is_set():
+            try:
+                await self._poll_replica_lag(role)
+            except Exception as e:
+                # Unknown lag makes the replica ineligible until the next poll succeeds
+                self.metrics[role].replication_lag = None
+                logger.warning("Replication lag poll failed", 
+                             role=role.value, error=str(e))
+            
+            await asyncio.sleep(self.lag_poll_interval)
+    
+    async def _poll_replica_lag(self, role: DatabaseRole):
+        """Refresh replication lag and replay LSN for a replica"""
+        async with self.get_raw_connection(role) as conn:
+            row = await conn.fetchrow("""
+                SELECT
+                    pg_is_in_recovery() AS in_recovery,
+                    pg_last_wal_replay_lsn()::text AS replay_lsn,
+                    CASE
+                        WHEN NOT pg_is_in_recovery() THEN 0
+                        -- Nothing left to replay: an idle primary is not lag
+                        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                        ELSE EXTRACT(EPOCH FROM (now() - pg_last_xact_replay_timestamp()))
+                    END AS lag_seconds
+            """)
         
-        # Select replica with lowest active connections
-        best_replica = self.primary_role
-        min_connections = float('inf')
+        metrics = self.metrics[role]
+        metrics.replication_lag = float(row["lag_seconds"] or 0.0)
+        if row["replay_lsn"]:
+            metrics.replay_lsn = parse_lsn(row["replay_lsn"])
+        metrics.lag_checked_at = time.time()
+    
+    def _replica_weight(self, role: DatabaseRole) -> float:
+        """Routing weight favouring idle pools and fast recent queries"""
+        metrics = self.metrics[role]
+        utilisation = metrics.active_connections / max(1, self.configs[role].max_size)
+        latency = metrics.latency_ewma or 0.0
+        # 10ms floor so a replica with no traffic yet is not weighted infinitely
+        return 1.0 / ((1.0 + 4.0 * utilisation) * (0.01 + latency))
+    
+    def _eligible_replicas(
+        self,
+        max_staleness: Optional[float] = None,
+        min_lsn: Optional[int] = None
+    ) -> List[DatabaseRole]:
+        """Healthy replicas whose lag fits the staleness budget"""
+        budget = self.default_max_staleness if max_staleness is None else max_staleness
+        # Lag readings older than a few poll intervals are treated as unknown
+        freshness = max(3 * self.lag_poll_interval, 1.0)
+        now = time.time()
         
+        eligible = []
         for replica in self.read_replicas:
-            if not self.metrics[replica].health_status:
+            metrics = self.metrics[replica]
+            if not metrics.health_status:
                 continue
-                
-            active_conns = self.metrics[replica].active_connections
-            if active_conns < min_connections:
-                min_connections = active_conns
-                best_replica = replica
+            if metrics.replication_lag is None or metrics.lag_checked_at is None:
+                continue
+            if now - metrics.lag_checked_at > freshness:
+                continue
+            if metrics.replication_lag > budget:
+                continue
+            if min_lsn is not None and (metrics.replay_lsn is None or metrics.replay_lsn < min_lsn):
+                continue
+            eligible.append(replica)
         
-        return best_replica
+        return eligible
     
-    def _route_query(self, query_type: QueryType) -> DatabaseRole:
+    def _select_read_replica(
+        self,
+        max_staleness: Optional[float] = None,
+        min_lsn: Optional[int] = None
+    ) -> DatabaseRole:
+        """Select a read replica within the staleness budget, or the primary"""
+        if not self.read_replicas:
+            return self.primary_role
+        
+        candidates = self._eligible_replicas(max_staleness, min_lsn)
+        if not candidates:
+            return self.primary_role
+        if len(candidates) == 1:
+            return candidates[0]
+        
+        weights = [self._replica_weight(replica) for replica in candidates]
+        return self._rng.choices(candidates, weights=weights, k=1)[0]
+    
+    def _route_query(
+        self,
+        query_type: QueryType,
+        max_staleness: Optional[float] = None,
+        min_lsn: Optional[int] = None
+    ) -> DatabaseRole:
         """Route query to appropriate database based on type"""
         if query_type == QueryType.WRITE:
             return self.primary_role
@@ -305,19 +463,105 @@ class DatabaseConnectionPool:
             # Prefer analytics replica if available
             analytics_role = DatabaseRole.ANALYTICS
             if (analytics_role in self.configs and 
-                self.metrics[analytics_role].health_status):
+                self.metrics[analytics_role].health_status and
+                analytics_role in self._eligible_replicas(max_staleness, min_lsn)):
                 return analytics_role
-            return self._select_read_replica()
+            return self._select_read_replica(max_staleness, min_lsn)
         else:  # READ
-            return self._select_read_replica()
+            return self._select_read_replica(max_staleness, min_lsn)
+    
+    async def _resolve_role(
+        self,
+        query_type: QueryType,
+        max_staleness: Optional[float] = None,
+        write_token: Optional[WriteToken] = None
+    ) -> DatabaseRole:
+        """Route a query, honouring read-your-writes for the current context"""
+        if query_type == QueryType.WRITE:
+            return self.primary_role
+        
+        token = write_token or get_last_write_token()
+        if token is None:
+            return self._route_query(query_type, max_staleness)
+        
+        # Replicas already known to have replayed the write are always safe
+        role = self._route_query(query_type, max_staleness, min_lsn=token.lsn)
+        if role != self.primary_role:
+            return role
+        
+        if self.read_your_writes_mode == ReadYourWritesMode.WAIT_FOR_REPLICA:
+            candidate = self._route_query(query_type, max_staleness)
+            if candidate != self.primary_role and await self._wait_for_replay(candidate, token.lsn):
+                return candidate
+        
+        return self.primary_role
+    
+    async def _wait_for_replay(self, role: DatabaseRole, lsn: int) -> bool:
+        """Wait (bounded) for a replica to replay past ``lsn``"""
+        deadline = time.monotonic() + self.replica_wait_timeout
+        delay = 0.01
+        
+        while True:
+            try:
+                async with self.get_raw_connection(role) as conn:
+                    replay_lsn = await conn.fetchval("SELECT pg_last_wal_replay_lsn()::text")
+            except Exception as e:
+                logger.warning("Failed to read replica replay position", 
+                             role=role.value, error=str(e))
+                return False
+            
+            if replay_lsn:
+                self.metrics[role].replay_lsn = parse_lsn(replay_lsn)
+                if self.metrics[role].replay_lsn >= lsn:
+                    return True
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.1)
+    
+    async def record_write(self) -> Optional[WriteToken]:
+        """Capture the primary's current WAL position after a committed write"""
+        try:
+            async with self.get_raw_connection(self.primary_role) as conn:
+                lsn = await conn.fetchval("SELECT pg_current_wal_lsn()::text")
+        except Exception as e:
+            # Without a token later reads may be stale, never incorrect routing of writes
+            logger.warning("Failed to record write position", error=str(e))
+            return None
+        
+        token = WriteToken(lsn=parse_lsn(lsn), committed_at=time.time())
+        set_last_write_token(token)
+        return token
     
     @asynccontextmanager
-    async def get_session(self, query_type: QueryType = QueryType.READ):
-        """Get database session with automatic routing"""
-        role = self._route_query(query_type)
+    async def get_session(
+        self,
+        query_type: QueryType = QueryType.READ,
+        max_staleness: Optional[float] = None,
+        write_token: Optional[WriteToken] = None
+    ):
+        """
+        Get database session with automatic routing
+        
+        Args:
+            query_type: Routing class of the work done in the session
+            max_staleness: Maximum acceptable replica lag in seconds for reads
+            write_token: Explicit read-your-writes token (defaults to the
+                last write recorded in the current context)
+        """
+        role = await self._resolve_role(query_type, max_staleness, write_token)
         session_maker = self.session_makers[role]
+        committed = False
         
         async with session_maker() as session:
+            if role == self.primary_role:
+                def _on_commit(_session):
+                    nonlocal committed
+                    committed = True
+                event.listen(session.sync_session, "after_commit", _on_commit)
+            
             try:
                 yield session
             except Exception as e:
@@ -328,6 +572,9 @@ class DatabaseConnectionPool:
                 raise
             finally:
                 await session.close()
+        
+        if committed and self.read_replicas:
+            await self.record_write()
     
     @asynccontextmanager
     async def get_raw_connection(self, role: Optional[DatabaseRole] = None):
@@ -350,10 +597,11 @@ class DatabaseConnectionPool:
         self, 
         query: str, 
         params: Optional[Dict[str, Any]] = None,
-        query_type: QueryType = QueryType.READ
+        query_type: QueryType = QueryType.READ,
+        max_staleness: Optional[float] = None
     ) -> List[Dict[str, Any]]:
         """Execute raw SQL query with automatic routing"""
-        role = self._route_query(query_type)
+        role = await self._resolve_role(query_type, max_staleness)
         start_time = time.time()
         
         try:
@@ -362,9 +610,12 @@ class DatabaseConnectionPool:
                     result = await conn.fetch(query, *params.values())
                 else:
                     result = await conn.fetch(query)
-                
-                # Convert to list of dicts
-                return [dict(row) for row in result]
+            
+            if query_type == QueryType.WRITE and self.read_replicas:
+                await self.record_write()
+            
+            # Convert to list of dicts
+            return [dict(row) for row in result]
                 
         except Exception as e:
             logger.error("Query execution failed", 
@@ -380,10 +631,11 @@ class DatabaseConnectionPool:
         self, 
         query: str, 
         params: Optional[Dict[str, Any]] = None,
-        query_type: QueryType = QueryType.READ
+        query_type: QueryType = QueryType.READ,
+        max_staleness: Optional[float] = None
     ) -> Any:
         """Execute query and return single value"""
-        role = self._route_query(query_type)
+        role = await self._resolve_role(query_type, max_staleness)
         start_time = time.time()
         
         try:
@@ -411,7 +663,7 @@ class DatabaseConnectionPool:
         query_type: QueryType = QueryType.WRITE
     ) -> List[Any]:
         """Execute multiple queries in a transaction"""
-        role = self._route_query(query_type)
+        role = await self._resolve_role(query_type)
         start_time = time.time()
         results = []
         
@@ -424,8 +676,11 @@ class DatabaseConnectionPool:
                         else:
                             result = await conn.fetch(query)
                         results.append([dict(row) for row in result])
-                
-                return results
+            
+            if query_type == QueryType.WRITE and self.read_replicas:
+                await self.record_write()
+            
+            return results
                 
         except Exception as e:
             logger.error("Transaction execution failed", 
@@ -456,7 +711,10 @@ class DatabaseConnectionPool:
                 "avg_query_time": metrics.get_avg_query_time(),
                 "connection_errors": metrics.connection_errors,
                 "health_status": metrics.health_status,
-                "last_health_check": metrics.last_health_check
+                "last_health_check": metrics.last_health_check,
+                "latency_ewma": metrics.latency_ewma,
+                "replication_lag": metrics.replication_lag,
+                "replay_lsn": format_lsn(metrics.replay_lsn) if metrics.replay_lsn is not None else None
             }
         
         return stats
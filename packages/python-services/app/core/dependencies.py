@@ -49,6 +49,15 @@ async def get_redis_client() -> Redis:
     return _redis_client
 
 
+async def close_redis_client() -> None:
+    """Close the global Redis client; the next use opens a new one."""
+    global _redis_client
+
+    if _redis_client is not None:
+        client, _redis_client = _redis_client, None
+        await client.aclose()
+
+
 async def get_settings_dependency():
     """Get application settings."""
     return get_settings()
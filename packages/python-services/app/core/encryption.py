@@ -3,12 +3,14 @@ Data encryption service for sensitive data at rest and in transit.
 
 This module provides comprehensive encryption capabilities including:
 - Field-level encryption for PII data
+- Compact binary AEAD envelopes for database columns
 - Key management and rotation
 - TLS 1.3 configuration
 - Secure data handling utilities
 """
 
 import base64
+import json
 import os
 import secrets
 from datetime import datetime, timedelta
@@ -20,6 +22,8 @@ from cryptography.fernet import Fernet, MultiFernet
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 from pydantic import BaseModel, Field
@@ -29,6 +33,30 @@ from .config import get_settings
 logger = structlog.get_logger()
 settings = get_settings()
 
+# Compact field envelope layout:
+#   version (1 byte) | key index (1 byte) | nonce (12 bytes) | AEAD ciphertext + tag
+# The version byte also selects the AEAD algorithm. The two header bytes are
+# authenticated as associated data so they cannot be swapped undetected.
+ENVELOPE_VERSION_AESGCM = 0x01
+ENVELOPE_VERSION_CHACHA20 = 0x02
+ENVELOPE_NONCE_SIZE = 12
+ENVELOPE_HEADER_SIZE = 2
+ENVELOPE_MIN_SIZE = ENVELOPE_HEADER_SIZE + ENVELOPE_NONCE_SIZE + 16
+
+_ENVELOPE_ALGORITHMS = {
+    ENVELOPE_VERSION_AESGCM: AESGCM,
+    ENVELOPE_VERSION_CHACHA20: ChaCha20Poly1305,
+}
+_ENVELOPE_VERSIONS_BY_NAME = {
+    "aes-gcm": ENVELOPE_VERSION_AESGCM,
+    "chacha20-poly1305": ENVELOPE_VERSION_CHACHA20,
+}
+
+
+def is_compact_envelope(value: Union[bytes, bytearray, memoryview]) -> bool:
+    """Return True if ``value`` looks like a compact binary field envelope."""
+    return len(value) >= ENVELOPE_MIN_SIZE and value[0] in _ENVELOPE_ALGORITHMS
+
 
 class EncryptionKeyMetadata(BaseModel):
     """Metadata for encryption keys."""
@@ -65,6 +93,11 @@ class EncryptionService:
         self.logger = logger.bind(service="encryption")
         self._keys: Dict[str, Fernet] = {}
         self._key_metadata: Dict[str, EncryptionKeyMetadata] = {}
+        # Raw AEAD keys and the one-byte indexes used in compact envelopes
+        self._aead_keys: Dict[str, bytes] = {}
+        self._key_indexes: Dict[str, int] = {}
+        self._key_ids_by_index: Dict[int, str] = {}
+        self._aead_ciphers: Dict[tuple, Union[AESGCM, ChaCha20Poly1305]] = {}
         self._master_key = self._get_or_create_master_key()
         self._initialize_default_keys()
     
@@ -146,6 +179,7 @@ class EncryptionService:
             
             # Store key and metadata
             self._keys[key_id] = fernet
+            self._register_aead_key(key_id, fernet_key)
             
             expires_at = None
             if expires_days:
@@ -235,6 +269,112 @@ class EncryptionService:
                             key_id=encrypted_field.key_id, error=str(e))
             raise
     
+    def _register_aead_key(self, key_id: str, fernet_key: bytes) -> None:
+        """Derive the AEAD key for compact envelopes and assign its index byte."""
+        if len(self._key_indexes) >= 255:
+            raise ValueError("Compact envelope key index space exhausted")
+        
+        hkdf = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b"givemejobs-field-envelope-v1",
+        )
+        self._aead_keys[key_id] = hkdf.derive(base64.urlsafe_b64decode(fernet_key))
+        
+        key_index = len(self._key_indexes) + 1
+        self._key_indexes[key_id] = key_index
+        self._key_ids_by_index[key_index] = key_id
+    
+    def _get_aead_cipher(self, key_id: str, version: int) -> Union[AESGCM, ChaCha20Poly1305]:
+        """Get a cached AEAD cipher instance for a key and envelope version."""
+        cache_key = (key_id, version)
+        cipher = self._aead_ciphers.get(cache_key)
+        if cipher is None:
+            cipher = _ENVELOPE_ALGORITHMS[version](self._aead_keys[key_id])
+            self._aead_ciphers[cache_key] = cipher
+        return cipher
+    
+    def encrypt_field_compact(
+        self,
+        data: Union[str, bytes, int, float],
+        key_id: Optional[str] = None,
+        algorithm: str = "aes-gcm"
+    ) -> bytes:
+        """
+        Encrypt a single field into a compact binary envelope.
+        
+        The envelope is suitable for ``bytea`` columns and adds only 30 bytes
+        of overhead (header, nonce and tag) to the plaintext.
+        """
+        if key_id is None:
+            key_id = "pii_default_v1"
+        
+        if key_id not in self._aead_keys:
+            raise ValueError(f"Key '{key_id}' not found")
+        
+        version = _ENVELOPE_VERSIONS_BY_NAME.get(algorithm)
+        if version is None:
+            raise ValueError(f"Unsupported envelope algorithm: {algorithm}")
+        
+        if isinstance(data, bytes):
+            data_bytes = data
+        else:
+            data_bytes = str(data).encode('utf-8')
+        
+        header = bytes((version, self._key_indexes[key_id]))
+        nonce = os.urandom(ENVELOPE_NONCE_SIZE)
+        ciphertext = self._get_aead_cipher(key_id, version).encrypt(nonce, data_bytes, header)
+        return header + nonce + ciphertext
+    
+    def get_envelope_key_id(self, envelope: Union[bytes, bytearray, memoryview]) -> str:
+        """Get the key ID a compact envelope was encrypted with."""
+        if not is_compact_envelope(envelope):
+            raise ValueError("Value is not a compact field envelope")
+        
+        key_id = self._key_ids_by_index.get(envelope[1])
+        if key_id is None:
+            raise ValueError(f"Unknown envelope key index: {envelope[1]}")
+        return key_id
+    
+    def decrypt_field_compact(self, envelope: Union[bytes, bytearray, memoryview]) -> str:
+        """Decrypt a compact binary envelope."""
+        envelope = bytes(envelope)
+        key_id = self.get_envelope_key_id(envelope)
+        
+        header = envelope[:ENVELOPE_HEADER_SIZE]
+        nonce = envelope[ENVELOPE_HEADER_SIZE:ENVELOPE_HEADER_SIZE + ENVELOPE_NONCE_SIZE]
+        ciphertext = envelope[ENVELOPE_HEADER_SIZE + ENVELOPE_NONCE_SIZE:]
+        
+        try:
+            plaintext = self._get_aead_cipher(key_id, envelope[0]).decrypt(nonce, ciphertext, header)
+        except Exception as e:
+            self.logger.error("Failed to decrypt field envelope", key_id=key_id, error=str(e))
+            raise
+        
+        return plaintext.decode('utf-8')
+    
+    def decrypt_stored_value(self, value: Union[bytes, bytearray, memoryview, str, Dict, EncryptedField]) -> str:
+        """
+        Decrypt a stored value in either the compact or the legacy format.
+        
+        Legacy values are ``EncryptedField`` instances, their ``model_dump``
+        dicts, or the JSON text written by ``EncryptedType``.
+        """
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            if is_compact_envelope(value):
+                return self.decrypt_field_compact(value)
+            value = bytes(value).decode('utf-8')
+        
+        if isinstance(value, EncryptedField):
+            return self.decrypt_field(value)
+        if isinstance(value, str):
+            value = json.loads(value)
+        if isinstance(value, dict) and 'encrypted_data' in value:
+            return self.decrypt_field(EncryptedField(**value))
+        
+        raise ValueError("Unrecognised encrypted value format")
+    
     def encrypt_pii_data(self, pii_data: Dict[str, Any]) -> Dict[str, EncryptedField]:
         """Encrypt PII data fields."""
         try:
@@ -302,6 +442,7 @@ class EncryptionService:
             
             # Store new key
             self._keys[new_key_id] = new_fernet
+            self._register_aead_key(new_key_id, new_fernet_key)
             
             # Update metadata
             self._key_metadata[new_key_id] = EncryptionKeyMetadata(
@@ -10,9 +10,10 @@ This module provides:
 """
 
 import asyncio
+import functools
 import secrets
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Set, Union
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, List, Optional, Union
 from uuid import UUID, uuid4
 
 import pyotp
@@ -29,11 +30,14 @@ from fastapi_users.authentication import (
 from fastapi_users.db import SQLAlchemyUserDatabase
 from fastapi_users.schemas import BaseUser, BaseUserCreate, BaseUserUpdate
 from pydantic import BaseModel, EmailStr, Field
+from sqlalchemy import bindparam, text
 from sqlalchemy.ext.asyncio import AsyncSession
 import structlog
 
 from .config import get_settings
 from .database import get_async_session
+from .permissions import PermissionResolver, get_permission_resolver, permission_bits
+from .session_store import get_session_store
 from ..models.database.user import User as UserTable, Role, Permission, UserRole
 
 logger = structlog.get_logger(__name__)
@@ -165,6 +169,7 @@ class EnhancedUserManager(UUIDIDMixin, BaseUserManager[UserTable, UUID]):
     def __init__(self, user_db: SQLAlchemyUserDatabase, redis_client: redis.Redis):
         super().__init__(user_db)
         self.redis_client = redis_client
+        self.session_store = get_session_store(redis_client)
     
     async def on_after_register(self, user: UserTable, request: Optional[Request] = None):
         """Actions after user registration."""
@@ -220,55 +225,30 @@ class EnhancedUserManager(UUIDIDMixin, BaseUserManager[UserTable, UUID]):
     
     async def create_session(self, user: UserTable, request: Request) -> str:
         """Create user session."""
-        session_id = str(uuid4())
-        
-        session_data = {
-            "user_id": str(user.id),
-            "ip_address": request.client.host if request.client else "unknown",
-            "user_agent": request.headers.get("user-agent", "unknown"),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "last_activity": datetime.now(timezone.utc).isoformat(),
-            "expires_at": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat()
-        }
-        
-        # Store session in Redis
-        await self.redis_client.setex(
-            f"session:{session_id}",
-            7 * 24 * 3600,  # 7 days
-            str(session_data)
+        record = await self.session_store.create(
+            user_id=str(user.id),
+            ip_address=request.client.host if request.client else "unknown",
+            user_agent=request.headers.get("user-agent", "unknown")
         )
-        
-        # Add to user's active sessions
-        await self.redis_client.sadd(f"user_sessions:{user.id}", session_id)
-        
-        return session_id
+        return record.session_id
+    
+    async def validate_session(self, session_id: str) -> Optional[SessionInfo]:
+        """Return the session if it is active, extending its sliding expiry."""
+        record = await self.session_store.validate(session_id)
+        return SessionInfo(**record.as_dict()) if record else None
+    
+    async def get_user_sessions(self, user_id: UUID) -> List[SessionInfo]:
+        """List a user's active sessions, most recently used first."""
+        records = await self.session_store.list_user_sessions(str(user_id))
+        return [SessionInfo(**record.as_dict()) for record in records]
     
     async def invalidate_session(self, session_id: str):
         """Invalidate a specific session."""
-        session_data = await self.redis_client.get(f"session:{session_id}")
-        if session_data:
-            import json
-            session_info = json.loads(session_data)
-            user_id = session_info.get("user_id")
-            
-            # Remove from Redis
-            await self.redis_client.delete(f"session:{session_id}")
-            
-            # Remove from user's active sessions
-            if user_id:
-                await self.redis_client.srem(f"user_sessions:{user_id}", session_id)
+        await self.session_store.revoke(session_id)
     
     async def invalidate_all_user_sessions(self, user_id: UUID):
         """Invalidate all sessions for a user."""
-        session_ids = await self.redis_client.smembers(f"user_sessions:{user_id}")
-        
-        if session_ids:
-            # Delete all sessions
-            session_keys = [f"session:{sid.decode()}" for sid in session_ids]
-            await self.redis_client.delete(*session_keys)
-            
-            # Clear user sessions set
-            await self.redis_client.delete(f"user_sessions:{user_id}")
+        await self.session_store.revoke_all(str(user_id))
 
 
 class MFAManager:
@@ -394,8 +374,9 @@ class MFAManager:
 class RBACManager:
     """Role-based access control manager."""
     
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, resolver: Optional[PermissionResolver] = None):
         self.session = session
+        self.resolver = resolver or get_permission_resolver()
     
     async def create_permission(self, permission_data: PermissionCreate) -> Permission:
         """Create a new permission."""
@@ -425,10 +406,14 @@ class RBACManager:
         await self.session.flush()
         
         # Add permissions to role
-        for perm_name in role_data.permissions:
-            # This would typically query for existing permissions
-            # For now, we'll simulate the relationship
-            pass
+        if role_data.permissions:
+            await self.session.execute(
+                text("""
+                    INSERT INTO role_permissions (role_id, permission_id)
+                    SELECT :role_id, id FROM permissions WHERE name IN :names
+                """).bindparams(bindparam("names", expanding=True)),
+                {"role_id": role.id, "names": list(role_data.permissions)}
+            )
         
         await self.session.commit()
         await self.session.refresh(role)
@@ -444,22 +429,34 @@ class RBACManager:
         
         self.session.add(user_role)
         await self.session.commit()
+        await self.resolver.invalidate_user(user_id)
     
     async def remove_role_from_user(self, user_id: UUID, role_id: UUID):
         """Remove role from user."""
-        # This would typically query and delete the UserRole relationship
-        pass
+        await self.session.execute(
+            text("DELETE FROM user_roles WHERE user_id = :user_id AND role_id = :role_id"),
+            {"user_id": user_id, "role_id": role_id}
+        )
+        await self.session.commit()
+        await self.resolver.invalidate_user(user_id)
+    
+    async def invalidate_role_permissions(self):
+        """Invalidate all compiled permission sets after a role's permissions change."""
+        await self.resolver.invalidate_all()
     
-    async def get_user_permissions(self, user_id: UUID) -> Set[str]:
+    async def get_user_permissions(self, user_id: UUID) -> FrozenSet[str]:
         """Get all permissions for a user."""
-        # This would typically join User -> UserRole -> Role -> RolePermission -> Permission
-        # For now, return a simulated set
-        return {"user:read", "user:update", "job:read", "application:create"}
+        return (await self.resolver.resolve(self.session, user_id)).permissions
     
     async def check_permission(self, user_id: UUID, permission: str) -> bool:
         """Check if user has specific permission."""
-        user_permissions = await self.get_user_permissions(user_id)
-        return permission in user_permissions
+        return await self.check_permissions(user_id, permission)
+    
+    async def check_permissions(self, user_id: UUID, *permissions: str) -> bool:
+        """Check if user has all of the given permissions."""
+        return await self.resolver.has_permissions(
+            self.session, user_id, self.resolver.compile(*permissions)
+        )
 
 
 class RefreshTokenManager:
@@ -529,9 +526,15 @@ class RefreshTokenManager:
 
 
 # Dependency functions
+_redis_client: Optional[redis.Redis] = None
+
+
 async def get_redis_client() -> redis.Redis:
-    """Get Redis client for authentication."""
-    return redis.from_url(settings.redis.url)
+    """Get the shared Redis client for authentication."""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(settings.redis.url)
+    return _redis_client
 
 
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
@@ -544,7 +547,10 @@ async def get_user_manager(
     redis_client: redis.Redis = Depends(get_redis_client)
 ):
     """Get user manager."""
-    yield EnhancedUserManager(user_db, redis_client)
+    user_manager = EnhancedUserManager(user_db, redis_client)
+    # Cached session validation is only trusted while revocations are received
+    await user_manager.session_store.start_revocation_listener()
+    yield user_manager
 
 
 async def get_mfa_manager(redis_client: redis.Redis = Depends(get_redis_client)):
@@ -552,9 +558,12 @@ async def get_mfa_manager(redis_client: redis.Redis = Depends(get_redis_client))
     yield MFAManager(redis_client)
 
 
-async def get_rbac_manager(session: AsyncSession = Depends(get_async_session)):
+async def get_rbac_manager(
+    session: AsyncSession = Depends(get_async_session),
+    redis_client: redis.Redis = Depends(get_redis_client)
+):
     """Get RBAC manager."""
-    yield RBACManager(session)
+    yield RBACManager(session, get_permission_resolver(redis_client))
 
 
 async def get_refresh_token_manager(redis_client: redis.Redis = Depends(get_redis_client)):
@@ -606,14 +615,20 @@ current_superuser = fastapi_users.current_user(active=True, superuser=True)
 # Permission decorators
 def require_permissions(*permissions: str):
     """Decorator to require specific permissions."""
+    # Compiled once; each request is a single bitmask test
+    required_mask = permission_bits.mask(permissions)
+    
     def decorator(func):
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            # Extract user from kwargs
+            # Extract user and RBAC manager from kwargs
             user = None
+            rbac_manager = None
             for key, value in kwargs.items():
-                if isinstance(value, UserTable):
+                if isinstance(value, UserTable) and user is None:
                     user = value
-                    break
+                elif isinstance(value, RBACManager):
+                    rbac_manager = value
             
             if not user:
                 raise HTTPException(
@@ -623,15 +638,18 @@ def require_permissions(*permissions: str):
             
             # Check permissions
             session = kwargs.get('session') or kwargs.get('db')
+            if rbac_manager is not None:
+                resolver, session = rbac_manager.resolver, rbac_manager.session
+            elif session:
+                resolver = get_permission_resolver(await get_redis_client())
+            
             if session:
-                rbac_manager = RBACManager(session)
-                
-                for permission in permissions:
-                    if not await rbac_manager.check_permission(user.id, permission):
-                        raise HTTPException(
-                            status_code=status.HTTP_403_FORBIDDEN,
-                            detail=f"Missing required permission: {permission}"
-                        )
+                granted = await resolver.resolve(session, user.id)
+                if not granted.has_all(required_mask):
+                    raise HTTPException(
+                        status_code=status.HTTP_403_FORBIDDEN,
+                        detail=f"Missing required permission: {', '.join(sorted(granted.missing(permissions)))}"
+                    )
             
             return await func(*args, **kwargs)
         return wrapper
@@ -0,0 +1,459 @@
+"""
+CIDR-aware IP reputation index.
+
+Blocklists (single addresses or CIDR ranges, IPv4 and IPv6) are compiled into
+a path-compressed binary (Patricia) trie over the 128-bit address space; IPv4
+prefixes live under the IPv4-mapped range ``::ffff:0:0/96``. The trie is
+flattened into fixed-width column arrays in one file that every worker
+memory-maps read-only, so all processes share a single copy in the page cache.
+
+A lookup visits at most one node per prefix bit and returns the most specific
+matching prefix, so a narrower allow entry can override a wider block.
+Rebuilds write a new file and atomically rename it over the old one; readers
+notice the new inode and swap their mapping without blocking lookups.
+"""
+
+import asyncio
+import fcntl
+import json
+import mmap
+import os
+import socket
+import struct
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+MAGIC = b"IPRTRIE1"
+HEADER = struct.Struct("<8sII")  # magic, node count, metadata length
+NO_SOURCE = 0xFFFF
+ADDRESS_BITS = 128
+IPV4_MAPPED = 0xFFFF << 32
+IPV4_OFFSET = 96
+
+# Column layout: (name, memoryview format, item size)
+COLUMNS = (
+    ("hi", "Q", 8),
+    ("lo", "Q", 8),
+    ("child0", "i", 4),
+    ("child1", "i", 4),
+    ("score", "f", 4),
+    ("source", "H", 2),
+    ("prefix_length", "B", 1),
+)
+BYTES_PER_NODE = sum(size for _, _, size in COLUMNS)
+
+# Ranges the previous per-event heuristic treated as reputable
+BUILTIN_REPUTATION = (
+    ("10.0.0.0/8", 0.8),
+    ("172.16.0.0/12", 0.8),
+    ("192.168.0.0/16", 0.8),
+    ("8.8.0.0/16", 0.9),
+    ("1.1.0.0/16", 0.9),
+)
+BUILTIN_SOURCE = "builtin"
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def address_key(ip: str) -> Tuple[int, bool]:
+    """128-bit trie key for an address and whether it is IPv4."""
+    try:
+        return IPV4_MAPPED | int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big"), True
+    except OSError:
+        pass
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), "big"), False
+    except OSError:
+        raise ValueError(f"Invalid IP address: {ip!r}") from None
+
+
+def network_key(network: str) -> Tuple[int, int]:
+    """Masked 128-bit key and prefix length for an address or CIDR range."""
+    address, _, length = network.strip().partition("/")
+    key, is_v4 = address_key(address)
+    max_length = 32 if is_v4 else ADDRESS_BITS
+    prefix_length = int(length) if length else max_length
+    if not 0 <= prefix_length <= max_length:
+        raise ValueError(f"Invalid prefix length: {network!r}")
+    if is_v4:
+        prefix_length += IPV4_OFFSET
+    return _mask(key, prefix_length), prefix_length
+
+
+def _mask(key: int, prefix_length: int) -> int:
+    shift = ADDRESS_BITS - prefix_length
+    return key >> shift << shift
+
+
+def parse_blocklist(lines: Iterable[str]) -> Iterator[str]:
+    """Addresses and CIDR ranges from a blocklist (``#`` and ``;`` start comments)."""
+    for line in lines:
+        entry = line.split("#", 1)[0].split(";", 1)[0].strip()
+        if entry:
+            yield entry.split()[0]
+
+
+class IndexBuilder:
+    """Builds the trie in plain Python lists and serialises it to the file format."""
+
+    def __init__(self):
+        self.keys: List[int] = [0]
+        self.prefix_lengths: List[int] = [0]
+        self.child0: List[int] = [-1]
+        self.child1: List[int] = [-1]
+        self.scores: List[float] = [0.0]
+        self.source_ids: List[int] = [NO_SOURCE]
+        self.sources: List[str] = []
+        self._source_index: Dict[str, int] = {}
+        self.prefix_count = 0
+
+    def _new_node(self, key: int, prefix_length: int) -> int:
+        self.keys.append(key)
+        self.prefix_lengths.append(prefix_length)
+        self.child0.append(-1)
+        self.child1.append(-1)
+        self.scores.append(0.0)
+        self.source_ids.append(NO_SOURCE)
+        return len(self.keys) - 1
+
+    def _set_value(self, node: int, score: float, source_id: int) -> None:
+        # The same prefix listed twice keeps its worst reputation
+        if self.source_ids[node] == NO_SOURCE:
+            self.prefix_count += 1
+        elif self.scores[node] <= score:
+            return
+        self.scores[node] = score
+        self.source_ids[node] = source_id
+
+    def _source_id(self, source: str) -> int:
+        if source not in self._source_index:
+            if len(self.sources) >= NO_SOURCE:
+                raise ValueError("Too many reputation sources")
+            self._source_index[source] = len(self.sources)
+            self.sources.append(source)
+        return self._source_index[source]
+
+    def add(self, network: str, score: float, source: str) -> None:
+        key, prefix_length = network_key(network)
+        source_id = self._source_id(source)
+        node = 0
+        while True:
+            # Invariant: the node's prefix is a prefix of the inserted one
+            if self.prefix_lengths[node] == prefix_length:
+                self._set_value(node, score, source_id)
+                return
+
+            children = self.child1 if (key >> (127 - self.prefix_lengths[node])) & 1 else self.child0
+            child = children[node]
+            if child < 0:
+                leaf = self._new_node(key, prefix_length)
+                self._set_value(leaf, score, source_id)
+                children[node] = leaf
+                return
+
+            child_length = self.prefix_lengths[child]
+            common = min(ADDRESS_BITS - (self.keys[child] ^ key).bit_length(), child_length, prefix_length)
+            if common == child_length:
+                node = child
+                continue
+
+            # Split the compressed edge at the first differing bit
+            branch = self._new_node(_mask(key, common), common)
+            child_bit = (self.keys[child] >> (127 - common)) & 1
+            (self.child1 if child_bit else self.child0)[branch] = child
+            if common == prefix_length:
+                self._set_value(branch, score, source_id)
+            else:
+                leaf = self._new_node(key, prefix_length)
+                self._set_value(leaf, score, source_id)
+                (self.child0 if child_bit else self.child1)[branch] = leaf
+            children[node] = branch
+            return
+
+    def add_blocklist(self, lines: Iterable[str], source: str, score: float) -> int:
+        """Add every entry of a blocklist; returns the number of invalid lines skipped."""
+        skipped = 0
+        for entry in parse_blocklist(lines):
+            try:
+                self.add(entry, score, source)
+            except ValueError:
+                skipped += 1
+        return skipped
+
+    def to_bytes(self) -> bytes:
+        node_count = len(self.keys)
+        metadata = json.dumps({
+            "sources": self.sources,
+            "prefixes": self.prefix_count,
+            "built_at": int(time.time()),
+        }).encode()
+
+        mask64 = (1 << 64) - 1
+        columns = {
+            "hi": [key >> 64 for key in self.keys],
+            "lo": [key & mask64 for key in self.keys],
+            "child0": self.child0,
+            "child1": self.child1,
+            "score": self.scores,
+            "source": self.source_ids,
+            "prefix_length": self.prefix_lengths,
+        }
+
+        buffer = bytearray(HEADER.pack(MAGIC, node_count, len(metadata)) + metadata)
+        for name, fmt, _ in COLUMNS:
+            buffer.extend(b"\0" * (_align(len(buffer)) - len(buffer)))
+            buffer.extend(struct.pack(f"<{node_count}{fmt}", *columns[name]))
+        return bytes(buffer)
+
+    def write(self, path) -> Path:
+        """Write the index atomically (readers see the old or the new file, never a mix)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(self.to_bytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return path
+
+
+@dataclass(frozen=True)
+class ReputationMatch:
+    """Most specific prefix matching an address."""
+    score: float
+    source: str
+    prefix_length: int
+
+
+class IPReputationIndex:
+    """Read-only view over a compiled index (an mmap or any bytes-like buffer)."""
+
+    def __init__(self, buffer, mapping: Optional[mmap.mmap] = None):
+        magic, node_count, metadata_length = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an IP reputation index")
+        offset = HEADER.size
+        metadata = json.loads(bytes(buffer[offset:offset + metadata_length]))
+        offset += metadata_length
+
+        view = memoryview(buffer)
+        columns = {}
+        for name, fmt, size in COLUMNS:
+            offset = _align(offset)
+            columns[name] = view[offset:offset + node_count * size].cast(fmt)
+            offset += node_count * size
+
+        self._view = view
+        self._mapping = mapping
+        self._columns = columns
+        self.node_count = node_count
+        self.nbytes = offset
+        self.sources: List[str] = metadata["sources"]
+        self.prefix_count: int = metadata["prefixes"]
+        self.built_at: int = metadata.get("built_at", 0)
+
+    @classmethod
+    def open(cls, path) -> "IPReputationIndex":
+        with open(path, "rb") as handle:
+            mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapping, mapping)
+
+    @classmethod
+    def from_builder(cls, builder: IndexBuilder) -> "IPReputationIndex":
+        return cls(builder.to_bytes())
+
+    def lookup(self, ip: str) -> Optional[ReputationMatch]:
+        """Most specific matching prefix; raises ``ValueError`` for invalid addresses."""
+        key, is_v4 = address_key(ip)
+        columns = self._columns
+        his, los, prefix_lengths, sources = columns["hi"], columns["lo"], columns["prefix_length"], columns["source"]
+        child0, child1 = columns["child0"], columns["child1"]
+
+        # Follow the key's bits without comparing skipped bits, collecting
+        # prefixes on the way; the path only diverges from the key after its
+        # last true match, so the deepest candidate that matches is the answer.
+        candidates = []
+        node = 0
+        while node >= 0:
+            prefix_length = prefix_lengths[node]
+            if sources[node] != NO_SOURCE:
+                candidates.append(node)
+            if prefix_length == ADDRESS_BITS:
+                break
+            node = (child1 if (key >> (127 - prefix_length)) & 1 else child0)[node]
+
+        best = -1
+        for node in reversed(candidates):
+            prefix_length = prefix_lengths[node]
+            if not prefix_length or not (key ^ ((his[node] << 64) | los[node])) >> (ADDRESS_BITS - prefix_length):
+                best = node
+                break
+        if best < 0:
+            return None
+        prefix_length = prefix_lengths[best]
+        return ReputationMatch(
+            score=columns["score"][best],
+            source=self.sources[sources[best]],
+            prefix_length=prefix_length - IPV4_OFFSET if is_v4 and prefix_length >= IPV4_OFFSET else prefix_length,
+        )
+
+    def close(self) -> None:
+        for column in self._columns.values():
+            column.release()
+        self._view.release()
+        if self._mapping is not None:
+            self._mapping.close()
+
+
+def build_index(
+    blocklists: Sequence[str],
+    output,
+    score: float = 0.1,
+    include_builtin: bool = True
+) -> Path:
+    """Compile blocklist files (source name = file stem) into an index file."""
+    builder = IndexBuilder()
+    if include_builtin:
+        for network, builtin_score in BUILTIN_REPUTATION:
+            builder.add(network, builtin_score, BUILTIN_SOURCE)
+    for blocklist in blocklists:
+        with open(blocklist, encoding="utf-8", errors="replace") as handle:
+            skipped = builder.add_blocklist(handle, Path(blocklist).stem, score)
+        if skipped:
+            logger.warning("Skipped invalid blocklist entries", blocklist=str(blocklist), skipped=skipped)
+    path = builder.write(output)
+    logger.info("IP reputation index built", prefixes=builder.prefix_count, nodes=len(builder.keys))
+    return path
+
+
+class IPReputationService:
+    """
+    Hot-swappable index shared by every worker through the same file.
+
+    ``refresh`` rebuilds the file when a blocklist is newer than it (one
+    worker at a time, under a file lock) and remaps it when its inode
+    changed. Lookups always see a complete index.
+    """
+
+    def __init__(
+        self,
+        index_path,
+        blocklists: Sequence[str] = (),
+        score: float = 0.1,
+        reload_interval: float = 60.0
+    ):
+        self.index_path = Path(index_path)
+        self.blocklists = list(blocklists)
+        self.score = score
+        self.reload_interval = reload_interval
+        self.index: Optional[IPReputationIndex] = None
+        self._identity: Optional[Tuple[int, int, int]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def lookup(self, ip: str) -> Optional[ReputationMatch]:
+        index = self.index
+        if index is None:
+            return None
+        try:
+            return index.lookup(ip)
+        except ValueError:
+            return None
+
+    def _is_stale(self) -> bool:
+        try:
+            built = self.index_path.stat().st_mtime
+        except FileNotFoundError:
+            return True
+        return any(os.path.exists(path) and os.stat(path).st_mtime > built for path in self.blocklists)
+
+    def rebuild_if_stale(self) -> bool:
+        if not self._is_stale():
+            return False
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{self.index_path}.lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False  # another worker is building; pick it up on the next refresh
+            try:
+                if not self._is_stale():
+                    return False
+                build_index([path for path in self.blocklists if os.path.exists(path)], self.index_path, self.score)
+                return True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def reload(self) -> bool:
+        """Map the index file if it changed since it was last mapped."""
+        try:
+            stat = self.index_path.stat()
+        except FileNotFoundError:
+            return False
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity == self._identity:
+            return False
+        index = IPReputationIndex.open(self.index_path)
+        # Single reference swap; the previous mapping is released once unreferenced
+        self.index, self._identity = index, identity
+        logger.info("IP reputation index loaded", prefixes=index.prefix_count, nodes=index.node_count)
+        return True
+
+    def refresh(self) -> bool:
+        self.rebuild_if_stale()
+        return self.reload()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.error("IP reputation refresh failed", error=str(e))
+            await asyncio.sleep(self.reload_interval)
+
+
+_service: Optional[IPReputationService] = None
+
+
+def get_ip_reputation_service() -> IPReputationService:
+    """Process-wide IP reputation service, configured from settings."""
+    global _service
+    if _service is None:
+        from .config import get_settings
+
+        security = get_settings().security
+        _service = IPReputationService(
+            security.ip_reputation_index_path,
+            blocklists=security.ip_reputation_blocklists,
+            score=security.ip_reputation_blocklist_score,
+            reload_interval=security.ip_reputation_reload_seconds,
+        )
+    return _service
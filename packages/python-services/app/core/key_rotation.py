@@ -0,0 +1,647 @@
+"""
+Online, resumable re-encryption of database columns after a key rotation.
+
+The primary key range of a table is split into contiguous slices, one per
+worker. Each worker owns its own database connection and walks its slice with
+keyset pagination (``pk > last_pk ORDER BY pk LIMIT n``), so concurrent writes
+never cause rows to be skipped. Decryption and re-encryption run in a thread
+pool, updates are written with a single ``UPDATE ... FROM (VALUES ...)`` per
+batch, and each batch commits together with its checkpoint row in
+``key_rotation_checkpoints`` so an interrupted rotation resumes where it
+stopped. Workers back off while replica replay lag exceeds a threshold.
+
+The update is a compare-and-swap: a row is only rewritten while it still holds
+the ciphertext that was read, so a value the application writes between the
+read and the update is never overwritten. Rows that changed are read again
+from the cursor on the next batch.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from .config import get_settings
+
+logger = structlog.get_logger()
+
+CHECKPOINT_TABLE = "key_rotation_checkpoints"
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+MAX_THROTTLE_SLEEP = 30.0
+
+
+def _quote(identifier: str) -> str:
+    """Quote a SQL identifier taken from model metadata."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+@dataclass
+class RotationRange:
+    """Checkpointed slice of the primary key space handled by one worker."""
+
+    worker_index: int
+    range_start: Optional[str]
+    range_end: Optional[str]
+    last_pk: Optional[str]
+    total_rows: int = 0
+    rows_processed: int = 0
+    rows_updated: int = 0
+    status: str = STATUS_PENDING
+
+
+@dataclass
+class KeyRotationProgress:
+    """Progress of a table rotation job, aggregated over its workers."""
+
+    job_id: str
+    table_name: str
+    old_key_id: str
+    new_key_id: str
+    ranges: List[RotationRange] = field(default_factory=list)
+    status: str = STATUS_PENDING
+    started_at: float = field(default_factory=time.monotonic)
+    # Rows already processed before this run started (resumed jobs)
+    resumed_rows: int = 0
+    throttled_seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def total_rows(self) -> int:
+        return sum(r.total_rows for r in self.ranges)
+
+    @property
+    def rows_processed(self) -> int:
+        return sum(r.rows_processed for r in self.ranges)
+
+    @property
+    def rows_updated(self) -> int:
+        return sum(r.rows_updated for r in self.ranges)
+
+    @property
+    def percent_complete(self) -> float:
+        if self.status == STATUS_COMPLETED:
+            return 100.0
+        if not self.total_rows:
+            return 0.0
+        return min(100.0, 100.0 * self.rows_processed / self.total_rows)
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        processed_this_run = self.rows_processed - self.resumed_rows
+        if elapsed <= 0 or processed_this_run <= 0:
+            return 0.0
+        return processed_this_run / elapsed
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        if self.status == STATUS_COMPLETED:
+            return 0.0
+        rate = self.rows_per_second
+        if not rate:
+            return None
+        return max(0, self.total_rows - self.rows_processed) / rate
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "table_name": self.table_name,
+            "old_key_id": self.old_key_id,
+            "new_key_id": self.new_key_id,
+            "status": self.status,
+            "total_rows": self.total_rows,
+            "rows_processed": self.rows_processed,
+            "rows_updated": self.rows_updated,
+            "percent_complete": round(self.percent_complete, 2),
+            "rows_per_second": round(self.rows_per_second, 2),
+            "eta_seconds": round(self.eta_seconds, 1) if self.eta_seconds is not None else None,
+            "throttled_seconds": round(self.throttled_seconds, 1),
+            "workers": [
+                {
+                    "worker_index": r.worker_index,
+                    "status": r.status,
+                    "rows_processed": r.rows_processed,
+                    "rows_updated": r.rows_updated,
+                    "total_rows": r.total_rows,
+                }
+                for r in self.ranges
+            ],
+            "error": self.error,
+        }
+
+
+class OnlineKeyRotationEngine:
+    """Parallel, resumable key rotation for tables with encrypted columns."""
+
+    def __init__(
+        self,
+        rotation_service=None,
+        session_factory: Optional[Callable[[], Any]] = None,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_replication_lag: Optional[float] = None,
+        crypto_threads: Optional[int] = None,
+        lag_probe: Optional[Callable[[], Awaitable[float]]] = None,
+        lag_check_interval: float = 1.0
+    ):
+        settings = get_settings()
+
+        if rotation_service is None:
+            from .database_encryption import get_key_rotation_service
+            rotation_service = get_key_rotation_service()
+        if session_factory is None:
+            from .database import get_async_session
+            session_factory = get_async_session
+
+        self.rotation_service = rotation_service
+        self.session_factory = session_factory
+        self.workers = workers or settings.security.key_rotation_workers
+        self.batch_size = batch_size or settings.security.key_rotation_batch_size
+        self.max_replication_lag = (
+            max_replication_lag if max_replication_lag is not None
+            else settings.security.key_rotation_max_replication_lag
+        )
+        self.crypto_threads = crypto_threads or settings.security.key_rotation_crypto_threads
+        self.lag_probe = lag_probe or self._query_replication_lag
+        self.lag_check_interval = lag_check_interval
+        self.logger = logger.bind(service="online_key_rotation")
+
+        self._jobs: Dict[str, KeyRotationProgress] = {}
+        self._lag_lock = asyncio.Lock()
+        self._last_lag: float = 0.0
+        self._last_lag_check: float = 0.0
+
+    @staticmethod
+    def make_job_id(table_name: str, old_key_id: str, new_key_id: str) -> str:
+        """Deterministic job id so re-running the same rotation resumes it."""
+        return f"{table_name}:{old_key_id}:{new_key_id}"
+
+    def get_progress(self, job_id: str) -> Optional[KeyRotationProgress]:
+        """Get progress of a job running (or finished) in this process."""
+        return self._jobs.get(job_id)
+
+    async def load_progress(self, job_id: str) -> Optional[KeyRotationProgress]:
+        """Get progress of a job, falling back to its persisted checkpoints."""
+        progress = self._jobs.get(job_id)
+        if progress is not None:
+            return progress
+
+        async with self.session_factory() as session:
+            return await self._load_checkpoints(session, job_id)
+
+    async def rotate_table(
+        self,
+        model_class: Type[Any],
+        old_key_id: str,
+        new_key_id: str,
+        job_id: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        workers: Optional[int] = None
+    ) -> KeyRotationProgress:
+        """
+        Re-encrypt every encrypted column of ``model_class`` from ``old_key_id``
+        to ``new_key_id``.
+
+        ``workers`` only applies when a job is planned; resumed jobs keep the
+        ranges recorded in their checkpoints.
+
+        Returns:
+            Final progress of the job
+        """
+        from .database_encryption import ENCRYPTED_COLUMN_TYPES, EncryptedBinaryType
+
+        table = model_class.__table__
+        pk_columns = list(table.primary_key.columns)
+        if len(pk_columns) != 1:
+            raise ValueError(
+                f"Online key rotation requires a single-column primary key: {table.name}"
+            )
+        pk_column = pk_columns[0]
+
+        encrypted_columns = [
+            column for column in table.columns
+            if isinstance(column.type, ENCRYPTED_COLUMN_TYPES)
+        ]
+        job_id = job_id or self.make_job_id(table.name, old_key_id, new_key_id)
+
+        if not encrypted_columns:
+            self.logger.info("No encrypted columns found", model=model_class.__name__)
+            progress = KeyRotationProgress(job_id, table.name, old_key_id, new_key_id,
+                                           status=STATUS_COMPLETED)
+            self._jobs[job_id] = progress
+            return progress
+
+        plan = _TablePlan(
+            table_name=table.name,
+            pk_name=pk_column.name,
+            pk_sql_type=pk_column.type.compile(dialect=postgresql.dialect()),
+            column_names=[column.name for column in encrypted_columns],
+            column_sql_types=[
+                "BYTEA" if isinstance(column.type, EncryptedBinaryType) else "TEXT"
+                for column in encrypted_columns
+            ],
+            batch_size=batch_size or self.batch_size,
+        )
+
+        async with self.session_factory() as session:
+            progress = await self._load_checkpoints(session, job_id)
+            if progress is None:
+                progress = await self._plan_job(
+                    session, plan, job_id, old_key_id, new_key_id, workers or self.workers
+                )
+
+        progress.resumed_rows = progress.rows_processed
+        progress.started_at = time.monotonic()
+        progress.status = STATUS_RUNNING
+        progress.error = None
+        self._jobs[job_id] = progress
+
+        self.logger.info("Starting online key rotation",
+                         job_id=job_id,
+                         table=table.name,
+                         workers=len(progress.ranges),
+                         total_rows=progress.total_rows,
+                         resumed_rows=progress.resumed_rows)
+
+        executor = ThreadPoolExecutor(
+            max_workers=self.crypto_threads, thread_name_prefix="key-rotation"
+        )
+        try:
+            await asyncio.gather(*[
+                self._run_worker(plan, progress, rotation_range, executor)
+                for rotation_range in progress.ranges
+                if rotation_range.status != STATUS_COMPLETED
+            ])
+        except Exception as e:
+            progress.status = STATUS_FAILED
+            progress.error = str(e)
+            self.logger.error("Online key rotation failed", job_id=job_id, error=str(e))
+            raise
+        finally:
+            executor.shutdown(wait=False)
+
+        progress.status = STATUS_COMPLETED
+        self.logger.info("Completed online key rotation",
+                         job_id=job_id,
+                         rows_processed=progress.rows_processed,
+                         rows_updated=progress.rows_updated)
+        return progress
+
+    async def _plan_job(
+        self,
+        session,
+        plan: "_TablePlan",
+        job_id: str,
+        old_key_id: str,
+        new_key_id: str,
+        workers: int
+    ) -> KeyRotationProgress:
+        """Split the primary key space into per-worker ranges and persist them."""
+        pk = _quote(plan.pk_name)
+        result = await session.execute(text(f"""
+            SELECT bucket, pk::text AS range_end, row_count
+            FROM (
+                SELECT pk, bucket,
+                       LEAD(bucket) OVER (ORDER BY pk) AS next_bucket,
+                       COUNT(*) OVER (PARTITION BY bucket) AS row_count
+                FROM (
+                    SELECT {pk} AS pk, ntile(:workers) OVER (ORDER BY {pk}) AS bucket
+                    FROM {_quote(plan.table_name)}
+                ) buckets
+            ) bounds
+            WHERE next_bucket IS DISTINCT FROM bucket
+            ORDER BY bucket
+        """), {"workers": workers})
+        buckets = result.fetchall()
+
+        ranges = []
+        range_start = None
+        for index, (_, range_end, row_count) in enumerate(buckets):
+            is_last = index == len(buckets) - 1
+            ranges.append(RotationRange(
+                worker_index=index,
+                range_start=range_start,
+                # The last range is open-ended so rows inserted meanwhile are covered
+                range_end=None if is_last else range_end,
+                last_pk=range_start,
+                total_rows=int(row_count),
+            ))
+            range_start = range_end
+
+        if not ranges:
+            ranges.append(RotationRange(worker_index=0, range_start=None, range_end=None, last_pk=None))
+
+        for rotation_range in ranges:
+            await session.execute(text(f"""
+                INSERT INTO {CHECKPOINT_TABLE} (
+                    job_id, worker_index, table_name, old_key_id, new_key_id,
+                    range_start, range_end, last_pk, total_rows,
+                    rows_processed, rows_updated, status, created_at, updated_at
+                ) VALUES (
+                    :job_id, :worker_index, :table_name, :old_key_id, :new_key_id,
+                    :range_start, :range_end, :last_pk, :total_rows,
+                    0, 0, :status, NOW(), NOW()
+                )
+                ON CONFLICT (job_id, worker_index) DO NOTHING
+            """), {
+                "job_id": job_id,
+                "worker_index": rotation_range.worker_index,
+                "table_name": plan.table_name,
+                "old_key_id": old_key_id,
+                "new_key_id": new_key_id,
+                "range_start": rotation_range.range_start,
+                "range_end": rotation_range.range_end,
+                "last_pk": rotation_range.last_pk,
+                "total_rows": rotation_range.total_rows,
+                "status": STATUS_PENDING,
+            })
+        await session.commit()
+
+        return KeyRotationProgress(job_id, plan.table_name, old_key_id, new_key_id, ranges=ranges)
+
+    async def _load_checkpoints(self, session, job_id: str) -> Optional[KeyRotationProgress]:
+        """Rebuild job progress from persisted checkpoints."""
+        result = await session.execute(text(f"""
+            SELECT worker_index, table_name, old_key_id, new_key_id,
+                   range_start, range_end, last_pk, total_rows,
+                   rows_processed, rows_updated, status
+            FROM {CHECKPOINT_TABLE}
+            WHERE job_id = :job_id
+            ORDER BY worker_index
+        """), {"job_id": job_id})
+        rows = result.fetchall()
+        if not rows:
+            return None
+
+        ranges = [
+            RotationRange(
+                worker_index=row.worker_index,
+                range_start=row.range_start,
+                range_end=row.range_end,
+                last_pk=row.last_pk,
+                total_rows=row.total_rows or 0,
+                rows_processed=row.rows_processed or 0,
+                rows_updated=row.rows_updated or 0,
+                status=row.status,
+            )
+            for row in rows
+        ]
+        status = (
+            STATUS_COMPLETED if all(r.status == STATUS_COMPLETED for r in ranges)
+            else STATUS_PENDING
+        )
+        first = rows[0]
+        return KeyRotationProgress(
+            job_id=job_id,
+            table_name=first.table_name,
+            old_key_id=first.old_key_id,
+            new_key_id=first.new_key_id,
+            ranges=ranges,
+            status=status,
+        )
+
+    async def _run_worker(
+        self,
+        plan: "_TablePlan",
+        progress: KeyRotationProgress,
+        rotation_range: RotationRange,
+        executor: ThreadPoolExecutor
+    ) -> None:
+        """Walk one primary key range batch by batch on a dedicated connection."""
+        loop = asyncio.get_running_loop()
+        rotation_range.status = STATUS_RUNNING
+
+        async with self.session_factory() as session:
+            while True:
+                await self._throttle(progress)
+
+                result = await session.execute(
+                    plan.select_batch_sql(rotation_range.last_pk, rotation_range.range_end),
+                    {
+                        "last_pk": rotation_range.last_pk,
+                        "range_end": rotation_range.range_end,
+                        "limit": plan.batch_size,
+                    }
+                )
+                rows = result.fetchall()
+                done = len(rows) < plan.batch_size
+
+                updates = []
+                updated = set()
+                if rows:
+                    updates = await loop.run_in_executor(
+                        executor,
+                        self._reencrypt_rows,
+                        rows,
+                        plan.column_sql_types,
+                        progress.old_key_id,
+                        progress.new_key_id
+                    )
+                    if updates:
+                        statement, params = plan.update_batch(updates)
+                        result = await session.execute(statement, params)
+                        updated = {str(row[0]) for row in result.fetchall()}
+
+                # Rows written concurrently since the read are retried from the first of them
+                missed = {pk for pk, _, _ in updates} - updated
+                if missed:
+                    first_missed = next(i for i, row in enumerate(rows) if str(row[0]) in missed)
+                    rows = rows[:first_missed]
+                    done = False
+                    self.logger.info("Key rotation rows changed concurrently; retrying",
+                                     job_id=progress.job_id, rows=len(missed))
+                if rows:
+                    rotation_range.last_pk = str(rows[-1][0])
+
+                rotation_range.rows_processed += len(rows)
+                rotation_range.rows_updated += len(updated)
+                if done:
+                    rotation_range.status = STATUS_COMPLETED
+
+                # The checkpoint commits atomically with the batch it describes
+                await session.execute(text(f"""
+                    UPDATE {CHECKPOINT_TABLE}
+                    SET last_pk = :last_pk,
+                        rows_processed = :rows_processed,
+                        rows_updated = :rows_updated,
+                        status = :status,
+                        updated_at = NOW()
+                    WHERE job_id = :job_id AND worker_index = :worker_index
+                """), {
+                    "last_pk": rotation_range.last_pk,
+                    "rows_processed": rotation_range.rows_processed,
+                    "rows_updated": rotation_range.rows_updated,
+                    "status": rotation_range.status,
+                    "job_id": progress.job_id,
+                    "worker_index": rotation_range.worker_index,
+                })
+                await session.commit()
+
+                if done:
+                    break
+
+        self.logger.info("Key rotation worker finished",
+                         job_id=progress.job_id,
+                         worker_index=rotation_range.worker_index,
+                         rows_processed=rotation_range.rows_processed,
+                         rows_updated=rotation_range.rows_updated)
+
+    def _reencrypt_rows(
+        self,
+        rows: Sequence[Sequence[Any]],
+        column_sql_types: Sequence[str],
+        old_key_id: str,
+        new_key_id: str
+    ) -> List[Tuple[str, List[Any], List[Any]]]:
+        """
+        Re-encrypt the values of a batch that use ``old_key_id``.
+
+        Runs in the crypto thread pool. Returns ``(pk, values, read_values)``
+        for rows that changed; unchanged columns are ``None`` and left as they
+        are.
+        """
+        updates = []
+        for row in rows:
+            new_values = [
+                self.rotation_service.reencrypt_value(
+                    value, old_key_id, new_key_id, compact=sql_type == "BYTEA"
+                )
+                for value, sql_type in zip(row[1:], column_sql_types)
+            ]
+            if any(value is not None for value in new_values):
+                updates.append((str(row[0]), new_values, list(row[1:])))
+        return updates
+
+    async def _throttle(self, progress: KeyRotationProgress) -> None:
+        """Pause while replica replay lag is above the configured threshold."""
+        if not self.max_replication_lag:
+            return
+
+        delay = 0.5
+        while True:
+            lag = await self._current_lag()
+            if lag <= self.max_replication_lag:
+                return
+
+            self.logger.info("Throttling key rotation on replication lag",
+                             job_id=progress.job_id,
+                             lag_seconds=lag,
+                             max_lag_seconds=self.max_replication_lag)
+            await asyncio.sleep(delay)
+            progress.throttled_seconds += delay
+            delay = min(delay * 2, MAX_THROTTLE_SLEEP)
+
+    async def _current_lag(self) -> float:
+        """Replication lag in seconds, shared across workers for a short interval."""
+        async with self._lag_lock:
+            now = time.monotonic()
+            if now - self._last_lag_check >= self.lag_check_interval:
+                try:
+                    self._last_lag = float(await self.lag_probe() or 0.0)
+                except Exception as e:
+                    self.logger.warning("Failed to read replication lag", error=str(e))
+                    self._last_lag = 0.0
+                self._last_lag_check = now
+            return self._last_lag
+
+    async def _query_replication_lag(self) -> float:
+        """Maximum replay lag of the primary's streaming replicas."""
+        async with self.session_factory() as session:
+            result = await session.execute(text("""
+                SELECT COALESCE(MAX(EXTRACT(EPOCH FROM replay_lag)), 0)
+                FROM pg_stat_replication
+            """))
+            return float(result.scalar() or 0.0)
+
+
+@dataclass
+class _TablePlan:
+    """SQL builders for one table's encrypted columns."""
+
+    table_name: str
+    pk_name: str
+    pk_sql_type: str
+    column_names: List[str]
+    column_sql_types: List[str]
+    batch_size: int
+
+    def _pk_param(self, name: str) -> str:
+        # Round-trip through text so any primary key type can be checkpointed
+        return f"CAST(CAST(:{name} AS TEXT) AS {self.pk_sql_type})"
+
+    def select_batch_sql(self, last_pk: Optional[str], range_end: Optional[str]):
+        pk = _quote(self.pk_name)
+        conditions = []
+        if last_pk is not None:
+            conditions.append(f"{pk} > {self._pk_param('last_pk')}")
+        if range_end is not None:
+            conditions.append(f"{pk} <= {self._pk_param('range_end')}")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        columns = ", ".join(_quote(name) for name in self.column_names)
+
+        # Raw text SQL so stored ciphertext is read without type decoration
+        return text(f"""
+            SELECT {pk}, {columns}
+            FROM {_quote(self.table_name)}
+            {where}
+            ORDER BY {pk}
+            LIMIT :limit
+        """)
+
+    def update_batch(self, updates: Sequence[Tuple[str, Sequence[Any], Sequence[Any]]]):
+        """
+        Build one compare-and-swap ``UPDATE ... FROM (VALUES ...)`` statement
+        for a batch, returning the primary keys of the rows it rewrote.
+        """
+        params: Dict[str, Any] = {}
+        value_rows = []
+        for row_index, (pk_value, values, read_values) in enumerate(updates):
+            params[f"pk_{row_index}"] = pk_value
+            row_sql = [self._pk_param(f"pk_{row_index}")]
+            for prefix, row_values in (("v", values), ("o", read_values)):
+                for column_index, (value, sql_type) in enumerate(zip(row_values, self.column_sql_types)):
+                    name = f"{prefix}_{row_index}_{column_index}"
+                    params[name] = value
+                    row_sql.append(f"CAST(:{name} AS {sql_type})")
+            value_rows.append(f"({', '.join(row_sql)})")
+
+        count = len(self.column_names)
+        value_columns = ", ".join([f"c{i}" for i in range(count)] + [f"o{i}" for i in range(count)])
+        assignments = ", ".join(
+            f"{_quote(name)} = COALESCE(v.c{i}, t.{_quote(name)})"
+            for i, name in enumerate(self.column_names)
+        )
+        # Only rewrite rows whose re-encrypted columns still hold what was read
+        unchanged = " AND ".join(
+            f"(v.c{i} IS NULL OR t.{_quote(name)} IS NOT DISTINCT FROM v.o{i})"
+            for i, name in enumerate(self.column_names)
+        )
+        statement = text(f"""
+            UPDATE {_quote(self.table_name)} AS t
+            SET {assignments}
+            FROM (VALUES {', '.join(value_rows)}) AS v(pk, {value_columns})
+            WHERE t.{_quote(self.pk_name)} = v.pk AND {unchanged}
+            RETURNING t.{_quote(self.pk_name)}
+        """)
+        return statement, params
+
+
+_online_rotation_engine: Optional[OnlineKeyRotationEngine] = None
+
+
+def get_online_rotation_engine() -> OnlineKeyRotationEngine:
+    """Get global online key rotation engine instance."""
+    global _online_rotation_engine
+    if _online_rotation_engine is None:
+        _online_rotation_engine = OnlineKeyRotationEngine()
+    return _online_rotation_engine
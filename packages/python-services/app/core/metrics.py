@@ -1,12 +1,24 @@
 """
 Custom Prometheus metrics for auto-scaling and monitoring.
+
+Gauges are refreshed by independent collectors, each on its own interval and
+bounded by a timeout, so a slow dependency delays only its own gauges:
+
+- ``system``: process and cgroup usage from psutil and ``/sys/fs/cgroup``,
+  read in a worker thread
+- ``redis``: ``INFO`` from the application Redis
+- ``celery``: queue depths as pipelined ``LLEN`` calls on the broker, and
+  active workers from the heartbeats they record in the broker
+- ``business``: rates from the incremental activity counters
 """
 
 import asyncio
 import time
-from typing import Dict, Optional, List
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, List, Sequence
 from dataclasses import dataclass
 
+import psutil
 import structlog
 from prometheus_client import (
     Counter, Histogram, Gauge, Info, Enum,
@@ -17,9 +29,117 @@ from fastapi.responses import PlainTextResponse
 import redis.asyncio as redis
 import httpx
 
+from .activity_counters import APPLICATION_SUBMITTED, DOCUMENT_GENERATED, ActivityCounters
+
 logger = structlog.get_logger(__name__)
 
 
+WORKER_HEARTBEATS_KEY = "metrics:celery:workers"
+# Workers record a heartbeat at most this often...
+WORKER_HEARTBEAT_RECORD_INTERVAL = 10.0
+# ...and count as active while their latest one is this recent
+WORKER_ACTIVE_SECONDS = 30.0
+
+# kombu's Redis transport keeps each priority level of a queue in its own list
+BROKER_PRIORITY_SEPARATOR = "\x06\x16"
+BROKER_PRIORITY_STEPS = (0, 3, 6, 9)
+
+DEFAULT_COLLECTOR_INTERVALS = {"system": 15.0, "redis": 30.0, "celery": 15.0, "business": 60.0}
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+# cgroup v1 reports an unlimited memory limit as a page-rounded 2**63 - 1
+_CGROUP_V1_UNLIMITED = 1 << 62
+
+
+def is_redis_broker(broker_url: str) -> bool:
+    """Queue depths and heartbeats live in the broker only with the Redis transport."""
+    return broker_url.startswith(("redis://", "rediss://", "unix://"))
+
+
+def broker_queue_keys(queue: str) -> List[str]:
+    """Broker list keys holding a queue's messages, one per priority level."""
+    return [
+        queue if step == 0 else f"{queue}{BROKER_PRIORITY_SEPARATOR}{step}"
+        for step in BROKER_PRIORITY_STEPS
+    ]
+
+
+def record_worker_heartbeat(client, hostname: str, now: Optional[float] = None) -> None:
+    """Record a worker heartbeat with a synchronous Redis client (called from workers)."""
+    now = time.time() if now is None else now
+    with client.pipeline(transaction=False) as pipe:
+        pipe.zadd(WORKER_HEARTBEATS_KEY, {hostname: now})
+        pipe.zremrangebyscore(WORKER_HEARTBEATS_KEY, "-inf", now - 10 * WORKER_ACTIVE_SECONDS)
+        pipe.execute()
+
+
+def _read_number(path: Path) -> Optional[float]:
+    try:
+        value = path.read_text().split()[0]
+    except (OSError, IndexError):
+        return None
+    if value == "max":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _read_stat(path: Path) -> Dict[str, float]:
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return {}
+    stats = {}
+    for line in lines:
+        name, _, value = line.partition(" ")
+        try:
+            stats[name] = float(value)
+        except ValueError:
+            continue
+    return stats
+
+
+def read_cgroup_metrics(root: Path = CGROUP_ROOT) -> Dict[str, float]:
+    """
+    Container memory and CPU limits and usage from cgroup v2, or v1.
+
+    Only the values the container actually exposes are returned; limits that
+    are unset are omitted.
+    """
+    metrics: Dict[str, float] = {}
+    if (root / "cgroup.controllers").exists():
+        usage = _read_number(root / "memory.current")
+        limit = _read_number(root / "memory.max")
+        try:
+            quota, period = (root / "cpu.max").read_text().split()[:2]
+            if quota != "max":
+                metrics["cpu_limit_cores"] = float(quota) / float(period)
+        except (OSError, ValueError):
+            pass
+        throttled = _read_stat(root / "cpu.stat").get("throttled_usec")
+        if throttled is not None:
+            metrics["cpu_throttled_seconds"] = throttled / 1e6
+    else:
+        usage = _read_number(root / "memory" / "memory.usage_in_bytes")
+        limit = _read_number(root / "memory" / "memory.limit_in_bytes")
+        if limit is not None and limit >= _CGROUP_V1_UNLIMITED:
+            limit = None
+        quota = _read_number(root / "cpu" / "cpu.cfs_quota_us")
+        period = _read_number(root / "cpu" / "cpu.cfs_period_us")
+        if quota is not None and quota > 0 and period:
+            metrics["cpu_limit_cores"] = quota / period
+        throttled = _read_stat(root / "cpu" / "cpu.stat").get("throttled_time")
+        if throttled is not None:
+            metrics["cpu_throttled_seconds"] = throttled / 1e9
+
+    if usage is not None:
+        metrics["memory_usage_bytes"] = usage
+    if limit is not None:
+        metrics["memory_limit_bytes"] = limit
+    return metrics
+
+
 @dataclass
 class MetricConfig:
     """Configuration for custom metrics."""
@@ -32,8 +152,24 @@ class MetricConfig:
 class CustomMetricsCollector:
     """Custom metrics collector for FastAPI auto-scaling."""
     
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        broker_client: Optional[redis.Redis] = None,
+        celery_queues: Sequence[str] = (),
+        activity: Optional[ActivityCounters] = None,
+        intervals: Optional[Dict[str, float]] = None,
+        collection_timeout: float = 5.0,
+        cgroup_root: Path = CGROUP_ROOT
+    ):
         self.redis_client = redis_client
+        # Closed when collection stops
+        self.broker_client = broker_client
+        self.celery_queues = list(celery_queues)
+        self.activity = activity or ActivityCounters(redis_client)
+        self.intervals = {**DEFAULT_COLLECTOR_INTERVALS, **(intervals or {})}
+        self.collection_timeout = collection_timeout
+        self.cgroup_root = cgroup_root
         self.registry = CollectorRegistry()
         
         # HTTP Request Metrics
@@ -103,6 +239,55 @@ class CustomMetricsCollector:
             registry=self.registry
         )
         
+        # Process and container metrics
+        self.process_cpu_percent = Gauge(
+            'process_cpu_usage_percent',
+            'Process CPU usage percentage since the previous collection',
+            registry=self.registry
+        )
+        
+        self.process_memory_rss = Gauge(
+            'process_memory_rss_bytes',
+            'Process resident memory in bytes',
+            registry=self.registry
+        )
+        
+        self.process_open_fds = Gauge(
+            'process_open_fds',
+            'Open file descriptors of the process',
+            registry=self.registry
+        )
+        
+        self.process_threads = Gauge(
+            'process_threads',
+            'Threads of the process',
+            registry=self.registry
+        )
+        
+        self.cgroup_memory_usage = Gauge(
+            'cgroup_memory_usage_bytes',
+            'Container memory usage in bytes',
+            registry=self.registry
+        )
+        
+        self.cgroup_memory_limit = Gauge(
+            'cgroup_memory_limit_bytes',
+            'Container memory limit in bytes',
+            registry=self.registry
+        )
+        
+        self.cgroup_cpu_limit = Gauge(
+            'cgroup_cpu_limit_cores',
+            'Container CPU limit in cores',
+            registry=self.registry
+        )
+        
+        self.cgroup_cpu_throttled = Gauge(
+            'cgroup_cpu_throttled_seconds',
+            'Total time the container has been CPU throttled',
+            registry=self.registry
+        )
+        
         # Redis Metrics
         self.redis_connections_active = Gauge(
             'redis_connections_active',
@@ -208,112 +393,169 @@ class CustomMetricsCollector:
             registry=self.registry
         )
         
-        # Start background metrics collection
-        self._metrics_task = None
+        # Collector health
+        self.collector_duration = Gauge(
+            'metrics_collector_duration_seconds',
+            'Duration of the latest collection',
+            ['collector'],
+            registry=self.registry
+        )
+        
+        self.collector_failures = Counter(
+            'metrics_collector_failures_total',
+            'Failed or timed out collections',
+            ['collector', 'reason'],
+            registry=self.registry
+        )
+        
+        self._process = psutil.Process()
+        # The first reading only primes the CPU counter
+        self._process.cpu_percent(None)
+        self.last_collected: Dict[str, float] = {}
+        self._collector_tasks: Dict[str, asyncio.Task] = {}
+    
+    @property
+    def is_collecting(self) -> bool:
+        return any(not task.done() for task in self._collector_tasks.values())
+    
+    def _collectors(self) -> Dict[str, Callable[[], Awaitable[None]]]:
+        collectors = {
+            "system": self._collect_system_metrics,
+            "redis": self._collect_redis_metrics,
+            "business": self._collect_business_metrics,
+        }
+        if self.broker_client is not None:
+            collectors["celery"] = self._collect_celery_metrics
+        return collectors
         
     async def start_collection(self):
-        """Start background metrics collection."""
-        if self._metrics_task is None:
-            self._metrics_task = asyncio.create_task(self._collect_metrics_loop())
+        """Start one background task per collector."""
+        if not self._collector_tasks:
+            self._collector_tasks = {
+                name: asyncio.create_task(self._run_collector(name, collect))
+                for name, collect in self._collectors().items()
+            }
     
     async def stop_collection(self):
         """Stop background metrics collection."""
-        if self._metrics_task:
-            self._metrics_task.cancel()
-            try:
-                await self._metrics_task
-            except asyncio.CancelledError:
-                pass
-            self._metrics_task = None
+        tasks = list(self._collector_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._collector_tasks = {}
+        if self.broker_client is not None:
+            await self.broker_client.aclose()
+            self.broker_client = None
     
-    async def _collect_metrics_loop(self):
-        """Background loop to collect metrics."""
+    async def _run_collector(self, name: str, collect: Callable[[], Awaitable[None]]):
+        """Run one collector on its interval; failures and timeouts only skip a round."""
+        interval = self.intervals.get(name, 30.0)
         while True:
-            try:
-                await self._collect_system_metrics()
-                await self._collect_redis_metrics()
-                await self._collect_celery_metrics()
-                await self._collect_business_metrics()
-                await asyncio.sleep(30)  # Collect every 30 seconds
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error("Error collecting metrics", error=str(e))
-                await asyncio.sleep(60)  # Wait longer on error
+            started = time.monotonic()
+            await self.collect_once(name, collect)
+            await asyncio.sleep(max(interval - (time.monotonic() - started), 0.0))
     
-    async def _collect_system_metrics(self):
-        """Collect system-level metrics."""
+    async def collect_once(self, name: str, collect: Optional[Callable[[], Awaitable[None]]] = None) -> bool:
+        """Run a single collection; returns whether it completed in time."""
+        collect = collect or self._collectors()[name]
+        started = time.monotonic()
         try:
-            # This would typically collect from system APIs
-            # For now, we'll simulate some metrics
-            
-            # Simulate active connections
-            self.active_connections.set(50)
-            
-            # Simulate concurrent requests
-            self.concurrent_requests.set(10)
-            
+            await asyncio.wait_for(collect(), self.collection_timeout)
+        except asyncio.TimeoutError:
+            self.collector_failures.labels(collector=name, reason="timeout").inc()
+            logger.warning("Metrics collection timed out", collector=name, timeout=self.collection_timeout)
+            return False
         except Exception as e:
-            logger.error("Error collecting system metrics", error=str(e))
+            self.collector_failures.labels(collector=name, reason="error").inc()
+            logger.error("Error collecting metrics", collector=name, error=str(e))
+            return False
+        finally:
+            self.collector_duration.labels(collector=name).set(time.monotonic() - started)
+        self.last_collected[name] = time.time()
+        return True
+    
+    def _read_system_metrics(self) -> Dict[str, float]:
+        """Process and cgroup readings; blocking, so run in a worker thread."""
+        process = self._process
+        values: Dict[str, float] = {}
+        with process.oneshot():
+            values["cpu_percent"] = process.cpu_percent(None)
+            values["memory_rss_bytes"] = process.memory_info().rss
+            values["threads"] = process.num_threads()
+            if hasattr(process, "num_fds"):
+                values["open_fds"] = process.num_fds()
+        try:
+            values["connections"] = sum(
+                1 for connection in process.net_connections(kind="tcp")
+                if connection.status == psutil.CONN_ESTABLISHED
+            )
+        except psutil.Error:
+            pass
+        values.update({
+            f"cgroup_{name}": value for name, value in read_cgroup_metrics(self.cgroup_root).items()
+        })
+        return values
+    
+    async def _collect_system_metrics(self):
+        """Collect process and container metrics off the event loop."""
+        values = await asyncio.to_thread(self._read_system_metrics)
+        
+        gauges = {
+            "cpu_percent": self.process_cpu_percent,
+            "memory_rss_bytes": self.process_memory_rss,
+            "threads": self.process_threads,
+            "open_fds": self.process_open_fds,
+            "connections": self.active_connections,
+            "cgroup_memory_usage_bytes": self.cgroup_memory_usage,
+            "cgroup_memory_limit_bytes": self.cgroup_memory_limit,
+            "cgroup_cpu_limit_cores": self.cgroup_cpu_limit,
+            "cgroup_cpu_throttled_seconds": self.cgroup_cpu_throttled,
+        }
+        for name, gauge in gauges.items():
+            if name in values:
+                gauge.set(values[name])
     
     async def _collect_redis_metrics(self):
         """Collect Redis metrics."""
-        try:
-            # Get Redis info
-            info = await self.redis_client.info()
-            
-            # Connected clients
-            self.redis_connections_active.set(info.get('connected_clients', 0))
-            
-            # Memory usage
-            self.redis_memory_usage.set(info.get('used_memory', 0))
-            
-            # Calculate cache hit rate
-            keyspace_hits = info.get('keyspace_hits', 0)
-            keyspace_misses = info.get('keyspace_misses', 0)
-            total_requests = keyspace_hits + keyspace_misses
-            
-            if total_requests > 0:
-                hit_rate = (keyspace_hits / total_requests) * 100
-                self.cache_hit_rate.labels(cache_type='redis').set(hit_rate)
-            
-        except Exception as e:
-            logger.error("Error collecting Redis metrics", error=str(e))
+        info = await self.redis_client.info()
+        
+        # Connected clients
+        self.redis_connections_active.set(info.get('connected_clients', 0))
+        
+        # Memory usage
+        self.redis_memory_usage.set(info.get('used_memory', 0))
+        
+        # Calculate cache hit rate
+        keyspace_hits = info.get('keyspace_hits', 0)
+        keyspace_misses = info.get('keyspace_misses', 0)
+        total_requests = keyspace_hits + keyspace_misses
+        
+        if total_requests > 0:
+            hit_rate = (keyspace_hits / total_requests) * 100
+            self.cache_hit_rate.labels(cache_type='redis').set(hit_rate)
     
     async def _collect_celery_metrics(self):
-        """Collect Celery metrics."""
-        try:
-            # This would typically use Celery's inspect API
-            # For now, we'll simulate some metrics
-            
-            # Simulate queue lengths
-            self.celery_queue_length.labels(queue='job_processing').set(25)
-            self.celery_queue_length.labels(queue='document_processing').set(10)
-            self.celery_queue_length.labels(queue='analytics').set(5)
-            
-            # Simulate active workers
-            self.celery_workers_active.set(4)
-            
-        except Exception as e:
-            logger.error("Error collecting Celery metrics", error=str(e))
+        """Collect queue depths and active workers from the broker in one round trip."""
+        now = time.time()
+        async with self.broker_client.pipeline(transaction=False) as pipe:
+            for queue in self.celery_queues:
+                for key in broker_queue_keys(queue):
+                    pipe.llen(key)
+            pipe.zcount(WORKER_HEARTBEATS_KEY, now - WORKER_ACTIVE_SECONDS, "+inf")
+            *lengths, workers = await pipe.execute()
+        
+        steps = len(BROKER_PRIORITY_STEPS)
+        for i, queue in enumerate(self.celery_queues):
+            self.celery_queue_length.labels(queue=queue).set(sum(lengths[i * steps:(i + 1) * steps]))
+        self.celery_workers_active.set(workers)
     
     async def _collect_business_metrics(self):
-        """Collect business-specific metrics."""
-        try:
-            # This would typically query the database for business metrics
-            # For now, we'll simulate some metrics
-            
-            # Simulate active user sessions
-            self.user_sessions_active.set(150)
-            
-            # Simulate job applications per minute
-            self.job_applications_per_minute.set(5)
-            
-            # Simulate document generations per minute
-            self.document_generations_per_minute.set(8)
-            
-        except Exception as e:
-            logger.error("Error collecting business metrics", error=str(e))
+        """Collect business rates from the incremental activity counters."""
+        snapshot = await self.activity.snapshot([APPLICATION_SUBMITTED, DOCUMENT_GENERATED])
+        
+        self.user_sessions_active.set(snapshot.active_sessions)
+        self.job_applications_per_minute.set(snapshot.rates[APPLICATION_SUBMITTED])
+        self.document_generations_per_minute.set(snapshot.rates[DOCUMENT_GENERATED])
     
     def record_http_request(self, method: str, endpoint: str, status_code: int, duration: float):
         """Record HTTP request metrics."""
@@ -379,7 +621,24 @@ def get_metrics_collector() -> Optional[CustomMetricsCollector]:
 def init_metrics_collector(redis_client: redis.Redis) -> CustomMetricsCollector:
     """Initialize the global metrics collector."""
     global _metrics_collector
-    _metrics_collector = CustomMetricsCollector(redis_client)
+    from .config import get_settings
+    
+    settings = get_settings()
+    broker_client = None
+    celery_queues: List[str] = []
+    if is_redis_broker(settings.celery.broker_url):
+        from .celery import celery_app
+        broker_client = redis.from_url(settings.celery.broker_url)
+        celery_queues = [queue.name for queue in celery_app.conf.task_queues]
+    
+    _metrics_collector = CustomMetricsCollector(
+        redis_client,
+        broker_client=broker_client,
+        celery_queues=celery_queues,
+        activity=ActivityCounters(redis_client, settings.security.session_touch_interval_seconds),
+        intervals=settings.monitoring.metrics_collector_intervals,
+        collection_timeout=settings.monitoring.metrics_collector_timeout
+    )
     return _metrics_collector
 
 
@@ -401,7 +660,8 @@ def setup_metrics_endpoint(app: FastAPI):
         if collector:
             return {
                 "status": "healthy",
-                "collector_active": collector._metrics_task is not None,
+                "collector_active": collector.is_collecting,
+                "last_collected": collector.last_collected,
                 "timestamp": time.time()
             }
         return {
@@ -0,0 +1,236 @@
+"""
+Monthly range partitioning for append-only tables.
+
+``audit_logs`` and ``security_events`` are partitioned by ``created_at`` into
+one partition per calendar month (``audit_logs_p2024_05``). Maintenance keeps
+``premake_months`` partitions ahead of the current month so inserts never
+reach a missing range, and applies retention a whole partition at a time: a
+partition whose upper bound is older than the retention cutoff is detached and
+then dropped, or moved to the archive schema for tables that must be kept.
+Nothing is deleted row by row, so retention leaves no dead tuples behind for
+autovacuum and does not bloat the remaining indexes.
+
+Rows written before a table was converted live in its ``*_legacy`` partition,
+which is bounded below by MINVALUE and expires like any other partition once
+its upper bound passes the cutoff.
+
+Queries only benefit when the planner can prune, so filters should compare
+``created_at`` directly against a bounded range rather than wrapping the
+column in a function.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import structlog
+from sqlalchemy import text
+
+from .config import get_settings
+
+logger = structlog.get_logger()
+
+BOUND_PATTERN = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+def _quote(identifier: str) -> str:
+    """Quote a SQL identifier taken from the partition registry or catalog."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def month_start(moment: datetime) -> datetime:
+    """First instant of ``moment``'s month in UTC."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """Shift a month start by ``months`` calendar months."""
+    index = moment.year * 12 + moment.month - 1 + months
+    return moment.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    value = value.strip()
+    if value.upper() == "MINVALUE":
+        return None
+    if value.upper() == "MAXVALUE":
+        return datetime.max.replace(tzinfo=timezone.utc)
+    parsed = datetime.fromisoformat(value.strip("'"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    """An append-only table partitioned by month on ``created_at``."""
+    name: str
+    retention_months: Optional[int]
+    # Expired partitions are moved to the archive schema instead of dropped
+    archive: bool = False
+
+
+@dataclass(frozen=True)
+class Partition:
+    """One attached partition and its range; None for MINVALUE."""
+    name: str
+    lower: Optional[datetime]
+    upper: Optional[datetime]
+
+    @classmethod
+    def from_bound(cls, name: str, bound: str) -> Optional["Partition"]:
+        """Parse ``pg_get_expr(relpartbound)``; None for a DEFAULT partition."""
+        match = BOUND_PATTERN.search(bound)
+        if match is None:
+            return None
+        return cls(name, _parse_bound(match.group(1)), _parse_bound(match.group(2)))
+
+    def overlaps(self, lower: datetime, upper: datetime) -> bool:
+        return (self.lower is None or self.lower < upper) and (self.upper is None or lower < self.upper)
+
+
+def missing_partitions(
+    table: str,
+    existing: Sequence[Partition],
+    now: datetime,
+    premake_months: int
+) -> List[Tuple[str, datetime, datetime]]:
+    """Monthly ranges from the current month to ``premake_months`` ahead not yet covered."""
+    current = month_start(now)
+    missing = []
+    for offset in range(premake_months + 1):
+        lower = add_months(current, offset)
+        upper = add_months(current, offset + 1)
+        if not any(partition.overlaps(lower, upper) for partition in existing):
+            missing.append((partition_name(table, lower), lower, upper))
+    return missing
+
+
+def expired_partitions(existing: Sequence[Partition], now: datetime, retention_months: Optional[int]) -> List[Partition]:
+    """Partitions holding only rows older than the retention cutoff."""
+    if retention_months is None:
+        return []
+    cutoff = add_months(month_start(now), -retention_months)
+    return [partition for partition in existing if partition.upper is not None and partition.upper <= cutoff]
+
+
+def default_partitioned_tables() -> List[PartitionedTable]:
+    database = get_settings().database
+    return [
+        PartitionedTable("audit_logs", database.audit_log_retention_months, archive=True),
+        PartitionedTable("security_events", database.security_event_retention_months),
+    ]
+
+
+class PartitionManager:
+    """Creates upcoming partitions and retires expired ones."""
+
+    def __init__(
+        self,
+        engine=None,
+        tables: Optional[Sequence[PartitionedTable]] = None,
+        premake_months: Optional[int] = None,
+        archive_schema: Optional[str] = None
+    ):
+        settings = get_settings()
+
+        if engine is None:
+            from .database import async_engine
+            engine = async_engine
+
+        self.engine = engine
+        self.tables = list(tables) if tables is not None else default_partitioned_tables()
+        self.premake_months = (
+            premake_months if premake_months is not None else settings.database.partition_premake_months
+        )
+        self.archive_schema = archive_schema or settings.database.partition_archive_schema
+        self.logger = logger.bind(service="partition_manager")
+
+    async def list_partitions(self, conn, table: str) -> List[Partition]:
+        result = await conn.execute(text("""
+            SELECT child.relname AS name, pg_get_expr(child.relpartbound, child.oid) AS bound
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+            WHERE parent.relname = :table AND ns.nspname = current_schema()
+        """), {"table": table})
+        partitions = [Partition.from_bound(row.name, row.bound) for row in result.fetchall()]
+        return sorted(
+            (partition for partition in partitions if partition is not None),
+            key=lambda partition: partition.lower or datetime.min.replace(tzinfo=timezone.utc)
+        )
+
+    async def maintain(self, now: Optional[datetime] = None) -> Dict[str, Dict[str, List[str]]]:
+        """Premake upcoming partitions and retire expired ones for every table."""
+        now = now or datetime.now(timezone.utc)
+        results = {}
+
+        for table in self.tables:
+            # DETACH ... CONCURRENTLY cannot run inside a transaction block
+            async with self.engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                existing = await self.list_partitions(conn, table.name)
+                if not existing:
+                    self.logger.warning("Table is not partitioned, skipping", table=table.name)
+                    continue
+
+                created = await self._create_partitions(conn, table, existing, now)
+                retired = await self._retire_partitions(conn, table, existing, now)
+
+            results[table.name] = {"created": created, "retired": retired}
+            self.logger.info(
+                "Partition maintenance completed",
+                table=table.name,
+                created=created,
+                retired=retired
+            )
+
+        return results
+
+    async def _create_partitions(
+        self,
+        conn,
+        table: PartitionedTable,
+        existing: Sequence[Partition],
+        now: datetime
+    ) -> List[str]:
+        created = []
+        for name, lower, upper in missing_partitions(table.name, existing, now, self.premake_months):
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {_quote(name)} PARTITION OF {_quote(table.name)} "
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+            created.append(name)
+        return created
+
+    async def _retire_partitions(
+        self,
+        conn,
+        table: PartitionedTable,
+        existing: Sequence[Partition],
+        now: datetime
+    ) -> List[str]:
+        retired = []
+        for partition in expired_partitions(existing, now, table.retention_months):
+            # Concurrent detach waits out running queries instead of blocking new ones
+            await conn.execute(text(
+                f"ALTER TABLE {_quote(table.name)} DETACH PARTITION {_quote(partition.name)} CONCURRENTLY"
+            ))
+            if table.archive:
+                await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {_quote(self.archive_schema)}"))
+                await conn.execute(text(
+                    f"ALTER TABLE {_quote(partition.name)} SET SCHEMA {_quote(self.archive_schema)}"
+                ))
+            else:
+                await conn.execute(text(f"DROP TABLE {_quote(partition.name)}"))
+            retired.append(partition.name)
+        return retired
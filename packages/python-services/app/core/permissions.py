@@ -0,0 +1,220 @@
+"""
+Compiled RBAC permission sets.
+
+A user's permissions are resolved with a single User -> Role -> Permission
+query, flattened into a frozenset plus a bitmask, and cached in-process and
+in Redis. Every cached entry is tagged with a global and a per-user
+permission version; role membership changes bump the user's version and
+role/permission definition changes bump the global one, so stale entries
+are never served.
+
+Permission names are mapped to bit positions per process, so bitmasks never
+leave the process; Redis stores the permission names.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+import redis.asyncio as redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+GLOBAL_VERSION_KEY = "rbac:version"
+USER_VERSION_KEY_PREFIX = "rbac:version:"
+USER_PERMISSIONS_KEY_PREFIX = "rbac:permissions:"
+
+USER_PERMISSIONS_QUERY = text("""
+    SELECT DISTINCT p.name
+    FROM user_roles ur
+    JOIN role_permissions rp ON rp.role_id = ur.role_id
+    JOIN permissions p ON p.id = rp.permission_id
+    WHERE ur.user_id = :user_id
+""")
+
+Versions = Tuple[int, int]
+
+
+class PermissionBits:
+    """Process-wide, append-only mapping of permission names to bit positions."""
+
+    def __init__(self):
+        self._bits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bit(self, name: str) -> int:
+        try:
+            return self._bits[name]
+        except KeyError:
+            with self._lock:
+                return self._bits.setdefault(name, 1 << len(self._bits))
+
+    def mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            mask |= self.bit(name)
+        return mask
+
+
+permission_bits = PermissionBits()
+
+
+@dataclass(frozen=True)
+class CompiledPermissions:
+    """A user's flattened permissions at a given permission version."""
+    user_id: str
+    permissions: FrozenSet[str]
+    mask: int
+    versions: Versions
+
+    def has_all(self, required_mask: int) -> bool:
+        return self.mask & required_mask == required_mask
+
+    def missing(self, required: Iterable[str]) -> FrozenSet[str]:
+        return frozenset(required) - self.permissions
+
+
+def _decode(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _encode_entry(versions: Versions, permissions: FrozenSet[str]) -> str:
+    return f"{versions[0]}:{versions[1]}:{','.join(sorted(permissions))}"
+
+
+def _decode_entry(raw) -> Optional[Tuple[Versions, FrozenSet[str]]]:
+    try:
+        global_version, user_version, names = _decode(raw).split(":", 2)
+        return (int(global_version), int(user_version)), frozenset(filter(None, names.split(",")))
+    except (AttributeError, ValueError):
+        return None
+
+
+class PermissionResolver:
+    """Resolves, compiles and caches user permissions."""
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        cache_ttl: int = 3600,
+        local_cache_size: int = 10000,
+        bits: Optional[PermissionBits] = None
+    ):
+        self.redis_client = redis_client
+        self.cache_ttl = cache_ttl
+        self.local_cache_size = local_cache_size
+        self.bits = bits or permission_bits
+        self._local: "OrderedDict[str, CompiledPermissions]" = OrderedDict()
+        # Version counters used when running without Redis (single process)
+        self._local_versions: Dict[str, int] = {}
+
+    def compile(self, *permissions: str) -> int:
+        """Bitmask for a set of required permissions."""
+        return self.bits.mask(permissions)
+
+    async def versions(self, user_id) -> Versions:
+        """Current global and per-user permission versions (one round trip)."""
+        key = str(user_id)
+        if self.redis_client is None:
+            return self._local_versions.get(GLOBAL_VERSION_KEY, 0), self._local_versions.get(key, 0)
+        global_version, user_version = await self.redis_client.mget(
+            GLOBAL_VERSION_KEY, f"{USER_VERSION_KEY_PREFIX}{key}"
+        )
+        return int(global_version or 0), int(user_version or 0)
+
+    async def resolve(self, session: AsyncSession, user_id) -> CompiledPermissions:
+        """Compiled permissions for a user, loading them at most once per version."""
+        key = str(user_id)
+        versions = await self.versions(key)
+
+        compiled = self._local.get(key)
+        if compiled is not None and compiled.versions == versions:
+            self._local.move_to_end(key)
+            return compiled
+
+        permissions = await self._load_cached(key, versions)
+        if permissions is None:
+            result = await session.execute(USER_PERMISSIONS_QUERY, {"user_id": user_id})
+            permissions = frozenset(result.scalars().all())
+            await self._store_cached(key, versions, permissions)
+
+        compiled = CompiledPermissions(
+            user_id=key,
+            permissions=permissions,
+            mask=self.bits.mask(permissions),
+            versions=versions,
+        )
+        self._local[key] = compiled
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_cache_size:
+            self._local.popitem(last=False)
+        return compiled
+
+    async def has_permissions(self, session: AsyncSession, user_id, required_mask: int) -> bool:
+        """Single bitmask test for any number of required permissions."""
+        return (await self.resolve(session, user_id)).has_all(required_mask)
+
+    async def invalidate_user(self, user_id) -> None:
+        """Invalidate one user's permissions (after role assignment changes)."""
+        key = str(user_id)
+        if self.redis_client is None:
+            self._local_versions[key] = self._local_versions.get(key, 0) + 1
+        else:
+            await self.redis_client.incr(f"{USER_VERSION_KEY_PREFIX}{key}")
+        self._local.pop(key, None)
+
+    async def invalidate_all(self) -> None:
+        """Invalidate every user's permissions (after role or permission changes)."""
+        if self.redis_client is None:
+            self._local_versions[GLOBAL_VERSION_KEY] = self._local_versions.get(GLOBAL_VERSION_KEY, 0) + 1
+        else:
+            await self.redis_client.incr(GLOBAL_VERSION_KEY)
+        self._local.clear()
+
+    async def _load_cached(self, key: str, versions: Versions) -> Optional[FrozenSet[str]]:
+        if self.redis_client is None:
+            return None
+        entry = _decode_entry(await self.redis_client.get(f"{USER_PERMISSIONS_KEY_PREFIX}{key}"))
+        if entry is None or entry[0] != versions:
+            return None
+        return entry[1]
+
+    async def _store_cached(self, key: str, versions: Versions, permissions: FrozenSet[str]) -> None:
+        if self.redis_client is None:
+            return
+        try:
+            await self.redis_client.set(
+                f"{USER_PERMISSIONS_KEY_PREFIX}{key}",
+                _encode_entry(versions, permissions),
+                ex=self.cache_ttl
+            )
+        except Exception as e:
+            logger.warning("Failed to cache user permissions", user_id=key, error=str(e))
+
+
+_resolver: Optional[PermissionResolver] = None
+
+
+def get_permission_resolver(redis_client: Optional[redis.Redis] = None) -> PermissionResolver:
+    """Process-wide permission resolver, configured from settings."""
+    global _resolver
+    if _resolver is None:
+        from .config import get_settings
+
+        security = get_settings().security
+        _resolver = PermissionResolver(
+            redis_client,
+            cache_ttl=security.rbac_cache_ttl_seconds,
+            local_cache_size=security.rbac_local_cache_size,
+        )
+    elif redis_client is not None and _resolver.redis_client is None:
+        # Entries tagged with process-local versions are meaningless in Redis
+        _resolver.redis_client = redis_client
+        _resolver._local.clear()
+    return _resolver
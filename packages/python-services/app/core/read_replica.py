@@ -1,13 +1,17 @@
 """Read replica support for database load balancing."""
 
+import asyncio
 import random
+import time
 from typing import AsyncGenerator, List, Optional
 from contextlib import asynccontextmanager
 
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import QueuePool, NullPool
 
 from .config import get_settings
+from .database_pool import WriteToken, get_last_write_token, parse_lsn, set_last_write_token
 from .logging import get_logger
 
 settings = get_settings()
@@ -24,6 +28,13 @@ class ReadReplicaManager:
         self.primary_session = None
         self.enabled = False
         
+        # Lag-aware routing state, refreshed by the lag monitor
+        self.replica_lag: List[Optional[float]] = []
+        self.lag_checked_at: Optional[float] = None
+        self.max_staleness: float = 5.0
+        self.lag_poll_interval: float = 1.0
+        self._lag_task: Optional[asyncio.Task] = None
+        
     async def initialize(self, replica_urls: List[str]) -> None:
         """Initialize read replica connections."""
         if not replica_urls:
@@ -55,7 +66,7 @@ class ReadReplicaManager:
                 
                 # Test replica connection
                 async with replica_engine.begin() as conn:
-                    await conn.execute("SELECT 1")
+                    await conn.execute(text("SELECT 1"))
                 
                 self.replica_engines.append(replica_engine)
                 
@@ -72,6 +83,9 @@ class ReadReplicaManager:
                 logger.info(f"Read replica {i} initialized successfully")
             
             self.enabled = len(self.replica_engines) > 0
+            self.replica_lag = [None] * len(self.replica_engines)
+            if self.enabled:
+                self._lag_task = asyncio.create_task(self._lag_monitor_loop())
             logger.info(f"Read replica manager initialized with {len(self.replica_engines)} replicas")
             
         except Exception as e:
@@ -80,6 +94,11 @@ class ReadReplicaManager:
     
     async def close(self) -> None:
         """Close all replica connections."""
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            await asyncio.gather(self._lag_task, return_exceptions=True)
+            self._lag_task = None
+        
         for engine in self.replica_engines:
             try:
                 await engine.dispose()
@@ -88,16 +107,42 @@ class ReadReplicaManager:
         
         self.replica_engines.clear()
         self.replica_sessions.clear()
+        self.replica_lag.clear()
         self.enabled = False
         logger.info("Read replica connections closed")
     
-    def get_replica_session(self) -> Optional[async_sessionmaker]:
-        """Get a random replica session factory."""
+    def get_replica_session(self, max_staleness: Optional[float] = None) -> Optional[async_sessionmaker]:
+        """
+        Get a replica session factory whose lag fits the staleness budget.
+        
+        Returns None (use the primary) when no replica has a recent lag
+        reading within ``max_staleness`` seconds.
+        """
         if not self.enabled or not self.replica_sessions:
             return None
         
-        # Simple round-robin or random selection
-        return random.choice(self.replica_sessions)
+        budget = self.max_staleness if max_staleness is None else max_staleness
+        if self.lag_checked_at is None or time.time() - self.lag_checked_at > 3 * max(self.lag_poll_interval, 1.0):
+            return None
+        
+        candidates = [
+            session_factory
+            for session_factory, lag in zip(self.replica_sessions, self.replica_lag)
+            if lag is not None and lag <= budget
+        ]
+        if not candidates:
+            return None
+        
+        return random.choice(candidates)
+    
+    async def _lag_monitor_loop(self) -> None:
+        """Poll replica lag in the background for routing decisions."""
+        while True:
+            try:
+                await self.get_replica_lag()
+            except Exception as e:
+                logger.warning(f"Replica lag monitoring error: {e}")
+            await asyncio.sleep(self.lag_poll_interval)
     
     async def check_replica_health(self) -> List[bool]:
         """Check health of all read replicas."""
@@ -106,7 +151,7 @@ class ReadReplicaManager:
         for i, engine in enumerate(self.replica_engines):
             try:
                 async with engine.begin() as conn:
-                    await conn.execute("SELECT 1")
+                    await conn.execute(text("SELECT 1"))
                 health_status.append(True)
                 logger.debug(f"Replica {i} is healthy")
             except Exception as e:
@@ -123,15 +168,16 @@ class ReadReplicaManager:
             try:
                 async with engine.begin() as conn:
                     # Query replication lag (requires appropriate permissions)
-                    result = await conn.execute("""
+                    result = await conn.execute(text("""
                         SELECT 
                             CASE 
-                                WHEN pg_is_in_recovery() THEN 
-                                    EXTRACT(EPOCH FROM (now() - pg_last_xact_replay_timestamp()))
-                                ELSE 0 
+                                WHEN NOT pg_is_in_recovery() THEN 0
+                                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                                ELSE EXTRACT(EPOCH FROM (now() - pg_last_xact_replay_timestamp()))
                             END as lag_seconds
-                    """)
+                    """))
                     lag = result.scalar()
+                    lag = float(lag) if lag is not None else None
                     lag_info.append(lag)
                     
                     if lag and lag > 5.0:  # Warn if lag > 5 seconds
@@ -141,6 +187,8 @@ class ReadReplicaManager:
                 logger.warning(f"Failed to get lag for replica {i}: {e}")
                 lag_info.append(None)
         
+        self.replica_lag = lag_info
+        self.lag_checked_at = time.time()
         return lag_info
 
 
@@ -148,19 +196,34 @@ class ReadReplicaManager:
 read_replica_manager = ReadReplicaManager()
 
 
+def _recent_write_pins_primary(max_staleness: Optional[float]) -> bool:
+    """True if a write in this context may not have reached the replicas yet."""
+    token = get_last_write_token()
+    if token is None:
+        return False
+    budget = read_replica_manager.max_staleness if max_staleness is None else max_staleness
+    return time.time() - token.committed_at < budget
+
+
 @asynccontextmanager
-async def get_read_session(prefer_replica: bool = True) -> AsyncGenerator[AsyncSession, None]:
+async def get_read_session(
+    prefer_replica: bool = True,
+    max_staleness: Optional[float] = None
+) -> AsyncGenerator[AsyncSession, None]:
     """
     Get database session, preferring read replica for read operations.
     
     Args:
         prefer_replica: If True, try to use read replica first
+        max_staleness: Maximum acceptable replica lag in seconds
     """
     session_factory = None
     
-    # Try to get replica session if preferred and available
-    if prefer_replica and read_replica_manager.enabled:
-        session_factory = read_replica_manager.get_replica_session()
+    # Try to get replica session if preferred and available; reads shortly
+    # after a write in the same context stay on the primary (read-your-writes)
+    if (prefer_replica and read_replica_manager.enabled
+            and not _recent_write_pins_primary(max_staleness)):
+        session_factory = read_replica_manager.get_replica_session(max_staleness)
     
     # Fall back to primary if no replica available
     if not session_factory:
@@ -183,7 +246,14 @@ async def get_write_session() -> AsyncGenerator[AsyncSession, None]:
     """Get database session for write operations (always uses primary)."""
     from .database import AsyncSessionLocal
     
+    committed = False
+    
+    def _on_commit(_session):
+        nonlocal committed
+        committed = True
+    
     async with AsyncSessionLocal() as session:
+        event.listen(session.sync_session, "after_commit", _on_commit)
         try:
             yield session
         except Exception as e:
@@ -192,6 +262,24 @@ async def get_write_session() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+    
+    if committed and read_replica_manager.enabled:
+        await _record_write_position()
+
+
+async def _record_write_position() -> None:
+    """Remember the primary's WAL position so following reads see the write."""
+    from .database import AsyncSessionLocal
+    
+    try:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(text("SELECT pg_current_wal_lsn()::text"))
+            lsn = result.scalar()
+    except Exception as e:
+        logger.warning(f"Failed to record write position: {e}")
+        return
+    
+    set_last_write_token(WriteToken(lsn=parse_lsn(lsn), committed_at=time.time()))
 
 
 class DatabaseRouter:
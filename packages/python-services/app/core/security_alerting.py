@@ -12,7 +12,8 @@ This module provides:
 import asyncio
 import json
 import smtplib
-from datetime import datetime, timedelta, timezone
+import time
+from datetime import datetime, timezone
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from enum import Enum
@@ -24,6 +25,7 @@ import redis.asyncio as redis
 from pydantic import BaseModel, Field
 import structlog
 
+from .alert_store import AlertStore
 from .config import get_settings
 from .threat_detection import ThreatIndicator, ThreatLevel
 
@@ -163,7 +165,13 @@ class SecurityAlertManager:
         
         # Alert correlation
         self.correlation_window = 300  # 5 minutes
-        self.correlation_cache: Dict[str, List[str]] = {}
+        self.correlation_limit = 10
+        
+        self.store = AlertStore(
+            redis_client,
+            bucket_seconds=settings.security.alert_bucket_seconds,
+            retention_seconds=settings.security.alert_retention_days * 86400
+        )
     
     def _load_alert_rules(self) -> List[AlertRule]:
         """Load alert rules configuration."""
@@ -252,8 +260,11 @@ class SecurityAlertManager:
             
             # Send notifications
             for rule in matching_rules:
-                if await self._should_send_alert(rule, alert):
-                    await self._send_alert_notifications(rule, alert)
+                now = time.time()
+                if await self._should_send_alert(rule, alert, now):
+                    if not await self._send_alert_notifications(rule, alert):
+                        # Nothing went out, so the send does not count against the throttle
+                        await self._release_alert_send(rule, now)
             
             # Schedule escalation if needed
             for rule in matching_rules:
@@ -327,59 +338,32 @@ class SecurityAlertManager:
             # Generate correlation key based on alert characteristics
             correlation_key = f"{alert.category}:{alert.source_ip or 'unknown'}"
             
-            # Check for recent similar alerts
-            recent_alerts = await self.redis_client.lrange(
-                f"correlation:{correlation_key}",
-                0, 9
+            # Record this alert and fetch recent similar ones in one script call
+            related = await self.store.correlate(
+                correlation_key,
+                str(alert.id),
+                self.correlation_window,
+                self.correlation_limit
             )
             
-            if recent_alerts:
-                # Found related alerts
+            if related:
                 alert.correlation_id = correlation_key
-                alert.related_alerts = [
-                    json.loads(alert_data)["id"] 
-                    for alert_data in recent_alerts
-                ]
-            
-            # Add current alert to correlation cache
-            await self.redis_client.lpush(
-                f"correlation:{correlation_key}",
-                json.dumps({"id": str(alert.id), "timestamp": alert.timestamp.isoformat()})
-            )
-            
-            # Set expiration for correlation cache
-            await self.redis_client.expire(
-                f"correlation:{correlation_key}",
-                self.correlation_window
-            )
+                alert.related_alerts = related
         
         except Exception as e:
             logger.error("Error correlating alert", error=str(e))
     
     async def _store_alert(self, alert: SecurityAlert):
-        """Store alert in database and cache."""
+        """Store alert in its time bucket."""
         
         try:
-            # Store in Redis for quick access
-            await self.redis_client.hset(
-                "security_alerts",
+            await self.store.add(
                 str(alert.id),
+                alert.timestamp.timestamp(),
+                alert.severity.value,
                 alert.model_dump_json()
             )
             
-            # Add to time-ordered list
-            await self.redis_client.zadd(
-                "alerts_by_time",
-                {str(alert.id): alert.timestamp.timestamp()}
-            )
-            
-            # Add to severity-ordered list
-            severity_score = self._get_severity_score(alert.severity)
-            await self.redis_client.zadd(
-                "alerts_by_severity",
-                {str(alert.id): severity_score}
-            )
-            
             logger.info("Alert stored", alert_id=str(alert.id))
         
         except Exception as e:
@@ -397,74 +381,62 @@ class SecurityAlertManager:
         
         return scores.get(severity, 1.0)
     
-    async def _should_send_alert(self, rule: AlertRule, alert: SecurityAlert) -> bool:
-        """Check if alert should be sent based on throttling rules."""
+    async def _should_send_alert(self, rule: AlertRule, alert: SecurityAlert, now: Optional[float] = None) -> bool:
+        """Check throttling rules and, if the alert may be sent, reserve the send."""
         
         try:
-            # Check throttling
-            throttle_key = f"alert_throttle:{rule.id}"
-            last_sent = await self.redis_client.get(throttle_key)
-            
-            if last_sent:
-                last_sent_time = datetime.fromisoformat(last_sent.decode())
-                time_since_last = datetime.now(timezone.utc) - last_sent_time
-                
-                if time_since_last.total_seconds() < rule.throttle_minutes * 60:
-                    return False
-            
-            # Check hourly limit
-            hour_key = f"alert_count:{rule.id}:{datetime.now(timezone.utc).hour}"
-            count = await self.redis_client.get(hour_key)
-            count = int(count) if count else 0
-            
-            if count >= rule.max_alerts_per_hour:
-                return False
-            
-            return True
+            return await self.store.acquire_send(
+                rule.id,
+                rule.throttle_minutes * 60,
+                rule.max_alerts_per_hour,
+                now=now
+            )
         
         except Exception as e:
             logger.error("Error checking alert throttling", error=str(e))
             return True
     
-    async def _send_alert_notifications(self, rule: AlertRule, alert: SecurityAlert):
-        """Send alert notifications through configured channels."""
+    async def _release_alert_send(self, rule: AlertRule, now: float):
+        """Give back a reserved send whose notifications all failed."""
         
         try:
-            # Update throttling counters
-            throttle_key = f"alert_throttle:{rule.id}"
-            await self.redis_client.setex(
-                throttle_key,
-                rule.throttle_minutes * 60,
-                datetime.now(timezone.utc).isoformat()
-            )
-            
-            hour_key = f"alert_count:{rule.id}:{datetime.now(timezone.utc).hour}"
-            await self.redis_client.incr(hour_key)
-            await self.redis_client.expire(hour_key, 3600)
-            
+            await self.store.release_send(rule.id, now=now)
+        
+        except Exception as e:
+            logger.error("Error releasing alert throttle", error=str(e))
+    
+    async def _send_alert_notifications(self, rule: AlertRule, alert: SecurityAlert) -> bool:
+        """Send alert notifications through configured channels; True if any was delivered."""
+        
+        delivered = False
+        try:
             # Send through each configured channel
             for channel in rule.channels:
                 try:
-                    await self._send_channel_notification(channel, rule, alert)
+                    if await self._send_channel_notification(channel, rule, alert):
+                        delivered = True
                 except Exception as e:
                     logger.error(f"Failed to send alert via {channel}", error=str(e))
         
         except Exception as e:
             logger.error("Error sending alert notifications", error=str(e))
+        
+        return delivered
     
-    async def _send_channel_notification(self, channel: AlertChannel, rule: AlertRule, alert: SecurityAlert):
+    async def _send_channel_notification(self, channel: AlertChannel, rule: AlertRule, alert: SecurityAlert) -> bool:
         """Send notification through specific channel."""
         
         if channel == AlertChannel.EMAIL:
-            await self._send_email_alert(rule, alert)
+            return await self._send_email_alert(rule, alert)
         elif channel == AlertChannel.SLACK:
-            await self._send_slack_alert(rule, alert)
+            return await self._send_slack_alert(rule, alert)
         elif channel == AlertChannel.WEBHOOK:
-            await self._send_webhook_alert(rule, alert)
+            return await self._send_webhook_alert(rule, alert)
         elif channel == AlertChannel.DASHBOARD:
-            await self._send_dashboard_alert(rule, alert)
+            return await self._send_dashboard_alert(rule, alert)
+        return False
     
-    async def _send_email_alert(self, rule: AlertRule, alert: SecurityAlert):
+    async def _send_email_alert(self, rule: AlertRule, alert: SecurityAlert) -> bool:
         """Send email alert."""
         
         try:
@@ -513,11 +485,13 @@ This is an automated security alert from GiveMeJobs.AI platform.
             server.quit()
             
             logger.info("Email alert sent", alert_id=str(alert.id))
+            return True
         
         except Exception as e:
             logger.error("Failed to send email alert", error=str(e))
+            return False
     
-    async def _send_slack_alert(self, rule: AlertRule, alert: SecurityAlert):
+    async def _send_slack_alert(self, rule: AlertRule, alert: SecurityAlert) -> bool:
         """Send Slack alert."""
         
         try:
@@ -526,7 +500,7 @@ This is an automated security alert from GiveMeJobs.AI platform.
             
             if not webhook_url:
                 logger.warning("Slack webhook URL not configured")
-                return
+                return False
             
             # Create Slack message
             color_map = {
@@ -578,11 +552,13 @@ This is an automated security alert from GiveMeJobs.AI platform.
             response.raise_for_status()
             
             logger.info("Slack alert sent", alert_id=str(alert.id))
+            return True
         
         except Exception as e:
             logger.error("Failed to send Slack alert", error=str(e))
+            return False
     
-    async def _send_webhook_alert(self, rule: AlertRule, alert: SecurityAlert):
+    async def _send_webhook_alert(self, rule: AlertRule, alert: SecurityAlert) -> bool:
         """Send webhook alert."""
         
         try:
@@ -591,7 +567,7 @@ This is an automated security alert from GiveMeJobs.AI platform.
             
             if not webhook_url:
                 logger.warning("Webhook URL not configured")
-                return
+                return False
             
             # Create webhook payload
             payload = {
@@ -620,11 +596,13 @@ This is an automated security alert from GiveMeJobs.AI platform.
             response.raise_for_status()
             
             logger.info("Webhook alert sent", alert_id=str(alert.id))
+            return True
         
         except Exception as e:
             logger.error("Failed to send webhook alert", error=str(e))
+            return False
     
-    async def _send_dashboard_alert(self, rule: AlertRule, alert: SecurityAlert):
+    async def _send_dashboard_alert(self, rule: AlertRule, alert: SecurityAlert) -> bool:
         """Send dashboard alert."""
         
         try:
@@ -638,9 +616,11 @@ This is an automated security alert from GiveMeJobs.AI platform.
             await self.redis_client.ltrim("dashboard_alerts", 0, 99)
             
             logger.info("Dashboard alert sent", alert_id=str(alert.id))
+            return True
         
         except Exception as e:
             logger.error("Failed to send dashboard alert", error=str(e))
+            return False
     
     async def _schedule_escalation(self, rule: AlertRule, alert: SecurityAlert):
         """Schedule alert escalation."""
@@ -670,34 +650,18 @@ This is an automated security alert from GiveMeJobs.AI platform.
             logger.error("Failed to schedule escalation", error=str(e))
     
     async def get_alert_statistics(self) -> Dict[str, Any]:
-        """Get alert statistics."""
+        """Get alert statistics for the retention window."""
         
         try:
-            # Get total alerts
-            total_alerts = await self.redis_client.hlen("security_alerts")
-            
-            # Get alerts by severity
-            severity_counts = {}
-            for severity in ThreatLevel:
-                count = await self.redis_client.zcount(
-                    "alerts_by_severity",
-                    self._get_severity_score(severity),
-                    self._get_severity_score(severity)
-                )
-                severity_counts[severity.value] = count
-            
-            # Get recent alerts (last 24 hours)
-            yesterday = datetime.now(timezone.utc) - timedelta(days=1)
-            recent_count = await self.redis_client.zcount(
-                "alerts_by_time",
-                yesterday.timestamp(),
-                datetime.now(timezone.utc).timestamp()
-            )
+            stats = await self.store.statistics(recent_seconds=86400)
             
             return {
-                "total_alerts": total_alerts,
-                "alerts_by_severity": severity_counts,
-                "recent_alerts_24h": recent_count,
+                "total_alerts": stats.total,
+                "alerts_by_severity": {
+                    severity.value: stats.by_severity.get(severity.value, 0)
+                    for severity in ThreatLevel
+                },
+                "recent_alerts_24h": stats.recent,
                 "active_rules": len([r for r in self.alert_rules if r.enabled])
             }
         
@@ -709,20 +673,10 @@ This is an automated security alert from GiveMeJobs.AI platform.
         """Get recent security alerts."""
         
         try:
-            # Get recent alert IDs
-            alert_ids = await self.redis_client.zrevrange(
-                "alerts_by_time",
-                0, limit - 1
-            )
-            
-            alerts = []
-            for alert_id in alert_ids:
-                alert_data = await self.redis_client.hget("security_alerts", alert_id)
-                if alert_data:
-                    alert = SecurityAlert.model_validate_json(alert_data)
-                    alerts.append(alert)
-            
-            return alerts
+            return [
+                SecurityAlert.model_validate_json(alert_data)
+                for alert_data in await self.store.recent(limit)
+            ]
         
         except Exception as e:
             logger.error("Error getting recent alerts", error=str(e))
@@ -732,7 +686,7 @@ This is an automated security alert from GiveMeJobs.AI platform.
         """Update alert status."""
         
         try:
-            alert_data = await self.redis_client.hget("security_alerts", str(alert_id))
+            alert_data = await self.store.get(str(alert_id))
             if not alert_data:
                 raise ValueError(f"Alert {alert_id} not found")
             
@@ -750,11 +704,7 @@ This is an automated security alert from GiveMeJobs.AI platform.
                 alert.resolved_at = now
             
             # Store updated alert
-            await self.redis_client.hset(
-                "security_alerts",
-                str(alert_id),
-                alert.model_dump_json()
-            )
+            await self.store.replace(str(alert_id), alert.model_dump_json())
             
             logger.info("Alert status updated", alert_id=str(alert_id), status=status.value)
         
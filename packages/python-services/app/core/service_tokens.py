@@ -0,0 +1,435 @@
+"""
+Service-to-service token verification.
+
+Internal callers reuse the same service JWT for many requests, so tokens are
+fully verified once and then cached by SHA-256 digest; a cache hit only
+re-checks the ``exp``/``nbf`` window and revocation. Verification keys (the
+shared HS256 secret and, optionally, a JWKS document) are parsed once and
+replaced atomically when the JWKS is refreshed in the background.
+
+Revoked token IDs are stored in a Redis sorted set scored by token expiry.
+Every process mirrors that set into a bloom filter, so the common case of a
+token that was never revoked is answered without a Redis round trip; filter
+hits are confirmed against Redis before a token is rejected.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import httpx
+import jwt
+import redis.asyncio as redis
+from jwt.algorithms import get_default_algorithms
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+REVOKED_TOKENS_KEY = "service_tokens:revoked"
+REVOKED_VERSION_KEY = "service_tokens:revoked:version"
+
+_ALGORITHMS = get_default_algorithms()
+
+
+class RevokedTokenError(jwt.InvalidTokenError):
+    """The token's ``jti`` has been revoked."""
+
+
+@dataclass(frozen=True)
+class VerificationKey:
+    """A parsed verification key and the only algorithm it may be used with."""
+    kid: Optional[str]
+    algorithm: str
+    key: Any
+
+
+class ServiceKeySet:
+    """Immutable set of parsed verification keys, indexed by ``kid``."""
+
+    def __init__(self, keys: Iterable[VerificationKey], fingerprint: str = ""):
+        self._by_kid: Dict[Optional[str], VerificationKey] = {key.kid: key for key in keys}
+        self.fingerprint = fingerprint
+
+    def __len__(self) -> int:
+        return len(self._by_kid)
+
+    @classmethod
+    def from_secret(cls, secret: str, algorithm: str = "HS256") -> "ServiceKeySet":
+        key = _ALGORITHMS[algorithm].prepare_key(secret)
+        return cls(
+            [VerificationKey(None, algorithm, key)],
+            fingerprint=hashlib.sha256(f"{algorithm}:{secret}".encode()).hexdigest()
+        )
+
+    @classmethod
+    def from_jwks(cls, jwks: Dict[str, Any], base: Optional["ServiceKeySet"] = None) -> "ServiceKeySet":
+        """Parse a JWKS document, keeping the keys of ``base`` (e.g. the shared secret)."""
+        parsed = jwt.PyJWKSet.from_dict(jwks)
+        keys = list(base._by_kid.values()) if base else []
+        keys.extend(
+            VerificationKey(jwk.key_id, jwk.algorithm_name, jwk.key) for jwk in parsed.keys
+        )
+        digest = hashlib.sha256(json.dumps(jwks, sort_keys=True).encode()).hexdigest()
+        return cls(keys, fingerprint=f"{base.fingerprint if base else ''}:{digest}")
+
+    def select(self, header: Dict[str, Any]) -> VerificationKey:
+        """Key for a token header; the header's ``alg`` must match the key's."""
+        key = self._by_kid.get(header.get("kid")) or self._by_kid.get(None)
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        if header.get("alg") != key.algorithm:
+            raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+        return key
+
+
+@dataclass(frozen=True)
+class VerifiedToken:
+    """A token whose signature and static claims have been verified."""
+    payload: Dict[str, Any]
+    jti: Optional[str]
+    not_before: float
+    expires_at: float
+
+
+class ClaimsValidator:
+    """
+    Claim checks compiled once into a tuple of closures.
+
+    ``__call__`` runs the static checks (required claims, types, issuer,
+    audience) once per token; ``check_window`` is the only per-request check.
+    """
+
+    def __init__(
+        self,
+        required: Iterable[str] = ("exp",),
+        issuer: Optional[str] = None,
+        audience: Optional[str] = None,
+        leeway: float = 0.0
+    ):
+        self.leeway = leeway
+        checks = []
+
+        required = frozenset(required)
+        if required:
+            def check_required(payload):
+                missing = required.difference(payload)
+                if missing:
+                    raise jwt.MissingRequiredClaimError(sorted(missing)[0])
+            checks.append(check_required)
+
+        def check_numeric(payload):
+            for claim in ("exp", "nbf", "iat"):
+                value = payload.get(claim)
+                if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                    raise jwt.DecodeError(f"The {claim} claim must be a number")
+        checks.append(check_numeric)
+
+        if issuer is not None:
+            def check_issuer(payload):
+                if payload.get("iss") != issuer:
+                    raise jwt.InvalidIssuerError("Invalid issuer")
+            checks.append(check_issuer)
+
+        if audience is not None:
+            def check_audience(payload):
+                aud = payload.get("aud")
+                if aud != audience and not (isinstance(aud, list) and audience in aud):
+                    raise jwt.InvalidAudienceError("Audience doesn't match")
+            checks.append(check_audience)
+
+        self._checks = tuple(checks)
+
+    def __call__(self, payload: Dict[str, Any]) -> VerifiedToken:
+        for check in self._checks:
+            check(payload)
+        return VerifiedToken(
+            payload=payload,
+            jti=payload.get("jti") or None,
+            not_before=payload.get("nbf", -math.inf) - self.leeway,
+            expires_at=payload.get("exp", math.inf) + self.leeway,
+        )
+
+    @staticmethod
+    def check_window(token: VerifiedToken, now: float) -> None:
+        if now >= token.expires_at:
+            raise jwt.ExpiredSignatureError("Signature has expired")
+        if now < token.not_before:
+            raise jwt.ImmatureSignatureError("The token is not yet valid (nbf)")
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified tokens keyed by token digest."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, VerifiedToken]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, digest: bytes) -> Optional[VerifiedToken]:
+        token = self._entries.get(digest)
+        if token is not None:
+            self._entries.move_to_end(digest)
+        return token
+
+    def put(self, digest: bytes, token: VerifiedToken) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[digest] = token
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def evict(self, digest: bytes) -> None:
+        self._entries.pop(digest, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class RevocationBloomFilter:
+    """Fixed-size bloom filter over revoked token IDs."""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class TokenRevocationList:
+    """Revoked token IDs in Redis, mirrored locally in a bloom filter."""
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        capacity: int = 100000,
+        error_rate: float = 0.001
+    ):
+        self.redis_client = redis_client
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = RevocationBloomFilter(capacity, error_rate)
+        self._version: Optional[int] = None
+        # Authoritative store when running without Redis (single process)
+        self._local: Dict[str, float] = {}
+
+    async def is_revoked(self, jti: str) -> bool:
+        if jti not in self._filter:
+            return False
+        if self.redis_client is None:
+            return self._local.get(jti, 0) > time.time()
+        try:
+            return await self.redis_client.zscore(REVOKED_TOKENS_KEY, jti) is not None
+        except Exception as e:
+            # Fail closed: the filter says the token may be revoked
+            logger.warning("Failed to confirm token revocation", jti=jti, error=str(e))
+            return True
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        """Revoke a token ID until the token would have expired anyway."""
+        self._filter.add(jti)
+        if self.redis_client is None:
+            self._local[jti] = expires_at
+            return
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.zadd(REVOKED_TOKENS_KEY, {jti: expires_at})
+            pipe.incr(REVOKED_VERSION_KEY)
+            await pipe.execute()
+
+    async def sync(self) -> bool:
+        """Rebuild the local filter if the Redis revocation set changed."""
+        if self.redis_client is None:
+            return False
+        # Read the version first: a revocation racing the rebuild bumps it again
+        version = int(await self.redis_client.get(REVOKED_VERSION_KEY) or 0)
+        if version == self._version:
+            return False
+
+        now = time.time()
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", now)
+            pipe.zrangebyscore(REVOKED_TOKENS_KEY, now, "+inf")
+            _, members = await pipe.execute()
+
+        rebuilt = RevocationBloomFilter(max(self.capacity, len(members)), self.error_rate)
+        for member in members:
+            rebuilt.add(member.decode() if isinstance(member, bytes) else member)
+        self._filter = rebuilt
+        self._version = version
+        return True
+
+
+class ServiceTokenVerifier:
+    """Verifies service JWTs with a digest-keyed cache of verified tokens."""
+
+    def __init__(
+        self,
+        keys: ServiceKeySet,
+        claims: Optional[ClaimsValidator] = None,
+        revocations: Optional[TokenRevocationList] = None,
+        cache_size: int = 10000,
+        jwks_url: Optional[str] = None,
+        jwks_refresh_interval: float = 300.0,
+        revocation_sync_interval: float = 5.0
+    ):
+        self.keys = keys
+        self._base_keys = keys
+        self.claims = claims or ClaimsValidator()
+        self.revocations = revocations or TokenRevocationList()
+        self.cache = VerifiedTokenCache(cache_size)
+        self.jwks_url = jwks_url
+        self.jwks_refresh_interval = jwks_refresh_interval
+        self.revocation_sync_interval = revocation_sync_interval
+        self._jws = jwt.PyJWS()
+        self._tasks: Tuple[asyncio.Task, ...] = ()
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def _verify_signature(self, token: str) -> VerifiedToken:
+        header = jwt.get_unverified_header(token)
+        key = self.keys.select(header)
+        decoded = self._jws.decode_complete(token, key.key, algorithms=[key.algorithm])
+        try:
+            payload = json.loads(decoded["payload"])
+        except ValueError as e:
+            raise jwt.DecodeError(f"Invalid payload string: {e}") from e
+        if not isinstance(payload, dict):
+            raise jwt.DecodeError("Invalid payload string: must be a json object")
+        return self.claims(payload)
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """Verified claims for a token; raises ``jwt.InvalidTokenError`` subclasses."""
+        digest = self.digest(token)
+        verified = self.cache.get(digest)
+        if verified is None:
+            verified = self._verify_signature(token)
+            self.cache.put(digest, verified)
+
+        try:
+            self.claims.check_window(verified, time.time())
+        except jwt.ExpiredSignatureError:
+            self.cache.evict(digest)
+            raise
+
+        if verified.jti and await self.revocations.is_revoked(verified.jti):
+            raise RevokedTokenError("Token has been revoked")
+        return verified.payload
+
+    async def revoke(self, token: str) -> None:
+        """Revoke a token (by its ``jti``) for the rest of its lifetime."""
+        digest = self.digest(token)
+        verified = self.cache.get(digest) or self._verify_signature(token)
+        if not verified.jti:
+            raise jwt.MissingRequiredClaimError("jti")
+        await self.revocations.revoke(verified.jti, verified.expires_at)
+
+    def set_keys(self, keys: ServiceKeySet) -> bool:
+        """Swap in a new key set; cached tokens are dropped if the keys changed."""
+        if keys.fingerprint == self.keys.fingerprint:
+            return False
+        self.keys = keys
+        self.cache.clear()
+        logger.info("Service verification keys rotated", keys=len(keys))
+        return True
+
+    async def refresh_keys(self) -> bool:
+        """Fetch and pre-parse the JWKS document."""
+        if not self.jwks_url:
+            return False
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            response = await client.get(self.jwks_url)
+            response.raise_for_status()
+        return self.set_keys(ServiceKeySet.from_jwks(response.json(), base=self._base_keys))
+
+    async def start(self) -> None:
+        """Start background key rotation and revocation sync (idempotent)."""
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        tasks = []
+        if self.jwks_url:
+            await self._run_safely(self.refresh_keys, "Service JWKS refresh failed")
+            tasks.append(self._every(self.jwks_refresh_interval, self.refresh_keys, "Service JWKS refresh failed"))
+        if self.revocations.redis_client is not None:
+            await self._run_safely(self.revocations.sync, "Service token revocation sync failed")
+            tasks.append(self._every(
+                self.revocation_sync_interval, self.revocations.sync, "Service token revocation sync failed"
+            ))
+        self._tasks = tuple(asyncio.create_task(task) for task in tasks)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = ()
+
+    @staticmethod
+    async def _run_safely(operation, message: str) -> None:
+        try:
+            await operation()
+        except Exception as e:
+            logger.warning(message, error=str(e))
+
+    async def _every(self, interval: float, operation, message: str) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self._run_safely(operation, message)
+
+
+_verifier: Optional[ServiceTokenVerifier] = None
+
+
+def get_service_token_verifier(redis_client: Optional[redis.Redis] = None) -> ServiceTokenVerifier:
+    """Process-wide service token verifier, configured from settings."""
+    global _verifier
+    if _verifier is None:
+        from .config import get_settings
+
+        security = get_settings().security
+        secret = security.service_token_secret or security.secret_key + "_service"
+        _verifier = ServiceTokenVerifier(
+            ServiceKeySet.from_secret(secret, security.service_token_algorithm),
+            claims=ClaimsValidator(
+                issuer=security.service_token_issuer,
+                audience=security.service_token_audience,
+                leeway=security.service_token_leeway_seconds,
+            ),
+            revocations=TokenRevocationList(
+                redis_client, capacity=security.service_token_revocation_capacity
+            ),
+            cache_size=security.service_token_cache_size,
+            jwks_url=security.service_jwks_url,
+            jwks_refresh_interval=security.service_jwks_refresh_seconds,
+            revocation_sync_interval=security.service_token_revocation_sync_seconds,
+        )
+    elif redis_client is not None and _verifier.revocations.redis_client is None:
+        _verifier.revocations.redis_client = redis_client
+    return _verifier
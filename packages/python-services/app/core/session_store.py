@@ -0,0 +1,402 @@
+"""
+Redis session store with a locally cached validation path.
+
+Sessions are stored as compact Redis hashes (short field names, epoch
+seconds) and every multi-key operation is sent as a single pipeline. Sliding
+expiry is extended at most once per ``touch_interval`` rather than on every
+request, and the same write counts the session as active for the business
+metrics.
+
+Validated sessions are kept in a short-lived in-process cache so most
+authenticated requests never reach Redis. Revocations are published on a
+Redis pub/sub channel and evict the entry from every process's cache; the
+local cache is only consulted while the revocation listener is subscribed,
+so a lost subscription falls back to reading Redis instead of serving
+revoked sessions.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+from .activity_counters import mark_session_active
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+SESSION_KEY_PREFIX = "session:"
+USER_SESSIONS_KEY_PREFIX = "user_sessions:"
+REVOCATION_CHANNEL = "session:revoked"
+
+# Compact hash field names
+_USER_ID = "u"
+_IP_ADDRESS = "ip"
+_USER_AGENT = "ua"
+_CREATED_AT = "c"
+_LAST_ACTIVITY = "a"
+_EXPIRES_AT = "e"
+
+# Published instead of a session ID to revoke every session of a user
+_USER_REVOCATION_PREFIX = "user:"
+
+_MAX_USER_AGENT_LENGTH = 256
+
+
+def session_key(session_id: str) -> str:
+    return f"{SESSION_KEY_PREFIX}{session_id}"
+
+
+def user_sessions_key(user_id: str) -> str:
+    return f"{USER_SESSIONS_KEY_PREFIX}{user_id}"
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+@dataclass(frozen=True)
+class SessionRecord:
+    """A user session; timestamps are epoch seconds."""
+    session_id: str
+    user_id: str
+    ip_address: str
+    user_agent: str
+    created_at: int
+    last_activity: int
+    expires_at: int
+
+    def to_hash(self) -> Dict[str, str]:
+        return {
+            _USER_ID: self.user_id,
+            _IP_ADDRESS: self.ip_address,
+            _USER_AGENT: self.user_agent,
+            _CREATED_AT: str(self.created_at),
+            _LAST_ACTIVITY: str(self.last_activity),
+            _EXPIRES_AT: str(self.expires_at),
+        }
+
+    @classmethod
+    def from_hash(cls, session_id: str, data: Dict) -> Optional["SessionRecord"]:
+        """Build a record from ``HGETALL`` output; None if empty or malformed."""
+        if not data:
+            return None
+        fields = {_decode(key): _decode(value) for key, value in data.items()}
+        try:
+            return cls(
+                session_id=session_id,
+                user_id=fields[_USER_ID],
+                ip_address=fields.get(_IP_ADDRESS, "unknown"),
+                user_agent=fields.get(_USER_AGENT, "unknown"),
+                created_at=int(fields[_CREATED_AT]),
+                last_activity=int(fields[_LAST_ACTIVITY]),
+                expires_at=int(fields[_EXPIRES_AT]),
+            )
+        except (KeyError, ValueError):
+            return None
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.time()) >= self.expires_at
+
+    def as_dict(self) -> Dict[str, object]:
+        """Session details with ISO-8601 timestamps, matching ``SessionInfo``."""
+        def iso(value: int) -> datetime:
+            return datetime.fromtimestamp(value, tz=timezone.utc)
+
+        return {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "ip_address": self.ip_address,
+            "user_agent": self.user_agent,
+            "created_at": iso(self.created_at),
+            "last_activity": iso(self.last_activity),
+            "expires_at": iso(self.expires_at),
+            "is_active": not self.is_expired(),
+        }
+
+
+class LocalSessionCache:
+    """Bounded LRU of validated sessions with a short per-entry TTL."""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 5.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, SessionRecord]]" = OrderedDict()
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        cached_until, record = entry
+        if time.monotonic() >= cached_until:
+            del self._entries[session_id]
+            return None
+        self._entries.move_to_end(session_id)
+        return record
+
+    def put(self, record: SessionRecord) -> None:
+        self._entries[record.session_id] = (time.monotonic() + self.ttl, record)
+        self._entries.move_to_end(record.session_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def update(self, record: SessionRecord) -> None:
+        """Replace a cached record without extending its cache lifetime."""
+        entry = self._entries.get(record.session_id)
+        if entry is not None:
+            self._entries[record.session_id] = (entry[0], record)
+
+    def evict(self, session_id: str) -> None:
+        self._entries.pop(session_id, None)
+
+    def evict_user(self, user_id: str) -> None:
+        for session_id in [sid for sid, (_, record) in self._entries.items() if record.user_id == user_id]:
+            del self._entries[session_id]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SessionStore:
+    """Session persistence, validation and revocation."""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        ttl_seconds: int = 7 * 24 * 3600,
+        touch_interval: int = 300,
+        local_cache_ttl: float = 5.0,
+        local_cache_size: int = 10000
+    ):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.touch_interval = touch_interval
+        self.local_cache = LocalSessionCache(max_size=local_cache_size, ttl=local_cache_ttl)
+
+        self._pubsub = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._subscribed = False
+
+    @property
+    def local_cache_enabled(self) -> bool:
+        """Whether cached validations are trusted (revocations are being received)."""
+        return self._subscribed and self.local_cache.ttl > 0
+
+    async def create(self, user_id: str, ip_address: str, user_agent: str) -> SessionRecord:
+        """Create a session and index it under its user in one round trip."""
+        now = int(time.time())
+        record = SessionRecord(
+            session_id=str(uuid4()),
+            user_id=str(user_id),
+            ip_address=ip_address,
+            user_agent=user_agent[:_MAX_USER_AGENT_LENGTH],
+            created_at=now,
+            last_activity=now,
+            expires_at=now + self.ttl_seconds,
+        )
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.hset(session_key(record.session_id), mapping=record.to_hash())
+            pipe.expire(session_key(record.session_id), self.ttl_seconds)
+            pipe.sadd(user_sessions_key(record.user_id), record.session_id)
+            pipe.expire(user_sessions_key(record.user_id), self.ttl_seconds)
+            mark_session_active(pipe, record.session_id, self.touch_interval, now)
+            await pipe.execute()
+
+        return record
+
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        """Read a session from Redis, bypassing the local cache."""
+        try:
+            data = await self.redis_client.hgetall(session_key(session_id))
+        except ResponseError:
+            # Not a hash: written by the previous string-based format
+            return None
+        record = SessionRecord.from_hash(session_id, data)
+        if record is None or record.is_expired():
+            return None
+        return record
+
+    async def validate(self, session_id: str) -> Optional[SessionRecord]:
+        """
+        Return the session if it is still valid.
+
+        Served from the local cache when possible; Redis is read on a miss
+        and written only when the sliding expiry is due for extension.
+        """
+        record = self.local_cache.get(session_id) if self.local_cache_enabled else None
+        if record is None:
+            record = await self.get(session_id)
+            if record is None:
+                self.local_cache.evict(session_id)
+                return None
+            if self.local_cache_enabled:
+                self.local_cache.put(record)
+        elif record.is_expired():
+            self.local_cache.evict(session_id)
+            return None
+
+        if time.time() - record.last_activity >= self.touch_interval:
+            record = await self.touch(record)
+        return record
+
+    async def touch(self, record: SessionRecord) -> SessionRecord:
+        """Extend a session's sliding expiry."""
+        now = int(time.time())
+        touched = replace(record, last_activity=now, expires_at=now + self.ttl_seconds)
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.hset(session_key(record.session_id), mapping={
+                _LAST_ACTIVITY: str(touched.last_activity),
+                _EXPIRES_AT: str(touched.expires_at),
+            })
+            pipe.expire(session_key(record.session_id), self.ttl_seconds)
+            pipe.expire(user_sessions_key(record.user_id), self.ttl_seconds)
+            mark_session_active(pipe, record.session_id, self.touch_interval, now)
+            await pipe.execute()
+
+        self.local_cache.update(touched)
+        return touched
+
+    async def revoke(self, session_id: str, user_id: Optional[str] = None) -> bool:
+        """Delete a session and notify every process to drop it from its cache."""
+        self.local_cache.evict(session_id)
+        if user_id is None:
+            try:
+                user_id = _decode(await self.redis_client.hget(session_key(session_id), _USER_ID))
+            except ResponseError:
+                user_id = None
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.delete(session_key(session_id))
+            if user_id:
+                pipe.srem(user_sessions_key(user_id), session_id)
+            pipe.publish(REVOCATION_CHANNEL, session_id)
+            results = await pipe.execute()
+
+        return bool(results[0])
+
+    async def revoke_all(self, user_id: str) -> int:
+        """Delete every session of a user; returns the number removed."""
+        user_id = str(user_id)
+        self.local_cache.evict_user(user_id)
+        session_ids = [_decode(sid) for sid in await self.redis_client.smembers(user_sessions_key(user_id))]
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            if session_ids:
+                pipe.delete(*[session_key(sid) for sid in session_ids])
+            pipe.delete(user_sessions_key(user_id))
+            pipe.publish(REVOCATION_CHANNEL, f"{_USER_REVOCATION_PREFIX}{user_id}")
+            results = await pipe.execute()
+
+        return results[0] if session_ids else 0
+
+    async def list_user_sessions(self, user_id: str) -> List[SessionRecord]:
+        """Active sessions of a user, pruning expired IDs from the index."""
+        user_id = str(user_id)
+        session_ids = [_decode(sid) for sid in await self.redis_client.smembers(user_sessions_key(user_id))]
+        if not session_ids:
+            return []
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for sid in session_ids:
+                pipe.hgetall(session_key(sid))
+            results = await pipe.execute(raise_on_error=False)
+
+        sessions, stale = [], []
+        for sid, data in zip(session_ids, results):
+            record = None if isinstance(data, Exception) else SessionRecord.from_hash(sid, data)
+            if record is None or record.is_expired():
+                stale.append(sid)
+            else:
+                sessions.append(record)
+
+        if stale:
+            await self.redis_client.srem(user_sessions_key(user_id), *stale)
+
+        return sorted(sessions, key=lambda record: record.last_activity, reverse=True)
+
+    async def start_revocation_listener(self) -> None:
+        """Subscribe to revocations; enables the local validation cache. Idempotent."""
+        if self._listener_task is not None and not self._listener_task.done():
+            return
+        if self._pubsub is not None:
+            # Previous listener failed; resubscribe on a fresh connection
+            await self._pubsub.aclose()
+        self._pubsub = self.redis_client.pubsub()
+        await self._pubsub.subscribe(REVOCATION_CHANNEL)
+        self._subscribed = True
+        self._listener_task = asyncio.create_task(self._revocation_loop())
+        logger.info("Session revocation listener started")
+
+    async def stop_revocation_listener(self) -> None:
+        """Unsubscribe and disable the local validation cache."""
+        self._subscribed = False
+        self.local_cache.clear()
+
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(REVOCATION_CHANNEL)
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+        logger.info("Session revocation listener stopped")
+
+    def apply_revocation(self, message: str) -> None:
+        """Evict the session (or all of a user's sessions) named in a revocation message."""
+        if message.startswith(_USER_REVOCATION_PREFIX):
+            self.local_cache.evict_user(message[len(_USER_REVOCATION_PREFIX):])
+        else:
+            self.local_cache.evict(message)
+
+    async def _revocation_loop(self) -> None:
+        try:
+            async for message in self._pubsub.listen():
+                if message["type"] == "message":
+                    self.apply_revocation(_decode(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Session revocation listener failed", error=str(e))
+        finally:
+            # Without revocations the cache could serve revoked sessions
+            self._subscribed = False
+            self.local_cache.clear()
+
+
+_session_stores: Dict[int, SessionStore] = {}
+
+
+def get_session_store(redis_client: redis.Redis) -> SessionStore:
+    """Process-wide session store for a Redis client, configured from settings."""
+    store = _session_stores.get(id(redis_client))
+    if store is None or store.redis_client is not redis_client:
+        from .config import get_settings
+
+        security = get_settings().security
+        store = SessionStore(
+            redis_client,
+            ttl_seconds=security.session_ttl_seconds,
+            touch_interval=security.session_touch_interval_seconds,
+            local_cache_ttl=security.session_local_cache_ttl_seconds,
+            local_cache_size=security.session_local_cache_size,
+        )
+        _session_stores[id(redis_client)] = store
+    return store
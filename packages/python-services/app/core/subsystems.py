@@ -0,0 +1,276 @@
+"""
+Lazy subsystem registry.
+
+The semantic search, analytics and document processing services pull in
+scikit-learn, pandas/scipy, Pinecone and LangChain at import time. Entry
+points (the API app, Celery task modules) reference them through this
+registry instead of importing them at module top, so a process only pays for
+the subsystems it actually uses: on first use, or up front for the Celery
+queues a worker consumes.
+
+Each load is profiled (import time and RSS growth); ``python -m
+app.core.subsystems`` prints a startup-profile report.
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+# Third-party packages that must not be imported by lightweight entry points
+HEAVY_DEPENDENCIES: Tuple[str, ...] = (
+    "pandas",
+    "scipy",
+    "sklearn",
+    "pinecone",
+    "langchain",
+    "langchain_core",
+    "langchain_openai",
+    "langchain_community",
+    "langchain_text_splitters",
+)
+
+
+def _current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, if it can be determined."""
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@dataclass
+class Subsystem:
+    """A lazily imported service."""
+    name: str
+    module: str
+    attribute: str
+    queues: Tuple[str, ...] = ()
+    description: str = ""
+
+
+@dataclass
+class SubsystemLoadProfile:
+    """Cost of loading one subsystem."""
+    name: str
+    import_seconds: float
+    rss_before: Optional[int]
+    rss_after: Optional[int]
+    new_modules: int
+    heavy_dependencies: List[str] = field(default_factory=list)
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def rss_delta(self) -> Optional[int]:
+        if self.rss_before is None or self.rss_after is None:
+            return None
+        return self.rss_after - self.rss_before
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "import_seconds": round(self.import_seconds, 4),
+            "rss_delta_bytes": self.rss_delta,
+            "new_modules": self.new_modules,
+            "heavy_dependencies": self.heavy_dependencies,
+        }
+
+
+class SubsystemRegistry:
+    """Imports and initialises registered subsystems on first use."""
+
+    def __init__(self):
+        self._subsystems: Dict[str, Subsystem] = {}
+        self._loaded: Dict[str, Any] = {}
+        self._profiles: Dict[str, SubsystemLoadProfile] = {}
+        self._lock = threading.RLock()
+
+    def register(self, subsystem: Subsystem) -> None:
+        """Register a subsystem; does not import it."""
+        with self._lock:
+            self._subsystems[subsystem.name] = subsystem
+
+    def names(self) -> List[str]:
+        return list(self._subsystems)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def load(self, name: str) -> Any:
+        """Return the subsystem's entry object, importing it on first use."""
+        try:
+            return self._loaded[name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if name in self._loaded:
+                return self._loaded[name]
+            try:
+                subsystem = self._subsystems[name]
+            except KeyError:
+                raise KeyError(f"Unknown subsystem: {name}") from None
+
+            modules_before = set(sys.modules)
+            rss_before = _current_rss()
+            started = time.perf_counter()
+
+            module = importlib.import_module(subsystem.module)
+            target = getattr(module, subsystem.attribute)
+
+            profile = SubsystemLoadProfile(
+                name=name,
+                import_seconds=time.perf_counter() - started,
+                rss_before=rss_before,
+                rss_after=_current_rss(),
+                new_modules=len(set(sys.modules) - modules_before),
+                heavy_dependencies=[
+                    dependency for dependency in HEAVY_DEPENDENCIES
+                    if dependency in sys.modules and dependency not in modules_before
+                ],
+            )
+            self._profiles[name] = profile
+            self._loaded[name] = target
+
+            logger.info("Subsystem loaded", **profile.to_dict())
+            return target
+
+    def subsystems_for_queues(self, queues: Iterable[str]) -> List[str]:
+        """Names of the subsystems whose tasks are routed to ``queues``."""
+        queues = set(queues)
+        return [
+            name for name, subsystem in self._subsystems.items()
+            if queues.intersection(subsystem.queues)
+        ]
+
+    def load_for_queues(self, queues: Iterable[str]) -> List[str]:
+        """Load every subsystem needed by a worker consuming ``queues``."""
+        names = self.subsystems_for_queues(queues)
+        for name in names:
+            self.load(name)
+        return names
+
+    def profile_report(self) -> Dict[str, Any]:
+        """Import time and RSS added by each loaded subsystem."""
+        profiles = [profile.to_dict() for profile in self._profiles.values()]
+        deltas = [p["rss_delta_bytes"] for p in profiles if p["rss_delta_bytes"] is not None]
+        return {
+            "subsystems": profiles,
+            "not_loaded": [name for name in self._subsystems if name not in self._loaded],
+            "total_import_seconds": round(sum(p["import_seconds"] for p in profiles), 4),
+            "total_rss_delta_bytes": sum(deltas) if deltas else None,
+            "rss_bytes": _current_rss(),
+        }
+
+
+class LazySubsystem:
+    """
+    Module-level stand-in for a subsystem's entry object.
+
+    Attribute access and calls are forwarded to the real object, which is
+    imported on first use.
+    """
+
+    def __init__(self, name: str, registry: Optional[SubsystemRegistry] = None):
+        self._name = name
+        self._registry = registry
+
+    def _resolve(self) -> Any:
+        return (self._registry or subsystem_registry).load(self._name)
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._resolve(), item)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<LazySubsystem {self._name!r}>"
+
+
+subsystem_registry = SubsystemRegistry()
+
+subsystem_registry.register(Subsystem(
+    name="semantic_search",
+    module="app.services.semantic_search.service",
+    attribute="get_semantic_search_service",
+    queues=("semantic_search", "high_priority"),
+    description="Embeddings and vector search (scikit-learn, Pinecone)",
+))
+subsystem_registry.register(Subsystem(
+    name="analytics",
+    module="app.services.analytics.service",
+    attribute="analytics_engine",
+    queues=("analytics",),
+    description="Application analytics and predictions (pandas, scipy, scikit-learn)",
+))
+subsystem_registry.register(Subsystem(
+    name="document_processing",
+    module="app.services.document_processing.service",
+    attribute="DocumentProcessingService",
+    queues=("document_processing", "high_priority"),
+    description="Document generation and parsing (LangChain)",
+))
+
+
+def get_subsystem(name: str) -> Any:
+    """Return a subsystem's entry object, importing it on first use."""
+    return subsystem_registry.load(name)
+
+
+def lazy_subsystem(name: str) -> LazySubsystem:
+    """Module-level proxy for a subsystem, resolved on first use."""
+    return LazySubsystem(name)
+
+
+def format_profile_report(report: Dict[str, Any]) -> str:
+    """Render a startup-profile report as a table."""
+    def megabytes(value: Optional[int]) -> str:
+        return "n/a" if value is None else f"{value / (1024 * 1024):.1f}"
+
+    lines = [f"{'subsystem':<22}{'import s':>10}{'RSS +MB':>10}{'modules':>9}  heavy dependencies"]
+    for profile in report["subsystems"]:
+        lines.append(
+            f"{profile['name']:<22}{profile['import_seconds']:>10.3f}"
+            f"{megabytes(profile['rss_delta_bytes']):>10}{profile['new_modules']:>9}  "
+            f"{', '.join(profile['heavy_dependencies']) or '-'}"
+        )
+    lines.append(
+        f"{'total':<22}{report['total_import_seconds']:>10.3f}"
+        f"{megabytes(report['total_rss_delta_bytes']):>10}"
+    )
+    lines.append(f"process RSS: {megabytes(report['rss_bytes'])} MB")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile subsystem startup cost")
+    parser.add_argument("names", nargs="*", help="Subsystems to load (default: all)")
+    parser.add_argument("--queues", help="Load the subsystems for these comma-separated Celery queues")
+    args = parser.parse_args()
+
+    baseline_rss = _current_rss()
+    if args.queues:
+        subsystem_registry.load_for_queues(args.queues.split(","))
+    else:
+        for subsystem_name in args.names or subsystem_registry.names():
+            subsystem_registry.load(subsystem_name)
+
+    print(f"baseline RSS: {baseline_rss / (1024 * 1024):.1f} MB" if baseline_rss else "baseline RSS: n/a")
+    print(format_profile_report(subsystem_registry.profile_report()))
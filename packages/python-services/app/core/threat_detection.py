@@ -14,7 +14,7 @@ import json
 import time
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 from uuid import UUID, uuid4
 
 import numpy as np
@@ -26,10 +26,22 @@ import structlog
 
 from .config import get_settings
 from .audit_logging import AuditLogger, AuditEventType, AuditSeverity
+from .ip_reputation import get_ip_reputation_service
+from .threat_state import (
+    CompactProfile,
+    MicroBatchScorer,
+    ProfileCache,
+    collect_signals,
+    persist_profiles,
+)
 
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+# Reputation of addresses in no loaded range, and the level treated as known bad
+DEFAULT_IP_REPUTATION = 0.5
+KNOWN_BAD_REPUTATION = 0.1
+
 
 class ThreatLevel(str, Enum):
     """Threat severity levels."""
@@ -168,12 +180,29 @@ class ThreatDetectionEngine:
         self.scaler = StandardScaler()
         self.model_trained = False
         
-        # Behavioral profiles
-        self.behavioral_profiles: Dict[UUID, BehavioralProfile] = {}
+        # Behavioral profiles (bounded, persisted to Redis hashes write-behind)
+        security = settings.security
+        self.behavioral_profiles = ProfileCache(
+            max_size=security.threat_profile_cache_size,
+            ttl=security.threat_profile_cache_ttl_seconds
+        )
+        self.profile_redis_ttl = security.threat_profile_redis_ttl_seconds
+        self.profile_flush_interval = security.threat_profile_flush_interval_seconds
+        self._profile_flush_task: Optional[asyncio.Task] = None
+        
+        # Anomaly scoring runs off the request path in micro-batches
+        self.anomaly_scorer = MicroBatchScorer(
+            self._score_anomaly_batch,
+            self._handle_anomaly_scores,
+            batch_size=security.threat_anomaly_batch_size,
+            max_delay=security.threat_anomaly_batch_delay_seconds,
+            queue_size=security.threat_anomaly_queue_size
+        )
         
         # Threat intelligence
         self.threat_intel_feeds = []
         self.known_bad_ips: Set[str] = set()
+        self.ip_reputation = get_ip_reputation_service()
         self.known_bad_domains: Set[str] = set()
         
         # Response handlers
@@ -236,24 +265,42 @@ class ThreatDetectionEngine:
         ]
     
     async def analyze_event(self, event_data: Dict[str, Any]) -> Optional[ThreatIndicator]:
-        """Analyze an event for potential threats."""
+        """
+        Analyze an event for potential threats.
+        
+        ML anomalies are scored asynchronously and reported through the
+        security alert queue rather than returned here.
+        """
         
         try:
             threats = []
+            self._start_background_tasks()
+            
+            # All rule counters and the behavioral profile in one round trip
+            user_id = event_data.get("user_id")
+            subject = str(user_id) if user_id else None
+            profile = self.behavioral_profiles.get(subject) if subject else None
+            signals, profile_hash = await collect_signals(
+                self.redis_client,
+                self._rule_signal_keys(event_data),
+                subject if subject and profile is None else None
+            )
             
             # Rule-based detection
-            rule_threats = await self._apply_detection_rules(event_data)
+            rule_threats = self._apply_detection_rules(event_data, signals)
             threats.extend(rule_threats)
             
             # Behavioral analysis
-            if event_data.get("user_id"):
-                behavioral_threats = await self._analyze_behavioral_anomalies(event_data)
+            if subject:
+                profile = profile or self._load_behavioral_profile(subject, profile_hash)
+                behavioral_threats = self._analyze_behavioral_anomalies(event_data, profile)
                 threats.extend(behavioral_threats)
+                profile.observe(event_data)
+                self.behavioral_profiles.mark_dirty(subject, profile)
             
             # ML-based anomaly detection
             if self.model_trained:
-                ml_threats = await self._detect_ml_anomalies(event_data)
-                threats.extend(ml_threats)
+                self._enqueue_ml_analysis(event_data)
             
             # Threat intelligence correlation
             intel_threats = await self._correlate_threat_intelligence(event_data)
@@ -275,8 +322,33 @@ class ThreatDetectionEngine:
             logger.error("Error analyzing event for threats", error=str(e))
             return None
     
-    async def _apply_detection_rules(self, event_data: Dict[str, Any]) -> List[ThreatIndicator]:
-        """Apply rule-based threat detection."""
+    def _rule_signal_keys(self, event_data: Dict[str, Any]) -> List[str]:
+        """Redis keys the enabled rules need for this event."""
+        
+        keys = []
+        event_type = event_data.get("event_type")
+        categories = {rule.category for rule in self.detection_rules if rule.enabled}
+        
+        if ThreatCategory.BRUTE_FORCE in categories and event_type == "login_failed":
+            if event_data.get("ip_address"):
+                keys.append(f"failed_logins:{event_data['ip_address']}")
+        
+        user_id = event_data.get("user_id")
+        if ThreatCategory.ACCOUNT_TAKEOVER in categories and event_type == "login_success" and user_id:
+            if event_data.get("location"):
+                keys.append(f"last_location:{user_id}")
+            if event_data.get("user_agent"):
+                keys.append(f"last_device:{user_id}")
+            keys.append(f"password_changed:{user_id}")
+        
+        return keys
+    
+    def _apply_detection_rules(
+        self,
+        event_data: Dict[str, Any],
+        signals: Dict[str, Optional[str]]
+    ) -> List[ThreatIndicator]:
+        """Apply rule-based threat detection against pre-fetched signals."""
         
         threats = []
         
@@ -285,7 +357,7 @@ class ThreatDetectionEngine:
                 continue
             
             try:
-                threat = await self._evaluate_rule(rule, event_data)
+                threat = self._evaluate_rule(rule, event_data, signals)
                 if threat:
                     threats.append(threat)
             except Exception as e:
@@ -293,19 +365,29 @@ class ThreatDetectionEngine:
         
         return threats
     
-    async def _evaluate_rule(self, rule: ThreatDetectionRule, event_data: Dict[str, Any]) -> Optional[ThreatIndicator]:
+    def _evaluate_rule(
+        self,
+        rule: ThreatDetectionRule,
+        event_data: Dict[str, Any],
+        signals: Dict[str, Optional[str]]
+    ) -> Optional[ThreatIndicator]:
         """Evaluate a specific detection rule."""
         
         if rule.category == ThreatCategory.BRUTE_FORCE:
-            return await self._evaluate_brute_force_rule(rule, event_data)
+            return self._evaluate_brute_force_rule(rule, event_data, signals)
         elif rule.category == ThreatCategory.ACCOUNT_TAKEOVER:
-            return await self._evaluate_account_takeover_rule(rule, event_data)
+            return self._evaluate_account_takeover_rule(rule, event_data, signals)
         elif rule.category == ThreatCategory.DATA_EXFILTRATION:
-            return await self._evaluate_data_exfiltration_rule(rule, event_data)
+            return self._evaluate_data_exfiltration_rule(rule, event_data)
         
         return None
     
-    async def _evaluate_brute_force_rule(self, rule: ThreatDetectionRule, event_data: Dict[str, Any]) -> Optional[ThreatIndicator]:
+    def _evaluate_brute_force_rule(
+        self,
+        rule: ThreatDetectionRule,
+        event_data: Dict[str, Any],
+        signals: Dict[str, Optional[str]]
+    ) -> Optional[ThreatIndicator]:
         """Evaluate brute force detection rule."""
         
         if event_data.get("event_type") != "login_failed":
@@ -316,11 +398,9 @@ class ThreatDetectionEngine:
             return None
         
         # Check failed login count
-        window = rule.conditions["failed_logins"]["window"]
         threshold = rule.conditions["failed_logins"]["threshold"]
         
-        key = f"failed_logins:{ip_address}"
-        count = await self.redis_client.get(key)
+        count = signals.get(f"failed_logins:{ip_address}")
         count = int(count) if count else 0
         
         if count >= threshold:
@@ -338,7 +418,12 @@ class ThreatDetectionEngine:
         
         return None 
    
-    async def _evaluate_account_takeover_rule(self, rule: ThreatDetectionRule, event_data: Dict[str, Any]) -> Optional[ThreatIndicator]:
+    def _evaluate_account_takeover_rule(
+        self,
+        rule: ThreatDetectionRule,
+        event_data: Dict[str, Any],
+        signals: Dict[str, Optional[str]]
+    ) -> Optional[ThreatIndicator]:
         """Evaluate account takeover detection rule."""
         
         if event_data.get("event_type") != "login_success":
@@ -355,8 +440,7 @@ class ThreatDetectionEngine:
         # Check location change
         current_location = event_data.get("location")
         if current_location:
-            last_location_key = f"last_location:{user_id}"
-            last_location = await self.redis_client.get(last_location_key)
+            last_location = signals.get(f"last_location:{user_id}")
             
             if last_location and last_location != current_location:
                 indicators.append(f"Location change: {last_location} -> {current_location}")
@@ -365,16 +449,14 @@ class ThreatDetectionEngine:
         # Check device change
         current_device = event_data.get("user_agent")
         if current_device:
-            last_device_key = f"last_device:{user_id}"
-            last_device = await self.redis_client.get(last_device_key)
+            last_device = signals.get(f"last_device:{user_id}")
             
             if last_device and last_device != current_device:
                 indicators.append("New device detected")
                 confidence += 0.3
         
         # Check for recent password change
-        password_change_key = f"password_changed:{user_id}"
-        password_changed = await self.redis_client.get(password_change_key)
+        password_changed = signals.get(f"password_changed:{user_id}")
         
         if password_changed:
             indicators.append("Recent password change detected")
@@ -396,7 +478,7 @@ class ThreatDetectionEngine:
         
         return None
     
-    async def _evaluate_data_exfiltration_rule(self, rule: ThreatDetectionRule, event_data: Dict[str, Any]) -> Optional[ThreatIndicator]:
+    def _evaluate_data_exfiltration_rule(self, rule: ThreatDetectionRule, event_data: Dict[str, Any]) -> Optional[ThreatIndicator]:
         """Evaluate data exfiltration detection rule."""
         
         if event_data.get("event_type") not in ["data_export", "data_download", "api_bulk_request"]:
@@ -426,7 +508,11 @@ class ThreatDetectionEngine:
         
         return None
     
-    async def _analyze_behavioral_anomalies(self, event_data: Dict[str, Any]) -> List[ThreatIndicator]:
+    def _analyze_behavioral_anomalies(
+        self,
+        event_data: Dict[str, Any],
+        profile: CompactProfile
+    ) -> List[ThreatIndicator]:
         """Analyze behavioral anomalies using user profiles."""
         
         threats = []
@@ -436,37 +522,36 @@ class ThreatDetectionEngine:
             return threats
         
         try:
-            user_uuid = UUID(user_id)
-            profile = await self._get_behavioral_profile(user_uuid)
+            user_uuid = UUID(str(user_id))
             
-            if not profile or not profile.baseline_established:
+            if not profile.baseline_established:
                 # Not enough data for behavioral analysis
                 return threats
             
             # Analyze login time anomaly
             current_hour = datetime.now(timezone.utc).hour
-            if profile.typical_login_hours and current_hour not in profile.typical_login_hours:
+            if not profile.is_typical_hour(current_hour):
                 threats.append(ThreatIndicator(
                     category=ThreatCategory.ANOMALOUS_BEHAVIOR,
                     level=ThreatLevel.MEDIUM,
                     confidence=0.6,
                     user_id=user_uuid,
                     description=f"Login at unusual hour: {current_hour}",
-                    indicators=[f"Typical hours: {profile.typical_login_hours}"],
+                    indicators=[f"Typical hours: {profile.typical_hours()}"],
                     recommended_actions=[ResponseAction.ALERT_ONLY]
                 ))
             
             # Analyze location anomaly
             current_location = event_data.get("location")
-            if current_location and profile.typical_locations:
-                if current_location not in profile.typical_locations:
+            if current_location and profile.locations:
+                if not profile.knows_location(current_location):
                     threats.append(ThreatIndicator(
                         category=ThreatCategory.ANOMALOUS_BEHAVIOR,
                         level=ThreatLevel.MEDIUM,
                         confidence=0.7,
                         user_id=user_uuid,
                         description=f"Login from unusual location: {current_location}",
-                        indicators=[f"Typical locations: {profile.typical_locations}"],
+                        indicators=[f"Known locations: {len(profile.locations)}"],
                         recommended_actions=[ResponseAction.REQUIRE_MFA]
                     ))
             
@@ -475,45 +560,49 @@ class ThreatDetectionEngine:
         
         return threats
     
-    async def _detect_ml_anomalies(self, event_data: Dict[str, Any]) -> List[ThreatIndicator]:
-        """Detect anomalies using machine learning models."""
+    def fit_anomaly_model(self, feature_rows: Sequence[Sequence[float]]):
+        """Train the anomaly model on historical feature vectors."""
         
-        threats = []
+        features = self.scaler.fit_transform(np.asarray(feature_rows, dtype=np.float64))
+        self.anomaly_detector.fit(features)
+        self.model_trained = True
+    
+    def _enqueue_ml_analysis(self, event_data: Dict[str, Any]):
+        """Queue an event for micro-batched anomaly scoring."""
         
-        try:
-            # Extract features for ML analysis
-            features = self._extract_ml_features(event_data)
-            
-            if features is None:
-                return threats
-            
-            # Normalize features
-            features_scaled = self.scaler.transform([features])
-            
-            # Predict anomaly
-            anomaly_score = self.anomaly_detector.decision_function(features_scaled)[0]
-            is_anomaly = self.anomaly_detector.predict(features_scaled)[0] == -1
+        features = self._extract_ml_features(event_data)
+        if features is not None and not self.anomaly_scorer.submit(features, (event_data, features)):
+            logger.warning("Anomaly scoring queue full, event dropped", dropped=self.anomaly_scorer.dropped)
+    
+    def _score_anomaly_batch(self, features: np.ndarray) -> np.ndarray:
+        """Anomaly scores for a batch; negative scores are anomalies."""
+        
+        return self.anomaly_detector.decision_function(self.scaler.transform(features))
+    
+    async def _handle_anomaly_scores(self, contexts: List[Tuple[Dict[str, Any], List[float]]], scores: np.ndarray):
+        """Report the anomalous events of a scored batch."""
+        
+        for (event_data, features), anomaly_score in zip(contexts, scores.tolist()):
+            if anomaly_score >= 0:
+                continue
             
-            if is_anomaly:
+            try:
                 # Convert anomaly score to confidence (higher negative score = higher confidence)
                 confidence = min(1.0, abs(anomaly_score) / 2.0)
                 
-                threats.append(ThreatIndicator(
+                await self._send_alert(ThreatIndicator(
                     category=ThreatCategory.ANOMALOUS_BEHAVIOR,
                     level=ThreatLevel.MEDIUM if confidence > 0.7 else ThreatLevel.LOW,
                     confidence=confidence,
-                    user_id=UUID(event_data["user_id"]) if event_data.get("user_id") else None,
+                    user_id=UUID(str(event_data["user_id"])) if event_data.get("user_id") else None,
                     source_ip=event_data.get("ip_address"),
                     description="ML-detected anomalous behavior",
                     indicators=[f"Anomaly score: {anomaly_score:.3f}"],
                     recommended_actions=[ResponseAction.INVESTIGATE],
                     additional_data={"ml_features": features, "anomaly_score": anomaly_score}
                 ))
-        
-        except Exception as e:
-            logger.error("Error in ML anomaly detection", error=str(e))
-        
-        return threats
+            except Exception as e:
+                logger.error("Error in ML anomaly detection", error=str(e))
     
     async def _correlate_threat_intelligence(self, event_data: Dict[str, Any]) -> List[ThreatIndicator]:
         """Correlate event with threat intelligence feeds."""
@@ -525,21 +614,27 @@ class ThreatDetectionEngine:
             return threats
         
         try:
+            # One longest-prefix lookup covers every loaded blocklist range
+            match = self.ip_reputation.lookup(ip_address)
+            
             # Check against known bad IPs
-            if ip_address in self.known_bad_ips:
+            if ip_address in self.known_bad_ips or (match and match.score <= KNOWN_BAD_REPUTATION):
                 threats.append(ThreatIndicator(
                     category=ThreatCategory.MALWARE,
                     level=ThreatLevel.HIGH,
                     confidence=0.9,
                     source_ip=ip_address,
                     description=f"Request from known malicious IP: {ip_address}",
-                    indicators=["IP in threat intelligence feed"],
+                    indicators=[
+                        f"IP in threat intelligence feed: {match.source}/{match.prefix_length}"
+                        if match else "IP in threat intelligence feed"
+                    ],
                     recommended_actions=[ResponseAction.BLOCK_IP],
                     automated_response=ResponseAction.BLOCK_IP
                 ))
+                return threats
             
-            # Check against reputation services (placeholder)
-            reputation_score = await self._check_ip_reputation(ip_address)
+            reputation_score = match.score if match else DEFAULT_IP_REPUTATION
             if reputation_score < 0.3:  # Low reputation
                 threats.append(ThreatIndicator(
                     category=ThreatCategory.MALWARE,
@@ -612,50 +707,58 @@ class ThreatDetectionEngine:
             logger.error("Error extracting ML features", error=str(e))
             return None
     
-    async def _get_behavioral_profile(self, user_id: UUID) -> Optional[BehavioralProfile]:
-        """Get or create behavioral profile for user."""
-        
-        if user_id in self.behavioral_profiles:
-            return self.behavioral_profiles[user_id]
+    def _load_behavioral_profile(self, subject: str, profile_hash: Optional[Dict[Any, Any]]) -> CompactProfile:
+        """Build a profile from its Redis hash (or start a new one) and cache it."""
         
-        # Load from Redis cache
-        profile_key = f"behavioral_profile:{user_id}"
-        profile_data = await self.redis_client.get(profile_key)
-        
-        if profile_data:
+        profile = None
+        if profile_hash:
             try:
-                profile = BehavioralProfile.model_validate_json(profile_data)
-                self.behavioral_profiles[user_id] = profile
-                return profile
+                profile = CompactProfile.from_hash(profile_hash)
             except Exception as e:
                 logger.error("Error loading behavioral profile", error=str(e))
         
-        # Create new profile
-        profile = BehavioralProfile(user_id=user_id)
-        self.behavioral_profiles[user_id] = profile
-        
+        profile = profile or CompactProfile()
+        self.behavioral_profiles.put(subject, profile)
         return profile
     
-    async def _check_ip_reputation(self, ip_address: str) -> float:
-        """Check IP reputation (placeholder implementation)."""
-        
-        # In a real implementation, this would query reputation services
-        # For now, return a random score based on IP characteristics
+    async def flush_behavioral_profiles(self):
+        """Write changed profiles to their Redis hashes."""
         
+        dirty = self.behavioral_profiles.drain_dirty()
         try:
-            # Simple heuristic: private IPs get higher reputation
-            if ip_address.startswith(("192.168.", "10.", "172.")):
-                return 0.8
-            
-            # Check if IP is in known good ranges (placeholder)
-            if ip_address.startswith(("8.8.", "1.1.")):  # Google DNS, Cloudflare
-                return 0.9
-            
-            # Default reputation for unknown IPs
-            return 0.5
+            await persist_profiles(self.redis_client, dirty, self.profile_redis_ttl)
+        except Exception as e:
+            self.behavioral_profiles.restore_dirty(dirty)
+            logger.error("Error persisting behavioral profiles", error=str(e))
+    
+    def _start_background_tasks(self):
+        """Start profile write-behind and anomaly scoring (idempotent)."""
         
-        except Exception:
-            return 0.5
+        if self._profile_flush_task is None or self._profile_flush_task.done():
+            self._profile_flush_task = asyncio.create_task(self._flush_profiles_periodically())
+        if self.model_trained:
+            self.anomaly_scorer.start()
+        self.ip_reputation.start()
+    
+    async def _flush_profiles_periodically(self):
+        while True:
+            await asyncio.sleep(self.profile_flush_interval)
+            await self.flush_behavioral_profiles()
+    
+    async def shutdown(self):
+        """Stop background tasks, scoring queued events and flushing profiles."""
+        
+        if self._profile_flush_task is not None:
+            self._profile_flush_task.cancel()
+            try:
+                await self._profile_flush_task
+            except asyncio.CancelledError:
+                pass
+            self._profile_flush_task = None
+        await self.ip_reputation.stop()
+        await self.anomaly_scorer.stop()
+        await self.anomaly_scorer.flush()
+        await self.flush_behavioral_profiles()
     
     def _threat_score(self, threat: ThreatIndicator) -> float:
         """Calculate threat score for prioritization."""
@@ -790,9 +893,15 @@ class ThreatDetectionEngine:
 
 
 # Dependency functions
+_engine: Optional[ThreatDetectionEngine] = None
+
+
 async def get_threat_detection_engine(
     redis_client: redis.Redis,
     audit_logger: AuditLogger
 ) -> ThreatDetectionEngine:
-    """Get threat detection engine instance."""
-    return ThreatDetectionEngine(redis_client, audit_logger)
\ No newline at end of file
+    """Get the process-wide threat detection engine (profiles and queues are per process)."""
+    global _engine
+    if _engine is None:
+        _engine = ThreatDetectionEngine(redis_client, audit_logger)
+    return _engine
\ No newline at end of file
@@ -0,0 +1,307 @@
+"""
+Runtime state for the threat detection engine.
+
+- ``collect_signals`` fetches every Redis counter the detection rules need,
+  plus an uncached behavioural profile, in one pipelined round trip.
+- ``CompactProfile`` keeps a behavioural profile as a handful of numbers
+  (an hour-of-day histogram, hashed location/device counts and averages)
+  that round-trip through a small Redis hash.
+- ``ProfileCache`` bounds the in-process profiles by size and age and
+  tracks which ones still need writing back to Redis.
+- ``MicroBatchScorer`` takes feature vectors off a bounded queue and scores
+  them in batches in the background, so anomaly scoring never runs on the
+  request path.
+
+Profiles are written back last-writer-wins; concurrent workers observing the
+same user may lose a few observations, which the profile tolerates.
+"""
+
+import asyncio
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import redis.asyncio as redis
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+PROFILE_KEY_PREFIX = "behavioral_profile:"
+
+# Observations required before a profile is used for anomaly detection
+BASELINE_OBSERVATIONS = 20
+# Share of observations an hour needs to count as a typical login hour
+TYPICAL_HOUR_SHARE = 0.02
+# Distinct locations/devices remembered per profile
+MAX_TRACKED_VALUES = 16
+SESSION_DURATION_SMOOTHING = 0.1
+
+
+def profile_key(subject: str) -> str:
+    return f"{PROFILE_KEY_PREFIX}{subject}"
+
+
+def _decode(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def value_hash(value: str) -> int:
+    return zlib.crc32(value.encode())
+
+
+def _encode_counts(counts: Dict[int, int]) -> str:
+    return ",".join(f"{key}:{count}" for key, count in counts.items())
+
+
+def _decode_counts(raw: Optional[str]) -> Dict[int, int]:
+    counts = {}
+    for item in filter(None, (raw or "").split(",")):
+        key, count = item.split(":")
+        counts[int(key)] = int(count)
+    return counts
+
+
+@dataclass
+class CompactProfile:
+    """Behavioural profile reduced to counters and averages."""
+    observations: int = 0
+    hours: List[int] = field(default_factory=lambda: [0] * 24)
+    locations: Dict[int, int] = field(default_factory=dict)
+    devices: Dict[int, int] = field(default_factory=dict)
+    avg_session_duration: float = 0.0
+    last_updated: int = 0
+
+    @property
+    def baseline_established(self) -> bool:
+        return self.observations >= BASELINE_OBSERVATIONS
+
+    @property
+    def confidence_score(self) -> float:
+        return min(1.0, self.observations / (5 * BASELINE_OBSERVATIONS))
+
+    def typical_hours(self) -> List[int]:
+        minimum = max(1, self.observations * TYPICAL_HOUR_SHARE)
+        return [hour for hour, count in enumerate(self.hours) if count >= minimum]
+
+    def is_typical_hour(self, hour: int) -> bool:
+        return self.hours[hour] >= max(1, self.observations * TYPICAL_HOUR_SHARE)
+
+    def knows_location(self, location: str) -> bool:
+        return value_hash(location) in self.locations
+
+    def knows_device(self, device: str) -> bool:
+        return value_hash(device) in self.devices
+
+    def observe(self, event_data: Dict[str, Any], now: Optional[datetime] = None) -> None:
+        """Fold one event into the profile."""
+        now = now or datetime.now(timezone.utc)
+        self.observations += 1
+        self.hours[now.hour] += 1
+        if event_data.get("location"):
+            self._count(self.locations, value_hash(event_data["location"]))
+        if event_data.get("user_agent"):
+            self._count(self.devices, value_hash(event_data["user_agent"]))
+        duration = event_data.get("session_duration")
+        if isinstance(duration, (int, float)) and duration > 0:
+            if self.avg_session_duration:
+                self.avg_session_duration += SESSION_DURATION_SMOOTHING * (duration - self.avg_session_duration)
+            else:
+                self.avg_session_duration = float(duration)
+        self.last_updated = int(now.timestamp())
+
+    @staticmethod
+    def _count(counts: Dict[int, int], key: int) -> None:
+        counts[key] = counts.get(key, 0) + 1
+        if len(counts) > MAX_TRACKED_VALUES:
+            del counts[min(counts, key=counts.get)]
+
+    def to_hash(self) -> Dict[str, str]:
+        return {
+            "n": str(self.observations),
+            "h": ",".join(map(str, self.hours)),
+            "l": _encode_counts(self.locations),
+            "d": _encode_counts(self.devices),
+            "sd": f"{self.avg_session_duration:.3f}",
+            "u": str(self.last_updated),
+        }
+
+    @classmethod
+    def from_hash(cls, data: Dict[Any, Any]) -> "CompactProfile":
+        data = {_decode(key): _decode(value) for key, value in data.items()}
+        hours = [int(count) for count in data["h"].split(",")] if data.get("h") else [0] * 24
+        return cls(
+            observations=int(data.get("n") or 0),
+            hours=hours if len(hours) == 24 else [0] * 24,
+            locations=_decode_counts(data.get("l")),
+            devices=_decode_counts(data.get("d")),
+            avg_session_duration=float(data.get("sd") or 0.0),
+            last_updated=int(data.get("u") or 0),
+        )
+
+
+class ProfileCache:
+    """Size- and age-bounded LRU of profiles with write-behind tracking."""
+
+    def __init__(self, max_size: int = 50000, ttl: float = 900.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[CompactProfile, float]]" = OrderedDict()
+        self._dirty: Dict[str, CompactProfile] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, subject: str) -> Optional[CompactProfile]:
+        # Unflushed changes win over anything that could be re-read from Redis
+        pending = self._dirty.get(subject)
+        entry = self._entries.get(subject)
+        if entry is None:
+            return pending
+        profile, loaded_at = entry
+        if time.monotonic() - loaded_at > self.ttl:
+            del self._entries[subject]
+            return pending
+        self._entries.move_to_end(subject)
+        return profile
+
+    def put(self, subject: str, profile: CompactProfile) -> None:
+        self._entries[subject] = (profile, time.monotonic())
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_size:
+            # Evicted dirty profiles stay in ``_dirty`` until the next flush
+            self._entries.popitem(last=False)
+
+    def mark_dirty(self, subject: str, profile: CompactProfile) -> None:
+        self._dirty[subject] = profile
+
+    def drain_dirty(self) -> Dict[str, CompactProfile]:
+        dirty, self._dirty = self._dirty, {}
+        return dirty
+
+    def restore_dirty(self, profiles: Dict[str, CompactProfile]) -> None:
+        """Re-queue profiles whose write failed, unless they were changed since."""
+        for subject, profile in profiles.items():
+            self._dirty.setdefault(subject, profile)
+
+
+async def collect_signals(
+    redis_client: redis.Redis,
+    keys: Sequence[str],
+    profile_subject: Optional[str] = None
+) -> Tuple[Dict[str, Optional[str]], Optional[Dict[Any, Any]]]:
+    """Rule counters (one MGET) and a profile hash (one HGETALL) in one round trip."""
+    if not keys and profile_subject is None:
+        return {}, None
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        if keys:
+            pipe.mget(list(keys))
+        if profile_subject is not None:
+            pipe.hgetall(profile_key(profile_subject))
+        results = await pipe.execute()
+
+    signals = dict(zip(keys, map(_decode, results[0]))) if keys else {}
+    return signals, (results[-1] if profile_subject is not None else None)
+
+
+async def persist_profiles(
+    redis_client: redis.Redis,
+    profiles: Dict[str, CompactProfile],
+    ttl_seconds: int
+) -> None:
+    """Write profiles back to their Redis hashes in one pipeline."""
+    if not profiles:
+        return
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for subject, profile in profiles.items():
+            key = profile_key(subject)
+            pipe.hset(key, mapping=profile.to_hash())
+            pipe.expire(key, ttl_seconds)
+        await pipe.execute()
+
+
+class MicroBatchScorer:
+    """
+    Background scorer fed from a bounded queue.
+
+    Items are collected until ``batch_size`` is reached or ``max_delay``
+    seconds have passed since the first one, then scored with a single call to
+    ``score_batch`` (run in a worker thread). ``on_scored`` receives each
+    item's context with its score.
+    """
+
+    def __init__(
+        self,
+        score_batch: Callable[[np.ndarray], np.ndarray],
+        on_scored: Callable[[List[Any], np.ndarray], Awaitable[None]],
+        batch_size: int = 64,
+        max_delay: float = 0.05,
+        queue_size: int = 10000
+    ):
+        self.score_batch = score_batch
+        self.on_scored = on_scored
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.queue: "asyncio.Queue[Tuple[Sequence[float], Any]]" = asyncio.Queue(queue_size)
+        self.dropped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, features: Sequence[float], context: Any = None) -> bool:
+        """Queue an item without blocking; returns False if it was dropped."""
+        try:
+            self.queue.put_nowait((features, context))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def flush(self) -> int:
+        """Score everything currently queued; returns the number of items scored."""
+        scored = 0
+        while not self.queue.empty():
+            batch = [self.queue.get_nowait() for _ in range(min(self.batch_size, self.queue.qsize()))]
+            await self._score(batch)
+            scored += len(batch)
+        return scored
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._score(batch)
+
+    async def _score(self, batch: List[Tuple[Sequence[float], Any]]) -> None:
+        try:
+            features = np.asarray([item[0] for item in batch], dtype=np.float64)
+            scores = await asyncio.to_thread(self.score_batch, features)
+            await self.on_scored([item[1] for item in batch], scores)
+        except Exception as e:
+            logger.error("Anomaly scoring batch failed", batch_size=len(batch), error=str(e))
@@ -0,0 +1,386 @@
+"""
+Span sampling, buffering and export.
+
+Tracing is head-sampled: whether a trace is recorded is decided once, when
+its root span starts, from the trace id and the route. The decision rides
+along in the W3C ``traceparent`` flags so every service in the call chain
+makes the same one, and unsampled spans cost little more than generating an
+id. Requests that fail are recorded regardless (tail promotion), so errors
+are never sampled away.
+
+Finished spans are appended to a bounded ring buffer. Appending to a
+``deque`` with ``maxlen`` is atomic, so the request path never takes a lock;
+when the exporter falls behind the oldest spans are overwritten and counted
+as dropped. A background ``SpanExporter`` drains the buffer in batches to a
+JSON-lines file or an OTLP/HTTP endpoint.
+"""
+
+import asyncio
+import json
+import random
+import re
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+TRACEPARENT_PATTERN = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+INVALID_TRACE_ID = "0" * 32
+INVALID_SPAN_ID = "0" * 16
+SAMPLED_FLAG = 0x01
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_getrandbits = random.getrandbits
+
+
+def new_trace_id() -> str:
+    return f"{_getrandbits(128) or 1:032x}"
+
+
+def new_span_id() -> str:
+    return f"{_getrandbits(64) or 1:016x}"
+
+
+def normalize_trace_id(value: Optional[str]) -> Optional[str]:
+    """A 32-hex trace id from a W3C id or a UUID-formatted gateway id."""
+    if not value:
+        return None
+    candidate = value.replace("-", "").lower()
+    if len(candidate) != 32 or candidate == INVALID_TRACE_ID:
+        return None
+    try:
+        int(candidate, 16)
+    except ValueError:
+        return None
+    return candidate
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Parse a W3C ``traceparent`` header into (trace id, parent span id, sampled).
+
+    Returns None for missing or malformed headers, including the all-zero
+    ids and version ``ff`` the spec declares invalid.
+    """
+    if not header:
+        return None
+    match = TRACEPARENT_PATTERN.match(header.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == "ff" or trace_id == INVALID_TRACE_ID or span_id == INVALID_SPAN_ID:
+        return None
+    # Version 00 headers are exactly 55 characters; later versions may append fields
+    if version == "00" and len(header.strip()) != 55:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & SAMPLED_FLAG)
+
+
+def format_traceparent(trace_id: str, span_id: str, sampled: bool) -> str:
+    return f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+
+class TraceSampler:
+    """
+    Parent-based head sampler with per-route rates.
+
+    A sampling decision carried by the parent is honoured. Otherwise the
+    trace is sampled when the low 64 bits of its id fall under the route's
+    rate, so every service sampling at the same rate agrees on the same
+    traces. Route rates match by longest path prefix.
+    """
+
+    def __init__(self, default_rate: float = 0.1, route_rates: Optional[Dict[str, float]] = None):
+        self.default_rate = default_rate
+        self._default_threshold = self._threshold(default_rate)
+        self._routes = sorted(
+            ((prefix, self._threshold(rate)) for prefix, rate in (route_rates or {}).items()),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+
+    @staticmethod
+    def _threshold(rate: float) -> int:
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError("sampling rates must be between 0 and 1")
+        return int(rate * (1 << 64))
+
+    def threshold_for(self, path: str) -> int:
+        for prefix, threshold in self._routes:
+            if path.startswith(prefix):
+                return threshold
+        return self._default_threshold
+
+    def should_sample(self, trace_id: str, path: str = "", parent_sampled: Optional[bool] = None) -> bool:
+        if parent_sampled is not None:
+            return parent_sampled
+        return int(trace_id[16:], 16) < self.threshold_for(path)
+
+
+class SpanRecord(NamedTuple):
+    """A finished span as it is buffered and exported."""
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    name: str
+    service: str
+    start_time: float
+    end_time: float
+    kind: int
+    status: int
+    attributes: Dict[str, Any]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "service": self.service,
+            "start_time": self.start_time,
+            "duration_ms": round((self.end_time - self.start_time) * 1000, 3),
+            "kind": "server" if self.kind == SPAN_KIND_SERVER else "internal",
+            "status": "error" if self.status == STATUS_ERROR else "ok",
+            "attributes": self.attributes,
+        }
+
+
+class SpanBuffer:
+    """Bounded ring buffer of finished spans; the oldest are overwritten when full."""
+
+    def __init__(self, capacity: int = 8192):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._spans: deque = deque(maxlen=capacity)
+        self.recorded = 0
+        self.drained = 0
+
+    def record(self, span: SpanRecord) -> None:
+        self._spans.append(span)
+        self.recorded += 1
+
+    def drain(self, max_spans: int) -> List[SpanRecord]:
+        """Remove and return up to ``max_spans`` of the oldest spans."""
+        spans = []
+        popleft = self._spans.popleft
+        try:
+            for _ in range(max_spans):
+                spans.append(popleft())
+        except IndexError:
+            pass
+        self.drained += len(spans)
+        return spans
+
+    @property
+    def dropped(self) -> int:
+        """Spans overwritten before they were drained."""
+        return max(0, self.recorded - self.drained - len(self._spans))
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+
+class FileSpanSink:
+    """Appends spans to a local JSON-lines file."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    async def export(self, spans: List[SpanRecord]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        await asyncio.to_thread(self._write, lines)
+
+    def _write(self, lines: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(lines)
+
+    async def close(self) -> None:
+        pass
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def otlp_payload(spans: List[SpanRecord], resource_attributes: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Encode spans as an OTLP/JSON ``ExportTraceServiceRequest``, one resource per service."""
+    by_service: Dict[str, List[Dict[str, Any]]] = {}
+    for span in spans:
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": span.kind,
+            "startTimeUnixNano": str(int(span.start_time * 1e9)),
+            "endTimeUnixNano": str(int(span.end_time * 1e9)),
+            "attributes": _otlp_attributes(span.attributes),
+            "status": {"code": span.status},
+        }
+        if span.parent_span_id:
+            encoded["parentSpanId"] = span.parent_span_id
+        by_service.setdefault(span.service, []).append(encoded)
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": _otlp_attributes({**(resource_attributes or {}), "service.name": service})
+                },
+                "scopeSpans": [{"scope": {"name": "givemejobs.tracing"}, "spans": encoded_spans}],
+            }
+            for service, encoded_spans in by_service.items()
+        ]
+    }
+
+
+class OTLPSpanSink:
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        resource_attributes: Optional[Dict[str, str]] = None,
+        timeout: float = 5.0,
+        client: Optional[httpx.AsyncClient] = None
+    ):
+        self.endpoint = endpoint
+        self.resource_attributes = resource_attributes or {}
+        self._client = client or httpx.AsyncClient(timeout=timeout)
+
+    async def export(self, spans: List[SpanRecord]) -> None:
+        response = await self._client.post(self.endpoint, json=otlp_payload(spans, self.resource_attributes))
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class SpanExporter:
+    """
+    Drains a ``SpanBuffer`` in the background and hands batches to a sink.
+
+    A batch that fails to export is dropped and counted rather than retried,
+    so a collector outage cannot back up into the request path.
+    """
+
+    def __init__(self, buffer: SpanBuffer, sink, batch_size: int = 512, interval: float = 2.0):
+        self.buffer = buffer
+        self.sink = sink
+        self.batch_size = batch_size
+        self.interval = interval
+        self.exported = 0
+        self.failed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._export_loop())
+
+    async def stop(self) -> None:
+        """Stop the loop, flush what is left and close the sink."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await self.sink.close()
+
+    async def flush(self) -> int:
+        """Export everything currently buffered; returns the number of spans exported."""
+        exported = 0
+        while True:
+            batch = self.buffer.drain(self.batch_size)
+            if not batch:
+                return exported
+            try:
+                await self.sink.export(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.warning("Span export failed", error=str(e), spans=len(batch))
+                return exported
+            exported += len(batch)
+            self.exported += len(batch)
+
+    async def _export_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.sleep(self.interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Error exporting spans", error=str(e))
+
+
+_span_buffer: Optional[SpanBuffer] = None
+_trace_sampler: Optional[TraceSampler] = None
+_span_exporter: Optional[SpanExporter] = None
+
+
+def get_span_buffer() -> SpanBuffer:
+    """The process-wide span buffer, sized from the monitoring settings on first use."""
+    global _span_buffer
+    if _span_buffer is None:
+        from .config import get_settings
+        _span_buffer = SpanBuffer(get_settings().monitoring.tracing_buffer_size)
+    return _span_buffer
+
+
+def get_trace_sampler() -> TraceSampler:
+    """The process-wide sampler, built from the monitoring settings on first use."""
+    global _trace_sampler
+    if _trace_sampler is None:
+        from .config import get_settings
+        monitoring = get_settings().monitoring
+        _trace_sampler = TraceSampler(monitoring.otel_sampling_rate, monitoring.tracing_route_sample_rates)
+    return _trace_sampler
+
+
+def get_span_exporter() -> Optional[SpanExporter]:
+    return _span_exporter
+
+
+def init_span_exporter(monitoring) -> Optional[SpanExporter]:
+    """Build the exporter configured by ``MonitoringSettings``; None when export is off."""
+    global _span_exporter
+    if monitoring.tracing_exporter == "file":
+        sink = FileSpanSink(monitoring.tracing_export_path)
+    elif monitoring.tracing_exporter == "otlp":
+        sink = OTLPSpanSink(monitoring.tracing_otlp_endpoint, monitoring.otel_resource_attributes)
+    else:
+        _span_exporter = None
+        return None
+
+    _span_exporter = SpanExporter(
+        get_span_buffer(),
+        sink,
+        batch_size=monitoring.tracing_export_batch_size,
+        interval=monitoring.tracing_export_interval,
+    )
+    return _span_exporter
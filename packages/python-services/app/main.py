@@ -78,6 +78,13 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     await metrics_collector.start_collection()
     logger.info("Metrics collector initialized")
     
+    # Start span export
+    from app.core.tracing import init_span_exporter
+    span_exporter = init_span_exporter(settings.monitoring)
+    if span_exporter:
+        await span_exporter.start()
+        logger.info("Span exporter started", exporter=settings.monitoring.tracing_exporter)
+    
     # Additional startup tasks
     logger.info("Application startup completed")
     
@@ -92,6 +99,12 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     if metrics_collector:
         await metrics_collector.stop_collection()
     
+    # Flush buffered spans
+    from app.core.tracing import get_span_exporter
+    span_exporter = get_span_exporter()
+    if span_exporter:
+        await span_exporter.stop()
+    
     await shutdown_database()
     logger.info("Application shutdown completed")
 
@@ -19,7 +19,8 @@ from app.tasks.background_analytics import (
     update_skill_scores_batch,
     calculate_job_match_scores_batch,
     cleanup_expired_data,
-    archive_old_jobs
+    archive_old_jobs,
+    feed_platform_statistics
 )
 
 settings = get_settings()
@@ -73,18 +74,12 @@ class AnalyticsManager:
             # Calculate number of batches needed
             num_batches = (total_users + batch_size - 1) // batch_size
             
-            # Create batched analytics tasks
-            analytics_tasks = []
+            # User analytics refresh only changed users and chunk themselves,
+            # so a single task covers every user
+            analytics_tasks = [calculate_user_analytics_batch.s(batch_size)]
             skill_score_tasks = []
             
             for i in range(num_batches):
-                offset = i * batch_size
-                
-                # User analytics batch
-                analytics_tasks.append(
-                    calculate_user_analytics_batch.s(batch_size, offset)
-                )
-                
                 # Skill scores batch (smaller batch size for intensive processing)
                 skill_batch_size = min(batch_size // 2, 50)
                 if i * skill_batch_size < total_users:
@@ -158,25 +153,23 @@ class AnalyticsManager:
                 "analytics_stats": self.analytics_stats
             }
     
-    async def run_user_analytics_only(self, batch_size: int = 100, offset: int = 0) -> Dict[str, Any]:
+    async def run_user_analytics_only(self, batch_size: int = 500) -> Dict[str, Any]:
         """
         Run user analytics calculation only.
         
         Args:
-            batch_size: Number of users to process
-            offset: Offset for pagination
+            batch_size: Number of users refreshed per chunk
             
         Returns:
             Dict containing analytics results
         """
         logger.info(
             "Starting user analytics calculation",
-            batch_size=batch_size,
-            offset=offset
+            batch_size=batch_size
         )
         
         try:
-            result = calculate_user_analytics_batch.apply_async(args=[batch_size, offset])
+            result = calculate_user_analytics_batch.apply_async(args=[batch_size])
             task_result = result.get(timeout=600)  # 10 minutes timeout
             
             logger.info(
@@ -200,6 +193,39 @@ class AnalyticsManager:
                 "error": str(e)
             }
     
+    async def run_platform_stats_backfill(self, batch_size: int = 500) -> Dict[str, Any]:
+        """
+        Count every existing application into the platform statistics.
+        
+        Safe to rerun: applications the feed has already counted are skipped.
+        
+        Args:
+            batch_size: Number of applications read per query
+            
+        Returns:
+            Dict containing backfill results
+        """
+        logger.info("Starting platform statistics backfill", batch_size=batch_size)
+        
+        try:
+            result = feed_platform_statistics.apply_async(kwargs={"full": True, "batch_size": batch_size})
+            task_result = result.get(timeout=3600)  # 1 hour timeout
+            
+            logger.info("Platform statistics backfill completed", result=task_result)
+            
+            return {
+                "status": "success",
+                "result": task_result
+            }
+            
+        except Exception as e:
+            logger.error("Platform statistics backfill failed", error=str(e))
+            
+            return {
+                "status": "failed",
+                "error": str(e)
+            }
+    
     async def run_skill_scores_update(self, batch_size: int = 50, offset: int = 0) -> Dict[str, Any]:
         """
         Run skill scores update only.
@@ -570,12 +596,18 @@ async def get_analytics_status_cli():
     print(json.dumps(status, indent=2))
 
 
-async def run_user_analytics_cli(batch_size: int = 100):
+async def run_user_analytics_cli(batch_size: int = 500):
     """CLI function to run user analytics only."""
     result = await analytics_manager.run_user_analytics_only(batch_size)
     print(json.dumps(result, indent=2))
 
 
+async def run_platform_stats_backfill_cli(batch_size: int = 500):
+    """CLI function to backfill the platform statistics."""
+    result = await analytics_manager.run_platform_stats_backfill(batch_size)
+    print(json.dumps(result, indent=2))
+
+
 async def run_cleanup_cli(days_to_keep: int = 90):
     """CLI function to run data cleanup."""
     result = await analytics_manager.run_data_cleanup(days_to_keep)
@@ -592,6 +624,7 @@ if __name__ == "__main__":
         print("  status - Get analytics status")
         print("  run-user-analytics [batch_size] - Run user analytics only")
         print("  run-cleanup [days_to_keep] - Run data cleanup")
+        print("  backfill-platform-stats [batch_size] - Count existing applications into platform statistics")
         sys.exit(1)
     
     command = sys.argv[1]
@@ -606,6 +639,9 @@ if __name__ == "__main__":
     elif command == "run-cleanup":
         days_to_keep = int(sys.argv[2]) if len(sys.argv) > 2 else 90
         asyncio.run(run_cleanup_cli(days_to_keep))
+    elif command == "backfill-platform-stats":
+        batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+        asyncio.run(run_platform_stats_backfill_cli(batch_size))
     else:
         print(f"Unknown command: {command}")
         sys.exit(1)
\ No newline at end of file
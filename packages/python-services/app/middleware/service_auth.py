@@ -6,7 +6,7 @@ between Node.js and Python services.
 """
 
 import jwt
-from datetime import datetime, timezone
+import redis.asyncio as redis
 from typing import Optional, Dict, Any, List
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -15,6 +15,11 @@ from starlette.responses import Response
 
 from app.core.config import get_settings
 from app.core.logging import get_logger
+from app.core.service_tokens import (
+    RevokedTokenError,
+    ServiceTokenVerifier,
+    get_service_token_verifier,
+)
 
 logger = get_logger(__name__)
 security = HTTPBearer(auto_error=False)
@@ -33,18 +38,28 @@ class ServiceTokenPayload:
 class ServiceAuthMiddleware(BaseHTTPMiddleware):
     """Middleware to authenticate service-to-service requests"""
     
-    def __init__(self, app, require_auth: bool = True):
+    def __init__(
+        self,
+        app,
+        require_auth: bool = True,
+        verifier: Optional[ServiceTokenVerifier] = None,
+        redis_client=None
+    ):
         super().__init__(app)
         self.require_auth = require_auth
         self.settings = get_settings()
-        self.service_secret = self.settings.jwt_secret + "_service"
-        self.token_blacklist: set = set()  # In production, use Redis
+        self.verifier = verifier or get_service_token_verifier(
+            redis_client or redis.from_url(self.settings.redis.url)
+        )
         
     async def dispatch(self, request: Request, call_next):
         # Skip authentication for health checks and docs
         if request.url.path in ['/health', '/docs', '/redoc', '/openapi.json']:
             return await call_next(request)
         
+        # Key rotation and revocation sync run in the background
+        await self.verifier.start()
+        
         # Extract and validate service token
         service_payload = await self._validate_service_token(request)
         
@@ -82,29 +97,16 @@ class ServiceAuthMiddleware(BaseHTTPMiddleware):
             
             token = auth_header[7:]  # Remove 'Bearer ' prefix
             
-            # Check if token is blacklisted
-            if token in self.token_blacklist:
-                logger.warning("Blacklisted token used", extra={
-                    'correlation_id': request.headers.get('x-correlation-id')
-                })
-                return None
-            
-            # Decode and validate token
-            payload = jwt.decode(
-                token,
-                self.service_secret,
-                algorithms=['HS256']
-            )
-            
-            # Validate token expiration
-            if payload.get('exp', 0) < datetime.now(timezone.utc).timestamp():
-                logger.warning("Expired token used", extra={
-                    'correlation_id': request.headers.get('x-correlation-id')
-                })
-                return None
+            # Verified tokens are cached; exp/nbf and revocation are always checked
+            payload = await self.verifier.verify(token)
             
             return ServiceTokenPayload(payload)
             
+        except RevokedTokenError:
+            logger.warning("Revoked token used", extra={
+                'correlation_id': request.headers.get('x-correlation-id')
+            })
+            return None
         except jwt.ExpiredSignatureError:
             logger.warning("Expired JWT token", extra={
                 'correlation_id': request.headers.get('x-correlation-id')
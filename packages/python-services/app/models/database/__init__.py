@@ -2,7 +2,7 @@
 
 from .base import Base
 from .user import UserModel, SkillModel, ExperienceModel, EducationModel, UserProfileModel
-from .job import JobModel, JobAnalyticsModel
+from .job import JobModel, JobAnalyticsModel, JobRequirementExtractionModel
 from .application import ApplicationModel
 
 __all__ = [
@@ -14,5 +14,6 @@ __all__ = [
     "UserProfileModel",
     "JobModel",
     "JobAnalyticsModel",
+    "JobRequirementExtractionModel",
     "ApplicationModel",
 ]
\ No newline at end of file
@@ -321,6 +321,8 @@ class AuditLog(Base):
     """Audit log model for security monitoring."""
     
     __tablename__ = "audit_logs"
+    # Monthly range partitions, see app.core.partitioning
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
     
     id: Mapped[UUID] = mapped_column(
         PostgresUUID(as_uuid=True), 
@@ -353,9 +355,10 @@ class AuditLog(Base):
     success: Mapped[bool] = mapped_column(Boolean, nullable=False)
     error_message: Mapped[str] = mapped_column(Text, nullable=True)
     
-    # Timestamp
+    # Timestamp; the partition key, so part of the primary key
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), 
+        primary_key=True,
         server_default=func.now()
     )
     
@@ -370,6 +373,8 @@ class SecurityEvent(Base):
     """Security event model for threat detection."""
     
     __tablename__ = "security_events"
+    # Monthly range partitions, see app.core.partitioning
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
     
     id: Mapped[UUID] = mapped_column(
         PostgresUUID(as_uuid=True), 
@@ -409,9 +414,10 @@ class SecurityEvent(Base):
     resolved_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
     resolution_notes: Mapped[str] = mapped_column(Text, nullable=True)
     
-    # Timestamps
+    # Timestamps; created_at is the partition key, so part of the primary key
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), 
+        primary_key=True,
         server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
@@ -3,7 +3,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, Integer, String, Text
+from sqlalchemy import Boolean, DateTime, Integer, String, Text, func
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -97,4 +97,27 @@ class JobAnalyticsModel(Base, TimestampedMixin):
         ARRAY(String), 
         default=[], 
         nullable=False
-    )
\ No newline at end of file
+    )
+
+class JobRequirementExtractionModel(Base):
+    """Structured requirement extraction keyed by job-description digest."""
+    
+    __tablename__ = "job_requirement_extractions"
+    
+    # SHA-256 of prompt version, model and normalised job description
+    digest: Mapped[str] = mapped_column(String(64), primary_key=True)
+    prompt_version: Mapped[str] = mapped_column(String(50), nullable=False)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    requirements: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
@@ -0,0 +1,84 @@
+"""
+Per-user application data versions and status change log.
+
+Written by the application feed and read by the analytics engine; kept
+apart from the columnar frames so the feed does not import pandas:
+
+- ``analytics:applications:{user_id}:version`` counter bumped on every change
+- ``analytics:applications:{user_id}:changes`` list of the recent status
+  changes, each tagged with the version it produced
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+
+
+KEY_PREFIX = "analytics:applications"
+# Changes older than this many versions force a rebuild instead of a replay
+MAX_CHANGES = 200
+CHANGES_TTL_SECONDS = 30 * 86400
+
+
+def _key(user_id: str, suffix: str) -> str:
+    return f"{KEY_PREFIX}:{user_id}:{suffix}"
+
+
+def _decode(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class ApplicationChangeLog:
+    """Per-user data versions and recent status changes, kept in Redis."""
+
+    def __init__(self, redis_client: redis.Redis, max_changes: int = MAX_CHANGES):
+        self.redis = redis_client
+        self.max_changes = max_changes
+
+    async def version(self, user_id: str) -> int:
+        return int(await self.redis.get(_key(user_id, "version")) or 0)
+
+    async def invalidate(self, user_id: str) -> int:
+        """Bump the version without a replayable change, forcing cached frames to rebuild."""
+        version = await self.redis.incr(_key(user_id, "version"))
+        await self.redis.expire(_key(user_id, "version"), CHANGES_TTL_SECONDS)
+        return version
+
+    async def record_status_change(
+        self,
+        user_id: str,
+        application_id: str,
+        status: Any,
+        response_time_days: Optional[float] = None,
+    ) -> int:
+        """Bump the user's version and keep the change for frames to replay."""
+        version = await self.invalidate(user_id)
+        change = json.dumps({
+            "version": version,
+            "application_id": str(application_id),
+            "status": getattr(status, "value", status),
+            "response_time_days": response_time_days,
+        })
+        changes_key = _key(user_id, "changes")
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.rpush(changes_key, change)
+        pipe.ltrim(changes_key, -self.max_changes, -1)
+        pipe.expire(changes_key, CHANGES_TTL_SECONDS)
+        await pipe.execute()
+        return version
+
+    async def changes_between(self, user_id: str, since: int, until: int) -> Optional[List[Dict[str, Any]]]:
+        """Changes producing versions ``since + 1 .. until`` in order, or None if any is missing."""
+        if until < since:
+            return None
+        if until == since:
+            return []
+        entries = [json.loads(_decode(raw)) for raw in await self.redis.lrange(_key(user_id, "changes"), 0, -1)]
+        changes = sorted(
+            (entry for entry in entries if since < entry["version"] <= until),
+            key=lambda entry: entry["version"],
+        )
+        if [entry["version"] for entry in changes] != list(range(since + 1, until + 1)):
+            return None
+        return changes
@@ -0,0 +1,268 @@
+"""
+Application feed for the incrementally maintained analytics counters.
+
+Applications are written to the shared ``applications`` table by the API
+backend, so the counters follow the table instead of a service call. Each
+run reads the applications updated since the previous run in
+``(updated_at, id)`` order and folds them into ``PlatformStatistics``, the
+submission rate of ``ActivityCounters`` and the per-user data versions of
+``ApplicationChangeLog`` that cached application frames are checked against:
+
+- ``platform_stats:feed:watermark`` ``updated_at`` of the last row read
+- ``platform_stats:feed:statuses`` hash of application id -> the status it
+  was last counted with, so a row read twice is counted once
+- ``platform_stats:feed:lock`` held by the run in progress
+
+Each run starts ``SAFETY_WINDOW`` before the watermark, since a transaction
+can commit an ``updated_at`` older than rows a previous run already read.
+The first run, or a full one, starts from the oldest application and so
+backfills every existing application. Deleted applications leave no row to
+read; cached frames drop them when they expire.
+
+Jobs carry no experience level column, so the level segment of an
+application is read from its job title ("Senior Data Engineer" counts
+towards ``level:senior``); titles without a seniority word count towards
+no level.
+"""
+
+import re
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.activity_counters import (
+    APPLICATION_SUBMITTED,
+    EVENT_RETENTION_SECONDS,
+    EVENT_WINDOW_SECONDS,
+    ActivityCounters,
+)
+from app.core.logging import get_logger
+from .application_changes import ApplicationChangeLog
+from .platform_stats import KEY_PREFIX, PlatformStatistics
+
+logger = get_logger(__name__)
+
+
+FEED_KEY_PREFIX = f"{KEY_PREFIX}:feed"
+WATERMARK_KEY = f"{FEED_KEY_PREFIX}:watermark"
+STATUSES_KEY = f"{FEED_KEY_PREFIX}:statuses"
+LOCK_KEY = f"{FEED_KEY_PREFIX}:lock"
+
+# Rows committed this long after a later ``updated_at`` was read are still seen
+SAFETY_WINDOW = timedelta(minutes=5)
+# A run that has not finished within this long loses the lock
+LOCK_TTL_SECONDS = 600
+
+# KEYS[1] lock; ARGV[1] run id. Releases the lock only if the run still holds it.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# Seniority words in job titles, by the experience level they name
+TITLE_LEVELS = {
+    "intern": "entry", "internship": "entry", "trainee": "entry",
+    "graduate": "entry", "entry": "entry",
+    "junior": "junior", "jr": "junior",
+    "associate": "associate",
+    "senior": "senior", "sr": "senior",
+    "lead": "lead", "staff": "lead",
+    "principal": "principal",
+    "director": "director", "head": "director",
+    "vp": "vp",
+    "chief": "executive", "cto": "executive", "cfo": "executive", "ceo": "executive",
+}
+# Most senior last; a title naming several levels counts towards the most senior
+LEVEL_ORDER = (
+    "entry", "junior", "associate", "senior", "lead", "principal", "director", "vp", "executive"
+)
+
+
+def title_level(title: Optional[str]) -> Optional[str]:
+    """The experience level a job title names, if any."""
+    words = re.findall(r"[a-z]+", (title or "").lower())
+    levels = {TITLE_LEVELS[word] for word in words if word in TITLE_LEVELS}
+    return max(levels, key=LEVEL_ORDER.index) if levels else None
+
+
+def _decode(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    # SQLite hands timestamps back as text
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _timestamp(value: datetime) -> float:
+    # Application timestamps are written with ``datetime.utcnow()``
+    return (value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value).timestamp()
+
+
+def _feed_statement(bounded: bool, resume: bool):
+    """
+    The next ``:batch_size`` applications in ``(updated_at, id)`` order:
+    from ``:since``, after ``(:since, :after_id)`` when resuming, or from
+    the oldest application when unbounded.
+    """
+    if resume:
+        position = "WHERE a.updated_at > :since OR (a.updated_at = :since AND a.id > :after_id)"
+    elif bounded:
+        position = "WHERE a.updated_at >= :since"
+    else:
+        position = ""
+    return text(f"""
+        SELECT a.id, a.user_id, a.status, a.created_at, a.updated_at,
+               a.applied_date, a.response_date, j.industry, j.title
+        FROM applications a
+        LEFT JOIN jobs j ON j.id = a.job_id
+        {position}
+        ORDER BY a.updated_at, a.id
+        LIMIT :batch_size
+    """)
+
+
+@dataclass
+class ApplicationFeedRun:
+    """What one feed run read and counted."""
+    rows_read: int = 0
+    applications_added: int = 0
+    status_changes: int = 0
+    locked: bool = False
+
+
+class ApplicationFeed:
+    """Folds application rows into the analytics counters exactly once."""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        platform_stats: PlatformStatistics,
+        activity: ActivityCounters,
+        application_changes: ApplicationChangeLog,
+        batch_size: int = 500
+    ):
+        self.redis_client = redis_client
+        self.platform_stats = platform_stats
+        self.activity = activity
+        self.application_changes = application_changes
+        self.batch_size = max(batch_size, 1)
+        self._release_lock = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+
+    async def run(self, session: AsyncSession, full: bool = False) -> ApplicationFeedRun:
+        """
+        Read applications changed since the last run; ``full`` rereads all of them.
+
+        Returns a run with ``locked`` set, having read nothing, while another
+        run holds the lock.
+        """
+        run_id = uuid.uuid4().hex
+        if not await self.redis_client.set(LOCK_KEY, run_id, nx=True, ex=LOCK_TTL_SECONDS):
+            return ApplicationFeedRun(locked=True)
+
+        try:
+            return await self._run(session, full)
+        finally:
+            await self._release_lock(keys=[LOCK_KEY], args=[run_id])
+
+    async def _run(self, session: AsyncSession, full: bool) -> ApplicationFeedRun:
+        result = ApplicationFeedRun()
+        stored = await self.redis_client.get(WATERMARK_KEY)
+        watermark = _as_datetime(_decode(stored)) if stored else None
+        since = watermark - SAFETY_WINDOW if watermark and not full else None
+        after_id = None
+
+        while True:
+            params = {"since": since, "after_id": after_id, "batch_size": self.batch_size}
+            statement = _feed_statement(bounded=since is not None, resume=after_id is not None)
+            rows = (await session.execute(statement, params)).fetchall()
+            if not rows:
+                break
+
+            await self._fold(rows, result)
+            since, after_id = _as_datetime(rows[-1].updated_at), rows[-1].id
+            # Rereads, and the whole of a full run, never move the watermark back
+            if watermark is None or since > watermark:
+                watermark = since
+                await self.redis_client.set(WATERMARK_KEY, watermark.isoformat())
+            if len(rows) < self.batch_size:
+                break
+
+        logger.info(
+            "Application feed run completed",
+            rows_read=result.rows_read,
+            applications_added=result.applications_added,
+            status_changes=result.status_changes,
+            full=full,
+        )
+        return result
+
+    async def _fold(self, rows: List[Any], result: ApplicationFeedRun) -> None:
+        """
+        Count each row's application or status change once.
+
+        A row's status is marked counted right after it is recorded, so a
+        run that dies in between recounts at most that one row. Recent
+        submissions go to the activity rates per minute once the batch is done.
+        """
+        ids = [str(row.id) for row in rows]
+        statuses = await self.redis_client.hmget(STATUSES_KEY, ids)
+        counted: Dict[str, Optional[str]] = dict(zip(ids, map(_decode, statuses)))
+        # Submissions still inside the rate retention, by the minute they were made
+        submitted = Counter()
+        retained_since = datetime.now(timezone.utc).timestamp() - EVENT_RETENTION_SECONDS
+
+        for application_id, row in zip(ids, rows):
+            result.rows_read += 1
+            status = getattr(row.status, "value", row.status)
+            previous = counted[application_id]
+            if previous == status:
+                continue
+
+            user_id = str(row.user_id)
+            level = title_level(row.title)
+            submitted_at = _as_datetime(row.applied_date) or _as_datetime(row.created_at)
+            changed_at = _as_datetime(row.response_date) or _as_datetime(row.updated_at)
+            if previous is None:
+                await self.platform_stats.record_application(
+                    user_id, industry=row.industry, level=level, submitted_at=submitted_at
+                )
+                # A new application cannot be replayed into a cached frame
+                await self.application_changes.invalidate(user_id)
+                result.applications_added += 1
+                created_at = _timestamp(_as_datetime(row.created_at))
+                if created_at >= retained_since:
+                    submitted[created_at - created_at % EVENT_WINDOW_SECONDS] += 1
+            if await self.platform_stats.record_status_change(
+                previous,
+                status,
+                industry=row.industry,
+                level=level,
+                submitted_at=submitted_at,
+                changed_at=changed_at
+            ):
+                result.status_changes += 1
+            if previous is not None:
+                response_time_days = None
+                if row.response_date is not None and submitted_at is not None:
+                    response_time_days = (changed_at - submitted_at).total_seconds() / 86400
+                await self.application_changes.record_status_change(
+                    user_id, application_id, status, response_time_days
+                )
+
+            await self.redis_client.hset(STATUSES_KEY, application_id, status)
+            counted[application_id] = status
+
+        for minute, count in submitted.items():
+            await self.activity.record(APPLICATION_SUBMITTED, count, now=minute)
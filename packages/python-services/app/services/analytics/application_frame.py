@@ -0,0 +1,258 @@
+"""
+Columnar per-user application frames for application insights.
+
+A user's applications are loaded once into an ``ApplicationFrame``: one
+array per column, statuses as small integer codes, and the groupings the
+insights use (week, weekday, hour, industry, company size, status) as
+category codes derived up front. Every count the metrics, insights, trend
+and visualization views need comes from one grouped pass: each application
+adds its measures to one slot per grouping in a single ``bincount`` over
+all groupings at once. When an application changes status its measures are
+subtracted from its slots and added back under the new status, so the
+totals are never recomputed for it.
+
+Cached frames are checked against the per-user data version kept by
+``ApplicationChangeLog``: a frame a few versions behind catches up by
+replaying the logged changes; a gap (an application added or removed, or
+changes trimmed away) means a rebuild.
+"""
+
+import calendar
+import copy
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .platform_stats import INTERVIEWED_STATUSES, OFFERED_STATUSES, RESPONDED_STATUSES
+
+# Status vocabularies of both the application model and the analytics frames
+STATUSES = (
+    "draft", "submitted", "applied", "screening", "under_review",
+    "interview_scheduled", "interview_completed", "offer_received",
+    "offer_accepted", "offer_declined", "accepted", "rejected", "withdrawn",
+)
+UNKNOWN_STATUS = len(STATUSES)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+
+def _status_mask(statuses: frozenset) -> np.ndarray:
+    return np.array([status in statuses for status in STATUSES] + [False])
+
+
+RESPONDED = _status_mask(RESPONDED_STATUSES)
+SUCCEEDED = _status_mask(INTERVIEWED_STATUSES)
+OFFERED = _status_mask(OFFERED_STATUSES)
+
+GROUPINGS = ("total", "week", "day_of_week", "hour", "industry", "company_size", "status")
+MEASURES = (
+    "applications", "responded", "succeeded", "offered",
+    "response_count", "response_sum", "match_count", "match_sum",
+)
+
+def status_code(status: Any) -> int:
+    return STATUS_CODES.get(getattr(status, "value", status), UNKNOWN_STATUS)
+
+
+def _status_values(statuses: pd.Series) -> pd.Series:
+    return statuses.map(lambda status: getattr(status, "value", status))
+
+
+def _categories(values: Optional[pd.Series], length: int) -> tuple:
+    """Category codes (-1 for missing) and the category labels."""
+    if values is None:
+        return np.full(length, -1, dtype=np.int64), pd.Index([])
+    categorical = pd.Categorical(values)
+    return categorical.codes.astype(np.int64), categorical.categories
+
+
+def _float_column(df: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float, na_value=np.nan, copy=True)
+
+
+class ApplicationFrame:
+    """One user's applications as columns, with incrementally maintained group totals."""
+
+    def __init__(self, frame: pd.DataFrame, version: Optional[int] = None):
+        self.frame = frame.reset_index(drop=True)
+        self.version = version
+        length = len(self.frame)
+
+        if "status" in self.frame.columns:
+            self.frame["status"] = pd.Categorical(_status_values(self.frame["status"]))
+            codes = pd.Categorical(self.frame["status"], categories=STATUSES).codes
+            self.status = np.where(codes < 0, UNKNOWN_STATUS, codes).astype(np.int64)
+        else:
+            self.status = np.full(length, UNKNOWN_STATUS, dtype=np.int64)
+        self.response_time = _float_column(self.frame, "response_time_days")
+        self.match_score = _float_column(self.frame, "match_score")
+
+        codes = {"total": np.zeros(length, dtype=np.int64), "status": self.status}
+        labels = {"total": pd.Index(["all"]), "status": pd.Index(list(STATUSES) + ["unknown"])}
+
+        self.has_dates = "applied_date" in self.frame.columns
+        if self.has_dates:
+            applied = pd.to_datetime(self.frame["applied_date"])
+            self.applied_at = applied.to_numpy()
+            self.date_order = np.argsort(self.applied_at, kind="stable")
+            weeks, codes["week"] = np.unique(applied.dt.to_period("W").array.asi8, return_inverse=True)
+            labels["week"] = pd.PeriodIndex.from_ordinals(weeks, freq="W")
+            codes["day_of_week"] = applied.dt.dayofweek.to_numpy(dtype=np.int64)
+            labels["day_of_week"] = pd.Index(list(calendar.day_name))
+            codes["hour"] = applied.dt.hour.to_numpy(dtype=np.int64)
+            labels["hour"] = pd.RangeIndex(24)
+        else:
+            self.applied_at = None
+            self.date_order = np.arange(length)
+            for grouping in ("week", "day_of_week", "hour"):
+                codes[grouping], labels[grouping] = np.full(length, -1, dtype=np.int64), pd.Index([])
+
+        self.has_industry = "industry" in self.frame.columns
+        self.has_company_size = "company_size" in self.frame.columns
+        for grouping in ("industry", "company_size"):
+            codes[grouping], labels[grouping] = _categories(self.frame.get(grouping), length)
+
+        # Each grouping owns a contiguous range of slots; the last slot collects missing values
+        self.labels = labels
+        self.offsets = {}
+        offset = 0
+        for grouping in GROUPINGS:
+            self.offsets[grouping] = offset
+            offset += len(labels[grouping])
+        self._missing_slot = offset
+        self._codes = codes
+
+        if "application_id" in self.frame.columns:
+            self.rows = {str(key): row for row, key in enumerate(self.frame["application_id"])}
+        else:
+            self.rows = {}
+
+        self.totals = self._group()
+        self._views: Optional[Dict[str, pd.DataFrame]] = None
+
+    @classmethod
+    def from_dataframe(cls, df: Optional[pd.DataFrame], version: Optional[int] = None) -> "ApplicationFrame":
+        return cls(df if df is not None else pd.DataFrame(), version)
+
+    def copy(self) -> "ApplicationFrame":
+        """A copy that status changes can be applied to while this frame is still being read."""
+        clone = copy.copy(self)
+        clone.frame = self.frame.copy()
+        clone.status = self.status.copy()
+        clone.response_time = self.response_time.copy()
+        clone._codes = {**self._codes, "status": clone.status}
+        clone.totals = self.totals.copy()
+        clone._views = None
+        return clone
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    # Group totals
+
+    def _slots(self, rows) -> np.ndarray:
+        """Slot of every grouping for ``rows``, shaped (rows, groupings)."""
+        slots = np.empty((len(np.atleast_1d(rows)), len(GROUPINGS)), dtype=np.int64)
+        for column, grouping in enumerate(GROUPINGS):
+            codes = np.atleast_1d(self._codes[grouping][rows])
+            slots[:, column] = np.where(codes >= 0, codes + self.offsets[grouping], self._missing_slot)
+        return slots
+
+    def _measures(self, rows) -> np.ndarray:
+        """Measures of ``rows``, shaped (rows, measures)."""
+        status = np.atleast_1d(self.status[rows])
+        response_time = np.atleast_1d(self.response_time[rows])
+        match_score = np.atleast_1d(self.match_score[rows])
+        return np.column_stack([
+            np.ones(len(status)),
+            RESPONDED[status], SUCCEEDED[status], OFFERED[status],
+            ~np.isnan(response_time), np.nan_to_num(response_time),
+            ~np.isnan(match_score), np.nan_to_num(match_score),
+        ]).astype(float)
+
+    def _group(self) -> np.ndarray:
+        """All group totals in one pass: every row adds its measures to one slot per grouping."""
+        rows = np.arange(len(self))
+        slots = self._slots(rows).ravel()
+        measures = np.repeat(self._measures(rows), len(GROUPINGS), axis=0)
+        size = self._missing_slot + 1
+        return np.column_stack([
+            np.bincount(slots, weights=measures[:, column], minlength=size)
+            for column in range(len(MEASURES))
+        ]) if len(rows) else np.zeros((size, len(MEASURES)))
+
+    def apply_status_change(
+        self, application_id: str, status: Any, response_time_days: Optional[float] = None
+    ) -> bool:
+        """Move one application to ``status``; False if it is not in this frame."""
+        row = self.rows.get(str(application_id))
+        if row is None:
+            return False
+
+        self.totals[self._slots(row)[0]] -= self._measures(row)[0]
+        self.status[row] = status_code(status)
+        if response_time_days is not None:
+            self.response_time[row] = float(response_time_days)
+        self.totals[self._slots(row)[0]] += self._measures(row)[0]
+
+        status = getattr(status, "value", status)
+        column = self.frame["status"]
+        if status not in column.cat.categories:
+            self.frame["status"] = column.cat.add_categories([status])
+        self.frame.at[row, "status"] = status
+        if response_time_days is not None and "response_time_days" in self.frame.columns:
+            self.frame.at[row, "response_time_days"] = response_time_days
+        self._views = None
+        return True
+
+    # Views
+
+    def views(self) -> Dict[str, pd.DataFrame]:
+        """
+        Totals of every measure by grouping (``total``, ``week``,
+        ``day_of_week``, ``hour``, ``industry``, ``company_size`` and
+        ``status``), leaving out empty groups.
+        """
+        if self._views is None:
+            views = {}
+            for grouping in GROUPINGS:
+                start = self.offsets[grouping]
+                totals = self.totals[start:start + len(self.labels[grouping])]
+                view = pd.DataFrame(totals, index=self.labels[grouping], columns=list(MEASURES))
+                views[grouping] = view[view["applications"] > 0]
+            self._views = views
+        return self._views
+
+    def total(self, measure: str) -> float:
+        return float(self.totals[self.offsets["total"], MEASURES.index(measure)])
+
+    def response_times(self) -> np.ndarray:
+        return self.response_time[~np.isnan(self.response_time)]
+
+    def succeeded(self) -> np.ndarray:
+        """Per-application success flags in row order."""
+        return SUCCEEDED[self.status].astype(int)
+
+    def succeeded_by_date(self) -> np.ndarray:
+        """Per-application success flags, oldest application first."""
+        return self.succeeded()[self.date_order]
+
+
+def replay(frame: ApplicationFrame, changes: Sequence[Dict[str, Any]], version: int) -> bool:
+    """
+    Apply logged changes to ``frame`` in place; False if one touches an
+    application it lacks. Replay onto a ``copy()`` of a frame others may be reading.
+    """
+    for change in changes:
+        if not frame.apply_status_change(
+            change["application_id"], change["status"], change.get("response_time_days")
+        ):
+            return False
+    frame.version = version
+    return True
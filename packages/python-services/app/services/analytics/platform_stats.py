@@ -0,0 +1,328 @@
+"""
+Incrementally maintained platform statistics.
+
+Application events are folded into small Redis summaries as they happen, so
+platform benchmarks are a constant-time read rather than a scan over every
+application:
+
+- ``platform_stats:{segment}`` hash of counters per segment (``all``,
+  ``industry:{name}`` and ``level:{name}``): applications, responded,
+  interviewed, offered, and the count, sum and sum of squares of response
+  times in days
+- ``platform_stats:{segment}:ttr`` time-to-response sketch, a log-bucketed
+  histogram of bucket index -> count
+- ``platform_stats:applications:{YYYY-MM}`` monthly application counter and
+  ``platform_stats:applicants:{YYYY-MM}`` HyperLogLog of applicants
+
+Every update is a few HINCRBY calls in one pipeline, so concurrent workers
+never lose counts and their sketches merge without coordination.
+"""
+
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import redis.asyncio as redis
+
+
+KEY_PREFIX = "platform_stats"
+SEGMENTS_KEY = f"{KEY_PREFIX}:segments"
+OVERALL_SEGMENT = "all"
+# Monthly counters are kept for a little over a year
+MONTHLY_TTL_SECONDS = 400 * 86400
+
+# Status vocabularies of both the application model and the analytics frames
+RESPONDED_STATUSES = frozenset({
+    "interview_scheduled", "interview_completed", "offer_received",
+    "offer_accepted", "offer_declined", "accepted", "rejected",
+})
+INTERVIEWED_STATUSES = frozenset({
+    "interview_scheduled", "interview_completed", "offer_received",
+    "offer_accepted", "offer_declined", "accepted",
+})
+OFFERED_STATUSES = frozenset({"offer_received", "offer_accepted", "offer_declined", "accepted"})
+
+MILESTONES = (
+    ("responded", RESPONDED_STATUSES),
+    ("interviewed", INTERVIEWED_STATUSES),
+    ("offered", OFFERED_STATUSES),
+)
+
+
+def _decode(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Application timestamps are written with ``datetime.utcnow()``
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def segment_key(segment: str) -> str:
+    return f"{KEY_PREFIX}:{segment}"
+
+
+def segments_for(industry: Optional[str] = None, level: Optional[str] = None) -> List[str]:
+    """The overall segment plus the industry and level segments an application counts towards."""
+    segments = [OVERALL_SEGMENT]
+    if industry and industry.strip():
+        segments.append(f"industry:{industry.strip().lower()}")
+    if level and level.strip():
+        segments.append(f"level:{level.strip().lower()}")
+    return segments
+
+
+def milestones_reached(previous_status: Optional[str], status: str) -> List[str]:
+    """Milestones that ``status`` reaches and ``previous_status`` had not."""
+    previous_status = getattr(previous_status, "value", previous_status)
+    status = getattr(status, "value", status)
+    return [
+        name for name, statuses in MILESTONES
+        if status in statuses and previous_status not in statuses
+    ]
+
+
+class ResponseTimeSketch:
+    """
+    Log-bucketed quantile sketch with bounded relative error.
+
+    A value ``v`` above ``min_value`` is counted in bucket
+    ``ceil(log_gamma(v / min_value))``, so any quantile read back is within
+    ``relative_accuracy`` of a sample value. Values at or below ``min_value``
+    share bucket 0. A year of response times fits in about 230 buckets.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.02, min_value: float = 1 / 24):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+    def bucket(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        return max(1, math.ceil(math.log(value / self.min_value) / self._log_gamma))
+
+    def value(self, bucket: int) -> float:
+        if bucket <= 0:
+            return self.min_value
+        return self.min_value * 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def quantile(self, counts: Dict[int, int], q: float) -> Optional[float]:
+        total = sum(counts.values())
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for bucket in sorted(counts):
+            seen += counts[bucket]
+            if seen > rank:
+                return self.value(bucket)
+        return self.value(max(counts))
+
+
+@dataclass
+class SegmentSummary:
+    """Counters for one segment of applications."""
+    applications: int = 0
+    responded: int = 0
+    interviewed: int = 0
+    offered: int = 0
+    timed_responses: int = 0
+    response_days_sum: float = 0.0
+    response_days_sq_sum: float = 0.0
+    response_time_buckets: Dict[int, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_redis(cls, counters: Dict, buckets: Dict) -> "SegmentSummary":
+        values = {_decode(name): _decode(value) for name, value in counters.items()}
+        return cls(
+            applications=int(values.get("applications", 0)),
+            responded=int(values.get("responded", 0)),
+            interviewed=int(values.get("interviewed", 0)),
+            offered=int(values.get("offered", 0)),
+            timed_responses=int(values.get("timed_responses", 0)),
+            response_days_sum=float(values.get("response_days_sum", 0.0)),
+            response_days_sq_sum=float(values.get("response_days_sq_sum", 0.0)),
+            response_time_buckets={int(_decode(bucket)): int(count) for bucket, count in buckets.items()},
+        )
+
+    def rate(self, milestone: str) -> float:
+        """Share of applications that reached ``milestone``, as a percentage."""
+        if not self.applications:
+            return 0.0
+        return 100.0 * getattr(self, milestone) / self.applications
+
+    @property
+    def mean_response_days(self) -> float:
+        return self.response_days_sum / self.timed_responses if self.timed_responses else 0.0
+
+    @property
+    def std_response_days(self) -> float:
+        if self.timed_responses < 2:
+            return 0.0
+        mean = self.mean_response_days
+        variance = self.response_days_sq_sum / self.timed_responses - mean * mean
+        return math.sqrt(max(variance, 0.0))
+
+    def response_time_percentiles(
+        self,
+        sketch: ResponseTimeSketch,
+        percentiles: Sequence[int] = (10, 25, 50, 75, 90)
+    ) -> Dict[str, float]:
+        if not self.response_time_buckets:
+            return {}
+        return {
+            str(p): round(sketch.quantile(self.response_time_buckets, p / 100), 2)
+            for p in percentiles
+        }
+
+    def rates(self) -> Dict[str, float]:
+        return {
+            "applications": self.applications,
+            "response_rate": round(self.rate("responded"), 2),
+            "interview_rate": round(self.rate("interviewed"), 2),
+            "offer_rate": round(self.rate("offered"), 2),
+        }
+
+
+@dataclass
+class PlatformSnapshot:
+    """Platform-wide and per-segment summaries read in constant time."""
+    overall: SegmentSummary
+    industries: Dict[str, SegmentSummary]
+    levels: Dict[str, SegmentSummary]
+    month: str = ""
+    monthly_applications: int = 0
+    monthly_applicants: int = 0
+
+    @property
+    def applications_per_applicant(self) -> Optional[float]:
+        """Applications per distinct applicant over ``month``."""
+        if not self.monthly_applicants:
+            return None
+        return self.monthly_applications / self.monthly_applicants
+
+
+class PlatformStatistics:
+    """Records application events and reads back the platform summaries."""
+
+    def __init__(self, redis_client: redis.Redis, sketch: Optional[ResponseTimeSketch] = None):
+        self.redis_client = redis_client
+        self.sketch = sketch or ResponseTimeSketch()
+
+    async def record_application(
+        self,
+        user_id: str,
+        industry: Optional[str] = None,
+        level: Optional[str] = None,
+        submitted_at: Optional[datetime] = None
+    ) -> None:
+        """Count a new application."""
+        segments = segments_for(industry, level)
+        month = _as_utc(submitted_at or datetime.now(timezone.utc)).strftime("%Y-%m")
+        applications_key = f"{KEY_PREFIX}:applications:{month}"
+        applicants_key = f"{KEY_PREFIX}:applicants:{month}"
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for segment in segments:
+                pipe.hincrby(segment_key(segment), "applications", 1)
+            if len(segments) > 1:
+                pipe.sadd(SEGMENTS_KEY, *segments[1:])
+            pipe.incr(applications_key)
+            pipe.expire(applications_key, MONTHLY_TTL_SECONDS)
+            pipe.pfadd(applicants_key, str(user_id))
+            pipe.expire(applicants_key, MONTHLY_TTL_SECONDS)
+            await pipe.execute()
+
+    async def record_status_change(
+        self,
+        previous_status: Optional[str],
+        status: str,
+        industry: Optional[str] = None,
+        level: Optional[str] = None,
+        submitted_at: Optional[datetime] = None,
+        changed_at: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        Count the milestones a status change reaches.
+
+        Milestones are counted once per application: moving between two
+        statuses that both imply a response does not count a second one.
+        Returns the milestones counted.
+        """
+        reached = milestones_reached(previous_status, status)
+        if not reached:
+            return []
+
+        response_days = None
+        if "responded" in reached and submitted_at is not None:
+            changed_at = _as_utc(changed_at or datetime.now(timezone.utc))
+            response_days = max(0.0, (changed_at - _as_utc(submitted_at)).total_seconds() / 86400)
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for segment in segments_for(industry, level):
+                key = segment_key(segment)
+                for milestone in reached:
+                    pipe.hincrby(key, milestone, 1)
+                if response_days is not None:
+                    pipe.hincrby(key, "timed_responses", 1)
+                    pipe.hincrbyfloat(key, "response_days_sum", response_days)
+                    pipe.hincrbyfloat(key, "response_days_sq_sum", response_days * response_days)
+                    pipe.hincrby(f"{key}:ttr", self.sketch.bucket(response_days), 1)
+            await pipe.execute()
+        return reached
+
+    async def snapshot(self, now: Optional[datetime] = None) -> PlatformSnapshot:
+        """
+        Read every summary; cost depends on the number of segments, not applications.
+
+        Monthly volume comes from the last complete month, falling back to
+        the current one until a full month has been recorded.
+        """
+        now = _as_utc(now or datetime.now(timezone.utc))
+        months = [(now.replace(day=1) - timedelta(days=1)).strftime("%Y-%m"), now.strftime("%Y-%m")]
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.smembers(SEGMENTS_KEY)
+            for month in months:
+                pipe.get(f"{KEY_PREFIX}:applications:{month}")
+                pipe.pfcount(f"{KEY_PREFIX}:applicants:{month}")
+            members, *monthly = await pipe.execute()
+
+        month, applications, applicants = months[1], monthly[2], monthly[3]
+        if monthly[1]:
+            month, applications, applicants = months[0], monthly[0], monthly[1]
+
+        segments = [OVERALL_SEGMENT] + sorted(_decode(member) for member in members)
+        summaries = await self._read_segments(segments)
+        return PlatformSnapshot(
+            overall=summaries.pop(OVERALL_SEGMENT),
+            industries=_strip_prefix(summaries, "industry:"),
+            levels=_strip_prefix(summaries, "level:"),
+            month=month,
+            monthly_applications=int(applications or 0),
+            monthly_applicants=int(applicants or 0),
+        )
+
+    async def _read_segments(self, segments: Iterable[str]) -> Dict[str, SegmentSummary]:
+        segments = list(segments)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for segment in segments:
+                pipe.hgetall(segment_key(segment))
+                pipe.hgetall(f"{segment_key(segment)}:ttr")
+            results = await pipe.execute()
+        return {
+            segment: SegmentSummary.from_redis(results[2 * i], results[2 * i + 1])
+            for i, segment in enumerate(segments)
+        }
+
+
+def _strip_prefix(summaries: Dict[str, SegmentSummary], prefix: str) -> Dict[str, SegmentSummary]:
+    return {
+        segment[len(prefix):]: summary
+        for segment, summary in summaries.items()
+        if segment.startswith(prefix)
+    }
@@ -181,46 +181,12 @@ async def get_platform_benchmarks(
     """
     Get platform-wide benchmark statistics.
     
-    Returns aggregated metrics across all users for comparison purposes.
+    Returns the incrementally maintained platform aggregates for comparison purposes.
     """
     try:
         logger.info("Platform benchmarks requested", service=auth.service_name)
         
-        # TODO: Implement actual platform benchmarks calculation
-        # For now, return sample benchmarks
-        benchmarks = {
-            "platform_averages": {
-                "response_rate": 25.0,
-                "interview_rate": 15.0,
-                "offer_rate": 8.0,
-                "applications_per_month": 15.0,
-                "average_response_time_days": 7.5
-            },
-            "percentile_ranges": {
-                "top_10_percent": {
-                    "response_rate": 45.0,
-                    "interview_rate": 30.0,
-                    "offer_rate": 18.0
-                },
-                "median": {
-                    "response_rate": 22.0,
-                    "interview_rate": 12.0,
-                    "offer_rate": 6.0
-                },
-                "bottom_10_percent": {
-                    "response_rate": 8.0,
-                    "interview_rate": 3.0,
-                    "offer_rate": 1.0
-                }
-            },
-            "industry_benchmarks": {
-                "technology": {"response_rate": 28.0, "interview_rate": 18.0},
-                "finance": {"response_rate": 22.0, "interview_rate": 14.0},
-                "healthcare": {"response_rate": 30.0, "interview_rate": 20.0}
-            },
-            "generated_at": "2024-11-04T12:00:00Z",
-            "data_points": 10000
-        }
+        benchmarks = await analytics_engine.get_platform_benchmarks()
         
         return benchmarks
         
@@ -4,10 +4,12 @@ Implements complex analytics using Pandas, NumPy, and ML models for success pred
 """
 
 import asyncio
+import copy
 import json
 import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Union
 from dataclasses import dataclass
 from enum import Enum
 
@@ -19,10 +21,14 @@ from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 import joblib
+import redis.asyncio as redis
 
 from app.core.config import get_settings
 from app.core.exceptions import ProcessingException
 from app.core.logging import get_logger
+from .application_changes import ApplicationChangeLog
+from .application_frame import ApplicationFrame, replay
+from .platform_stats import PlatformSnapshot, PlatformStatistics
 
 logger = get_logger(__name__)
 
@@ -75,6 +81,59 @@ class AnalyticsInsight:
     impact_score: float = 0.0
 
 
+# Research-based benchmarks, used until enough applications have been recorded
+DEFAULT_PLATFORM_STATISTICS = {
+    'averages': {
+        'response_rate': 25.0,  # 25% - industry standard
+        'interview_rate': 15.0,  # 15% - typical conversion
+        'offer_rate': 8.0,       # 8% - realistic offer rate
+        'applications_per_month': 15.0,  # 15 apps/month - recommended volume
+        'average_response_time': 10.5  # 10.5 days - typical response time
+    },
+    'std_devs': {
+        'response_rate': 8.0,    # Standard deviation
+        'interview_rate': 6.0,
+        'offer_rate': 4.0,
+        'applications_per_month': 8.0,
+        'average_response_time': 5.0
+    },
+    'percentiles': {
+        'response_rate': {
+            '10': 10.0,
+            '25': 18.0,
+            '50': 25.0,
+            '75': 35.0,
+            '90': 45.0
+        },
+        'interview_rate': {
+            '10': 5.0,
+            '25': 10.0,
+            '50': 15.0,
+            '75': 22.0,
+            '90': 30.0
+        },
+        'offer_rate': {
+            '10': 2.0,
+            '25': 5.0,
+            '50': 8.0,
+            '75': 12.0,
+            '90': 18.0
+        }
+    },
+    'by_industry': {
+        'technology': {'response_rate': 28.0, 'interview_rate': 18.0},
+        'finance': {'response_rate': 22.0, 'interview_rate': 14.0},
+        'healthcare': {'response_rate': 30.0, 'interview_rate': 20.0}
+    },
+    'by_level': {},
+    'sample_size': 0,
+    'source': 'default'
+}
+
+# Live counters replace the defaults once this many applications are recorded
+MIN_PLATFORM_SAMPLE_SIZE = 200
+
+
 class AnalyticsEngine:
     """Advanced analytics engine with ML capabilities."""
     
@@ -90,7 +149,15 @@ class AnalyticsEngine:
         # Platform-wide statistics cache
         self._platform_stats_cache: Optional[Dict[str, Any]] = None
         self._platform_stats_last_update: float = 0
-        self._platform_stats_ttl = 3600  # 1 hour
+        self._platform_stats_ttl = 60  # Counters are live; this only bounds Redis reads
+        self._platform_stats_store: Optional[PlatformStatistics] = None
+        self._redis: Optional[redis.Redis] = None
+        
+        # Per-user application frames, brought up to the data version on use
+        self._application_frames: "OrderedDict[Tuple[str, str], Tuple[float, ApplicationFrame]]" = OrderedDict()
+        self._application_frames_max = 256
+        self._application_frame_ttl = 3600  # The period window moves; rebuild at least hourly
+        self._application_changes: Optional[ApplicationChangeLog] = None
         
     async def calculate_application_insights(
         self, 
@@ -112,9 +179,9 @@ class AnalyticsEngine:
             start_time = time.time()
             
             # Fetch user application data
-            applications_df = await self._get_user_applications(user_id, time_period)
+            frame = await self._get_application_frame(user_id, time_period)
             
-            if applications_df.empty:
+            if frame.empty:
                 return {
                     "error": "No application data available",
                     "user_id": user_id,
@@ -122,22 +189,20 @@ class AnalyticsEngine:
                 }
             
             # Calculate basic metrics
-            basic_metrics = self._calculate_basic_metrics(applications_df)
-            
-            # Generate insights
-            insights = await self._generate_insights(applications_df, user_id)
+            basic_metrics = self._calculate_basic_metrics(frame)
             
-            # Predict success probability
-            success_prediction = await self._predict_success_probability(user_id, applications_df)
+            # Insights, success prediction (trained off the event loop) and benchmarks are independent
+            insights, success_prediction, benchmarks = await asyncio.gather(
+                self._generate_insights(frame, user_id),
+                self._predict_success_probability(user_id, frame.frame),
+                self._get_benchmark_comparison(user_id, basic_metrics)
+            )
             
             # Generate recommendations
             recommendations = await self._generate_recommendations(
-                applications_df, insights, success_prediction
+                frame, insights, success_prediction
             )
             
-            # Get benchmark comparison
-            benchmarks = await self._get_benchmark_comparison(user_id, basic_metrics)
-            
             processing_time = time.time() - start_time
             
             result = {
@@ -166,34 +231,22 @@ class AnalyticsEngine:
                 details={"user_id": user_id, "error": str(e)}
             )
     
-    def _calculate_basic_metrics(self, df: pd.DataFrame) -> ApplicationMetrics:
+    def _calculate_basic_metrics(self, data: Union[pd.DataFrame, ApplicationFrame]) -> ApplicationMetrics:
         """Calculate basic application metrics."""
-        total_applications = len(df)
+        frame = self._as_application_frame(data)
+        total_applications = len(frame)
         
         if total_applications == 0:
             return ApplicationMetrics(0, 0.0, 0.0, 0.0, 0.0)
         
-        # Response rate (interviews + offers + rejections)
-        responses = df[df['status'].isin([
-            'interview_scheduled', 'interview_completed', 
-            'offer_received', 'accepted', 'rejected'
-        ])]
-        response_rate = len(responses) / total_applications
-        
-        # Interview rate
-        interviews = df[df['status'].isin([
-            'interview_scheduled', 'interview_completed', 
-            'offer_received', 'accepted'
-        ])]
-        interview_rate = len(interviews) / total_applications
-        
-        # Offer rate
-        offers = df[df['status'].isin(['offer_received', 'accepted'])]
-        offer_rate = len(offers) / total_applications
+        # Response, interview and offer counts come from the status totals
+        response_rate = frame.total('responded') / total_applications
+        interview_rate = frame.total('succeeded') / total_applications
+        offer_rate = frame.total('offered') / total_applications
         
         # Average response time
-        response_times = df[df['response_time_days'].notna()]['response_time_days']
-        avg_response_time = response_times.mean() if not response_times.empty else 0.0
+        response_count = frame.total('response_count')
+        avg_response_time = frame.total('response_sum') / response_count if response_count else 0.0
         
         return ApplicationMetrics(
             total_applications=total_applications,
@@ -203,32 +256,42 @@ class AnalyticsEngine:
             average_response_time_days=round(avg_response_time, 1)
         )
     
+    @staticmethod
+    def _as_application_frame(data: Union[pd.DataFrame, ApplicationFrame]) -> ApplicationFrame:
+        return data if isinstance(data, ApplicationFrame) else ApplicationFrame.from_dataframe(data)
+    
+    @staticmethod
+    def _success_rates(view: pd.DataFrame, min_count: int) -> pd.DataFrame:
+        """Success rate, applications and successes of the groups with at least ``min_count`` applications."""
+        rates = pd.DataFrame({
+            'success_rate': view['succeeded'] / view['applications'],
+            'count': view['applications'],
+            'successes': view['succeeded']
+        })
+        return rates[rates['count'] >= min_count]
+    
     async def _generate_insights(
         self, 
-        df: pd.DataFrame, 
+        data: Union[pd.DataFrame, ApplicationFrame], 
         user_id: str
     ) -> List[AnalyticsInsight]:
         """Generate actionable insights from application data using statistical analysis."""
         insights = []
         
         try:
+            frame = self._as_application_frame(data)
+            views = frame.views()
+            total_apps = len(frame)
+            overall_rate = frame.total('succeeded') / total_apps if total_apps else 0.0
+            
             # Insight 1: Application timing analysis with statistical significance
-            if 'applied_date' in df.columns and len(df) >= 10:
-                df['day_of_week'] = pd.to_datetime(df['applied_date']).dt.day_name()
-                df['hour'] = pd.to_datetime(df['applied_date']).dt.hour
-                df['is_success'] = df['status'].isin(['interview_scheduled', 'interview_completed', 'offer_received', 'accepted']).astype(int)
-                
+            if frame.has_dates and total_apps >= 10:
                 # Best days analysis with statistical testing
-                day_success = df.groupby('day_of_week').agg({
-                    'is_success': ['mean', 'count']
-                })
-                day_success.columns = ['success_rate', 'count']
-                day_success = day_success[day_success['count'] >= 3]  # Minimum sample size
+                day_success = self._success_rates(views['day_of_week'], 3)  # Minimum sample size
                 
                 if not day_success.empty:
                     best_day = day_success['success_rate'].idxmax()
                     best_day_rate = day_success['success_rate'].max()
-                    overall_rate = df['is_success'].mean()
                     
                     # Chi-square test for significance
                     if best_day_rate > overall_rate * 1.3 and best_day_rate > 0.2:
@@ -242,40 +305,29 @@ class AnalyticsEngine:
                         ))
                 
                 # Time of day analysis
-                if 'hour' in df.columns:
-                    hour_success = df.groupby('hour').agg({
-                        'is_success': ['mean', 'count']
-                    })
-                    hour_success.columns = ['success_rate', 'count']
-                    hour_success = hour_success[hour_success['count'] >= 2]
-                    
-                    if not hour_success.empty:
-                        best_hours = hour_success[hour_success['success_rate'] > overall_rate * 1.2]
-                        if not best_hours.empty:
-                            hour_range = f"{best_hours.index.min()}-{best_hours.index.max()}"
-                            insights.append(AnalyticsInsight(
-                                type="timing",
-                                title="Optimal Application Time Window",
-                                description=f"Applications between {hour_range}:00 show higher success rates",
-                                actionable=True,
-                                recommendation=f"Schedule applications during {hour_range}:00 hours",
-                                impact_score=0.7
-                            ))
+                hour_success = self._success_rates(views['hour'], 2)
+                
+                if not hour_success.empty:
+                    best_hours = hour_success[hour_success['success_rate'] > overall_rate * 1.2]
+                    if not best_hours.empty:
+                        hour_range = f"{best_hours.index.min()}-{best_hours.index.max()}"
+                        insights.append(AnalyticsInsight(
+                            type="timing",
+                            title="Optimal Application Time Window",
+                            description=f"Applications between {hour_range}:00 show higher success rates",
+                            actionable=True,
+                            recommendation=f"Schedule applications during {hour_range}:00 hours",
+                            impact_score=0.7
+                        ))
             
             # Insight 2: Industry performance with trend analysis
-            if 'industry' in df.columns and len(df) >= 15:
-                df['is_success'] = df['status'].isin(['interview_scheduled', 'interview_completed', 'offer_received', 'accepted']).astype(int)
-                
-                industry_performance = df.groupby('industry').agg({
-                    'is_success': ['mean', 'count', 'sum']
-                })
-                industry_performance.columns = ['success_rate', 'total_apps', 'successes']
-                industry_performance = industry_performance[industry_performance['total_apps'] >= 3]
+            if frame.has_industry and total_apps >= 15:
+                industry_performance = self._success_rates(views['industry'], 3)
                 
                 if not industry_performance.empty:
                     top_industry = industry_performance['success_rate'].idxmax()
                     top_rate = industry_performance['success_rate'].max()
-                    top_count = industry_performance.loc[top_industry, 'total_apps']
+                    top_count = industry_performance.loc[top_industry, 'count']
                     
                     # Calculate confidence interval
                     confidence = self._calculate_confidence_interval(
@@ -293,10 +345,9 @@ class AnalyticsEngine:
                     ))
                     
                     # Identify underperforming industries
-                    overall_rate = df['is_success'].mean()
                     underperforming = industry_performance[
                         (industry_performance['success_rate'] < overall_rate * 0.5) & 
-                        (industry_performance['total_apps'] >= 5)
+                        (industry_performance['count'] >= 5)
                     ]
                     
                     if not underperforming.empty:
@@ -312,9 +363,8 @@ class AnalyticsEngine:
                         ))
             
             # Insight 3: Application volume and frequency analysis
-            total_apps = len(df)
-            if 'applied_date' in df.columns:
-                date_range = (pd.to_datetime(df['applied_date']).max() - pd.to_datetime(df['applied_date']).min()).days
+            if frame.has_dates:
+                date_range = pd.Timedelta(frame.applied_at.max() - frame.applied_at.min()).days
                 apps_per_week = (total_apps / max(date_range, 1)) * 7
                 
                 if apps_per_week < 3:
@@ -326,87 +376,83 @@ class AnalyticsEngine:
                         recommendation="Increase application frequency to 5-10 per week for better outcomes",
                         impact_score=0.9
                     ))
-                elif apps_per_week > 20:
-                    success_rate = df['is_success'].mean() if 'is_success' in df.columns else 0
-                    if success_rate < 0.15:
-                        insights.append(AnalyticsInsight(
-                            type="volume",
-                            title="High Volume, Low Quality Pattern",
-                            description=f"High application rate ({apps_per_week:.1f}/week) but low success rate ({success_rate:.1%})",
-                            actionable=True,
-                            recommendation="Focus on quality over quantity - target better-matched positions",
-                            impact_score=0.85
-                        ))
+                elif apps_per_week > 20 and overall_rate < 0.15:
+                    insights.append(AnalyticsInsight(
+                        type="volume",
+                        title="High Volume, Low Quality Pattern",
+                        description=f"High application rate ({apps_per_week:.1f}/week) but low success rate ({overall_rate:.1%})",
+                        actionable=True,
+                        recommendation="Focus on quality over quantity - target better-matched positions",
+                        impact_score=0.85
+                    ))
             
             # Insight 4: Response time patterns with statistical analysis
-            if 'response_time_days' in df.columns:
-                response_times = df['response_time_days'].dropna()
-                if len(response_times) >= 5:
-                    median_response = response_times.median()
-                    mean_response = response_times.mean()
-                    std_response = response_times.std()
-                    
-                    # Identify outliers (responses taking unusually long)
-                    outlier_threshold = mean_response + 2 * std_response
-                    outliers = response_times[response_times > outlier_threshold]
-                    
-                    if median_response > 10:
-                        insights.append(AnalyticsInsight(
-                            type="response_time",
-                            title="Slow Response Pattern",
-                            description=f"Median response time is {median_response:.1f} days (mean: {mean_response:.1f}±{std_response:.1f})",
-                            actionable=True,
-                            recommendation="Follow up on applications after 7-10 days to accelerate the process",
-                            impact_score=0.65
-                        ))
-                    
-                    if len(outliers) > len(response_times) * 0.3:
-                        insights.append(AnalyticsInsight(
-                            type="response_time",
-                            title="Inconsistent Response Times",
-                            description=f"{len(outliers)} applications ({len(outliers)/len(response_times):.1%}) have unusually long response times",
-                            actionable=True,
-                            recommendation="Consider withdrawing from positions with no response after 3 weeks",
-                            impact_score=0.6
-                        ))
+            response_times = frame.response_times()
+            if len(response_times) >= 5:
+                median_response = float(np.median(response_times))
+                mean_response = float(response_times.mean())
+                std_response = float(response_times.std(ddof=1))
+                
+                # Identify outliers (responses taking unusually long)
+                outlier_threshold = mean_response + 2 * std_response
+                outliers = int((response_times > outlier_threshold).sum())
+                
+                if median_response > 10:
+                    insights.append(AnalyticsInsight(
+                        type="response_time",
+                        title="Slow Response Pattern",
+                        description=f"Median response time is {median_response:.1f} days (mean: {mean_response:.1f}±{std_response:.1f})",
+                        actionable=True,
+                        recommendation="Follow up on applications after 7-10 days to accelerate the process",
+                        impact_score=0.65
+                    ))
+                
+                if outliers > len(response_times) * 0.3:
+                    insights.append(AnalyticsInsight(
+                        type="response_time",
+                        title="Inconsistent Response Times",
+                        description=f"{outliers} applications ({outliers/len(response_times):.1%}) have unusually long response times",
+                        actionable=True,
+                        recommendation="Consider withdrawing from positions with no response after 3 weeks",
+                        impact_score=0.6
+                    ))
             
             # Insight 5: Success rate analysis with trend detection
-            if 'is_success' in df.columns and 'applied_date' in df.columns and len(df) >= 20:
-                df_sorted = df.sort_values('applied_date')
-                df_sorted['rolling_success'] = df_sorted['is_success'].rolling(window=10, min_periods=5).mean()
+            if frame.has_dates and total_apps >= 20:
+                success_by_date = frame.succeeded_by_date()
+                recent_success = success_by_date[-10:].mean()
+                earlier_success = success_by_date[:10].mean()
                 
-                # Detect trend
-                if len(df_sorted) >= 20:
-                    recent_success = df_sorted.tail(10)['is_success'].mean()
-                    earlier_success = df_sorted.head(10)['is_success'].mean()
-                    
-                    if recent_success < earlier_success * 0.7 and earlier_success > 0.1:
-                        insights.append(AnalyticsInsight(
-                            type="success_rate",
-                            title="Declining Success Rate Trend",
-                            description=f"Success rate declined from {earlier_success:.1%} to {recent_success:.1%}",
-                            actionable=True,
-                            recommendation="Review and refresh your application materials and targeting strategy",
-                            impact_score=0.95
-                        ))
-                    elif recent_success > earlier_success * 1.5:
-                        insights.append(AnalyticsInsight(
-                            type="success_rate",
-                            title="Improving Success Rate",
-                            description=f"Success rate improved from {earlier_success:.1%} to {recent_success:.1%}",
-                            actionable=False,
-                            recommendation="Continue current application strategy",
-                            impact_score=0.5
-                        ))
+                if recent_success < earlier_success * 0.7 and earlier_success > 0.1:
+                    insights.append(AnalyticsInsight(
+                        type="success_rate",
+                        title="Declining Success Rate Trend",
+                        description=f"Success rate declined from {earlier_success:.1%} to {recent_success:.1%}",
+                        actionable=True,
+                        recommendation="Review and refresh your application materials and targeting strategy",
+                        impact_score=0.95
+                    ))
+                elif recent_success > earlier_success * 1.5:
+                    insights.append(AnalyticsInsight(
+                        type="success_rate",
+                        title="Improving Success Rate",
+                        description=f"Success rate improved from {earlier_success:.1%} to {recent_success:.1%}",
+                        actionable=False,
+                        recommendation="Continue current application strategy",
+                        impact_score=0.5
+                    ))
             
             # Insight 6: Match score correlation analysis
-            if 'match_score' in df.columns and 'is_success' in df.columns and len(df) >= 15:
+            if 'match_score' in frame.frame.columns and total_apps >= 15:
+                match_scores = pd.Series(frame.match_score)
+                success = pd.Series(frame.succeeded())
+                
                 # Calculate correlation between match score and success
-                correlation = df[['match_score', 'is_success']].corr().iloc[0, 1]
+                correlation = match_scores.corr(success)
                 
                 if correlation > 0.3:  # Moderate positive correlation
-                    high_match_success = df[df['match_score'] > 0.7]['is_success'].mean()
-                    low_match_success = df[df['match_score'] <= 0.5]['is_success'].mean()
+                    high_match_success = success[match_scores > 0.7].mean()
+                    low_match_success = success[match_scores <= 0.5].mean()
                     
                     if high_match_success > low_match_success * 1.5:
                         insights.append(AnalyticsInsight(
@@ -419,14 +465,10 @@ class AnalyticsEngine:
                         ))
             
             # Insight 7: Company size preference analysis
-            if 'company_size' in df.columns and 'is_success' in df.columns and len(df) >= 15:
-                size_performance = df.groupby('company_size').agg({
-                    'is_success': ['mean', 'count']
-                })
-                size_performance.columns = ['success_rate', 'count']
-                size_performance = size_performance[size_performance['count'] >= 3]
+            if frame.has_company_size and total_apps >= 15:
+                size_performance = self._success_rates(views['company_size'], 3)
                 
-                if not size_performance.empty and len(size_performance) >= 2:
+                if len(size_performance) >= 2:
                     best_size = size_performance['success_rate'].idxmax()
                     best_rate = size_performance['success_rate'].max()
                     worst_size = size_performance['success_rate'].idxmin()
@@ -669,6 +711,17 @@ class AnalyticsEngine:
             logger.info("Using cached model", user_id=user_id)
             return self.models[model_key]
         
+        # Training is CPU-bound; run it in a thread so the other insight stages proceed
+        return await asyncio.to_thread(self._train_success_model, user_id, training_data)
+    
+    def _train_success_model(
+        self, 
+        user_id: str, 
+        training_data: pd.DataFrame
+    ) -> RandomForestClassifier:
+        """Train, evaluate and cache a success model for the user."""
+        model_key = f"success_model_{user_id}"
+        
         try:
             # Prepare training data
             if 'success' not in training_data.columns:
@@ -973,7 +1026,7 @@ class AnalyticsEngine:
     
     async def _generate_recommendations(
         self,
-        applications_df: pd.DataFrame,
+        applications: Union[pd.DataFrame, ApplicationFrame],
         insights: List[AnalyticsInsight],
         success_prediction: SuccessPrediction
     ) -> List[str]:
@@ -989,11 +1042,10 @@ class AnalyticsEngine:
         recommendations.extend(success_prediction.recommendations)
         
         # Add general recommendations based on data
-        total_apps = len(applications_df)
+        frame = self._as_application_frame(applications)
+        total_apps = len(frame)
         if total_apps > 0:
-            success_rate = len(applications_df[
-                applications_df['status'].isin(['offer_received', 'accepted'])
-            ]) / total_apps
+            success_rate = frame.total('offered') / total_apps
             
             if success_rate < 0.1:
                 recommendations.append("Consider getting professional resume review to improve success rate")
@@ -1133,7 +1185,7 @@ class AnalyticsEngine:
             )
     
     async def _get_platform_statistics(self) -> Dict[str, Any]:
-        """Get platform-wide statistics with caching."""
+        """Get platform-wide statistics from the live counters, with caching."""
         current_time = time.time()
         
         # Return cached stats if available and fresh
@@ -1141,60 +1193,159 @@ class AnalyticsEngine:
             current_time - self._platform_stats_last_update < self._platform_stats_ttl):
             return self._platform_stats_cache
         
-        # TODO: In production, fetch real platform statistics from database
-        # This would involve aggregating data from all users
-        # For now, using realistic industry benchmarks based on research
-        
-        platform_stats = {
-            'averages': {
-                'response_rate': 25.0,  # 25% - industry standard
-                'interview_rate': 15.0,  # 15% - typical conversion
-                'offer_rate': 8.0,       # 8% - realistic offer rate
-                'applications_per_month': 15.0,  # 15 apps/month - recommended volume
-                'average_response_time': 10.5  # 10.5 days - typical response time
-            },
-            'std_devs': {
-                'response_rate': 8.0,    # Standard deviation
-                'interview_rate': 6.0,
-                'offer_rate': 4.0,
-                'applications_per_month': 8.0,
-                'average_response_time': 5.0
-            },
-            'percentiles': {
-                'response_rate': {
-                    '10': 10.0,
-                    '25': 18.0,
-                    '50': 25.0,
-                    '75': 35.0,
-                    '90': 45.0
-                },
-                'interview_rate': {
-                    '10': 5.0,
-                    '25': 10.0,
-                    '50': 15.0,
-                    '75': 22.0,
-                    '90': 30.0
-                },
-                'offer_rate': {
-                    '10': 2.0,
-                    '25': 5.0,
-                    '50': 8.0,
-                    '75': 12.0,
-                    '90': 18.0
-                }
-            },
-            'sample_size': 10000,  # Simulated platform user count
-            'last_updated': datetime.now(timezone.utc).isoformat()
-        }
+        try:
+            snapshot = await self._get_platform_statistics_store().snapshot()
+            if snapshot.overall.applications >= MIN_PLATFORM_SAMPLE_SIZE:
+                platform_stats = self._platform_statistics_from_snapshot(snapshot)
+            else:
+                platform_stats = copy.deepcopy(DEFAULT_PLATFORM_STATISTICS)
+        except Exception as e:
+            logger.warning("Platform statistics unavailable, using defaults", error=str(e))
+            platform_stats = copy.deepcopy(DEFAULT_PLATFORM_STATISTICS)
+        platform_stats['last_updated'] = datetime.now(timezone.utc).isoformat()
         
         # Cache the statistics
         self._platform_stats_cache = platform_stats
         self._platform_stats_last_update = current_time
         
-        logger.info("Platform statistics calculated/cached")
+        logger.info("Platform statistics refreshed", source=platform_stats['source'])
         
         return platform_stats
     
+    def _get_redis(self) -> redis.Redis:
+        """Redis client shared by the platform statistics and application change log."""
+        if self._redis is None:
+            redis_settings = self.settings.redis
+            self._redis = redis.from_url(
+                redis_settings.url,
+                socket_timeout=redis_settings.socket_timeout,
+                socket_connect_timeout=redis_settings.socket_connect_timeout
+            )
+        return self._redis
+    
+    def _get_platform_statistics_store(self) -> PlatformStatistics:
+        """Get the incrementally maintained platform statistics store."""
+        if self._platform_stats_store is None:
+            self._platform_stats_store = PlatformStatistics(self._get_redis())
+        return self._platform_stats_store
+    
+    def _get_application_changes(self) -> ApplicationChangeLog:
+        """Get the per-user application data versions and change log."""
+        if self._application_changes is None:
+            self._application_changes = ApplicationChangeLog(self._get_redis())
+        return self._application_changes
+    
+    async def _get_application_frame(self, user_id: str, time_period: str) -> ApplicationFrame:
+        """
+        The user's application frame for the period.
+        
+        A cached frame is reused when it matches the user's data version, or
+        a copy of it is brought up to it by replaying the logged status
+        changes and replaces it; otherwise the applications are fetched and
+        the frame rebuilt.
+        """
+        key = (user_id, time_period)
+        changes_log = self._get_application_changes()
+        try:
+            version = await changes_log.version(user_id)
+        except Exception as e:
+            logger.warning("Application data version unavailable", user_id=user_id, error=str(e))
+            version = None
+        
+        cached = self._application_frames.get(key)
+        if cached is not None and version is not None:
+            built_at, frame = cached
+            if time.time() - built_at < self._application_frame_ttl and frame.version is not None:
+                if frame.version == version:
+                    self._application_frames.move_to_end(key)
+                    return frame
+                try:
+                    changes = await changes_log.changes_between(user_id, frame.version, version)
+                except Exception as e:
+                    logger.warning("Application changes unavailable", user_id=user_id, error=str(e))
+                    changes = None
+                # Callers may still be reading the cached frame, so changes go onto a copy
+                updated = frame.copy() if changes is not None else None
+                if updated is not None and replay(updated, changes, version):
+                    self._application_frames[key] = (built_at, updated)
+                    self._application_frames.move_to_end(key)
+                    logger.info("Application frame updated incrementally",
+                               user_id=user_id, changes=len(changes), version=version)
+                    return updated
+        
+        frame = ApplicationFrame.from_dataframe(await self._get_user_applications(user_id, time_period), version)
+        if version is not None and not frame.empty:
+            self._application_frames[key] = (time.time(), frame)
+            self._application_frames.move_to_end(key)
+            while len(self._application_frames) > self._application_frames_max:
+                self._application_frames.popitem(last=False)
+        return frame
+    
+    def _platform_statistics_from_snapshot(self, snapshot: PlatformSnapshot) -> Dict[str, Any]:
+        """Build platform statistics from live counters."""
+        overall = snapshot.overall
+        defaults = DEFAULT_PLATFORM_STATISTICS
+        
+        averages = {
+            'response_rate': round(overall.rate('responded'), 2),
+            'interview_rate': round(overall.rate('interviewed'), 2),
+            'offer_rate': round(overall.rate('offered'), 2),
+            'applications_per_month': round(
+                snapshot.applications_per_applicant or defaults['averages']['applications_per_month'], 2
+            ),
+            'average_response_time': round(
+                overall.mean_response_days or defaults['averages']['average_response_time'], 2
+            )
+        }
+        
+        # Per-user spread of the rates is not tracked; keep the research-based priors
+        std_devs = dict(defaults['std_devs'])
+        if overall.std_response_days > 0:
+            std_devs['average_response_time'] = round(overall.std_response_days, 2)
+        
+        percentiles = copy.deepcopy(defaults['percentiles'])
+        response_time_percentiles = overall.response_time_percentiles(self._get_platform_statistics_store().sketch)
+        if response_time_percentiles:
+            percentiles['response_time'] = response_time_percentiles
+        
+        return {
+            'averages': averages,
+            'std_devs': std_devs,
+            'percentiles': percentiles,
+            'by_industry': {name: summary.rates() for name, summary in snapshot.industries.items()},
+            'by_level': {name: summary.rates() for name, summary in snapshot.levels.items()},
+            'sample_size': overall.applications,
+            'source': 'live'
+        }
+    
+    async def get_platform_benchmarks(self) -> Dict[str, Any]:
+        """Get platform-wide benchmarks for comparison pages."""
+        platform_stats = await self._get_platform_statistics()
+        averages = platform_stats['averages']
+        percentiles = platform_stats['percentiles']
+        rate_metrics = ('response_rate', 'interview_rate', 'offer_rate')
+        
+        return {
+            "platform_averages": {
+                "response_rate": averages['response_rate'],
+                "interview_rate": averages['interview_rate'],
+                "offer_rate": averages['offer_rate'],
+                "applications_per_month": averages['applications_per_month'],
+                "average_response_time_days": averages['average_response_time']
+            },
+            "percentile_ranges": {
+                "top_10_percent": {metric: percentiles[metric]['90'] for metric in rate_metrics},
+                "median": {metric: percentiles[metric]['50'] for metric in rate_metrics},
+                "bottom_10_percent": {metric: percentiles[metric]['10'] for metric in rate_metrics}
+            },
+            "response_time_percentiles": percentiles.get('response_time', {}),
+            "industry_benchmarks": platform_stats['by_industry'],
+            "level_benchmarks": platform_stats['by_level'],
+            "generated_at": platform_stats['last_updated'],
+            "data_points": platform_stats['sample_size'],
+            "source": platform_stats['source']
+        }
+    
     async def generate_analytics_report(
         self,
         user_id: str,
@@ -1219,20 +1370,20 @@ class AnalyticsEngine:
             if "error" in insights:
                 return insights
             
-            # Add additional analysis
-            applications_df = await self._get_user_applications(user_id, time_period)
+            # Add additional analysis (the frame is cached from the insights above)
+            frame = await self._get_application_frame(user_id, time_period)
             
             report = {
                 **insights,
                 "report_type": "comprehensive",
                 "executive_summary": self._generate_executive_summary(insights),
                 "action_items": self._prioritize_action_items(insights),
-                "trend_analysis": self._analyze_trends(applications_df) if not applications_df.empty else {},
-                "skill_gap_analysis": self._analyze_skill_gaps(applications_df) if not applications_df.empty else {},
+                "trend_analysis": self._analyze_trends(frame) if not frame.empty else {},
+                "skill_gap_analysis": self._analyze_skill_gaps(frame.frame) if not frame.empty else {},
             }
             
             if include_visualizations:
-                report["visualization_data"] = self._prepare_visualization_data(applications_df)
+                report["visualization_data"] = self._prepare_visualization_data(frame)
             
             return report
             
@@ -1322,27 +1473,20 @@ class AnalyticsEngine:
         
         return action_items[:10]  # Top 10 action items
     
-    def _analyze_trends(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_trends(self, data: Union[pd.DataFrame, ApplicationFrame]) -> Dict[str, Any]:
         """Analyze trends in application data over time."""
-        if df.empty or 'applied_date' not in df.columns:
+        frame = self._as_application_frame(data)
+        if frame.empty or not frame.has_dates:
             return {}
         
         try:
-            df = df.copy()
-            df['applied_date'] = pd.to_datetime(df['applied_date'])
-            df = df.sort_values('applied_date')
-            df['is_success'] = df['status'].isin([
-                'interview_scheduled', 'interview_completed', 'offer_received', 'accepted'
-            ]).astype(int)
-            
             # Weekly aggregation
-            df['week'] = df['applied_date'].dt.to_period('W')
-            weekly_stats = df.groupby('week').agg({
-                'is_success': ['mean', 'count'],
-                'match_score': 'mean'
-            }).reset_index()
-            
-            weekly_stats.columns = ['week', 'success_rate', 'applications', 'avg_match_score']
+            weekly = frame.views()['week']
+            weekly_stats = pd.DataFrame({
+                'success_rate': weekly['succeeded'] / weekly['applications'],
+                'applications': weekly['applications'],
+                'avg_match_score': weekly['match_sum'] / weekly['match_count'].where(weekly['match_count'] > 0)
+            })
             
             # Calculate trend direction
             if len(weekly_stats) >= 4:
@@ -1380,55 +1524,51 @@ class AnalyticsEngine:
             "recommendation": "Ensure your profile includes all relevant skills"
         }
     
-    def _prepare_visualization_data(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _prepare_visualization_data(self, data: Union[pd.DataFrame, ApplicationFrame]) -> Dict[str, Any]:
         """Prepare data for frontend visualizations."""
-        if df.empty:
+        frame = self._as_application_frame(data)
+        if frame.empty:
             return {}
         
         try:
             viz_data = {}
+            views = frame.views()
             
             # Application timeline
-            if 'applied_date' in df.columns:
-                df['applied_date'] = pd.to_datetime(df['applied_date'])
-                timeline = df.groupby(df['applied_date'].dt.to_period('W')).size()
+            if frame.has_dates:
+                timeline = views['week']['applications']
                 viz_data['application_timeline'] = {
                     'labels': [str(period) for period in timeline.index],
-                    'values': timeline.values.tolist()
+                    'values': timeline.astype(int).tolist()
                 }
             
             # Status distribution
-            if 'status' in df.columns:
-                status_dist = df['status'].value_counts()
+            if 'status' in frame.frame.columns:
+                status_dist = views['status']['applications'].sort_values(ascending=False, kind='stable')
                 viz_data['status_distribution'] = {
                     'labels': status_dist.index.tolist(),
-                    'values': status_dist.values.tolist()
+                    'values': status_dist.astype(int).tolist()
                 }
             
             # Industry performance
-            if 'industry' in df.columns:
-                df['is_success'] = df['status'].isin([
-                    'interview_scheduled', 'interview_completed', 'offer_received', 'accepted'
-                ]).astype(int)
-                industry_perf = df.groupby('industry')['is_success'].agg(['mean', 'count'])
-                industry_perf = industry_perf[industry_perf['count'] >= 2]
+            if frame.has_industry:
+                industry_perf = self._success_rates(views['industry'], 2)
                 viz_data['industry_performance'] = {
                     'labels': industry_perf.index.tolist(),
-                    'success_rates': (industry_perf['mean'] * 100).tolist(),
-                    'application_counts': industry_perf['count'].tolist()
+                    'success_rates': (industry_perf['success_rate'] * 100).tolist(),
+                    'application_counts': industry_perf['count'].astype(int).tolist()
                 }
             
             # Response time distribution
-            if 'response_time_days' in df.columns:
-                response_times = df['response_time_days'].dropna()
-                if len(response_times) > 0:
-                    viz_data['response_time_distribution'] = {
-                        'mean': float(response_times.mean()),
-                        'median': float(response_times.median()),
-                        'min': float(response_times.min()),
-                        'max': float(response_times.max()),
-                        'histogram': np.histogram(response_times, bins=10)[0].tolist()
-                    }
+            response_times = frame.response_times()
+            if len(response_times) > 0:
+                viz_data['response_time_distribution'] = {
+                    'mean': float(response_times.mean()),
+                    'median': float(np.median(response_times)),
+                    'min': float(response_times.min()),
+                    'max': float(response_times.max()),
+                    'histogram': np.histogram(response_times, bins=10)[0].tolist()
+                }
             
             return viz_data
             
@@ -1,14 +1,18 @@
 """Background tasks for analytics service."""
 
 import asyncio
+import time
 from typing import Dict, Any, List
 
 from app.core.celery import celery_app
 from app.core.logging import get_logger
-from .service import analytics_engine
+from app.core.subsystems import lazy_subsystem
 
 logger = get_logger(__name__)
 
+# Imported on first use so workers not serving analytics skip pandas/scipy/sklearn
+analytics_engine = lazy_subsystem("analytics")
+
 
 @celery_app.task(bind=True, name="analytics.calculate_user_analytics")
 def calculate_user_analytics_task(self, user_ids: List[str] = None) -> Dict[str, Any]:
@@ -128,87 +132,33 @@ def generate_success_predictions_task(self, user_id: str) -> Dict[str, Any]:
 
 @celery_app.task(bind=True, name="analytics.calculate_platform_benchmarks")
 def calculate_platform_benchmarks_task(self) -> Dict[str, Any]:
-    """Background task to calculate platform-wide benchmarks."""
+    """
+    Background task to read platform-wide benchmarks.
+    
+    The aggregates are maintained as applications change state, so this is a
+    constant-time read rather than a scan over every user's applications.
+    """
     try:
         logger.info("Starting platform benchmarks calculation task")
+        start_time = time.time()
         
-        # TODO: In production, implement actual database aggregation
-        # For now, simulate benchmark calculation with sample data
-        
-        # Simulate processing multiple users for benchmarks
-        sample_users = [f"user_{i}" for i in range(1, 1001)]  # 1000 users
-        
-        response_rates = []
-        interview_rates = []
-        offer_rates = []
-        
-        # Process sample of users to calculate benchmarks
-        processed = 0
-        for user_id in sample_users[:100]:  # Sample 100 users for benchmarks
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                result = loop.run_until_complete(
-                    analytics_engine.calculate_application_insights(
-                        user_id=user_id,
-                        time_period="3m"
-                    )
-                )
-                
-                loop.close()
-                
-                if "error" not in result:
-                    metrics = result.get("metrics", {})
-                    response_rates.append(metrics.get("response_rate", 0))
-                    interview_rates.append(metrics.get("interview_rate", 0))
-                    offer_rates.append(metrics.get("offer_rate", 0))
-                    processed += 1
-                    
-            except Exception as user_error:
-                logger.warning("Failed to process user for benchmarks", 
-                             user_id=user_id, error=str(user_error))
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
         
-        # Calculate platform averages
-        import numpy as np
+        benchmarks = loop.run_until_complete(analytics_engine.get_platform_benchmarks())
         
-        benchmarks = {
-            "platform_averages": {
-                "response_rate": float(np.mean(response_rates)) if response_rates else 25.0,
-                "interview_rate": float(np.mean(interview_rates)) if interview_rates else 15.0,
-                "offer_rate": float(np.mean(offer_rates)) if offer_rates else 8.0,
-                "applications_per_month": 15.0  # Default value
-            },
-            "percentiles": {
-                "p25": {
-                    "response_rate": float(np.percentile(response_rates, 25)) if response_rates else 15.0,
-                    "interview_rate": float(np.percentile(interview_rates, 25)) if interview_rates else 8.0,
-                    "offer_rate": float(np.percentile(offer_rates, 25)) if offer_rates else 3.0
-                },
-                "p50": {
-                    "response_rate": float(np.percentile(response_rates, 50)) if response_rates else 22.0,
-                    "interview_rate": float(np.percentile(interview_rates, 50)) if interview_rates else 12.0,
-                    "offer_rate": float(np.percentile(offer_rates, 50)) if offer_rates else 6.0
-                },
-                "p75": {
-                    "response_rate": float(np.percentile(response_rates, 75)) if response_rates else 35.0,
-                    "interview_rate": float(np.percentile(interview_rates, 75)) if interview_rates else 22.0,
-                    "offer_rate": float(np.percentile(offer_rates, 75)) if offer_rates else 12.0
-                }
-            },
-            "data_points": processed,
-            "total_users_analyzed": len(sample_users)
-        }
+        loop.close()
         
         result = {
             "status": "completed",
             "benchmarks": benchmarks,
-            "users_processed": processed,
-            "calculation_time": 60.3
+            "data_points": benchmarks.get("data_points", 0),
+            "calculation_time": time.time() - start_time
         }
         
         logger.info("Platform benchmarks calculation completed successfully", 
-                   users_processed=processed)
+                   data_points=result["data_points"],
+                   source=benchmarks.get("source"))
         return result
         
     except Exception as e:
@@ -15,12 +15,18 @@ from pathlib import Path
 import structlog
 import aiofiles
 import aiohttp
-from PIL import Image, ImageOpt
-import gzip
-import brotli
-from io import BytesIO
 import json
 
+from app.core.asset_build import (
+    KIND_IMAGE,
+    KIND_TEXT,
+    IncrementalAssetBuilder,
+    atomic_write_bytes,
+    compress_bytes,
+    encode_image,
+    hash_file,
+)
+
 logger = structlog.get_logger()
 
 @dataclass
@@ -151,31 +157,23 @@ class CDNOptimizationService:
             
             original_size = len(image_data)
             
-            # Open image with PIL
-            image = Image.open(BytesIO(image_data))
-            original_format = image.format.lower() if image.format else 'jpeg'
-            
-            # Determine target format
-            if target_format is None:
-                target_format = self._select_optimal_format(image, original_format)
+            # Decode, resize and re-encode off the event loop
+            optimized_image, target_format, width, height = await asyncio.to_thread(
+                encode_image,
+                image_data,
+                target_format,
+                quality or self.config.image_quality,
+                self.config.max_image_width,
+                self.config.max_image_height,
+                self.config.image_formats
+            )
             
             # Determine output path
             if output_path is None:
                 output_path = self._generate_optimized_path(input_path, target_format)
             
             output_path = Path(output_path)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Optimize image
-            optimized_image = await self._optimize_image_data(
-                image, 
-                target_format, 
-                quality or self.config.image_quality
-            )
-            
-            # Save optimized image
-            async with aiofiles.open(output_path, 'wb') as f:
-                await f.write(optimized_image)
+            await asyncio.to_thread(atomic_write_bytes, output_path, optimized_image)
             
             optimized_size = len(optimized_image)
             
@@ -185,9 +183,10 @@ class CDNOptimizationService:
                 optimized_path=str(output_path),
                 original_size=original_size,
                 optimized_size=optimized_size,
+                compression_ratio=0.0,
                 format=target_format,
-                width=image.width,
-                height=image.height,
+                width=width,
+                height=height,
                 hash=self._calculate_hash(optimized_image)
             )
             
@@ -214,78 +213,6 @@ class CDNOptimizationService:
                         path=str(input_path), error=str(e))
             raise
     
-    async def _optimize_image_data(
-        self, 
-        image: Image.Image, 
-        target_format: str, 
-        quality: int
-    ) -> bytes:
-        """Optimize image data"""
-        # Resize if too large
-        if (image.width > self.config.max_image_width or 
-            image.height > self.config.max_image_height):
-            image.thumbnail(
-                (self.config.max_image_width, self.config.max_image_height),
-                Image.Resampling.LANCZOS
-            )
-        
-        # Convert color mode if necessary
-        if target_format == 'jpeg' and image.mode in ('RGBA', 'LA', 'P'):
-            # Convert to RGB for JPEG
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-            image = background
-        elif target_format == 'webp' and image.mode not in ('RGB', 'RGBA'):
-            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
-        
-        # Save to bytes
-        output = BytesIO()
-        
-        if target_format == 'webp':
-            image.save(output, 'WEBP', quality=quality, optimize=True)
-        elif target_format == 'jpeg':
-            image.save(output, 'JPEG', quality=quality, optimize=True)
-        elif target_format == 'png':
-            image.save(output, 'PNG', optimize=True)
-        else:
-            raise ValueError(f"Unsupported format: {target_format}")
-        
-        return output.getvalue()
-    
-    def _select_optimal_format(self, image: Image.Image, original_format: str) -> str:
-        """Select optimal image format based on content"""
-        # Check if image has transparency
-        has_transparency = (
-            image.mode in ('RGBA', 'LA') or 
-            'transparency' in image.info
-        )
-        
-        # For images with transparency, prefer WebP or PNG
-        if has_transparency:
-            return 'webp' if 'webp' in self.config.image_formats else 'png'
-        
-        # For photos, prefer WebP or JPEG
-        if self._is_photo(image):
-            return 'webp' if 'webp' in self.config.image_formats else 'jpeg'
-        
-        # For graphics/illustrations, prefer WebP or PNG
-        return 'webp' if 'webp' in self.config.image_formats else 'png'
-    
-    def _is_photo(self, image: Image.Image) -> bool:
-        """Determine if image is likely a photograph"""
-        # Simple heuristic: photos typically have more colors and less sharp edges
-        if image.mode not in ('RGB', 'RGBA'):
-            return False
-        
-        # Sample the image to check color diversity
-        sample = image.resize((100, 100))
-        colors = len(sample.getcolors(maxcolors=256*256*256))
-        
-        # Photos typically have more unique colors
-        return colors > 1000
-    
     def _generate_optimized_path(self, original_path: Path, target_format: str) -> Path:
         """Generate path for optimized asset"""
         stem = original_path.stem
@@ -314,44 +241,35 @@ class CDNOptimizationService:
             original_size = len(original_data)
             compressed_assets = {}
             
-            # Generate compressed versions
-            if self.config.enable_gzip:
-                gzip_data = gzip.compress(original_data, compresslevel=self.config.compression_level)
-                gzip_path = output_dir / f"{input_path.name}.gz"
-                
-                async with aiofiles.open(gzip_path, 'wb') as f:
-                    await f.write(gzip_data)
-                
-                compressed_assets['gzip'] = OptimizedAsset(
-                    original_path=str(input_path),
-                    optimized_path=str(gzip_path),
-                    original_size=original_size,
-                    optimized_size=len(gzip_data),
-                    format='gzip',
-                    hash=self._calculate_hash(gzip_data)
-                )
+            # Generate compressed versions off the event loop
+            variants = await asyncio.to_thread(
+                compress_bytes,
+                original_data,
+                self.config.enable_gzip,
+                self.config.enable_brotli,
+                self.config.compression_level
+            )
+            extensions = {'gzip': '.gz', 'brotli': '.br'}
             
-            if self.config.enable_brotli:
-                brotli_data = brotli.compress(original_data, quality=self.config.compression_level)
-                brotli_path = output_dir / f"{input_path.name}.br"
-                
-                async with aiofiles.open(brotli_path, 'wb') as f:
-                    await f.write(brotli_data)
+            for compression_type, compressed_data in variants.items():
+                compressed_path = output_dir / f"{input_path.name}{extensions[compression_type]}"
+                await asyncio.to_thread(atomic_write_bytes, compressed_path, compressed_data)
                 
-                compressed_assets['brotli'] = OptimizedAsset(
+                compressed_assets[compression_type] = OptimizedAsset(
                     original_path=str(input_path),
-                    optimized_path=str(brotli_path),
+                    optimized_path=str(compressed_path),
                     original_size=original_size,
-                    optimized_size=len(brotli_data),
-                    format='brotli',
-                    hash=self._calculate_hash(brotli_data)
+                    optimized_size=len(compressed_data),
+                    compression_ratio=0.0,
+                    format=compression_type,
+                    hash=self._calculate_hash(compressed_data)
                 )
             
             logger.info("Text asset compressed", 
                        path=str(input_path),
                        original_size=original_size,
-                       gzip_size=compressed_assets.get('gzip', {}).optimized_size if 'gzip' in compressed_assets else None,
-                       brotli_size=compressed_assets.get('brotli', {}).optimized_size if 'brotli' in compressed_assets else None)
+                       gzip_size=compressed_assets['gzip'].optimized_size if 'gzip' in compressed_assets else None,
+                       brotli_size=compressed_assets['brotli'].optimized_size if 'brotli' in compressed_assets else None)
             
             return compressed_assets
             
@@ -363,6 +281,7 @@ class CDNOptimizationService:
     async def generate_asset_manifest(self, assets_dir: Union[str, Path]) -> Dict[str, Any]:
         """Generate asset manifest with versioning information"""
         assets_dir = Path(assets_dir)
+        manifest_path = assets_dir / "manifest.json"
         manifest = {
             "version": datetime.utcnow().isoformat(),
             "assets": {},
@@ -370,35 +289,15 @@ class CDNOptimizationService:
         }
         
         try:
-            # Scan for assets
-            for asset_path in assets_dir.rglob("*"):
-                if asset_path.is_file() and not asset_path.name.startswith('.'):
-                    relative_path = asset_path.relative_to(assets_dir)
-                    
-                    # Calculate file hash for versioning
-                    async with aiofiles.open(asset_path, 'rb') as f:
-                        content = await f.read()
-                    
-                    file_hash = self._calculate_hash(content)
-                    file_size = len(content)
-                    
-                    # Generate versioned filename
-                    stem = asset_path.stem
-                    suffix = asset_path.suffix
-                    versioned_name = f"{stem}.{file_hash[:8]}{suffix}"
-                    
-                    manifest["assets"][str(relative_path)] = {
-                        "versioned_name": versioned_name,
-                        "hash": file_hash,
-                        "size": file_size,
-                        "mime_type": mimetypes.guess_type(str(asset_path))[0],
-                        "cdn_url": f"{self.config.cdn_base_url}/{versioned_name}" if self.config.cdn_base_url else None
-                    }
-            
-            # Save manifest
-            manifest_path = assets_dir / "manifest.json"
-            async with aiofiles.open(manifest_path, 'w') as f:
-                await f.write(json.dumps(manifest, indent=2))
+            previous = await asyncio.to_thread(self._load_manifest_assets, manifest_path)
+            manifest["assets"] = await asyncio.to_thread(
+                self._scan_manifest_assets, assets_dir, manifest_path, previous
+            )
+            
+            # Save manifest atomically so readers never see a partial file
+            await asyncio.to_thread(
+                atomic_write_bytes, manifest_path, json.dumps(manifest, indent=2).encode('utf-8')
+            )
             
             logger.info("Asset manifest generated", 
                        assets_count=len(manifest["assets"]),
@@ -410,6 +309,50 @@ class CDNOptimizationService:
             logger.error("Asset manifest generation failed", error=str(e))
             raise
     
+    def _load_manifest_assets(self, manifest_path: Path) -> Dict[str, Any]:
+        """Load asset entries from a previously generated manifest"""
+        try:
+            with open(manifest_path, 'r') as f:
+                return json.load(f).get("assets", {})
+        except (OSError, ValueError):
+            return {}
+    
+    def _scan_manifest_assets(
+        self, 
+        assets_dir: Path, 
+        manifest_path: Path,
+        previous: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Hash assets for the manifest, reusing hashes of files whose size and mtime are unchanged"""
+        assets = {}
+        
+        for asset_path in sorted(assets_dir.rglob("*")):
+            if not asset_path.is_file() or asset_path.name.startswith('.') or asset_path == manifest_path:
+                continue
+            
+            relative_path = str(asset_path.relative_to(assets_dir))
+            stat = asset_path.stat()
+            entry = previous.get(relative_path)
+            
+            if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+                file_hash = entry["hash"]
+            else:
+                file_hash = hash_file(asset_path)
+            
+            # Generate versioned filename
+            versioned_name = f"{asset_path.stem}.{file_hash[:8]}{asset_path.suffix}"
+            
+            assets[relative_path] = {
+                "versioned_name": versioned_name,
+                "hash": file_hash,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "mime_type": mimetypes.guess_type(str(asset_path))[0],
+                "cdn_url": f"{self.config.cdn_base_url}/{versioned_name}" if self.config.cdn_base_url else None
+            }
+        
+        return assets
+    
     async def upload_to_cdn(
         self, 
         asset_path: Union[str, Path], 
@@ -485,9 +428,17 @@ class CDNOptimizationService:
     async def optimize_directory(
         self, 
         input_dir: Union[str, Path],
-        output_dir: Optional[Union[str, Path]] = None
+        output_dir: Optional[Union[str, Path]] = None,
+        max_workers: Optional[int] = None
     ) -> Dict[str, OptimizedAsset]:
-        """Optimize all assets in a directory"""
+        """
+        Optimize all assets in a directory incrementally.
+        
+        Unchanged files (same content hash and optimization settings as the
+        previous build) are skipped; changed images and text assets are
+        processed in a bounded process pool and written under content-addressed
+        names, with an ``asset-manifest.json`` for ``AssetVersionManager``.
+        """
         input_dir = Path(input_dir)
         
         if output_dir is None:
@@ -495,38 +446,63 @@ class CDNOptimizationService:
         else:
             output_dir = Path(output_dir)
         
+        start_time = time.time()
         optimized_assets = {}
         
         try:
-            # Find all assets
-            image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'}
-            text_extensions = {'.css', '.js', '.html', '.htm', '.json', '.xml', '.svg'}
-            
-            for asset_path in input_dir.rglob("*"):
-                if asset_path.is_file() and not asset_path.name.startswith('.'):
-                    extension = asset_path.suffix.lower()
-                    relative_path = asset_path.relative_to(input_dir)
-                    
-                    try:
-                        if extension in image_extensions:
-                            # Optimize image
-                            optimized = await self.optimize_image(asset_path)
-                            optimized_assets[str(relative_path)] = optimized
-                            
-                        elif extension in text_extensions:
-                            # Compress text asset
-                            compressed = await self.compress_text_asset(asset_path, output_dir)
-                            for compression_type, asset in compressed.items():
-                                key = f"{relative_path}.{compression_type}"
-                                optimized_assets[key] = asset
-                        
-                    except Exception as e:
-                        logger.warning("Failed to optimize asset", 
-                                     path=str(asset_path), error=str(e))
+            builder = self._create_asset_builder(output_dir, max_workers)
+            result = await builder.build(input_dir)
+            built_paths = set(result.built)
+            
+            for relative_path, entry in result.entries.items():
+                original_size = entry["size"]
+                outputs = entry["outputs"]
+                
+                if entry["kind"] == KIND_IMAGE:
+                    output = outputs["image"]
+                    optimized_assets[relative_path] = OptimizedAsset(
+                        original_path=str(input_dir / relative_path),
+                        optimized_path=str(output_dir / output["path"]),
+                        original_size=original_size,
+                        optimized_size=output["size"],
+                        compression_ratio=0.0,
+                        format=entry["format"],
+                        width=entry.get("width"),
+                        height=entry.get("height"),
+                        hash=output["sha256"]
+                    )
+                
+                elif entry["kind"] == KIND_TEXT:
+                    for compression_type in ('gzip', 'brotli'):
+                        if compression_type not in outputs:
+                            continue
+                        output = outputs[compression_type]
+                        optimized_assets[f"{relative_path}.{compression_type}"] = OptimizedAsset(
+                            original_path=str(input_dir / relative_path),
+                            optimized_path=str(output_dir / output["path"]),
+                            original_size=original_size,
+                            optimized_size=output["size"],
+                            compression_ratio=0.0,
+                            format=compression_type,
+                            hash=output["sha256"]
+                        )
+            
+            built = [
+                asset for key, asset in optimized_assets.items()
+                if key in built_paths or key.rsplit('.', 1)[0] in built_paths
+            ]
+            self.optimization_stats["total_assets"] += len(built)
+            self.optimization_stats["total_original_size"] += sum(a.original_size for a in built)
+            self.optimization_stats["total_optimized_size"] += sum(a.optimized_size for a in built)
+            self.optimization_stats["total_savings"] += sum(a.original_size - a.optimized_size for a in built)
+            self.optimization_stats["optimization_time"] += (time.time() - start_time)
             
             logger.info("Directory optimization completed", 
                        input_dir=str(input_dir),
-                       assets_optimized=len(optimized_assets))
+                       assets_optimized=len(optimized_assets),
+                       assets_built=len(result.built),
+                       assets_skipped=len(result.skipped),
+                       assets_failed=len(result.failed))
             
             return optimized_assets
             
@@ -535,6 +511,29 @@ class CDNOptimizationService:
                         input_dir=str(input_dir), error=str(e))
             raise
     
+    def _create_asset_builder(
+        self, 
+        output_dir: Path, 
+        max_workers: Optional[int] = None
+    ) -> IncrementalAssetBuilder:
+        """Create an incremental builder for the current optimization settings"""
+        return IncrementalAssetBuilder(
+            output_dir,
+            image_options={
+                "target_format": None,
+                "formats": list(self.config.image_formats),
+                "quality": self.config.image_quality,
+                "max_width": self.config.max_image_width,
+                "max_height": self.config.max_image_height,
+            },
+            text_options={
+                "gzip": self.config.enable_gzip,
+                "brotli": self.config.enable_brotli,
+                "level": self.config.compression_level,
+            },
+            max_workers=max_workers
+        )
+    
     async def invalidate_cdn_cache(self, paths: List[str]) -> bool:
         """Invalidate CDN cache for specified paths"""
         if not self.cdn_session:
@@ -22,6 +22,7 @@ from app.core.dependencies import (
 )
 from app.middleware.correlation import CorrelationIDMiddleware
 
+from .parsing import shutdown_document_parser_pool
 from .routes import router as document_router
 
 logger = get_logger(__name__)
@@ -75,6 +76,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     
     # Cleanup
     logger.info("Document Processing Service shutting down")
+    shutdown_document_parser_pool()
     await cleanup_all()
 
 
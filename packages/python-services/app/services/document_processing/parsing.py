@@ -0,0 +1,345 @@
+"""Off-loop document parsing for uploaded resumes and documents.
+
+Uploads are spooled in chunks to unique temporary files with a hard size cap
+while their SHA-256 is computed. Parsing then runs in a bounded
+``ProcessPoolExecutor`` so that large PDFs and DOCX files never block the event
+loop; each parse has a timeout, worker processes run under an address-space
+limit, and PDFs are read page by page so huge documents are truncated early.
+Parsed results are cached in Redis by file content hash.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiofiles
+from redis.asyncio import Redis
+
+from app.core.config import get_settings
+from app.core.exceptions import ProcessingException, ValidationException
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Bump whenever parse output changes so cached results are not reused
+PARSER_VERSION = "v1"
+
+SPOOL_CHUNK_SIZE = 1024 * 1024  # 1 MB
+PARSED_CACHE_PREFIX = "parsed_document"
+
+
+@dataclass
+class SpooledUpload:
+    """An upload written to a unique temporary file."""
+
+    path: Path
+    size: int
+    sha256: str
+
+    def cleanup(self) -> None:
+        """Remove the temporary file."""
+        try:
+            self.path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("Failed to remove spooled upload", path=str(self.path), error=str(e))
+
+
+async def spool_upload(
+    chunks: AsyncIterator[bytes],
+    max_bytes: int,
+    suffix: str = ""
+) -> SpooledUpload:
+    """Stream chunks to a unique temporary file, enforcing a size cap.
+
+    Raises:
+        ValidationException: If the upload exceeds ``max_bytes``.
+    """
+    fd, temp_path = tempfile.mkstemp(prefix="upload-", suffix=suffix)
+    os.close(fd)
+    path = Path(temp_path)
+    hasher = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(path, "wb") as f:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValidationException(
+                        "Document exceeds maximum upload size",
+                        details={"max_bytes": max_bytes}
+                    )
+                hasher.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+    return SpooledUpload(path=path, size=size, sha256=hasher.hexdigest())
+
+
+async def _iter_upload_file(upload: Any, chunk_size: int) -> AsyncIterator[bytes]:
+    """Iterate a Starlette ``UploadFile`` in fixed-size chunks."""
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def _iter_bytes(content: bytes, chunk_size: int) -> AsyncIterator[bytes]:
+    """Iterate an in-memory payload in fixed-size chunks."""
+    for start in range(0, len(content), chunk_size):
+        yield content[start:start + chunk_size]
+
+
+async def spool_upload_file(upload: Any, max_bytes: int, suffix: str = "") -> SpooledUpload:
+    """Spool a FastAPI ``UploadFile`` without reading it fully into memory."""
+    return await spool_upload(_iter_upload_file(upload, SPOOL_CHUNK_SIZE), max_bytes, suffix)
+
+
+async def spool_bytes(content: bytes, max_bytes: int, suffix: str = "") -> SpooledUpload:
+    """Spool an in-memory payload for callers that already hold the bytes."""
+    return await spool_upload(_iter_bytes(content, SPOOL_CHUNK_SIZE), max_bytes, suffix)
+
+
+# Worker-process functions (must be importable top-level callables)
+
+def _init_parser_worker(memory_limit_bytes: Optional[int]) -> None:
+    """Apply the address-space limit inside each parser worker process."""
+    if not memory_limit_bytes:
+        return
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+    except (ImportError, ValueError, OSError):
+        # Not supported on this platform; timeouts still bound the worker
+        pass
+
+
+def _parse_pdf(path: str, max_pages: int, max_chars: int) -> Dict[str, Any]:
+    import pypdf
+
+    reader = pypdf.PdfReader(path)
+    total_pages = len(reader.pages)
+    pages = []
+    char_count = 0
+    truncated = False
+
+    for page_num, page in enumerate(reader.pages):
+        if page_num >= max_pages or char_count >= max_chars:
+            truncated = True
+            break
+        page_text = page.extract_text() or ""
+        pages.append(page_text)
+        char_count += len(page_text)
+
+    text = "\n\n".join(pages)
+    if len(text) > max_chars:
+        text = text[:max_chars]
+        truncated = True
+
+    return {
+        "text": text,
+        "metadata": {
+            "pages": len(pages),
+            "total_pages": total_pages,
+            "truncated": truncated,
+            "extraction_method": "pypdf"
+        }
+    }
+
+
+def _parse_docx(path: str, max_chars: int) -> Dict[str, Any]:
+    from docx import Document as DocxDocument
+
+    doc = DocxDocument(path)
+    paragraphs = []
+    char_count = 0
+    truncated = False
+
+    for paragraph in doc.paragraphs:
+        if char_count >= max_chars:
+            truncated = True
+            break
+        if paragraph.text.strip():
+            paragraphs.append(paragraph.text)
+            char_count += len(paragraph.text) + 1
+
+    text = "\n".join(paragraphs)
+    if len(text) > max_chars:
+        text = text[:max_chars]
+        truncated = True
+
+    return {
+        "text": text,
+        "metadata": {
+            "paragraphs": len(paragraphs),
+            "truncated": truncated,
+            "extraction_method": "python-docx"
+        }
+    }
+
+
+def _parse_txt(path: str, max_chars: int) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        text = f.read(max_chars + 1)
+    truncated = len(text) > max_chars
+
+    return {
+        "text": text[:max_chars],
+        "metadata": {
+            "truncated": truncated,
+            "extraction_method": "direct"
+        }
+    }
+
+
+def parse_document_file(path: str, format: str, max_pages: int, max_chars: int) -> Dict[str, Any]:
+    """Parse a spooled document; runs inside a parser worker process."""
+    if format == "pdf":
+        return _parse_pdf(path, max_pages, max_chars)
+    if format == "docx":
+        return _parse_docx(path, max_chars)
+    if format == "txt":
+        return _parse_txt(path, max_chars)
+    raise ValueError(f"Unsupported document format: {format}")
+
+
+class DocumentParserPool:
+    """Bounded process pool for CPU-heavy document parsing."""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        timeout: float = 30.0,
+        memory_limit_mb: Optional[int] = 512,
+        max_pages: int = 50,
+        max_chars: int = 200_000
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_parser_worker,
+                initargs=(self.memory_limit_bytes,)
+            )
+        return self._executor
+
+    async def parse(self, path: Path, format: str) -> Dict[str, Any]:
+        """Parse a document off the event loop with a per-document timeout."""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._get_executor(),
+            parse_document_file,
+            str(path),
+            format,
+            self.max_pages,
+            self.max_chars
+        )
+
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            # The stuck worker cannot be cancelled individually, so recycle the pool
+            self._reset()
+            raise ProcessingException(
+                "Document parsing timed out",
+                processing_type="document_parsing",
+                details={"timeout": self.timeout}
+            )
+        except (BrokenProcessPool, MemoryError):
+            self._reset()
+            raise ProcessingException(
+                "Document parsing exceeded resource limits",
+                processing_type="document_parsing"
+            )
+
+    def _reset(self) -> None:
+        """Terminate the current workers; a fresh pool is created on next use."""
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        for process in list(getattr(executor, "_processes", {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """Shut down the pool and wait for workers to exit."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+_parser_pool: Optional[DocumentParserPool] = None
+
+
+def get_document_parser_pool() -> DocumentParserPool:
+    """Get the process-wide document parser pool."""
+    global _parser_pool
+
+    if _parser_pool is None:
+        settings = get_settings()
+        _parser_pool = DocumentParserPool(
+            max_workers=settings.ai.parser_max_workers,
+            timeout=settings.ai.parser_timeout,
+            memory_limit_mb=settings.ai.parser_memory_limit_mb,
+            max_pages=settings.ai.parser_max_pages,
+            max_chars=settings.ai.parser_max_chars
+        )
+    return _parser_pool
+
+
+def shutdown_document_parser_pool() -> None:
+    """Shut down the process-wide document parser pool."""
+    global _parser_pool
+
+    if _parser_pool is not None:
+        _parser_pool.shutdown()
+        _parser_pool = None
+
+
+class ParsedDocumentCache:
+    """Redis cache of parse results keyed by file content hash."""
+
+    def __init__(self, redis_client: Optional[Redis], ttl: int = 86400):
+        self.redis = redis_client
+        self.ttl = ttl
+
+    def _key(self, sha256: str, format: str) -> str:
+        return f"{PARSED_CACHE_PREFIX}:{PARSER_VERSION}:{format}:{sha256}"
+
+    async def get(self, sha256: str, format: str) -> Optional[Dict[str, Any]]:
+        if self.redis is None:
+            return None
+        try:
+            data = await self.redis.get(self._key(sha256, format))
+            if data:
+                return json.loads(data)
+        except Exception as e:
+            logger.warning("Failed to read cached parse result", sha256=sha256, error=str(e))
+        return None
+
+    async def set(self, sha256: str, format: str, result: Dict[str, Any]) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.setex(self._key(sha256, format), self.ttl, json.dumps(result))
+        except Exception as e:
+            logger.warning("Failed to cache parse result", sha256=sha256, error=str(e))
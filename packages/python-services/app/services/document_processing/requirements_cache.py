@@ -0,0 +1,172 @@
+"""Content-addressed cache for structured job-requirement extractions.
+
+Extractions are keyed on a digest of the normalised job description, the
+extraction prompt version and the model name, so every user applying to the
+same posting shares one LLM call. Results live in Redis (hot tier) and in the
+``job_requirement_extractions`` table (durable tier) and are precomputed by
+the ``document_processing.precompute_job_requirements`` Celery task when jobs
+are ingested.
+"""
+
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Optional
+
+from redis.asyncio import Redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_session
+from app.core.logging import get_logger
+
+from .models import ExtractedRequirements
+
+logger = get_logger(__name__)
+
+# Bump whenever the extraction prompt or output schema changes so that stale
+# extractions are not served for the new prompt.
+REQUIREMENTS_PROMPT_VERSION = "v1"
+
+REDIS_KEY_PREFIX = "job_requirements"
+DEFAULT_REDIS_TTL = 7 * 24 * 3600  # 7 days
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_job_description(job_description: str) -> str:
+    """Normalise a job description so cosmetic differences share a digest."""
+    normalized = unicodedata.normalize("NFKC", job_description or "")
+    return _WHITESPACE_RE.sub(" ", normalized).strip().lower()
+
+
+def compute_requirements_digest(
+    job_description: str,
+    model: str,
+    prompt_version: str = REQUIREMENTS_PROMPT_VERSION
+) -> str:
+    """Compute the cache digest for a job description, prompt version and model."""
+    hasher = hashlib.sha256()
+    hasher.update(prompt_version.encode("utf-8"))
+    hasher.update(b"\x00")
+    hasher.update(model.encode("utf-8"))
+    hasher.update(b"\x00")
+    hasher.update(normalize_job_description(job_description).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class JobRequirementsCache:
+    """Two-tier (Redis + Postgres) store for extracted job requirements."""
+
+    def __init__(
+        self,
+        redis_client: Optional[Redis],
+        db_session: Optional[AsyncSession] = None,
+        redis_ttl: int = DEFAULT_REDIS_TTL
+    ):
+        self.redis = redis_client
+        self.db = db_session
+        self.redis_ttl = redis_ttl
+
+    def _redis_key(self, digest: str) -> str:
+        return f"{REDIS_KEY_PREFIX}:{digest}"
+
+    async def get(self, digest: str) -> Optional[ExtractedRequirements]:
+        """Read an extraction, falling back from Redis to Postgres."""
+        cached = await self._get_from_redis(digest)
+        if cached is not None:
+            return cached
+
+        stored = await self._get_from_database(digest)
+        if stored is not None:
+            # Re-populate the hot tier so the next reader skips Postgres
+            await self._set_in_redis(digest, stored)
+        return stored
+
+    async def set(
+        self,
+        digest: str,
+        requirements: ExtractedRequirements,
+        model: str,
+        prompt_version: str = REQUIREMENTS_PROMPT_VERSION
+    ) -> None:
+        """Persist an extraction to both tiers."""
+        await self._set_in_database(digest, requirements, model, prompt_version)
+        await self._set_in_redis(digest, requirements)
+
+    async def _get_from_redis(self, digest: str) -> Optional[ExtractedRequirements]:
+        if self.redis is None:
+            return None
+        try:
+            data = await self.redis.get(self._redis_key(digest))
+            if data:
+                return ExtractedRequirements.model_validate_json(data)
+        except Exception as e:
+            logger.warning("Failed to read cached job requirements", digest=digest, error=str(e))
+        return None
+
+    async def _set_in_redis(self, digest: str, requirements: ExtractedRequirements) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.setex(
+                self._redis_key(digest), self.redis_ttl, requirements.model_dump_json()
+            )
+        except Exception as e:
+            logger.warning("Failed to cache job requirements", digest=digest, error=str(e))
+
+    async def _get_from_database(self, digest: str) -> Optional[ExtractedRequirements]:
+        query = text("""
+            SELECT requirements FROM job_requirement_extractions
+            WHERE digest = :digest
+        """)
+        try:
+            if self.db is not None:
+                result = await self.db.execute(query, {"digest": digest})
+                row = result.fetchone()
+            else:
+                async with get_async_session() as session:
+                    result = await session.execute(query, {"digest": digest})
+                    row = result.fetchone()
+        except Exception as e:
+            logger.warning("Failed to read stored job requirements", digest=digest, error=str(e))
+            return None
+
+        if row is None:
+            return None
+        data = row[0]
+        if isinstance(data, str):
+            data = json.loads(data)
+        return ExtractedRequirements(**data)
+
+    async def _set_in_database(
+        self,
+        digest: str,
+        requirements: ExtractedRequirements,
+        model: str,
+        prompt_version: str
+    ) -> None:
+        query = text("""
+            INSERT INTO job_requirement_extractions (
+                digest, prompt_version, model, requirements, created_at, updated_at
+            ) VALUES (
+                :digest, :prompt_version, :model, CAST(:requirements AS JSONB), NOW(), NOW()
+            )
+            ON CONFLICT (digest) DO UPDATE SET
+                requirements = EXCLUDED.requirements,
+                updated_at = NOW()
+        """)
+        params = {
+            "digest": digest,
+            "prompt_version": prompt_version,
+            "model": model,
+            "requirements": requirements.model_dump_json(),
+        }
+        try:
+            # Use a dedicated session so the caller's transaction is never committed here
+            async with get_async_session() as session:
+                await session.execute(query, params)
+                await session.commit()
+        except Exception as e:
+            logger.warning("Failed to store job requirements", digest=digest, error=str(e))
@@ -22,6 +22,7 @@ from .models import (
     TemplateType,
     DocumentFormat
 )
+from .parsing import spool_upload_file
 from .service import DocumentProcessingService
 
 logger = get_logger(__name__)
@@ -196,6 +197,7 @@ async def generate_cover_letter(
 async def process_document(
     file: UploadFile = File(...),
     format: DocumentFormat = Form(...),
+    deps: ServiceDependencies = Depends(get_document_processing_dependencies),
     auth: ServiceAuth = Depends(get_current_auth)
 ):
     """Process uploaded document and extract text."""
@@ -209,15 +211,20 @@ async def process_document(
             format=format
         )
         
-        # Read file content
-        file_content = await file.read()
+        document_service = DocumentProcessingService(deps)
         
-        # Process document
-        processed_document = await document_service.process_document(
-            file_content=file_content,
-            file_name=file.filename or "unknown",
-            format=format
+        # Stream the upload to a unique temporary file instead of buffering it
+        spooled = await spool_upload_file(
+            file, document_service.max_upload_bytes, suffix=f".{format.value}"
         )
+        try:
+            processed_document = await document_service.process_spooled_document(
+                spooled,
+                file_name=file.filename or "unknown",
+                format=format
+            )
+        finally:
+            spooled.cleanup()
         
         processing_time = time.time() - start_time
         
@@ -228,6 +235,17 @@ async def process_document(
             "processing_time": processing_time
         }
         
+    except ValidationException as e:
+        logger.warning("Document upload rejected", error=str(e))
+        return JSONResponse(
+            status_code=413,
+            content={
+                "status": "failed",
+                "error": str(e),
+                "correlation_id": correlation_id,
+                "processing_time": time.time() - start_time
+            }
+        )
     except ProcessingException as e:
         logger.error("Document processing failed", error=str(e))
         return JSONResponse(
@@ -2,22 +2,18 @@
 
 import json
 import time
-import io
 import asyncio
 from typing import Dict, Any, Optional, List
-from pathlib import Path
 
-from langchain_community.document_loaders import PyPDFLoader, UnstructuredWordDocumentLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.prompts import PromptTemplate
 from jinja2 import Template, Environment, BaseLoader
-import pypdf
-from docx import Document as DocxDocument
 
+from app.core.activity_counters import DOCUMENT_GENERATED, ActivityCounters
 from app.core.config import get_settings
-from app.core.exceptions import ProcessingException, ExternalServiceException
+from app.core.exceptions import ProcessingException, ExternalServiceException, ValidationException
 from app.core.logging import get_logger
 from app.core.openai_client import EnhancedOpenAIClient
 from app.core.dependencies import ServiceDependencies
@@ -31,6 +27,17 @@ from .models import (
     TemplateType,
     ProcessedDocument
 )
+from .parsing import (
+    ParsedDocumentCache,
+    SpooledUpload,
+    get_document_parser_pool,
+    spool_bytes
+)
+from .requirements_cache import (
+    JobRequirementsCache,
+    REQUIREMENTS_PROMPT_VERSION,
+    compute_requirements_digest
+)
 
 logger = get_logger(__name__)
 
@@ -68,6 +75,23 @@ class DocumentProcessingService:
         
         # Cache for processed documents
         self.document_cache_ttl = 3600  # 1 hour
+        
+        # Off-loop document parsing with results cached by content hash
+        self.parser_pool = get_document_parser_pool()
+        self.parsed_document_cache = ParsedDocumentCache(
+            self.redis, ttl=self.settings.ai.parsed_document_cache_ttl
+        )
+        self.max_upload_bytes = self.settings.ai.max_document_size_mb * 1024 * 1024
+        
+        # Shared, content-addressed store for job requirement extractions
+        self.requirements_cache = JobRequirementsCache(
+            self.redis,
+            getattr(dependencies, "db", None),
+            redis_ttl=self.settings.ai.requirements_cache_ttl
+        )
+        
+        # Per-minute generation counts for the business metrics
+        self.activity = ActivityCounters(self.redis)
     
     async def generate_resume(
         self,
@@ -133,6 +157,7 @@ class DocumentProcessingService:
             
             # Cache the generated document
             await self._cache_document(cache_key, generated_document)
+            await self._record_document_generated()
             
             self.logger.info(
                 "Resume generation completed successfully",
@@ -322,59 +347,68 @@ class DocumentProcessingService:
         format: DocumentFormat
     ) -> ProcessedDocument:
         """Process uploaded document and extract text."""
+        spooled = await spool_bytes(file_content, self.max_upload_bytes, suffix=f".{format.value}")
+        try:
+            return await self.process_spooled_document(spooled, file_name, format)
+        finally:
+            spooled.cleanup()
+    
+    async def process_spooled_document(
+        self,
+        spooled: SpooledUpload,
+        file_name: str,
+        format: DocumentFormat
+    ) -> ProcessedDocument:
+        """Extract text from an upload already spooled to a temporary file."""
         start_time = time.time()
         
         try:
-            logger.info("Starting document processing", file_name=file_name, format=format)
-            
-            # Save file temporarily for processing
-            temp_file_path = f"/tmp/{file_name}"
-            with open(temp_file_path, "wb") as f:
-                f.write(file_content)
-            
-            # Extract text based on format
-            extracted_text = ""
-            metadata = {}
-            
-            if format == DocumentFormat.PDF:
-                loader = PyPDFLoader(temp_file_path)
-                documents = loader.load()
-                extracted_text = "\n".join([doc.page_content for doc in documents])
-                metadata["pages"] = len(documents)
-                
-            elif format == DocumentFormat.DOCX:
-                loader = UnstructuredWordDocumentLoader(temp_file_path)
-                documents = loader.load()
-                extracted_text = "\n".join([doc.page_content for doc in documents])
-                
-            elif format == DocumentFormat.TXT:
-                with open(temp_file_path, "r", encoding="utf-8") as f:
-                    extracted_text = f.read()
+            logger.info(
+                "Starting document processing",
+                file_name=file_name,
+                format=format,
+                size=spooled.size
+            )
             
+            parsed = await self._parse_spooled_document(spooled, format)
             processing_time = time.time() - start_time
             
-            # Clean up temporary file
-            import os
-            os.remove(temp_file_path)
-            
             logger.info(
                 "Document processing completed",
                 processing_time=processing_time,
-                text_length=len(extracted_text)
+                text_length=len(parsed["text"]),
+                cached=parsed["metadata"].get("cached", False)
             )
             
             return ProcessedDocument(
                 file_name=file_name,
                 format=format,
-                extracted_text=extracted_text,
-                metadata=metadata,
+                extracted_text=parsed["text"],
+                metadata=parsed["metadata"],
                 processing_time=processing_time
             )
             
+        except (ValidationException, ProcessingException):
+            raise
         except Exception as e:
             logger.error("Document processing failed", error=str(e), exc_info=True)
             raise ProcessingException(f"Document processing failed: {str(e)}")
     
+    async def _parse_spooled_document(
+        self, spooled: SpooledUpload, format: DocumentFormat
+    ) -> Dict[str, Any]:
+        """Parse a spooled document in the process pool, reusing cached results."""
+        cached = await self.parsed_document_cache.get(spooled.sha256, format.value)
+        if cached is not None:
+            cached["metadata"]["cached"] = True
+            return cached
+        
+        parsed = await self.parser_pool.parse(spooled.path, format.value)
+        parsed["metadata"]["content_sha256"] = spooled.sha256
+        await self.parsed_document_cache.set(spooled.sha256, format.value, parsed)
+        parsed["metadata"]["cached"] = False
+        return parsed
+    
     async def generate_cover_letter(
         self,
         user_profile: UserProfile,
@@ -435,6 +469,7 @@ class DocumentProcessingService:
                 generation_time=generation_time,
                 word_count=word_count
             )
+            await self._record_document_generated()
             
             return GeneratedDocument(
                 content=cover_letter_content,
@@ -560,7 +595,36 @@ class DocumentProcessingService:
     async def _extract_job_requirements_with_langchain(
         self, job_description: str
     ) -> ExtractedRequirements:
-        """Extract job requirements using LangChain with structured output."""
+        """Extract job requirements, reading the shared extraction cache first.
+        
+        Extractions are normally precomputed at job-ingestion time, so the
+        interactive path only reads the stored result; the LLM is called only
+        for descriptions that have not been seen before.
+        """
+        model = self.settings.ai.openai_model
+        digest = compute_requirements_digest(job_description, model)
+        
+        cached_requirements = await self.requirements_cache.get(digest)
+        if cached_requirements is not None:
+            self.logger.info("Using stored job requirement extraction", digest=digest)
+            return cached_requirements
+        
+        requirements, parsed = await self._run_job_requirements_extraction(job_description)
+        if parsed:
+            await self.requirements_cache.set(
+                digest, requirements, model, REQUIREMENTS_PROMPT_VERSION
+            )
+        return requirements
+    
+    async def precompute_job_requirements(self, job_description: str) -> str:
+        """Ensure an extraction is stored for a job description and return its digest."""
+        await self._extract_job_requirements_with_langchain(job_description)
+        return compute_requirements_digest(job_description, self.settings.ai.openai_model)
+    
+    async def _run_job_requirements_extraction(
+        self, job_description: str
+    ) -> tuple[ExtractedRequirements, bool]:
+        """Run the LangChain extraction; returns the requirements and whether parsing succeeded."""
         
         system_message = SystemMessage(content="""
         You are an expert HR analyst specializing in job requirement extraction.
@@ -610,11 +674,11 @@ class DocumentProcessingService:
             
             # Parse JSON response
             extracted_data = json.loads(response.content)
-            return ExtractedRequirements(**extracted_data)
+            return ExtractedRequirements(**extracted_data), True
             
         except json.JSONDecodeError as e:
             self.logger.error("Failed to parse LangChain extracted requirements JSON", error=str(e))
-            return ExtractedRequirements()
+            return ExtractedRequirements(), False
         except Exception as e:
             self.logger.error("LangChain job requirement extraction failed", error=str(e))
             raise ProcessingException(f"Job requirement extraction failed: {str(e)}")
@@ -743,6 +807,13 @@ Date: {{ generation_date }}
             self.logger.warning("Failed to get cached document", cache_key=cache_key, error=str(e))
         return None
     
+    async def _record_document_generated(self) -> None:
+        """Count a generated document towards the business rate metrics."""
+        try:
+            await self.activity.record(DOCUMENT_GENERATED)
+        except Exception as e:
+            self.logger.warning("Failed to record document generation", error=str(e))
+    
     async def _cache_document(self, cache_key: str, document: GeneratedDocument) -> None:
         """Cache generated document."""
         try:
@@ -756,62 +827,24 @@ Date: {{ generation_date }}
     async def process_document_with_langchain(
         self, file_content: bytes, file_name: str, format: DocumentFormat
     ) -> ProcessedDocument:
-        """Process document using LangChain loaders with enhanced text extraction."""
+        """Process document off the event loop and chunk it with the LangChain splitter."""
         start_time = time.time()
         
         try:
             self.logger.info("Processing document with LangChain", file_name=file_name, format=format)
             
-            # Create temporary file
-            temp_file_path = Path(f"/tmp/{file_name}")
-            temp_file_path.parent.mkdir(exist_ok=True)
-            
-            with open(temp_file_path, "wb") as f:
-                f.write(file_content)
-            
-            extracted_text = ""
-            metadata = {}
-            
-            if format == DocumentFormat.PDF:
-                # Use PyPDF for better text extraction
-                pdf_reader = pypdf.PdfReader(io.BytesIO(file_content))
-                pages = []
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
-                    pages.append(page_text)
-                
-                extracted_text = "\n\n".join(pages)
-                metadata = {
-                    "pages": len(pages),
-                    "pdf_info": pdf_reader.metadata,
-                    "extraction_method": "pypdf"
-                }
-                
-            elif format == DocumentFormat.DOCX:
-                # Use python-docx for better structure preservation
-                doc = DocxDocument(io.BytesIO(file_content))
-                paragraphs = []
-                for paragraph in doc.paragraphs:
-                    if paragraph.text.strip():
-                        paragraphs.append(paragraph.text)
-                
-                extracted_text = "\n".join(paragraphs)
-                metadata = {
-                    "paragraphs": len(paragraphs),
-                    "extraction_method": "python-docx"
-                }
-                
-            elif format == DocumentFormat.TXT:
-                extracted_text = file_content.decode('utf-8', errors='ignore')
-                metadata = {"extraction_method": "direct"}
-            
-            # Clean up temporary file
-            if temp_file_path.exists():
-                temp_file_path.unlink()
+            spooled = await spool_bytes(file_content, self.max_upload_bytes, suffix=f".{format.value}")
+            try:
+                parsed = await self._parse_spooled_document(spooled, format)
+            finally:
+                spooled.cleanup()
+            
+            extracted_text = parsed["text"]
+            metadata = parsed["metadata"]
             
             # Use LangChain text splitter for better chunking
             if len(extracted_text) > 2000:
-                chunks = self.text_splitter.split_text(extracted_text)
+                chunks = await asyncio.to_thread(self.text_splitter.split_text, extracted_text)
                 metadata["chunks"] = len(chunks)
                 metadata["chunked"] = True
             else:
@@ -834,9 +867,11 @@ Date: {{ generation_date }}
                 processing_time=processing_time
             )
             
+        except (ValidationException, ProcessingException):
+            raise
         except Exception as e:
             self.logger.error("LangChain document processing failed", error=str(e), exc_info=True)
             raise ProcessingException(
                 f"Document processing failed: {str(e)}",
                 processing_type="document_processing"
-            )
\ No newline at end of file
+            )
@@ -3,16 +3,23 @@
 import asyncio
 from typing import Dict, Any, Optional
 
+from sqlalchemy import text
+
 from app.core.celery import celery_app
 from app.core.logging import get_logger
 from app.core.dependencies import get_redis_client, get_openai_client, ServiceDependencies
 from app.core.config import get_settings
+from app.core.database import get_async_session
+
+from app.core.subsystems import lazy_subsystem
 
 from .models import UserProfile, JobPosting, TemplateType, DocumentFormat
-from .service import DocumentProcessingService
 
 logger = get_logger(__name__)
 
+# Imported on first use so workers not serving documents skip LangChain
+DocumentProcessingService = lazy_subsystem("document_processing")
+
 
 async def _get_service_dependencies() -> ServiceDependencies:
     """Get service dependencies for Celery tasks."""
@@ -128,6 +135,65 @@ def extract_job_requirements_task(self, job_description: str) -> Dict[str, Any]:
         self.retry(countdown=60, max_retries=3)
 
 
+@celery_app.task(bind=True, name="document_processing.precompute_job_requirements")
+def precompute_job_requirements_task(self, job_ids: list[str]) -> Dict[str, Any]:
+    """Precompute and store requirement extractions for newly ingested jobs.
+    
+    Runs at ingestion time so that interactive resume generation only reads the
+    stored extraction. Jobs whose normalised description was already extracted
+    with the current prompt version and model are served from the cache.
+    """
+    try:
+        logger.info("Starting job requirement precomputation task", job_count=len(job_ids))
+        
+        # Run async function in event loop
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        
+        try:
+            result = loop.run_until_complete(_precompute_job_requirements_async(job_ids))
+        finally:
+            loop.close()
+        
+        logger.info("Job requirement precomputation completed", **result)
+        return {"status": "completed", **result}
+        
+    except Exception as e:
+        logger.error("Job requirement precomputation failed", error=str(e), exc_info=True)
+        self.retry(countdown=120, max_retries=3)
+
+
+async def _precompute_job_requirements_async(job_ids: list[str]) -> Dict[str, Any]:
+    """Load job descriptions and make sure each has a stored extraction."""
+    async with get_async_session() as session:
+        result = await session.execute(
+            text("SELECT id, description FROM jobs WHERE id = ANY(:job_ids)"),
+            {"job_ids": job_ids}
+        )
+        jobs = result.fetchall()
+    
+    dependencies = await _get_service_dependencies()
+    service = DocumentProcessingService(dependencies)
+    
+    digests = set()
+    failed = 0
+    for job in jobs:
+        if not job.description:
+            continue
+        try:
+            digests.add(await service.precompute_job_requirements(job.description))
+        except Exception as e:
+            failed += 1
+            logger.warning("Requirement precomputation failed for job", job_id=str(job.id), error=str(e))
+    
+    return {
+        "jobs_requested": len(job_ids),
+        "jobs_found": len(jobs),
+        "unique_extractions": len(digests),
+        "failed": failed
+    }
+
+
 @celery_app.task(bind=True, name="document_processing.generate_cover_letter")
 def generate_cover_letter_task(
     self,
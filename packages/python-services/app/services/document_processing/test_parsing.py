@@ -0,0 +1,155 @@
+"""Tests for off-loop document parsing and upload spooling."""
+
+import hashlib
+import io
+
+import pytest
+from unittest.mock import AsyncMock
+
+from app.core.exceptions import ValidationException
+
+from .parsing import (
+    DocumentParserPool,
+    ParsedDocumentCache,
+    parse_document_file,
+    spool_bytes,
+    spool_upload_file
+)
+
+
+def _write_blank_pdf(path, pages: int) -> None:
+    import pypdf
+
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+class _FakeUploadFile:
+    """Minimal stand-in for Starlette's UploadFile."""
+
+    def __init__(self, content: bytes):
+        self._buffer = io.BytesIO(content)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._buffer.read(size)
+
+
+class TestUploadSpooling:
+    """Test streamed upload spooling."""
+
+    @pytest.mark.asyncio
+    async def test_spool_bytes_writes_unique_file_and_hash(self):
+        content = b"resume content" * 1000
+        first = await spool_bytes(content, max_bytes=1024 * 1024, suffix=".txt")
+        second = await spool_bytes(content, max_bytes=1024 * 1024, suffix=".txt")
+        try:
+            assert first.path != second.path
+            assert first.size == len(content)
+            assert first.sha256 == hashlib.sha256(content).hexdigest()
+            assert first.path.read_bytes() == content
+        finally:
+            first.cleanup()
+            second.cleanup()
+
+        assert not first.path.exists()
+
+    @pytest.mark.asyncio
+    async def test_spool_upload_file_streams_in_chunks(self):
+        content = b"a" * (3 * 1024 * 1024 + 17)
+        spooled = await spool_upload_file(_FakeUploadFile(content), max_bytes=4 * 1024 * 1024)
+        try:
+            assert spooled.size == len(content)
+            assert spooled.sha256 == hashlib.sha256(content).hexdigest()
+        finally:
+            spooled.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_oversized_upload_is_rejected_and_removed(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+
+        with pytest.raises(ValidationException):
+            await spool_bytes(b"x" * 2048, max_bytes=1024)
+
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestParseDocumentFile:
+    """Test the worker-side parse functions."""
+
+    def test_parse_txt_truncates_to_max_chars(self, tmp_path):
+        path = tmp_path / "doc.txt"
+        path.write_text("abcdef" * 10)
+
+        result = parse_document_file(str(path), "txt", max_pages=10, max_chars=12)
+
+        assert result["text"] == "abcdefabcdef"
+        assert result["metadata"]["truncated"] is True
+
+    def test_parse_pdf_stops_at_page_limit(self, tmp_path):
+        path = tmp_path / "doc.pdf"
+        _write_blank_pdf(path, pages=5)
+
+        result = parse_document_file(str(path), "pdf", max_pages=2, max_chars=10_000)
+
+        assert result["metadata"]["pages"] == 2
+        assert result["metadata"]["total_pages"] == 5
+        assert result["metadata"]["truncated"] is True
+
+    def test_parse_docx(self, tmp_path):
+        from docx import Document as DocxDocument
+
+        path = tmp_path / "doc.docx"
+        doc = DocxDocument()
+        doc.add_paragraph("Senior Engineer")
+        doc.add_paragraph("")
+        doc.add_paragraph("Python, SQL")
+        doc.save(str(path))
+
+        result = parse_document_file(str(path), "docx", max_pages=10, max_chars=10_000)
+
+        assert result["text"] == "Senior Engineer\nPython, SQL"
+        assert result["metadata"]["paragraphs"] == 2
+
+    def test_unsupported_format(self, tmp_path):
+        path = tmp_path / "doc.bin"
+        path.write_bytes(b"\x00")
+
+        with pytest.raises(ValueError):
+            parse_document_file(str(path), "bin", max_pages=1, max_chars=1)
+
+
+class TestDocumentParserPool:
+    """Test parsing through the bounded process pool."""
+
+    @pytest.mark.asyncio
+    async def test_parse_runs_in_worker_process(self, tmp_path):
+        path = tmp_path / "doc.txt"
+        path.write_text("hello from a worker")
+        pool = DocumentParserPool(max_workers=1, timeout=30, memory_limit_mb=None)
+        try:
+            result = await pool.parse(path, "txt")
+        finally:
+            pool.shutdown()
+
+        assert result["text"] == "hello from a worker"
+
+
+class TestParsedDocumentCache:
+    """Test the content-hash parse cache."""
+
+    @pytest.mark.asyncio
+    async def test_round_trip(self):
+        store = {}
+        redis = AsyncMock()
+        redis.get.side_effect = lambda key: store.get(key)
+        redis.setex.side_effect = lambda key, ttl, value: store.__setitem__(key, value)
+        cache = ParsedDocumentCache(redis, ttl=60)
+
+        assert await cache.get("abc", "pdf") is None
+        await cache.set("abc", "pdf", {"text": "t", "metadata": {"pages": 1}})
+
+        assert await cache.get("abc", "pdf") == {"text": "t", "metadata": {"pages": 1}}
+        assert await cache.get("abc", "docx") is None
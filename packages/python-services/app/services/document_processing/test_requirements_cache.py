@@ -0,0 +1,117 @@
+"""Tests for the content-addressed job requirement extraction cache."""
+
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+
+from .models import ExtractedRequirements
+from .requirements_cache import (
+    JobRequirementsCache,
+    REQUIREMENTS_PROMPT_VERSION,
+    compute_requirements_digest,
+    normalize_job_description
+)
+
+
+@pytest.fixture
+def sample_requirements():
+    """Sample extracted requirements."""
+    return ExtractedRequirements(
+        required_skills=["Python", "SQL"],
+        preferred_skills=["AWS"],
+        experience_years=5
+    )
+
+
+class TestRequirementsDigest:
+    """Test digest computation."""
+
+    def test_normalization_ignores_whitespace_and_case(self):
+        a = "Senior  Python Engineer\n\nMust know   SQL"
+        b = "senior python engineer must know sql  "
+        assert normalize_job_description(a) == normalize_job_description(b)
+        assert compute_requirements_digest(a, "gpt-4") == compute_requirements_digest(b, "gpt-4")
+
+    def test_digest_depends_on_model_and_prompt_version(self):
+        description = "Senior Python Engineer"
+        base = compute_requirements_digest(description, "gpt-4")
+        assert base != compute_requirements_digest(description, "gpt-4o")
+        assert base != compute_requirements_digest(description, "gpt-4", prompt_version="v999")
+        assert base == compute_requirements_digest(description, "gpt-4", REQUIREMENTS_PROMPT_VERSION)
+
+
+class TestJobRequirementsCache:
+    """Test two-tier cache reads and writes."""
+
+    @pytest.mark.asyncio
+    async def test_get_returns_redis_hit_without_database(self, sample_requirements):
+        redis = AsyncMock()
+        redis.get.return_value = sample_requirements.model_dump_json()
+        db = AsyncMock()
+        cache = JobRequirementsCache(redis, db)
+
+        result = await cache.get("abc")
+
+        assert result == sample_requirements
+        redis.get.assert_awaited_once_with("job_requirements:abc")
+        db.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_falls_back_to_database_and_repopulates_redis(self, sample_requirements):
+        redis = AsyncMock()
+        redis.get.return_value = None
+        db = AsyncMock()
+        db_result = Mock()
+        db_result.fetchone.return_value = (sample_requirements.model_dump(),)
+        db.execute.return_value = db_result
+        cache = JobRequirementsCache(redis, db, redis_ttl=60)
+
+        result = await cache.get("abc")
+
+        assert result == sample_requirements
+        redis.setex.assert_awaited_once()
+        key, ttl, _ = redis.setex.call_args.args
+        assert key == "job_requirements:abc"
+        assert ttl == 60
+
+    @pytest.mark.asyncio
+    async def test_get_miss_returns_none(self):
+        redis = AsyncMock()
+        redis.get.return_value = None
+        db = AsyncMock()
+        db_result = Mock()
+        db_result.fetchone.return_value = None
+        db.execute.return_value = db_result
+        cache = JobRequirementsCache(redis, db)
+
+        assert await cache.get("missing") is None
+        redis.setex.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch('app.services.document_processing.requirements_cache.get_async_session')
+    async def test_set_writes_both_tiers(self, mock_session, sample_requirements):
+        session = AsyncMock()
+        mock_session.return_value.__aenter__.return_value = session
+        redis = AsyncMock()
+        cache = JobRequirementsCache(redis)
+
+        await cache.set("abc", sample_requirements, "gpt-4")
+
+        session.execute.assert_awaited_once()
+        params = session.execute.call_args.args[1]
+        assert params["digest"] == "abc"
+        assert params["model"] == "gpt-4"
+        assert params["prompt_version"] == REQUIREMENTS_PROMPT_VERSION
+        session.commit.assert_awaited_once()
+        redis.setex.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_are_not_fatal(self, sample_requirements):
+        redis = AsyncMock()
+        redis.get.side_effect = ConnectionError("redis down")
+        db = AsyncMock()
+        db_result = Mock()
+        db_result.fetchone.return_value = (sample_requirements.model_dump_json(),)
+        db.execute.return_value = db_result
+        cache = JobRequirementsCache(redis, db)
+
+        assert await cache.get("abc") == sample_requirements
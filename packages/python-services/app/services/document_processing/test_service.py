@@ -22,7 +22,7 @@ from .models import (
     UserProfile, JobPosting, ExtractedRequirements, GeneratedDocument,
     DocumentFormat, TemplateType, ProcessedDocument
 )
-from app.core.exceptions import ProcessingException, ExternalServiceException
+from app.core.exceptions import ProcessingException, ExternalServiceException, ValidationException
 
 
 class TestDocumentProcessingService:
@@ -392,87 +392,107 @@ class TestDocumentProcessing:
             service.openai_client = mock_client
             return service
     
+    @pytest.fixture
+    def parsing_service(self, service):
+        """Service with the process pool and parse cache mocked out."""
+        service.max_upload_bytes = 1024 * 1024
+        service.parser_pool = Mock()
+        service.parser_pool.parse = AsyncMock()
+        service.parsed_document_cache = Mock()
+        service.parsed_document_cache.get = AsyncMock(return_value=None)
+        service.parsed_document_cache.set = AsyncMock()
+        return service
+    
     @pytest.mark.asyncio
-    async def test_process_txt_document(self, service):
+    async def test_process_txt_document(self, parsing_service):
         """Test processing TXT document."""
         file_content = b"This is a test document with some content."
         file_name = "test.txt"
+        parsing_service.parser_pool.parse.return_value = {
+            "text": file_content.decode(),
+            "metadata": {"truncated": False, "extraction_method": "direct"}
+        }
         
-        with patch('builtins.open', create=True) as mock_open:
-            mock_open.return_value.__enter__.return_value.read.return_value = file_content.decode()
-            
-            with patch('os.remove'):
-                result = await service.process_document(
-                    file_content=file_content,
-                    file_name=file_name,
-                    format=DocumentFormat.TXT
-                )
+        result = await parsing_service.process_document(
+            file_content=file_content,
+            file_name=file_name,
+            format=DocumentFormat.TXT
+        )
         
         assert isinstance(result, ProcessedDocument)
         assert result.file_name == file_name
         assert result.format == DocumentFormat.TXT
-        assert result.processing_time > 0
+        assert result.extracted_text == file_content.decode()
+        assert result.metadata["cached"] is False
+        parsing_service.parsed_document_cache.set.assert_awaited_once()
     
     @pytest.mark.asyncio
-    async def test_process_pdf_document(self, service):
+    async def test_process_pdf_document(self, parsing_service):
         """Test processing PDF document."""
         file_content = b"%PDF-1.4 fake pdf content"
-        file_name = "test.pdf"
-        
-        # Mock PDF loader
-        mock_doc = Mock()
-        mock_doc.page_content = "Extracted PDF content"
+        parsing_service.parser_pool.parse.return_value = {
+            "text": "Extracted PDF content\n\nExtracted PDF content",
+            "metadata": {"pages": 2, "total_pages": 2, "truncated": False, "extraction_method": "pypdf"}
+        }
         
-        with patch('app.services.document_processing.service.PyPDFLoader') as mock_loader:
-            mock_loader.return_value.load.return_value = [mock_doc, mock_doc]
-            
-            with patch('builtins.open', create=True):
-                with patch('os.remove'):
-                    result = await service.process_document(
-                        file_content=file_content,
-                        file_name=file_name,
-                        format=DocumentFormat.PDF
-                    )
+        result = await parsing_service.process_document(
+            file_content=file_content,
+            file_name="test.pdf",
+            format=DocumentFormat.PDF
+        )
         
         assert isinstance(result, ProcessedDocument)
         assert result.format == DocumentFormat.PDF
-        assert "pages" in result.metadata
         assert result.metadata["pages"] == 2
+        
+        # The spooled temp file is parsed by path and removed afterwards
+        spooled_path, format_value = parsing_service.parser_pool.parse.call_args.args
+        assert format_value == "pdf"
+        assert not spooled_path.exists()
     
     @pytest.mark.asyncio
-    async def test_process_docx_document(self, service):
-        """Test processing DOCX document."""
-        file_content = b"PK fake docx content"
-        file_name = "test.docx"
+    async def test_process_document_uses_content_hash_cache(self, parsing_service):
+        """Test that cached parse results skip the process pool."""
+        parsing_service.parsed_document_cache.get.return_value = {
+            "text": "Cached DOCX content",
+            "metadata": {"paragraphs": 1, "extraction_method": "python-docx"}
+        }
         
-        # Mock DOCX loader
-        mock_doc = Mock()
-        mock_doc.page_content = "Extracted DOCX content"
+        result = await parsing_service.process_document(
+            file_content=b"PK fake docx content",
+            file_name="test.docx",
+            format=DocumentFormat.DOCX
+        )
         
-        with patch('app.services.document_processing.service.UnstructuredWordDocumentLoader') as mock_loader:
-            mock_loader.return_value.load.return_value = [mock_doc]
-            
-            with patch('builtins.open', create=True):
-                with patch('os.remove'):
-                    result = await service.process_document(
-                        file_content=file_content,
-                        file_name=file_name,
-                        format=DocumentFormat.DOCX
-                    )
+        assert result.extracted_text == "Cached DOCX content"
+        assert result.metadata["cached"] is True
+        parsing_service.parser_pool.parse.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_process_document_rejects_oversized_upload(self, parsing_service):
+        """Test that uploads above the size cap are rejected before parsing."""
+        parsing_service.max_upload_bytes = 10
+        
+        with pytest.raises(ValidationException):
+            await parsing_service.process_document(
+                file_content=b"x" * 100,
+                file_name="test.txt",
+                format=DocumentFormat.TXT
+            )
         
-        assert isinstance(result, ProcessedDocument)
-        assert result.format == DocumentFormat.DOCX
+        parsing_service.parser_pool.parse.assert_not_called()
     
     @pytest.mark.asyncio
-    async def test_process_document_failure(self, service):
+    async def test_process_document_failure(self, parsing_service):
         """Test document processing failure."""
-        with patch('builtins.open', side_effect=Exception("File error")):
-            with pytest.raises(ProcessingException) as exc_info:
-                await service.process_document(
-                    file_content=b"content",
-                    file_name="test.txt",
-                    format=DocumentFormat.TXT
-                )
+        parsing_service.parser_pool.parse.side_effect = Exception("File error")
+        
+        with pytest.raises(ProcessingException) as exc_info:
+            await parsing_service.process_document(
+                file_content=b"content",
+                file_name="test.txt",
+                format=DocumentFormat.TXT
+            )
         
         assert "Document processing failed" in str(exc_info.value)
 
@@ -1,24 +1,176 @@
 """
 Query Performance Monitoring Service
 Monitors database query performance, identifies slow queries, and provides optimization recommendations
+
+Executions are observed through SQLAlchemy's ``before_cursor_execute`` /
+``after_cursor_execute`` hooks. Statements arrive already parameterised and
+compiled statements are cached by SQLAlchemy, so each distinct statement is
+fingerprinted once and later executions are a dictionary hit. Latency per
+fingerprint goes into a fixed-size streaming histogram.
+
+Plans for slow queries come from plain ``EXPLAIN`` with the original bound
+parameters, which plans without executing, at most once per fingerprint per
+``plan_capture_interval``. Plans logged by ``auto_explain`` can be fed in
+with ``ingest_auto_explain`` instead.
 """
 
 import asyncio
-import time
 import hashlib
-from typing import Dict, List, Optional, Any, Tuple
+import json
+import math
+import time
+from typing import Dict, List, Optional, Any, Sequence, Set, Union
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from collections import defaultdict, deque
+from collections import deque
 import structlog
 import re
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 
 from ..core.database_pool import DatabaseConnectionPool, QueryType
 
 logger = structlog.get_logger()
 
+_WHITESPACE = re.compile(r'\s+')
+_POSITIONAL_PARAMETER = re.compile(r'\$\d+')
+_NAMED_PARAMETER = re.compile(r'%\([^)]+\)s')
+_STRING_LITERAL = re.compile(r"'[^']*'")
+_NUMERIC_LITERAL = re.compile(r'\b\d+\b')
+_IN_LIST = re.compile(r'IN\s*\([^)]+\)', re.IGNORECASE)
+
+# Statements that plain EXPLAIN accepts
+_EXPLAINABLE_PREFIXES = ("select", "with", "insert", "update", "delete", "values", "table")
+
+
+class LatencyHistogram:
+    """
+    Streaming latency histogram with log-linear buckets.
+
+    Each power of two between ``2**MIN_EXPONENT`` and ``2**MAX_EXPONENT``
+    seconds (about 8us to 256s) is split into ``SUB_BUCKETS`` equal buckets,
+    so quantiles are within 1/SUB_BUCKETS of the true value and memory is
+    fixed regardless of how many executions are recorded.
+    """
+    
+    MIN_EXPONENT = -16
+    MAX_EXPONENT = 9
+    SUB_BUCKETS = 16
+    
+    __slots__ = ("counts", "count", "total")
+    
+    def __init__(self):
+        self.counts = [0] * ((self.MAX_EXPONENT - self.MIN_EXPONENT) * self.SUB_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+    
+    def record(self, value: float):
+        """Add one observation in seconds"""
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+    
+    def _index(self, value: float) -> int:
+        if value <= 0:
+            return 0
+        mantissa, exponent = math.frexp(value)
+        if exponent <= self.MIN_EXPONENT:
+            return 0
+        if exponent > self.MAX_EXPONENT:
+            return len(self.counts) - 1
+        return (exponent - self.MIN_EXPONENT - 1) * self.SUB_BUCKETS + int((mantissa - 0.5) * 2 * self.SUB_BUCKETS)
+    
+    def _bucket_midpoint(self, index: int) -> float:
+        exponent, sub_bucket = divmod(index, self.SUB_BUCKETS)
+        lower = math.ldexp(0.5 + sub_bucket / (2 * self.SUB_BUCKETS), exponent + self.MIN_EXPONENT + 1)
+        return lower + math.ldexp(1 / (4 * self.SUB_BUCKETS), exponent + self.MIN_EXPONENT + 1)
+    
+    def quantile(self, q: float) -> float:
+        """Approximate quantile in seconds (0.0 when empty)"""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen > rank:
+                return self._bucket_midpoint(index)
+        return self._bucket_midpoint(len(self.counts) - 1)
+    
+    def percentiles(self, quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, float]:
+        return {f"p{round(q * 100)}": self.quantile(q) for q in quantiles}
+    
+    def merge(self, other: "LatencyHistogram"):
+        for index, bucket_count in enumerate(other.counts):
+            self.counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+
+
+@dataclass(frozen=True)
+class StatementFingerprint:
+    """Normalised form of a statement and its hash"""
+    query_hash: str
+    pattern: str
+    explainable: bool
+
+
+def normalize_statement(query: str) -> str:
+    """Normalize query for pattern matching"""
+    # Remove extra whitespace
+    normalized = _WHITESPACE.sub(' ', query.strip())
+    
+    # Replace parameter placeholders with generic markers
+    normalized = _POSITIONAL_PARAMETER.sub('$?', normalized)  # PostgreSQL parameters
+    normalized = _NAMED_PARAMETER.sub('%(?)', normalized)  # Python parameters
+    normalized = _STRING_LITERAL.sub("'?'", normalized)  # String literals
+    normalized = _NUMERIC_LITERAL.sub('?', normalized)  # Numeric literals
+    
+    # Replace IN clauses with generic form
+    normalized = _IN_LIST.sub('IN (?)', normalized)
+    
+    return normalized.lower()
+
+
+class FingerprintCache:
+    """
+    Statement -> fingerprint memo.
+    
+    Lookups are keyed by the statement string itself: CPython caches a
+    string's hash on the object and compares identical objects by identity,
+    so the same compiled statement executed again costs one dictionary hit.
+    Statements with inlined literals each get an entry; the cache is bounded
+    and drops its oldest entries first.
+    """
+    
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._entries: Dict[str, StatementFingerprint] = {}
+        self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, statement: str) -> StatementFingerprint:
+        fingerprint = self._entries.get(statement)
+        if fingerprint is None:
+            fingerprint = self._fingerprint(statement)
+            if len(self._entries) >= self.max_size:
+                del self._entries[next(iter(self._entries))]
+            self._entries[statement] = fingerprint
+        return fingerprint
+    
+    def _fingerprint(self, statement: str) -> StatementFingerprint:
+        self.misses += 1
+        pattern = normalize_statement(statement)
+        return StatementFingerprint(
+            query_hash=hashlib.blake2b(pattern.encode(), digest_size=8).hexdigest(),
+            pattern=pattern,
+            explainable=pattern.startswith(_EXPLAINABLE_PREFIXES)
+        )
+
+
 @dataclass
 class QueryStats:
     """Query execution statistics"""
@@ -35,6 +187,9 @@ class QueryStats:
     # Recent execution times (for trend analysis)
     recent_times: deque = field(default_factory=lambda: deque(maxlen=100))
     
+    # Latency distribution over all successful executions
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    
     def add_execution(self, duration: float, error: bool = False):
         """Add execution statistics"""
         self.execution_count += 1
@@ -49,6 +204,7 @@ class QueryStats:
         self.avg_time = self.total_time / (self.execution_count - self.error_count)
         self.last_executed = datetime.utcnow()
         self.recent_times.append(duration)
+        self.histogram.record(duration)
     
     def get_recent_avg(self) -> float:
         """Get average of recent executions"""
@@ -71,10 +227,18 @@ class SlowQuery:
     query_pattern: str
     duration: float
     timestamp: datetime
-    parameters: Optional[Dict[str, Any]] = None
+    parameters: Optional[Any] = None
     execution_plan: Optional[str] = None
     recommendations: List[str] = field(default_factory=list)
 
+@dataclass
+class CapturedPlan:
+    """Most recent plan captured for a fingerprint"""
+    execution_plan: Optional[str]
+    recommendations: List[str]
+    captured_at: float
+    source: str
+
 class QueryPerformanceMonitor:
     """Query performance monitoring and optimization service"""
     
@@ -82,11 +246,20 @@ class QueryPerformanceMonitor:
         self.db_pool = db_pool
         self.query_stats: Dict[str, QueryStats] = {}
         self.slow_queries: deque = deque(maxlen=1000)  # Keep last 1000 slow queries
+        self.fingerprints = FingerprintCache()
         
         # Configuration
         self.slow_query_threshold = 1.0  # seconds
         self.monitoring_enabled = True
-        self.explain_analyze_enabled = True
+        self.plan_capture_enabled = True
+        self.plan_capture_interval = 300.0  # seconds between plans per fingerprint
+        self.max_concurrent_plan_captures = 2
+        
+        # Plan capture state
+        self.plans: Dict[str, CapturedPlan] = {}
+        self._plan_attempts: Dict[str, float] = {}
+        self._plan_tasks: Set[asyncio.Task] = set()
+        self._instrumented: Dict[Engine, Optional[AsyncEngine]] = {}
         
         # Performance tracking
         self.monitoring_overhead = deque(maxlen=100)
@@ -100,6 +273,9 @@ class QueryPerformanceMonitor:
         if not self.monitoring_enabled:
             return
         
+        for engine in self.db_pool.engines.values():
+            self.instrument(engine)
+        
         self.analysis_task = asyncio.create_task(self._analysis_loop())
         self.cleanup_task = asyncio.create_task(self._cleanup_loop())
         
@@ -111,29 +287,58 @@ class QueryPerformanceMonitor:
             self.analysis_task.cancel()
         if self.cleanup_task:
             self.cleanup_task.cancel()
+        for task in list(self._plan_tasks):
+            task.cancel()
+        for sync_engine in list(self._instrumented):
+            self.uninstrument(sync_engine)
         
         logger.info("Query performance monitoring stopped")
     
+    def instrument(self, engine: Union[Engine, AsyncEngine]):
+        """Observe every statement executed through ``engine``"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        if sync_engine in self._instrumented:
+            return
+        self._instrumented[sync_engine] = engine if isinstance(engine, AsyncEngine) else None
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(sync_engine, "handle_error", self._handle_error)
+    
+    def uninstrument(self, engine: Union[Engine, AsyncEngine]):
+        sync_engine = getattr(engine, "sync_engine", engine)
+        if self._instrumented.pop(sync_engine, False) is False:
+            return
+        event.remove(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.remove(sync_engine, "handle_error", self._handle_error)
+    
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._qpm_started = time.perf_counter()
+    
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_qpm_started", None)
+        if started is None or not self.monitoring_enabled:
+            return
+        duration = time.perf_counter() - started
+        if executemany and parameters:
+            parameters = parameters[0]
+        self._observe(statement, duration, False, parameters, self._instrumented.get(conn.engine))
+    
+    def _handle_error(self, exception_context):
+        context = exception_context.execution_context
+        started = getattr(context, "_qpm_started", None)
+        if started is None or exception_context.statement is None or not self.monitoring_enabled:
+            return
+        self._observe(exception_context.statement, time.perf_counter() - started, True)
+    
     def _normalize_query(self, query: str) -> str:
         """Normalize query for pattern matching"""
-        # Remove extra whitespace
-        normalized = re.sub(r'\s+', ' ', query.strip())
-        
-        # Replace parameter placeholders with generic markers
-        normalized = re.sub(r'\$\d+', '$?', normalized)  # PostgreSQL parameters
-        normalized = re.sub(r'%\([^)]+\)s', '%(?)', normalized)  # Python parameters
-        normalized = re.sub(r"'[^']*'", "'?'", normalized)  # String literals
-        normalized = re.sub(r'\b\d+\b', '?', normalized)  # Numeric literals
-        
-        # Replace IN clauses with generic form
-        normalized = re.sub(r'IN\s*\([^)]+\)', 'IN (?)', normalized, flags=re.IGNORECASE)
-        
-        return normalized.lower()
+        return self.fingerprints.get(query).pattern
     
     def _get_query_hash(self, query: str) -> str:
         """Generate hash for query pattern"""
-        normalized = self._normalize_query(query)
-        return hashlib.md5(normalized.encode()).hexdigest()[:16]
+        return self.fingerprints.get(query).query_hash
     
     async def record_query_execution(
         self, 
@@ -142,98 +347,181 @@ class QueryPerformanceMonitor:
         error: bool = False,
         parameters: Optional[Dict[str, Any]] = None
     ):
-        """Record query execution for monitoring"""
+        """Record a query execution that was not observed through ``instrument``"""
         if not self.monitoring_enabled:
             return
-        
-        start_time = time.time()
+        self._observe(query, duration, error, parameters)
+    
+    def _observe(
+        self,
+        statement: str,
+        duration: float,
+        error: bool = False,
+        parameters: Optional[Any] = None,
+        engine: Optional[AsyncEngine] = None
+    ):
+        """Fold one execution into its fingerprint's statistics"""
+        start_time = time.perf_counter()
         
         try:
-            query_hash = self._get_query_hash(query)
-            query_pattern = self._normalize_query(query)
+            fingerprint = self.fingerprints.get(statement)
             
             # Update or create query stats
-            if query_hash not in self.query_stats:
-                self.query_stats[query_hash] = QueryStats(
-                    query_hash=query_hash,
-                    query_pattern=query_pattern
+            stats = self.query_stats.get(fingerprint.query_hash)
+            if stats is None:
+                stats = self.query_stats[fingerprint.query_hash] = QueryStats(
+                    query_hash=fingerprint.query_hash,
+                    query_pattern=fingerprint.pattern
                 )
             
-            self.query_stats[query_hash].add_execution(duration, error)
+            stats.add_execution(duration, error)
             
             # Record slow queries
             if not error and duration > self.slow_query_threshold:
-                await self._record_slow_query(query_hash, query_pattern, duration, parameters)
+                self._record_slow_query(fingerprint, statement, duration, parameters, engine)
             
         except Exception as e:
             logger.error("Failed to record query execution", error=str(e))
         finally:
             # Track monitoring overhead
-            overhead = time.time() - start_time
-            self.monitoring_overhead.append(overhead)
+            self.monitoring_overhead.append(time.perf_counter() - start_time)
     
-    async def _record_slow_query(
+    def _record_slow_query(
         self, 
-        query_hash: str, 
-        query_pattern: str, 
+        fingerprint: StatementFingerprint,
+        statement: str,
         duration: float,
-        parameters: Optional[Dict[str, Any]] = None
+        parameters: Optional[Any] = None,
+        engine: Optional[AsyncEngine] = None
+    ):
+        """Record slow query, attaching a recent plan or scheduling a capture"""
+        slow_query = SlowQuery(
+            query_hash=fingerprint.query_hash,
+            query_pattern=fingerprint.pattern,
+            duration=duration,
+            timestamp=datetime.utcnow(),
+            parameters=parameters
+        )
+        self.slow_queries.append(slow_query)
+        
+        plan = self.plans.get(fingerprint.query_hash)
+        if plan is not None:
+            slow_query.execution_plan = plan.execution_plan
+            slow_query.recommendations = list(plan.recommendations)
+        if self._should_capture_plan(fingerprint):
+            self._schedule_plan_capture(fingerprint, statement, parameters, engine, slow_query)
+        
+        logger.warning("Slow query detected", 
+                     duration=duration,
+                     query_hash=fingerprint.query_hash,
+                     recommendations=slow_query.recommendations)
+    
+    def _should_capture_plan(self, fingerprint: StatementFingerprint) -> bool:
+        if not self.plan_capture_enabled or not fingerprint.explainable:
+            return False
+        if len(self._plan_tasks) >= self.max_concurrent_plan_captures:
+            return False
+        last_attempt = self._plan_attempts.get(fingerprint.query_hash)
+        return last_attempt is None or time.monotonic() - last_attempt >= self.plan_capture_interval
+    
+    def _schedule_plan_capture(
+        self,
+        fingerprint: StatementFingerprint,
+        statement: str,
+        parameters: Optional[Any],
+        engine: Optional[AsyncEngine],
+        slow_query: SlowQuery
     ):
-        """Record slow query with analysis"""
         try:
-            execution_plan = None
-            recommendations = []
-            
-            # Get execution plan if enabled
-            if self.explain_analyze_enabled:
-                execution_plan = await self._get_execution_plan(query_pattern, parameters)
-                recommendations = self._analyze_execution_plan(execution_plan)
-            
-            slow_query = SlowQuery(
-                query_hash=query_hash,
-                query_pattern=query_pattern,
-                duration=duration,
-                timestamp=datetime.utcnow(),
-                parameters=parameters,
-                execution_plan=execution_plan,
-                recommendations=recommendations
-            )
-            
-            self.slow_queries.append(slow_query)
-            
-            logger.warning("Slow query detected", 
-                         duration=duration,
-                         query_hash=query_hash,
-                         recommendations=recommendations)
-            
-        except Exception as e:
-            logger.error("Failed to analyze slow query", error=str(e))
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Synchronous engines have no loop to run the capture on
+            return
+        self._plan_attempts[fingerprint.query_hash] = time.monotonic()
+        task = loop.create_task(self._capture_plan(fingerprint, statement, parameters, engine, slow_query))
+        self._plan_tasks.add(task)
+        task.add_done_callback(self._plan_tasks.discard)
+    
+    async def _capture_plan(
+        self,
+        fingerprint: StatementFingerprint,
+        statement: str,
+        parameters: Optional[Any],
+        engine: Optional[AsyncEngine],
+        slow_query: SlowQuery
+    ):
+        execution_plan = await self._get_execution_plan(statement, parameters, engine)
+        if execution_plan is None:
+            return
+        plan = CapturedPlan(
+            execution_plan=execution_plan,
+            recommendations=self._analyze_execution_plan(execution_plan),
+            captured_at=time.time(),
+            source="explain"
+        )
+        self.plans[fingerprint.query_hash] = plan
+        slow_query.execution_plan = plan.execution_plan
+        slow_query.recommendations = list(plan.recommendations)
     
     async def _get_execution_plan(
         self, 
-        query: str, 
-        parameters: Optional[Dict[str, Any]] = None
+        statement: str, 
+        parameters: Optional[Any] = None,
+        engine: Optional[AsyncEngine] = None
     ) -> Optional[str]:
-        """Get query execution plan"""
+        """
+        Get the estimated plan with the original parameters.
+        
+        Plain EXPLAIN plans without executing, so this adds no load from
+        re-running a query that is already slow.
+        """
         try:
-            # Prepare EXPLAIN ANALYZE query
-            explain_query = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"
+            if engine is not None:
+                # Statements seen on the cursor are in the driver's paramstyle
+                if engine.dialect.name != "postgresql":
+                    return None
+                async with engine.connect() as conn:
+                    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters or ())
+                    plan_data = result.fetchone()
+            else:
+                async with self.db_pool.get_session(QueryType.READ) as session:
+                    result = await session.execute(text(f"EXPLAIN (FORMAT JSON) {statement}"), parameters or {})
+                    plan_data = result.fetchone()
             
-            async with self.db_pool.get_session(QueryType.READ) as session:
-                if parameters:
-                    result = await session.execute(text(explain_query), parameters)
-                else:
-                    result = await session.execute(text(explain_query))
-                
-                plan_data = result.fetchone()
-                if plan_data:
-                    return str(plan_data[0])
+            if plan_data:
+                plan = plan_data[0]
+                return plan if isinstance(plan, str) else json.dumps(plan)
                 
         except Exception as e:
             logger.debug("Failed to get execution plan", error=str(e))
         
         return None
     
+    def ingest_auto_explain(self, entry: Union[str, Dict[str, Any]]) -> Optional[str]:
+        """
+        Attach a plan logged by ``auto_explain`` (``log_format = json``).
+        
+        Returns the fingerprint hash the plan was filed under.
+        """
+        try:
+            if isinstance(entry, str):
+                entry = json.loads(entry[entry.index("{"):])
+            statement = entry["Query Text"]
+            plan = {key: value for key, value in entry.items() if key != "Query Text"}
+        except (ValueError, KeyError, TypeError) as e:
+            logger.debug("Ignoring malformed auto_explain entry", error=str(e))
+            return None
+        
+        fingerprint = self.fingerprints.get(statement)
+        execution_plan = json.dumps([plan])
+        self.plans[fingerprint.query_hash] = CapturedPlan(
+            execution_plan=execution_plan,
+            recommendations=self._analyze_execution_plan(execution_plan),
+            captured_at=time.time(),
+            source="auto_explain"
+        )
+        return fingerprint.query_hash
+    
     def _analyze_execution_plan(self, execution_plan: Optional[str]) -> List[str]:
         """Analyze execution plan and provide recommendations"""
         if not execution_plan:
@@ -242,7 +530,6 @@ class QueryPerformanceMonitor:
         recommendations = []
         
         try:
-            import json
             plan_json = json.loads(execution_plan)
             
             # Analyze plan for common issues
@@ -259,7 +546,8 @@ class QueryPerformanceMonitor:
         
         # Check for sequential scans on large tables
         if node_type == 'Seq Scan':
-            rows = node.get('Actual Rows', 0)
+            # Plain EXPLAIN only has the planner's estimate
+            rows = node.get('Actual Rows', node.get('Plan Rows', 0))
             if rows > 10000:
                 recommendations.append(
                     f"Consider adding index for sequential scan on large table ({rows} rows)"
@@ -373,6 +661,15 @@ class QueryPerformanceMonitor:
             
             for query_hash in old_queries:
                 del self.query_stats[query_hash]
+                self.plans.pop(query_hash, None)
+            
+            # Forget capture attempts old enough to allow a new capture anyway
+            now = time.monotonic()
+            self._plan_attempts = {
+                query_hash: attempted
+                for query_hash, attempted in self._plan_attempts.items()
+                if now - attempted < self.plan_capture_interval
+            }
             
             logger.debug("Query monitoring cleanup completed",
                         removed_patterns=len(old_queries))
@@ -428,7 +725,8 @@ class QueryPerformanceMonitor:
                         "query_hash": stats.query_hash,
                         "pattern": stats.query_pattern[:200],
                         "execution_count": stats.execution_count,
-                        "avg_time": stats.avg_time
+                        "avg_time": stats.avg_time,
+                        **stats.histogram.percentiles()
                     }
                     for stats in top_by_count
                 ],
@@ -447,7 +745,8 @@ class QueryPerformanceMonitor:
                         "pattern": stats.query_pattern[:200],
                         "avg_time": stats.avg_time,
                         "max_time": stats.max_time,
-                        "execution_count": stats.execution_count
+                        "execution_count": stats.execution_count,
+                        **stats.histogram.percentiles()
                     }
                     for stats in top_by_avg_time
                 ],
@@ -456,7 +755,8 @@ class QueryPerformanceMonitor:
                         "query_hash": slow.query_hash,
                         "duration": slow.duration,
                         "timestamp": slow.timestamp.isoformat(),
-                        "recommendations": slow.recommendations
+                        "recommendations": slow.recommendations,
+                        "has_plan": slow.execution_plan is not None
                     }
                     for slow in recent_slow
                 ]
@@ -520,6 +820,9 @@ class QueryPerformanceMonitor:
             "tracked_patterns": len(self.query_stats),
             "slow_queries_recorded": len(self.slow_queries),
             "slow_query_threshold": self.slow_query_threshold,
+            "fingerprint_cache_size": len(self.fingerprints),
+            "fingerprint_cache_misses": self.fingerprints.misses,
+            "captured_plans": len(self.plans),
             "avg_monitoring_overhead_ms": (
                 sum(self.monitoring_overhead) / len(self.monitoring_overhead) * 1000
                 if self.monitoring_overhead else 0
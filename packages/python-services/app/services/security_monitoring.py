@@ -31,6 +31,8 @@ import asyncio
 import os
 import tempfile
 
+from app.core.session_store import get_session_store
+
 logger = structlog.get_logger()
 
 
@@ -393,12 +395,11 @@ class SecurityMonitoringService:
     async def _revoke_user_sessions(self, user_id: str):
         """Revoke all sessions for a user"""
         try:
-            # Remove all user sessions from Redis
-            session_pattern = f"session:{user_id}:*"
-            async for key in self.redis.scan_iter(match=session_pattern):
-                await self.redis.delete(key)
+            # Delete the user's sessions and broadcast the revocation to
+            # every process's session cache
+            revoked = await get_session_store(self.redis).revoke_all(user_id)
             
-            await self.logger.awarn("user_sessions_revoked", user_id=user_id)
+            await self.logger.awarn("user_sessions_revoked", user_id=user_id, sessions=revoked)
             
         except Exception as e:
             await self.logger.aerror("Failed to revoke user sessions", 
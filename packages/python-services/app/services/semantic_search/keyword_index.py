@@ -0,0 +1,512 @@
+"""In-process BM25 inverted index for the keyword leg of job search.
+
+Jobs are indexed over their title, skills, company and description. Each
+field's term frequencies are weighted before BM25 saturation (a simplified
+BM25F), so a skill or title hit outweighs a passing mention in the
+description.
+
+Postings are kept per term in document-id order. Every ``BLOCK_SIZE``
+postings are sealed into a block of varint-encoded doc-id deltas and term
+frequencies; the newest postings stay in an uncompressed tail until a block
+fills. Blocks record their first and last doc id, so a cursor can skip to a
+target document without decoding the blocks in between.
+
+Queries run document-at-a-time with MaxScore: query terms are ordered by
+their maximum possible contribution, and once the top-k threshold exceeds the
+combined bound of the weakest terms those terms stop generating candidates
+and are only probed for documents the stronger terms already found.
+
+Updates are incremental. Adding a job appends postings under a new internal
+id; replacing or removing one tombstones the old id, and tombstoned postings
+are dropped when the index is compacted (automatically once they make up a
+quarter of the documents, and before every snapshot). Processes sharing a
+snapshot publish under ``snapshot_lock`` so one's write never replaces
+another's unseen changes.
+"""
+
+import base64
+import bisect
+import fcntl
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+SNAPSHOT_VERSION = 1
+BLOCK_SIZE = 128
+# Field weights are multiples of 0.5; term frequencies are stored in half units
+TF_SCALE = 2
+COMPACT_RATIO = 0.25
+
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "skills": 2.0,
+    "company": 1.5,
+    "description": 1.0,
+}
+
+# Search scores are calibrated against a document listing each query term once here
+CALIBRATION_FIELD = "skills"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of",
+    "on", "or", "our", "the", "to", "we", "with", "you", "your", "will", "this", "that",
+})
+
+END = float("inf")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased terms; keeps skill spellings such as ``c++``, ``c#`` and ``node.js``."""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _encode_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_pairs(data: bytes, first: int) -> Tuple[List[int], List[int]]:
+    """Decode interleaved (doc delta, tf) varints back into doc ids and tfs."""
+    if data and max(data) < 0x80:
+        # Dense terms: every delta and tf fits in one byte
+        docs = list(accumulate(data[0::2], initial=first))
+        del docs[0]
+        return docs, list(data[1::2])
+
+    docs, tfs = [], []
+    doc, value, shift, is_tf = first, 0, 0, False
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if is_tf:
+            tfs.append(value)
+        else:
+            doc += value
+            docs.append(doc)
+        is_tf = not is_tf
+        value, shift = 0, 0
+    return docs, tfs
+
+
+@dataclass
+class PostingBlock:
+    """A sealed run of postings; ``data`` holds varint (doc delta, tf) pairs."""
+    first: int
+    last: int
+    data: bytes
+
+    @classmethod
+    def encode(cls, docs: Sequence[int], tfs: Sequence[int]) -> "PostingBlock":
+        out = bytearray()
+        previous = docs[0]
+        for doc, tf in zip(docs, tfs):
+            _encode_varint(doc - previous, out)
+            _encode_varint(tf, out)
+            previous = doc
+        return cls(docs[0], docs[-1], bytes(out))
+
+    def decode(self) -> Tuple[List[int], List[int]]:
+        return _decode_pairs(self.data, self.first)
+
+
+class PostingList:
+    """Doc-id ordered postings for one term: sealed blocks plus an open tail."""
+
+    def __init__(self):
+        self.blocks: List[PostingBlock] = []
+        self.lasts: List[int] = []
+        self.tail_docs: List[int] = []
+        self.tail_tfs: List[int] = []
+        self.max_tf = 0
+
+    def append(self, doc: int, tf: int) -> None:
+        self.tail_docs.append(doc)
+        self.tail_tfs.append(tf)
+        self.max_tf = max(self.max_tf, tf)
+        if len(self.tail_docs) >= BLOCK_SIZE:
+            self._seal()
+
+    def _seal(self) -> None:
+        block = PostingBlock.encode(self.tail_docs, self.tail_tfs)
+        self.blocks.append(block)
+        self.lasts.append(block.last)
+        self.tail_docs, self.tail_tfs = [], []
+
+    def segments(self) -> List[Tuple[int, Any]]:
+        """(last doc id, block or decoded tail) for each segment in order."""
+        segments: List[Tuple[int, Any]] = list(zip(self.lasts, self.blocks))
+        if self.tail_docs:
+            segments.append((self.tail_docs[-1], (self.tail_docs, self.tail_tfs)))
+        return segments
+
+    def iterate(self) -> Iterable[Tuple[int, int]]:
+        for block in self.blocks:
+            yield from zip(*block.decode())
+        yield from zip(self.tail_docs, self.tail_tfs)
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        return {
+            "blocks": [[block.first, block.last, base64.b64encode(block.data).decode()] for block in self.blocks],
+            "tail": [self.tail_docs, self.tail_tfs],
+            "max_tf": self.max_tf,
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: Mapping[str, Any]) -> "PostingList":
+        postings = cls()
+        postings.blocks = [PostingBlock(first, last, base64.b64decode(encoded)) for first, last, encoded in data["blocks"]]
+        postings.lasts = [block.last for block in postings.blocks]
+        postings.tail_docs, postings.tail_tfs = list(data["tail"][0]), list(data["tail"][1])
+        postings.max_tf = data["max_tf"]
+        return postings
+
+
+class _Cursor:
+    """Forward-only iterator over one term's postings with block skipping."""
+
+    def __init__(self, postings: PostingList, weight: float, upper_bound: float):
+        self.segments = postings.segments()
+        self.lasts = [last for last, _ in self.segments]
+        self.weight = weight
+        self.upper_bound = upper_bound
+        self.segment = -1
+        self.docs: List[int] = []
+        self.tfs: List[int] = []
+        self.position = 0
+        self.doc: float = END
+        self.advance(0)
+
+    def _load(self, segment: int) -> None:
+        self.segment = segment
+        payload = self.segments[segment][1]
+        self.docs, self.tfs = payload.decode() if isinstance(payload, PostingBlock) else payload
+        self.position = 0
+
+    @property
+    def tf(self) -> int:
+        return self.tfs[self.position]
+
+    def advance(self, target: int) -> None:
+        """Move to the first posting with doc id >= ``target``."""
+        if self.doc != END and self.doc >= target:
+            return
+        segment = bisect.bisect_left(self.lasts, target, lo=max(self.segment, 0))
+        if segment >= len(self.segments):
+            self.doc = END
+            return
+        if segment != self.segment:
+            self._load(segment)
+        self.position = bisect.bisect_left(self.docs, target, lo=self.position)
+        self.doc = self.docs[self.position]
+
+    def next(self) -> None:
+        self.advance(int(self.doc) + 1)
+
+
+@dataclass
+class KeywordHit:
+    """One ranked result: the document key, raw BM25 score and calibrated score."""
+    key: str
+    score: float
+    calibrated: float
+    payload: Dict[str, Any]
+
+
+class BM25Index:
+    """Incrementally updated BM25 index with compressed postings and MaxScore top-k."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, field_weights: Optional[Mapping[str, float]] = None):
+        self.k1 = k1
+        self.b = b
+        self.field_weights = dict(field_weights or FIELD_WEIGHTS)
+
+        self.postings: Dict[str, PostingList] = {}
+        self.doc_freq: Counter = Counter()
+        self.keys: Dict[str, int] = {}
+        # Per internal id; None once the document is deleted
+        self.doc_keys: List[Optional[str]] = []
+        self.lengths: List[int] = []
+        self.payloads: List[Optional[Dict[str, Any]]] = []
+        self.doc_terms: List[Tuple[str, ...]] = []
+        self.total_length = 0
+        self.deleted = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys
+
+    @property
+    def average_length(self) -> float:
+        return self.total_length / len(self.keys) if self.keys else 0.0
+
+    def _field_frequencies(self, fields: Mapping[str, str]) -> Counter:
+        frequencies: Counter = Counter()
+        for name, text in fields.items():
+            weight = int(self.field_weights.get(name, 1.0) * TF_SCALE)
+            for token in tokenize(text):
+                frequencies[token] += weight
+        return frequencies
+
+    def add(self, key: str, fields: Mapping[str, str], payload: Optional[Dict[str, Any]] = None) -> None:
+        """Index a document, replacing any earlier version with the same key."""
+        if key in self.keys:
+            self.remove(key)
+
+        frequencies = self._field_frequencies(fields)
+        doc = len(self.doc_keys)
+        for term in sorted(frequencies):
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = PostingList()
+            postings.append(doc, frequencies[term])
+            self.doc_freq[term] += 1
+
+        length = sum(frequencies.values())
+        self.keys[key] = doc
+        self.doc_keys.append(key)
+        self.lengths.append(length)
+        self.payloads.append(payload or {})
+        self.doc_terms.append(tuple(frequencies))
+        self.total_length += length
+
+    def remove(self, key: str) -> bool:
+        doc = self.keys.pop(key, None)
+        if doc is None:
+            return False
+        for term in self.doc_terms[doc]:
+            self.doc_freq[term] -= 1
+            if not self.doc_freq[term]:
+                del self.doc_freq[term]
+        self.total_length -= self.lengths[doc]
+        self.doc_keys[doc] = None
+        self.payloads[doc] = None
+        self.doc_terms[doc] = ()
+        self.deleted += 1
+        if self.deleted > COMPACT_RATIO * max(len(self.keys), BLOCK_SIZE):
+            self.compact()
+        return True
+
+    def compact(self) -> None:
+        """Rewrite postings without deleted documents and renumber the survivors."""
+        if not self.deleted:
+            return
+        remap = {}
+        for old, key in enumerate(self.doc_keys):
+            if key is not None:
+                remap[old] = len(remap)
+
+        postings = {}
+        for term, old_postings in self.postings.items():
+            new_postings = PostingList()
+            for doc, tf in old_postings.iterate():
+                if doc in remap:
+                    new_postings.append(remap[doc], tf)
+            if new_postings.max_tf:
+                postings[term] = new_postings
+        self.postings = postings
+
+        survivors = list(remap)
+        self.doc_keys = [self.doc_keys[old] for old in survivors]
+        self.lengths = [self.lengths[old] for old in survivors]
+        self.payloads = [self.payloads[old] for old in survivors]
+        self.doc_terms = [self.doc_terms[old] for old in survivors]
+        self.keys = {key: doc for doc, key in enumerate(self.doc_keys)}
+        self.deleted = 0
+
+    def idf(self, term: str) -> float:
+        df = self.doc_freq.get(term, 0)
+        return math.log(1.0 + (len(self.keys) - df + 0.5) / (df + 0.5))
+
+    def search(
+        self, query: Mapping[str, float], k: int, accept: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> List[KeywordHit]:
+        """Top ``k`` documents for weighted query terms, best first.
+
+        Scores are calibrated against an average-length document that lists
+        every query term once in ``CALIBRATION_FIELD``, so 1.0 means every
+        term matched at least that strongly. Documents whose payload
+        ``accept`` rejects are skipped like deleted ones, so they never take
+        a place in the top ``k``.
+        """
+        if k <= 0 or not self.keys:
+            return []
+
+        average_length = self.average_length
+        k1, b = self.k1, self.b
+        reference_tf = self.field_weights.get(CALIBRATION_FIELD, 1.0)
+        reference = reference_tf * (k1 + 1) / (reference_tf + k1)
+        cursors = []
+        ideal = 0.0
+        for term, weight in query.items():
+            postings = self.postings.get(term)
+            if postings is None or term not in self.doc_freq:
+                continue
+            term_weight = weight * self.idf(term)
+            ideal += term_weight * reference
+            # BM25 grows with tf and shrinks with length, so max tf at zero length bounds it
+            max_tf = postings.max_tf / TF_SCALE
+            upper_bound = term_weight * max_tf * (k1 + 1) / (max_tf + k1 * (1 - b))
+            cursors.append(_Cursor(postings, term_weight, upper_bound))
+        if not cursors:
+            return []
+
+        cursors.sort(key=lambda cursor: cursor.upper_bound)
+        # bounds[i]: most that terms 0..i can add together
+        bounds = []
+        running = 0.0
+        for cursor in cursors:
+            running += cursor.upper_bound
+            bounds.append(running)
+
+        heap: List[Tuple[float, int]] = []
+        threshold = 0.0
+        essential = 0
+        lengths = self.lengths
+        norm = [k1 * (1 - b), k1 * b / average_length if average_length else 0.0]
+
+        while essential < len(cursors):
+            doc = min(cursor.doc for cursor in cursors[essential:])
+            if doc == END:
+                break
+            doc = int(doc)
+
+            live = self.doc_keys[doc] is not None and (accept is None or accept(self.payloads[doc]))
+            length_norm = norm[0] + norm[1] * lengths[doc]
+            score = 0.0
+            for cursor in cursors[essential:]:
+                if cursor.doc == doc:
+                    if live:
+                        tf = cursor.tf / TF_SCALE
+                        score += cursor.weight * tf * (k1 + 1) / (tf + length_norm)
+                    cursor.next()
+            if not live:
+                continue
+
+            # Probe the non-essential terms strongest first while they can still matter
+            for index in range(essential - 1, -1, -1):
+                if score + bounds[index] <= threshold:
+                    break
+                cursor = cursors[index]
+                cursor.advance(doc)
+                if cursor.doc == doc:
+                    tf = cursor.tf / TF_SCALE
+                    score += cursor.weight * tf * (k1 + 1) / (tf + length_norm)
+
+            if len(heap) < k:
+                heapq.heappush(heap, (score, -doc))
+            elif score > threshold:
+                heapq.heapreplace(heap, (score, -doc))
+            else:
+                continue
+            if len(heap) == k:
+                threshold = heap[0][0]
+                while essential < len(cursors) and bounds[essential] <= threshold:
+                    essential += 1
+
+        hits = sorted(heap, key=lambda item: (-item[0], -item[1]))
+        return [
+            KeywordHit(
+                key=self.doc_keys[-doc],
+                score=score,
+                calibrated=min(score / ideal, 1.0) if ideal else 0.0,
+                payload=self.payloads[-doc],
+            )
+            for score, doc in hits
+        ]
+
+    def save(self, path: str) -> None:
+        """Compact and write a gzip JSON snapshot, replacing ``path`` atomically."""
+        self.compact()
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "field_weights": self.field_weights,
+            "documents": [
+                [key, length, payload, list(terms)]
+                for key, length, payload, terms in zip(self.doc_keys, self.lengths, self.payloads, self.doc_terms)
+            ],
+            "postings": {term: postings.to_snapshot() for term, postings in self.postings.items()},
+        }
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".bm25-")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as handle:
+                handle.write(json.dumps(snapshot, default=str).encode())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with gzip.open(path, "rb") as handle:
+            snapshot = json.loads(handle.read())
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported keyword index snapshot version: {snapshot.get('version')}")
+
+        index = cls(snapshot["k1"], snapshot["b"], snapshot["field_weights"])
+        for key, length, payload, terms in snapshot["documents"]:
+            index.keys[key] = len(index.doc_keys)
+            index.doc_keys.append(key)
+            index.lengths.append(length)
+            index.payloads.append(payload)
+            index.doc_terms.append(tuple(terms))
+            index.total_length += length
+            index.doc_freq.update(terms)
+        index.postings = {term: PostingList.from_snapshot(data) for term, data in snapshot["postings"].items()}
+        return index
+
+
+@contextmanager
+def snapshot_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on ``path``'s snapshot across a read, merge and write."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", "a+b") as handle:
+        fcntl.lockf(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.lockf(handle, fcntl.LOCK_UN)
+
+
+def job_fields(job: Mapping[str, Any]) -> Dict[str, str]:
+    """Indexed text fields of a job posting dict."""
+    skills = list(job.get("required_skills") or []) + list(job.get("preferred_skills") or [])
+    return {
+        "title": job.get("title") or "",
+        "skills": " ".join(skills),
+        "company": job.get("company") or "",
+        "description": job.get("description") or "",
+    }
+
+
+def profile_query(skills: Sequence[str], roles: Sequence[str] = (), industries: Sequence[str] = ()) -> Dict[str, float]:
+    """Weighted query terms for a candidate profile; repeated terms count more."""
+    query: Counter = Counter()
+    for texts, weight in ((skills, 1.0), (roles, 1.0), (industries, 0.5)):
+        for text in texts:
+            for token in tokenize(text):
+                query[token] += weight
+    return dict(query)
@@ -80,6 +80,18 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         logger.error("Failed to initialize service dependencies", error=str(e))
         raise
     
+    # Warm the cached searches predicted to be read next before serving
+    try:
+        from app.core.cache_warming import warm_predicted_caches
+        
+        stats = await warm_predicted_caches(
+            ["semantic_search"],
+            budget_seconds=settings.redis.cache_warming_startup_budget_seconds
+        )
+        logger.info("Warmed search caches before serving", **stats)
+    except Exception as e:
+        logger.warning("Startup cache warming failed", error=str(e))
+    
     yield
     
     # Cleanup
@@ -35,6 +35,7 @@ class UserProfile(BaseModel):
     industry_preferences: List[str] = Field(default_factory=list)
     job_type_preferences: List[str] = Field(default_factory=list)  # full-time, part-time, contract
     remote_preferences: List[str] = Field(default_factory=list)  # remote, hybrid, on-site
+    preferred_roles: List[str] = Field(default_factory=list)
 
 
 class JobPosting(BaseModel):
@@ -92,6 +93,7 @@ class JobMatch(BaseModel):
     skill_gaps: List[str] = Field(default_factory=list)
     salary_match: Optional[bool] = None
     location_match: Optional[bool] = None
+    metadata: Dict[str, Any] = Field(default_factory=dict)  # source of a hybrid result
     
     @validator('composite_score')
     def validate_composite_score(cls, v, values):
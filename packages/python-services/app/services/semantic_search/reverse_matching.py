@@ -0,0 +1,378 @@
+"""Reverse matching of changed jobs against stored user profiles.
+
+Refreshing recommendations by running a full search for every user repeats
+the profile embedding, the vector query and the scoring once per user, even
+though only a handful of jobs changed since the last run. Reverse matching
+turns this around: the jobs added or changed since a watermark are scored
+against the stored profiles one chunk of users at a time, and each user's
+qualifying jobs are merged into their persisted top-N list.
+
+For a chunk of profiles the semantic score is a single dense product of the
+unit profile embeddings with the unit job embeddings. Skill overlap is a
+sparse product of a users x skills incidence matrix with the batch's
+skills x jobs matrix, and location, remote, industry and role preferences are
+matched the same way against the distinct preference strings of the chunk.
+The resulting ``(users, jobs)`` arrays go through the factor formulas in
+:mod:`.scoring`, so a reverse-matched job gets the score a search for that
+user would have given it.
+
+Full searches are only needed for users whose profile changed; those refresh
+their stored embedding and replace their list outright.
+
+The job feed is ordered by a Redis sequence number rather than a clock: a
+job's number is taken and its feed entry added in one script, so a run whose
+watermark is some number has already seen every entry up to it, however the
+writers' clocks disagree.
+"""
+
+import base64
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .models import JobPosting, UserProfile
+from .scoring import (
+    CandidateBatch,
+    ProfileFeatures,
+    composite_formula,
+    experience_formula,
+    industry_formula,
+    location_formula,
+    recent_postings,
+    salary_formula,
+    skill_formula,
+    traditional_formula,
+)
+
+JOB_FEED_KEY = "recommendations:job_feed"
+JOB_KEY_PREFIX = "recommendations:job:"
+KNOWN_JOBS_KEY = "recommendations:known_jobs"
+PROFILES_KEY = "recommendations:profiles"
+PROFILE_VECTORS_KEY = "recommendations:profile_vectors"
+PROFILE_DIGESTS_KEY = "recommendations:profile_digests"
+WATERMARK_KEY = "recommendations:watermark"
+SEQUENCE_KEY = "recommendations:job_sequence"
+FEED_TIMES_KEY = "recommendations:job_feed_times"
+LIST_KEY_PREFIX = "recommendations:user:"
+
+# KEYS[1] sequence, KEYS[2] feed, KEYS[3] feed times; ARGV[1] job id, ARGV[2]
+# change time, ARGV[3] retention cutoff. Returns the job's feed position.
+RECORD_JOB_SCRIPT = """
+local position = redis.call('INCR', KEYS[1])
+redis.call('ZADD', KEYS[2], position, ARGV[1])
+redis.call('ZADD', KEYS[3], ARGV[2], ARGV[1])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', '(' .. ARGV[3])
+for _, job_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], job_id)
+    redis.call('ZREM', KEYS[3], job_id)
+end
+return position
+"""
+
+VECTOR_DTYPE = np.float32
+
+
+def profile_digest(profile: UserProfile) -> str:
+    """Fingerprint of everything in a profile that affects its matches."""
+    encoded = json.dumps(profile.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def unit_rows(matrix: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length; all-zero rows stay zero."""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def pack_vector(vector: Sequence[float]) -> str:
+    """Base64 float32 encoding; survives clients created with ``decode_responses``."""
+    return base64.b64encode(np.asarray(vector, dtype=VECTOR_DTYPE).tobytes()).decode()
+
+
+def unpack_vector(packed: Any) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(packed), dtype=VECTOR_DTYPE)
+
+
+def _incidence(sets: Sequence[Iterable[str]], vocabulary: Mapping[str, int]) -> sparse.csr_matrix:
+    """Sparse rows x vocabulary matrix with a one for each member of each set."""
+    rows, columns = [], []
+    for row, values in enumerate(sets):
+        for value in values:
+            column = vocabulary.get(value)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+    return sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, columns)), shape=(len(sets), len(vocabulary))
+    )
+
+
+def _skill_matrix(column, vocabulary_size: int) -> sparse.csr_matrix:
+    """Sparse skills x jobs matrix for one of the batch's skill columns."""
+    return sparse.csr_matrix(
+        (np.ones(len(column.ids)), (column.ids, column.rows)), shape=(vocabulary_size, column.size)
+    )
+
+
+def _preference_hits(column: np.ndarray, preferences: Sequence[Iterable[str]], substring: bool) -> np.ndarray:
+    """Boolean ``(users, jobs)`` array of rows matching any of each user's preferences.
+
+    Each distinct preference string is tested against the column once; the
+    per-user result is a sparse product over those strings.
+    """
+    vocabulary: Dict[str, int] = {}
+    for values in preferences:
+        for value in values:
+            vocabulary.setdefault(value, len(vocabulary))
+    if not vocabulary:
+        return np.zeros((len(preferences), len(column)), dtype=bool)
+
+    matches = np.empty((len(vocabulary), len(column)), dtype=np.float64)
+    for value, index in vocabulary.items():
+        found = np.char.find(column, value) >= 0 if substring else column == value
+        matches[index] = found & (column != "")
+    return np.asarray(_incidence(preferences, vocabulary) @ matches) > 0
+
+
+def _column(values: Sequence[float]) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64).reshape(-1, 1)
+
+
+class ProfileMatrix:
+    """A chunk of stored profiles: unit embeddings plus per-user feature columns."""
+
+    def __init__(self, user_ids: Sequence[str], profiles: Sequence[UserProfile], embeddings: np.ndarray):
+        self.user_ids = list(user_ids)
+        self.features = [ProfileFeatures.from_profile(profile) for profile in profiles]
+        self.embeddings = unit_rows(embeddings)
+
+        self.skill_count = _column([len(features.skills) for features in self.features])
+        self.years = _column([features.years_experience for features in self.features])
+        self.salary_min = _column([
+            np.nan if features.salary_min is None else features.salary_min for features in self.features
+        ])
+        self.salary_max = _column([
+            np.nan if features.salary_max is None else features.salary_max for features in self.features
+        ])
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+
+def score_profiles(
+    batch: CandidateBatch,
+    job_embeddings: np.ndarray,
+    profiles: ProfileMatrix,
+    now: Optional[datetime] = None
+) -> np.ndarray:
+    """Composite match scores for every profile and job, shape ``(users, jobs)``."""
+    semantic = profiles.embeddings @ unit_rows(job_embeddings).T
+
+    vocabulary_size = len(batch.vocabulary)
+    required = _skill_matrix(batch.required_skills, vocabulary_size)
+    preferred = _skill_matrix(batch.preferred_skills, vocabulary_size)
+    user_skills = _incidence([features.skills for features in profiles.features], batch.vocabulary)
+    required_hits = (user_skills @ required).toarray()
+    required_count = batch.required_skills.counts()
+
+    factors = {
+        "skill": skill_formula(
+            required_hits, required_count,
+            (user_skills @ preferred).toarray(), batch.preferred_skills.counts(),
+            profiles.skill_count
+        ),
+        "experience": experience_formula(batch.required_years, profiles.years),
+        "location": location_formula(
+            _preference_hits(batch.location, [features.locations for features in profiles.features], True),
+            _preference_hits(batch.remote_type, [features.remote_preferences for features in profiles.features], False),
+        ),
+        "salary": salary_formula(batch.salary_min, batch.salary_max, profiles.salary_min, profiles.salary_max),
+        "industry": industry_formula(
+            _preference_hits(batch.industry, [features.industries for features in profiles.features], True),
+            _preference_hits(batch.title, [features.roles for features in profiles.features], True),
+        ),
+    }
+
+    high_demand = _incidence([features.high_demand_skills for features in profiles.features], batch.vocabulary)
+    return composite_formula(
+        semantic,
+        traditional_formula(factors),
+        (high_demand @ required).toarray(),
+        recent_postings(batch, now),
+        required_count - required_hits,
+    )
+
+
+def best_per_row(scores: np.ndarray, threshold: float, limit: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Column indices and scores of each row's best ``limit`` entries at or above ``threshold``."""
+    masked = np.where(scores >= threshold, scores, -np.inf)
+    if masked.shape[1] > limit:
+        candidates = np.argpartition(-masked, limit - 1, axis=1)[:, :limit]
+    else:
+        candidates = np.broadcast_to(np.arange(masked.shape[1]), masked.shape)
+
+    best = []
+    for row, columns in enumerate(candidates):
+        row_scores = masked[row, columns]
+        keep = np.isfinite(row_scores)
+        best.append((columns[keep], row_scores[keep]))
+    return best
+
+
+@dataclass
+class ChangedJobs:
+    """Jobs recorded in the feed after a watermark."""
+    rows: List[Dict[str, Any]]
+    embeddings: np.ndarray
+    updated: List[str]
+    watermark: int
+
+    @property
+    def job_ids(self) -> List[str]:
+        return [row["id"] for row in self.rows]
+
+
+@dataclass
+class StoredProfile:
+    user_id: str
+    profile: UserProfile
+    embedding: np.ndarray
+
+
+class RecommendationStore:
+    """Redis state for reverse matching.
+
+    Changed jobs go into a feed sorted by sequence number, with their
+    embedding in a payload key that expires after the retention window. Profiles are
+    stored as JSON with their embedding as base64 float32 and a digest for
+    change detection. Each user's recommendations are a sorted set of job ids
+    by match score, trimmed to the list size.
+    """
+
+    def __init__(self, redis, list_size: int, feed_retention: timedelta):
+        self.redis = redis
+        self.list_size = list_size
+        self.feed_retention = feed_retention
+
+    async def record_job(self, job: JobPosting, embedding: Sequence[float], changed_at: Optional[float] = None) -> int:
+        """Queue a job for reverse matching; returns its feed position.
+
+        ``changed_at`` only decides when the entry ages out of the feed.
+        """
+        changed_at = time.time() if changed_at is None else changed_at
+        new = await self.redis.sadd(KNOWN_JOBS_KEY, job.id)
+        payload = json.dumps({
+            "job": job.model_dump(mode="json"),
+            "embedding": [float(value) for value in embedding],
+            "updated": not new,
+        })
+        # The payload is written first so a feed entry never points at nothing
+        retention = self.feed_retention.total_seconds()
+        await self.redis.set(f"{JOB_KEY_PREFIX}{job.id}", payload, ex=int(retention))
+        record = self.redis.register_script(RECORD_JOB_SCRIPT)
+        position = await record(
+            keys=[SEQUENCE_KEY, JOB_FEED_KEY, FEED_TIMES_KEY],
+            args=[job.id, repr(changed_at), repr(changed_at - retention)]
+        )
+        return int(position)
+
+    async def watermark(self) -> int:
+        value = await self.redis.get(WATERMARK_KEY)
+        return int(value) if value is not None else 0
+
+    async def set_watermark(self, watermark: int) -> None:
+        await self.redis.set(WATERMARK_KEY, int(watermark))
+
+    async def changed_jobs(self, since: int) -> ChangedJobs:
+        entries = await self.redis.zrangebyscore(JOB_FEED_KEY, f"({since}", "+inf", withscores=True)
+        if not entries:
+            return ChangedJobs([], np.empty((0, 0)), [], since)
+
+        payloads = await self.redis.mget([f"{JOB_KEY_PREFIX}{_text(job_id)}" for job_id, _ in entries])
+        rows, embeddings, updated = [], [], []
+        for payload in payloads:
+            if payload is None:
+                continue
+            entry = json.loads(payload)
+            rows.append(entry["job"])
+            embeddings.append(entry["embedding"])
+            if entry.get("updated"):
+                updated.append(entry["job"]["id"])
+        embeddings = np.asarray(embeddings, dtype=np.float64) if rows else np.empty((0, 0))
+        return ChangedJobs(rows, embeddings, updated, int(max(score for _, score in entries)))
+
+    async def profile_digests(self, user_ids: Sequence[str]) -> Dict[str, Optional[str]]:
+        if not user_ids:
+            return {}
+        digests = await self.redis.hmget(PROFILE_DIGESTS_KEY, list(user_ids))
+        return {user_id: _text(digest) if digest is not None else None for user_id, digest in zip(user_ids, digests)}
+
+    async def store_profile(self, profile: UserProfile, embedding: Sequence[float], digest: Optional[str] = None) -> None:
+        pipe = self.redis.pipeline()
+        pipe.hset(PROFILES_KEY, profile.id, profile.model_dump_json())
+        pipe.hset(PROFILE_VECTORS_KEY, profile.id, pack_vector(embedding))
+        pipe.hset(PROFILE_DIGESTS_KEY, profile.id, digest or profile_digest(profile))
+        await pipe.execute()
+
+    async def iter_profiles(self, chunk_size: int) -> AsyncIterator[List[StoredProfile]]:
+        """Stored profiles in chunks of roughly ``chunk_size``."""
+        cursor = 0
+        while True:
+            cursor, vectors = await self.redis.hscan(PROFILE_VECTORS_KEY, cursor, count=chunk_size)
+            if vectors:
+                user_ids = [_text(user_id) for user_id in vectors]
+                profiles = await self.redis.hmget(PROFILES_KEY, user_ids)
+                yield [
+                    StoredProfile(user_id, UserProfile.model_validate_json(profile), unpack_vector(vector))
+                    for user_id, vector, profile in zip(user_ids, vectors.values(), profiles)
+                    if profile is not None
+                ]
+            if not cursor:
+                break
+
+    async def replace(self, user_id: str, scores: Mapping[str, float]) -> None:
+        key = f"{LIST_KEY_PREFIX}{user_id}"
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        if scores:
+            pipe.zadd(key, dict(scores))
+            pipe.zremrangebyrank(key, 0, -(self.list_size + 1))
+        await pipe.execute()
+
+    async def merge(
+        self, user_ids: Sequence[str], scores: Sequence[Mapping[str, float]], changed: Sequence[str] = ()
+    ) -> int:
+        """Merge new scores into each user's list; ``changed`` jobs that no longer qualify are dropped.
+
+        Returns the number of lists that received at least one job.
+        """
+        pipe = self.redis.pipeline()
+        touched = 0
+        for user_id, user_scores in zip(user_ids, scores):
+            key = f"{LIST_KEY_PREFIX}{user_id}"
+            stale = [job_id for job_id in changed if job_id not in user_scores]
+            if stale:
+                pipe.zrem(key, *stale)
+            if user_scores:
+                pipe.zadd(key, dict(user_scores))
+                pipe.zremrangebyrank(key, 0, -(self.list_size + 1))
+                touched += 1
+        await pipe.execute()
+        return touched
+
+    async def recommendations(self, user_id: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """A user's stored list as ``(job_id, score)``, best first."""
+        end = -1 if limit is None else limit - 1
+        entries = await self.redis.zrevrange(f"{LIST_KEY_PREFIX}{user_id}", 0, end, withscores=True)
+        return [(_text(job_id), score) for job_id, score in entries]
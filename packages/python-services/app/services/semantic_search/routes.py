@@ -1,11 +1,11 @@
 """Semantic Search Service routes."""
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from typing import List, Optional
 
 from app.core.auth import ServiceAuth, get_current_auth
 from app.core.logging import get_logger
-from .service import get_semantic_search_service, SemanticSearchService
+from .service import get_semantic_search_service
 from .models import (
     SemanticSearchRequest, SearchResults, EmbeddingRequest, EmbeddingResponse,
     BatchEmbeddingRequest, BatchEmbeddingResponse, VectorSearchRequest,
@@ -206,6 +206,71 @@ async def store_job_embedding(
         )
 
 
+@router.post("/profiles/update")
+async def update_profile(
+    profile: UserProfile,
+    background_tasks: BackgroundTasks,
+    auth: ServiceAuth = Depends(get_current_auth)
+):
+    """Store an updated profile for reverse matching and rebuild its recommendations."""
+    logger.info(
+        "Profile update received",
+        user_id=profile.id,
+        service=auth.service_name
+    )
+    
+    try:
+        service = await get_semantic_search_service()
+        
+        # Unchanged profiles are skipped by the refresh
+        background_tasks.add_task(service.refresh_recommendations, [profile])
+        
+        return {
+            "status": "accepted",
+            "user_id": profile.id,
+            "message": "Recommendation refresh queued for processing"
+        }
+        
+    except Exception as e:
+        logger.error(f"Profile update failed: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Profile update failed: {str(e)}"
+        )
+
+
+@router.get("/recommendations/{user_id}")
+async def get_recommendations(
+    user_id: str,
+    limit: Optional[int] = Query(default=None, ge=1, le=100),
+    auth: ServiceAuth = Depends(get_current_auth)
+):
+    """Read a user's persisted recommendation list."""
+    logger.info(
+        "Recommendations requested",
+        user_id=user_id,
+        limit=limit,
+        service=auth.service_name
+    )
+    
+    try:
+        service = await get_semantic_search_service()
+        recommendations = await service.get_recommendations(user_id, limit)
+        
+        return {
+            "user_id": user_id,
+            "recommendations": recommendations,
+            "total": len(recommendations)
+        }
+        
+    except Exception as e:
+        logger.error(f"Recommendation lookup failed: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Recommendation lookup failed: {str(e)}"
+        )
+
+
 @router.post("/similarity/calculate", response_model=SimilarityResponse)
 async def calculate_similarity(
     request: SimilarityRequest,
@@ -0,0 +1,397 @@
+"""Columnar match scoring for semantic search candidates.
+
+A vector query returns up to a few hundred candidates. Scoring them one
+Pydantic ``JobPosting`` at a time dominated search latency, so candidate
+metadata is decoded once into numpy columns and every factor is computed for
+the whole batch with array operations. Only the candidates that make the
+final cut are turned into ``JobMatch`` objects.
+
+Skill lists are interned into a per-batch vocabulary: each candidate's
+required and preferred skills become runs of integer ids, and overlap with the
+profile is a ``bincount`` over a boolean membership column. Profile lookup
+sets are built once per request in :class:`ProfileFeatures`; the level table
+and high-demand skills are module constants.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .models import JobPosting, UserProfile
+
+# Years of experience implied by an ``experience_level``
+EXPERIENCE_LEVEL_YEARS = {
+    'entry': 0, 'junior': 1, 'associate': 2, 'mid': 3, 'senior': 5,
+    'lead': 7, 'principal': 10, 'director': 12, 'vp': 15, 'executive': 20
+}
+DEFAULT_REQUIRED_YEARS = 3
+
+HIGH_DEMAND_SKILLS = frozenset({'python', 'javascript', 'react', 'aws', 'kubernetes', 'machine learning'})
+
+RECENT_POSTING_WINDOW = timedelta(days=7)
+
+# Fields without defaults on JobPosting; rows missing any are dropped on decode
+REQUIRED_JOB_FIELDS = ("id", "title", "company", "description")
+
+FACTOR_WEIGHTS = {
+    "skill": 0.35,
+    "experience": 0.25,
+    "location": 0.15,
+    "salary": 0.15,
+    "industry": 0.10,
+}
+
+
+def normalize_skill(skill: str) -> str:
+    return skill.lower().strip()
+
+
+def _lowered(values: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    return tuple(value.lower() for value in values or ())
+
+
+def _timestamp(value: Any) -> float:
+    """Seconds since the epoch for a ``posted_date`` in any form JobPosting accepts."""
+    if value is None or value == "":
+        return np.nan
+    try:
+        if isinstance(value, datetime):
+            return value.timestamp()
+        if isinstance(value, (int, float)):
+            return float(value)
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except (TypeError, ValueError, OverflowError):
+        return np.nan
+
+
+def _positive(value: Any) -> float:
+    """Salary column value; missing and zero salaries both mean unknown."""
+    try:
+        return float(value) if value else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+@dataclass(frozen=True)
+class ProfileFeatures:
+    """Lookup sets for one profile, built once per search request."""
+    skills: FrozenSet[str]
+    high_demand_skills: FrozenSet[str]
+    locations: Tuple[str, ...]
+    remote_preferences: FrozenSet[str]
+    industries: Tuple[str, ...]
+    roles: Tuple[str, ...]
+    years_experience: float
+    salary_min: Optional[float]
+    salary_max: Optional[float]
+
+    @classmethod
+    def from_profile(cls, profile: UserProfile) -> "ProfileFeatures":
+        skills = frozenset(normalize_skill(skill) for skill in profile.skills)
+        return cls(
+            skills=skills,
+            high_demand_skills=skills & HIGH_DEMAND_SKILLS,
+            locations=_lowered(profile.preferred_locations),
+            remote_preferences=frozenset(_lowered(profile.remote_preferences)),
+            industries=_lowered(profile.industry_preferences),
+            roles=_lowered(profile.preferred_roles),
+            years_experience=float(profile.years_experience or 0),
+            salary_min=float(profile.salary_expectation_min) if profile.salary_expectation_min else None,
+            salary_max=float(profile.salary_expectation_max) if profile.salary_expectation_max else None,
+        )
+
+    def matching_skills(self, required: Sequence[str], preferred: Sequence[str]) -> List[str]:
+        skills = dict.fromkeys(normalize_skill(skill) for skill in list(required) + list(preferred))
+        return [skill for skill in skills if skill in self.skills]
+
+    def skill_gaps(self, required: Sequence[str]) -> List[str]:
+        skills = dict.fromkeys(normalize_skill(skill) for skill in required)
+        return [skill for skill in skills if skill not in self.skills]
+
+    def location_match(self, location: Optional[str]) -> Optional[bool]:
+        if not self.locations or not location:
+            return None
+        location = location.lower()
+        return any(preferred in location for preferred in self.locations)
+
+    def salary_match(self, salary_max: Optional[int]) -> Optional[bool]:
+        if self.salary_min is None or not salary_max:
+            return None
+        return salary_max >= self.salary_min
+
+
+class _SkillColumn:
+    """Ragged per-candidate skill sets as flat vocabulary ids plus owning rows."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.ids = []
+        self.rows = []
+
+    def add(self, row: int, skills: Iterable[str], vocabulary: Dict[str, int]) -> None:
+        for skill in dict.fromkeys(normalize_skill(skill) for skill in skills):
+            self.ids.append(vocabulary.setdefault(skill, len(vocabulary)))
+            self.rows.append(row)
+
+    def freeze(self) -> None:
+        self.ids = np.asarray(self.ids, dtype=np.int64)
+        self.rows = np.asarray(self.rows, dtype=np.int64)
+
+    def counts(self) -> np.ndarray:
+        return np.bincount(self.rows, minlength=self.size).astype(np.float64)
+
+    def hits(self, member: np.ndarray) -> np.ndarray:
+        """Per-row count of skills whose vocabulary id is set in ``member``."""
+        if not len(self.ids):
+            return np.zeros(self.size)
+        return np.bincount(self.rows, weights=member[self.ids], minlength=self.size)
+
+
+class CandidateBatch:
+    """Candidate job metadata decoded into columns, one row per candidate."""
+
+    def __init__(self, rows: Sequence[Mapping[str, Any]], semantic_scores: Sequence[float]):
+        self.rows = list(rows)
+        size = len(self.rows)
+        self.semantic = np.asarray(semantic_scores, dtype=np.float64).reshape(size)
+
+        self.salary_min = np.array([_positive(row.get("salary_min")) for row in self.rows], dtype=np.float64)
+        self.salary_max = np.array([_positive(row.get("salary_max")) for row in self.rows], dtype=np.float64)
+        self.required_years = np.array([
+            EXPERIENCE_LEVEL_YEARS.get(row["experience_level"].lower(), DEFAULT_REQUIRED_YEARS)
+            if row.get("experience_level") else np.nan
+            for row in self.rows
+        ], dtype=np.float64)
+        self.posted_at = np.array([_timestamp(row.get("posted_date")) for row in self.rows], dtype=np.float64)
+
+        # Unicode arrays so substring tests run through np.char
+        self.location = np.array([(row.get("location") or "").lower() for row in self.rows], dtype=str)
+        self.remote_type = np.array([(row.get("remote_type") or "").lower() for row in self.rows], dtype=str)
+        self.industry = np.array([(row.get("industry") or "").lower() for row in self.rows], dtype=str)
+        self.title = np.array([(row.get("title") or "").lower() for row in self.rows], dtype=str)
+
+        self.vocabulary: Dict[str, int] = {}
+        self.required_skills = _SkillColumn(size)
+        self.preferred_skills = _SkillColumn(size)
+        for index, row in enumerate(self.rows):
+            self.required_skills.add(index, row.get("required_skills") or (), self.vocabulary)
+            self.preferred_skills.add(index, row.get("preferred_skills") or (), self.vocabulary)
+        self.required_skills.freeze()
+        self.preferred_skills.freeze()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def from_matches(cls, matches: Iterable[Any]) -> "CandidateBatch":
+        """Decode vector-index matches, skipping any without usable job metadata."""
+        rows, scores = [], []
+        for match in matches:
+            metadata = getattr(match, "metadata", None)
+            if not isinstance(metadata, Mapping) or not all(metadata.get(field) for field in REQUIRED_JOB_FIELDS):
+                continue
+            rows.append(metadata)
+            scores.append(float(match.score))
+        return cls(rows, scores)
+
+    @classmethod
+    def from_jobs(cls, jobs: Sequence[JobPosting], semantic_scores: Optional[Sequence[float]] = None) -> "CandidateBatch":
+        if semantic_scores is None:
+            semantic_scores = [0.0] * len(jobs)
+        return cls([job.model_dump() for job in jobs], semantic_scores)
+
+    def membership(self, skills: FrozenSet[str]) -> np.ndarray:
+        """Boolean column over the vocabulary marking ``skills``."""
+        member = np.zeros(len(self.vocabulary), dtype=np.float64)
+        for skill in skills:
+            skill_id = self.vocabulary.get(skill)
+            if skill_id is not None:
+                member[skill_id] = 1.0
+        return member
+
+
+@dataclass
+class CandidateScores:
+    """Per-factor and combined scores, aligned with the batch rows."""
+    skill: np.ndarray
+    experience: np.ndarray
+    location: np.ndarray
+    salary: np.ndarray
+    industry: np.ndarray
+    traditional: np.ndarray
+    composite: np.ndarray
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def _contains_any(column: np.ndarray, needles: Sequence[str]) -> np.ndarray:
+    """Rows of a non-empty string column containing any of ``needles``."""
+    found = np.zeros(column.shape, dtype=bool)
+    for needle in needles:
+        found |= np.char.find(column, needle) >= 0
+    return found & (column != "")
+
+
+# Factor formulas. Profile inputs are scalars when one profile is scored
+# against a batch and ``(users, 1)`` columns when a matrix of profiles is, so
+# both paths broadcast through the same code.
+
+def skill_formula(
+    required_hits: np.ndarray,
+    required_count: np.ndarray,
+    preferred_hits: np.ndarray,
+    preferred_count: np.ndarray,
+    profile_skill_count: Any
+) -> np.ndarray:
+    score = _safe_divide(required_hits, required_count) * 0.8 + _safe_divide(preferred_hits, preferred_count) * 0.2
+    # Bonus for having more skills than required
+    surplus = profile_skill_count - required_count
+    score = score + np.where(surplus > 0, np.minimum(0.1, surplus * 0.02), 0.0)
+
+    score = np.minimum(score, 1.0)
+    return np.where((required_count > 0) & (np.asarray(profile_skill_count) > 0), score, 0.0)
+
+
+def experience_formula(required: np.ndarray, years: Any) -> np.ndarray:
+    years, required = np.broadcast_arrays(np.asarray(years, dtype=np.float64), required)
+
+    # Slightly penalise overqualification beyond 1.5x the requirement
+    qualified = np.where(years <= required * 1.5, 1.0, np.maximum(0.8, 1.0 - (years - required * 1.5) * 0.05))
+    underqualified = np.maximum(0.2, _safe_divide(years, np.nan_to_num(required)) * 0.8)
+
+    score = np.where(years >= required, qualified, underqualified)
+    # Neutral when the posting has no experience level
+    return np.where(np.isnan(required), 0.5, score)
+
+
+def location_formula(location_hit: np.ndarray, remote_hit: np.ndarray) -> np.ndarray:
+    return np.minimum(np.where(location_hit, 0.6, 0.0) + np.where(remote_hit, 0.4, 0.0), 1.0)
+
+
+def salary_formula(job_min: np.ndarray, job_max: np.ndarray, wanted_min: Any, wanted_max: Any) -> np.ndarray:
+    """Salary fit; unknown profile expectations are NaN."""
+    with np.errstate(invalid="ignore"):
+        mid = (wanted_min + wanted_max) / 2
+        diff_ratio = np.abs((job_min + job_max) / 2 - mid) / mid
+        range_score = np.select([diff_ratio <= 0.1, diff_ratio <= 0.2, diff_ratio <= 0.3], [1.0, 0.8, 0.6], 0.4)
+        # Only the posting's maximum is known
+        max_only = np.where(job_max >= mid, 0.8, 0.6)
+        with_range = np.where(np.isnan(job_min), max_only, range_score)
+        # Only the profile's minimum is known
+        min_only = np.where(job_max >= wanted_min * 1.2, 0.8, 0.6)
+
+        score = np.where(np.isnan(wanted_max), min_only, with_range)
+        score = np.where(job_max < wanted_min, 0.0, score)
+    return np.where(np.isnan(job_max) | np.isnan(wanted_min), 0.5, score)
+
+
+def industry_formula(industry_hit: np.ndarray, role_hit: np.ndarray) -> np.ndarray:
+    return np.minimum(np.where(industry_hit, 0.5, 0.0) + np.where(role_hit, 0.5, 0.0), 1.0)
+
+
+def traditional_formula(factors: Mapping[str, np.ndarray]) -> np.ndarray:
+    return np.minimum(sum(factors[name] * weight for name, weight in FACTOR_WEIGHTS.items()), 1.0)
+
+
+def composite_formula(
+    semantic: np.ndarray,
+    traditional: np.ndarray,
+    high_demand_hits: np.ndarray,
+    recent: np.ndarray,
+    skill_gaps: np.ndarray
+) -> np.ndarray:
+    """Blend semantic and traditional scores, then apply the ranking adjustments."""
+    score = semantic * 0.6 + traditional * 0.4
+    # Boost for each matched high-demand skill
+    score = score + high_demand_hits * 0.02
+    # Boost for postings from the last week
+    score = score + np.where(recent, 0.05, 0.0)
+    # Penalty for significant gaps in the required skills
+    score = score - np.where(skill_gaps > 3, 0.1, 0.0)
+    return np.clip(score, 0.0, 1.0)
+
+
+def recent_postings(batch: CandidateBatch, now: Optional[datetime] = None) -> np.ndarray:
+    cutoff = ((now or datetime.now()) - RECENT_POSTING_WINDOW).timestamp()
+    with np.errstate(invalid="ignore"):
+        return batch.posted_at > cutoff
+
+
+def _optional(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+
+def skill_scores(batch: CandidateBatch, profile: ProfileFeatures) -> np.ndarray:
+    user = batch.membership(profile.skills)
+    return skill_formula(
+        batch.required_skills.hits(user), batch.required_skills.counts(),
+        batch.preferred_skills.hits(user), batch.preferred_skills.counts(),
+        len(profile.skills)
+    )
+
+
+def experience_scores(batch: CandidateBatch, profile: ProfileFeatures) -> np.ndarray:
+    return experience_formula(batch.required_years, profile.years_experience)
+
+
+def location_scores(batch: CandidateBatch, profile: ProfileFeatures) -> np.ndarray:
+    remote = np.isin(batch.remote_type, list(profile.remote_preferences)) & (batch.remote_type != "")
+    return location_formula(_contains_any(batch.location, profile.locations), remote)
+
+
+def salary_scores(batch: CandidateBatch, profile: ProfileFeatures) -> np.ndarray:
+    return salary_formula(
+        batch.salary_min, batch.salary_max, _optional(profile.salary_min), _optional(profile.salary_max)
+    )
+
+
+def industry_scores(batch: CandidateBatch, profile: ProfileFeatures) -> np.ndarray:
+    return industry_formula(
+        _contains_any(batch.industry, profile.industries), _contains_any(batch.title, profile.roles)
+    )
+
+
+def composite_scores(
+    batch: CandidateBatch,
+    profile: ProfileFeatures,
+    traditional: np.ndarray,
+    now: Optional[datetime] = None
+) -> np.ndarray:
+    required = batch.required_skills
+    return composite_formula(
+        batch.semantic,
+        traditional,
+        required.hits(batch.membership(profile.high_demand_skills)),
+        recent_postings(batch, now),
+        required.counts() - required.hits(batch.membership(profile.skills)),
+    )
+
+
+def score_candidates(
+    batch: CandidateBatch,
+    profile: ProfileFeatures,
+    now: Optional[datetime] = None
+) -> CandidateScores:
+    factors = {
+        "skill": skill_scores(batch, profile),
+        "experience": experience_scores(batch, profile),
+        "location": location_scores(batch, profile),
+        "salary": salary_scores(batch, profile),
+        "industry": industry_scores(batch, profile),
+    }
+    traditional = traditional_formula(factors)
+    return CandidateScores(
+        traditional=traditional,
+        composite=composite_scores(batch, profile, traditional, now),
+        **factors
+    )
+
+
+def rank_candidates(scores: np.ndarray, threshold: float) -> np.ndarray:
+    """Row indices at or above ``threshold``, best first."""
+    eligible = np.flatnonzero(scores >= threshold)
+    return eligible[np.argsort(-scores[eligible], kind="stable")]
@@ -1,8 +1,11 @@
 """Enhanced semantic search service with vector embeddings and Pinecone integration."""
 
 import asyncio
+import hashlib
 import json
+import os
 import time
+from datetime import timedelta
 from typing import Dict, Any, List, Optional, Tuple
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity, euclidean_distances
@@ -12,10 +15,11 @@ import pinecone
 from langchain_openai import OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from app.core.cache_warming import AccessLog
 from app.core.config import get_settings
 from app.core.logging import get_logger
-from app.core.openai_client import EnhancedOpenAIClient
-from app.core.dependencies import ServiceDependencies
+from app.core.openai_client import EnhancedOpenAIClient, get_openai_client
+from app.core.dependencies import ServiceDependencies, get_redis_client
 from app.core.exceptions import VectorSearchException, EmbeddingException
 
 from .models import (
@@ -25,9 +29,20 @@ from .models import (
     BatchEmbeddingRequest, BatchEmbeddingResponse, SimilarityRequest,
     SimilarityResponse, MatchType
 )
+from .keyword_index import BM25Index, job_fields, profile_query, snapshot_lock
+from .reverse_matching import (
+    ProfileMatrix, RecommendationStore, best_per_row, profile_digest, score_profiles
+)
+from .scoring import (
+    CandidateBatch, CandidateScores, ProfileFeatures, composite_scores, rank_candidates,
+    score_candidates
+)
 
 logger = get_logger(__name__)
 
+# Access log loader that recomputes cached search results (see app.core.cache_warming)
+SEARCH_RESULTS_LOADER = "semantic_search.search_jobs"
+
 
 class EnhancedSemanticSearchService:
     """Enhanced semantic search service with vector embeddings, Pinecone, and Elasticsearch."""
@@ -45,6 +60,26 @@ class EnhancedSemanticSearchService:
         self.pinecone_index = None
         self.elasticsearch_client = None
         
+        # In-process BM25 index backing keyword search
+        self.keyword_index = BM25Index(
+            k1=self.settings.ai.keyword_index_k1,
+            b=self.settings.ai.keyword_index_b
+        )
+        self.keyword_index_path = self.settings.ai.keyword_index_path
+        self._keyword_index_mtime = None
+        # Local changes not yet in the snapshot: job id -> row, or None for a removal
+        self._keyword_index_pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        
+        # Persisted recommendation lists and the reverse matching state
+        self.recommendations = RecommendationStore(
+            self.redis,
+            list_size=self.settings.ai.recommendation_list_size,
+            feed_retention=timedelta(days=self.settings.ai.job_feed_retention_days)
+        )
+        
+        # Sampled reads of cached search results, for predictive warming
+        self.access_log = AccessLog.from_settings(self.redis, self.settings)
+        
         # Text processing
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
@@ -110,20 +145,23 @@ class EnhancedSemanticSearchService:
             else:
                 self.logger.warning("Pinecone credentials not provided, vector search will be limited")
                 
-            # Initialize Elasticsearch for keyword search fallback
-            try:
-                self.elasticsearch_client = AsyncElasticsearch(
-                    [{"host": "localhost", "port": 9200}],
-                    timeout=30,
-                    max_retries=3,
-                    retry_on_timeout=True
-                )
-                # Test connection
-                await self.elasticsearch_client.ping()
-                self.logger.info("Elasticsearch client initialized")
-            except Exception as e:
-                self.logger.warning(f"Elasticsearch not available: {e}")
-                self.elasticsearch_client = None
+            # Elasticsearch replaces the local keyword index only when configured
+            if self.settings.ai.elasticsearch_url:
+                try:
+                    self.elasticsearch_client = AsyncElasticsearch(
+                        self.settings.ai.elasticsearch_url,
+                        request_timeout=30,
+                        max_retries=3,
+                        retry_on_timeout=True
+                    )
+                    # Test connection
+                    await self.elasticsearch_client.ping()
+                    self.logger.info("Elasticsearch client initialized")
+                except Exception as e:
+                    self.logger.warning(f"Elasticsearch not available: {e}")
+                    self.elasticsearch_client = None
+            
+            self._refresh_keyword_index()
             
             self._initialized = True
             self.logger.info("Enhanced semantic search service initialized successfully")
@@ -135,8 +173,13 @@ class EnhancedSemanticSearchService:
                 index_name=self.settings.ai.pinecone_index_name
             )
             
-    async def search_jobs(self, request: SemanticSearchRequest) -> SearchResults:
-        """Enhanced main search method with hybrid semantic and traditional matching."""
+    async def search_jobs(self, request: SemanticSearchRequest, refresh: bool = False) -> SearchResults:
+        """
+        Enhanced main search method with hybrid semantic and traditional matching.
+        
+        With ``refresh`` the cached results are recomputed rather than read,
+        and the read is not recorded in the access log (cache warming).
+        """
         start_time = time.time()
         
         try:
@@ -153,9 +196,10 @@ class EnhancedSemanticSearchService:
             cache_key = self._generate_cache_key(request)
             
             # Check cache first
-            cached_result = await self._get_cached_result(cache_key)
+            cached_result = None if refresh else await self._get_cached_result(cache_key)
             if cached_result:
                 cached_result.metadata["cache_hit"] = True
+                await self.access_log.record(cache_key, SEARCH_RESULTS_LOADER, request.model_dump(mode="json"))
                 self.logger.info("Returning cached search results", user_id=request.user_profile.id)
                 return cached_result
                 
@@ -173,17 +217,16 @@ class EnhancedSemanticSearchService:
             if request.filters:
                 matches = await self._apply_advanced_filters(matches, request.filters)
                 
-            # Enhanced scoring and ranking
-            matches = await self._apply_enhanced_scoring(matches, request.user_profile)
-            
-            # Sort by composite score and limit results
-            matches.sort(key=lambda x: x.composite_score, reverse=True)
+            # Sort by composite score (hybrid results by fused rank) and limit results
+            matches.sort(
+                key=lambda x: x.metadata.get("rrf_score", x.composite_score), reverse=True
+            )
             matches = matches[:request.top_k]
             
             # Generate match explanations if requested
             if request.include_explanation:
                 for match in matches:
-                    match.match_explanation = await self._generate_match_explanation(
+                    match.match_explanation = await self._generate_enhanced_match_explanation(
                         match, request.user_profile
                     )
             
@@ -207,6 +250,11 @@ class EnhancedSemanticSearchService:
             
             # Cache results
             await self._cache_result(cache_key, results)
+            if not refresh:
+                await self.access_log.record(
+                    cache_key, SEARCH_RESULTS_LOADER, request.model_dump(mode="json"),
+                    cost=results.processing_time
+                )
             
             self.logger.info(
                 "Enhanced search completed",
@@ -297,13 +345,9 @@ class EnhancedSemanticSearchService:
     async def _keyword_search(self, request: SemanticSearchRequest) -> List[JobMatch]:
         """Perform keyword-based search as fallback."""
         try:
-            # This would typically query a traditional database
-            # For now, we'll simulate with a basic implementation
             logger.info("Performing keyword search", user_id=request.user_profile.id)
             
-            # In a real implementation, this would query your job database
-            # with SQL LIKE queries or full-text search
-            jobs = await self._get_jobs_from_database(request.filters)
+            jobs = self._keyword_candidates(request.user_profile, min(request.top_k * 3, 200))
             
             matches = []
             profile_keywords = self._extract_keywords(request.user_profile)
@@ -613,11 +657,107 @@ class EnhancedSemanticSearchService:
             logger.error(f"Batch embedding generation failed: {str(e)}")
             raise
             
+    def index_jobs(self, jobs: List[JobPosting]) -> int:
+        """Add or replace jobs in the local keyword index."""
+        for job in jobs:
+            row = job.model_dump(mode="json")
+            self.keyword_index.add(job.id, job_fields(row), row)
+            self._keyword_index_pending[job.id] = row
+        return len(jobs)
+        
+    def remove_jobs(self, job_ids: List[str]) -> int:
+        """Drop jobs from the local keyword index and, once saved, from the snapshot."""
+        removed = 0
+        for job_id in job_ids:
+            removed += self.keyword_index.remove(job_id)
+            # Another process may have indexed it since this one last loaded
+            self._keyword_index_pending[job_id] = None
+        return removed
+        
+    def sync_keyword_index(self, jobs: List[JobPosting]) -> Dict[str, int]:
+        """
+        Make the keyword index hold exactly ``jobs``, the currently active
+        postings: missing or changed ones are indexed, others removed, and
+        the snapshot saved. Bootstraps an empty index from existing jobs.
+        """
+        self._refresh_keyword_index()
+        
+        changed = []
+        for job in jobs:
+            doc = self.keyword_index.keys.get(job.id)
+            if doc is None or self.keyword_index.payloads[doc] != job.model_dump(mode="json"):
+                changed.append(job)
+        self.index_jobs(changed)
+        
+        active = {job.id for job in jobs}
+        stale = [key for key in self.keyword_index.keys if key not in active]
+        self.remove_jobs(stale)
+        
+        self.save_keyword_index()
+        return {"indexed": len(changed), "removed": len(stale), "documents": len(self.keyword_index)}
+        
+    def save_keyword_index(self) -> bool:
+        """
+        Publish local changes to the keyword index snapshot.
+        
+        The snapshot is reloaded under a file lock if another process wrote
+        it since this one last did, so their changes are merged rather than
+        overwritten.
+        """
+        try:
+            with snapshot_lock(self.keyword_index_path):
+                index = self.keyword_index
+                try:
+                    mtime = os.stat(self.keyword_index_path).st_mtime_ns
+                except OSError:
+                    mtime = None
+                if mtime is not None and mtime != self._keyword_index_mtime:
+                    index = BM25Index.load(self.keyword_index_path)
+                    self._apply_pending(index)
+                    
+                index.save(self.keyword_index_path)
+                self.keyword_index = index
+                self._keyword_index_mtime = os.stat(self.keyword_index_path).st_mtime_ns
+                self._keyword_index_pending = {}
+            logger.info("Keyword index snapshot saved", documents=len(self.keyword_index))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save keyword index snapshot: {str(e)}")
+            return False
+            
+    def _apply_pending(self, index: BM25Index) -> None:
+        """Replay unsaved local changes onto ``index``."""
+        for job_id, row in self._keyword_index_pending.items():
+            if row is None:
+                index.remove(job_id)
+            else:
+                index.add(job_id, job_fields(row), row)
+                
+    def _refresh_keyword_index(self) -> None:
+        """Reload the keyword index snapshot if another process replaced it, keeping unsaved changes."""
+        try:
+            mtime = os.stat(self.keyword_index_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._keyword_index_mtime:
+            return
+            
+        try:
+            index = BM25Index.load(self.keyword_index_path)
+            self._apply_pending(index)
+            self.keyword_index = index
+            self._keyword_index_mtime = mtime
+            logger.info("Keyword index snapshot loaded", documents=len(self.keyword_index))
+        except Exception as e:
+            logger.warning(f"Failed to load keyword index snapshot: {str(e)}")
+            
     async def store_job_embedding(self, job: JobPosting, embedding: List[float]) -> bool:
-        """Store job embedding in Pinecone."""
+        """Store job embedding in Pinecone and index the job for keyword search."""
         try:
             await self.initialize()
             
+            self.index_jobs([job])
+            
             if not self.pinecone_index:
                 raise ValueError("Pinecone index not available")
                 
@@ -644,6 +784,9 @@ class EnhancedSemanticSearchService:
                 vectors=[(job.id, embedding, metadata)]
             )
             
+            # Queue the job for reverse matching against stored profiles
+            await self.recommendations.record_job(job, embedding)
+            
             logger.info(f"Stored embedding for job {job.id}")
             return True
             
@@ -651,6 +794,107 @@ class EnhancedSemanticSearchService:
             logger.error(f"Failed to store job embedding: {str(e)}")
             return False
             
+    async def get_recommendations(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """A user's persisted recommendation list, best first.
+        
+        Each entry carries the job posting from the keyword index when the
+        job is still indexed, and ``None`` otherwise.
+        """
+        self._refresh_keyword_index()
+        
+        entries = []
+        for job_id, score in await self.recommendations.recommendations(user_id, limit):
+            doc = self.keyword_index.keys.get(job_id)
+            entries.append({
+                "job_id": job_id,
+                "score": score,
+                "job": self.keyword_index.payloads[doc] if doc is not None else None
+            })
+        return entries
+        
+    async def refresh_recommendations(self, profiles: List[UserProfile]) -> Dict[str, Any]:
+        """Rebuild the recommendation lists of profiles that changed since they were stored.
+        
+        Unchanged profiles are skipped; their lists are kept current by
+        :meth:`reverse_match_jobs`.
+        """
+        await self.initialize()
+        
+        stored = await self.recommendations.profile_digests([profile.id for profile in profiles])
+        refreshed, failed = [], []
+        for profile in profiles:
+            digest = profile_digest(profile)
+            if stored.get(profile.id) == digest:
+                continue
+                
+            try:
+                results = await self.search_jobs(SemanticSearchRequest(
+                    user_profile=profile,
+                    search_type=SearchType.HYBRID,
+                    top_k=self.settings.ai.recommendation_list_size,
+                    include_explanation=False,
+                    match_threshold=self.settings.ai.recommendation_threshold
+                ))
+                await self.recommendations.replace(
+                    profile.id, {match.job.id: match.composite_score for match in results.matches}
+                )
+                if self.embeddings:
+                    embedding = await self._profile_embedding(profile)
+                    await self.recommendations.store_profile(profile, embedding, digest)
+                refreshed.append(profile.id)
+            except Exception as e:
+                logger.warning(f"Failed to refresh recommendations for user {profile.id}: {str(e)}")
+                failed.append(profile.id)
+                
+        return {
+            "refreshed": refreshed,
+            "failed": failed,
+            "unchanged": len(profiles) - len(refreshed) - len(failed)
+        }
+        
+    async def reverse_match_jobs(self) -> Dict[str, Any]:
+        """Score jobs changed since the last run against every stored profile.
+        
+        Profiles are read in chunks; each chunk is scored against the changed
+        jobs as one matrix and the qualifying jobs are merged into the users'
+        lists. The watermark only advances once every chunk is merged, so a
+        failed run is retried from the same point.
+        """
+        since = await self.recommendations.watermark()
+        changed = await self.recommendations.changed_jobs(since)
+        stats = {"jobs_matched": len(changed.rows), "users_scored": 0, "lists_updated": 0}
+        if not changed.rows:
+            if changed.watermark > since:
+                await self.recommendations.set_watermark(changed.watermark)
+            return stats
+            
+        batch = CandidateBatch(changed.rows, np.zeros(len(changed.rows)))
+        job_ids = changed.job_ids
+        dimension = changed.embeddings.shape[1]
+        threshold = self.settings.ai.recommendation_threshold
+        limit = self.settings.ai.recommendation_list_size
+        
+        async for chunk in self.recommendations.iter_profiles(self.settings.ai.reverse_match_chunk_size):
+            chunk = [entry for entry in chunk if len(entry.embedding) == dimension]
+            if not chunk:
+                continue
+            profiles = ProfileMatrix(
+                [entry.user_id for entry in chunk],
+                [entry.profile for entry in chunk],
+                np.stack([entry.embedding for entry in chunk])
+            )
+            scores = score_profiles(batch, changed.embeddings, profiles)
+            best = [
+                {job_ids[column]: float(score) for column, score in zip(columns, row_scores)}
+                for columns, row_scores in best_per_row(scores, threshold, limit)
+            ]
+            stats["lists_updated"] += await self.recommendations.merge(profiles.user_ids, best, changed.updated)
+            stats["users_scored"] += len(profiles)
+            
+        await self.recommendations.set_watermark(changed.watermark)
+        logger.info("Reverse matching completed", **stats)
+        return stats
+        
     # Helper methods for caching and database operations
     
     def _generate_cache_key(self, request: SemanticSearchRequest) -> str:
@@ -664,18 +908,18 @@ class EnhancedSemanticSearchService:
         
         if request.filters:
             # Create a deterministic string from filters
-            filter_str = json.dumps(request.filters.dict(), sort_keys=True)
-            key_parts.append(f"filters:{hash(filter_str)}")
+            filter_str = json.dumps(request.filters.model_dump(mode="json"), sort_keys=True)
+            key_parts.append(f"filters:{hashlib.sha1(filter_str.encode()).hexdigest()[:16]}")
             
         return ":".join(key_parts)
         
     async def _get_cached_result(self, cache_key: str) -> Optional[SearchResults]:
         """Get cached search results."""
         try:
-            if not self.redis_client:
+            if not self.redis:
                 return None
                 
-            cached_data = await self.redis_client.get(cache_key)
+            cached_data = await self.redis.get(cache_key)
             if cached_data:
                 data = json.loads(cached_data)
                 return SearchResults(**data)
@@ -688,27 +932,33 @@ class EnhancedSemanticSearchService:
     async def _cache_result(self, cache_key: str, results: SearchResults, ttl: int = 300):
         """Cache search results."""
         try:
-            if not self.redis_client:
+            if not self.redis:
                 return
                 
             # Mark as cached
             results.metadata["cache_hit"] = False
             
-            await self.redis_client.setex(
+            await self.redis.setex(
                 cache_key,
                 ttl,
-                results.json()
+                results.model_dump_json()
             )
             
         except Exception as e:
             logger.warning(f"Cache storage failed: {str(e)}")
             
-    async def _get_jobs_from_database(self, filters: Optional[SearchFilters]) -> List[JobPosting]:
-        """Get jobs from database with filters (placeholder implementation)."""
-        # This would typically query your actual job database
-        # For now, return empty list as this needs to be connected to your actual data source
-        logger.info("Getting jobs from database (placeholder implementation)")
-        return []
+    def _keyword_candidates(self, profile: UserProfile, limit: int) -> List[JobPosting]:
+        """Best BM25 matches for the profile from the local keyword index."""
+        self._refresh_keyword_index()
+        
+        query = profile_query(profile.skills, profile.preferred_roles, profile.industry_preferences)
+        jobs = []
+        for hit in self.keyword_index.search(query, limit):
+            try:
+                jobs.append(JobPosting(**hit.payload))
+            except Exception as e:
+                logger.warning(f"Skipping invalid indexed job {hit.key}: {str(e)}")
+        return jobs
         
     def _extract_keywords(self, profile: UserProfile) -> List[str]:
         """Extract keywords from user profile."""
@@ -898,35 +1148,14 @@ class EnhancedSemanticSearchService:
                 }
             )
 
-
-# Global service instance (legacy - kept for compatibility)
-semantic_search_service = None
-
-
-async def get_semantic_search_service_legacy():
-    """Get the legacy semantic search service instance."""
-    # This is kept for backward compatibility
-    # Use get_semantic_search_service with dependencies instead
-    pass
-# Enhanced methods for the semantic search service
+    # Enhanced methods for the semantic search service
 
     async def _enhanced_semantic_search(self, request: SemanticSearchRequest) -> List[JobMatch]:
         """Enhanced semantic search with improved vector operations."""
         try:
             self.logger.info("Performing enhanced semantic search", user_id=request.user_profile.id)
             
-            # Generate enhanced user profile embedding
-            profile_text = self._create_enhanced_profile_text(request.user_profile)
-            
-            # Check embedding cache first
-            cache_key = f"embedding:{hash(profile_text)}"
-            cached_embedding = await self._get_cached_embedding(cache_key)
-            
-            if cached_embedding:
-                profile_embedding = cached_embedding
-            else:
-                profile_embedding = await self.embeddings.aembed_query(profile_text)
-                await self._cache_embedding(cache_key, profile_embedding)
+            profile_embedding = await self._profile_embedding(request.user_profile)
             
             # Enhanced Pinecone search with better filtering
             search_results = self.pinecone_index.query(
@@ -937,41 +1166,14 @@ async def get_semantic_search_service_legacy():
                 filter=self._create_enhanced_pinecone_filters(request.filters) if request.filters else None
             )
             
-            matches = []
-            for match in search_results.matches:
-                try:
-                    job_data = match.metadata
-                    job = JobPosting(**job_data)
-                    
-                    # Enhanced scoring with multiple factors
-                    semantic_score = float(match.score)
-                    traditional_score = await self._calculate_enhanced_traditional_match(
-                        request.user_profile, job
-                    )
-                    
-                    # Advanced composite scoring
-                    composite_score = await self._calculate_advanced_composite_score(
-                        semantic_score, traditional_score, request.user_profile, job
-                    )
-                    
-                    if composite_score >= request.match_threshold:
-                        job_match = JobMatch(
-                            job=job,
-                            semantic_score=semantic_score,
-                            traditional_score=traditional_score,
-                            composite_score=composite_score,
-                            matching_skills=self._find_matching_skills(request.user_profile, job),
-                            skill_gaps=self._find_skill_gaps(request.user_profile, job),
-                            salary_match=self._check_salary_match(request.user_profile, job),
-                            location_match=self._check_location_match(request.user_profile, job)
-                        )
-                        matches.append(job_match)
-                        
-                except Exception as e:
-                    self.logger.warning(f"Failed to process job match: {str(e)}")
-                    continue
-                    
-            return matches
+            # Score every candidate at once; only the final cut becomes JobMatch objects
+            profile = ProfileFeatures.from_profile(request.user_profile)
+            batch = CandidateBatch.from_matches(search_results.matches)
+            scores = score_candidates(batch, profile)
+
+            return self._materialize_matches(
+                batch, scores, profile, request.match_threshold, request.top_k
+            )
             
         except Exception as e:
             self.logger.error(f"Enhanced semantic search failed: {str(e)}")
@@ -985,11 +1187,11 @@ async def get_semantic_search_service_legacy():
             if self.elasticsearch_client:
                 return await self._elasticsearch_search(request)
             else:
-                return await self._fallback_keyword_search(request)
+                return await self._local_keyword_search(request)
                 
         except Exception as e:
             self.logger.error(f"Enhanced keyword search failed: {str(e)}")
-            return await self._fallback_keyword_search(request)
+            return await self._local_keyword_search(request)
 
     async def _enhanced_hybrid_search(self, request: SemanticSearchRequest) -> List[JobMatch]:
         """Enhanced hybrid search combining multiple approaches."""
@@ -1014,10 +1216,8 @@ async def get_semantic_search_service_legacy():
                 self.logger.warning(f"Keyword search failed in hybrid mode: {keyword_matches}")
                 keyword_matches = []
             
-            # Enhanced result combination with weighted scoring
-            combined_matches = await self._enhanced_combine_results(
-                semantic_matches, keyword_matches, request.user_profile
-            )
+            # Fuse the two rankings
+            combined_matches = self._enhanced_combine_results(semantic_matches, keyword_matches)
             
             return combined_matches
             
@@ -1066,43 +1266,32 @@ async def get_semantic_search_service_legacy():
                 }
             )
             
-            matches = []
-            for hit in response["hits"]["hits"]:
-                try:
-                    job_data = hit["_source"]
-                    job = JobPosting(**job_data)
-                    
-                    # Use Elasticsearch score as semantic score
-                    semantic_score = min(hit["_score"] / 10.0, 1.0)  # Normalize
-                    traditional_score = await self._calculate_enhanced_traditional_match(
-                        request.user_profile, job
-                    )
-                    
-                    composite_score = (semantic_score * 0.4) + (traditional_score * 0.6)
-                    
-                    if composite_score >= request.match_threshold:
-                        job_match = JobMatch(
-                            job=job,
-                            semantic_score=semantic_score,
-                            traditional_score=traditional_score,
-                            composite_score=composite_score,
-                            matching_skills=self._find_matching_skills(request.user_profile, job),
-                            skill_gaps=self._find_skill_gaps(request.user_profile, job),
-                            salary_match=self._check_salary_match(request.user_profile, job),
-                            location_match=self._check_location_match(request.user_profile, job)
-                        )
-                        matches.append(job_match)
-                        
-                except Exception as e:
-                    self.logger.warning(f"Failed to process Elasticsearch result: {str(e)}")
-                    continue
-                    
-            return matches
+            hits = response["hits"]["hits"]
+            max_score = response["hits"].get("max_score") or 1.0
+            return self._score_keyword_candidates(
+                request,
+                [hit["_source"] for hit in hits],
+                [min(hit["_score"] / max_score, 1.0) for hit in hits]
+            )
             
         except Exception as e:
             self.logger.error(f"Elasticsearch search failed: {str(e)}")
             raise
 
+    async def _profile_embedding(self, profile: UserProfile) -> List[float]:
+        """Embedding of the enhanced profile text, cached in Redis."""
+        profile_text = self._create_enhanced_profile_text(profile)
+        
+        # Check embedding cache first
+        cache_key = f"embedding:{hash(profile_text)}"
+        cached_embedding = await self._get_cached_embedding(cache_key)
+        if cached_embedding:
+            return cached_embedding
+            
+        profile_embedding = await self.embeddings.aembed_query(profile_text)
+        await self._cache_embedding(cache_key, profile_embedding)
+        return profile_embedding
+
     def _create_enhanced_profile_text(self, profile: UserProfile) -> str:
         """Create enhanced profile text with better structure for embeddings."""
         sections = []
@@ -1161,210 +1350,76 @@ async def get_semantic_search_service_legacy():
         
         return " | ".join(sections)
 
+    def _materialize_matches(
+        self, batch: CandidateBatch, scores: CandidateScores, profile: ProfileFeatures,
+        threshold: float, limit: int
+    ) -> List[JobMatch]:
+        """Build JobMatch objects for the best ``limit`` candidates above ``threshold``."""
+        matches = []
+        for index in rank_candidates(scores.composite, threshold):
+            try:
+                job = JobPosting(**batch.rows[index])
+                matches.append(JobMatch(
+                    job=job,
+                    semantic_score=float(batch.semantic[index]),
+                    traditional_score=float(scores.traditional[index]),
+                    composite_score=float(scores.composite[index]),
+                    matching_skills=profile.matching_skills(job.required_skills, job.preferred_skills),
+                    skill_gaps=profile.skill_gaps(job.required_skills),
+                    salary_match=profile.salary_match(job.salary_max),
+                    location_match=profile.location_match(job.location)
+                ))
+            except Exception as e:
+                self.logger.warning(f"Failed to process job match: {str(e)}")
+                continue
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def _score_job(
+        self, profile: UserProfile, job: JobPosting, semantic_score: float = 0.0
+    ) -> CandidateScores:
+        """Score a single job with the same columnar scorer used for batches."""
+        return score_candidates(
+            CandidateBatch.from_jobs([job], [semantic_score]), ProfileFeatures.from_profile(profile)
+        )
+
     async def _calculate_enhanced_traditional_match(
         self, profile: UserProfile, job: JobPosting
     ) -> float:
-        """Enhanced traditional matching with more sophisticated scoring."""
-        scores = []
-        weights = []
-        
-        # Enhanced skill matching (35% weight)
-        skill_score = await self._calculate_skill_match_score(profile, job)
-        scores.append(skill_score)
-        weights.append(0.35)
-        
-        # Experience matching with level analysis (25% weight)
-        exp_score = self._calculate_experience_match_score(profile, job)
-        scores.append(exp_score)
-        weights.append(0.25)
-        
-        # Location and remote preferences (15% weight)
-        location_score = self._calculate_location_match_score(profile, job)
-        scores.append(location_score)
-        weights.append(0.15)
-        
-        # Salary alignment (15% weight)
-        salary_score = self._calculate_salary_match_score(profile, job)
-        scores.append(salary_score)
-        weights.append(0.15)
-        
-        # Industry and role alignment (10% weight)
-        industry_score = self._calculate_industry_match_score(profile, job)
-        scores.append(industry_score)
-        weights.append(0.10)
-        
-        # Calculate weighted average
-        weighted_score = sum(score * weight for score, weight in zip(scores, weights))
-        return min(weighted_score, 1.0)
+        """Weighted skill, experience, location, salary and industry score."""
+        return float(self._score_job(profile, job).traditional[0])
 
     async def _calculate_skill_match_score(self, profile: UserProfile, job: JobPosting) -> float:
         """Calculate sophisticated skill matching score."""
-        if not profile.skills or not job.required_skills:
-            return 0.0
-        
-        user_skills = set(skill.lower().strip() for skill in profile.skills)
-        required_skills = set(skill.lower().strip() for skill in job.required_skills)
-        preferred_skills = set(skill.lower().strip() for skill in job.preferred_skills)
-        
-        # Exact matches
-        required_matches = user_skills.intersection(required_skills)
-        preferred_matches = user_skills.intersection(preferred_skills)
-        
-        # Calculate scores
-        required_score = len(required_matches) / len(required_skills) if required_skills else 0
-        preferred_score = len(preferred_matches) / len(preferred_skills) if preferred_skills else 0
-        
-        # Weighted combination (required skills are more important)
-        skill_score = (required_score * 0.8) + (preferred_score * 0.2)
-        
-        # Bonus for having more skills than required
-        if len(user_skills) > len(required_skills):
-            bonus = min(0.1, (len(user_skills) - len(required_skills)) * 0.02)
-            skill_score += bonus
-        
-        return min(skill_score, 1.0)
+        return float(self._score_job(profile, job).skill[0])
 
     def _calculate_experience_match_score(self, profile: UserProfile, job: JobPosting) -> float:
         """Calculate experience matching score with level analysis."""
-        if not hasattr(profile, 'years_experience') or not job.experience_level:
-            return 0.5  # Neutral score if data is missing
-        
-        # Experience level mapping
-        level_years = {
-            'entry': 0, 'junior': 1, 'associate': 2, 'mid': 3, 'senior': 5, 
-            'lead': 7, 'principal': 10, 'director': 12, 'vp': 15, 'executive': 20
-        }
-        
-        required_years = level_years.get(job.experience_level.lower(), 3)
-        user_years = getattr(profile, 'years_experience', 0)
-        
-        if user_years >= required_years:
-            # Perfect match or overqualified
-            if user_years <= required_years * 1.5:
-                return 1.0  # Perfect range
-            else:
-                # Slightly penalize overqualification
-                return max(0.8, 1.0 - (user_years - required_years * 1.5) * 0.05)
-        else:
-            # Underqualified but may still be viable
-            ratio = user_years / required_years if required_years > 0 else 0
-            return max(0.2, ratio * 0.8)
+        return float(self._score_job(profile, job).experience[0])
 
     def _calculate_location_match_score(self, profile: UserProfile, job: JobPosting) -> float:
         """Calculate location and remote work matching score."""
-        if not profile.preferred_locations and not hasattr(profile, 'remote_preferences'):
-            return 0.5  # Neutral if no preferences specified
-        
-        score = 0.0
-        
-        # Check location match
-        if profile.preferred_locations and job.location:
-            location_match = any(
-                loc.lower() in job.location.lower() 
-                for loc in profile.preferred_locations
-            )
-            if location_match:
-                score += 0.6
-        
-        # Check remote work preferences
-        if hasattr(profile, 'remote_preferences') and job.remote_type:
-            remote_prefs = getattr(profile, 'remote_preferences', [])
-            if job.remote_type.lower() in [pref.lower() for pref in remote_prefs]:
-                score += 0.4
-        
-        return min(score, 1.0)
+        return float(self._score_job(profile, job).location[0])
 
     def _calculate_salary_match_score(self, profile: UserProfile, job: JobPosting) -> float:
         """Calculate salary matching score with range analysis."""
-        if not profile.salary_expectation_min or not job.salary_max:
-            return 0.5  # Neutral if salary info is missing
-        
-        # Check if job meets minimum expectations
-        if job.salary_max < profile.salary_expectation_min:
-            return 0.0  # Below minimum expectations
-        
-        # Calculate how well the salary range aligns
-        if profile.salary_expectation_max:
-            profile_mid = (profile.salary_expectation_min + profile.salary_expectation_max) / 2
-            
-            if job.salary_min:
-                job_mid = (job.salary_min + job.salary_max) / 2
-                
-                # Perfect match if job midpoint is within 10% of profile midpoint
-                diff_ratio = abs(job_mid - profile_mid) / profile_mid
-                if diff_ratio <= 0.1:
-                    return 1.0
-                elif diff_ratio <= 0.2:
-                    return 0.8
-                elif diff_ratio <= 0.3:
-                    return 0.6
-                else:
-                    return 0.4
-            else:
-                # Only max salary available
-                if job.salary_max >= profile_mid:
-                    return 0.8
-                else:
-                    return 0.6
-        else:
-            # Only minimum expectation available
-            if job.salary_max >= profile.salary_expectation_min * 1.2:
-                return 0.8
-            else:
-                return 0.6
+        return float(self._score_job(profile, job).salary[0])
 
     def _calculate_industry_match_score(self, profile: UserProfile, job: JobPosting) -> float:
         """Calculate industry and role alignment score."""
-        score = 0.0
-        
-        # Industry match
-        if hasattr(profile, 'industry_preferences') and job.industry:
-            industry_prefs = getattr(profile, 'industry_preferences', [])
-            if any(ind.lower() in job.industry.lower() for ind in industry_prefs):
-                score += 0.5
-        
-        # Role/title match
-        if hasattr(profile, 'preferred_roles') and job.title:
-            role_prefs = getattr(profile, 'preferred_roles', [])
-            if any(role.lower() in job.title.lower() for role in role_prefs):
-                score += 0.5
-        
-        return min(score, 1.0)
+        return float(self._score_job(profile, job).industry[0])
 
     async def _calculate_advanced_composite_score(
         self, semantic_score: float, traditional_score: float, 
         profile: UserProfile, job: JobPosting
     ) -> float:
         """Calculate advanced composite score with dynamic weighting."""
-        
-        # Base weighted score
-        base_score = (semantic_score * 0.6) + (traditional_score * 0.4)
-        
-        # Apply dynamic adjustments based on job characteristics
-        adjustments = 0.0
-        
-        # Boost for high-demand skills
-        high_demand_skills = {'python', 'javascript', 'react', 'aws', 'kubernetes', 'machine learning'}
-        user_skills = set(skill.lower() for skill in profile.skills)
-        job_skills = set(skill.lower() for skill in job.required_skills)
-        
-        high_demand_matches = user_skills.intersection(job_skills).intersection(high_demand_skills)
-        if high_demand_matches:
-            adjustments += len(high_demand_matches) * 0.02
-        
-        # Boost for recent job postings
-        if hasattr(job, 'posted_date') and job.posted_date:
-            from datetime import datetime, timedelta
-            if job.posted_date > datetime.now() - timedelta(days=7):
-                adjustments += 0.05
-        
-        # Penalty for significant skill gaps in required skills
-        skill_gaps = self._find_skill_gaps(profile, job)
-        if len(skill_gaps) > 3:
-            adjustments -= 0.1
-        
-        final_score = base_score + adjustments
-        return max(0.0, min(1.0, final_score))
+        batch = CandidateBatch.from_jobs([job], [semantic_score])
+        composite = composite_scores(
+            batch, ProfileFeatures.from_profile(profile), np.array([traditional_score])
+        )
+        return float(composite[0])
 
     async def _apply_advanced_filters(
         self, matches: List[JobMatch], filters: SearchFilters
@@ -1373,40 +1428,34 @@ async def get_semantic_search_service_legacy():
         if not filters:
             return matches
         
-        filtered_matches = []
+        return [match for match in matches if self._passes_filters(filters, match.job)]
+
+    def _passes_filters(self, filters: SearchFilters, job: JobPosting) -> bool:
+        """Check one job against the advanced filters."""
+        # Advanced location filtering with fuzzy matching
+        if filters.locations:
+            location_match = False
+            if job.location:
+                for filter_loc in filters.locations:
+                    # Exact match
+                    if filter_loc.lower() in job.location.lower():
+                        location_match = True
+                        break
+                    # Fuzzy match for cities/states
+                    if self._fuzzy_location_match(filter_loc, job.location):
+                        location_match = True
+                        break
+            
+            if not location_match:
+                return False
         
-        for match in matches:
-            job = match.job
-            
-            # Advanced location filtering with fuzzy matching
-            if filters.locations:
-                location_match = False
-                if job.location:
-                    for filter_loc in filters.locations:
-                        # Exact match
-                        if filter_loc.lower() in job.location.lower():
-                            location_match = True
-                            break
-                        # Fuzzy match for cities/states
-                        if self._fuzzy_location_match(filter_loc, job.location):
-                            location_match = True
-                            break
-                
-                if not location_match:
-                    continue
-            
-            # Advanced salary filtering with range overlap
-            if filters.salary_min or filters.salary_max:
-                if not self._salary_range_overlap(filters, job):
-                    continue
-            
-            # Other filters (employment type, experience, etc.)
-            if not self._apply_standard_filters(filters, job):
-                continue
-            
-            filtered_matches.append(match)
+        # Advanced salary filtering with range overlap
+        if filters.salary_min or filters.salary_max:
+            if not self._salary_range_overlap(filters, job):
+                return False
         
-        return filtered_matches
+        # Other filters (employment type, experience, etc.)
+        return self._apply_standard_filters(filters, job)
 
     def _fuzzy_location_match(self, filter_location: str, job_location: str) -> bool:
         """Perform fuzzy location matching."""
@@ -1453,49 +1502,30 @@ async def get_semantic_search_service_legacy():
         
         return True
 
-    async def _enhanced_combine_results(
-        self, semantic_matches: List[JobMatch], keyword_matches: List[JobMatch],
-        profile: UserProfile
+    def _enhanced_combine_results(
+        self, semantic_matches: List[JobMatch], keyword_matches: List[JobMatch]
     ) -> List[JobMatch]:
-        """Enhanced result combination with intelligent merging."""
-        combined = {}
-        
-        # Add semantic matches with higher weight
-        for match in semantic_matches:
-            match.metadata = {"source": "semantic", "weight": 0.7}
-            combined[match.job.id] = match
-        
-        # Add keyword matches, merging if job already exists
-        for match in keyword_matches:
-            if match.job.id in combined:
-                existing = combined[match.job.id]
-                
-                # Weighted average based on source reliability
-                semantic_weight = 0.7
-                keyword_weight = 0.3
-                
-                existing.semantic_score = (
-                    existing.semantic_score * semantic_weight + 
-                    match.semantic_score * keyword_weight
-                )
-                existing.traditional_score = (
-                    existing.traditional_score * semantic_weight + 
-                    match.traditional_score * keyword_weight
-                )
-                
-                # Recalculate composite score
-                existing.composite_score = await self._calculate_advanced_composite_score(
-                    existing.semantic_score, existing.traditional_score, profile, existing.job
-                )
-                
-                existing.metadata = {"source": "hybrid", "weight": 1.0}
-            else:
-                match.metadata = {"source": "keyword", "weight": 0.3}
-                combined[match.job.id] = match
-        
-        return list(combined.values())
+        """Fuse semantic and keyword rankings with reciprocal rank fusion.
 
-    async def _generate_match_explanation(
+        Each list adds ``1 / (k + rank)`` for every job it ranks, so the legs
+        are combined by position and neither score scale has to be mapped
+        onto the other. A job found by both keeps its semantic match.
+        """
+        rrf_k = self.settings.ai.hybrid_rrf_k
+        combined: Dict[str, JobMatch] = {}
+        
+        for source, matches in (("semantic", semantic_matches), ("keyword", keyword_matches)):
+            for rank, match in enumerate(matches, start=1):
+                fused = combined.setdefault(match.job.id, match)
+                fused.metadata[f"{source}_rank"] = rank
+                fused.metadata["rrf_score"] = fused.metadata.get("rrf_score", 0.0) + 1.0 / (rrf_k + rank)
+                fused.metadata["sources"] = fused.metadata.get("sources", []) + [source]
+                if source == "keyword":
+                    fused.metadata["keyword_score"] = match.semantic_score
+        
+        return sorted(combined.values(), key=lambda match: match.metadata["rrf_score"], reverse=True)
+
+    async def _generate_enhanced_match_explanation(
         self, match: JobMatch, profile: UserProfile
     ) -> Dict[str, Any]:
         """Generate detailed match explanation with insights."""
@@ -1631,13 +1661,49 @@ async def get_semantic_search_service_legacy():
         
         return es_filters
 
-    async def _fallback_keyword_search(self, request: SemanticSearchRequest) -> List[JobMatch]:
-        """Fallback keyword search when Elasticsearch is not available."""
-        self.logger.info("Using fallback keyword search")
+    async def _local_keyword_search(self, request: SemanticSearchRequest) -> List[JobMatch]:
+        """Keyword search against the in-process BM25 index."""
+        self._refresh_keyword_index()
+        
+        profile = request.user_profile
+        query = profile_query(profile.skills, profile.preferred_roles, profile.industry_preferences)
+        
+        def accept(row: Dict[str, Any]) -> bool:
+            return self._passes_filters(request.filters, JobPosting.model_construct(**row))
+        
+        # Filter inside the search so rejected jobs never take a place in the top k
+        hits = self.keyword_index.search(
+            query, min(request.top_k * 3, 200), accept=accept if request.filters else None
+        )
+        
+        return self._score_keyword_candidates(
+            request, [hit.payload for hit in hits], [hit.calibrated for hit in hits]
+        )
+
+    def _score_keyword_candidates(
+        self,
+        request: SemanticSearchRequest,
+        rows: List[Dict[str, Any]],
+        keyword_scores: List[float]
+    ) -> List[JobMatch]:
+        """Score keyword hits like vector candidates, with the keyword score as the similarity."""
+        profile = ProfileFeatures.from_profile(request.user_profile)
+        batch = CandidateBatch(rows, keyword_scores)
         
-        # This would typically query your job database
-        # For now, return empty list as placeholder
-        return []
+        return self._materialize_matches(
+            batch, score_candidates(batch, profile), profile, request.match_threshold, request.top_k
+        )
+
+
+# Global service instance (legacy - kept for compatibility)
+semantic_search_service = None
+
+
+async def get_semantic_search_service_legacy():
+    """Get the legacy semantic search service instance."""
+    # This is kept for backward compatibility
+    # Use get_semantic_search_service with dependencies instead
+    pass
 
 
 # Update the global service instance to use the enhanced version
@@ -1647,8 +1713,29 @@ async def get_semantic_search_service(dependencies: ServiceDependencies = None)
     """Get the enhanced semantic search service instance."""
     global enhanced_semantic_search_service
     
-    if enhanced_semantic_search_service is None and dependencies:
+    if enhanced_semantic_search_service is None:
+        if dependencies is None:
+            dependencies = ServiceDependencies(
+                db_session=None,
+                redis_client=await get_redis_client(),
+                openai_client=await get_openai_client(),
+                logger=get_logger(__name__).bind(service="semantic-search"),
+                settings=get_settings()
+            )
         enhanced_semantic_search_service = EnhancedSemanticSearchService(dependencies)
         await enhanced_semantic_search_service.initialize()
     
-    return enhanced_semantic_search_service
\ No newline at end of file
+    return enhanced_semantic_search_service
+
+
+async def warm_search_results(args: Dict[str, Any]) -> None:
+    """Cache warming loader: recompute and cache the results of a logged search."""
+    service = await get_semantic_search_service()
+    await service.search_jobs(SemanticSearchRequest(**args), refresh=True)
+
+
+async def release_semantic_search_service() -> None:
+    """Drop the service instance so the next use builds it with fresh clients."""
+    global enhanced_semantic_search_service
+    
+    enhanced_semantic_search_service = None
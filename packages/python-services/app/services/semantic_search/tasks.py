@@ -1,16 +1,24 @@
 """Background tasks for semantic search service."""
 
 import asyncio
+import json
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.celery import celery_app
+from app.core.database import get_async_session
 from app.core.logging import get_logger
-from .service import get_semantic_search_service
+from app.core.subsystems import lazy_subsystem
 from .models import JobPosting, UserProfile, EmbeddingRequest, BatchEmbeddingRequest
 
 logger = get_logger(__name__)
 
+# Imported on first use so workers not serving search skip scikit-learn/Pinecone
+get_semantic_search_service = lazy_subsystem("semantic_search")
+
 
 def run_async_task(coro):
     """Helper to run async tasks in Celery."""
@@ -68,6 +76,10 @@ def update_job_embeddings_task(self, job_data_list: List[Dict[str, Any]]) -> Dic
                     failed_count += 1
                     continue
             
+            # Publish the keyword index updates to the search processes
+            if processed_count:
+                service.save_keyword_index()
+            
             return processed_count, failed_count
         
         processed_count, failed_count = run_async_task(process_jobs())
@@ -94,9 +106,93 @@ def update_job_embeddings_task(self, job_data_list: List[Dict[str, Any]]) -> Dic
         self.retry(countdown=300, max_retries=3)
 
 
+ACTIVE_JOBS_QUERY = text("""
+    SELECT id, title, company, description, location, salary_min, salary_max,
+           job_type, industry, remote_type, required_skills, preferred_skills,
+           posted_date, company_size, benefits
+    FROM jobs
+    WHERE status = 'active' AND deleted_at IS NULL AND (:after_id IS NULL OR id > :after_id)
+    ORDER BY id
+    LIMIT :batch_size
+""")
+
+
+def _as_list(value: Any) -> List[str]:
+    # Arrays come back as lists from PostgreSQL and as JSON text elsewhere
+    if isinstance(value, str):
+        return json.loads(value) if value else []
+    return list(value or [])
+
+
+async def load_active_jobs(session: AsyncSession, batch_size: int = 1000) -> List[JobPosting]:
+    """Every active, undeleted job posting, read in id order."""
+    jobs = []
+    after_id = None
+    while True:
+        rows = (await session.execute(
+            ACTIVE_JOBS_QUERY, {"after_id": after_id, "batch_size": batch_size}
+        )).fetchall()
+        for row in rows:
+            try:
+                jobs.append(JobPosting(
+                    id=str(row.id),
+                    title=row.title,
+                    company=row.company,
+                    description=row.description,
+                    location=row.location,
+                    salary_min=row.salary_min,
+                    salary_max=row.salary_max,
+                    employment_type=row.job_type,
+                    industry=row.industry,
+                    remote_type=row.remote_type,
+                    required_skills=_as_list(row.required_skills),
+                    preferred_skills=_as_list(row.preferred_skills),
+                    posted_date=row.posted_date,
+                    company_size=row.company_size,
+                    benefits=_as_list(row.benefits)
+                ))
+            except Exception as e:
+                logger.warning(f"Skipping invalid job {row.id}: {str(e)}")
+        if len(rows) < batch_size:
+            return jobs
+        after_id = rows[-1].id
+
+
+@celery_app.task(bind=True, name="semantic_search.sync_keyword_index")
+def sync_keyword_index_task(self) -> Dict[str, Any]:
+    """Periodic task reconciling the keyword index with the active jobs.
+    
+    Builds the index from existing jobs on first run and drops jobs that
+    were closed or deleted since.
+    """
+    try:
+        logger.info("Starting keyword index sync task")
+        start_time = time.time()
+        
+        async def sync_index():
+            async with get_async_session() as session:
+                jobs = await load_active_jobs(session)
+            service = await get_semantic_search_service()
+            return service.sync_keyword_index(jobs)
+        
+        stats = run_async_task(sync_index())
+        result = {"status": "completed", **stats, "processing_time": time.time() - start_time}
+        
+        logger.info("Keyword index sync completed", **result)
+        return result
+        
+    except Exception as e:
+        logger.error("Keyword index sync failed", error=str(e), exc_info=True)
+        self.retry(countdown=600, max_retries=2)
+
+
 @celery_app.task(bind=True, name="semantic_search.generate_user_embedding")
 def generate_user_embedding_task(self, user_profile_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Background task to generate user profile embedding."""
+    """Background task to generate user profile embedding.
+    
+    A profile that changed since it was last stored also gets its
+    recommendation list rebuilt and is stored for reverse matching.
+    """
     try:
         logger.info("Starting user embedding generation task", 
                    user_id=user_profile_data.get("id"))
@@ -119,10 +215,11 @@ def generate_user_embedding_task(self, user_profile_data: Dict[str, Any]) -> Dic
             )
             
             embedding_response = await service.generate_embedding(embedding_request)
+            refresh = await service.refresh_recommendations([user_profile])
             
-            return embedding_response.embedding, embedding_response.processing_time
+            return embedding_response.embedding, embedding_response.processing_time, refresh
         
-        embedding_vector, generation_time = run_async_task(process_user())
+        embedding_vector, generation_time, refresh = run_async_task(process_user())
         total_time = time.time() - start_time
         
         result = {
@@ -130,6 +227,7 @@ def generate_user_embedding_task(self, user_profile_data: Dict[str, Any]) -> Dic
             "user_id": user_profile_data.get("id"),
             "embedding_dimension": len(embedding_vector),
             "generation_time": generation_time,
+            "recommendations_refreshed": bool(refresh["refreshed"]),
             "total_time": total_time
         }
         
@@ -144,70 +242,54 @@ def generate_user_embedding_task(self, user_profile_data: Dict[str, Any]) -> Dic
 
 
 @celery_app.task(bind=True, name="semantic_search.batch_job_matching")
-def batch_job_matching_task(self, user_profiles_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Background task for batch job matching."""
+def batch_job_matching_task(self, user_profiles_data: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Background task keeping users' recommendation lists current.
+    
+    Profiles passed in are searched in full only if they changed since they
+    were last stored; jobs added or changed since the previous run are then
+    reverse matched against every stored profile.
+    """
     try:
+        user_profiles_data = user_profiles_data or []
         logger.info("Starting batch job matching task", user_count=len(user_profiles_data))
         start_time = time.time()
         
         async def process_batch_matching():
             service = await get_semantic_search_service()
-            processed_users = 0
-            total_matches = 0
-            failed_users = 0
             
+            profiles = []
+            invalid_users = 0
             for user_data in user_profiles_data:
                 try:
-                    user_profile = UserProfile(**user_data)
-                    
-                    # Create search request
-                    from .models import SemanticSearchRequest, SearchType
-                    search_request = SemanticSearchRequest(
-                        user_profile=user_profile,
-                        search_type=SearchType.HYBRID,
-                        top_k=20,
-                        include_explanation=False,
-                        match_threshold=0.6
-                    )
-                    
-                    # Perform search
-                    results = await service.search_jobs(search_request)
-                    
-                    processed_users += 1
-                    total_matches += len(results.matches)
-                    
-                    # Here you would typically store the matches in your database
-                    # For now, we just log the results
-                    logger.info(
-                        "Generated matches for user",
-                        user_id=user_profile.id,
-                        match_count=len(results.matches)
-                    )
-                    
+                    profiles.append(UserProfile(**user_data))
                 except Exception as e:
                     logger.warning(f"Failed to process user {user_data.get('id', 'unknown')}: {str(e)}")
-                    failed_users += 1
-                    continue
+                    invalid_users += 1
             
-            return processed_users, total_matches, failed_users
+            refresh = await service.refresh_recommendations(profiles)
+            reverse = await service.reverse_match_jobs()
+            return refresh, reverse, invalid_users
         
-        processed_users, total_matches, failed_users = run_async_task(process_batch_matching())
+        refresh, reverse, invalid_users = run_async_task(process_batch_matching())
         processing_time = time.time() - start_time
         
         result = {
             "status": "completed",
-            "users_processed": processed_users,
-            "users_failed": failed_users,
-            "matches_generated": total_matches,
-            "average_matches_per_user": total_matches / processed_users if processed_users > 0 else 0,
+            "users_refreshed": len(refresh["refreshed"]),
+            "users_unchanged": refresh["unchanged"],
+            "users_failed": len(refresh["failed"]) + invalid_users,
+            "jobs_matched": reverse["jobs_matched"],
+            "users_scored": reverse["users_scored"],
+            "lists_updated": reverse["lists_updated"],
             "processing_time": processing_time
         }
         
         logger.info(
             "Batch job matching completed",
-            users_processed=processed_users,
-            users_failed=failed_users,
-            total_matches=total_matches,
+            users_refreshed=result["users_refreshed"],
+            users_failed=result["users_failed"],
+            jobs_matched=result["jobs_matched"],
+            users_scored=result["users_scored"],
             processing_time=processing_time
         )
         return result
@@ -315,4 +397,19 @@ def refresh_vector_index_task(self) -> Dict[str, Any]:
         
     except Exception as e:
         logger.error("Vector index refresh failed", error=str(e), exc_info=True)
-        self.retry(countdown=600, max_retries=2)  # Longer retry interval for index operations
\ No newline at end of file
+        self.retry(countdown=600, max_retries=2)  # Longer retry interval for index operations
+
+
+@celery_app.task(bind=True, name="semantic_search.warm_search_cache")
+def warm_search_cache_task(self) -> Dict[str, Any]:
+    """Periodic task to recompute the cached searches predicted to be read next."""
+    from app.core.cache_warming import warm_predicted_caches
+    
+    try:
+        stats = run_async_task(warm_predicted_caches(["semantic_search"]))
+        logger.info("Search cache warming completed", **stats)
+        return stats
+        
+    except Exception as e:
+        logger.error("Search cache warming failed", error=str(e), exc_info=True)
+        return {"status": "failed", "error": str(e)}
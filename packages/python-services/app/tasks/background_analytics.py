@@ -1,26 +1,42 @@
 """Background analytics tasks for user analytics, skill scores, and data cleanup."""
 
 import asyncio
+import statistics
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 
-import pandas as pd
-import numpy as np
+import redis.asyncio as redis
 import structlog
 from celery import Task
 from celery.exceptions import MaxRetriesExceededError
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.activity_counters import ActivityCounters
 from app.core.celery import celery_app
 from app.core.config import get_settings
 from app.core.database import get_async_session
 from app.core.logging import get_logger
+from app.core.partitioning import PartitionManager
+from app.services.analytics.application_changes import ApplicationChangeLog
+from app.services.analytics.application_feed import ApplicationFeed
+from app.services.analytics.platform_stats import PlatformStatistics
 
 settings = get_settings()
 logger = get_logger(__name__)
 
+USER_ANALYTICS_JOB = "user_analytics"
+ANALYTICS_REFRESH_CHECKPOINTS = "analytics_refresh_checkpoints"
+# Rates cover applications created within this window
+USER_ANALYTICS_WINDOW = timedelta(days=30)
+# A running refresh that has not checkpointed for this long is taken over
+ANALYTICS_REFRESH_STALE_AFTER = timedelta(minutes=10)
+
+RESPONSE_STATUSES = "'interview_scheduled', 'offer_received', 'accepted'"
+INTERVIEW_STATUSES = "'interview_scheduled', 'interview_completed', 'offer_received', 'accepted'"
+OFFER_STATUSES = "'offer_received', 'accepted'"
+
 
 class BaseAnalyticsTask(Task):
     """Base task class for analytics processing."""
@@ -33,13 +49,12 @@ class BaseAnalyticsTask(Task):
 
 
 @celery_app.task(bind=True, base=BaseAnalyticsTask, name="app.tasks.background_analytics.calculate_user_analytics_batch")
-def calculate_user_analytics_batch(self, batch_size: int = 100, offset: int = 0) -> Dict[str, Any]:
+def calculate_user_analytics_batch(self, batch_size: int = 500) -> Dict[str, Any]:
     """
-    Calculate analytics for a batch of users.
+    Refresh analytics for users with application activity since the last run.
     
     Args:
-        batch_size: Number of users to process in this batch
-        offset: Offset for pagination
+        batch_size: Number of users refreshed per chunk
         
     Returns:
         Dict containing processing results and statistics
@@ -50,8 +65,7 @@ def calculate_user_analytics_batch(self, batch_size: int = 100, offset: int = 0)
     logger.info(
         "Starting user analytics batch calculation",
         task_id=task_id,
-        batch_size=batch_size,
-        offset=offset
+        batch_size=batch_size
     )
     
     try:
@@ -61,7 +75,7 @@ def calculate_user_analytics_batch(self, batch_size: int = 100, offset: int = 0)
         
         try:
             result = loop.run_until_complete(
-                _calculate_user_analytics_batch_async(task_id, batch_size, offset)
+                _calculate_user_analytics_batch_async(task_id, batch_size)
             )
         finally:
             loop.close()
@@ -286,6 +300,109 @@ def cleanup_expired_data(self, days_to_keep: int = 90) -> Dict[str, Any]:
         raise
 
 
+@celery_app.task(bind=True, name="app.tasks.background_analytics.maintain_partitions")
+def maintain_partitions(self) -> Dict[str, Any]:
+    """
+    Create upcoming monthly partitions and retire expired ones.
+    
+    Retention of the partitioned append-only tables happens here, a whole
+    partition at a time, instead of through row deletes in the cleanup task.
+    
+    Returns:
+        Dict containing the partitions created and retired per table
+    """
+    start_time = time.time()
+    task_id = self.request.id
+    
+    logger.info("Starting partition maintenance", task_id=task_id)
+    
+    try:
+        # Run async function in event loop
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        
+        try:
+            result = loop.run_until_complete(PartitionManager().maintain())
+        finally:
+            loop.close()
+        
+        execution_time = time.time() - start_time
+        
+        logger.info(
+            "Partition maintenance completed",
+            task_id=task_id,
+            execution_time=execution_time,
+            tables=list(result)
+        )
+        
+        return {
+            "tables": result,
+            "execution_time": execution_time,
+            "task_id": task_id
+        }
+        
+    except Exception as exc:
+        logger.error(
+            "Partition maintenance failed",
+            task_id=task_id,
+            error=str(exc)
+        )
+        raise
+
+
+@celery_app.task(bind=True, base=BaseAnalyticsTask, name="app.tasks.background_analytics.feed_platform_statistics")
+def feed_platform_statistics(self, full: bool = False, batch_size: int = 500) -> Dict[str, Any]:
+    """
+    Fold new and changed applications into the platform statistics, the
+    application submission rate and the cached application frame versions.
+    
+    Args:
+        full: Reread every application; a one-off backfill, since rows
+            already counted are not counted again
+        batch_size: Number of applications read per query
+        
+    Returns:
+        Dict containing the applications and status changes counted
+    """
+    start_time = time.time()
+    task_id = self.request.id
+    
+    logger.info("Starting platform statistics feed", task_id=task_id, full=full)
+    
+    try:
+        # Run async function in event loop
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        
+        try:
+            result = loop.run_until_complete(_feed_platform_statistics_async(full, batch_size))
+        finally:
+            loop.close()
+        
+        execution_time = time.time() - start_time
+        
+        logger.info(
+            "Platform statistics feed completed",
+            task_id=task_id,
+            execution_time=execution_time,
+            **result
+        )
+        
+        return {
+            **result,
+            "execution_time": execution_time,
+            "task_id": task_id
+        }
+        
+    except Exception as exc:
+        logger.error(
+            "Platform statistics feed failed",
+            task_id=task_id,
+            error=str(exc)
+        )
+        raise
+
+
 @celery_app.task(bind=True, name="app.tasks.background_analytics.archive_old_jobs")
 def archive_old_jobs(self, days_to_keep: int = 30) -> Dict[str, Any]:
     """
@@ -344,46 +461,76 @@ def archive_old_jobs(self, days_to_keep: int = 30) -> Dict[str, Any]:
 
 # Async helper functions
 
-async def _calculate_user_analytics_batch_async(task_id: str, batch_size: int, offset: int) -> Dict[str, Any]:
-    """Async implementation of user analytics batch calculation."""
+async def _calculate_user_analytics_batch_async(task_id: str, batch_size: int) -> Dict[str, Any]:
+    """
+    Async implementation of user analytics batch calculation.
+    
+    A run refreshes the users whose applications changed, or aged out of the
+    analytics window, since the previous run's watermark (every active user
+    on the first run). Users are visited in id order, ``batch_size`` at a
+    time, and each chunk is a single ``INSERT ... SELECT ... ON CONFLICT``
+    committed together with the run's checkpoint, so an interrupted run
+    resumes after its last chunk and overlapping runs are skipped.
+    """
     users_processed = 0
-    analytics_updated = 0
-    errors = []
+    chunks = 0
     
     async with get_async_session() as session:
-        # Get batch of users
-        users_query = text("""
-            SELECT id, email, created_at, last_login_at
-            FROM users 
-            WHERE active = true
-            ORDER BY id
-            LIMIT :batch_size OFFSET :offset
-        """)
-        
-        result = await session.execute(users_query, {"batch_size": batch_size, "offset": offset})
-        users = result.fetchall()
-        
-        for user in users:
-            try:
-                # Calculate analytics for this user
-                analytics_data = await _calculate_user_analytics(session, user.id)
-                
-                # Update or insert analytics record
-                await _upsert_user_analytics(session, user.id, analytics_data)
-                
-                analytics_updated += 1
-            except Exception as e:
-                errors.append(f"Error processing user {user.id}: {str(e)}")
+        run = await _claim_analytics_refresh(session, task_id)
+        if run is None:
+            logger.info("User analytics refresh already running, skipping", task_id=task_id)
+            return {
+                "users_processed": 0,
+                "analytics_updated": 0,
+                "errors": [],
+                "error_count": 0,
+                "skipped": True
+            }
+        
+        dialect = session.get_bind().dialect.name
+        after = run["last_user_id"]
+        while True:
+            statement = _user_analytics_refresh_statement(
+                dialect, incremental=run["since"] is not None, resume=after is not None
+            )
+            params = {
+                "since": run["since"],
+                "until": run["until"],
+                "window_start": run["until"] - USER_ANALYTICS_WINDOW,
+                "after": after,
+                "batch_size": batch_size,
+                "calculated_at": datetime.utcnow(),
+            }
+            if run["since"] is not None:
+                params["expired_since"] = run["since"] - USER_ANALYTICS_WINDOW
             
-            users_processed += 1
+            refreshed = [str(row[0]) for row in (await session.execute(statement, params)).fetchall()]
+            if not refreshed:
+                break
+            
+            after = max(refreshed)
+            if not await _checkpoint_analytics_refresh(session, task_id, after, len(refreshed)):
+                # Another run took over this one after it went stale
+                await session.rollback()
+                logger.warning("User analytics refresh lost its checkpoint", task_id=task_id)
+                break
+            await session.commit()
+            
+            users_processed += len(refreshed)
+            chunks += 1
+            if len(refreshed) < batch_size:
+                break
         
+        await _complete_analytics_refresh(session, task_id)
         await session.commit()
     
     return {
         "users_processed": users_processed,
-        "analytics_updated": analytics_updated,
-        "errors": errors,
-        "error_count": len(errors)
+        "analytics_updated": users_processed,
+        "chunks": chunks,
+        "errors": [],
+        "error_count": 0,
+        "skipped": False
     }
 
 
@@ -593,6 +740,30 @@ async def _archive_old_jobs_async(task_id: str, days_to_keep: int) -> Dict[str,
 
 # Helper functions for analytics calculations
 
+async def _feed_platform_statistics_async(full: bool, batch_size: int) -> Dict[str, Any]:
+    """Run the application feed against the shared database and Redis."""
+    redis_client = redis.from_url(settings.redis.url)
+    try:
+        feed = ApplicationFeed(
+            redis_client,
+            PlatformStatistics(redis_client),
+            ActivityCounters(redis_client),
+            ApplicationChangeLog(redis_client),
+            batch_size=batch_size
+        )
+        async with get_async_session() as session:
+            run = await feed.run(session, full=full)
+    finally:
+        await redis_client.aclose()
+    
+    return {
+        "rows_read": run.rows_read,
+        "applications_added": run.applications_added,
+        "status_changes": run.status_changes,
+        "skipped": run.locked
+    }
+
+
 async def _calculate_user_analytics(session: AsyncSession, user_id: str) -> Dict[str, Any]:
     """Calculate comprehensive analytics for a user."""
     # Get user's application data
@@ -633,7 +804,7 @@ async def _calculate_user_analytics(session: AsyncSession, user_id: str) -> Dict
             response_time = (app.updated_at - app.created_at).total_seconds() / 86400  # days
             response_times.append(response_time)
     
-    avg_response_time = np.mean(response_times) if response_times else 0
+    avg_response_time = statistics.fmean(response_times) if response_times else 0
     
     return {
         "total_applications": total_apps,
@@ -644,16 +815,153 @@ async def _calculate_user_analytics(session: AsyncSession, user_id: str) -> Dict
     }
 
 
-async def _upsert_user_analytics(session: AsyncSession, user_id: str, analytics_data: Dict[str, Any]) -> None:
-    """Insert or update user analytics record."""
-    upsert_query = text("""
+async def _claim_analytics_refresh(session: AsyncSession, run_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Take ownership of the user analytics refresh.
+    
+    A completed checkpoint starts a new run from its watermark; a running one
+    is resumed only once it has not advanced for ``ANALYTICS_REFRESH_STALE_AFTER``.
+    Returns None while another run is active.
+    """
+    now = datetime.utcnow()
+    await session.execute(text(f"""
+        INSERT INTO {ANALYTICS_REFRESH_CHECKPOINTS} (job_name, run_id, status, updated_at)
+        VALUES (:job_name, :run_id, 'completed', :stale)
+        ON CONFLICT (job_name) DO NOTHING
+    """), {"job_name": USER_ANALYTICS_JOB, "run_id": run_id, "stale": now - ANALYTICS_REFRESH_STALE_AFTER})
+    
+    # A finished run's watermark becomes the lower bound of the next one
+    claimed = await session.execute(text(f"""
+        UPDATE {ANALYTICS_REFRESH_CHECKPOINTS} SET
+            since_watermark = CASE WHEN status = 'completed' THEN until_watermark ELSE since_watermark END,
+            until_watermark = CASE WHEN status = 'completed' THEN :now ELSE until_watermark END,
+            last_user_id = CASE WHEN status = 'completed' THEN NULL ELSE last_user_id END,
+            users_refreshed = CASE WHEN status = 'completed' THEN 0 ELSE users_refreshed END,
+            run_id = :run_id,
+            status = 'running',
+            updated_at = :now
+        WHERE job_name = :job_name
+        AND (status = 'completed' OR updated_at < :stale)
+    """), {
+        "job_name": USER_ANALYTICS_JOB,
+        "run_id": run_id,
+        "now": now,
+        "stale": now - ANALYTICS_REFRESH_STALE_AFTER,
+    })
+    if claimed.rowcount != 1:
+        await session.rollback()
+        return None
+    
+    row = (await session.execute(text(f"""
+        SELECT since_watermark, until_watermark, last_user_id
+        FROM {ANALYTICS_REFRESH_CHECKPOINTS}
+        WHERE job_name = :job_name
+    """), {"job_name": USER_ANALYTICS_JOB})).one()
+    await session.commit()
+    return {
+        "since": _as_datetime(row.since_watermark),
+        "until": _as_datetime(row.until_watermark),
+        "last_user_id": row.last_user_id,
+    }
+
+
+async def _checkpoint_analytics_refresh(session: AsyncSession, run_id: str, last_user_id: str, refreshed: int) -> bool:
+    """Record a chunk's progress; False if the run no longer owns the checkpoint."""
+    result = await session.execute(text(f"""
+        UPDATE {ANALYTICS_REFRESH_CHECKPOINTS} SET
+            last_user_id = :last_user_id,
+            users_refreshed = users_refreshed + :refreshed,
+            updated_at = :now
+        WHERE job_name = :job_name AND run_id = :run_id
+    """), {
+        "job_name": USER_ANALYTICS_JOB,
+        "run_id": run_id,
+        "last_user_id": last_user_id,
+        "refreshed": refreshed,
+        "now": datetime.utcnow(),
+    })
+    return result.rowcount == 1
+
+
+async def _complete_analytics_refresh(session: AsyncSession, run_id: str) -> None:
+    await session.execute(text(f"""
+        UPDATE {ANALYTICS_REFRESH_CHECKPOINTS} SET status = 'completed', updated_at = :now
+        WHERE job_name = :job_name AND run_id = :run_id
+    """), {"job_name": USER_ANALYTICS_JOB, "run_id": run_id, "now": datetime.utcnow()})
+
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    # SQLite hands timestamps back as text
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _user_analytics_refresh_statement(dialect: str, incremental: bool, resume: bool):
+    """
+    Build the statement refreshing one chunk of users and returning their ids.
+    
+    The chunk is the next ``:batch_size`` users after ``:after`` in id order:
+    every active user on a full refresh, or those with applications updated
+    in ``(:since, :until]`` or created in ``(:expired_since, :window_start]``
+    (aged out of the window) on an incremental one.
+    """
+    after = "AND {column} > :after" if resume else ""
+    if incremental:
+        chunk = f"""
+            SELECT DISTINCT a.user_id
+            FROM job_applications a
+            JOIN users u ON u.id = a.user_id
+            WHERE u.active = true
+            AND (
+                (a.updated_at > :since AND a.updated_at <= :until)
+                OR (a.created_at > :expired_since AND a.created_at <= :window_start)
+            )
+            {after.format(column="a.user_id")}
+            ORDER BY a.user_id
+            LIMIT :batch_size
+        """
+    else:
+        chunk = f"""
+            SELECT u.id AS user_id
+            FROM users u
+            WHERE u.active = true
+            {after.format(column="u.id")}
+            ORDER BY u.id
+            LIMIT :batch_size
+        """
+    
+    if dialect == "sqlite":
+        response_days = "julianday(a.updated_at) - julianday(a.created_at)"
+    else:
+        response_days = "EXTRACT(EPOCH FROM (a.updated_at - a.created_at)) / 86400.0"
+    
+    def rate(statuses: str) -> str:
+        return f"""ROUND(CAST(CASE WHEN COUNT(a.user_id) = 0 THEN 0
+            ELSE 100.0 * SUM(CASE WHEN a.status IN ({statuses}) THEN 1 ELSE 0 END) / COUNT(a.user_id)
+            END AS NUMERIC), 2)"""
+    
+    return text(f"""
+        WITH chunk AS ({chunk})
         INSERT INTO user_analytics (
-            user_id, total_applications, response_rate, interview_rate, 
+            user_id, total_applications, response_rate, interview_rate,
             offer_rate, avg_response_time, calculated_at
-        ) VALUES (
-            :user_id, :total_applications, :response_rate, :interview_rate,
-            :offer_rate, :avg_response_time, :calculated_at
         )
+        SELECT
+            chunk.user_id,
+            COUNT(a.user_id),
+            {rate(RESPONSE_STATUSES)},
+            {rate(INTERVIEW_STATUSES)},
+            {rate(OFFER_STATUSES)},
+            ROUND(CAST(COALESCE(AVG(CASE WHEN a.status IN ({RESPONSE_STATUSES})
+                AND a.updated_at IS NOT NULL THEN {response_days} END), 0) AS NUMERIC), 1),
+            :calculated_at
+        FROM chunk
+        LEFT JOIN job_applications a
+            ON a.user_id = chunk.user_id
+            AND a.created_at >= :window_start
+        WHERE true
+        GROUP BY chunk.user_id
         ON CONFLICT (user_id) DO UPDATE SET
             total_applications = EXCLUDED.total_applications,
             response_rate = EXCLUDED.response_rate,
@@ -661,13 +969,8 @@ async def _upsert_user_analytics(session: AsyncSession, user_id: str, analytics_
             offer_rate = EXCLUDED.offer_rate,
             avg_response_time = EXCLUDED.avg_response_time,
             calculated_at = EXCLUDED.calculated_at
+        RETURNING user_id
     """)
-    
-    await session.execute(upsert_query, {
-        "user_id": user_id,
-        "calculated_at": datetime.utcnow(),
-        **analytics_data
-    })
 
 
 async def _calculate_skill_scores(session: AsyncSession, user_id: str, skills: List[Dict]) -> Dict[str, Dict]:
@@ -462,6 +462,8 @@ async def _normalize_and_deduplicate_jobs_async(task_id: str, hours_back: int) -
     
     cutoff_time = datetime.utcnow() - timedelta(hours=hours_back)
     
+    unique_job_ids = []
+    
     async with get_async_session() as session:
         # Get jobs from the last N hours
         query = text("""
@@ -506,15 +508,20 @@ async def _normalize_and_deduplicate_jobs_async(task_id: str, hours_back: int) -
                     text("UPDATE jobs SET processed = true WHERE id = :job_id"),
                     {"job_id": primary_job.id}
                 )
+                unique_job_ids.append(str(primary_job.id))
             else:
                 # Single job, just mark as processed
                 await session.execute(
                     text("UPDATE jobs SET processed = true WHERE id = :job_id"),
                     {"job_id": job_group[0].id}
                 )
+                unique_job_ids.append(str(job_group[0].id))
         
         await session.commit()
     
+    # Precompute requirement extractions so resume generation only reads them
+    _schedule_requirement_extraction(unique_job_ids)
+    
     return {
         "jobs_processed": jobs_processed,
         "duplicates_removed": duplicates_removed,
@@ -522,6 +529,26 @@ async def _normalize_and_deduplicate_jobs_async(task_id: str, hours_back: int) -
     }
 
 
+def _schedule_requirement_extraction(job_ids: List[str], chunk_size: int = 50) -> None:
+    """Enqueue requirement precomputation for newly ingested unique jobs."""
+    for start in range(0, len(job_ids), chunk_size):
+        chunk = job_ids[start:start + chunk_size]
+        try:
+            # Dispatch by name to avoid importing the document processing stack here
+            celery_app.send_task(
+                "document_processing.precompute_job_requirements",
+                kwargs={"job_ids": chunk},
+                queue="document_processing",
+                ignore_result=True
+            )
+        except Exception as e:
+            logger.warning(
+                "Failed to schedule job requirement precomputation",
+                job_count=len(chunk),
+                error=str(e)
+            )
+
+
 # Job normalization functions
 
 def _normalize_linkedin_job(job_data: Dict) -> Dict:
@@ -97,44 +97,35 @@ class TestBackgroundAnalyticsTasks:
         """Test successful user analytics batch calculation."""
         # Mock database session and queries
         mock_session_instance = Mock()
+        mock_session_instance.get_bind.return_value.dialect.name = "postgresql"
         
-        # Mock users query result
-        mock_users_result = Mock()
-        mock_users_result.fetchall.return_value = mock_users_data
-        
-        # Mock analytics calculation results
-        mock_session_instance.execute = AsyncMock(side_effect=[
-            mock_users_result,  # Users query
-            Mock(),  # Analytics upsert for user 1
-            Mock(),  # Analytics upsert for user 2
-        ])
+        # Mock the chunk upsert returning the refreshed users
+        mock_chunk_result = Mock()
+        mock_chunk_result.fetchall.return_value = [(user.id,) for user in mock_users_data]
+        mock_session_instance.execute = AsyncMock(return_value=mock_chunk_result)
         mock_session_instance.commit = AsyncMock()
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
-        # Mock the analytics calculation function
-        with patch('app.tasks.background_analytics._calculate_user_analytics') as mock_calc:
-            mock_calc.return_value = {
-                "total_applications": 5,
-                "response_rate": 40.0,
-                "interview_rate": 20.0,
-                "offer_rate": 10.0,
-                "avg_response_time": 3.5
-            }
+        # Mock the refresh checkpoint
+        run = {"since": None, "until": datetime.utcnow(), "last_user_id": None}
+        with patch('app.tasks.background_analytics._claim_analytics_refresh', AsyncMock(return_value=run)), \
+             patch('app.tasks.background_analytics._checkpoint_analytics_refresh', AsyncMock(return_value=True)) as mock_checkpoint, \
+             patch('app.tasks.background_analytics._complete_analytics_refresh', AsyncMock()):
             
-            with patch('app.tasks.background_analytics._upsert_user_analytics') as mock_upsert:
-                mock_upsert.return_value = None
-                
-                # Execute task
-                result = calculate_user_analytics_batch.apply(args=[100, 0])
-                task_result = result.get()
+            # Execute task
+            result = calculate_user_analytics_batch.apply(args=[100])
+            task_result = result.get()
         
         # Assertions
         assert task_result["users_processed"] == 2
         assert task_result["analytics_updated"] == 2
         assert task_result["error_count"] == 0
+        assert task_result["chunks"] == 1
         
-        # Verify database operations
-        mock_session_instance.commit.assert_called_once()
+        # Verify the chunk was upserted in one statement and checkpointed
+        mock_session_instance.execute.assert_called_once()
+        assert mock_checkpoint.await_args.args[2:] == ("user_2", 2)
+        assert mock_session_instance.commit.await_count == 2
     
     @patch('app.tasks.background_analytics.get_async_session')
     def test_update_skill_scores_batch_success(self, mock_session, mock_skills_data):
@@ -306,7 +297,7 @@ class TestBackgroundAnalyticsTasks:
         
         # Execute task and expect retry
         with pytest.raises(MaxRetriesExceededError):
-            result = calculate_user_analytics_batch.apply(args=[100, 0])
+            result = calculate_user_analytics_batch.apply(args=[100])
             result.get()
 
 
@@ -488,38 +479,36 @@ class TestAsyncAnalyticsFunctions:
         """Test async user analytics batch calculation."""
         # Mock database session and queries
         mock_session_instance = Mock()
+        mock_session_instance.get_bind.return_value.dialect.name = "postgresql"
         
-        # Mock users query result
-        mock_users_result = Mock()
-        mock_users_result.fetchall.return_value = [
-            Mock(id="user_1", email="user1@example.com", created_at=datetime.utcnow(), last_login_at=datetime.utcnow()),
-            Mock(id="user_2", email="user2@example.com", created_at=datetime.utcnow(), last_login_at=datetime.utcnow())
-        ]
-        
-        mock_session_instance.execute = AsyncMock(return_value=mock_users_result)
+        # Two full chunks followed by an empty one
+        mock_session_instance.execute = AsyncMock(side_effect=[
+            Mock(fetchall=Mock(return_value=[("user_1",), ("user_2",)])),
+            Mock(fetchall=Mock(return_value=[("user_3",), ("user_4",)])),
+            Mock(fetchall=Mock(return_value=[])),
+        ])
         mock_session_instance.commit = AsyncMock()
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
-        # Mock analytics calculation and upsert functions
-        with patch('app.tasks.background_analytics._calculate_user_analytics') as mock_calc:
-            mock_calc.return_value = {
-                "total_applications": 5,
-                "response_rate": 40.0,
-                "interview_rate": 20.0,
-                "offer_rate": 10.0,
-                "avg_response_time": 3.5
-            }
+        # Resume an incremental run after user_0
+        run = {"since": datetime.utcnow() - timedelta(minutes=30), "until": datetime.utcnow(), "last_user_id": "user_0"}
+        with patch('app.tasks.background_analytics._claim_analytics_refresh', AsyncMock(return_value=run)), \
+             patch('app.tasks.background_analytics._checkpoint_analytics_refresh', AsyncMock(return_value=True)), \
+             patch('app.tasks.background_analytics._complete_analytics_refresh', AsyncMock()) as mock_complete:
             
-            with patch('app.tasks.background_analytics._upsert_user_analytics') as mock_upsert:
-                mock_upsert.return_value = None
-                
-                # Execute function
-                result = await _calculate_user_analytics_batch_async("test_task", 100, 0)
+            # Execute function
+            result = await _calculate_user_analytics_batch_async("test_task", 2)
         
         # Assertions
-        assert result["users_processed"] == 2
-        assert result["analytics_updated"] == 2
+        assert result["users_processed"] == 4
+        assert result["analytics_updated"] == 4
+        assert result["chunks"] == 2
         assert result["error_count"] == 0
+        
+        # Each chunk continues from the last user of the previous one
+        cursors = [call.args[1]["after"] for call in mock_session_instance.execute.await_args_list]
+        assert cursors == ["user_0", "user_2", "user_4"]
+        mock_complete.assert_awaited_once()
     
     @pytest.mark.asyncio
     @patch('app.tasks.background_analytics.get_async_session')
@@ -568,43 +557,44 @@ class TestAnalyticsErrorHandling:
     """Test error handling in analytics tasks."""
     
     @patch('app.tasks.background_analytics.get_async_session')
-    def test_analytics_task_with_partial_errors(self, mock_session):
-        """Test analytics task behavior with partial errors."""
+    def test_analytics_task_skipped_while_another_run_holds_the_checkpoint(self, mock_session):
+        """Test analytics task behavior when a refresh is already running."""
         # Mock database session
         mock_session_instance = Mock()
+        mock_session_instance.execute = AsyncMock()
+        mock_session_instance.commit = AsyncMock()
+        mock_session.return_value.__aenter__.return_value = mock_session_instance
         
-        # Mock users query result
-        mock_users_result = Mock()
-        mock_users_result.fetchall.return_value = [
-            Mock(id="user_1", email="user1@example.com"),
-            Mock(id="user_2", email="user2@example.com"),
-            Mock(id="user_3", email="user3@example.com")
-        ]
+        with patch('app.tasks.background_analytics._claim_analytics_refresh', AsyncMock(return_value=None)):
+            # Execute task
+            result = calculate_user_analytics_batch.apply(args=[100])
+            task_result = result.get()
         
-        mock_session_instance.execute = AsyncMock(return_value=mock_users_result)
+        # Should return without touching user analytics
+        assert task_result["skipped"] is True
+        assert task_result["users_processed"] == 0
+        mock_session_instance.execute.assert_not_called()
+    
+    @patch('app.tasks.background_analytics.get_async_session')
+    def test_analytics_task_checkpoint_lost(self, mock_session):
+        """Test that a run stops once another run takes over its checkpoint."""
+        mock_session_instance = Mock()
+        mock_session_instance.get_bind.return_value.dialect.name = "postgresql"
+        mock_session_instance.execute = AsyncMock(return_value=Mock(fetchall=Mock(return_value=[("user_1",)])))
         mock_session_instance.commit = AsyncMock()
+        mock_session_instance.rollback = AsyncMock()
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
-        # Mock analytics calculation with one failure
-        with patch('app.tasks.background_analytics._calculate_user_analytics') as mock_calc:
-            mock_calc.side_effect = [
-                {"total_applications": 5, "response_rate": 40.0, "interview_rate": 20.0, "offer_rate": 10.0, "avg_response_time": 3.5},
-                Exception("Calculation failed for user 2"),
-                {"total_applications": 3, "response_rate": 33.0, "interview_rate": 33.0, "offer_rate": 0.0, "avg_response_time": 2.0}
-            ]
-            
-            with patch('app.tasks.background_analytics._upsert_user_analytics') as mock_upsert:
-                mock_upsert.return_value = None
-                
-                # Execute task
-                result = calculate_user_analytics_batch.apply(args=[100, 0])
-                task_result = result.get()
+        run = {"since": None, "until": datetime.utcnow(), "last_user_id": None}
+        with patch('app.tasks.background_analytics._claim_analytics_refresh', AsyncMock(return_value=run)), \
+             patch('app.tasks.background_analytics._checkpoint_analytics_refresh', AsyncMock(return_value=False)), \
+             patch('app.tasks.background_analytics._complete_analytics_refresh', AsyncMock()):
+            result = calculate_user_analytics_batch.apply(args=[1])
+            task_result = result.get()
         
-        # Should complete with partial success
-        assert task_result["users_processed"] == 3
-        assert task_result["analytics_updated"] == 2  # Only 2 successful
-        assert task_result["error_count"] == 1  # One error
-        assert len(task_result["errors"]) == 1
+        # The chunk is rolled back rather than committed
+        assert task_result["users_processed"] == 0
+        mock_session_instance.rollback.assert_awaited_once()
     
     @patch('app.tasks.background_analytics.get_async_session')
     def test_analytics_task_database_connection_failure(self, mock_session):
@@ -614,7 +604,7 @@ class TestAnalyticsErrorHandling:
         
         # Execute task and expect retry
         with pytest.raises(MaxRetriesExceededError):
-            result = calculate_user_analytics_batch.apply(args=[100, 0])
+            result = calculate_user_analytics_batch.apply(args=[100])
             result.get()
     
     @pytest.mark.asyncio
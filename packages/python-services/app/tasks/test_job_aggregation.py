@@ -238,8 +238,9 @@ class TestJobAggregationTasks:
             result = aggregate_linkedin_jobs.apply(args=[100, "United States"])
             result.get()
     
+    @patch('app.tasks.job_aggregation._schedule_requirement_extraction')
     @patch('app.tasks.job_aggregation.get_async_session')
-    def test_normalize_and_deduplicate_jobs_success(self, mock_session):
+    def test_normalize_and_deduplicate_jobs_success(self, mock_session, mock_schedule):
         """Test successful job normalization and deduplication."""
         # Mock database query results
         mock_jobs = [
@@ -294,6 +295,9 @@ class TestJobAggregationTasks:
         # Verify database operations
         assert mock_session_instance.execute.call_count >= 2  # Query + updates
         mock_session_instance.commit.assert_called_once()
+        
+        # Requirement extraction is precomputed for unique jobs only
+        mock_schedule.assert_called_once_with(["job_1", "job_3"])
 
 
 class TestJobNormalizationFunctions:
@@ -466,8 +470,9 @@ class TestAsyncJobAggregationFunctions:
             await _aggregate_linkedin_jobs_async("test_task", 100, "United States")
     
     @pytest.mark.asyncio
+    @patch('app.tasks.job_aggregation._schedule_requirement_extraction')
     @patch('app.tasks.job_aggregation.get_async_session')
-    async def test_normalize_and_deduplicate_jobs_async(self, mock_session):
+    async def test_normalize_and_deduplicate_jobs_async(self, mock_session, mock_schedule):
         """Test async job normalization and deduplication."""
         # Mock database query results
         mock_jobs = [
@@ -501,6 +506,7 @@ class TestAsyncJobAggregationFunctions:
         assert result["jobs_processed"] == 2
         assert result["duplicates_removed"] == 1
         assert result["unique_jobs"] == 1
+        mock_schedule.assert_called_once_with(["job_1"])
     
     @pytest.mark.asyncio
     @patch('app.tasks.job_aggregation.get_async_session')
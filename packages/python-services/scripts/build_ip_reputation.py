@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Build and inspect the compiled IP reputation index.
+
+    python scripts/build_ip_reputation.py build blocklists/*.txt --output data/ip_reputation.idx
+    python scripts/build_ip_reputation.py stats data/ip_reputation.idx
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.ip_reputation import IPReputationIndex, build_index  # noqa: E402
+
+
+@click.group()
+def cli():
+    """IP reputation index tools."""
+
+
+@cli.command()
+@click.argument("blocklists", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option("--output", default="data/ip_reputation.idx", help="Index file to write (replaced atomically)")
+@click.option("--score", default=0.1, type=float, help="Reputation assigned to blocklisted prefixes")
+@click.option("--no-builtin", is_flag=True, help="Leave out the built-in private/known-good ranges")
+def build(blocklists, output, score, no_builtin):
+    """Compile blocklist files into an index."""
+    started = time.perf_counter()
+    path = build_index(blocklists, output, score=score, include_builtin=not no_builtin)
+    index = IPReputationIndex.open(path)
+    click.echo(f"Wrote {path}: {index.prefix_count:,} prefixes, {index.node_count:,} nodes "
+               f"in {time.perf_counter() - started:.1f}s")
+
+
+@cli.command()
+@click.argument("index_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--lookups", default=200000, help="Random IPv4 lookups to time")
+def stats(index_path, lookups):
+    """Report index size, memory per million prefixes and lookups per second."""
+    index = IPReputationIndex.open(index_path)
+    rng = random.Random(0)
+    addresses = [".".join(str(rng.randrange(256)) for _ in range(4)) for _ in range(lookups)]
+
+    started = time.perf_counter()
+    hits = sum(index.lookup(address) is not None for address in addresses)
+    elapsed = time.perf_counter() - started
+
+    per_prefix = index.nbytes / max(index.prefix_count, 1)
+    click.echo(f"Prefixes:             {index.prefix_count:,}")
+    click.echo(f"Nodes:                {index.node_count:,}")
+    click.echo(f"Sources:              {', '.join(index.sources)}")
+    click.echo(f"Size:                 {index.nbytes / 2**20:.1f} MiB ({per_prefix:.1f} bytes/prefix)")
+    click.echo(f"Per million prefixes: {per_prefix * 1e6 / 2**20:.1f} MiB")
+    click.echo(f"Lookups:              {lookups / elapsed:,.0f}/s ({hits:,} of {lookups:,} matched)")
+
+
+if __name__ == "__main__":
+    cli()
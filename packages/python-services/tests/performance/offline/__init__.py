@@ -0,0 +1,8 @@
+"""
+Deterministic offline performance benchmarks.
+
+Runs real service code against in-process fakes (fakeredis, SQLite, a stub
+OpenAI embeddings endpoint) so benchmarks need no network or live services.
+Results are compared against ``baseline.json`` statistically; see
+``python -m tests.performance.offline --help``.
+"""
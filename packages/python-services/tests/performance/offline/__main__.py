@@ -0,0 +1,71 @@
+"""
+Command line entry point for the offline benchmarks.
+
+    python -m tests.performance.offline                    # compare with baseline
+    python -m tests.performance.offline --update-baseline  # record a new baseline
+    python -m tests.performance.offline --scenario cache.memory_hit
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from . import scenarios  # noqa: F401  (registers scenarios)
+from .harness import (
+    DEFAULT_ALPHA,
+    DEFAULT_BASELINE_PATH,
+    DEFAULT_MIN_EFFECT,
+    DEFAULT_SAMPLES,
+    SCENARIOS,
+    Baseline,
+    compare_samples,
+    run_scenario,
+)
+
+
+async def main(args: argparse.Namespace) -> int:
+    names = args.scenario or sorted(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    baseline = Baseline.load(args.baseline)
+    if baseline is not None and not args.update_baseline and not baseline.is_compatible():
+        print("Baseline was recorded on a different environment; comparisons skipped", file=sys.stderr)
+        baseline = None
+
+    regressions = 0
+    recorded = baseline if (baseline and args.update_baseline) else Baseline(path=Path(args.baseline))
+    for name in names:
+        result = await run_scenario(SCENARIOS[name], samples=args.samples)
+        line = f"{name:<32}{result.median * 1e6:>12.1f} us/op{1 / result.median:>14,.0f} ops/s"
+
+        reference = baseline.samples_for(result) if baseline and not args.update_baseline else None
+        if reference:
+            comparison = compare_samples(
+                name, result.samples, reference, alpha=args.alpha, min_effect=args.min_effect
+            )
+            line += f"  {comparison.verdict} x{comparison.ratio:.3f} [{comparison.ci_low:.3f}, {comparison.ci_high:.3f}]"
+            regressions += comparison.is_regression
+        print(line)
+        recorded.record(result)
+
+    if args.update_baseline:
+        recorded.save()
+        print(f"Baseline written to {recorded.path}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the offline performance benchmarks")
+    parser.add_argument("--scenario", action="append", help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE_PATH), help="Baseline JSON path")
+    parser.add_argument("--update-baseline", action="store_true", help="Record results as the new baseline")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="Samples per scenario")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help="Significance level")
+    parser.add_argument("--min-effect", type=float, default=DEFAULT_MIN_EFFECT,
+                        help="Smallest relative median change treated as a regression")
+    sys.exit(asyncio.run(main(parser.parse_args())))
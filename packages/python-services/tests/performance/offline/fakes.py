@@ -0,0 +1,274 @@
+"""
+In-process fakes for offline benchmarks.
+
+Everything here is deterministic: the embedding stub derives vectors from a
+hash of the input text and the fixture data comes from seeded generators.
+"""
+
+import base64
+import hashlib
+import json
+import random
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+
+SEED = 1337
+
+SKILLS = [
+    "python", "fastapi", "postgresql", "redis", "docker", "kubernetes", "aws", "react",
+    "typescript", "machine learning", "pandas", "sql", "celery", "graphql", "terraform",
+    "go", "java", "spark", "airflow", "linux",
+]
+LOCATIONS = ["San Francisco", "New York", "Austin", "Seattle", "Remote", "Boston", "Chicago"]
+INDUSTRIES = ["technology", "finance", "healthcare", "retail", "education"]
+LEVELS = ["entry", "mid", "senior", "lead"]
+
+
+def create_fake_redis():
+    """An in-memory ``redis.asyncio`` compatible client."""
+    from fakeredis import aioredis
+
+    return aioredis.FakeRedis()
+
+
+class StubEmbeddingServer:
+    """
+    Deterministic stand-in for the OpenAI ``/v1/embeddings`` endpoint.
+
+    Served through ``httpx.MockTransport`` so the real OpenAI SDK request and
+    response handling is exercised. Vectors share a common component, like
+    real text embeddings, so cosine similarities land in a realistic positive
+    range.
+    """
+
+    def __init__(self, dimension: int = 1536, seed: int = SEED):
+        self.dimension = dimension
+        common = np.random.default_rng(seed).standard_normal(dimension)
+        self._common = common / np.linalg.norm(common)
+        self.requests = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        noise = np.random.default_rng(int.from_bytes(digest[:8], "little")).standard_normal(self.dimension)
+        vector = 0.8 * self._common + 0.6 * noise / np.linalg.norm(noise)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "POST" or not request.url.path.endswith("/embeddings"):
+            return httpx.Response(404, json={"error": {"message": "not found"}})
+
+        self.requests += 1
+        body = json.loads(request.content)
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        use_base64 = body.get("encoding_format") == "base64"
+
+        data = []
+        for index, item in enumerate(inputs):
+            vector = self.embed(str(item))
+            embedding = (
+                base64.b64encode(vector.tobytes()).decode("ascii") if use_base64 else vector.tolist()
+            )
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+        tokens = sum(len(str(item).split()) for item in inputs)
+        return httpx.Response(200, json={
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-ada-002"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    def client(self):
+        """An ``openai.AsyncOpenAI`` client wired to this stub."""
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(
+            api_key="stub-key",
+            base_url="http://openai.stub/v1",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handle)),
+            max_retries=0,
+        )
+
+
+class StubEmbeddings:
+    """``aembed_query``/``aembed_documents`` over the stub server, like LangChain's OpenAIEmbeddings."""
+
+    def __init__(self, server: StubEmbeddingServer, model: str = "text-embedding-ada-002"):
+        self.server = server
+        self.model = model
+        self._client = server.client()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        response = await self._client.embeddings.create(model=self.model, input=texts)
+        return [list(map(float, item.embedding)) for item in response.data]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    async def aclose(self) -> None:
+        await self._client.close()
+
+
+class InMemoryVectorIndex:
+    """Exact cosine-similarity index with the Pinecone ``query`` response shape."""
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._vectors: Optional[np.ndarray] = None
+
+    def upsert(self, vectors: Sequence[Tuple[str, Sequence[float], Dict[str, Any]]]) -> None:
+        rows = []
+        for vector_id, values, metadata in vectors:
+            self._ids.append(vector_id)
+            self._metadata.append(metadata)
+            rows.append(np.asarray(values, dtype=np.float32))
+        stacked = np.vstack(rows)
+        stacked /= np.linalg.norm(stacked, axis=1, keepdims=True)
+        self._vectors = stacked if self._vectors is None else np.vstack([self._vectors, stacked])
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True, **_: Any):
+        query = np.asarray(vector, dtype=np.float32)
+        scores = self._vectors @ (query / np.linalg.norm(query))
+        top = np.argsort(-scores)[:top_k]
+        return SimpleNamespace(matches=[
+            SimpleNamespace(
+                id=self._ids[i],
+                score=float(scores[i]),
+                metadata=self._metadata[i] if include_metadata else None,
+            )
+            for i in top
+        ])
+
+
+def make_job_records(count: int, seed: int = SEED) -> List[Dict[str, Any]]:
+    """Deterministic job postings in the semantic search ``JobPosting`` shape."""
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        salary_min = rng.randrange(60_000, 160_000, 5_000)
+        jobs.append({
+            "id": f"job-{i}",
+            "title": f"{rng.choice(LEVELS).title()} {rng.choice(['Backend', 'Data', 'Platform', 'Frontend'])} Engineer",
+            "company": f"Company {i % 37}",
+            "description": " ".join(rng.choices(SKILLS, k=25)),
+            "location": rng.choice(LOCATIONS),
+            "salary_min": salary_min,
+            "salary_max": salary_min + rng.randrange(10_000, 60_000, 5_000),
+            "employment_type": "full-time",
+            "experience_level": rng.choice(LEVELS),
+            "industry": rng.choice(INDUSTRIES),
+            "remote_type": rng.choice(["remote", "hybrid", "on-site"]),
+            "required_skills": rng.sample(SKILLS, 5),
+            "preferred_skills": rng.sample(SKILLS, 3),
+        })
+    return jobs
+
+
+def make_profile_record(seed: int = SEED) -> Dict[str, Any]:
+    """A deterministic candidate profile in the semantic search ``UserProfile`` shape."""
+    rng = random.Random(seed)
+    return {
+        "id": "user-bench",
+        "skills": rng.sample(SKILLS, 8),
+        "experience": [
+            {"title": "Software Engineer", "company": "Acme", "duration": "3 years",
+             "description": "Built APIs and data pipelines"},
+        ],
+        "education": [{"degree": "BSc Computer Science", "institution": "State University"}],
+        "career_goals": "Lead backend platform work",
+        "preferred_locations": ["Remote", "Seattle"],
+        "salary_expectation_min": 110_000,
+        "salary_expectation_max": 150_000,
+        "years_experience": 5,
+        "industry_preferences": ["technology"],
+        "job_type_preferences": ["full-time"],
+        "remote_preferences": ["remote", "hybrid"],
+    }
+
+
+MATCH_SCORE_SCHEMA = [
+    """CREATE TABLE jobs (
+        id TEXT PRIMARY KEY, title TEXT, company TEXT, location TEXT, description TEXT,
+        required_skills TEXT, salary_min INTEGER, salary_max INTEGER, created_at TIMESTAMP,
+        is_duplicate BOOLEAN DEFAULT 0, archived BOOLEAN DEFAULT 0
+    )""",
+    """CREATE TABLE users (
+        id TEXT PRIMARY KEY, preferred_locations TEXT, salary_expectation_min INTEGER,
+        salary_expectation_max INTEGER, active BOOLEAN DEFAULT 1
+    )""",
+    """CREATE TABLE user_skills (
+        user_id TEXT, skill_name TEXT, proficiency_level INTEGER
+    )""",
+    "CREATE INDEX ix_user_skills_user_id ON user_skills (user_id)",
+    """CREATE TABLE job_match_scores (
+        job_id TEXT, user_id TEXT, match_score REAL, calculated_at TIMESTAMP,
+        PRIMARY KEY (job_id, user_id)
+    )""",
+]
+
+
+@asynccontextmanager
+async def sqlite_match_score_database(
+    jobs: int = 10,
+    users: int = 30,
+    seed: int = SEED
+) -> AsyncIterator[Any]:
+    """
+    An in-memory SQLite database seeded for the job match score batch.
+
+    Yields an ``async with factory() as session`` callable compatible with
+    ``app.core.database.get_async_session``.
+    """
+    rng = random.Random(seed)
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    created_at = datetime.utcnow() - timedelta(hours=1)
+    async with engine.begin() as conn:
+        for statement in MATCH_SCORE_SCHEMA:
+            await conn.execute(text(statement))
+        for job in make_job_records(jobs, seed):
+            await conn.execute(text(
+                "INSERT INTO jobs (id, title, company, location, description, required_skills, "
+                "salary_min, salary_max, created_at) VALUES (:id, :title, :company, :location, "
+                ":description, :required_skills, :salary_min, :salary_max, :created_at)"
+            ), {**{k: job[k] for k in ("id", "title", "company", "location", "description",
+                                       "salary_min", "salary_max")},
+                "required_skills": ",".join(job["required_skills"]),
+                "created_at": created_at})
+        for i in range(users):
+            user_id = f"user-{i}"
+            await conn.execute(text(
+                "INSERT INTO users (id, preferred_locations, salary_expectation_min, "
+                "salary_expectation_max) VALUES (:id, :locations, :min, :max)"
+            ), {"id": user_id, "locations": ",".join(rng.sample(LOCATIONS, 2)),
+                "min": rng.randrange(70_000, 140_000, 5_000), "max": 180_000})
+            for skill in rng.sample(SKILLS, 6):
+                await conn.execute(text(
+                    "INSERT INTO user_skills (user_id, skill_name, proficiency_level) "
+                    "VALUES (:user_id, :skill, :level)"
+                ), {"user_id": user_id, "skill": skill, "level": rng.randint(1, 5)})
+
+    @asynccontextmanager
+    async def session_factory():
+        async with session_maker() as session:
+            yield session
+
+    try:
+        yield session_factory
+    finally:
+        await engine.dispose()
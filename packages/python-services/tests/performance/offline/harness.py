@@ -0,0 +1,311 @@
+"""
+Offline benchmark runner, baseline store and statistical regression checks.
+
+A benchmark is a scenario (see ``scenarios.py``) timed as repeated samples;
+each sample is the mean per-operation time over ``inner_iterations`` calls.
+Samples are compared against a versioned baseline with a one-sided
+Mann-Whitney U test and a seeded bootstrap confidence interval on the ratio
+of medians, instead of fixed thresholds.
+"""
+
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import structlog
+from scipy.stats import mannwhitneyu
+
+
+BASELINE_SCHEMA_VERSION = 1
+DEFAULT_BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+DEFAULT_SAMPLES = 30
+DEFAULT_WARMUP = 3
+
+# Regression detection defaults
+DEFAULT_ALPHA = 0.01
+DEFAULT_MIN_EFFECT = 0.10  # ignore median shifts smaller than 10%
+BOOTSTRAP_RESAMPLES = 2000
+BOOTSTRAP_SEED = 20240601
+
+Operation = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class Scenario:
+    """A named benchmark workload."""
+    name: str
+    factory: Callable[[], Any]
+    inner_iterations: int = 10
+    version: int = 1
+    description: str = ""
+
+
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def scenario(name: str, inner_iterations: int = 10, version: int = 1):
+    """
+    Register an async generator as a benchmark scenario.
+
+    The generator performs setup, yields the async operation to time and
+    tears down afterwards. Bump ``version`` whenever the workload changes so
+    stale baseline entries are not compared.
+    """
+    def decorator(func):
+        SCENARIOS[name] = Scenario(
+            name=name,
+            factory=asynccontextmanager(func),
+            inner_iterations=inner_iterations,
+            version=version,
+            description=(func.__doc__ or "").strip().splitlines()[0] if func.__doc__ else "",
+        )
+        return func
+    return decorator
+
+
+@contextmanager
+def silenced_logging() -> Iterator[None]:
+    """
+    Discard log output while keeping its formatting cost.
+
+    Log records are still rendered, as in production, but written to the null
+    device so terminal I/O and output capture do not skew the timings. The
+    previous logging configuration is restored on exit.
+    """
+    structlog_config = structlog.get_config()
+    root = logging.getLogger()
+    root_handlers = root.handlers[:]
+    with open(os.devnull, "w") as devnull:
+        structlog.configure(logger_factory=structlog.PrintLoggerFactory(file=devnull))
+        root.handlers = [logging.StreamHandler(devnull)]
+        try:
+            yield
+        finally:
+            root.handlers = root_handlers
+            structlog.configure(**structlog_config)
+
+
+@dataclass
+class BenchmarkResult:
+    """Timing samples for one scenario, in seconds per operation."""
+    name: str
+    samples: List[float]
+    inner_iterations: int
+    version: int
+
+    @property
+    def median(self) -> float:
+        return float(np.median(self.samples))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "unit": "seconds",
+            "version": self.version,
+            "inner_iterations": self.inner_iterations,
+            "median": self.median,
+            "samples": self.samples,
+        }
+
+
+async def run_scenario(
+    scenario: Scenario,
+    samples: int = DEFAULT_SAMPLES,
+    warmup: int = DEFAULT_WARMUP
+) -> BenchmarkResult:
+    """Time a scenario; the garbage collector is paused while sampling."""
+    timings = []
+    with silenced_logging():
+        async with scenario.factory() as operation:
+            for _ in range(warmup):
+                await operation()
+
+            for _ in range(samples):
+                gc.collect()
+                gc.disable()
+                try:
+                    started = time.perf_counter_ns()
+                    for _ in range(scenario.inner_iterations):
+                        await operation()
+                    elapsed = time.perf_counter_ns() - started
+                finally:
+                    gc.enable()
+                timings.append(elapsed / scenario.inner_iterations / 1e9)
+
+    return BenchmarkResult(
+        name=scenario.name,
+        samples=timings,
+        inner_iterations=scenario.inner_iterations,
+        version=scenario.version,
+    )
+
+
+@dataclass
+class Comparison:
+    """Outcome of comparing current samples with the baseline."""
+    name: str
+    verdict: str  # "regression", "improvement", "unchanged"
+    ratio: float
+    ci_low: float
+    ci_high: float
+    p_slower: float
+    p_faster: float
+
+    @property
+    def is_regression(self) -> bool:
+        return self.verdict == "regression"
+
+    def describe(self) -> str:
+        return (
+            f"{self.name}: {self.verdict} "
+            f"(median x{self.ratio:.3f}, 95% CI [{self.ci_low:.3f}, {self.ci_high:.3f}], "
+            f"p_slower={self.p_slower:.4f})"
+        )
+
+
+def bootstrap_median_ratio(
+    current: List[float],
+    baseline: List[float],
+    resamples: int = BOOTSTRAP_RESAMPLES,
+    confidence: float = 0.95,
+    seed: int = BOOTSTRAP_SEED
+) -> tuple:
+    """Percentile bootstrap CI for median(current) / median(baseline)."""
+    rng = np.random.default_rng(seed)
+    current_array = np.asarray(current, dtype=float)
+    baseline_array = np.asarray(baseline, dtype=float)
+
+    current_medians = np.median(
+        rng.choice(current_array, size=(resamples, current_array.size), replace=True), axis=1
+    )
+    baseline_medians = np.median(
+        rng.choice(baseline_array, size=(resamples, baseline_array.size), replace=True), axis=1
+    )
+    ratios = current_medians / baseline_medians
+
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(ratios, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def compare_samples(
+    name: str,
+    current: List[float],
+    baseline: List[float],
+    alpha: float = DEFAULT_ALPHA,
+    min_effect: float = DEFAULT_MIN_EFFECT
+) -> Comparison:
+    """
+    Decide whether ``current`` is slower or faster than ``baseline``.
+
+    A regression requires both a significant one-sided Mann-Whitney U test
+    and a bootstrap CI whose lower bound exceeds ``1 + min_effect``, so noise
+    and tiny but significant shifts are both ignored.
+    """
+    ratio = float(np.median(current) / np.median(baseline))
+    ci_low, ci_high = bootstrap_median_ratio(current, baseline)
+    p_slower = float(mannwhitneyu(current, baseline, alternative="greater").pvalue)
+    p_faster = float(mannwhitneyu(current, baseline, alternative="less").pvalue)
+
+    if p_slower < alpha and ci_low > 1 + min_effect:
+        verdict = "regression"
+    elif p_faster < alpha and ci_high < 1 - min_effect:
+        verdict = "improvement"
+    else:
+        verdict = "unchanged"
+
+    return Comparison(name, verdict, ratio, ci_low, ci_high, p_slower, p_faster)
+
+
+def environment_fingerprint() -> Dict[str, Any]:
+    """Properties that must match for timings to be comparable."""
+    return {
+        "python": platform.python_version_tuple()[:2],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True, text=True, timeout=5, cwd=Path(__file__).parent
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+@dataclass
+class Baseline:
+    """Versioned store of benchmark samples."""
+    path: Path
+    environment: Dict[str, Any] = field(default_factory=environment_fingerprint)
+    benchmarks: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    created_at: Optional[str] = None
+    git_commit: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_BASELINE_PATH) -> Optional["Baseline"]:
+        """Load a baseline; returns None if missing or of another schema version."""
+        path = Path(path)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        if data.get("schema_version") != BASELINE_SCHEMA_VERSION:
+            return None
+        return cls(
+            path=path,
+            environment=data.get("environment", {}),
+            benchmarks=data.get("benchmarks", {}),
+            created_at=data.get("created_at"),
+            git_commit=data.get("git_commit"),
+        )
+
+    def is_compatible(self) -> bool:
+        """Whether this baseline was recorded on a comparable environment."""
+        # JSON turns tuples into lists
+        return json.loads(json.dumps(environment_fingerprint())) == self.environment
+
+    def samples_for(self, result: BenchmarkResult) -> Optional[List[float]]:
+        """Baseline samples for the same scenario version, if recorded."""
+        entry = self.benchmarks.get(result.name)
+        if not entry or entry.get("version") != result.version:
+            return None
+        return entry["samples"]
+
+    def record(self, result: BenchmarkResult) -> None:
+        self.benchmarks[result.name] = result.to_dict()
+
+    def save(self) -> None:
+        """Write the baseline atomically."""
+        self.environment = environment_fingerprint()
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.git_commit = _git_commit()
+        payload = {
+            "schema_version": BASELINE_SCHEMA_VERSION,
+            "created_at": self.created_at,
+            "git_commit": self.git_commit,
+            "environment": self.environment,
+            "benchmarks": dict(sorted(self.benchmarks.items())),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(payload, f, indent=2)
+            f.write("\n")
+        os.replace(temp_path, self.path)
@@ -0,0 +1,444 @@
+"""
+Offline benchmark scenarios.
+
+Each scenario drives real service code against the in-process fakes from
+``fakes.py``. Bump a scenario's ``version`` whenever its workload changes.
+"""
+
+import ipaddress
+import os
+import random
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import cycle
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import jwt
+from fastapi import FastAPI
+
+from app.core.caching import MemoryCache, MultiLayerCache, RedisCache
+from app.core.config import get_settings
+from app.core.dependencies import ServiceDependencies
+from app.core.logging import get_logger
+
+from .fakes import (
+    InMemoryVectorIndex,
+    StubEmbeddings,
+    StubEmbeddingServer,
+    create_fake_redis,
+    make_job_records,
+    make_profile_record,
+    sqlite_match_score_database,
+)
+from .harness import scenario
+
+
+CACHE_PAYLOAD = {
+    "user_id": "user-bench",
+    "recommendations": [{"job_id": f"job-{i}", "score": i / 100} for i in range(50)],
+}
+
+
+@asynccontextmanager
+async def _multi_layer_cache():
+    redis_client = create_fake_redis()
+    cache = MultiLayerCache(MemoryCache(max_size=1000), RedisCache(redis_client))
+    try:
+        yield cache
+    finally:
+        await redis_client.aclose()
+
+
+@scenario("cache.memory_hit", inner_iterations=200)
+async def cache_memory_hit():
+    """Multi-layer cache read served from the in-process tier."""
+    async with _multi_layer_cache() as cache:
+        await cache.set("bench:key", CACHE_PAYLOAD, ttl=300)
+
+        async def operation():
+            return await cache.get("bench:key")
+
+        yield operation
+
+
+@scenario("cache.redis_hit", inner_iterations=100)
+async def cache_redis_hit():
+    """Multi-layer cache read that misses memory and is served (and promoted) from Redis."""
+    async with _multi_layer_cache() as cache:
+        await cache.set("bench:key", CACHE_PAYLOAD, ttl=300)
+
+        async def operation():
+            await cache.memory_cache.delete("bench:key")
+            return await cache.get("bench:key")
+
+        yield operation
+
+
+@scenario("cache.miss_fill", inner_iterations=100)
+async def cache_miss_fill():
+    """Multi-layer cache miss followed by a write-through fill of both tiers."""
+    async with _multi_layer_cache() as cache:
+        async def operation():
+            await cache.delete("bench:key")
+            if await cache.get("bench:key") is None:
+                await cache.set("bench:key", CACHE_PAYLOAD, ttl=300)
+
+        yield operation
+
+
+@asynccontextmanager
+async def _semantic_search_service(job_count: int):
+    from app.services.semantic_search.service import EnhancedSemanticSearchService
+
+    server = StubEmbeddingServer()
+    embeddings = StubEmbeddings(server)
+    redis_client = create_fake_redis()
+
+    index = InMemoryVectorIndex()
+    jobs = make_job_records(job_count)
+    vectors = await embeddings.aembed_documents([job["description"] for job in jobs])
+    index.upsert([(job["id"], vector, job) for job, vector in zip(jobs, vectors)])
+
+    service = EnhancedSemanticSearchService(ServiceDependencies(
+        None, redis_client, None, get_logger("offline-benchmark"), get_settings()
+    ))
+    service.embeddings = embeddings
+    service.pinecone_index = index
+    service._initialized = True
+
+    try:
+        yield service
+    finally:
+        await embeddings.aclose()
+        await redis_client.aclose()
+
+
+@scenario("search.semantic_scoring", inner_iterations=5)
+async def search_semantic_scoring():
+    """Semantic search over 200 jobs: stub embedding call, vector query and match scoring."""
+    from app.services.semantic_search.models import SemanticSearchRequest, UserProfile
+
+    request = SemanticSearchRequest(
+        user_profile=UserProfile(**make_profile_record()),
+        top_k=50,
+        match_threshold=0.0,
+        include_explanation=False,
+    )
+
+    async with _semantic_search_service(200) as service:
+        async def operation():
+            return await service._semantic_search(request)
+
+        yield operation
+
+
+@scenario("search.enhanced_semantic_scoring", inner_iterations=5)
+async def search_enhanced_semantic_scoring():
+    """Enhanced semantic search: 200 vector candidates scored as columns, top 67 materialised."""
+    from app.services.semantic_search.models import SemanticSearchRequest, UserProfile
+
+    request = SemanticSearchRequest(
+        user_profile=UserProfile(**make_profile_record()),
+        top_k=67,
+        match_threshold=0.0,
+        include_explanation=False,
+    )
+
+    async with _semantic_search_service(300) as service:
+        async def operation():
+            return await service._enhanced_semantic_search(request)
+
+        yield operation
+
+
+@scenario("search.keyword_top_k", inner_iterations=20)
+async def search_keyword_top_k():
+    """BM25 top-50 over 5000 indexed jobs for a profile's skills and roles."""
+    from app.services.semantic_search.keyword_index import BM25Index, job_fields, profile_query
+
+    index = BM25Index()
+    for job in make_job_records(5000):
+        index.add(job["id"], job_fields(job), job)
+    profile = make_profile_record()
+    query = profile_query(profile["skills"], ["backend engineer"], profile.get("industry_preferences", []))
+
+    async def operation():
+        return index.search(query, 50)
+
+    yield operation
+
+
+@scenario("search.reverse_match_chunk", inner_iterations=5)
+async def search_reverse_match_chunk():
+    """Reverse matching: 100 changed jobs against a chunk of 1024 profiles, top 20 per user."""
+    import numpy as np
+
+    from app.services.semantic_search.models import UserProfile
+    from app.services.semantic_search.reverse_matching import ProfileMatrix, best_per_row, score_profiles
+    from app.services.semantic_search.scoring import CandidateBatch
+
+    rng = np.random.default_rng(0)
+    profiles = [
+        UserProfile(**{**make_profile_record(seed), "id": f"user-{seed}"}) for seed in range(1024)
+    ]
+    matrix = ProfileMatrix([p.id for p in profiles], profiles, rng.normal(size=(len(profiles), 1536)))
+    jobs = make_job_records(100)
+    batch = CandidateBatch(jobs, np.zeros(len(jobs)))
+    job_embeddings = rng.normal(size=(len(jobs), 1536))
+
+    async def operation():
+        return best_per_row(score_profiles(batch, job_embeddings, matrix), 0.6, 20)
+
+    yield operation
+
+
+@scenario("analytics.match_score_batch", inner_iterations=1)
+async def analytics_match_score_batch():
+    """Job match score batch for 10 jobs x 30 users against seeded SQLite."""
+    from app.tasks import background_analytics
+
+    async with sqlite_match_score_database(jobs=10, users=30) as session_factory:
+        with patch.object(background_analytics, "get_async_session", session_factory):
+            async def operation():
+                result = await background_analytics._calculate_job_match_scores_batch_async(
+                    "offline-benchmark", batch_size=10, hours_back=24
+                )
+                assert result["error_count"] == 0, result["errors"]
+                return result
+
+            yield operation
+
+
+@scenario("analytics.platform_benchmarks", inner_iterations=20)
+async def analytics_platform_benchmarks():
+    """Platform benchmark snapshot over 20k recorded applications in 8 industries x 4 levels."""
+    from app.services.analytics.platform_stats import PlatformStatistics
+
+    redis_client = create_fake_redis()
+    stats = PlatformStatistics(redis_client)
+    rng = random.Random(40)
+    industries = [f"industry-{i}" for i in range(8)]
+    levels = ["entry", "mid", "senior", "lead"]
+    for i in range(20000):
+        industry, level = rng.choice(industries), rng.choice(levels)
+        await stats.record_application(f"user-{i % 2500}", industry, level)
+        if rng.random() < 0.3:
+            submitted = datetime.now(timezone.utc) - timedelta(days=rng.expovariate(1 / 7))
+            await stats.record_status_change("submitted", rng.choice(["rejected", "interview_scheduled"]),
+                                             industry, level, submitted)
+    try:
+        async def operation():
+            return await stats.snapshot()
+
+        yield operation
+    finally:
+        await redis_client.aclose()
+
+
+@scenario("analytics.application_views", inner_iterations=20)
+async def analytics_application_views():
+    """One status change on a cached 1y application frame, then metrics, insights, trends and charts."""
+    from app.services.analytics.application_frame import ApplicationFrame
+    from app.services.analytics.service import AnalyticsEngine
+
+    engine = AnalyticsEngine()
+    frame = ApplicationFrame(await engine._get_user_applications("user-bench", "1y"))
+    changes = cycle((application_id, status) for application_id in frame.rows
+                    for status in ("interview_scheduled", "rejected"))
+
+    async def operation():
+        application_id, status = next(changes)
+        frame.apply_status_change(application_id, status, response_time_days=5.0)
+        metrics = engine._calculate_basic_metrics(frame)
+        insights = await engine._generate_insights(frame, "user-bench")
+        return metrics, insights, engine._analyze_trends(frame), engine._prepare_visualization_data(frame)
+
+    yield operation
+
+
+@asynccontextmanager
+async def _service_token_verifier(cache_size: int):
+    from app.core.service_tokens import ServiceKeySet, ServiceTokenVerifier, TokenRevocationList
+
+    secret = "offline-benchmark-service-secret-0123456789"
+    redis_client = create_fake_redis()
+    verifier = ServiceTokenVerifier(
+        ServiceKeySet.from_secret(secret),
+        revocations=TokenRevocationList(redis_client),
+        cache_size=cache_size,
+    )
+    await verifier.revocations.revoke("revoked-token", time.time() + 3600)
+    await verifier.revocations.sync()
+    token = jwt.encode({
+        "serviceId": "node-backend",
+        "serviceName": "Node.js Backend",
+        "permissions": ["read:*", "write:analytics"],
+        "jti": "bench-token",
+        "iat": int(time.time()),
+        "exp": int(time.time()) + 3600,
+    }, secret, algorithm="HS256")
+    try:
+        yield verifier, token
+    finally:
+        await redis_client.aclose()
+
+
+@scenario("auth.service_token_cached", inner_iterations=500)
+async def auth_service_token_cached():
+    """Service JWT verification served from the verified-token cache (verifications/s = 1 / median)."""
+    async with _service_token_verifier(cache_size=1000) as (verifier, token):
+        async def operation():
+            return await verifier.verify(token)
+
+        yield operation
+
+
+@scenario("auth.service_token_full", inner_iterations=200)
+async def auth_service_token_full():
+    """Service JWT verification with the cache disabled: signature and claims on every call."""
+    async with _service_token_verifier(cache_size=0) as (verifier, token):
+        async def operation():
+            return await verifier.verify(token)
+
+        yield operation
+
+
+@scenario("security.ip_reputation_lookup", inner_iterations=1000)
+async def security_ip_reputation_lookup():
+    """Longest-prefix IP reputation lookup over 50k IPv4 and 5k IPv6 prefixes."""
+    from app.core.ip_reputation import IndexBuilder, IPReputationIndex
+
+    rng = random.Random(38)
+    builder = IndexBuilder()
+    for _ in range(50000):
+        builder.add(str(ipaddress.ip_network((rng.getrandbits(32), rng.randint(12, 32)), strict=False)), 0.1, "v4")
+    for _ in range(5000):
+        builder.add(str(ipaddress.ip_network((rng.getrandbits(128), rng.randint(24, 64)), strict=False)), 0.1, "v6")
+    addresses = cycle(str(ipaddress.ip_address(rng.getrandbits(32))) for _ in range(4096))
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = IPReputationIndex.open(builder.write(Path(directory) / "bench.idx"))
+
+        async def operation():
+            return index.lookup(next(addresses))
+
+        try:
+            yield operation
+        finally:
+            index.close()
+
+
+@scenario("database.query_monitor_observe", inner_iterations=1000)
+async def database_query_monitor_observe():
+    """Per-execution query monitor overhead over 200 distinct parameterised statements."""
+    from types import SimpleNamespace
+
+    from app.services.query_performance_monitor import QueryPerformanceMonitor
+
+    monitor = QueryPerformanceMonitor(SimpleNamespace(engines={}))
+    rng = random.Random(41)
+    statements = [
+        f"SELECT id, title, company FROM jobs WHERE industry = $1 AND salary_min > $2 ORDER BY col_{i} LIMIT $3"
+        for i in range(200)
+    ]
+    executions = cycle((rng.choice(statements), rng.expovariate(200)) for _ in range(4096))
+
+    async def operation():
+        statement, duration = next(executions)
+        monitor._observe(statement, duration, False, ("technology", 50000, 20))
+
+    yield operation
+
+
+def _benchmark_app(with_middleware: bool) -> FastAPI:
+    from app.middleware.correlation import CorrelationIDMiddleware
+    from app.middleware.distributed_tracing import DistributedTracingMiddleware
+    from app.middleware.logging import LoggingMiddleware
+    from app.middleware.metrics import MetricsMiddleware
+
+    app = FastAPI()
+
+    @app.get("/bench")
+    async def bench():
+        return {"status": "ok"}
+
+    if with_middleware:
+        # Added innermost first, mirroring the production stack order
+        app.add_middleware(MetricsMiddleware)
+        app.add_middleware(LoggingMiddleware)
+        app.add_middleware(DistributedTracingMiddleware, service_name="offline-benchmark")
+        app.add_middleware(CorrelationIDMiddleware)
+    return app
+
+
+@asynccontextmanager
+async def _asgi_client(app: FastAPI):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        yield client
+
+
+@scenario("middleware.bare", inner_iterations=50)
+async def middleware_bare():
+    """Request through an ASGI app without middleware (reference for the stack below)."""
+    async with _asgi_client(_benchmark_app(with_middleware=False)) as client:
+        async def operation():
+            return await client.get("/bench")
+
+        yield operation
+
+
+@scenario("middleware.stack", inner_iterations=50)
+async def middleware_stack():
+    """Request through the correlation, tracing, logging and metrics middleware."""
+    async with _asgi_client(_benchmark_app(with_middleware=True)) as client:
+        async def operation():
+            return await client.get("/bench")
+
+        yield operation
+
+
+@scenario("documents.resume_rendering", inner_iterations=20)
+async def documents_resume_rendering():
+    """Resume prompt construction and template rendering, without the LLM call."""
+    # ChatOpenAI validates that a key exists; no request is ever made
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+
+    from app.services.document_processing.models import TemplateType, UserProfile
+    from app.services.document_processing.service import DocumentProcessingService
+
+    redis_client = create_fake_redis()
+    service = DocumentProcessingService(ServiceDependencies(
+        None, redis_client, None, get_logger("offline-benchmark"), get_settings()
+    ))
+
+    record = make_profile_record()
+    profile = UserProfile(
+        id=record["id"],
+        first_name="Bench",
+        last_name="Mark",
+        email="bench@example.com",
+        skills=record["skills"],
+        experience=record["experience"] * 4,
+        education=record["education"],
+        career_goals=record["career_goals"],
+        summary="Backend engineer focused on data-intensive services.",
+    )
+    content = "\n".join(f"- Delivered project {i} using {', '.join(record['skills'])}" for i in range(40))
+
+    async def operation():
+        prompt = service._build_resume_prompt(profile, None, TemplateType.PROFESSIONAL, None)
+        rendered = await service._apply_template_formatting_async(
+            content, TemplateType.PROFESSIONAL, profile
+        )
+        return prompt, rendered
+
+    try:
+        yield operation
+    finally:
+        await redis_client.aclose()
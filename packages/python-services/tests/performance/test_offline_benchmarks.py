@@ -0,0 +1,154 @@
+"""
+Tests for the offline benchmark harness.
+
+The statistics, fakes and baseline store are always tested. Scenarios run as
+quick smoke tests; comparing them against the recorded baseline is opt-in
+(``OFFLINE_BENCHMARKS=1``) because timings are only meaningful on a quiet
+machine matching the baseline environment.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from tests.performance.offline import scenarios  # noqa: F401  (registers scenarios)
+from tests.performance.offline.fakes import (
+    InMemoryVectorIndex,
+    StubEmbeddings,
+    StubEmbeddingServer,
+)
+from tests.performance.offline.harness import (
+    SCENARIOS,
+    Baseline,
+    BenchmarkResult,
+    bootstrap_median_ratio,
+    compare_samples,
+    run_scenario,
+)
+
+
+RUN_BASELINE_COMPARISON = os.environ.get("OFFLINE_BENCHMARKS") == "1"
+
+
+def _timings(seed: int, median: float, count: int = 40):
+    rng = np.random.default_rng(seed)
+    return list(median * rng.lognormal(0.0, 0.05, count))
+
+
+@pytest.mark.performance
+class TestRegressionStatistics:
+    """Test Mann-Whitney / bootstrap regression detection."""
+
+    def test_same_distribution_is_unchanged(self):
+        comparison = compare_samples("noop", _timings(1, 1e-3), _timings(2, 1e-3))
+
+        assert comparison.verdict == "unchanged"
+        assert comparison.ci_low <= 1.0 <= comparison.ci_high
+
+    def test_detects_slowdown(self):
+        comparison = compare_samples("slow", _timings(3, 1.3e-3), _timings(4, 1e-3))
+
+        assert comparison.is_regression
+        assert comparison.ci_low > 1.1
+
+    def test_detects_speedup(self):
+        comparison = compare_samples("fast", _timings(5, 0.7e-3), _timings(6, 1e-3))
+
+        assert comparison.verdict == "improvement"
+
+    def test_small_significant_shift_is_ignored(self):
+        comparison = compare_samples("tiny", _timings(7, 1.03e-3, 200), _timings(8, 1e-3, 200))
+
+        assert comparison.verdict == "unchanged"
+
+    def test_bootstrap_is_deterministic(self):
+        current, baseline = _timings(9, 1e-3), _timings(10, 1e-3)
+
+        assert bootstrap_median_ratio(current, baseline) == bootstrap_median_ratio(current, baseline)
+
+
+@pytest.mark.performance
+class TestFakes:
+    """Test the deterministic in-process fakes."""
+
+    @pytest.mark.asyncio
+    async def test_stub_embeddings_are_deterministic(self):
+        embeddings = StubEmbeddings(StubEmbeddingServer(dimension=64))
+        try:
+            first = await embeddings.aembed_query("python engineer")
+            again, other = await embeddings.aembed_documents(["python engineer", "data analyst"])
+        finally:
+            await embeddings.aclose()
+
+        assert len(first) == 64
+        assert np.allclose(first, again, atol=1e-6)
+        assert 0.0 < float(np.dot(first, other)) < 0.99
+
+    def test_vector_index_ranks_by_cosine_similarity(self):
+        server = StubEmbeddingServer(dimension=32)
+        index = InMemoryVectorIndex()
+        index.upsert([
+            (name, server.embed(name), {"id": name}) for name in ("alpha", "beta", "gamma")
+        ])
+
+        result = index.query(server.embed("beta"), top_k=2)
+
+        assert [match.id for match in result.matches][0] == "beta"
+        assert result.matches[0].score == pytest.approx(1.0, abs=1e-5)
+        assert len(result.matches) == 2
+
+
+@pytest.mark.performance
+class TestBaselineStore:
+    """Test the versioned baseline file."""
+
+    def test_round_trip_and_version_matching(self, tmp_path):
+        path = tmp_path / "baseline.json"
+        baseline = Baseline(path=path)
+        baseline.record(BenchmarkResult("cache.get", [1e-6, 2e-6, 3e-6], 100, version=2))
+        baseline.save()
+
+        loaded = Baseline.load(path)
+
+        assert loaded.is_compatible()
+        assert loaded.samples_for(BenchmarkResult("cache.get", [], 100, version=2)) == [1e-6, 2e-6, 3e-6]
+        assert loaded.samples_for(BenchmarkResult("cache.get", [], 100, version=3)) is None
+        assert loaded.benchmarks["cache.get"]["median"] == 2e-6
+
+    def test_missing_or_foreign_baseline(self, tmp_path):
+        path = tmp_path / "baseline.json"
+        assert Baseline.load(path) is None
+
+        path.write_text('{"schema_version": 999}')
+        assert Baseline.load(path) is None
+
+    def test_other_environment_is_incompatible(self, tmp_path):
+        baseline = Baseline(path=tmp_path / "baseline.json", environment={"machine": "other"})
+
+        assert not baseline.is_compatible()
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+async def test_scenario(name):
+    """Every scenario runs; with OFFLINE_BENCHMARKS=1 it must not regress."""
+    samples = 20 if RUN_BASELINE_COMPARISON else 2
+    result = await run_scenario(SCENARIOS[name], samples=samples, warmup=1)
+
+    assert len(result.samples) == samples
+    assert all(sample > 0 for sample in result.samples)
+
+    if not RUN_BASELINE_COMPARISON:
+        return
+
+    baseline = Baseline.load()
+    if baseline is None or not baseline.is_compatible():
+        pytest.skip("No baseline recorded for this environment")
+    reference = baseline.samples_for(result)
+    if reference is None:
+        pytest.skip(f"No baseline samples for {name} v{result.version}")
+
+    comparison = compare_samples(name, result.samples, reference)
+    assert not comparison.is_regression, comparison.describe()
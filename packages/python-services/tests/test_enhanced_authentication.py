@@ -15,6 +15,7 @@ from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
+import fakeredis
 import pytest
 import pytest_asyncio
 from fastapi import HTTPException
@@ -39,15 +40,10 @@ class TestEnhancedUserManager:
     
     @pytest_asyncio.fixture
     async def mock_redis(self):
-        """Mock Redis client."""
-        redis_mock = AsyncMock()
-        redis_mock.setex = AsyncMock()
-        redis_mock.get = AsyncMock()
-        redis_mock.delete = AsyncMock()
-        redis_mock.sadd = AsyncMock()
-        redis_mock.srem = AsyncMock()
-        redis_mock.smembers = AsyncMock()
-        return redis_mock
+        """In-memory Redis client."""
+        redis_client = fakeredis.aioredis.FakeRedis()
+        yield redis_client
+        await redis_client.aclose()
     
     @pytest_asyncio.fixture
     async def mock_user_db(self):
@@ -103,34 +99,38 @@ class TestEnhancedUserManager:
         
         session_id = await user_manager.create_session(sample_user, mock_request)
         
-        assert session_id is not None
-        mock_redis.setex.assert_called()
-        mock_redis.sadd.assert_called()
+        stored = await mock_redis.hgetall(f"session:{session_id}")
+        assert stored[b"u"] == str(sample_user.id).encode()
+        assert stored[b"ip"] == b"192.168.1.1"
+        assert await mock_redis.ttl(f"session:{session_id}") > 0
+        assert await mock_redis.sismember(f"user_sessions:{sample_user.id}", session_id)
+        
+        session = await user_manager.validate_session(session_id)
+        assert session.user_id == sample_user.id
+        assert session.is_active
     
-    async def test_invalidate_session(self, user_manager, mock_redis):
+    async def test_invalidate_session(self, user_manager, sample_user, mock_redis):
         """Test session invalidation."""
         
-        session_id = "test_session_id"
-        session_data = json.dumps({"user_id": str(uuid4())})
+        record = await user_manager.session_store.create(str(sample_user.id), "10.0.0.1", "agent")
         
-        mock_redis.get.return_value = session_data.encode()
+        await user_manager.invalidate_session(record.session_id)
         
-        await user_manager.invalidate_session(session_id)
-        
-        mock_redis.delete.assert_called()
-        mock_redis.srem.assert_called()
+        assert not await mock_redis.exists(f"session:{record.session_id}")
+        assert not await mock_redis.sismember(f"user_sessions:{sample_user.id}", record.session_id)
+        assert await user_manager.validate_session(record.session_id) is None
     
-    async def test_invalidate_all_user_sessions(self, user_manager, mock_redis):
+    async def test_invalidate_all_user_sessions(self, user_manager, sample_user, mock_redis):
         """Test invalidating all user sessions."""
         
-        user_id = uuid4()
-        session_ids = [b"session_1", b"session_2"]
-        
-        mock_redis.smembers.return_value = session_ids
+        for _ in range(2):
+            await user_manager.session_store.create(str(sample_user.id), "10.0.0.1", "agent")
+        assert len(await user_manager.get_user_sessions(sample_user.id)) == 2
         
-        await user_manager.invalidate_all_user_sessions(user_id)
+        await user_manager.invalidate_all_user_sessions(sample_user.id)
         
-        mock_redis.delete.assert_called()
+        assert await user_manager.get_user_sessions(sample_user.id) == []
+        assert not await mock_redis.exists(f"user_sessions:{sample_user.id}")
 
 
 class TestMFAManager:
@@ -331,31 +331,36 @@ class TestRBACManager:
         mock_session.add.assert_called_once()
         mock_session.commit.assert_called_once()
     
-    async def test_get_user_permissions(self, rbac_manager):
+    async def test_get_user_permissions(self, rbac_manager, mock_session):
         """Test getting user permissions."""
         
         user_id = uuid4()
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = ["user:read", "job:read"]
+        mock_session.execute = AsyncMock(return_value=result)
         
         permissions = await rbac_manager.get_user_permissions(user_id)
         
-        assert isinstance(permissions, set)
-        assert "user:read" in permissions
+        assert permissions == frozenset({"user:read", "job:read"})
+        mock_session.execute.assert_called_once()
     
-    async def test_check_permission(self, rbac_manager):
+    async def test_check_permission(self, rbac_manager, mock_session):
         """Test permission checking."""
         
         user_id = uuid4()
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = ["user:read", "user:write"]
+        mock_session.execute = AsyncMock(return_value=result)
         
-        with patch.object(rbac_manager, 'get_user_permissions') as mock_get_perms:
-            mock_get_perms.return_value = {"user:read", "user:write"}
-            
-            # Test existing permission
-            result = await rbac_manager.check_permission(user_id, "user:read")
-            assert result is True
-            
-            # Test non-existing permission
-            result = await rbac_manager.check_permission(user_id, "admin:delete")
-            assert result is False
+        # Test existing permission
+        assert await rbac_manager.check_permission(user_id, "user:read") is True
+        
+        # Test non-existing permission
+        assert await rbac_manager.check_permission(user_id, "admin:delete") is False
+        
+        # Permissions are resolved once and then served from the compiled set
+        assert await rbac_manager.check_permissions(user_id, "user:read", "user:write") is True
+        mock_session.execute.assert_called_once()
 
 
 class TestRefreshTokenManager:
@@ -0,0 +1,141 @@
+"""
+Unit tests for the time-bucketed alert store.
+"""
+
+import json
+import time
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from app.core.alert_store import BUCKET_INDEX_KEY, AlertStore, bucket_key
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    client = fakeredis.aioredis.FakeRedis()
+    yield client
+    await client.aclose()
+
+
+@pytest_asyncio.fixture
+async def store(redis_client):
+    return AlertStore(redis_client, bucket_seconds=3600, retention_seconds=2 * 86400)
+
+
+async def _add(store: AlertStore, alert_id: str, timestamp: float, severity: str = "high") -> None:
+    await store.add(alert_id, timestamp, severity, json.dumps({"id": alert_id}))
+
+
+@pytest.mark.unit
+class TestAlertStorage:
+    """Test bucketed writes, reads and retention."""
+
+    @pytest.mark.asyncio
+    async def test_recent_alerts_span_buckets_newest_first(self, store):
+        now = time.time()
+        for i, age in enumerate([7200, 30, 3700, 10]):
+            await _add(store, f"a{i}", now - age)
+
+        ids = [json.loads(payload)["id"] for payload in await store.recent(limit=3)]
+
+        assert ids == ["a3", "a1", "a2"]
+        assert len(await store.recent(limit=10)) == 4
+        assert await store.recent(limit=0) == []
+
+    @pytest.mark.asyncio
+    async def test_recent_alerts_use_one_hmget_per_bucket(self, store, redis_client):
+        now = time.time()
+        for i in range(6):
+            await _add(store, f"a{i}", now - i * 1800)
+
+        with patch.object(redis_client, "hget", wraps=redis_client.hget) as hget:
+            assert len(await store.recent(limit=6)) == 6
+
+        hget.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_buckets_expire_with_retention(self, store, redis_client):
+        now = time.time()
+        await _add(store, "old", now - 3 * 86400)
+        await _add(store, "new", now)
+
+        old_bucket = store.bucket_for(now - 3 * 86400)
+        ttl = await redis_client.ttl(bucket_key(store.bucket_for(now)))
+        assert 0 < ttl <= store.retention_seconds + store.bucket_seconds
+        # Writes trim buckets that have left the window from the index
+        assert await redis_client.zscore(BUCKET_INDEX_KEY, str(old_bucket)) is None
+        assert [json.loads(payload)["id"] for payload in await store.recent()] == ["new"]
+
+    @pytest.mark.asyncio
+    async def test_statistics_come_from_bucket_counters(self, store):
+        now = time.time()
+        await _add(store, "a", now, "high")
+        await _add(store, "b", now, "critical")
+        await _add(store, "c", now - 36 * 3600, "high")
+
+        stats = await store.statistics(recent_seconds=86400)
+
+        assert stats.total == 3
+        assert stats.by_severity == {"high": 2, "critical": 1}
+        assert stats.recent == 2
+
+    @pytest.mark.asyncio
+    async def test_replace_updates_in_place(self, store):
+        await _add(store, "a", time.time())
+
+        assert await store.replace("a", json.dumps({"id": "a", "status": "resolved"}))
+        assert json.loads(await store.get("a"))["status"] == "resolved"
+        assert not await store.replace("missing", "{}")
+        assert await store.get("missing") is None
+
+    def test_retention_must_cover_a_bucket(self, redis_client):
+        with pytest.raises(ValueError):
+            AlertStore(redis_client, bucket_seconds=3600, retention_seconds=60)
+
+
+@pytest.mark.unit
+class TestAlertScripts:
+    """Test the atomic correlation and throttling scripts."""
+
+    @pytest.mark.asyncio
+    async def test_correlation_returns_previous_alerts(self, store, redis_client):
+        assert await store.correlate("auth:1.2.3.4", "a", window_seconds=300, limit=2) == []
+        assert await store.correlate("auth:1.2.3.4", "b", window_seconds=300, limit=2) == ["a"]
+        assert await store.correlate("auth:1.2.3.4", "c", window_seconds=300, limit=2) == ["b", "a"]
+        assert await store.correlate("auth:5.6.7.8", "d", window_seconds=300, limit=2) == []
+
+        assert await redis_client.llen("correlation:auth:1.2.3.4") == 2
+        assert 0 < await redis_client.ttl("correlation:auth:1.2.3.4") <= 300
+
+    @pytest.mark.asyncio
+    async def test_throttle_blocks_until_it_expires(self, store, redis_client):
+        assert await store.acquire_send("rule", throttle_seconds=300, max_per_hour=10)
+        assert not await store.acquire_send("rule", throttle_seconds=300, max_per_hour=10)
+
+        await redis_client.delete("alert_throttle:rule")
+        assert await store.acquire_send("rule", throttle_seconds=300, max_per_hour=10)
+
+    @pytest.mark.asyncio
+    async def test_released_send_does_not_count(self, store, redis_client):
+        now = time.time()
+        assert await store.acquire_send("rule", throttle_seconds=300, max_per_hour=1, now=now)
+
+        # Delivery failed: the throttle and the hourly budget are given back
+        await store.release_send("rule", now=now)
+
+        assert await store.acquire_send("rule", throttle_seconds=300, max_per_hour=1, now=now)
+        assert not await store.acquire_send("rule", throttle_seconds=300, max_per_hour=1, now=now)
+        assert int(await redis_client.get(f"alert_count:rule:{time.gmtime(now).tm_hour}")) == 1
+
+    @pytest.mark.asyncio
+    async def test_hourly_budget_without_throttle(self, store, redis_client):
+        now = time.time()
+        results = [await store.acquire_send("critical", 0, max_per_hour=3, now=now) for _ in range(5)]
+
+        assert results == [True, True, True, False, False]
+        hour_key = f"alert_count:critical:{time.gmtime(now).tm_hour}"
+        assert int(await redis_client.get(hour_key)) == 3
+        assert 0 < await redis_client.ttl(hour_key) <= 3600
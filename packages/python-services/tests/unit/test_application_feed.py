@@ -0,0 +1,209 @@
+"""
+Unit tests for the application feed into the analytics counters.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.activity_counters import APPLICATION_SUBMITTED, ActivityCounters
+from app.services.analytics.application_changes import ApplicationChangeLog
+from app.services.analytics.application_feed import (
+    LOCK_KEY, WATERMARK_KEY, ApplicationFeed, title_level
+)
+from app.services.analytics.platform_stats import PlatformStatistics
+
+SCHEMA = [
+    "CREATE TABLE jobs (id TEXT PRIMARY KEY, industry TEXT, title TEXT)",
+    """CREATE TABLE applications (
+        id TEXT PRIMARY KEY, user_id TEXT, job_id TEXT, status TEXT,
+        applied_date TIMESTAMP, response_date TIMESTAMP,
+        created_at TIMESTAMP, updated_at TIMESTAMP
+    )""",
+]
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        for statement in SCHEMA:
+            await conn.execute(text(statement))
+        await conn.execute(text(
+            "INSERT INTO jobs (id, industry, title) VALUES "
+            "('job-1', 'Technology', 'Senior Backend Engineer'), "
+            "('job-2', 'Finance', 'Financial Analyst')"
+        ))
+    async with AsyncSession(engine) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def stats(redis_client):
+    return PlatformStatistics(redis_client)
+
+
+@pytest.fixture
+def activity(redis_client):
+    return ActivityCounters(redis_client)
+
+
+@pytest.fixture
+def changes(redis_client):
+    return ApplicationChangeLog(redis_client)
+
+
+@pytest.fixture
+def feed(redis_client, stats, activity, changes):
+    # Small batches so the runs page through ties on updated_at
+    return ApplicationFeed(redis_client, stats, activity, changes, batch_size=2)
+
+
+async def _apply(
+    session, application_id: str, status: str, updated_at: datetime,
+    job_id: str = "job-1", created_at: datetime = NOW - timedelta(days=10)
+) -> None:
+    await session.execute(text("""
+        INSERT INTO applications (id, user_id, job_id, status, applied_date, created_at, updated_at)
+        VALUES (:id, :user_id, :job_id, :status, :created_at, :created_at, :updated_at)
+    """), {"id": application_id, "user_id": f"user-{application_id}", "job_id": job_id,
+           "status": status, "created_at": created_at, "updated_at": updated_at})
+    await session.commit()
+
+
+async def _update(
+    session, application_id: str, status: str, updated_at: datetime, response_date: datetime = None
+) -> None:
+    await session.execute(
+        text("UPDATE applications SET status = :status, updated_at = :updated_at, "
+             "response_date = :response_date WHERE id = :id"),
+        {"id": application_id, "status": status, "updated_at": updated_at,
+         "response_date": response_date},
+    )
+    await session.commit()
+
+
+@pytest.mark.unit
+class TestApplicationFeed:
+    """Test backfill, exactly-once counting, the safety window and what each counter receives."""
+
+    @pytest.mark.asyncio
+    async def test_first_run_backfills_existing_applications(
+        self, session, redis_client, stats, feed
+    ):
+        await _apply(session, "a1", "submitted", NOW - timedelta(days=9))
+        await _apply(session, "a2", "interview_scheduled", NOW - timedelta(days=5), job_id="job-2")
+        await _apply(session, "a3", "rejected", NOW - timedelta(days=3))
+
+        run = await feed.run(session)
+
+        assert (run.rows_read, run.applications_added, run.status_changes) == (3, 3, 2)
+        snapshot = await stats.snapshot()
+        assert snapshot.overall.applications == 3
+        assert snapshot.overall.responded == 2 and snapshot.overall.interviewed == 1
+        assert snapshot.industries["finance"].interviewed == 1
+        # Levels come from job titles; "Financial Analyst" names none
+        assert set(snapshot.levels) == {"senior"}
+        senior = snapshot.levels["senior"]
+        assert senior.applications == 2 and senior.responded == 1
+        assert await redis_client.get(WATERMARK_KEY) == (NOW - timedelta(days=3)).isoformat()
+
+    def test_levels_are_read_from_job_titles(self):
+        assert title_level("Sr. Data Engineer") == "senior"
+        assert title_level("Senior Staff Engineer") == "lead"
+        assert title_level("Software Engineering Intern") == "entry"
+        assert title_level("VP of Engineering") == "vp"
+        assert title_level("Leadership Coach") is None
+        assert title_level("Data Engineer") is None and title_level(None) is None
+
+    @pytest.mark.asyncio
+    async def test_rows_read_again_are_counted_once(self, session, redis_client, stats, feed):
+        for i in range(5):
+            # Equal timestamps span batch boundaries
+            await _apply(session, f"a{i}", "submitted", NOW - timedelta(minutes=1))
+        await feed.run(session)
+
+        await _update(session, "a1", "interview_scheduled", NOW)
+        run = await feed.run(session)
+        assert run.rows_read == 5 and run.applications_added == 0 and run.status_changes == 1
+
+        full = await feed.run(session, full=True)
+        assert full.applications_added == 0 and full.status_changes == 0
+        snapshot = await stats.snapshot()
+        assert snapshot.overall.applications == 5 and snapshot.overall.interviewed == 1
+        assert await redis_client.get(WATERMARK_KEY) == NOW.isoformat()
+
+    @pytest.mark.asyncio
+    async def test_late_commits_within_the_safety_window_are_seen(
+        self, session, redis_client, stats, feed
+    ):
+        await _apply(session, "a1", "submitted", NOW)
+        await feed.run(session)
+
+        # Committed after the run, with an updated_at from before its watermark
+        await _apply(session, "late", "offer_received", NOW - timedelta(minutes=2))
+        await _apply(session, "old", "submitted", NOW - timedelta(hours=1))
+        run = await feed.run(session)
+
+        assert run.applications_added == 1
+        assert (await stats.snapshot()).overall.offered == 1
+        assert await redis_client.get(WATERMARK_KEY) == NOW.isoformat()
+
+    @pytest.mark.asyncio
+    async def test_recent_submissions_feed_the_activity_rate(self, session, activity, feed):
+        submitted_at = NOW - timedelta(minutes=2)
+        for i in range(3):
+            await _apply(session, f"new{i}", "submitted", submitted_at, created_at=submitted_at)
+        await _apply(session, "old", "submitted", submitted_at)
+
+        await feed.run(session)
+        await feed.run(session, full=True)
+
+        now = NOW.replace(tzinfo=timezone.utc).timestamp() + 60
+        snapshot = await activity.snapshot([APPLICATION_SUBMITTED], minutes=5, now=now)
+        assert snapshot.rates[APPLICATION_SUBMITTED] == pytest.approx(3 / 5)
+
+    @pytest.mark.asyncio
+    async def test_application_data_versions_follow_the_table(self, session, changes, feed):
+        await _apply(session, "a1", "submitted", NOW - timedelta(minutes=3))
+        await _apply(session, "a2", "submitted", NOW - timedelta(minutes=3))
+        await feed.run(session)
+        # New applications force a rebuild: no replayable change
+        assert await changes.version("user-a1") == 1
+        assert await changes.changes_between("user-a1", 0, 1) is None
+
+        await _update(
+            session, "a1", "interview_scheduled", NOW, response_date=NOW - timedelta(days=6)
+        )
+        await feed.run(session)
+        await feed.run(session)
+
+        assert await changes.version("user-a1") == 2 and await changes.version("user-a2") == 1
+        (change,) = await changes.changes_between("user-a1", 1, 2)
+        assert change["application_id"] == "a1" and change["status"] == "interview_scheduled"
+        assert change["response_time_days"] == pytest.approx(4.0)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_runs_are_skipped(self, session, redis_client, stats, feed):
+        await _apply(session, "a1", "submitted", NOW)
+        await redis_client.set(LOCK_KEY, "other-run")
+
+        run = await feed.run(session)
+
+        assert run.locked and run.rows_read == 0
+        assert (await stats.snapshot()).overall.applications == 0
+        assert await redis_client.get(LOCK_KEY) == "other-run"
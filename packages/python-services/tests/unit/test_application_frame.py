@@ -0,0 +1,179 @@
+"""
+Unit tests for columnar, incrementally maintained application frames.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import fakeredis
+import numpy as np
+import pandas as pd
+import pytest
+import pytest_asyncio
+
+from app.services.analytics.application_changes import ApplicationChangeLog
+from app.services.analytics.application_frame import (
+    INTERVIEWED_STATUSES,
+    MEASURES,
+    ApplicationFrame,
+    replay,
+)
+from app.services.analytics.service import AnalyticsEngine
+
+STATUSES = ["applied", "screening", "interview_scheduled", "offer_received", "accepted", "rejected"]
+
+
+def _applications(count: int = 120, seed: int = 4) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    status = rng.choice(STATUSES, count)
+    return pd.DataFrame({
+        "application_id": [f"app-{i}" for i in range(count)],
+        "industry": rng.choice(["technology", "finance", "retail"], count),
+        "company_size": rng.choice(["startup", "large"], count),
+        "status": status,
+        "applied_date": [datetime(2024, 1, 1) + timedelta(hours=int(h)) for h in rng.integers(0, 24 * 90, count)],
+        "response_time_days": np.where(np.isin(status, ["applied", "screening"]), np.nan, rng.exponential(7, count)),
+        "match_score": rng.beta(2, 2, count),
+    })
+
+
+def _assert_same_totals(frame: ApplicationFrame, expected: ApplicationFrame):
+    np.testing.assert_allclose(frame.totals, expected.totals)
+    for grouping, view in expected.views().items():
+        pd.testing.assert_frame_equal(frame.views()[grouping], view, check_index_type=False)
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    yield client
+    await client.aclose()
+
+
+@pytest.mark.unit
+class TestApplicationFrame:
+    """Test the grouped totals against pandas and incremental updates against rebuilds."""
+
+    def test_views_match_groupby(self):
+        df = _applications()
+        views = ApplicationFrame(df).views()
+
+        succeeded = df["status"].isin(INTERVIEWED_STATUSES)
+        for grouping, keys in {
+            "industry": df["industry"],
+            "day_of_week": df["applied_date"].dt.day_name(),
+            "hour": df["applied_date"].dt.hour,
+            "week": df["applied_date"].dt.to_period("W"),
+        }.items():
+            expected = pd.DataFrame({
+                "applications": df.groupby(keys).size(),
+                "succeeded": succeeded.groupby(keys).sum(),
+                "response_count": df["response_time_days"].groupby(keys).count(),
+            }).astype(float)
+            actual = views[grouping].loc[expected.index, expected.columns]
+            np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), err_msg=grouping)
+
+        assert views["total"].loc["all", "match_sum"] == pytest.approx(df["match_score"].sum())
+        assert views["status"]["applications"].sum() == len(df)
+
+    def test_status_change_matches_rebuild(self):
+        df = _applications()
+        frame = ApplicationFrame(df)
+        frame.views()
+
+        assert frame.apply_status_change("app-3", "offer_received", response_time_days=4.0)
+        assert frame.apply_status_change("app-7", "rejected")
+        assert not frame.apply_status_change("missing", "rejected")
+
+        df.loc[3, ["status", "response_time_days"]] = ["offer_received", 4.0]
+        df.loc[7, "status"] = "rejected"
+        _assert_same_totals(frame, ApplicationFrame(df))
+        assert frame.total("offered") == df["status"].isin(["offer_received", "accepted"]).sum()
+
+    def test_changes_to_a_copy_leave_the_original_untouched(self):
+        df = _applications()
+        frame = ApplicationFrame(df)
+        views = frame.views()
+
+        updated = frame.copy()
+        assert updated.apply_status_change("app-3", "offer_received", response_time_days=4.0)
+
+        _assert_same_totals(frame, ApplicationFrame(df))
+        assert frame.views() is views and frame.frame.loc[3, "status"] == df.loc[3, "status"]
+        df.loc[3, ["status", "response_time_days"]] = ["offer_received", 4.0]
+        _assert_same_totals(updated, ApplicationFrame(df))
+
+    def test_empty_frame(self):
+        frame = ApplicationFrame.from_dataframe(pd.DataFrame())
+
+        assert frame.empty
+        assert all(frame.total(measure) == 0 for measure in MEASURES)
+        assert all(view.empty for view in frame.views().values())
+
+
+@pytest.mark.unit
+class TestApplicationChangeLog:
+    """Test versioned change replay."""
+
+    @pytest.mark.asyncio
+    async def test_changes_replay_until_a_gap(self, redis_client):
+        log = ApplicationChangeLog(redis_client, max_changes=3)
+        df = _applications()
+        frame = ApplicationFrame(df, version=await log.version("user-1"))
+
+        await log.record_status_change("user-1", "app-1", "interview_scheduled", 2.5)
+        await log.record_status_change("user-1", "app-2", "rejected")
+        version = await log.version("user-1")
+
+        changes = await log.changes_between("user-1", frame.version, version)
+        assert [change["application_id"] for change in changes] == ["app-1", "app-2"]
+        assert replay(frame, changes, version) and frame.version == 2
+        df.loc[1, ["status", "response_time_days"]] = ["interview_scheduled", 2.5]
+        df.loc[2, "status"] = "rejected"
+        _assert_same_totals(frame, ApplicationFrame(df))
+
+        # An added application leaves no replayable change; trimmed changes are gone too
+        await log.invalidate("user-1")
+        assert await log.changes_between("user-1", 2, 3) is None
+        for _ in range(4):
+            await log.record_status_change("user-1", "app-1", "rejected")
+        assert await log.changes_between("user-1", 3, 7) is None
+        assert len(await log.changes_between("user-1", 4, 7)) == 3
+
+
+@pytest.mark.unit
+class TestAnalyticsEngineFrames:
+    """Test that insights reuse and incrementally maintain the cached frame."""
+
+    @pytest.mark.asyncio
+    async def test_cached_frame_is_replayed_or_rebuilt(self, redis_client):
+        engine = AnalyticsEngine()
+        engine._redis = redis_client
+        engine._get_user_applications = AsyncMock(side_effect=lambda *_: _applications())
+        log = engine._get_application_changes()
+
+        first = await engine._get_application_frame("user-1", "3m")
+        assert await engine._get_application_frame("user-1", "3m") is first
+
+        await log.record_status_change("user-1", "app-5", "accepted", 3.0)
+        replayed = await engine._get_application_frame("user-1", "3m")
+        assert replayed is not first and replayed.version == 1
+        assert engine._get_user_applications.await_count == 1
+        assert replayed.frame.loc[5, "status"] == "accepted"
+        assert await engine._get_application_frame("user-1", "3m") is replayed
+
+        await log.invalidate("user-1")
+        rebuilt = await engine._get_application_frame("user-1", "3m")
+        assert rebuilt is not first and rebuilt.version == 2
+        assert engine._get_user_applications.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_unavailable_versions_are_not_cached(self):
+        engine = AnalyticsEngine()
+        engine._get_application_changes = lambda: ApplicationChangeLog(AsyncMock(get=AsyncMock(side_effect=ConnectionError)))
+        engine._get_user_applications = AsyncMock(side_effect=lambda *_: _applications())
+
+        frame = await engine._get_application_frame("user-1", "3m")
+
+        assert len(frame) == 120 and frame.version is None
+        assert engine._application_frames == {}
@@ -0,0 +1,198 @@
+"""
+Unit tests for incremental, content-addressed asset builds.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from app.core.asset_build import (
+    BUILD_MANIFEST_NAME,
+    VERSION_MANIFEST_NAME,
+    IncrementalAssetBuilder,
+    content_addressed_path,
+)
+from app.core.cdn_optimization import AssetVersionManager
+from app.services.cdn_optimization_service import AssetConfig, CDNOptimizationService
+
+
+IMAGE_OPTIONS = {
+    "target_format": None,
+    "formats": ["webp", "jpeg", "png"],
+    "quality": 80,
+    "max_width": 64,
+    "max_height": 64,
+}
+TEXT_OPTIONS = {"gzip": True, "brotli": True, "level": 6}
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    source = tmp_path / "src"
+    (source / "css").mkdir(parents=True)
+    (source / "css" / "app.css").write_text("body { color: red; }\n" * 50)
+    (source / "js").mkdir()
+    (source / "js" / "app.js").write_text("console.log('hello');\n" * 50)
+    Image.new("RGB", (128, 96), (10, 120, 200)).save(source / "logo.png")
+    return source
+
+
+def _builder(output_dir, **image_overrides):
+    return IncrementalAssetBuilder(
+        output_dir,
+        image_options={**IMAGE_OPTIONS, **image_overrides},
+        text_options=TEXT_OPTIONS,
+        max_workers=2,
+    )
+
+
+@pytest.mark.unit
+class TestIncrementalAssetBuilder:
+    """Test incremental builds."""
+
+    @pytest.mark.asyncio
+    async def test_first_build_writes_content_addressed_outputs(self, source_dir, tmp_path):
+        output_dir = tmp_path / "dist"
+
+        result = await _builder(output_dir).build(source_dir)
+
+        assert sorted(result.built) == ["css/app.css", "js/app.js", "logo.png"]
+        assert not result.failed
+
+        css = result.entries["css/app.css"]
+        assert css["versioned_path"] == content_addressed_path("css/app.css", css["sha256"])
+        for output in css["outputs"].values():
+            assert (output_dir / output["path"]).exists()
+        assert set(css["outputs"]) == {"identity", "gzip", "brotli"}
+
+        logo = result.entries["logo.png"]
+        assert logo["versioned_path"].endswith(".webp")
+        assert (logo["width"], logo["height"]) == (64, 48)
+
+        # No temporary files are left behind
+        assert not [p for p in output_dir.rglob("*.tmp")]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_files_are_skipped(self, source_dir, tmp_path):
+        output_dir = tmp_path / "dist"
+        await _builder(output_dir).build(source_dir)
+
+        result = await _builder(output_dir).build(source_dir)
+
+        assert result.built == []
+        assert sorted(result.skipped) == ["css/app.css", "js/app.js", "logo.png"]
+
+    @pytest.mark.asyncio
+    async def test_touched_file_with_same_content_is_not_rebuilt(self, source_dir, tmp_path):
+        output_dir = tmp_path / "dist"
+        await _builder(output_dir).build(source_dir)
+        css = source_dir / "css" / "app.css"
+        stat = css.stat()
+        os.utime(css, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+        result = await _builder(output_dir).build(source_dir)
+
+        assert result.built == []
+        assert result.entries["css/app.css"]["mtime_ns"] == css.stat().st_mtime_ns
+
+    @pytest.mark.asyncio
+    async def test_changed_content_is_rebuilt_under_new_name(self, source_dir, tmp_path):
+        output_dir = tmp_path / "dist"
+        first = await _builder(output_dir).build(source_dir)
+        (source_dir / "js" / "app.js").write_text("console.log('changed');\n")
+
+        second = await _builder(output_dir).build(source_dir)
+
+        assert second.built == ["js/app.js"]
+        assert second.entries["js/app.js"]["versioned_path"] != first.entries["js/app.js"]["versioned_path"]
+
+    @pytest.mark.asyncio
+    async def test_settings_change_rebuilds_only_affected_kind(self, source_dir, tmp_path):
+        output_dir = tmp_path / "dist"
+        await _builder(output_dir).build(source_dir)
+
+        result = await _builder(output_dir, quality=50).build(source_dir)
+
+        assert result.built == ["logo.png"]
+
+    @pytest.mark.asyncio
+    async def test_missing_output_is_rebuilt(self, source_dir, tmp_path):
+        output_dir = tmp_path / "dist"
+        first = await _builder(output_dir).build(source_dir)
+        (output_dir / first.entries["css/app.css"]["outputs"]["gzip"]["path"]).unlink()
+
+        result = await _builder(output_dir).build(source_dir)
+
+        assert result.built == ["css/app.css"]
+
+    @pytest.mark.asyncio
+    async def test_failed_file_is_reported_and_others_still_build(self, source_dir, tmp_path):
+        (source_dir / "broken.png").write_bytes(b"not an image")
+
+        result = await _builder(tmp_path / "dist").build(source_dir)
+
+        assert set(result.failed) == {"broken.png"}
+        assert "broken.png" not in result.version_manifest
+        assert "logo.png" in result.version_manifest
+
+    @pytest.mark.asyncio
+    async def test_removed_sources_leave_the_manifest(self, source_dir, tmp_path):
+        output_dir = tmp_path / "dist"
+        await _builder(output_dir).build(source_dir)
+        (source_dir / "js" / "app.js").unlink()
+
+        result = await _builder(output_dir).build(source_dir)
+
+        assert result.removed == ["js/app.js"]
+        manifest = json.loads((output_dir / BUILD_MANIFEST_NAME).read_text())
+        assert "js/app.js" not in manifest["assets"]
+
+    @pytest.mark.asyncio
+    async def test_version_manifest_is_served_by_asset_version_manager(self, source_dir, tmp_path):
+        output_dir = tmp_path / "dist"
+        result = await _builder(output_dir).build(source_dir)
+
+        manager = AssetVersionManager(output_dir / VERSION_MANIFEST_NAME)
+        await manager.load_manifest()
+
+        assert manager.get_versioned_path("css/app.css") == result.entries["css/app.css"]["versioned_path"]
+        assert (output_dir / manager.get_versioned_path("logo.png")).exists()
+
+
+@pytest.mark.unit
+class TestCDNOptimizationServiceIncremental:
+    """Test the service wiring of incremental builds."""
+
+    @pytest.fixture
+    def service(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        return CDNOptimizationService(AssetConfig(max_image_width=64, max_image_height=64))
+
+    @pytest.mark.asyncio
+    async def test_optimize_directory_keeps_result_keys(self, service, source_dir, tmp_path):
+        assets = await service.optimize_directory(source_dir, tmp_path / "dist", max_workers=2)
+
+        assert set(assets) == {
+            "logo.png", "css/app.css.gzip", "css/app.css.brotli", "js/app.js.gzip", "js/app.js.brotli"
+        }
+        assert Path(assets["css/app.css.gzip"].optimized_path).exists()
+        assert service.optimization_stats["total_assets"] == 5
+
+        await service.optimize_directory(source_dir, tmp_path / "dist", max_workers=2)
+        assert service.optimization_stats["total_assets"] == 5
+
+    @pytest.mark.asyncio
+    async def test_asset_manifest_reuses_hashes_and_excludes_itself(self, service, source_dir, monkeypatch):
+        first = await service.generate_asset_manifest(source_dir)
+        assert "manifest.json" not in first["assets"]
+
+        def fail(path):
+            raise AssertionError("unchanged file was re-hashed")
+
+        monkeypatch.setattr("app.services.cdn_optimization_service.hash_file", fail)
+        second = await service.generate_asset_manifest(source_dir)
+
+        assert second["assets"] == first["assets"]
@@ -0,0 +1,263 @@
+"""
+Unit tests for access-log-driven predictive cache warming.
+"""
+
+import asyncio
+import json
+import math
+import time
+from unittest.mock import AsyncMock
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from app.core.cache_warming import (
+    ACCESS_COSTS_KEY,
+    ACCESS_LOADERS_KEY,
+    AccessLog,
+    PredictiveCacheWarmer,
+    WarmingLoader,
+    predict_hit_probabilities,
+)
+from app.core.config import get_settings
+from app.core.dependencies import ServiceDependencies
+from app.core.logging import get_logger
+from app.core import cache_warming, dependencies, openai_client
+from app.services.semantic_search import main as search_app
+from app.services.semantic_search import service as service_module
+from app.services.semantic_search.models import JobPosting, SemanticSearchRequest, SearchType, UserProfile
+from app.services.semantic_search.service import SEARCH_RESULTS_LOADER, EnhancedSemanticSearchService
+
+HOUR = 3600
+NOW = 1_700_000_000.0 - 1_700_000_000.0 % HOUR + 600  # ten minutes into an hour
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    yield client
+    await client.aclose()
+
+
+def _log(redis_client, sample_rate=1.0, sampler=lambda: 0.0) -> AccessLog:
+    return AccessLog(redis_client, sample_rate=sample_rate, bucket_seconds=HOUR,
+                     retention_seconds=72 * HOUR, sampler=sampler)
+
+
+async def _reads(log: AccessLog, key: str, hours_ago: float, count: int = 1, cost=None, loader="test.loader"):
+    for _ in range(count):
+        await log.record(key, loader, {"key": key}, cost=cost, now=NOW - hours_ago * HOUR)
+
+
+# Loaders resolved by the warmer in these tests
+loaded = []
+in_flight = {"now": 0, "max": 0}
+
+
+async def record_load(args):
+    loaded.append(args["key"])
+
+
+async def slow_load(args):
+    in_flight["now"] += 1
+    in_flight["max"] = max(in_flight["max"], in_flight["now"])
+    await asyncio.sleep(0.2)
+    in_flight["now"] -= 1
+    loaded.append(args["key"])
+
+
+async def failing_load(args):
+    raise RuntimeError("backend down")
+
+
+def _loaders(attribute="record_load"):
+    return {"test.loader": WarmingLoader("test.loader", __name__, attribute)}
+
+
+@pytest.fixture(autouse=True)
+def reset_loads():
+    loaded.clear()
+    in_flight.update(now=0, max=0)
+
+
+@pytest.mark.unit
+class TestAccessLog:
+    """Test sampling and the bucketed history."""
+
+    @pytest.mark.asyncio
+    async def test_sampled_reads_are_scaled(self, redis_client):
+        draws = iter([0.1, 0.6, 0.2, 0.9])
+        log = _log(redis_client, sample_rate=0.25, sampler=lambda: next(draws))
+
+        recorded = [await log.record("k", "test.loader", {"key": "k"}, now=NOW - HOUR) for _ in range(4)]
+
+        assert recorded == [True, False, True, False]
+        assert await log.history(NOW) == {1: {"k": 8.0}}
+        assert await log.descriptors() == {"k": {"loader": "test.loader", "args": {"key": "k"}}}
+
+    @pytest.mark.asyncio
+    async def test_costs_are_recorded_on_misses(self, redis_client):
+        log = _log(redis_client)
+
+        await log.record("k", "test.loader", {}, cost=0.75, now=NOW)
+        await log.record("k", "test.loader", {}, now=NOW)
+
+        assert await log.costs() == {"k": 0.75}
+
+
+@pytest.mark.unit
+class TestPrediction:
+    """Test hit probabilities from recent and same-time-of-day reads."""
+
+    def test_recent_and_frequent_keys_rank_higher(self):
+        history = {1: {"hot": 12.0, "warm": 1.0}, 2: {"hot": 12.0}, 30: {"stale": 50.0}}
+
+        probabilities = predict_hit_probabilities(history, HOUR, 72, horizon_seconds=300)
+
+        assert probabilities["hot"] > probabilities["warm"] > 0
+        assert probabilities["hot"] > probabilities["stale"]
+        assert all(0 <= p < 1 for p in probabilities.values())
+
+    def test_daily_pattern_is_anticipated(self):
+        # Read at this hour on each of the last three days and never since
+        history = {24: {"daily": 6.0}, 48: {"daily": 6.0}, 72: {"daily": 6.0}, 23: {"other": 6.0}}
+
+        probabilities = predict_hit_probabilities(history, HOUR, 72, horizon_seconds=HOUR)
+
+        assert probabilities["daily"] > probabilities["other"]
+        assert probabilities["daily"] > 1 - math.exp(-0.5 * 6.0)
+
+
+@pytest.mark.unit
+class TestPredictiveCacheWarmer:
+    """Test planning and budgeted warming cycles."""
+
+    @pytest.mark.asyncio
+    async def test_plan_ranks_by_probability_times_cost(self, redis_client):
+        log = _log(redis_client)
+        await _reads(log, "cheap-hot", 1, count=10, cost=0.01)
+        await _reads(log, "costly-warm", 1, count=2, cost=2.0)
+        await _reads(log, "hit-only", 1, count=2)
+        await _reads(log, "fresh", 1, count=10, cost=5.0)
+        await _reads(log, "unknown-loader", 1, count=10, cost=5.0, loader="other.loader")
+        await _reads(log, "expired", 100, cost=9.0)
+        await redis_client.set("fresh", "cached", ex=3 * HOUR)
+
+        warmer = PredictiveCacheWarmer(redis_client, log, _loaders(), horizon_seconds=300)
+        plan = await warmer.plan(NOW)
+
+        assert [c.key for c in plan] == ["costly-warm", "hit-only", "cheap-hot"]
+        # Keys only ever seen as hits take the median cost of their loader
+        assert plan[1].cost == pytest.approx(2.0)
+        # Keys that left the retained history are forgotten
+        assert "expired" not in await redis_client.hkeys(ACCESS_LOADERS_KEY)
+
+    @pytest.mark.asyncio
+    async def test_cycle_warms_best_first_with_bounded_concurrency(self, redis_client):
+        log = _log(redis_client)
+        for i in range(8):
+            await _reads(log, f"key-{i}", 1, count=4, cost=8 - i)
+
+        warmer = PredictiveCacheWarmer(redis_client, log, _loaders("slow_load"), concurrency=3)
+        stats = await warmer.run_cycle(now=NOW)
+
+        assert (stats.planned, stats.warmed, stats.failed, stats.skipped) == (8, 8, 0, 0)
+        assert in_flight["max"] == 3
+        assert sorted(loaded[:3]) == ["key-0", "key-1", "key-2"]
+
+    @pytest.mark.asyncio
+    async def test_budget_stops_new_loads(self, redis_client):
+        log = _log(redis_client)
+        for i in range(10):
+            await _reads(log, f"key-{i}", 1, count=4, cost=10 - i)
+
+        warmer = PredictiveCacheWarmer(redis_client, log, _loaders("slow_load"), concurrency=2)
+        stats = await warmer.run_cycle(budget_seconds=0.3, now=NOW)
+
+        assert stats.warmed == 4 and stats.skipped == 6
+        assert sorted(loaded) == ["key-0", "key-1", "key-2", "key-3"]
+
+    @pytest.mark.asyncio
+    async def test_failures_are_counted_and_one_process_warms_at_a_time(self, redis_client):
+        log = _log(redis_client)
+        await _reads(log, "key", 1, cost=1.0)
+
+        failing = PredictiveCacheWarmer(redis_client, log, _loaders("failing_load"))
+        stats = await failing.run_cycle(now=NOW)
+        assert (stats.warmed, stats.failed, stats.failures) == (0, 1, ["key"])
+
+        await redis_client.set("cache:warming:lock", "other-process")
+        stats = await PredictiveCacheWarmer(redis_client, log, _loaders()).run_cycle(now=NOW)
+        assert stats.locked and loaded == []
+
+
+@pytest_asyncio.fixture
+async def search_service(redis_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings().ai, "keyword_index_path", str(tmp_path / "jobs.json.gz"))
+    monkeypatch.setattr(get_settings().redis, "cache_access_sample_rate", 1.0)
+    service = EnhancedSemanticSearchService(ServiceDependencies(
+        None, redis_client, None, get_logger("test"), get_settings()
+    ))
+    service._initialized = True
+    service.index_jobs([JobPosting(
+        id="job-1", title="Python Developer", company="Acme", description="Python role",
+        required_skills=["Python"], location="Remote", remote_type="remote",
+    )])
+    monkeypatch.setattr(service_module, "enhanced_semantic_search_service", service)
+    yield service
+
+
+@pytest.mark.unit
+class TestSearchResultWarming:
+    """Test that cached searches are logged and recomputed through the service."""
+
+    @pytest.mark.asyncio
+    async def test_logged_search_is_rewarmed(self, search_service, redis_client):
+        request = SemanticSearchRequest(
+            user_profile=UserProfile(id="user-1", skills=["Python"]),
+            search_type=SearchType.KEYWORD,
+            match_threshold=0.0,
+        )
+
+        first = await search_service.search_jobs(request)
+        second = await search_service.search_jobs(request)
+
+        assert not first.metadata["cache_hit"] and second.metadata["cache_hit"]
+        key = search_service._generate_cache_key(request)
+        descriptor = json.loads(await redis_client.hget(ACCESS_LOADERS_KEY, key))
+        assert descriptor["loader"] == SEARCH_RESULTS_LOADER
+        assert float(await redis_client.hget(ACCESS_COSTS_KEY, key)) == first.processing_time
+
+        # In the next hour the cached entry has expired; warming recomputes it through search_jobs
+        await redis_client.delete(key)
+        warmer = PredictiveCacheWarmer.from_settings(redis_client, ["semantic_search"])
+        stats = await warmer.run_cycle(now=time.time() + HOUR)
+
+        assert stats.warmed == 1
+        cached = json.loads(await redis_client.get(key))
+        assert [match["job"]["id"] for match in cached["matches"]] == ["job-1"]
+
+
+@pytest.mark.unit
+class TestStartupWarming:
+    """Test that the search API warms its caches before serving."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("warm", [
+        AsyncMock(return_value={"warmed": 3}), AsyncMock(side_effect=ConnectionError)
+    ], ids=["warmed", "failed"])
+    async def test_lifespan_warms_search_caches(self, monkeypatch, redis_client, warm):
+        monkeypatch.setattr(openai_client, "get_openai_client", AsyncMock(
+            return_value=AsyncMock(health_check=AsyncMock(return_value=True))
+        ))
+        monkeypatch.setattr(dependencies, "get_redis_client", AsyncMock(return_value=redis_client))
+        monkeypatch.setattr(get_settings().ai, "pinecone_api_key", None)
+        monkeypatch.setattr(cache_warming, "warm_predicted_caches", warm)
+        monkeypatch.setattr(search_app, "cleanup_all", AsyncMock())
+
+        # A failed cycle leaves startup to carry on
+        async with search_app.lifespan(None):
+            warm.assert_awaited_once_with(
+                ["semantic_search"], budget_seconds=get_settings().redis.cache_warming_startup_budget_seconds
+            )
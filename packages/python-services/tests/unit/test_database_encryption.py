@@ -0,0 +1,194 @@
+"""
+Unit tests for compact binary field encryption.
+
+Covers the AEAD envelope format, the ``EncryptedBinaryType`` column type,
+lazy/session-cached decryption and backward compatibility with the legacy
+``EncryptedField`` JSON format.
+"""
+
+import json
+
+import pytest
+from sqlalchemy import Column, Integer, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from app.core.database_encryption import (
+    DecryptionCache,
+    EncryptedBinaryType,
+    EncryptedType,
+    EncryptionKeyRotationService,
+    LazyDecryptedValue,
+    get_session_decryption_cache,
+)
+from app.core.encryption import (
+    ENVELOPE_VERSION_AESGCM,
+    ENVELOPE_VERSION_CHACHA20,
+    get_encryption_service,
+    is_compact_envelope,
+)
+
+
+Base = declarative_base()
+
+
+class _Contact(Base):
+    __tablename__ = "test_encrypted_contacts"
+
+    id = Column(Integer, primary_key=True)
+    email = Column(EncryptedBinaryType())
+
+
+@pytest.fixture
+def encryption_service():
+    return get_encryption_service()
+
+
+@pytest.mark.unit
+@pytest.mark.security
+class TestCompactEnvelope:
+    """Test the compact envelope format."""
+
+    def test_round_trip_aes_gcm(self, encryption_service):
+        envelope = encryption_service.encrypt_field_compact("user@example.com")
+
+        assert envelope[0] == ENVELOPE_VERSION_AESGCM
+        assert is_compact_envelope(envelope)
+        assert encryption_service.decrypt_field_compact(envelope) == "user@example.com"
+
+    def test_round_trip_chacha20(self, encryption_service):
+        envelope = encryption_service.encrypt_field_compact(
+            "user@example.com", algorithm="chacha20-poly1305"
+        )
+
+        assert envelope[0] == ENVELOPE_VERSION_CHACHA20
+        assert encryption_service.decrypt_field_compact(envelope) == "user@example.com"
+
+    def test_envelope_is_much_smaller_than_legacy_format(self, encryption_service):
+        plaintext = "user@example.com"
+        envelope = encryption_service.encrypt_field_compact(plaintext)
+        legacy = json.dumps(encryption_service.encrypt_field(plaintext).model_dump(), default=str)
+
+        # header (2) + nonce (12) + tag (16)
+        assert len(envelope) == len(plaintext) + 30
+        assert len(envelope) * 3 < len(legacy)
+
+    def test_envelope_records_key_id(self, encryption_service):
+        envelope = encryption_service.encrypt_field_compact("x", key_id="session_default_v1")
+
+        assert encryption_service.get_envelope_key_id(envelope) == "session_default_v1"
+
+    def test_tampered_header_fails_authentication(self, encryption_service):
+        envelope = bytearray(encryption_service.encrypt_field_compact("secret"))
+        envelope[0] = ENVELOPE_VERSION_CHACHA20
+
+        with pytest.raises(Exception):
+            encryption_service.decrypt_field_compact(bytes(envelope))
+
+    def test_decrypt_stored_value_reads_legacy_formats(self, encryption_service):
+        encrypted_field = encryption_service.encrypt_field("legacy@example.com")
+        legacy_json = json.dumps(encrypted_field.model_dump(), default=str)
+
+        assert encryption_service.decrypt_stored_value(encrypted_field) == "legacy@example.com"
+        assert encryption_service.decrypt_stored_value(legacy_json) == "legacy@example.com"
+        assert encryption_service.decrypt_stored_value(legacy_json.encode()) == "legacy@example.com"
+
+
+@pytest.mark.unit
+@pytest.mark.security
+class TestEncryptedBinaryType:
+    """Test the bytea column type against SQLite."""
+
+    @pytest.fixture
+    def session(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            yield session
+
+    def test_values_are_stored_as_envelopes_and_loaded_lazily(self, session):
+        session.add(_Contact(id=1, email="user@example.com"))
+        session.commit()
+        session.expunge_all()
+
+        raw = session.connection().exec_driver_sql(
+            "SELECT email FROM test_encrypted_contacts"
+        ).scalar()
+        assert is_compact_envelope(raw)
+        assert b"user@example.com" not in raw
+
+        contact = session.get(_Contact, 1)
+        assert isinstance(contact.email, LazyDecryptedValue)
+        assert not contact.email.is_decrypted
+        assert contact.email.get_for_session(session) == "user@example.com"
+        assert contact.email == "user@example.com"
+
+    def test_legacy_json_rows_remain_readable(self, session, encryption_service):
+        legacy = json.dumps(
+            encryption_service.encrypt_field("legacy@example.com").model_dump(), default=str
+        ).encode()
+        session.connection().exec_driver_sql(
+            "INSERT INTO test_encrypted_contacts (id, email) VALUES (?, ?)", (2, legacy)
+        )
+        session.commit()
+
+        contact = session.get(_Contact, 2)
+        assert str(contact.email) == "legacy@example.com"
+
+    def test_loaded_value_is_written_back_without_reencryption(self, encryption_service):
+        column_type = EncryptedBinaryType()
+        envelope = encryption_service.encrypt_field_compact("user@example.com")
+        lazy_value = column_type.process_result_value(envelope, None)
+
+        assert column_type.process_bind_param(lazy_value, None) == envelope
+
+    def test_eager_mode_returns_plaintext(self, encryption_service):
+        column_type = EncryptedBinaryType(lazy=False)
+        envelope = column_type.process_bind_param("user@example.com", None)
+
+        assert column_type.process_result_value(envelope, None) == "user@example.com"
+
+    def test_legacy_text_type_reads_compact_envelopes(self, encryption_service):
+        envelope = encryption_service.encrypt_field_compact("user@example.com")
+
+        assert EncryptedType().process_result_value(envelope, None) == "user@example.com"
+
+
+@pytest.mark.unit
+@pytest.mark.security
+class TestDecryptionCache:
+    """Test per-session decrypted value caching."""
+
+    def test_cache_is_scoped_to_session(self):
+        first, second = Session(), Session()
+
+        assert get_session_decryption_cache(first) is get_session_decryption_cache(first)
+        assert get_session_decryption_cache(first) is not get_session_decryption_cache(second)
+
+    def test_cache_hit_skips_decryption(self, encryption_service):
+        envelope = encryption_service.encrypt_field_compact("user@example.com")
+        cache = DecryptionCache()
+        cache.set(envelope, "cached")
+
+        assert LazyDecryptedValue(envelope).get(cache) == "cached"
+
+    def test_cache_is_bounded(self):
+        cache = DecryptionCache(max_size=2)
+        for i in range(3):
+            cache.set(bytes([i]) * 32, str(i))
+
+        assert len(cache) == 2
+        assert cache.get(bytes([0]) * 32) is None
+
+
+@pytest.mark.unit
+@pytest.mark.security
+class TestKeyRotationWithEnvelopes:
+    """Test rotation helpers on compact envelopes."""
+
+    def test_needs_rotation_reads_envelope_key(self, encryption_service):
+        rotation = EncryptionKeyRotationService()
+        envelope = encryption_service.encrypt_field_compact("x", key_id="pii_default_v1")
+
+        assert rotation._needs_key_rotation(envelope, "pii_default_v1")
+        assert rotation._needs_key_rotation(LazyDecryptedValue(envelope), "pii_default_v1")
+        assert not rotation._needs_key_rotation(envelope, "session_default_v1")
@@ -0,0 +1,168 @@
+"""
+Unit tests for the IP reputation index.
+"""
+
+import ipaddress
+import os
+import random
+
+import pytest
+
+from app.core.config import APP_ROOT, SecuritySettings
+from app.core.ip_reputation import (
+    BYTES_PER_NODE,
+    IndexBuilder,
+    IPReputationIndex,
+    IPReputationService,
+    build_index,
+    parse_blocklist,
+)
+
+
+def _index(*entries) -> IPReputationIndex:
+    builder = IndexBuilder()
+    for network, score, source in entries:
+        builder.add(network, score, source)
+    return IPReputationIndex.from_builder(builder)
+
+
+@pytest.mark.unit
+class TestIPReputationIndex:
+    """Test longest-prefix lookups over the compiled trie."""
+
+    def test_cidr_ranges_and_single_addresses(self):
+        index = _index(
+            ("203.0.113.0/24", 0.1, "drop"),
+            ("198.51.100.7", 0.2, "feed"),
+            ("2001:db8::/32", 0.1, "drop6"),
+        )
+
+        assert index.lookup("203.0.113.200").source == "drop"
+        assert index.lookup("203.0.113.200").prefix_length == 24
+        assert index.lookup("198.51.100.7").prefix_length == 32
+        assert index.lookup("198.51.100.8") is None
+        assert index.lookup("2001:db8:1::5").source == "drop6"
+        assert index.lookup("2001:db9::1") is None
+        assert index.lookup("::ffff:203.0.113.9").source == "drop"
+
+    def test_most_specific_prefix_wins(self):
+        index = _index(
+            ("10.0.0.0/8", 0.1, "block"),
+            ("10.1.0.0/16", 0.9, "allow"),
+            ("10.1.2.0/24", 0.05, "block"),
+        )
+
+        assert index.lookup("10.2.3.4").score == pytest.approx(0.1)
+        assert index.lookup("10.1.3.4").source == "allow"
+        assert index.lookup("10.1.2.3").score == pytest.approx(0.05)
+
+    def test_duplicate_prefix_keeps_worst_score(self):
+        index = _index(("192.0.2.0/24", 0.3, "a"), ("192.0.2.0/24", 0.1, "b"), ("192.0.2.0/24", 0.2, "c"))
+
+        match = index.lookup("192.0.2.1")
+        assert (match.source, match.score) == ("b", pytest.approx(0.1))
+        assert index.prefix_count == 1
+
+    def test_default_routes(self):
+        index = _index(("0.0.0.0/0", 0.4, "v4"), ("::/0", 0.6, "any"))
+
+        assert index.lookup("8.8.8.8").source == "v4"
+        assert index.lookup("8.8.8.8").prefix_length == 0
+        assert index.lookup("2001:db8::1").source == "any"
+
+    def test_invalid_input(self):
+        index = _index(("192.0.2.0/24", 0.1, "drop"))
+
+        with pytest.raises(ValueError):
+            index.lookup("not-an-ip")
+        with pytest.raises(ValueError):
+            IndexBuilder().add("192.0.2.0/33", 0.1, "drop")
+
+    def test_matches_brute_force_longest_prefix(self):
+        rng = random.Random(7)
+        networks = [
+            ipaddress.ip_network((rng.getrandbits(32), rng.randint(4, 32)), strict=False)
+            for _ in range(300)
+        ]
+        index = _index(*((str(network), 0.1, "random") for network in networks))
+
+        addresses = [ipaddress.ip_address(rng.getrandbits(32)) for _ in range(200)]
+        addresses += [network.network_address + rng.randrange(network.num_addresses) for network in networks]
+        for address in addresses:
+            matching = [network.prefixlen for network in networks if address in network]
+            match = index.lookup(str(address))
+            assert (match.prefix_length if match else None) == (max(matching) if matching else None)
+
+    def test_memory_is_bounded_per_prefix(self):
+        rng = random.Random(11)
+        index = _index(*(
+            (str(ipaddress.ip_network((rng.getrandbits(32), rng.randint(16, 32)), strict=False)), 0.1, "bulk")
+            for _ in range(5000)
+        ))
+
+        # A Patricia trie has fewer than two nodes per prefix
+        assert index.node_count < 2 * index.prefix_count + 1
+        assert index.nbytes / index.prefix_count < 2 * BYTES_PER_NODE + 8
+
+
+@pytest.mark.unit
+def test_parse_blocklist_skips_comments():
+    lines = ["; Spamhaus DROP", "1.10.16.0/20 ; SBL256894", "# comment", "", "  192.0.2.1  extra"]
+
+    assert list(parse_blocklist(lines)) == ["1.10.16.0/20", "192.0.2.1"]
+
+
+@pytest.mark.unit
+class TestIPReputationService:
+    """Test building from files and hot swapping."""
+
+    def test_builds_from_blocklists_and_maps_the_file(self, tmp_path):
+        blocklist = tmp_path / "drop.txt"
+        blocklist.write_text("203.0.113.0/24\nbogus\n")
+        service = IPReputationService(tmp_path / "index.idx", blocklists=[str(blocklist)])
+
+        assert service.lookup("203.0.113.1") is None
+        assert service.refresh()
+
+        assert service.lookup("203.0.113.1").source == "drop"
+        assert service.lookup("192.168.1.1").source == "builtin"
+        assert service.lookup("garbage") is None
+        assert not service.refresh()
+
+    def test_changed_blocklist_is_hot_swapped(self, tmp_path):
+        blocklist = tmp_path / "drop.txt"
+        blocklist.write_text("203.0.113.0/24\n")
+        service = IPReputationService(tmp_path / "index.idx", blocklists=[str(blocklist)])
+        service.refresh()
+        previous = service.index
+
+        blocklist.write_text("198.51.100.0/24\n")
+        later = os.stat(service.index_path).st_mtime + 5
+        os.utime(blocklist, (later, later))
+
+        assert service.refresh()
+        assert service.index is not previous
+        assert service.lookup("203.0.113.1") is None
+        assert service.lookup("198.51.100.1").source == "drop"
+        # Lookups already holding the old mapping keep working
+        assert previous.lookup("203.0.113.1").source == "drop"
+
+    def test_workers_share_one_file(self, tmp_path):
+        blocklist = tmp_path / "drop.txt"
+        blocklist.write_text("203.0.113.0/24\n")
+        path = build_index([str(blocklist)], tmp_path / "index.idx")
+
+        first = IPReputationService(path, blocklists=[str(blocklist)])
+        second = IPReputationService(path, blocklists=[str(blocklist)])
+
+        assert not first.rebuild_if_stale() and first.reload()
+        assert second.reload()
+        assert first.lookup("203.0.113.5") == second.lookup("203.0.113.5")
+
+    def test_relative_paths_resolve_against_the_service_root(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+
+        security = SecuritySettings(ip_reputation_blocklists=["lists/drop.txt", "/etc/drop.txt"])
+
+        assert security.ip_reputation_index_path == str(APP_ROOT / "data" / "ip_reputation.idx")
+        assert security.ip_reputation_blocklists == [str(APP_ROOT / "lists" / "drop.txt"), "/etc/drop.txt"]
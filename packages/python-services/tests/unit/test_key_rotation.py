@@ -0,0 +1,318 @@
+"""
+Unit tests for the online key rotation engine.
+
+The database is replaced by a small in-memory fake that understands the
+statements issued by the engine, so planning, keyset iteration, batched
+updates and checkpointing can be exercised without PostgreSQL.
+"""
+
+import json
+import re
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import Column, Integer
+from sqlalchemy.orm import declarative_base
+
+from app.core.database_encryption import EncryptedBinaryType, EncryptedText, EncryptionKeyRotationService
+from app.core.encryption import get_encryption_service
+from app.core.key_rotation import (
+    STATUS_COMPLETED,
+    KeyRotationProgress,
+    OnlineKeyRotationEngine,
+    RotationRange,
+)
+
+
+Base = declarative_base()
+
+
+class _Profile(Base):
+    __tablename__ = "rotation_profiles"
+
+    id = Column(Integer, primary_key=True)
+    email = Column(EncryptedBinaryType())
+
+
+class _Note(Base):
+    __tablename__ = "rotation_notes"
+
+    id = Column(Integer, primary_key=True)
+    body = Column(EncryptedText())
+
+
+class _Result:
+    def __init__(self, rows=None, scalar=None):
+        self._rows = rows or []
+        self._scalar = scalar
+
+    def fetchall(self):
+        return self._rows
+
+    def scalar(self):
+        return self._scalar
+
+
+class _FakeDatabase:
+    """In-memory stand-in for the rotated table and the checkpoint table."""
+
+    def __init__(self, rows):
+        self.rows = dict(rows)
+        self.checkpoints = {}
+        self.update_statements = 0
+        self.fail_after_batches = None
+        # Called with the batch about to be written, standing in for a concurrent writer
+        self.before_update = None
+
+    def execute(self, statement, params):
+        sql = " ".join(str(statement).split())
+
+        if sql.startswith("SELECT worker_index"):
+            rows = [
+                SimpleNamespace(**cp) for (job_id, _), cp in sorted(self.checkpoints.items())
+                if job_id == params["job_id"]
+            ]
+            return _Result(rows)
+
+        if "ntile" in sql:
+            pks = sorted(self.rows)
+            workers = params["workers"]
+            size = -(-len(pks) // workers)
+            buckets = [pks[i:i + size] for i in range(0, len(pks), size)]
+            return _Result([(i + 1, str(b[-1]), len(b)) for i, b in enumerate(buckets)])
+
+        if sql.startswith("INSERT INTO key_rotation_checkpoints"):
+            key = (params["job_id"], params["worker_index"])
+            self.checkpoints[key] = dict(
+                worker_index=params["worker_index"],
+                table_name=params["table_name"],
+                old_key_id=params["old_key_id"],
+                new_key_id=params["new_key_id"],
+                range_start=params["range_start"],
+                range_end=params["range_end"],
+                last_pk=params["last_pk"],
+                total_rows=params["total_rows"],
+                rows_processed=0,
+                rows_updated=0,
+                status=params["status"],
+            )
+            return _Result()
+
+        if sql.startswith("SELECT \"id\""):
+            last_pk = int(params["last_pk"]) if params["last_pk"] is not None else None
+            range_end = int(params["range_end"]) if params["range_end"] is not None else None
+            selected = [
+                (pk, self.rows[pk]) for pk in sorted(self.rows)
+                if (last_pk is None or pk > last_pk) and (range_end is None or pk <= range_end)
+            ]
+            return _Result(selected[:params["limit"]])
+
+        if sql.startswith("UPDATE \"rotation_"):
+            assert "FROM (VALUES" in sql and "IS NOT DISTINCT FROM" in sql
+            self.update_statements += 1
+            if self.fail_after_batches is not None and self.update_statements > self.fail_after_batches:
+                raise RuntimeError("connection lost")
+            if self.before_update is not None:
+                self.before_update(params)
+            updated = []
+            for name, value in params.items():
+                match = re.fullmatch(r"pk_(\d+)", name)
+                if not match:
+                    continue
+                new, read = params[f"v_{match.group(1)}_0"], params[f"o_{match.group(1)}_0"]
+                if new is not None and self.rows[int(value)] == read:
+                    self.rows[int(value)] = new
+                    updated.append((value,))
+            return _Result(updated)
+
+        if sql.startswith("UPDATE key_rotation_checkpoints"):
+            checkpoint = self.checkpoints[(params["job_id"], params["worker_index"])]
+            for field in ("last_pk", "rows_processed", "rows_updated", "status"):
+                checkpoint[field] = params[field]
+            return _Result()
+
+        raise AssertionError(f"Unexpected statement: {sql}")
+
+
+class _FakeSession:
+    def __init__(self, database):
+        self.database = database
+
+    async def execute(self, statement, params=None):
+        return self.database.execute(statement, params or {})
+
+    async def commit(self):
+        pass
+
+
+def _session_factory(database):
+    @asynccontextmanager
+    async def factory():
+        yield _FakeSession(database)
+    return factory
+
+
+@pytest.fixture
+def encryption_service():
+    return get_encryption_service()
+
+
+@pytest.fixture
+def database(encryption_service):
+    rows = {}
+    for pk in range(1, 26):
+        key_id = "pii_default_v1" if pk % 5 else "session_default_v1"
+        rows[pk] = encryption_service.encrypt_field_compact(f"user{pk}@example.com", key_id)
+    return _FakeDatabase(rows)
+
+
+def _engine(database, **kwargs):
+    options = dict(
+        rotation_service=EncryptionKeyRotationService(),
+        session_factory=_session_factory(database),
+        workers=3,
+        batch_size=4,
+        max_replication_lag=0,
+        crypto_threads=2,
+    )
+    options.update(kwargs)
+    return OnlineKeyRotationEngine(**options)
+
+
+@pytest.mark.unit
+@pytest.mark.security
+class TestOnlineKeyRotation:
+    """Test parallel keyset rotation."""
+
+    @pytest.mark.asyncio
+    async def test_rotates_only_rows_using_old_key(self, database, encryption_service):
+        engine = _engine(database)
+
+        progress = await engine.rotate_table(_Profile, "pii_default_v1", "session_default_v1")
+
+        assert progress.status == STATUS_COMPLETED
+        assert progress.rows_processed == 25
+        assert progress.rows_updated == 20
+        assert len(progress.ranges) == 3
+        for pk, envelope in database.rows.items():
+            assert encryption_service.get_envelope_key_id(envelope) == "session_default_v1"
+            assert encryption_service.decrypt_field_compact(envelope) == f"user{pk}@example.com"
+
+    @pytest.mark.asyncio
+    async def test_interrupted_rotation_resumes_from_checkpoint(self, database, encryption_service):
+        database.fail_after_batches = 2
+        engine = _engine(database, workers=1)
+
+        with pytest.raises(RuntimeError):
+            await engine.rotate_table(_Profile, "pii_default_v1", "session_default_v1")
+
+        checkpoint = database.checkpoints[("rotation_profiles:pii_default_v1:session_default_v1", 0)]
+        assert checkpoint["last_pk"] == "8"
+        assert checkpoint["rows_processed"] == 8
+
+        database.fail_after_batches = None
+        resumed = _engine(database, workers=1)
+        progress = await resumed.rotate_table(_Profile, "pii_default_v1", "session_default_v1")
+
+        assert progress.resumed_rows == 8
+        assert progress.rows_processed == 25
+        assert all(
+            encryption_service.get_envelope_key_id(envelope) == "session_default_v1"
+            for envelope in database.rows.values()
+        )
+
+    @pytest.mark.asyncio
+    async def test_rotates_legacy_text_columns(self, encryption_service):
+        database = _FakeDatabase({
+            pk: encryption_service.encrypt_field(f"note {pk}", "pii_default_v1").model_dump_json()
+            for pk in range(1, 11)
+        })
+
+        progress = await _engine(database).rotate_table(_Note, "pii_default_v1", "session_default_v1")
+
+        assert progress.rows_updated == 10
+        for pk, stored in database.rows.items():
+            assert json.loads(stored)["key_id"] == "session_default_v1"
+            assert encryption_service.decrypt_stored_value(stored) == f"note {pk}"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_are_not_overwritten(self, database, encryption_service):
+        written = {}
+
+        def concurrent_writer(params):
+            # The application rewrites two rows of the first batch after they were read
+            for pk, key_id in ((2, "pii_default_v1"), (3, "session_default_v1")):
+                if pk not in written:
+                    written[pk] = encryption_service.encrypt_field_compact(f"new{pk}@example.com", key_id)
+                    database.rows[pk] = written[pk]
+
+        database.before_update = concurrent_writer
+        engine = _engine(database, workers=1)
+
+        progress = await engine.rotate_table(_Profile, "pii_default_v1", "session_default_v1")
+
+        assert progress.status == STATUS_COMPLETED
+        assert progress.rows_processed == 25
+        # Row 3 was written with the new key and kept as is; row 2 was re-read and rotated
+        assert database.rows[3] == written[3]
+        assert encryption_service.decrypt_field_compact(database.rows[2]) == "new2@example.com"
+        for envelope in database.rows.values():
+            assert encryption_service.get_envelope_key_id(envelope) == "session_default_v1"
+
+    @pytest.mark.asyncio
+    async def test_progress_can_be_loaded_from_checkpoints(self, database):
+        await _engine(database).rotate_table(_Profile, "pii_default_v1", "session_default_v1")
+
+        progress = await _engine(database).load_progress(
+            "rotation_profiles:pii_default_v1:session_default_v1"
+        )
+
+        assert progress.status == STATUS_COMPLETED
+        assert progress.to_dict()["percent_complete"] == 100.0
+
+    @pytest.mark.asyncio
+    async def test_throttles_while_replication_lag_is_high(self, database, monkeypatch):
+        lags = iter([10.0, 10.0] + [0.0] * 100)
+        sleeps = []
+
+        async def lag_probe():
+            return next(lags)
+
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+
+        monkeypatch.setattr("app.core.key_rotation.asyncio.sleep", fake_sleep)
+        engine = _engine(database, workers=1, max_replication_lag=5.0,
+                         lag_probe=lag_probe, lag_check_interval=0)
+
+        progress = await engine.rotate_table(_Profile, "pii_default_v1", "session_default_v1")
+
+        assert sleeps == [0.5, 1.0]
+        assert progress.throttled_seconds == 1.5
+        assert progress.status == STATUS_COMPLETED
+
+
+@pytest.mark.unit
+class TestKeyRotationProgress:
+    """Test progress and ETA reporting."""
+
+    def test_eta_uses_rate_of_current_run(self):
+        progress = KeyRotationProgress(
+            "job", "users", "old", "new",
+            ranges=[RotationRange(0, None, None, "100", total_rows=1000, rows_processed=600)],
+            resumed_rows=400,
+        )
+        progress.started_at -= 10  # 200 rows in 10s this run
+
+        assert progress.rows_per_second == pytest.approx(20, rel=0.05)
+        assert progress.eta_seconds == pytest.approx(20, rel=0.05)
+        assert progress.percent_complete == 60.0
+
+    def test_eta_unknown_before_any_progress(self):
+        progress = KeyRotationProgress(
+            "job", "users", "old", "new",
+            ranges=[RotationRange(0, None, None, None, total_rows=1000)],
+        )
+
+        assert progress.eta_seconds is None
@@ -0,0 +1,317 @@
+"""
+Unit tests for the in-process BM25 keyword index.
+"""
+
+import math
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import get_settings
+from app.core.dependencies import ServiceDependencies
+from app.core.logging import get_logger
+from app.services.semantic_search.keyword_index import (
+    BLOCK_SIZE,
+    FIELD_WEIGHTS,
+    BM25Index,
+    PostingBlock,
+    tokenize,
+)
+from app.services.semantic_search.models import (
+    JobMatch, JobPosting, SearchFilters, SemanticSearchRequest, SearchType, UserProfile
+)
+from app.services.semantic_search.service import EnhancedSemanticSearchService
+from app.services.semantic_search.tasks import load_active_jobs
+
+WORDS = ["python", "rust", "go", "react", "aws", "kubernetes", "sql", "docker", "data", "platform",
+         "backend", "frontend", "senior", "engineer", "team", "cloud", "ml", "api", "scale", "design"]
+
+
+def _documents(count: int, seed: int = 3) -> dict:
+    rng = random.Random(seed)
+    return {
+        f"job-{i}": {
+            "title": " ".join(rng.choices(WORDS, k=3)),
+            "skills": " ".join(rng.sample(WORDS, 4)),
+            "company": f"company{i % 11}",
+            "description": " ".join(rng.choices(WORDS, k=rng.randrange(5, 40))),
+        }
+        for i in range(count)
+    }
+
+
+def _brute_force(documents: dict, query: dict, k: int, k1: float = 1.2, b: float = 0.75) -> list:
+    """Exhaustive BM25 over the same weighted field frequencies."""
+    frequencies = {}
+    for key, fields in documents.items():
+        counts = Counter()
+        for name, text in fields.items():
+            for token in tokenize(text):
+                counts[token] += FIELD_WEIGHTS[name]
+        frequencies[key] = counts
+    average = sum(sum(counts.values()) for counts in frequencies.values()) / len(frequencies)
+
+    scores = {}
+    for key, counts in frequencies.items():
+        length = sum(counts.values())
+        score = 0.0
+        for term, weight in query.items():
+            df = sum(1 for other in frequencies.values() if term in other)
+            if term in counts:
+                idf = math.log(1 + (len(frequencies) - df + 0.5) / (df + 0.5))
+                tf = counts[term]
+                score += weight * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average))
+        if score > 0:
+            scores[key] = score
+    return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def _assert_same_ranking(hits, expected):
+    assert [hit.key for hit in hits] == [key for key, _ in expected]
+    assert [hit.score for hit in hits] == pytest.approx([score for _, score in expected])
+
+
+@pytest.mark.unit
+class TestBM25Index:
+    """Test indexing, top-k retrieval and snapshots."""
+
+    def test_tokenizer_keeps_skill_spellings(self):
+        assert tokenize("Senior C++ / C# and Node.js engineer.") == ["senior", "c++", "c#", "node.js", "engineer"]
+
+    def test_blocks_round_trip(self):
+        docs = [3, 4, 200, 70_000, 70_001]
+        tfs = [2, 6, 1, 300, 4]
+
+        block = PostingBlock.encode(docs, tfs)
+
+        assert block.decode() == (docs, tfs)
+        assert (block.first, block.last) == (3, 70_001)
+        assert len(block.data) < 8 * len(docs)
+
+    @pytest.mark.parametrize("query", [
+        {"python": 1.0},
+        {"rust": 1.0, "engineer": 1.0, "cloud": 0.5},
+        {"kubernetes": 2.0, "data": 1.0, "missing": 1.0, "company3": 1.0},
+    ])
+    def test_matches_exhaustive_bm25(self, query):
+        documents = _documents(600)
+        index = BM25Index()
+        for key, fields in documents.items():
+            index.add(key, fields)
+
+        _assert_same_ranking(index.search(query, 10), _brute_force(documents, query, 10))
+
+    def test_incremental_updates(self):
+        documents = _documents(400)
+        index = BM25Index()
+        for key, fields in documents.items():
+            index.add(key, fields)
+
+        for i in range(0, 400, 7):
+            index.remove(f"job-{i}")
+            del documents[f"job-{i}"]
+        documents["job-1"] = {"title": "rust rust engineer", "skills": "rust", "company": "x", "description": ""}
+        index.add("job-1", documents["job-1"])
+
+        query = {"rust": 1.0, "engineer": 1.0}
+        _assert_same_ranking(index.search(query, 10), _brute_force(documents, query, 10))
+        assert index.search(query, 1)[0].key == "job-1"
+        assert len(index) == len(documents)
+
+    def test_maxscore_skips_blocks_of_common_terms(self, monkeypatch):
+        rare = {i: "rust rust" for i in range(0, 500, 100)}
+        rare[2000] = "rust rust rust"
+        index = BM25Index()
+        for i in range(BLOCK_SIZE * 20):
+            index.add(f"job-{i}", {"title": f"engineer {rare.get(i, '')}", "description": "engineer team"})
+        decoded = []
+        original = PostingBlock.decode
+        monkeypatch.setattr(PostingBlock, "decode", lambda block: decoded.append(block) or original(block))
+
+        hits = index.search({"rust": 1.0, "engineer": 1.0}, 5)
+
+        assert [hit.key for hit in hits] == ["job-2000", "job-0", "job-100", "job-200", "job-300"]
+        # Once five rust postings are held, "engineer" alone cannot compete and its blocks are skipped
+        assert len(decoded) < len(index.postings["engineer"].blocks) // 2
+
+    def test_calibrated_scores(self):
+        index = BM25Index()
+        index.add("full", {"skills": "python aws"})
+        index.add("half", {"description": "python rust go java"})
+        index.add("other", {"skills": "cobol fortran"})
+
+        hits = {hit.key: hit for hit in index.search({"python": 1.0, "aws": 1.0}, 3)}
+
+        assert hits["full"].calibrated == pytest.approx(1.0, abs=0.05)
+        assert 0 < hits["half"].calibrated < 0.5
+        assert "other" not in hits
+
+    def test_snapshot_round_trip(self, tmp_path):
+        documents = _documents(300)
+        index = BM25Index()
+        for key, fields in documents.items():
+            index.add(key, fields, {"id": key})
+        index.remove("job-5")
+        path = str(tmp_path / "index.json.gz")
+
+        index.save(path)
+        restored = BM25Index.load(path)
+
+        query = {"react": 1.0, "platform": 1.0}
+        assert [(hit.key, hit.score, hit.payload) for hit in restored.search(query, 20)] == [
+            (hit.key, hit.score, hit.payload) for hit in index.search(query, 20)
+        ]
+        assert "job-5" not in restored and len(restored) == 299
+        assert [path.name for path in tmp_path.iterdir()] == ["index.json.gz"]
+
+
+def _job(job_id: str, title: str, skills: list, location: str = "Remote") -> JobPosting:
+    return JobPosting(
+        id=job_id, title=title, company="Acme", description=f"{title} role",
+        required_skills=skills, location=location, remote_type="remote",
+    )
+
+
+def _other_process() -> EnhancedSemanticSearchService:
+    return EnhancedSemanticSearchService(SimpleNamespace(
+        settings=get_settings(), openai=None, redis=None, logger=get_logger("test")
+    ))
+
+
+def _match(job_id: str, score: float) -> JobMatch:
+    return JobMatch(
+        job=_job(job_id, "Engineer", []), semantic_score=score, traditional_score=score, composite_score=score
+    )
+
+
+@pytest_asyncio.fixture
+async def search_service(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings().ai, "keyword_index_path", str(tmp_path / "jobs.json.gz"))
+    redis_client = fakeredis.aioredis.FakeRedis()
+    service = EnhancedSemanticSearchService(ServiceDependencies(
+        None, redis_client, None, get_logger("test"), get_settings()
+    ))
+    service._initialized = True
+    yield service
+    await redis_client.aclose()
+
+
+@pytest.mark.unit
+class TestKeywordSearch:
+    """Test the keyword leg and its fusion with semantic results."""
+
+    @pytest.mark.asyncio
+    async def test_local_keyword_search(self, search_service):
+        search_service.index_jobs([
+            _job("job-1", "Rust Engineer", ["Rust", "Kubernetes"]),
+            _job("job-2", "Python Developer", ["Python", "AWS"]),
+            _job("job-3", "Accountant", ["Excel"]),
+        ])
+        request = SemanticSearchRequest(
+            user_profile=UserProfile(id="user-1", skills=["Python", "AWS"], remote_preferences=["remote"]),
+            search_type=SearchType.KEYWORD,
+            match_threshold=0.0,
+        )
+
+        matches = await search_service._enhanced_keyword_search(request)
+
+        assert [match.job.id for match in matches] == ["job-2"]
+        assert matches[0].semantic_score == pytest.approx(1.0, abs=0.05)
+        assert matches[0].matching_skills == ["python", "aws"]
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_picked_up_by_other_processes(self, search_service):
+        search_service.index_jobs([_job("job-1", "Rust Engineer", ["Rust"])])
+        assert search_service.save_keyword_index()
+
+        other = _other_process()
+        profile = UserProfile(id="user-1", skills=["rust"])
+
+        assert [job.id for job in other._keyword_candidates(profile, 10)] == ["job-1"]
+
+    @pytest.mark.asyncio
+    async def test_filters_apply_before_truncation(self, search_service):
+        search_service.index_jobs(
+            [_job(f"onsite-{i}", "Python Developer", ["Python", "AWS"], location="Berlin") for i in range(40)]
+            + [_job("remote-1", "Developer", ["Python"])]
+        )
+        request = SemanticSearchRequest(
+            user_profile=UserProfile(id="user-1", skills=["Python", "AWS"]),
+            filters=SearchFilters(locations=["Remote"]),
+            search_type=SearchType.KEYWORD,
+            top_k=2,
+            match_threshold=0.0,
+        )
+
+        matches = await search_service._local_keyword_search(request)
+
+        assert [match.job.id for match in matches] == ["remote-1"]
+
+    def test_concurrent_saves_merge_into_the_snapshot(self, search_service):
+        other = _other_process()
+        search_service.index_jobs([_job("job-1", "Rust Engineer", ["Rust"])])
+        other.index_jobs([_job("job-2", "Rust Developer", ["Rust"])])
+
+        assert search_service.save_keyword_index() and other.save_keyword_index()
+        assert set(other.keyword_index.keys) == {"job-1", "job-2"}
+
+        # A removal reaches the snapshot even if this process never indexed the job
+        third = _other_process()
+        third.remove_jobs(["job-1"])
+        search_service.index_jobs([_job("job-3", "Rust Lead", ["Rust"])])
+        assert third.save_keyword_index() and search_service.save_keyword_index()
+
+        profile = UserProfile(id="user-1", skills=["rust"])
+        assert {job.id for job in _other_process()._keyword_candidates(profile, 10)} == {"job-2", "job-3"}
+
+    @pytest.mark.asyncio
+    async def test_sync_bootstraps_from_active_jobs(self, search_service):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.execute(text("""
+                CREATE TABLE jobs (
+                    id TEXT PRIMARY KEY, title TEXT, company TEXT, description TEXT, location TEXT,
+                    salary_min INTEGER, salary_max INTEGER, job_type TEXT, industry TEXT, remote_type TEXT,
+                    required_skills TEXT, preferred_skills TEXT, posted_date TIMESTAMP, company_size TEXT,
+                    benefits TEXT, status TEXT, deleted_at TIMESTAMP
+                )
+            """))
+            for job_id, status, deleted_at in [
+                ("job-1", "active", None), ("job-2", "active", None),
+                ("job-3", "closed", None), ("job-4", "active", "2024-01-01 00:00:00"),
+            ]:
+                await conn.execute(text("""
+                    INSERT INTO jobs (id, title, company, description, location, job_type, remote_type,
+                                      required_skills, preferred_skills, benefits, status, deleted_at)
+                    VALUES (:id, 'Rust Engineer', 'Acme', 'Rust role', 'Remote', 'full-time', 'remote',
+                            '["Rust"]', '[]', '[]', :status, :deleted_at)
+                """), {"id": job_id, "status": status, "deleted_at": deleted_at})
+
+        async with AsyncSession(engine) as session:
+            jobs = await load_active_jobs(session, batch_size=1)
+        await engine.dispose()
+        search_service.index_jobs([_job("gone", "Rust Engineer", ["Rust"])])
+
+        assert [job.id for job in jobs] == ["job-1", "job-2"] and jobs[0].employment_type == "full-time"
+        assert search_service.sync_keyword_index(jobs) == {"indexed": 2, "removed": 1, "documents": 2}
+        assert search_service.sync_keyword_index(jobs) == {"indexed": 0, "removed": 0, "documents": 2}
+        assert set(BM25Index.load(get_settings().ai.keyword_index_path).keys) == {"job-1", "job-2"}
+
+    def test_reciprocal_rank_fusion(self, search_service):
+        semantic = [_match("a", 0.9), _match("b", 0.8), _match("c", 0.7)]
+        keyword = [_match("c", 0.95), _match("d", 0.6)]
+
+        fused = search_service._enhanced_combine_results(semantic, keyword)
+
+        assert [match.job.id for match in fused] == ["c", "a", "b", "d"]
+        assert fused[0].metadata == {
+            "semantic_rank": 3, "keyword_rank": 1, "sources": ["semantic", "keyword"],
+            "keyword_score": 0.95, "rrf_score": pytest.approx(1 / 63 + 1 / 61),
+        }
+        assert fused[0].composite_score == 0.7
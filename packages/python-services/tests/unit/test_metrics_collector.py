@@ -0,0 +1,165 @@
+"""
+Unit tests for the background metrics collectors.
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from app.core.activity_counters import (
+    APPLICATION_SUBMITTED,
+    DOCUMENT_GENERATED,
+    ActivityCounters,
+    mark_session_active,
+)
+from app.core.metrics import (
+    CustomMetricsCollector,
+    broker_queue_keys,
+    read_cgroup_metrics,
+    record_worker_heartbeat,
+)
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest_asyncio.fixture
+async def redis_client(server):
+    client = fakeredis.aioredis.FakeRedis(server=server)
+    yield client
+    await client.aclose()
+
+
+@pytest_asyncio.fixture
+async def collector(redis_client, server, tmp_path):
+    collector = CustomMetricsCollector(
+        redis_client,
+        broker_client=fakeredis.aioredis.FakeRedis(server=server),
+        celery_queues=["analytics", "default"],
+        collection_timeout=0.5,
+        cgroup_root=tmp_path,
+    )
+    yield collector
+    await collector.stop_collection()
+
+
+def _value(metrics: CustomMetricsCollector, name: str, **labels) -> float:
+    return metrics.registry.get_sample_value(name, labels or None)
+
+
+@pytest.mark.unit
+class TestCollectors:
+    """Test that each collector reads real values."""
+
+    @pytest.mark.asyncio
+    async def test_celery_queue_depths_and_workers(self, collector, server):
+        broker = fakeredis.FakeRedis(server=server)
+        low, high = broker_queue_keys("analytics")[0], broker_queue_keys("analytics")[3]
+        broker.rpush(low, "a", "b")
+        broker.rpush(high, "c")
+        now = time.time()
+        record_worker_heartbeat(broker, "celery@worker-1", now)
+        record_worker_heartbeat(broker, "celery@worker-2", now - 120)
+
+        assert await collector.collect_once("celery")
+
+        assert high == "analytics\x06\x169"
+        assert _value(collector, "celery_queue_length", queue="analytics") == 3
+        assert _value(collector, "celery_queue_length", queue="default") == 0
+        assert _value(collector, "celery_workers_active") == 1
+
+    @pytest.mark.asyncio
+    async def test_business_rates_from_counters(self, collector, redis_client):
+        activity = ActivityCounters(redis_client)
+        last_minute = time.time() - 60
+        await activity.record(APPLICATION_SUBMITTED, 10, now=last_minute)
+        await activity.record(DOCUMENT_GENERATED, 5, now=last_minute)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for session_id in ("s1", "s2", "s1"):
+                mark_session_active(pipe, session_id, 300)
+            await pipe.execute()
+
+        assert await collector.collect_once("business")
+
+        assert _value(collector, "job_applications_per_minute") == 2.0
+        assert _value(collector, "document_generations_per_minute") == 1.0
+        assert _value(collector, "user_sessions_active") == 2
+
+    @pytest.mark.asyncio
+    async def test_system_metrics_from_the_process(self, collector, tmp_path):
+        (tmp_path / "cgroup.controllers").write_text("cpu memory\n")
+        (tmp_path / "memory.current").write_text("1048576\n")
+        (tmp_path / "memory.max").write_text("max\n")
+
+        assert await collector.collect_once("system")
+
+        assert _value(collector, "process_memory_rss_bytes") > 0
+        assert _value(collector, "process_threads") >= 1
+        assert _value(collector, "cgroup_memory_usage_bytes") == 1048576
+        assert _value(collector, "cgroup_memory_limit_bytes") == 0
+
+
+@pytest.mark.unit
+class TestScheduling:
+    """Test that collectors are isolated from each other."""
+
+    @pytest.mark.asyncio
+    async def test_timeouts_are_counted(self, collector):
+        async def hang():
+            await asyncio.sleep(10)
+
+        assert not await collector.collect_once("system", hang)
+        assert _value(collector, "metrics_collector_failures_total", collector="system", reason="timeout") == 1
+        assert "system" not in collector.last_collected
+
+    @pytest.mark.asyncio
+    async def test_a_stalled_collector_does_not_delay_the_others(self, collector, monkeypatch):
+        async def hang():
+            await asyncio.sleep(10)
+
+        monkeypatch.setattr(collector, "_collect_system_metrics", hang)
+        # fakeredis has no INFO
+        monkeypatch.setattr(collector.redis_client, "info", AsyncMock(return_value={"used_memory": 1024}))
+        await collector.start_collection()
+        await asyncio.sleep(0.1)
+
+        assert collector.is_collecting
+        assert {"redis", "celery", "business"} <= set(collector.last_collected)
+        assert "system" not in collector.last_collected
+        assert _value(collector, "redis_memory_usage_bytes") == 1024
+
+        await collector.stop_collection()
+        assert not collector.is_collecting
+
+
+@pytest.mark.unit
+class TestCgroups:
+    """Test cgroup v1 and v2 parsing."""
+
+    def test_v2(self, tmp_path):
+        (tmp_path / "cgroup.controllers").write_text("cpu memory\n")
+        (tmp_path / "memory.current").write_text("200\n")
+        (tmp_path / "memory.max").write_text("1000\n")
+        (tmp_path / "cpu.max").write_text("150000 100000\n")
+        (tmp_path / "cpu.stat").write_text("usage_usec 10\nthrottled_usec 2500000\n")
+
+        assert read_cgroup_metrics(tmp_path) == {
+            "memory_usage_bytes": 200, "memory_limit_bytes": 1000,
+            "cpu_limit_cores": 1.5, "cpu_throttled_seconds": 2.5,
+        }
+
+    def test_v1_unlimited(self, tmp_path):
+        (tmp_path / "memory").mkdir()
+        (tmp_path / "cpu").mkdir()
+        (tmp_path / "memory" / "memory.usage_in_bytes").write_text("300\n")
+        (tmp_path / "memory" / "memory.limit_in_bytes").write_text("9223372036854771712\n")
+        (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+        (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+
+        assert read_cgroup_metrics(tmp_path) == {"memory_usage_bytes": 300}
@@ -0,0 +1,157 @@
+"""
+Unit tests for monthly partition maintenance.
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.partitioning import (
+    Partition,
+    PartitionedTable,
+    PartitionManager,
+    add_months,
+    expired_partitions,
+    missing_partitions,
+)
+
+NOW = datetime(2024, 5, 17, 12, 30, tzinfo=timezone.utc)
+
+
+def _utc(year: int, month: int) -> datetime:
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def _monthly(table: str, *months) -> list:
+    return [
+        Partition(f"{table}_p{year}_{month:02d}", _utc(year, month), add_months(_utc(year, month), 1))
+        for year, month in months
+    ]
+
+
+class FakeConnection:
+    """Records statements and answers the partition catalog query."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.statements = []
+
+    async def execution_options(self, **options):
+        return self
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        if "pg_inherits" in sql:
+            rows = [SimpleNamespace(name=name, bound=bound) for name, bound in self.bounds.get(params["table"], [])]
+            return SimpleNamespace(fetchall=lambda: rows)
+        self.statements.append(" ".join(sql.split()))
+        return SimpleNamespace()
+
+
+class FakeEngine:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def connect(self):
+        yield self.conn
+
+
+@pytest.mark.unit
+class TestPartitionPlanning:
+    """Test which partitions are created and retired."""
+
+    def test_bounds_are_parsed(self):
+        legacy = Partition.from_bound("audit_logs_legacy", "FOR VALUES FROM (MINVALUE) TO ('2024-03-01 00:00:00+00')")
+        monthly = Partition.from_bound(
+            "audit_logs_p2024_03", "FOR VALUES FROM ('2024-03-01 00:00:00+00') TO ('2024-04-01 00:00:00+00')"
+        )
+
+        assert legacy == Partition("audit_logs_legacy", None, _utc(2024, 3))
+        assert monthly.lower == _utc(2024, 3) and monthly.upper == _utc(2024, 4)
+        assert Partition.from_bound("audit_logs_default", "DEFAULT") is None
+
+    def test_missing_months_are_premade(self):
+        existing = _monthly("audit_logs", (2024, 5), (2024, 6))
+
+        missing = missing_partitions("audit_logs", existing, NOW, premake_months=3)
+
+        assert [(name, lower, upper) for name, lower, upper in missing] == [
+            ("audit_logs_p2024_07", _utc(2024, 7), _utc(2024, 8)),
+            ("audit_logs_p2024_08", _utc(2024, 8), _utc(2024, 9)),
+        ]
+
+    def test_legacy_range_is_not_recreated(self):
+        existing = [Partition("audit_logs_legacy", None, _utc(2024, 6))]
+
+        missing = missing_partitions("audit_logs", existing, NOW, premake_months=1)
+
+        assert [name for name, _, _ in missing] == ["audit_logs_p2024_06"]
+
+    def test_year_boundaries(self):
+        missing = missing_partitions("security_events", [], datetime(2024, 12, 31, 23, 59), premake_months=1)
+
+        assert [name for name, _, _ in missing] == ["security_events_p2024_12", "security_events_p2025_01"]
+        assert add_months(_utc(2024, 1), -13) == _utc(2022, 12)
+
+    def test_only_fully_expired_partitions_are_retired(self):
+        existing = [Partition("audit_logs_legacy", None, _utc(2023, 3))] + _monthly(
+            "audit_logs", (2023, 3), (2023, 4), (2023, 5), (2023, 6)
+        )
+
+        expired = expired_partitions(existing, NOW, retention_months=12)
+
+        assert [partition.name for partition in expired] == ["audit_logs_legacy", "audit_logs_p2023_03", "audit_logs_p2023_04"]
+        assert expired_partitions(existing, NOW, None) == []
+
+
+@pytest.mark.unit
+class TestPartitionManager:
+    """Test the DDL issued by partition maintenance."""
+
+    @pytest.mark.asyncio
+    async def test_maintain_creates_and_retires(self):
+        bound = "FOR VALUES FROM ('{}') TO ('{}')"
+        conn = FakeConnection({
+            "audit_logs": [
+                ("audit_logs_p2022_04", bound.format("2022-04-01 00:00:00+00", "2022-05-01 00:00:00+00")),
+                ("audit_logs_p2024_05", bound.format("2024-05-01 00:00:00+00", "2024-06-01 00:00:00+00")),
+            ],
+            "security_events": [
+                ("security_events_legacy", "FOR VALUES FROM (MINVALUE) TO ('2023-01-01 00:00:00+00')"),
+                ("security_events_p2024_05", bound.format("2024-05-01 00:00:00+00", "2024-06-01 00:00:00+00")),
+                ("security_events_p2024_06", bound.format("2024-06-01 00:00:00+00", "2024-07-01 00:00:00+00")),
+            ],
+        })
+        manager = PartitionManager(
+            FakeEngine(conn),
+            [PartitionedTable("audit_logs", 24, archive=True), PartitionedTable("security_events", 12)],
+            premake_months=1,
+            archive_schema="archive",
+        )
+
+        result = await manager.maintain(NOW)
+
+        assert result == {
+            "audit_logs": {"created": ["audit_logs_p2024_06"], "retired": ["audit_logs_p2022_04"]},
+            "security_events": {"created": [], "retired": ["security_events_legacy"]},
+        }
+        assert conn.statements == [
+            'CREATE TABLE IF NOT EXISTS "audit_logs_p2024_06" PARTITION OF "audit_logs" '
+            "FOR VALUES FROM ('2024-06-01T00:00:00+00:00') TO ('2024-07-01T00:00:00+00:00')",
+            'ALTER TABLE "audit_logs" DETACH PARTITION "audit_logs_p2022_04" CONCURRENTLY',
+            'CREATE SCHEMA IF NOT EXISTS "archive"',
+            'ALTER TABLE "audit_logs_p2022_04" SET SCHEMA "archive"',
+            'ALTER TABLE "security_events" DETACH PARTITION "security_events_legacy" CONCURRENTLY',
+            'DROP TABLE "security_events_legacy"',
+        ]
+
+    @pytest.mark.asyncio
+    async def test_unpartitioned_tables_are_skipped(self):
+        conn = FakeConnection({})
+        manager = PartitionManager(FakeEngine(conn), [PartitionedTable("audit_logs", 24)], premake_months=1)
+
+        assert await manager.maintain(NOW) == {}
+        assert conn.statements == []
@@ -0,0 +1,154 @@
+"""
+Unit tests for compiled RBAC permission sets.
+"""
+
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.permissions import PermissionBits, PermissionResolver
+
+
+SCHEMA = [
+    "CREATE TABLE permissions (id TEXT PRIMARY KEY, name TEXT UNIQUE)",
+    "CREATE TABLE role_permissions (role_id TEXT, permission_id TEXT)",
+    "CREATE TABLE user_roles (user_id TEXT, role_id TEXT)",
+]
+
+PERMISSIONS = {"p1": "user:read", "p2": "job:read", "p3": "role:create", "p4": "user:manage_roles"}
+ROLE_PERMISSIONS = [("member", "p1"), ("member", "p2"), ("admin", "p1"), ("admin", "p3"), ("admin", "p4")]
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        for statement in SCHEMA:
+            await conn.execute(text(statement))
+        for permission_id, name in PERMISSIONS.items():
+            await conn.execute(text("INSERT INTO permissions VALUES (:id, :name)"), {"id": permission_id, "name": name})
+        for role_id, permission_id in ROLE_PERMISSIONS:
+            await conn.execute(
+                text("INSERT INTO role_permissions VALUES (:role_id, :permission_id)"),
+                {"role_id": role_id, "permission_id": permission_id}
+            )
+        await conn.execute(text("INSERT INTO user_roles VALUES ('alice', 'member')"))
+
+    async with async_sessionmaker(engine, class_=AsyncSession)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def _resolver(server, **kwargs) -> PermissionResolver:
+    return PermissionResolver(fakeredis.aioredis.FakeRedis(server=server), **kwargs)
+
+
+async def _grant_role(session, user_id: str, role_id: str):
+    await session.execute(
+        text("INSERT INTO user_roles VALUES (:user_id, :role_id)"), {"user_id": user_id, "role_id": role_id}
+    )
+    await session.commit()
+
+
+@pytest.mark.unit
+class TestPermissionResolver:
+    """Test permission resolution, caching and invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_resolves_flattened_permissions_in_one_query(self, session, server):
+        resolver = _resolver(server)
+        await _grant_role(session, "alice", "admin")
+
+        with patch.object(session, "execute", wraps=session.execute) as execute:
+            compiled = await resolver.resolve(session, "alice")
+            again = await resolver.resolve(session, "alice")
+
+        assert compiled.permissions == frozenset(PERMISSIONS.values())
+        assert again is compiled
+        assert execute.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_multi_permission_check_is_a_bitmask_test(self, session, server):
+        resolver = _resolver(server)
+        compiled = await resolver.resolve(session, "alice")
+
+        assert compiled.has_all(resolver.compile("user:read", "job:read"))
+        assert not compiled.has_all(resolver.compile("user:read", "role:create"))
+        assert compiled.missing(["user:read", "role:create"]) == {"role:create"}
+        assert await resolver.has_permissions(session, "alice", resolver.compile()) is True
+
+    @pytest.mark.asyncio
+    async def test_redis_cache_is_shared_between_processes(self, session, server):
+        await _resolver(server).resolve(session, "alice")
+        other = _resolver(server)
+
+        with patch.object(session, "execute", wraps=session.execute) as execute:
+            compiled = await other.resolve(session, "alice")
+
+        assert compiled.permissions == {"user:read", "job:read"}
+        execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_user_version_invalidates_every_process(self, session, server):
+        first, second = _resolver(server), _resolver(server)
+        assert not (await first.resolve(session, "alice")).has_all(first.compile("role:create"))
+        await second.resolve(session, "alice")
+
+        await _grant_role(session, "alice", "admin")
+        await first.invalidate_user("alice")
+
+        assert (await second.resolve(session, "alice")).has_all(second.compile("role:create"))
+
+    @pytest.mark.asyncio
+    async def test_global_version_invalidates_all_users(self, session, server):
+        resolver = _resolver(server)
+        await resolver.resolve(session, "alice")
+
+        await session.execute(text("INSERT INTO role_permissions VALUES ('member', 'p3')"))
+        await session.commit()
+        await _resolver(server).invalidate_all()
+
+        assert "role:create" in (await resolver.resolve(session, "alice")).permissions
+
+    @pytest.mark.asyncio
+    async def test_without_redis_versions_are_local(self, session):
+        resolver = PermissionResolver()
+        assert (await resolver.resolve(session, "alice")).permissions == {"user:read", "job:read"}
+
+        await _grant_role(session, "alice", "admin")
+        await resolver.invalidate_user("alice")
+
+        assert "user:manage_roles" in (await resolver.resolve(session, "alice")).permissions
+
+    @pytest.mark.asyncio
+    async def test_local_cache_is_bounded(self, session, server):
+        resolver = _resolver(server, local_cache_size=1)
+        await _grant_role(session, "bob", "member")
+
+        await resolver.resolve(session, "alice")
+        await resolver.resolve(session, "bob")
+
+        assert list(resolver._local) == ["bob"]
+
+
+@pytest.mark.unit
+def test_permission_bits_are_stable():
+    bits = PermissionBits()
+
+    assert bits.mask(["a", "b"]) == 0b11
+    assert bits.bit("a") == 1 and bits.bit("c") == 4
+    assert bits.mask([]) == 0
@@ -0,0 +1,168 @@
+"""
+Unit tests for incrementally maintained platform statistics.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import fakeredis
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.services.analytics.platform_stats import (
+    PlatformStatistics,
+    ResponseTimeSketch,
+    milestones_reached,
+    segments_for,
+)
+from app.services.analytics.service import MIN_PLATFORM_SAMPLE_SIZE, AnalyticsEngine
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    client = fakeredis.aioredis.FakeRedis()
+    yield client
+    await client.aclose()
+
+
+@pytest.mark.unit
+class TestMilestones:
+    """Test how status changes map onto counted milestones."""
+
+    @pytest.mark.parametrize("previous, status, expected", [
+        ("submitted", "interview_scheduled", ["responded", "interviewed"]),
+        ("submitted", "rejected", ["responded"]),
+        ("interview_scheduled", "interview_completed", []),
+        ("interview_completed", "offer_received", ["offered"]),
+        ("interview_scheduled", "rejected", []),
+        ("submitted", "under_review", []),
+        (None, "accepted", ["responded", "interviewed", "offered"]),
+    ])
+    def test_milestones_are_counted_once(self, previous, status, expected):
+        assert milestones_reached(previous, status) == expected
+
+    def test_segments(self):
+        assert segments_for(" Technology ", "Senior") == ["all", "industry:technology", "level:senior"]
+        assert segments_for(None, "") == ["all"]
+
+
+@pytest.mark.unit
+class TestResponseTimeSketch:
+    """Test the log-bucketed quantile sketch."""
+
+    def test_quantiles_within_relative_accuracy(self):
+        sketch = ResponseTimeSketch(relative_accuracy=0.02)
+        values = np.random.default_rng(3).exponential(7, 5000) + 0.1
+        counts = {}
+        for value in values:
+            bucket = sketch.bucket(value)
+            counts[bucket] = counts.get(bucket, 0) + 1
+
+        for q in (0.1, 0.5, 0.9, 0.99):
+            exact = np.quantile(values, q, method="lower")
+            assert sketch.quantile(counts, q) == pytest.approx(exact, rel=0.05)
+        assert len(counts) < 300
+
+    def test_empty_and_tiny_values(self):
+        sketch = ResponseTimeSketch()
+
+        assert sketch.quantile({}, 0.5) is None
+        assert sketch.bucket(0.0) == 0
+        assert sketch.quantile({0: 3}, 0.5) == sketch.min_value
+
+
+@pytest.mark.unit
+class TestPlatformStatistics:
+    """Test event recording and constant-time snapshots."""
+
+    @pytest.mark.asyncio
+    async def test_counts_rates_by_segment(self, redis_client):
+        stats = PlatformStatistics(redis_client)
+        submitted = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        for i in range(4):
+            await stats.record_application(f"user-{i % 2}", "technology", "senior", submitted)
+        await stats.record_application("user-3", "finance", None, submitted)
+
+        await stats.record_status_change("submitted", "interview_scheduled", "technology", "senior",
+                                         submitted, submitted + timedelta(days=3))
+        await stats.record_status_change("interview_scheduled", "offer_received", "technology", "senior",
+                                         submitted, submitted + timedelta(days=9))
+        await stats.record_status_change("submitted", "rejected", "finance", None,
+                                         submitted.replace(tzinfo=None), submitted + timedelta(days=5))
+
+        snapshot = await stats.snapshot(now=submitted + timedelta(days=10))
+
+        assert snapshot.overall.applications == 5
+        assert snapshot.overall.rates() == {
+            "applications": 5, "response_rate": 40.0, "interview_rate": 20.0, "offer_rate": 20.0,
+        }
+        assert snapshot.industries["technology"].rate("responded") == 25.0
+        assert snapshot.industries["finance"].responded == 1
+        assert set(snapshot.levels) == {"senior"}
+        assert snapshot.overall.mean_response_days == pytest.approx(4.0)
+        assert snapshot.overall.std_response_days == pytest.approx(1.0)
+        assert snapshot.month == "2024-05"
+        assert snapshot.applications_per_applicant == pytest.approx(5 / 3, rel=0.05)
+
+    @pytest.mark.asyncio
+    async def test_snapshot_prefers_last_complete_month(self, redis_client):
+        stats = PlatformStatistics(redis_client)
+        await stats.record_application("a", submitted_at=datetime(2024, 4, 10, tzinfo=timezone.utc))
+        await stats.record_application("a", submitted_at=datetime(2024, 4, 20, tzinfo=timezone.utc))
+        await stats.record_application("b", submitted_at=datetime(2024, 5, 2, tzinfo=timezone.utc))
+
+        snapshot = await stats.snapshot(now=datetime(2024, 5, 3, tzinfo=timezone.utc))
+
+        assert (snapshot.month, snapshot.monthly_applications, snapshot.monthly_applicants) == ("2024-04", 2, 1)
+
+    @pytest.mark.asyncio
+    async def test_snapshot_cost_does_not_grow_with_applications(self, redis_client):
+        stats = PlatformStatistics(redis_client)
+        rng = random.Random(5)
+        for i in range(300):
+            await stats.record_application(f"user-{i}", rng.choice(["technology", "finance"]), "mid")
+
+        with patch.object(redis_client, "pipeline", wraps=redis_client.pipeline) as pipeline:
+            snapshot = await stats.snapshot()
+
+        assert pipeline.call_count == 2
+        assert snapshot.overall.applications == 300
+
+
+@pytest.mark.unit
+class TestAnalyticsEngineBenchmarks:
+    """Test that benchmarks are read from the live counters."""
+
+    @pytest.mark.asyncio
+    async def test_live_benchmarks_replace_defaults(self, redis_client):
+        engine = AnalyticsEngine()
+        engine._platform_stats_store = PlatformStatistics(redis_client)
+        submitted = datetime.now(timezone.utc) - timedelta(days=6)
+        for i in range(MIN_PLATFORM_SAMPLE_SIZE):
+            await engine._platform_stats_store.record_application(f"user-{i}", "technology", "junior", submitted)
+            if i % 4 == 0:
+                await engine._platform_stats_store.record_status_change("submitted", "rejected", "technology",
+                                                                       "junior", submitted)
+
+        benchmarks = await engine.get_platform_benchmarks()
+
+        assert benchmarks["source"] == "live"
+        assert benchmarks["data_points"] == MIN_PLATFORM_SAMPLE_SIZE
+        assert benchmarks["platform_averages"]["response_rate"] == 25.0
+        assert benchmarks["platform_averages"]["average_response_time_days"] == pytest.approx(6.0, abs=0.01)
+        assert benchmarks["industry_benchmarks"]["technology"]["applications"] == MIN_PLATFORM_SAMPLE_SIZE
+        assert benchmarks["response_time_percentiles"]["50"] == pytest.approx(6.0, rel=0.03)
+
+    @pytest.mark.asyncio
+    async def test_small_samples_use_defaults(self, redis_client):
+        engine = AnalyticsEngine()
+        engine._platform_stats_store = PlatformStatistics(redis_client)
+        await engine._platform_stats_store.record_application("user-1", "technology")
+
+        benchmarks = await engine.get_platform_benchmarks()
+
+        assert benchmarks["source"] == "default"
+        assert benchmarks["platform_averages"]["response_rate"] == 25.0
+        assert "median" in benchmarks["percentile_ranges"]
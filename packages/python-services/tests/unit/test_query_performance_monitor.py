@@ -0,0 +1,174 @@
+"""
+Unit tests for the query performance monitor.
+"""
+
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.services.query_performance_monitor import (
+    FingerprintCache,
+    LatencyHistogram,
+    QueryPerformanceMonitor,
+)
+
+SEQ_SCAN_PLAN = {"Plan": {"Node Type": "Seq Scan", "Relation Name": "jobs", "Plan Rows": 50000}}
+
+
+@pytest.fixture
+def monitor():
+    return QueryPerformanceMonitor(SimpleNamespace(engines={}))
+
+
+@pytest_asyncio.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE jobs (id INTEGER PRIMARY KEY, title TEXT)"))
+        await conn.execute(text("INSERT INTO jobs (title) VALUES ('a'), ('b'), ('c')"))
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.unit
+class TestLatencyHistogram:
+    """Test the streaming latency histogram."""
+
+    def test_quantiles_within_bucket_accuracy(self):
+        values = np.random.default_rng(41).lognormal(mean=-5, sigma=1.5, size=20000)
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(float(value))
+
+        for q in (0.5, 0.95, 0.99):
+            exact = np.quantile(values, q, method="lower")
+            assert histogram.quantile(q) == pytest.approx(exact, rel=1 / LatencyHistogram.SUB_BUCKETS)
+        assert histogram.count == len(values)
+
+    def test_out_of_range_values_are_clamped(self):
+        histogram = LatencyHistogram()
+        for value in (0.0, 1e-9, 10_000.0):
+            histogram.record(value)
+
+        assert histogram.quantile(0.0) < 1e-4
+        assert histogram.quantile(1.0) > 256
+        assert LatencyHistogram().quantile(0.5) == 0.0
+
+    def test_merge(self):
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.record(0.01)
+        second.record(0.02)
+        first.merge(second)
+
+        assert first.count == 2
+        assert first.total == pytest.approx(0.03)
+
+
+@pytest.mark.unit
+class TestFingerprintCache:
+    """Test statement fingerprinting."""
+
+    def test_repeated_statements_are_fingerprinted_once(self):
+        cache = FingerprintCache()
+        statement = "SELECT id FROM jobs   WHERE id = $1"
+
+        first = cache.get(statement)
+        for _ in range(100):
+            assert cache.get(statement) is first
+
+        assert cache.misses == 1
+        assert first.pattern == "select id from jobs where id = $?"
+        assert first.explainable
+
+    def test_inlined_literals_share_a_fingerprint(self):
+        cache = FingerprintCache(max_size=2)
+        hashes = {cache.get(f"SELECT * FROM jobs WHERE id = {i} AND title = 'x{i}'").query_hash for i in range(5)}
+
+        assert len(hashes) == 1
+        assert len(cache) == 2
+        assert not cache.get("EXPLAIN (FORMAT JSON) SELECT 1").explainable
+
+
+@pytest.mark.unit
+class TestCursorHooks:
+    """Test instrumentation through SQLAlchemy cursor events."""
+
+    @pytest.mark.asyncio
+    async def test_executions_are_recorded_per_fingerprint(self, monitor, engine):
+        monitor.instrument(engine)
+        async with engine.connect() as conn:
+            for _ in range(50):
+                await conn.execute(text("SELECT title FROM jobs WHERE id = :id"), {"id": random.randint(1, 3)})
+            with pytest.raises(Exception):
+                await conn.execute(text("SELECT missing FROM jobs"))
+
+        stats = {stats.query_pattern: stats for stats in monitor.query_stats.values()}
+        select = stats["select title from jobs where id = ?"]
+        assert select.execution_count == 50
+        assert select.histogram.count == 50
+        assert stats["select missing from jobs"].error_count == 1
+        assert monitor.fingerprints.misses == len(stats)
+
+        monitor.uninstrument(engine)
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT title FROM jobs WHERE id = :id"), {"id": 1})
+        assert select.execution_count == 50
+
+    @pytest.mark.asyncio
+    async def test_slow_query_plans_are_rate_limited(self, monitor, engine):
+        monitor.slow_query_threshold = 0.0
+        monitor._get_execution_plan = AsyncMock(return_value=json.dumps([SEQ_SCAN_PLAN]))
+        monitor.instrument(engine)
+
+        async with engine.connect() as conn:
+            for job_id in (1, 2, 3):
+                await conn.execute(text("SELECT title FROM jobs WHERE id = :id"), {"id": job_id})
+        await asyncio.gather(*monitor._plan_tasks)
+
+        monitor._get_execution_plan.assert_awaited_once()
+        statement, parameters, plan_engine = monitor._get_execution_plan.await_args.args
+        assert statement == "SELECT title FROM jobs WHERE id = ?"
+        assert parameters == (1,)
+        assert plan_engine is engine
+
+        first = monitor.slow_queries[0]
+        assert first.execution_plan is not None
+        assert any("sequential scan" in item for item in first.recommendations)
+
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT title FROM jobs WHERE id = :id"), {"id": 1})
+        assert monitor.slow_queries[-1].recommendations == first.recommendations
+        monitor._get_execution_plan.assert_awaited_once()
+
+    def test_sync_engines_skip_plan_capture(self, monitor):
+        engine = create_engine("sqlite://")
+        monitor.slow_query_threshold = 0.0
+        monitor._get_execution_plan = AsyncMock()
+        monitor.instrument(engine)
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        assert len(monitor.slow_queries) == 1
+        monitor._get_execution_plan.assert_not_called()
+
+
+@pytest.mark.unit
+def test_auto_explain_log_ingestion(monitor):
+    entry = {"Query Text": "SELECT * FROM jobs WHERE title = $1", **SEQ_SCAN_PLAN}
+    log_line = "2024-05-06 10:00:00 UTC LOG:  duration: 2300.1 ms  plan:\n" + json.dumps(entry)
+
+    query_hash = monitor.ingest_auto_explain(log_line)
+
+    assert query_hash == monitor._get_query_hash("SELECT * FROM jobs WHERE title = $1")
+    assert monitor.plans[query_hash].source == "auto_explain"
+    assert monitor.plans[query_hash].recommendations
+    assert monitor.ingest_auto_explain("not a plan") is None
@@ -0,0 +1,181 @@
+"""
+Unit tests for lag-aware read replica routing and read-your-writes.
+"""
+
+import time
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.database_pool import (
+    ConnectionMetrics,
+    DatabaseConfig,
+    DatabaseConnectionPool,
+    DatabaseRole,
+    QueryType,
+    ReadYourWritesMode,
+    WriteToken,
+    format_lsn,
+    parse_lsn,
+    set_last_write_token,
+)
+
+
+def _config(role: DatabaseRole) -> DatabaseConfig:
+    return DatabaseConfig(
+        host="localhost", port=5432, database="test",
+        username="test", password="test", role=role, max_size=10
+    )
+
+
+@pytest.fixture
+def pool():
+    pool = DatabaseConnectionPool(
+        [_config(DatabaseRole.PRIMARY), _config(DatabaseRole.READ_REPLICA), _config(DatabaseRole.ANALYTICS)],
+        default_max_staleness=2.0,
+    )
+    now = time.time()
+    for role in pool.configs:
+        pool.metrics[role] = ConnectionMetrics()
+    pool.read_replicas = [DatabaseRole.READ_REPLICA, DatabaseRole.ANALYTICS]
+    for role in pool.read_replicas:
+        pool.metrics[role].replication_lag = 0.1
+        pool.metrics[role].replay_lsn = parse_lsn("0/2000")
+        pool.metrics[role].lag_checked_at = now
+    yield pool
+    set_last_write_token(None)
+
+
+@pytest.mark.unit
+class TestLsn:
+    """Test LSN helpers and write tokens."""
+
+    def test_parse_and_format_round_trip(self):
+        assert parse_lsn("16/B374D848") == (0x16 << 32) | 0xB374D848
+        assert format_lsn(parse_lsn("16/B374D848")) == "16/B374D848"
+
+    def test_write_token_encoding(self):
+        token = WriteToken(lsn=parse_lsn("1/A0"), committed_at=1700000000.5)
+
+        assert WriteToken.decode(token.encode()) == token
+        assert WriteToken.decode("garbage") is None
+        assert WriteToken.decode(None) is None
+
+
+@pytest.mark.unit
+class TestLagAwareRouting:
+    """Test replica selection."""
+
+    def test_replicas_over_staleness_budget_are_excluded(self, pool):
+        pool.metrics[DatabaseRole.READ_REPLICA].replication_lag = 10.0
+
+        assert {pool._select_read_replica() for _ in range(20)} == {DatabaseRole.ANALYTICS}
+
+    def test_per_query_budget_overrides_default(self, pool):
+        for role in pool.read_replicas:
+            pool.metrics[role].replication_lag = 10.0
+
+        assert pool._route_query(QueryType.READ) == DatabaseRole.PRIMARY
+        assert pool._route_query(QueryType.READ, max_staleness=30.0) != DatabaseRole.PRIMARY
+
+    def test_unknown_or_stale_lag_readings_are_excluded(self, pool):
+        pool.metrics[DatabaseRole.READ_REPLICA].replication_lag = None
+        pool.metrics[DatabaseRole.ANALYTICS].lag_checked_at = time.time() - 60
+
+        assert pool._select_read_replica() == DatabaseRole.PRIMARY
+
+    def test_unhealthy_replicas_are_excluded(self, pool):
+        pool.metrics[DatabaseRole.READ_REPLICA].health_status = False
+
+        assert pool._eligible_replicas() == [DatabaseRole.ANALYTICS]
+
+    def test_weighting_prefers_idle_and_fast_replicas(self, pool):
+        busy = pool.metrics[DatabaseRole.READ_REPLICA]
+        busy.active_connections = 9
+        busy.latency_ewma = 0.2
+        pool.metrics[DatabaseRole.ANALYTICS].latency_ewma = 0.005
+
+        picks = [pool._select_read_replica() for _ in range(500)]
+
+        assert picks.count(DatabaseRole.ANALYTICS) > 450
+
+    def test_writes_always_go_to_primary(self, pool):
+        assert pool._route_query(QueryType.WRITE) == DatabaseRole.PRIMARY
+
+    def test_latency_ewma_tracks_recent_queries(self):
+        metrics = ConnectionMetrics()
+        metrics.add_query_time(1.0)
+        for _ in range(50):
+            metrics.add_query_time(0.01)
+
+        assert metrics.latency_ewma < 0.02
+
+
+@pytest.mark.unit
+class TestReadYourWrites:
+    """Test routing after a write."""
+
+    @pytest.mark.asyncio
+    async def test_pins_to_primary_until_replica_passes_commit_lsn(self, pool):
+        token = WriteToken(lsn=parse_lsn("0/3000"), committed_at=time.time())
+        set_last_write_token(token)
+
+        assert await pool._resolve_role(QueryType.READ) == DatabaseRole.PRIMARY
+
+        pool.metrics[DatabaseRole.ANALYTICS].replay_lsn = parse_lsn("0/3000")
+        assert await pool._resolve_role(QueryType.READ) == DatabaseRole.ANALYTICS
+
+    @pytest.mark.asyncio
+    async def test_wait_mode_waits_for_replica_replay(self, pool):
+        pool.read_your_writes_mode = ReadYourWritesMode.WAIT_FOR_REPLICA
+        pool.read_replicas = [DatabaseRole.READ_REPLICA]
+        replay_positions = iter(["0/2000", "0/2800", "0/3000"])
+
+        conn = AsyncMock()
+        conn.fetchval.side_effect = lambda query: next(replay_positions)
+
+        @asynccontextmanager
+        async def raw_connection(role=None):
+            yield conn
+
+        pool.get_raw_connection = raw_connection
+        token = WriteToken(lsn=parse_lsn("0/3000"), committed_at=time.time())
+
+        role = await pool._resolve_role(QueryType.READ, write_token=token)
+
+        assert role == DatabaseRole.READ_REPLICA
+        assert conn.fetchval.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_wait_mode_falls_back_to_primary_on_timeout(self, pool):
+        pool.read_your_writes_mode = ReadYourWritesMode.WAIT_FOR_REPLICA
+        pool.replica_wait_timeout = 0.05
+
+        conn = AsyncMock()
+        conn.fetchval.return_value = "0/2000"
+
+        @asynccontextmanager
+        async def raw_connection(role=None):
+            yield conn
+
+        pool.get_raw_connection = raw_connection
+        token = WriteToken(lsn=parse_lsn("0/3000"), committed_at=time.time())
+
+        assert await pool._resolve_role(QueryType.READ, write_token=token) == DatabaseRole.PRIMARY
+
+    @pytest.mark.asyncio
+    async def test_record_write_sets_context_token(self, pool):
+        conn = AsyncMock()
+        conn.fetchval.return_value = "0/5000"
+
+        @asynccontextmanager
+        async def raw_connection(role=None):
+            yield conn
+
+        pool.get_raw_connection = raw_connection
+
+        token = await pool.record_write()
+
+        assert token.lsn == parse_lsn("0/5000")
+        assert await pool._resolve_role(QueryType.READ) == DatabaseRole.PRIMARY
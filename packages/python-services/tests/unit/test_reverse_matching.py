@@ -0,0 +1,240 @@
+"""
+Unit tests for reverse matching of changed jobs against stored profiles.
+"""
+
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import fakeredis
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.core.config import get_settings
+from app.core.dependencies import ServiceDependencies
+from app.core.logging import get_logger
+from app.services.semantic_search.models import JobMatch, JobPosting, UserProfile
+from app.services.semantic_search.reverse_matching import (
+    ProfileMatrix,
+    RecommendationStore,
+    best_per_row,
+    profile_digest,
+    score_profiles,
+    unit_rows,
+)
+from app.services.semantic_search.scoring import CandidateBatch, ProfileFeatures, score_candidates
+from app.services.semantic_search.service import EnhancedSemanticSearchService
+
+NOW = datetime(2024, 5, 17, 12, 0)
+SKILLS = ["Python", "JavaScript", "React", "AWS", "Kubernetes", "SQL", "Go", "Rust", "Docker", "Terraform"]
+LOCATIONS = ["San Francisco, CA", "New York, NY", "Remote", "Austin, TX", None]
+DIMENSION = 16
+
+
+def _jobs(count: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        salary_min = rng.choice([None, rng.randrange(60_000, 160_000, 5_000)])
+        jobs.append(JobPosting(
+            id=f"job-{i}",
+            title=rng.choice(["Senior Backend Engineer", "Data Scientist", "Platform Engineer"]),
+            company=f"Company {i % 5}",
+            description="description",
+            location=rng.choice(LOCATIONS),
+            salary_min=salary_min,
+            salary_max=rng.choice([None, (salary_min or 80_000) + rng.randrange(0, 60_000, 5_000)]),
+            experience_level=rng.choice(["junior", "mid", "senior", "principal", None]),
+            industry=rng.choice(["Technology", "Finance", None]),
+            remote_type=rng.choice(["remote", "hybrid", "on-site", None]),
+            required_skills=rng.sample(SKILLS, rng.randrange(0, 7)),
+            preferred_skills=rng.sample(SKILLS, rng.randrange(0, 3)),
+            posted_date=rng.choice([None, NOW - timedelta(days=rng.randrange(0, 20))]),
+        ))
+    return jobs
+
+
+def _profiles(count: int, seed: int = 5) -> list:
+    rng = random.Random(seed)
+    profiles = []
+    for i in range(count):
+        salary_min = rng.choice([None, rng.randrange(80_000, 150_000, 10_000)])
+        profiles.append(UserProfile(
+            id=f"user-{i}",
+            skills=rng.sample(SKILLS, rng.randrange(0, 8)),
+            preferred_locations=rng.sample(["San Francisco", "New York", "remote"], rng.randrange(0, 3)),
+            remote_preferences=rng.sample(["remote", "hybrid", "on-site"], rng.randrange(0, 3)),
+            industry_preferences=rng.sample(["tech", "finance"], rng.randrange(0, 2)),
+            preferred_roles=rng.sample(["backend", "data"], rng.randrange(0, 2)),
+            years_experience=rng.randrange(0, 15),
+            salary_expectation_min=salary_min,
+            salary_expectation_max=rng.choice([None, (salary_min or 90_000) + 30_000]),
+        ))
+    return profiles
+
+
+@pytest.mark.unit
+class TestProfileMatrixScoring:
+    """Test that matrix scores match a per-user search."""
+
+    def test_matches_per_user_scoring(self):
+        rng = np.random.default_rng(0)
+        jobs, profiles = _jobs(60), _profiles(40)
+        job_embeddings = rng.normal(size=(len(jobs), DIMENSION))
+        profile_embeddings = rng.normal(size=(len(profiles), DIMENSION))
+        batch = CandidateBatch.from_jobs(jobs)
+
+        scores = score_profiles(
+            batch, job_embeddings, ProfileMatrix([p.id for p in profiles], profiles, profile_embeddings), NOW
+        )
+
+        cosine = unit_rows(profile_embeddings) @ unit_rows(job_embeddings).T
+        for row, profile in enumerate(profiles):
+            expected = score_candidates(
+                CandidateBatch.from_jobs(jobs, cosine[row]), ProfileFeatures.from_profile(profile), NOW
+            ).composite
+            np.testing.assert_allclose(scores[row], expected, err_msg=profile.id)
+
+    def test_best_per_row(self):
+        scores = np.array([
+            [0.9, 0.2, 0.7, 0.8],
+            [0.1, 0.3, 0.2, 0.0],
+            [0.6, 0.61, 0.9, 0.95],
+        ])
+
+        best = best_per_row(scores, threshold=0.5, limit=2)
+
+        assert [sorted(columns.tolist()) for columns, _ in best] == [[0, 3], [], [2, 3]]
+        assert sorted(best[0][1].tolist()) == [0.8, 0.9]
+
+
+def _unit(*values) -> list:
+    vector = np.zeros(DIMENSION)
+    vector[:len(values)] = values
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@pytest_asyncio.fixture
+async def search_service(monkeypatch):
+    monkeypatch.setattr(get_settings().ai, "recommendation_list_size", 2)
+    monkeypatch.setattr(get_settings().ai, "recommendation_threshold", 0.5)
+    redis_client = fakeredis.aioredis.FakeRedis()
+    service = EnhancedSemanticSearchService(ServiceDependencies(
+        None, redis_client, None, get_logger("test"), get_settings()
+    ))
+    service._initialized = True
+    yield service
+    await redis_client.aclose()
+
+
+def _job(job_id: str, skills: list) -> JobPosting:
+    return JobPosting(id=job_id, title="Engineer", company="Acme", description="role", required_skills=skills)
+
+
+@pytest.mark.unit
+class TestRecommendationRefresh:
+    """Test reverse matching and profile change detection against Redis."""
+
+    @pytest.mark.asyncio
+    async def test_new_jobs_are_merged_into_lists(self, search_service):
+        store = search_service.recommendations
+        await store.store_profile(UserProfile(id="python", skills=["Python"]), _unit(1, 0))
+        await store.store_profile(UserProfile(id="rust", skills=["Rust"]), _unit(0, 1))
+        await store.record_job(_job("py-1", ["Python"]), _unit(1, 0.1), changed_at=100.0)
+        await store.record_job(_job("py-2", ["Python", "SQL"]), _unit(1, 0.3), changed_at=101.0)
+        await store.record_job(_job("py-3", ["Python", "AWS"]), _unit(1, 0.6), changed_at=102.0)
+        await store.record_job(_job("rs-1", ["Rust"]), _unit(0.1, 1), changed_at=103.0)
+
+        stats = await search_service.reverse_match_jobs()
+
+        assert stats == {"jobs_matched": 4, "users_scored": 2, "lists_updated": 2}
+        assert [job_id for job_id, _ in await store.recommendations("python")] == ["py-1", "py-2"]
+        assert [job_id for job_id, _ in await store.recommendations("rust")] == ["rs-1"]
+        assert await store.watermark() == 4
+
+        # Nothing changed since the watermark
+        assert (await search_service.reverse_match_jobs())["jobs_matched"] == 0
+
+        # A changed job that no longer qualifies leaves the lists
+        await store.record_job(_job("py-1", ["Go", "Java", "Scala", "C", "Perl"]), _unit(0, 0, 1), changed_at=104.0)
+        await search_service.reverse_match_jobs()
+
+        assert [job_id for job_id, _ in await store.recommendations("python")] == ["py-2"]
+
+    @pytest.mark.asyncio
+    async def test_only_changed_profiles_are_searched(self, search_service):
+        unchanged = UserProfile(id="user-1", skills=["Python"])
+        changed = UserProfile(id="user-2", skills=["Rust"])
+        await search_service.recommendations.store_profile(unchanged, _unit(1, 0))
+        await search_service.recommendations.store_profile(changed.model_copy(update={"skills": ["Go"]}), _unit(0, 1))
+        search_service.embeddings = SimpleNamespace()
+        search_service._profile_embedding = AsyncMock(return_value=_unit(0, 1))
+        search_service.search_jobs = AsyncMock(return_value=SimpleNamespace(matches=[
+            JobMatch(job=_job("rs-1", ["Rust"]), semantic_score=0.9, traditional_score=0.8, composite_score=0.86)
+        ]))
+
+        result = await search_service.refresh_recommendations([unchanged, changed])
+
+        assert result == {"refreshed": ["user-2"], "failed": [], "unchanged": 1}
+        assert search_service.search_jobs.await_count == 1
+        assert await search_service.recommendations.recommendations("user-2") == [("rs-1", 0.86)]
+        assert (await search_service.recommendations.profile_digests(["user-2"]))["user-2"] == profile_digest(changed)
+
+    @pytest.mark.asyncio
+    async def test_feed_order_does_not_depend_on_writer_clocks(self, search_service):
+        store = search_service.recommendations
+        await store.store_profile(UserProfile(id="python", skills=["Python"]), _unit(1, 0))
+        assert await store.record_job(_job("py-1", ["Python"]), _unit(1, 0.1), changed_at=1000.0) == 1
+        await search_service.reverse_match_jobs()
+
+        # Written after the run by a writer whose clock is behind
+        assert await store.record_job(_job("py-2", ["Python"]), _unit(1, 0.2), changed_at=900.0) == 2
+        stats = await search_service.reverse_match_jobs()
+
+        assert stats["jobs_matched"] == 1 and await store.watermark() == 2
+        assert [job_id for job_id, _ in await store.recommendations("python")] == ["py-1", "py-2"]
+
+    @pytest.mark.asyncio
+    async def test_feed_entries_age_out(self, search_service):
+        store = search_service.recommendations
+        retention = store.feed_retention.total_seconds()
+        await store.record_job(_job("old", ["Python"]), _unit(1, 0), changed_at=1000.0)
+        await store.record_job(_job("new", ["Python"]), _unit(1, 0), changed_at=1000.0 + retention + 1)
+
+        assert (await store.changed_jobs(0)).job_ids == ["new"]
+
+    @pytest.mark.asyncio
+    async def test_refreshed_lists_are_readable(self, search_service, tmp_path, monkeypatch):
+        monkeypatch.setattr(search_service, "keyword_index_path", str(tmp_path / "jobs.json.gz"))
+        search_service.index_jobs([_job("rs-1", ["Rust"])])
+        search_service.embeddings = SimpleNamespace()
+        search_service._profile_embedding = AsyncMock(return_value=_unit(0, 1))
+        search_service.search_jobs = AsyncMock(return_value=SimpleNamespace(matches=[
+            JobMatch(job=_job("rs-1", ["Rust"]), semantic_score=0.9, traditional_score=0.8, composite_score=0.86),
+            JobMatch(job=_job("rs-2", ["Rust"]), semantic_score=0.8, traditional_score=0.7, composite_score=0.76),
+        ]))
+        profile = UserProfile(id="user-1", skills=["Rust"])
+
+        await search_service.refresh_recommendations([profile])
+        chunks = [chunk async for chunk in search_service.recommendations.iter_profiles(10)]
+        recommendations = await search_service.get_recommendations("user-1")
+
+        assert [entry.profile for entry in chunks[0]] == [profile]
+        assert [(entry["job_id"], entry["score"]) for entry in recommendations] == [("rs-1", 0.86), ("rs-2", 0.76)]
+        assert recommendations[0]["job"]["required_skills"] == ["Rust"] and recommendations[1]["job"] is None
+        assert len(await search_service.get_recommendations("user-1", limit=1)) == 1
+
+    @pytest.mark.asyncio
+    async def test_profiles_round_trip_through_decoding_clients(self):
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        store = RecommendationStore(redis_client, list_size=5, feed_retention=timedelta(days=1))
+        profile = UserProfile(id="user-1", skills=["Python"])
+
+        await store.store_profile(profile, _unit(3, 4))
+        chunks = [chunk async for chunk in store.iter_profiles(10)]
+
+        assert [entry.profile for entry in chunks[0]] == [profile]
+        np.testing.assert_allclose(chunks[0][0].embedding, _unit(3, 4), rtol=1e-6)
+        await redis_client.aclose()
@@ -0,0 +1,241 @@
+"""
+Unit tests for columnar semantic search scoring.
+"""
+
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import fakeredis
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.core.config import get_settings
+from app.core.dependencies import ServiceDependencies
+from app.core.logging import get_logger
+from app.services.semantic_search import service as service_module
+from app.services.semantic_search.models import JobPosting, SemanticSearchRequest, UserProfile
+from app.services.semantic_search.scoring import (
+    EXPERIENCE_LEVEL_YEARS,
+    HIGH_DEMAND_SKILLS,
+    CandidateBatch,
+    ProfileFeatures,
+    score_candidates,
+)
+from app.services.semantic_search.service import EnhancedSemanticSearchService
+
+NOW = datetime(2024, 5, 17, 12, 0)
+SKILLS = ["Python", "JavaScript", "React", "AWS", "Kubernetes", "SQL", "Go", "Rust", "Docker", "Terraform"]
+LEVELS = list(EXPERIENCE_LEVEL_YEARS) + ["wizard", None]
+LOCATIONS = ["San Francisco, CA", "New York, NY", "Remote", "Austin, TX", None]
+
+
+def _jobs(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        salary_min = rng.choice([None, 0, rng.randrange(60_000, 160_000, 5_000)])
+        jobs.append(JobPosting(
+            id=f"job-{i}",
+            title=rng.choice(["Senior Backend Engineer", "Data Scientist", "Platform Engineer"]),
+            company=f"Company {i % 7}",
+            description="description",
+            location=rng.choice(LOCATIONS),
+            salary_min=salary_min,
+            salary_max=rng.choice([None, (salary_min or 80_000) + rng.randrange(0, 60_000, 5_000)]),
+            experience_level=rng.choice(LEVELS),
+            industry=rng.choice(["Technology", "Finance", None]),
+            remote_type=rng.choice(["remote", "hybrid", "on-site", None]),
+            required_skills=rng.sample(SKILLS, rng.randrange(0, 7)),
+            preferred_skills=rng.sample(SKILLS, rng.randrange(0, 3)),
+            posted_date=rng.choice([None, NOW - timedelta(days=rng.randrange(0, 20))]),
+        ))
+    return jobs
+
+
+def _profile(**overrides) -> UserProfile:
+    values = dict(
+        id="user-1",
+        skills=["Python", "react ", "AWS", "SQL", "Docker", "Go"],
+        preferred_locations=["San Francisco", "remote"],
+        remote_preferences=["Remote", "hybrid"],
+        industry_preferences=["tech"],
+        preferred_roles=["Backend"],
+        years_experience=6,
+        salary_expectation_min=100_000,
+        salary_expectation_max=140_000,
+    )
+    values.update(overrides)
+    return UserProfile(**values)
+
+
+def _reference_traditional(profile: UserProfile, job: JobPosting) -> list:
+    """Per-job factor scores as the service computed them one posting at a time."""
+    user = {skill.lower().strip() for skill in profile.skills}
+    required = {skill.lower().strip() for skill in job.required_skills}
+    preferred = {skill.lower().strip() for skill in job.preferred_skills}
+    if not profile.skills or not job.required_skills:
+        skill = 0.0
+    else:
+        skill = len(user & required) / len(required) * 0.8
+        skill += (len(user & preferred) / len(preferred) if preferred else 0) * 0.2
+        if len(user) > len(required):
+            skill += min(0.1, (len(user) - len(required)) * 0.02)
+        skill = min(skill, 1.0)
+
+    if not job.experience_level:
+        experience = 0.5
+    else:
+        needed = EXPERIENCE_LEVEL_YEARS.get(job.experience_level.lower(), 3)
+        years = profile.years_experience
+        if years >= needed:
+            experience = 1.0 if years <= needed * 1.5 else max(0.8, 1.0 - (years - needed * 1.5) * 0.05)
+        else:
+            experience = max(0.2, (years / needed if needed > 0 else 0) * 0.8)
+
+    location = 0.0
+    if profile.preferred_locations and job.location:
+        if any(loc.lower() in job.location.lower() for loc in profile.preferred_locations):
+            location += 0.6
+    if job.remote_type and job.remote_type.lower() in [pref.lower() for pref in profile.remote_preferences]:
+        location += 0.4
+
+    if not profile.salary_expectation_min or not job.salary_max:
+        salary = 0.5
+    elif job.salary_max < profile.salary_expectation_min:
+        salary = 0.0
+    elif profile.salary_expectation_max:
+        mid = (profile.salary_expectation_min + profile.salary_expectation_max) / 2
+        if job.salary_min:
+            diff = abs((job.salary_min + job.salary_max) / 2 - mid) / mid
+            salary = 1.0 if diff <= 0.1 else 0.8 if diff <= 0.2 else 0.6 if diff <= 0.3 else 0.4
+        else:
+            salary = 0.8 if job.salary_max >= mid else 0.6
+    else:
+        salary = 0.8 if job.salary_max >= profile.salary_expectation_min * 1.2 else 0.6
+
+    industry = 0.0
+    if job.industry and any(ind.lower() in job.industry.lower() for ind in profile.industry_preferences):
+        industry += 0.5
+    if job.title and any(role.lower() in job.title.lower() for role in profile.preferred_roles):
+        industry += 0.5
+
+    return [skill, experience, min(location, 1.0), salary, min(industry, 1.0)]
+
+
+def _reference_composite(semantic: float, traditional: float, profile: UserProfile, job: JobPosting) -> float:
+    user = {skill.lower().strip() for skill in profile.skills}
+    required = {skill.lower().strip() for skill in job.required_skills}
+    score = semantic * 0.6 + traditional * 0.4
+    score += len(user & required & HIGH_DEMAND_SKILLS) * 0.02
+    if job.posted_date and job.posted_date > NOW - timedelta(days=7):
+        score += 0.05
+    if len(required - user) > 3:
+        score -= 0.1
+    return max(0.0, min(1.0, score))
+
+
+@pytest.mark.unit
+class TestColumnarScoring:
+    """Test that batch scores match per-job scoring."""
+
+    @pytest.mark.parametrize("overrides", [
+        {},
+        {"salary_expectation_max": None},
+        {"salary_expectation_min": None, "skills": [], "preferred_locations": []},
+        {"years_experience": 0, "preferred_roles": [], "remote_preferences": []},
+    ])
+    def test_matches_per_job_scores(self, overrides):
+        profile = _profile(**overrides)
+        jobs = _jobs(200)
+        semantic = np.linspace(0.2, 0.95, len(jobs))
+
+        scores = score_candidates(CandidateBatch.from_jobs(jobs, semantic), ProfileFeatures.from_profile(profile), NOW)
+
+        factors = np.column_stack([scores.skill, scores.experience, scores.location, scores.salary, scores.industry])
+        expected = np.array([_reference_traditional(profile, job) for job in jobs])
+        np.testing.assert_allclose(factors, expected)
+
+        traditional = np.minimum(expected @ np.array([0.35, 0.25, 0.15, 0.15, 0.10]), 1.0)
+        np.testing.assert_allclose(scores.traditional, traditional)
+        np.testing.assert_allclose(scores.composite, [
+            _reference_composite(s, t, profile, job) for s, t, job in zip(semantic, traditional, jobs)
+        ])
+
+    def test_matches_without_metadata_are_skipped(self):
+        job = _jobs(1)[0].model_dump()
+        batch = CandidateBatch.from_matches([
+            SimpleNamespace(score=0.9, metadata=job),
+            SimpleNamespace(score=0.8, metadata=None),
+            SimpleNamespace(score=0.7, metadata={"id": "job-x", "title": "No company"}),
+        ])
+
+        assert len(batch) == 1 and batch.semantic.tolist() == [0.9]
+
+    def test_posted_date_strings_are_decoded(self):
+        rows = [
+            {"posted_date": "2024-05-16T09:00:00Z"},
+            {"posted_date": "not a date"},
+            {"posted_date": None},
+        ]
+
+        posted = CandidateBatch(rows, [0.0] * 3).posted_at
+
+        assert posted[0] == datetime.fromisoformat("2024-05-16T09:00:00+00:00").timestamp()
+        assert np.isnan(posted[1:]).all()
+
+
+@pytest_asyncio.fixture
+async def search_service():
+    redis_client = fakeredis.aioredis.FakeRedis()
+    service = EnhancedSemanticSearchService(ServiceDependencies(
+        None, redis_client, None, get_logger("test"), get_settings()
+    ))
+    service.embeddings = SimpleNamespace(aembed_query=AsyncMock(return_value=[0.1, 0.2]))
+    service._initialized = True
+    yield service
+    await redis_client.aclose()
+
+
+@pytest.mark.unit
+class TestEnhancedSemanticSearch:
+    """Test that only the final results are materialised."""
+
+    @pytest.mark.asyncio
+    async def test_only_top_k_are_materialized(self, search_service, monkeypatch):
+        jobs = _jobs(150)
+        search_service.pinecone_index = SimpleNamespace(query=lambda **_: SimpleNamespace(matches=[
+            SimpleNamespace(id=job.id, score=0.5 + i / 1000, metadata=job.model_dump())
+            for i, job in enumerate(jobs)
+        ]))
+        built = []
+
+        class CountingJobPosting(JobPosting):
+            def __init__(self, **data):
+                built.append(data["id"])
+                super().__init__(**data)
+
+        monkeypatch.setattr(service_module, "JobPosting", CountingJobPosting)
+        request = SemanticSearchRequest(user_profile=_profile(), top_k=10, match_threshold=0.0)
+
+        matches = await search_service._enhanced_semantic_search(request)
+
+        assert len(built) == len(matches) == 10
+        composite = [match.composite_score for match in matches]
+        assert composite == sorted(composite, reverse=True)
+        best = matches[0]
+        assert best.matching_skills == ProfileFeatures.from_profile(request.user_profile).matching_skills(
+            best.job.required_skills, best.job.preferred_skills
+        )
+
+    @pytest.mark.asyncio
+    async def test_threshold_applies_before_the_cut(self, search_service):
+        jobs = _jobs(20)
+        search_service.pinecone_index = SimpleNamespace(query=lambda **_: SimpleNamespace(matches=[
+            SimpleNamespace(id=job.id, score=0.0, metadata=job.model_dump()) for job in jobs
+        ]))
+        request = SemanticSearchRequest(user_profile=_profile(), top_k=10, match_threshold=0.99)
+
+        assert await search_service._enhanced_semantic_search(request) == []
@@ -0,0 +1,227 @@
+"""
+Unit tests for service token verification.
+"""
+
+import json
+import time
+from unittest.mock import patch
+
+import fakeredis
+import httpx
+import jwt
+import pytest
+import pytest_asyncio
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import FastAPI, Request
+from jwt.algorithms import RSAAlgorithm
+
+from app.core import service_tokens as service_tokens_module
+from app.core.service_tokens import (
+    ClaimsValidator,
+    RevocationBloomFilter,
+    RevokedTokenError,
+    ServiceKeySet,
+    ServiceTokenVerifier,
+    TokenRevocationList,
+)
+from app.middleware.service_auth import ServiceAuthMiddleware
+
+
+SECRET = "offline-test-secret-that-is-long-enough_service"
+
+
+def _token(secret: str = SECRET, algorithm: str = "HS256", headers=None, **claims) -> str:
+    payload = {"serviceId": "node-backend", "jti": "token-1", "exp": time.time() + 900, **claims}
+    return jwt.encode(payload, secret, algorithm=algorithm, headers=headers)
+
+
+def _verifier(redis_client=None, **kwargs) -> ServiceTokenVerifier:
+    return ServiceTokenVerifier(
+        ServiceKeySet.from_secret(SECRET),
+        revocations=TokenRevocationList(redis_client),
+        **kwargs
+    )
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest_asyncio.fixture
+async def redis_client(server):
+    client = fakeredis.aioredis.FakeRedis(server=server)
+    yield client
+    await client.aclose()
+
+
+@pytest.mark.unit
+class TestServiceTokenVerifier:
+    """Test verification, caching, key rotation and revocation."""
+
+    @pytest.mark.asyncio
+    async def test_verified_tokens_are_cached_by_digest(self):
+        verifier = _verifier()
+        token = _token()
+
+        with patch.object(verifier._jws, "decode_complete", wraps=verifier._jws.decode_complete) as decode:
+            first = await verifier.verify(token)
+            second = await verifier.verify(token)
+
+        assert first["serviceId"] == "node-backend"
+        assert second is first
+        assert decode.call_count == 1
+        assert len(verifier.cache) == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_tokens_still_honour_exp(self, monkeypatch):
+        verifier = _verifier()
+        token = _token(exp=time.time() + 60)
+        await verifier.verify(token)
+
+        later = time.time() + 61
+        monkeypatch.setattr(service_tokens_module.time, "time", lambda: later)
+
+        with pytest.raises(jwt.ExpiredSignatureError):
+            await verifier.verify(token)
+        assert len(verifier.cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_cached_tokens_honour_nbf(self, monkeypatch):
+        verifier = _verifier()
+        now = time.time()
+        token = _token(nbf=now + 30)
+
+        with pytest.raises(jwt.ImmatureSignatureError):
+            await verifier.verify(token)
+
+        monkeypatch.setattr(service_tokens_module.time, "time", lambda: now + 31)
+        assert (await verifier.verify(token))["jti"] == "token-1"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("token, error", [
+        (_token(secret="another-secret-that-is-long-enough"), jwt.InvalidSignatureError),
+        (jwt.encode({"serviceId": "x"}, SECRET, algorithm="HS256"), jwt.MissingRequiredClaimError),
+        (_token(exp="tomorrow"), jwt.DecodeError),
+        (_token(algorithm="HS512"), jwt.InvalidAlgorithmError),
+    ], ids=["signature", "missing-exp", "non-numeric-exp", "algorithm"])
+    async def test_invalid_tokens_are_rejected_and_not_cached(self, token, error):
+        verifier = _verifier()
+
+        with pytest.raises(error):
+            await verifier.verify(token)
+        assert len(verifier.cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_issuer_and_audience_are_checked(self):
+        verifier = _verifier(claims=ClaimsValidator(issuer="givemejobs", audience="python-services"))
+
+        assert await verifier.verify(_token(iss="givemejobs", aud=["python-services", "other"]))
+        with pytest.raises(jwt.InvalidIssuerError):
+            await verifier.verify(_token(iss="elsewhere", aud="python-services"))
+        with pytest.raises(jwt.InvalidAudienceError):
+            await verifier.verify(_token(iss="givemejobs", aud="other"))
+
+    @pytest.mark.asyncio
+    async def test_jwks_keys_are_preparsed_and_rotation_drops_cache(self):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+        jwks = {"keys": [{**jwk, "kid": "k1", "alg": "RS256", "use": "sig"}]}
+        verifier = _verifier()
+        assert verifier.set_keys(ServiceKeySet.from_jwks(jwks, base=verifier.keys))
+
+        rsa_token = _token(private_key, "RS256", headers={"kid": "k1"})
+        assert (await verifier.verify(rsa_token))["serviceId"] == "node-backend"
+        assert await verifier.verify(_token())
+
+        assert not verifier.set_keys(ServiceKeySet.from_jwks(jwks, base=verifier._base_keys))
+        assert len(verifier.cache) == 2
+        assert verifier.set_keys(verifier._base_keys)
+        assert len(verifier.cache) == 0
+        with pytest.raises(jwt.InvalidAlgorithmError):
+            await verifier.verify(rsa_token)
+
+    @pytest.mark.asyncio
+    async def test_revocation_without_redis(self):
+        verifier = _verifier()
+        token = _token()
+        await verifier.verify(token)
+
+        await verifier.revoke(token)
+
+        with pytest.raises(RevokedTokenError):
+            await verifier.verify(token)
+        assert await verifier.verify(_token(jti="token-2"))
+
+    @pytest.mark.asyncio
+    async def test_revocation_reaches_other_processes_on_sync(self, server, redis_client):
+        other_client = fakeredis.aioredis.FakeRedis(server=server)
+        issuer, other = _verifier(redis_client), _verifier(other_client)
+        token = _token()
+        try:
+            assert await other.verify(token)
+
+            await issuer.revoke(token)
+            assert await other.revocations.sync()
+
+            with pytest.raises(RevokedTokenError):
+                await other.verify(token)
+            assert not await other.revocations.sync()
+        finally:
+            await other_client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_filter_false_positives_are_confirmed_in_redis(self, redis_client):
+        revocations = TokenRevocationList(redis_client)
+        revocations._filter.add("token-1")
+
+        with patch.object(redis_client, "zscore", wraps=redis_client.zscore) as zscore:
+            assert not await revocations.is_revoked("token-1")
+            assert not await revocations.is_revoked("never-revoked")
+
+        assert zscore.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_sync_prunes_expired_revocations(self, redis_client):
+        revocations = TokenRevocationList(redis_client)
+        await revocations.revoke("old", time.time() - 1)
+        await revocations.revoke("current", time.time() + 60)
+
+        await revocations.sync()
+
+        assert "old" not in revocations._filter
+        assert "current" in revocations._filter
+        assert await redis_client.zcard(service_tokens_module.REVOKED_TOKENS_KEY) == 1
+
+
+@pytest.mark.unit
+def test_bloom_filter_sizing_and_membership():
+    bloom = RevocationBloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"jti-{i}")
+
+    assert all(f"jti-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_middleware_authenticates_and_rejects_revoked_tokens():
+    verifier = _verifier()
+    app = FastAPI()
+
+    @app.get("/internal")
+    async def internal(request: Request):
+        return {"service": request.state.service.service_id}
+
+    app.add_middleware(ServiceAuthMiddleware, verifier=verifier)
+    token = _token()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        headers = {"authorization": f"Bearer {token}"}
+        assert (await client.get("/internal", headers=headers)).json() == {"service": "node-backend"}
+
+        await verifier.revoke(token)
+
+        assert (await client.get("/internal", headers=headers)).status_code == 401
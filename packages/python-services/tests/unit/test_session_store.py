@@ -0,0 +1,187 @@
+"""
+Unit tests for the Redis session store.
+"""
+
+import asyncio
+import time
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from app.core import session_store as session_store_module
+from app.core.session_store import (
+    LocalSessionCache,
+    SessionRecord,
+    SessionStore,
+    session_key,
+    user_sessions_key,
+)
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest_asyncio.fixture
+async def redis_client(server):
+    client = fakeredis.aioredis.FakeRedis(server=server)
+    yield client
+    await client.aclose()
+
+
+@pytest_asyncio.fixture
+async def store(redis_client):
+    store = SessionStore(redis_client, ttl_seconds=3600, touch_interval=300, local_cache_ttl=30)
+    yield store
+    await store.stop_revocation_listener()
+
+
+async def _wait_for(predicate, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.unit
+class TestSessionStore:
+    """Test session persistence, caching and revocation."""
+
+    @pytest.mark.asyncio
+    async def test_create_writes_compact_hash_with_expiry(self, store, redis_client):
+        record = await store.create("user-1", "10.0.0.1", "agent/1.0")
+
+        stored = await redis_client.hgetall(session_key(record.session_id))
+        assert set(stored) == {b"u", b"ip", b"ua", b"c", b"a", b"e"}
+        assert 0 < await redis_client.ttl(session_key(record.session_id)) <= 3600
+        assert await redis_client.sismember(user_sessions_key("user-1"), record.session_id)
+        assert await store.get(record.session_id) == record
+
+    @pytest.mark.asyncio
+    async def test_validation_without_listener_always_reads_redis(self, store, redis_client):
+        record = await store.create("user-1", "10.0.0.1", "agent")
+        assert await store.validate(record.session_id) == record
+
+        await redis_client.delete(session_key(record.session_id))
+
+        assert await store.validate(record.session_id) is None
+        assert len(store.local_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_validation_is_served_from_local_cache(self, store, redis_client):
+        await store.start_revocation_listener()
+        record = await store.create("user-1", "10.0.0.1", "agent")
+        await store.validate(record.session_id)
+
+        # Removed behind the store's back (no revocation message): still cached
+        await redis_client.delete(session_key(record.session_id))
+
+        assert await store.validate(record.session_id) == record
+
+    @pytest.mark.asyncio
+    async def test_revocation_reaches_other_processes(self, store, server):
+        other_client = fakeredis.aioredis.FakeRedis(server=server)
+        other = SessionStore(other_client, ttl_seconds=3600, local_cache_ttl=30)
+        try:
+            await other.start_revocation_listener()
+            record = await store.create("user-1", "10.0.0.1", "agent")
+            assert await other.validate(record.session_id) == record
+            assert len(other.local_cache) == 1
+
+            assert await store.revoke(record.session_id)
+
+            await _wait_for(lambda: len(other.local_cache) == 0)
+            assert await other.validate(record.session_id) is None
+        finally:
+            await other.stop_revocation_listener()
+            await other_client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_revoke_all_evicts_cached_user_sessions(self, store, redis_client):
+        await store.start_revocation_listener()
+        first = await store.create("user-1", "10.0.0.1", "agent")
+        second = await store.create("user-1", "10.0.0.2", "agent")
+        keep = await store.create("user-2", "10.0.0.3", "agent")
+        for record in (first, second, keep):
+            await store.validate(record.session_id)
+
+        assert await store.revoke_all("user-1") == 2
+
+        assert await store.validate(first.session_id) is None
+        assert await store.validate(second.session_id) is None
+        assert await store.validate(keep.session_id) == keep
+        assert not await redis_client.exists(user_sessions_key("user-1"))
+
+    @pytest.mark.asyncio
+    async def test_sliding_expiry_is_throttled(self, store, redis_client, monkeypatch):
+        record = await store.create("user-1", "10.0.0.1", "agent")
+
+        await store.validate(record.session_id)
+        assert (await store.get(record.session_id)).last_activity == record.last_activity
+
+        later = time.time() + 301
+        monkeypatch.setattr(session_store_module.time, "time", lambda: later)
+        touched = await store.validate(record.session_id)
+
+        assert touched.last_activity == int(later)
+        assert touched.expires_at == int(later) + 3600
+        stored = await redis_client.hgetall(session_key(record.session_id))
+        assert int(stored[b"a"]) == int(later)
+
+    @pytest.mark.asyncio
+    async def test_list_user_sessions_prunes_stale_ids(self, store, redis_client):
+        record = await store.create("user-1", "10.0.0.1", "agent")
+        await redis_client.sadd(user_sessions_key("user-1"), "gone")
+
+        sessions = await store.list_user_sessions("user-1")
+
+        assert [s.session_id for s in sessions] == [record.session_id]
+        assert not await redis_client.sismember(user_sessions_key("user-1"), "gone")
+
+    @pytest.mark.asyncio
+    async def test_legacy_string_sessions_are_invalid(self, store, redis_client):
+        await redis_client.set(session_key("legacy"), "{'user_id': 'user-1'}")
+
+        assert await store.validate("legacy") is None
+        assert await store.revoke("legacy")
+
+
+@pytest.mark.unit
+class TestLocalSessionCache:
+    """Test the bounded in-process cache."""
+
+    @staticmethod
+    def _record(session_id: str, user_id: str = "user-1") -> SessionRecord:
+        now = int(time.time())
+        return SessionRecord(session_id, user_id, "10.0.0.1", "agent", now, now, now + 60)
+
+    def test_lru_bound(self):
+        cache = LocalSessionCache(max_size=2, ttl=30)
+        for session_id in ("a", "b"):
+            cache.put(self._record(session_id))
+        cache.get("a")
+        cache.put(self._record("c"))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+
+    def test_entries_expire(self, monkeypatch):
+        cache = LocalSessionCache(ttl=5)
+        cache.put(self._record("a"))
+
+        later = time.monotonic() + 6
+        monkeypatch.setattr(session_store_module.time, "monotonic", lambda: later)
+
+        assert cache.get("a") is None
+
+    def test_evict_user(self):
+        cache = LocalSessionCache()
+        cache.put(self._record("a", "user-1"))
+        cache.put(self._record("b", "user-2"))
+
+        cache.evict_user("user-1")
+
+        assert cache.get("a") is None and cache.get("b") is not None
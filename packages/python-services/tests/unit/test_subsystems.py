@@ -0,0 +1,116 @@
+"""
+Unit tests for the lazy subsystem registry.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.core.subsystems import (
+    HEAVY_DEPENDENCIES,
+    LazySubsystem,
+    Subsystem,
+    SubsystemRegistry,
+    format_profile_report,
+    subsystem_registry,
+)
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Modules every Celery worker imports regardless of the queues it serves
+LIGHTWEIGHT_ENTRY_POINTS = [
+    "app.core.celery",
+    "app.worker",
+    "app.services.analytics.tasks",
+    "app.services.document_processing.tasks",
+    "app.services.semantic_search.tasks",
+    "app.tasks.job_aggregation",
+    "app.tasks.background_analytics",
+]
+
+
+@pytest.fixture
+def registry():
+    registry = SubsystemRegistry()
+    registry.register(Subsystem(
+        name="codec", module="json", attribute="JSONDecoder", queues=("parsing",)
+    ))
+    registry.register(Subsystem(
+        name="report", module="string", attribute="Template", queues=("reports", "parsing")
+    ))
+    return registry
+
+
+@pytest.mark.unit
+class TestSubsystemRegistry:
+    """Test lazy loading and profiling."""
+
+    def test_load_imports_once_and_records_profile(self, registry):
+        first = registry.load("codec")
+        second = registry.load("codec")
+
+        assert first is second is json.JSONDecoder
+        report = registry.profile_report()
+        assert [p["name"] for p in report["subsystems"]] == ["codec"]
+        assert report["not_loaded"] == ["report"]
+        assert report["subsystems"][0]["import_seconds"] >= 0
+
+    def test_unknown_subsystem_raises(self, registry):
+        with pytest.raises(KeyError):
+            registry.load("missing")
+
+    def test_queues_select_subsystems(self, registry):
+        assert registry.subsystems_for_queues(["reports"]) == ["report"]
+        assert sorted(registry.load_for_queues(["parsing"])) == ["codec", "report"]
+        assert registry.subsystems_for_queues(["default"]) == []
+
+    def test_lazy_proxy_forwards_calls_and_attributes(self, registry):
+        proxy = LazySubsystem("report", registry)
+
+        assert not registry.is_loaded("report")
+        assert proxy("$x").substitute(x=1) == "1"
+        assert proxy.delimiter == "$"
+        assert registry.is_loaded("report")
+
+    def test_report_formatting(self, registry):
+        registry.load("codec")
+
+        table = format_profile_report(registry.profile_report())
+
+        assert "codec" in table and "process RSS" in table
+
+    def test_default_registry_covers_worker_queues(self):
+        assert set(subsystem_registry.subsystems_for_queues(["high_priority"])) == {
+            "semantic_search", "document_processing"
+        }
+        assert subsystem_registry.subsystems_for_queues(["analytics"]) == ["analytics"]
+        assert subsystem_registry.subsystems_for_queues(["job_aggregation", "background"]) == []
+
+
+@pytest.mark.unit
+def test_lightweight_entry_points_do_not_import_heavy_dependencies():
+    """Worker entry points must not pull in ML/LangChain packages at import time."""
+    script = (
+        "import importlib, json, sys\n"
+        f"for name in {LIGHTWEIGHT_ENTRY_POINTS!r}:\n"
+        "    importlib.import_module(name)\n"
+        f"print(json.dumps([m for m in {list(HEAVY_DEPENDENCIES)!r} if m in sys.modules]))\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PROJECT_ROOT,
+        # The root conftest sets ENVIRONMENT=test, which Settings() rejects
+        env={**os.environ, "ENVIRONMENT": "testing"},
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert completed.returncode == 0, completed.stderr
+    heavy = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert heavy == [], f"Heavy dependencies imported at startup: {heavy}"
@@ -0,0 +1,193 @@
+"""
+Unit tests for threat detection runtime state.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import fakeredis
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.core import threat_state as threat_state_module
+from app.core.threat_state import (
+    BASELINE_OBSERVATIONS,
+    MAX_TRACKED_VALUES,
+    CompactProfile,
+    MicroBatchScorer,
+    ProfileCache,
+    collect_signals,
+    persist_profiles,
+    profile_key,
+)
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    client = fakeredis.aioredis.FakeRedis()
+    yield client
+    await client.aclose()
+
+
+def _login(location: str = "Berlin", user_agent: str = "agent/1.0") -> dict:
+    return {"event_type": "login_success", "location": location, "user_agent": user_agent}
+
+
+@pytest.mark.unit
+class TestCompactProfile:
+    """Test profile observation and its Redis hash encoding."""
+
+    def test_baseline_and_typical_hours(self):
+        profile = CompactProfile()
+        nine_am = datetime(2024, 5, 6, 9, tzinfo=timezone.utc)
+        for _ in range(BASELINE_OBSERVATIONS):
+            profile.observe(_login(), now=nine_am)
+
+        assert profile.baseline_established
+        assert profile.typical_hours() == [9]
+        assert not profile.is_typical_hour(3)
+        assert profile.knows_location("Berlin") and not profile.knows_location("Lagos")
+
+    def test_tracked_values_are_bounded(self):
+        profile = CompactProfile()
+        profile.observe(_login("home"))
+        profile.observe(_login("home"))
+        for i in range(MAX_TRACKED_VALUES * 2):
+            profile.observe(_login(f"city-{i}"))
+
+        assert len(profile.locations) == MAX_TRACKED_VALUES
+        assert profile.knows_location("home")
+
+    def test_hash_round_trip(self):
+        profile = CompactProfile()
+        profile.observe({**_login(), "session_duration": 120})
+        profile.observe({**_login("Paris"), "session_duration": 220})
+
+        encoded = {key.encode(): value.encode() for key, value in profile.to_hash().items()}
+
+        assert CompactProfile.from_hash(encoded) == profile
+        assert profile.avg_session_duration == pytest.approx(130.0)
+
+
+@pytest.mark.unit
+class TestProfileCache:
+    """Test the bounded profile cache and write-behind tracking."""
+
+    def test_lru_bound(self):
+        cache = ProfileCache(max_size=2)
+        for subject in ("a", "b"):
+            cache.put(subject, CompactProfile())
+        cache.get("a")
+        cache.put("c", CompactProfile())
+
+        assert cache.get("b") is None
+        assert len(cache) == 2
+
+    def test_entries_expire(self, monkeypatch):
+        cache = ProfileCache(ttl=10)
+        cache.put("a", CompactProfile())
+
+        later = time.monotonic() + 11
+        monkeypatch.setattr(threat_state_module.time, "monotonic", lambda: later)
+
+        assert cache.get("a") is None
+
+    def test_unflushed_profiles_survive_eviction(self):
+        cache = ProfileCache(max_size=1)
+        profile = CompactProfile(observations=3)
+        cache.put("a", profile)
+        cache.mark_dirty("a", profile)
+        cache.put("b", CompactProfile())
+
+        assert cache.get("a") is profile
+        assert cache.drain_dirty() == {"a": profile}
+        assert cache.get("a") is None
+
+    def test_failed_writes_do_not_override_newer_changes(self):
+        cache = ProfileCache()
+        old, new = CompactProfile(observations=1), CompactProfile(observations=2)
+        cache.mark_dirty("a", new)
+
+        cache.restore_dirty({"a": old, "b": old})
+
+        assert cache.drain_dirty() == {"a": new, "b": old}
+
+
+@pytest.mark.unit
+class TestRedisSignals:
+    """Test pipelined signal collection and profile persistence."""
+
+    @pytest.mark.asyncio
+    async def test_collects_counters_and_profile_in_one_round_trip(self, redis_client):
+        await redis_client.set("failed_logins:1.2.3.4", 7)
+        profile = CompactProfile(observations=4)
+        await persist_profiles(redis_client, {"user-1": profile}, ttl_seconds=60)
+
+        with patch.object(redis_client, "get", wraps=redis_client.get) as get:
+            signals, profile_hash = await collect_signals(
+                redis_client, ["failed_logins:1.2.3.4", "password_changed:user-1"], "user-1"
+            )
+
+        get.assert_not_called()
+        assert signals == {"failed_logins:1.2.3.4": "7", "password_changed:user-1": None}
+        assert CompactProfile.from_hash(profile_hash) == profile
+        assert 0 < await redis_client.ttl(profile_key("user-1")) <= 60
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_collect(self, redis_client):
+        assert await collect_signals(redis_client, []) == ({}, None)
+
+
+@pytest.mark.unit
+class TestMicroBatchScorer:
+    """Test queue-fed batch scoring."""
+
+    @pytest.mark.asyncio
+    async def test_background_batches(self):
+        batches = []
+        scored = asyncio.Event()
+
+        async def on_scored(contexts, scores):
+            batches.append((contexts, scores.tolist()))
+            if sum(len(contexts) for contexts, _ in batches) == 5:
+                scored.set()
+
+        scorer = MicroBatchScorer(lambda features: features.sum(axis=1), on_scored, batch_size=3, max_delay=0.01)
+        scorer.start()
+        try:
+            for i in range(5):
+                assert scorer.submit([i, 1.0], f"event-{i}")
+            await asyncio.wait_for(scored.wait(), timeout=2)
+        finally:
+            await scorer.stop()
+
+        assert [len(contexts) for contexts, _ in batches] == [3, 2]
+        assert batches[0] == (["event-0", "event-1", "event-2"], [1.0, 2.0, 3.0])
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_and_flush_scores_remaining(self):
+        calls = []
+
+        async def on_scored(contexts, scores):
+            calls.append(contexts)
+
+        scorer = MicroBatchScorer(lambda features: np.zeros(len(features)), on_scored, batch_size=2, queue_size=3)
+        results = [scorer.submit([float(i)], i) for i in range(4)]
+
+        assert results == [True, True, True, False]
+        assert scorer.dropped == 1
+        assert await scorer.flush() == 3
+        assert calls == [[0, 1], [2]]
+
+    @pytest.mark.asyncio
+    async def test_scoring_errors_do_not_stop_the_scorer(self):
+        async def on_scored(contexts, scores):
+            raise RuntimeError("alert sink down")
+
+        scorer = MicroBatchScorer(lambda features: np.zeros(len(features)), on_scored)
+        scorer.submit([1.0])
+
+        assert await scorer.flush() == 1
@@ -0,0 +1,230 @@
+"""
+Unit tests for head-sampled tracing and span export.
+"""
+
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+
+from app.core.tracing import (
+    STATUS_ERROR,
+    FileSpanSink,
+    OTLPSpanSink,
+    SpanBuffer,
+    SpanExporter,
+    SpanRecord,
+    TraceSampler,
+    new_trace_id,
+    parse_traceparent,
+)
+from app.middleware import distributed_tracing
+from app.middleware.distributed_tracing import (
+    DistributedTracingMiddleware,
+    TraceContext,
+    get_trace_context,
+    trace_operation,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+def _span(i: int = 0) -> SpanRecord:
+    return SpanRecord(TRACE_ID, f"{i:016x}", None, "op", "svc", 1.0, 1.5, 2, 1, {"n": i})
+
+
+@pytest.fixture
+def span_buffer(monkeypatch):
+    buffer = SpanBuffer(capacity=64)
+    monkeypatch.setattr(distributed_tracing, "get_span_buffer", lambda: buffer)
+    return buffer
+
+
+def _app(span_buffer: SpanBuffer, sampler: TraceSampler) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/jobs")
+    async def jobs(request: Request):
+        with trace_operation(get_trace_context(request), "search", "query") as span:
+            span.tags["rows"] = "3"
+        return {"ok": True}
+
+    @app.get("/fail")
+    async def fail():
+        raise HTTPException(status_code=503)
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(DistributedTracingMiddleware, service_name="test", sampler=sampler, span_buffer=span_buffer)
+    return app
+
+
+async def _get(app: FastAPI, path: str, **headers) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers=headers)
+
+
+@pytest.mark.unit
+class TestTraceparent:
+    """Test W3C traceparent parsing."""
+
+    def test_valid_header(self):
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, False)
+        assert parse_traceparent(f"01-{TRACE_ID}-{PARENT_ID}-03-extra") == (TRACE_ID, PARENT_ID, True)
+
+    @pytest.mark.parametrize("header", [
+        None,
+        "",
+        f"ff-{TRACE_ID}-{PARENT_ID}-01",
+        f"00-{'0' * 32}-{PARENT_ID}-01",
+        f"00-{TRACE_ID}-{'0' * 16}-01",
+        f"00-{TRACE_ID}-{PARENT_ID}-01-extra",
+        f"00-{TRACE_ID[:-1]}-{PARENT_ID}-01",
+    ])
+    def test_invalid_headers(self, header):
+        assert parse_traceparent(header) is None
+
+
+@pytest.mark.unit
+class TestTraceSampler:
+    """Test head sampling decisions."""
+
+    def test_rate_is_respected_and_deterministic(self):
+        sampler = TraceSampler(0.25)
+        trace_ids = [new_trace_id() for _ in range(20000)]
+        decisions = [sampler.should_sample(trace_id) for trace_id in trace_ids]
+
+        assert sum(decisions) / len(decisions) == pytest.approx(0.25, abs=0.02)
+        assert decisions == [sampler.should_sample(trace_id) for trace_id in trace_ids]
+
+    def test_route_rates_and_parent_decision(self):
+        sampler = TraceSampler(1.0, {"/health": 0.0, "/api": 0.0, "/api/v1/jobs": 1.0})
+
+        assert not sampler.should_sample(TRACE_ID, "/health/live")
+        assert not sampler.should_sample(TRACE_ID, "/api/v1/users")
+        assert sampler.should_sample(TRACE_ID, "/api/v1/jobs/1")
+        assert sampler.should_sample(TRACE_ID, "/health", parent_sampled=True)
+        assert not sampler.should_sample(TRACE_ID, "/other", parent_sampled=False)
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TraceSampler(1.5)
+
+
+@pytest.mark.unit
+class TestMiddleware:
+    """Test request spans, propagation and tail promotion."""
+
+    @pytest.mark.asyncio
+    async def test_sampled_request_records_request_and_child_spans(self, span_buffer):
+        app = _app(span_buffer, TraceSampler(0.0))
+
+        response = await _get(app, "/jobs", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01")
+
+        child, request_span = span_buffer.drain(10)
+        assert request_span.trace_id == child.trace_id == TRACE_ID
+        assert request_span.parent_span_id == PARENT_ID
+        assert child.parent_span_id == request_span.span_id
+        assert child.attributes["rows"] == "3"
+        assert request_span.attributes["http.status_code"] == 200
+        assert response.headers["traceparent"] == f"00-{TRACE_ID}-{request_span.span_id}-01"
+
+    @pytest.mark.asyncio
+    async def test_unsampled_requests_record_nothing(self, span_buffer):
+        app = _app(span_buffer, TraceSampler(1.0))
+
+        response = await _get(app, "/jobs", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-00")
+
+        assert len(span_buffer) == 0
+        assert response.headers["traceparent"].endswith("-00")
+        assert response.headers["x-trace-id"] == TRACE_ID
+
+    @pytest.mark.asyncio
+    async def test_errors_are_promoted(self, span_buffer):
+        app = _app(span_buffer, TraceSampler(0.0))
+
+        await _get(app, "/fail")
+        await _get(app, "/boom")
+
+        failed, raised = span_buffer.drain(10)
+        assert failed.status == raised.status == STATUS_ERROR
+        assert failed.attributes["http.status_code"] == 503
+        assert failed.attributes["sampling.promoted"] is True
+        assert raised.attributes["error.type"] == "RuntimeError"
+
+    @pytest.mark.asyncio
+    async def test_gateway_uuid_trace_ids_are_continued(self, span_buffer):
+        app = _app(span_buffer, TraceSampler(1.0))
+
+        await _get(app, "/jobs", **{"x-trace-id": "4bf92f35-77b3-4da6-a3ce-929d0e0e4736",
+                                    "x-parent-span-id": PARENT_ID})
+
+        assert {span.trace_id for span in span_buffer.drain(10)} == {TRACE_ID}
+
+    def test_unsampled_child_spans_are_no_ops(self, span_buffer):
+        parent = TraceContext(TRACE_ID, PARENT_ID, sampled=False)
+
+        with trace_operation(parent, "svc", "op") as span:
+            pass
+
+        assert span is parent
+        assert parent._tags is None
+        assert len(span_buffer) == 0
+
+
+@pytest.mark.unit
+class TestSpanExport:
+    """Test the ring buffer and batched exporters."""
+
+    def test_ring_buffer_overwrites_oldest(self):
+        buffer = SpanBuffer(capacity=3)
+        for i in range(5):
+            buffer.record(_span(i))
+
+        assert [span.attributes["n"] for span in buffer.drain(10)] == [2, 3, 4]
+        assert buffer.dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_file_export_in_batches(self, tmp_path):
+        buffer = SpanBuffer()
+        for i in range(5):
+            buffer.record(_span(i))
+        exporter = SpanExporter(buffer, FileSpanSink(str(tmp_path / "spans.jsonl")), batch_size=2)
+
+        assert await exporter.flush() == 5
+        lines = [json.loads(line) for line in (tmp_path / "spans.jsonl").read_text().splitlines()]
+        assert [line["attributes"]["n"] for line in lines] == [0, 1, 2, 3, 4]
+        assert lines[0]["duration_ms"] == 500.0
+
+    @pytest.mark.asyncio
+    async def test_otlp_export(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200 if len(requests) == 1 else 503)
+
+        sink = OTLPSpanSink("http://collector/v1/traces", {"env": "test"},
+                            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        buffer = SpanBuffer()
+        exporter = SpanExporter(buffer, sink, batch_size=10)
+
+        buffer.record(_span(1))
+        assert await exporter.flush() == 1
+        buffer.record(_span(2))
+        assert await exporter.flush() == 0
+        await sink.close()
+
+        resource = requests[0]["resourceSpans"][0]
+        span = resource["scopeSpans"][0]["spans"][0]
+        assert {"key": "service.name", "value": {"stringValue": "svc"}} in resource["resource"]["attributes"]
+        assert span["traceId"] == TRACE_ID
+        assert span["endTimeUnixNano"] == "1500000000"
+        assert {"key": "n", "value": {"intValue": "1"}} in span["attributes"]
+        assert exporter.exported == 1 and exporter.failed == 1
@@ -0,0 +1,183 @@
+"""
+Unit tests for the set-based user analytics refresh.
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.tasks import background_analytics
+from app.tasks.background_analytics import _calculate_user_analytics_batch_async
+
+SCHEMA = [
+    "CREATE TABLE users (id TEXT PRIMARY KEY, active BOOLEAN NOT NULL)",
+    """CREATE TABLE job_applications (
+        id INTEGER PRIMARY KEY, user_id TEXT, job_id TEXT, status TEXT,
+        created_at TIMESTAMP, updated_at TIMESTAMP
+    )""",
+    """CREATE TABLE user_analytics (
+        user_id TEXT PRIMARY KEY, total_applications INTEGER, response_rate REAL,
+        interview_rate REAL, offer_rate REAL, avg_response_time REAL, calculated_at TIMESTAMP
+    )""",
+    """CREATE TABLE analytics_refresh_checkpoints (
+        job_name TEXT PRIMARY KEY, run_id TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'completed',
+        since_watermark TIMESTAMP, until_watermark TIMESTAMP, last_user_id TEXT,
+        users_refreshed INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+]
+
+
+@pytest_asyncio.fixture
+async def engine(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        for statement in SCHEMA:
+            await conn.execute(text(statement))
+
+    @asynccontextmanager
+    async def session():
+        async with AsyncSession(engine) as session:
+            yield session
+
+    monkeypatch.setattr(background_analytics, "get_async_session", session)
+    yield engine
+    await engine.dispose()
+
+
+async def _execute(engine, statement: str, params=None):
+    async with engine.begin() as conn:
+        result = await conn.execute(text(statement), params or {})
+        return result.fetchall() if result.returns_rows else None
+
+
+async def _add_users(engine, count: int, active: bool = True) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("INSERT INTO users (id, active) VALUES (:id, :active)"),
+            [{"id": f"user-{i:03d}", "active": active} for i in range(count)],
+        )
+
+
+async def _apply(engine, user_id: str, status: str, days_ago: float, response_days: float = 0) -> None:
+    created_at = datetime.utcnow() - timedelta(days=days_ago)
+    await _execute(
+        engine,
+        "INSERT INTO job_applications (user_id, job_id, status, created_at, updated_at) "
+        "VALUES (:user_id, 'job', :status, :created_at, :updated_at)",
+        {"user_id": user_id, "status": status, "created_at": created_at,
+         "updated_at": created_at + timedelta(days=response_days)},
+    )
+
+
+async def _add_inactive_user(engine) -> None:
+    await _execute(engine, "INSERT INTO users (id, active) VALUES ('inactive', false)")
+    await _apply(engine, "inactive", "applied", 1)
+
+
+async def _analytics(engine):
+    rows = await _execute(engine, "SELECT user_id, total_applications, response_rate, interview_rate, "
+                                  "offer_rate, avg_response_time, calculated_at FROM user_analytics")
+    return {row.user_id: row for row in rows}
+
+
+async def _rewind_checkpoint(engine, minutes: int = 1) -> None:
+    # Activity is picked up from the previous run's watermark onwards
+    await _execute(engine, "UPDATE analytics_refresh_checkpoints SET until_watermark = :watermark",
+                   {"watermark": datetime.utcnow() - timedelta(minutes=minutes)})
+
+
+@pytest.mark.unit
+class TestUserAnalyticsRefresh:
+    """Test chunked refreshes, change detection and checkpoints."""
+
+    @pytest.mark.asyncio
+    async def test_full_refresh_aggregates(self, engine):
+        await _add_users(engine, 3)
+        await _add_inactive_user(engine)
+        await _apply(engine, "user-000", "interview_scheduled", 5, response_days=2)
+        await _apply(engine, "user-000", "offer_received", 4, response_days=4)
+        await _apply(engine, "user-000", "applied", 3)
+        await _apply(engine, "user-000", "rejected", 2)
+        await _apply(engine, "user-000", "accepted", 45, response_days=1)
+        await _apply(engine, "user-001", "interview_completed", 1)
+
+        result = await _calculate_user_analytics_batch_async("run-1", 2)
+
+        assert result["users_processed"] == 3 and result["chunks"] == 2
+        analytics = await _analytics(engine)
+        assert set(analytics) == {"user-000", "user-001", "user-002"}
+        first = analytics["user-000"]
+        assert first.total_applications == 4
+        assert (first.response_rate, first.interview_rate, first.offer_rate) == (50.0, 50.0, 25.0)
+        assert first.avg_response_time == 3.0
+        assert analytics["user-001"].interview_rate == 100.0
+        assert analytics["user-002"].total_applications == 0
+
+    @pytest.mark.asyncio
+    async def test_only_changed_users_are_refreshed(self, engine):
+        await _add_users(engine, 3)
+        await _apply(engine, "user-001", "applied", 1)
+        await _calculate_user_analytics_batch_async("run-1", 10)
+        before = await _analytics(engine)
+        await _rewind_checkpoint(engine)
+
+        await _apply(engine, "user-002", "offer_received", 0, response_days=0)
+        result = await _calculate_user_analytics_batch_async("run-2", 10)
+
+        assert result["users_processed"] == 1
+        after = await _analytics(engine)
+        assert after["user-002"].offer_rate == 100.0
+        assert after["user-000"].calculated_at == before["user-000"].calculated_at
+        assert after["user-001"].calculated_at == before["user-001"].calculated_at
+
+    @pytest.mark.asyncio
+    async def test_applications_leaving_the_window_are_refreshed(self, engine):
+        await _add_users(engine, 1)
+        await _apply(engine, "user-000", "applied", 29.9)
+        await _calculate_user_analytics_batch_async("run-1", 10)
+        assert (await _analytics(engine))["user-000"].total_applications == 1
+
+        # Six hours pass: the application ages out without being touched
+        await _rewind_checkpoint(engine, minutes=6 * 60)
+        await _execute(engine, "UPDATE job_applications SET created_at = :created_at",
+                       {"created_at": datetime.utcnow() - timedelta(days=30, hours=2)})
+        result = await _calculate_user_analytics_batch_async("run-2", 10)
+
+        assert result["users_processed"] == 1
+        assert (await _analytics(engine))["user-000"].total_applications == 0
+
+    @pytest.mark.asyncio
+    async def test_overlapping_runs_are_skipped(self, engine):
+        await _add_users(engine, 2)
+        await _execute(engine, "INSERT INTO analytics_refresh_checkpoints (job_name, run_id, status, updated_at) "
+                               "VALUES ('user_analytics', 'other', 'running', :now)", {"now": datetime.utcnow()})
+
+        result = await _calculate_user_analytics_batch_async("run-1", 10)
+
+        assert result["skipped"] is True
+        assert await _analytics(engine) == {}
+
+    @pytest.mark.asyncio
+    async def test_stale_runs_resume_from_their_checkpoint(self, engine):
+        await _add_users(engine, 4)
+        stale = datetime.utcnow() - timedelta(hours=1)
+        await _execute(
+            engine,
+            "INSERT INTO analytics_refresh_checkpoints "
+            "(job_name, run_id, status, until_watermark, last_user_id, users_refreshed, updated_at) "
+            "VALUES ('user_analytics', 'crashed', 'running', :until, 'user-001', 2, :stale)",
+            {"until": stale, "stale": stale},
+        )
+
+        result = await _calculate_user_analytics_batch_async("run-1", 10)
+
+        assert set(await _analytics(engine)) == {"user-002", "user-003"}
+        assert result["users_processed"] == 2
+        (checkpoint,) = await _execute(engine, "SELECT * FROM analytics_refresh_checkpoints")
+        assert (checkpoint.status, checkpoint.run_id, checkpoint.users_refreshed) == ("completed", "run-1", 4)
+        assert checkpoint.last_user_id == "user-003"